@@ -168,14 +168,20 @@ class BackendFactory:
         env var, then auto-detection.
     vector_dimension : int
         Embedding dimensionality passed to vector backends (default 1024).
+    sqlite_options : dict, optional
+        Extra keyword arguments for the SQLite backends only (e.g.
+        ``durability``, ``group_commit_ms``); never passed to the
+        server-backed implementations.
     """
 
     def __init__(
         self,
         tier: str | BackendTier | None = None,
         vector_dimension: int = 1024,
+        sqlite_options: Optional[Dict[str, Any]] = None,
     ) -> None:
         self._vector_dim = vector_dimension
+        self._sqlite_options = dict(sqlite_options or {})
 
         # Resolve tier
         if tier is not None:
@@ -255,7 +261,7 @@ class BackendFactory:
         # Fallback: SQLite
         from .sqlite_vector import SQLiteVectorBackend
 
-        self._vector = SQLiteVectorBackend(**kwargs)
+        self._vector = SQLiteVectorBackend(**{**self._sqlite_options, **kwargs})
         logger.info("Created SQLiteVectorBackend (lite / fallback)")
         return self._vector
 
@@ -283,7 +289,7 @@ class BackendFactory:
         # Fallback: SQLite
         from .sqlite_memory import SQLiteMemoryBackend
 
-        self._storage = SQLiteMemoryBackend(**kwargs)
+        self._storage = SQLiteMemoryBackend(**{**self._sqlite_options, **kwargs})
         logger.info("Created SQLiteMemoryBackend (lite / fallback)")
         return self._storage
 
@@ -344,7 +350,7 @@ class BackendFactory:
         # Fallback: SQLite FTS5
         from .sqlite_fts import SQLiteFTS5Backend
 
-        self._text_search = SQLiteFTS5Backend(**kwargs)
+        self._text_search = SQLiteFTS5Backend(**{**self._sqlite_options, **kwargs})
         logger.info("Created SQLiteFTS5Backend (lite / fallback)")
         return self._text_search
 
@@ -87,6 +87,21 @@ class VectorBackend(ABC):
             metadata: Optional metadata to store alongside the vector.
         """
 
+    def add_batch(
+        self,
+        items: Sequence[Tuple[str, List[float], Optional[Dict[str, Any]]]],
+    ) -> None:
+        """Insert or update many vectors at once (bulk ingest).
+
+        The default implementation calls :meth:`add` per item; backends
+        that can group the writes into a single commit should override it.
+
+        Args:
+            items: ``(id, vector, metadata)`` triples.
+        """
+        for id, vector, metadata in items:
+            self.add(id, vector, metadata)
+
     @abstractmethod
     def search(
         self,
@@ -105,6 +120,22 @@ class VectorBackend(ABC):
             Ranked list of :class:`SearchResult` (descending by score).
         """
 
+    def search_batch(
+        self,
+        query_vectors: Sequence[List[float]],
+        top_k: int = 20,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[SearchResult]]:
+        """Run :meth:`search` for several query vectors that share *filters*.
+
+        The default implementation searches one query at a time; backends
+        that can score the whole query matrix in one pass should override it.
+
+        Returns:
+            One ranked result list per query, in input order.
+        """
+        return [self.search(vector, top_k=top_k, filters=filters) for vector in query_vectors]
+
     @abstractmethod
     def delete(self, id: str) -> bool:
         """Remove a vector by id.
@@ -139,6 +170,21 @@ class TextSearchBackend(ABC):
             metadata: Optional metadata.
         """
 
+    def add_batch(
+        self,
+        items: Sequence[Tuple[str, str, Optional[Dict[str, Any]]]],
+    ) -> None:
+        """Index many documents at once (bulk ingest).
+
+        The default implementation calls :meth:`add` per item; backends
+        that can group the writes into a single commit should override it.
+
+        Args:
+            items: ``(id, text, metadata)`` triples.
+        """
+        for id, text, metadata in items:
+            self.add(id, text, metadata)
+
     @abstractmethod
     def search(
         self,
@@ -303,6 +349,18 @@ class StorageBackend(ABC):
             data: Serialisable data payload.
         """
 
+    def save_batch(self, items: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        """Persist many documents at once (bulk ingest).
+
+        The default implementation calls :meth:`save` per item; backends
+        that can group the writes into a single commit should override it.
+
+        Args:
+            items: ``(id, data)`` pairs.
+        """
+        for id, data in items:
+            self.save(id, data)
+
     @abstractmethod
     def load(self, id: str) -> Optional[Dict[str, Any]]:
         """Load a document by id.
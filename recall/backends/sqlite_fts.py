@@ -11,7 +11,9 @@ pass the same ``db_path``.
 
 Design notes
 ------------
-* **Thread safety** – an ``RLock`` protects every public method.
+* **Thread safety** – writes go through a :class:`GroupCommitWriter`
+  that coalesces concurrent writes into one transaction; searches run
+  lock-free on per-thread connections (WAL snapshot reads).
 * **Connection-per-thread** – ``threading.local()`` gives each thread
   its own ``sqlite3.Connection``.
 * **Chinese / CJK support** – if *jieba* is importable the query and
@@ -29,9 +31,11 @@ import sqlite3
 import threading
 import time
 import unicodedata
-from typing import Any, Dict, List, Optional, Sequence
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from .interfaces import SearchResult, TextSearchBackend
+from .sqlite_writer import GroupCommitWriter
 
 logger = logging.getLogger(__name__)
 
@@ -157,17 +161,35 @@ class SQLiteFTS5Backend(TextSearchBackend):
         ``SQLiteMemoryBackend`` to share a single database.
     default_namespace : str
         Namespace used when no explicit one is provided.
+    durability : {"full", "normal", "async"}
+        Commit durability of the group-commit writer (see
+        :mod:`recall.backends.sqlite_writer`).
+    group_commit_ms : float
+        Extra time to linger for concurrent writes (``0``: group only
+        the writes that queued up during the previous commit).
+    group_commit_rows : int
+        Maximum rows per group transaction.
     """
 
     def __init__(
         self,
         db_path: str = "recall_data/data/memories.db",
         default_namespace: str = "default",
+        durability: str = "normal",
+        group_commit_ms: float = 0.0,
+        group_commit_rows: int = 512,
     ) -> None:
         self._db_path = str(db_path)
         self._default_ns = default_namespace
-        self._lock = threading.RLock()
         self._local = threading.local()
+        self._writer = GroupCommitWriter(
+            self._connect,
+            durability=durability,
+            max_delay_ms=group_commit_ms,
+            max_rows=group_commit_rows,
+            inline_conn=self._get_conn if self._db_path == ":memory:" else None,
+            name="sqlite-fts-writer",
+        )
 
         from pathlib import Path
         if self._db_path != ":memory:":
@@ -186,14 +208,28 @@ class SQLiteFTS5Backend(TextSearchBackend):
         """Return this thread's ``sqlite3.Connection``."""
         conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
         if conn is None:
-            conn = sqlite3.connect(self._db_path, check_same_thread=False)
-            conn.row_factory = sqlite3.Row
-            conn.execute("PRAGMA journal_mode=WAL")
-            conn.execute("PRAGMA synchronous=NORMAL")
-            conn.execute("PRAGMA busy_timeout=5000")
+            conn = self._connect()
             self._local.conn = conn
         return conn
 
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    @contextmanager
+    def batch(self) -> Iterator["SQLiteFTS5Backend"]:
+        """Commit every index write made by this thread inside the block at once."""
+        with self._writer.batch():
+            yield self
+
+    def flush(self) -> None:
+        """Wait until all queued writes (``"async"`` durability) are committed."""
+        self._writer.flush()
+
     def _init_schema(self) -> None:
         conn = self._get_conn()
         conn.executescript(_FTS_SCHEMA_SQL)
@@ -277,47 +313,72 @@ class SQLiteFTS5Backend(TextSearchBackend):
             Must include ``namespace`` and/or ``user_id`` for filtered
             retrieval.
         """
+        row = self._fts_row(memory_id, content, keywords, entities, metadata)
+        self._writer.submit(lambda conn: self._replace_rows(conn, [row]))
+        logger.debug("FTS indexed memory %s", memory_id)
+
+    def add_batch(
+        self,
+        items: Sequence[Tuple[str, str, Optional[Dict[str, Any]]]],
+    ) -> None:
+        """Index many documents in a single transaction.
+
+        Segmentation runs on the calling thread; the deletes and
+        inserts for the whole batch share one commit.
+
+        Parameters
+        ----------
+        items : sequence of (id, text, metadata)
+            Same arguments as :meth:`add`, one triple per document.
+        """
+        # Later duplicates win, as with repeated add() calls
+        rows = list({
+            id: self._fts_row(id, text, None, None, metadata)
+            for id, text, metadata in items
+        }.values())
+        if not rows:
+            return
+        self._writer.submit(lambda conn: self._replace_rows(conn, rows), rows=len(rows))
+        logger.debug("FTS indexed %d memories in one batch", len(rows))
+
+    def _fts_row(
+        self,
+        memory_id: str,
+        content: str,
+        keywords: Optional[Sequence[str]],
+        entities: Optional[Sequence[str]],
+        metadata: Optional[Dict[str, Any]],
+    ) -> Tuple[str, str, str, str, str, str, float]:
+        """Segment one document into the column values written by :meth:`_replace_rows`."""
         metadata = metadata or {}
         kw_text = " ".join(keywords) if keywords else ""
         ent_text = " ".join(entities) if entities else ""
+        return (
+            memory_id,
+            _segment_text(content),
+            _segment_text(kw_text),
+            _segment_text(ent_text),
+            metadata.get("user_id", "default"),
+            metadata.get("namespace", self._default_ns),
+            metadata.get("created_at", time.time()),
+        )
 
-        seg_content = _segment_text(content)
-        seg_kw = _segment_text(kw_text)
-        seg_ent = _segment_text(ent_text)
-
-        ns = metadata.get("namespace", self._default_ns)
-        user_id = metadata.get("user_id", "default")
-        created_at = metadata.get("created_at", time.time())
-
-        with self._lock:
-            conn = self._get_conn()
-            try:
-                # Remove any previous entry
-                conn.execute(
-                    "DELETE FROM memories_fts WHERE memory_id = ?",
-                    (memory_id,),
-                )
-                conn.execute(
-                    "DELETE FROM fts_metadata WHERE memory_id = ?",
-                    (memory_id,),
-                )
-                # Insert into FTS table
-                conn.execute(
-                    "INSERT INTO memories_fts (memory_id, content, keywords, entities) "
-                    "VALUES (?, ?, ?, ?)",
-                    (memory_id, seg_content, seg_kw, seg_ent),
-                )
-                # Insert metadata
-                conn.execute(
-                    "INSERT INTO fts_metadata (memory_id, user_id, namespace, created_at) "
-                    "VALUES (?, ?, ?, ?)",
-                    (memory_id, user_id, ns, created_at),
-                )
-                conn.commit()
-                logger.debug("FTS indexed memory %s", memory_id)
-            except Exception:
-                conn.rollback()
-                raise
+    @staticmethod
+    def _replace_rows(conn: sqlite3.Connection, rows) -> None:
+        """Delete any previous entries and insert *rows* (the writer commits)."""
+        ids = [(row[0],) for row in rows]
+        conn.executemany("DELETE FROM memories_fts WHERE memory_id = ?", ids)
+        conn.executemany("DELETE FROM fts_metadata WHERE memory_id = ?", ids)
+        conn.executemany(
+            "INSERT INTO memories_fts (memory_id, content, keywords, entities) "
+            "VALUES (?, ?, ?, ?)",
+            [row[:4] for row in rows],
+        )
+        conn.executemany(
+            "INSERT INTO fts_metadata (memory_id, user_id, namespace, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            [(row[0], row[4], row[5], row[6]) for row in rows],
+        )
 
     def search_memories(
         self,
@@ -389,13 +450,12 @@ class SQLiteFTS5Backend(TextSearchBackend):
 
         sql = " ".join(sql_parts)
 
-        with self._lock:
-            conn = self._get_conn()
-            try:
-                rows = conn.execute(sql, params).fetchall()
-            except sqlite3.OperationalError as exc:
-                logger.warning("FTS query failed: %s  query=%r", exc, fts_query)
-                return []
+        conn = self._get_conn()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as exc:
+            logger.warning("FTS query failed: %s  query=%r", exc, fts_query)
+            return []
 
         results: list[SearchResult] = []
         for row in rows:
@@ -416,25 +476,21 @@ class SQLiteFTS5Backend(TextSearchBackend):
 
         Returns ``True`` if a row was deleted.
         """
-        with self._lock:
-            conn = self._get_conn()
-            try:
-                cur = conn.execute(
-                    "DELETE FROM memories_fts WHERE memory_id = ?",
-                    (memory_id,),
-                )
-                conn.execute(
-                    "DELETE FROM fts_metadata WHERE memory_id = ?",
-                    (memory_id,),
-                )
-                conn.commit()
-                deleted = cur.rowcount > 0
-                if deleted:
-                    logger.debug("FTS deleted memory %s", memory_id)
-                return deleted
-            except Exception:
-                conn.rollback()
-                raise
+        def write(conn: sqlite3.Connection) -> bool:
+            cur = conn.execute(
+                "DELETE FROM memories_fts WHERE memory_id = ?",
+                (memory_id,),
+            )
+            conn.execute(
+                "DELETE FROM fts_metadata WHERE memory_id = ?",
+                (memory_id,),
+            )
+            return cur.rowcount > 0
+
+        deleted = self._writer.submit(write, wait=True)
+        if deleted:
+            logger.debug("FTS deleted memory %s", memory_id)
+        return deleted
 
     def count(
         self,
@@ -454,10 +510,9 @@ class SQLiteFTS5Backend(TextSearchBackend):
         where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
         sql = f"SELECT COUNT(*) AS cnt FROM fts_metadata{where}"
 
-        with self._lock:
-            conn = self._get_conn()
-            row = conn.execute(sql, params).fetchone()
-            return row["cnt"] if row else 0
+        conn = self._get_conn()
+        row = conn.execute(sql, params).fetchone()
+        return row["cnt"] if row else 0
 
     def clear(
         self,
@@ -466,37 +521,31 @@ class SQLiteFTS5Backend(TextSearchBackend):
         global_clear: bool = False,
     ) -> int:
         """Delete indexed entries."""
-        with self._lock:
-            conn = self._get_conn()
-            try:
-                if global_clear:
-                    conn.execute("DELETE FROM memories_fts")
-                    cur = conn.execute("DELETE FROM fts_metadata")
-                else:
-                    ns = namespace or self._default_ns
-                    # Identify memory_ids to delete from FTS
-                    ids = conn.execute(
-                        "SELECT memory_id FROM fts_metadata WHERE namespace = ?",
-                        (ns,),
-                    ).fetchall()
-                    id_list = [r["memory_id"] for r in ids]
-                    if id_list:
-                        placeholders = ",".join("?" * len(id_list))
-                        conn.execute(
-                            f"DELETE FROM memories_fts WHERE memory_id IN ({placeholders})",
-                            id_list,
-                        )
-                    cur = conn.execute(
-                        "DELETE FROM fts_metadata WHERE namespace = ?",
-                        (ns,),
-                    )
-                conn.commit()
-                count = cur.rowcount
-                logger.info("FTS cleared %d entries", count)
-                return count
-            except Exception:
-                conn.rollback()
-                raise
+        def write(conn: sqlite3.Connection) -> int:
+            if global_clear:
+                conn.execute("DELETE FROM memories_fts")
+                return conn.execute("DELETE FROM fts_metadata").rowcount
+            ns = namespace or self._default_ns
+            # Identify memory_ids to delete from FTS
+            ids = conn.execute(
+                "SELECT memory_id FROM fts_metadata WHERE namespace = ?",
+                (ns,),
+            ).fetchall()
+            id_list = [r["memory_id"] for r in ids]
+            if id_list:
+                placeholders = ",".join("?" * len(id_list))
+                conn.execute(
+                    f"DELETE FROM memories_fts WHERE memory_id IN ({placeholders})",
+                    id_list,
+                )
+            return conn.execute(
+                "DELETE FROM fts_metadata WHERE namespace = ?",
+                (ns,),
+            ).rowcount
+
+        count = self._writer.submit(write, wait=True)
+        logger.info("FTS cleared %d entries", count)
+        return count
 
     # ---- helpers ---------------------------------------------------------
 
@@ -516,7 +565,8 @@ class SQLiteFTS5Backend(TextSearchBackend):
         return " OR ".join(escaped)
 
     def close(self) -> None:
-        """Close this thread's connection."""
+        """Drain and stop the writer, then close this thread's connection."""
+        self._writer.close()
         conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
         if conn is not None:
             conn.close()
@@ -7,13 +7,16 @@ backup).
 
 Design notes
 ------------
-* **Thread safety** – every public method acquires an ``RLock`` so the
-  backend can be shared across threads without external synchronisation.
+* **Thread safety** – writes go through a :class:`GroupCommitWriter`
+  (one writer thread, one connection) that coalesces concurrent writes
+  into a single transaction; reads use per-thread connections and take
+  no lock (WAL readers see the last committed snapshot).
 * **Connection-per-thread** – uses ``threading.local()`` so each thread
   gets its own ``sqlite3.Connection`` (SQLite connections cannot be
   shared across threads in most builds).
-* **Atomic writes** – mutating operations run inside an explicit
-  transaction (``BEGIN IMMEDIATE … COMMIT``).
+* **Atomic writes** – each mutating call is atomic (its own SAVEPOINT
+  inside the group transaction); ``with backend.batch():`` makes a whole
+  block of writes atomic and commits it once.
 * **JSON metadata** – the ``metadata`` column is stored as TEXT and
   transparently (de)serialised on read/write.
 """
@@ -27,10 +30,12 @@ import sqlite3
 import threading
 import time
 import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from .interfaces import StorageBackend
+from .sqlite_writer import GroupCommitWriter
 
 logger = logging.getLogger(__name__)
 
@@ -97,6 +102,14 @@ class SQLiteMemoryBackend(StorageBackend):
         an ephemeral in-memory database (mainly useful for testing).
     default_namespace : str, optional
         Namespace used when the caller does not specify one.
+    durability : {"full", "normal", "async"}
+        Commit durability of the group-commit writer (see
+        :mod:`recall.backends.sqlite_writer`).
+    group_commit_ms : float
+        Extra time to linger for concurrent writes (``0``: group only
+        the writes that queued up during the previous commit).
+    group_commit_rows : int
+        Maximum rows per group transaction.
     """
 
     # ---- construction / lifecycle ----------------------------------------
@@ -105,11 +118,21 @@ class SQLiteMemoryBackend(StorageBackend):
         self,
         db_path: str | Path = "recall_data/data/memories.db",
         default_namespace: str = "default",
+        durability: str = "normal",
+        group_commit_ms: float = 0.0,
+        group_commit_rows: int = 512,
     ) -> None:
         self._db_path = str(db_path)
         self._default_ns = default_namespace
-        self._lock = threading.RLock()
         self._local = threading.local()
+        self._writer = GroupCommitWriter(
+            self._connect,
+            durability=durability,
+            max_delay_ms=group_commit_ms,
+            max_rows=group_commit_rows,
+            inline_conn=self._get_conn if self._db_path == ":memory:" else None,
+            name="sqlite-memory-writer",
+        )
 
         # Ensure parent directory exists (unless in-memory)
         if self._db_path != ":memory:":
@@ -128,14 +151,32 @@ class SQLiteMemoryBackend(StorageBackend):
         """
         conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
         if conn is None:
-            conn = sqlite3.connect(self._db_path, check_same_thread=False)
-            conn.row_factory = sqlite3.Row
-            conn.execute("PRAGMA journal_mode=WAL")
-            conn.execute("PRAGMA synchronous=NORMAL")
-            conn.execute("PRAGMA busy_timeout=5000")
+            conn = self._connect()
             self._local.conn = conn
         return conn
 
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    @contextmanager
+    def batch(self) -> Iterator["SQLiteMemoryBackend"]:
+        """Commit every write made by this thread inside the block at once.
+
+        ``upsert`` / ``save`` / ``save_batch`` return immediately inside the
+        block and become visible when it exits; an exception discards them.
+        """
+        with self._writer.batch():
+            yield self
+
+    def flush(self) -> None:
+        """Wait until all queued writes (``"async"`` durability) are committed."""
+        self._writer.flush()
+
     def _init_schema(self) -> None:
         conn = self._get_conn()
         conn.executescript(_SCHEMA_SQL)
@@ -150,7 +191,11 @@ class SQLiteMemoryBackend(StorageBackend):
         callers using the generic ``StorageBackend`` interface still get
         upsert semantics automatically.
         """
-        self.upsert(
+        self.upsert(**self._save_kwargs(id, data))
+
+    def _save_kwargs(self, id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a generic ``StorageBackend`` payload onto :meth:`upsert` arguments."""
+        return dict(
             content=data.get("content", json.dumps(data)),
             id=id,
             metadata=data.get("metadata"),
@@ -164,6 +209,19 @@ class SQLiteMemoryBackend(StorageBackend):
             importance=data.get("importance", 0.5),
         )
 
+    def save_batch(self, items: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        """Persist many documents in a single transaction (one commit)."""
+        rows = [self._save_kwargs(id, data) for id, data in items]
+        if not rows:
+            return
+
+        def write(conn: sqlite3.Connection) -> None:
+            for kwargs in rows:
+                kwargs = dict(kwargs)
+                self._upsert_unlocked(conn, kwargs.pop("content"), **kwargs)
+
+        self._writer.submit(write, rows=len(rows))
+
     def load(self, id: str) -> Optional[Dict[str, Any]]:
         """Load a single memory by its primary-key *id*."""
         return self.get_by_id(id)
@@ -174,27 +232,25 @@ class SQLiteMemoryBackend(StorageBackend):
 
     def list(self, prefix: str = "") -> List[str]:  # type: ignore[override]
         """Return memory ids, optionally filtered by id prefix."""
-        with self._lock:
-            conn = self._get_conn()
-            if prefix:
-                rows = conn.execute(
-                    "SELECT id FROM memories WHERE id LIKE ? ORDER BY created_at DESC",
-                    (prefix + "%",),
-                ).fetchall()
-            else:
-                rows = conn.execute(
-                    "SELECT id FROM memories ORDER BY created_at DESC"
-                ).fetchall()
-            return [r["id"] for r in rows]
+        conn = self._get_conn()
+        if prefix:
+            rows = conn.execute(
+                "SELECT id FROM memories WHERE id LIKE ? ORDER BY created_at DESC",
+                (prefix + "%",),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT id FROM memories ORDER BY created_at DESC"
+            ).fetchall()
+        return [r["id"] for r in rows]
 
     def exists(self, id: str) -> bool:
         """Check whether a memory with *id* exists."""
-        with self._lock:
-            conn = self._get_conn()
-            row = conn.execute(
-                "SELECT 1 FROM memories WHERE id = ?", (id,)
-            ).fetchone()
-            return row is not None
+        conn = self._get_conn()
+        row = conn.execute(
+            "SELECT 1 FROM memories WHERE id = ?", (id,)
+        ).fetchone()
+        return row is not None
 
     # ---- extended CRUD ----------------------------------------------------
 
@@ -222,60 +278,91 @@ class SQLiteMemoryBackend(StorageBackend):
         Returns
         -------
         str
-            The id of the inserted / updated memory.
+            The id of the inserted / updated memory.  Upserts keyed by
+            *external_id* wait for the commit to learn the id; plain
+            inserts return their id without waiting under ``"async"``
+            durability or inside :meth:`batch`.
+        """
+        mem_id = id if external_id is not None else (id or _new_id())
+
+        def write(conn: sqlite3.Connection) -> str:
+            return self._upsert_unlocked(
+                conn, content, id=mem_id, external_id=external_id,
+                metadata=metadata, user_id=user_id, session_id=session_id,
+                namespace=namespace, source=source, category=category,
+                event_time=event_time, importance=importance,
+            )
+
+        if external_id is not None:
+            return self._writer.submit(write, wait=True)
+        self._writer.submit(write)
+        return mem_id
+
+    def _upsert_unlocked(
+        self,
+        conn: sqlite3.Connection,
+        content: str,
+        *,
+        id: Optional[str] = None,
+        external_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        user_id: str = "default",
+        session_id: Optional[str] = None,
+        namespace: Optional[str] = None,
+        source: str = "user",
+        category: Optional[str] = None,
+        event_time: Optional[str] = None,
+        importance: float = 0.5,
+    ) -> str:
+        """Upsert body shared by :meth:`upsert` and the bulk paths.
+
+        Runs inside the writer's group transaction; the writer commits
+        (or rolls back).
         """
         ns = namespace or self._default_ns
         now = _now()
         meta_json = json.dumps(metadata) if metadata else None
 
-        with self._lock:
-            conn = self._get_conn()
-            try:
-                # Try to find existing row by external_id composite key
-                if external_id is not None:
-                    existing = conn.execute(
-                        "SELECT id FROM memories "
-                        "WHERE source = ? AND namespace = ? AND external_id = ?",
-                        (source, ns, external_id),
-                    ).fetchone()
-                    if existing:
-                        mem_id = existing["id"]
-                        conn.execute(
-                            "UPDATE memories SET "
-                            "  content = ?, metadata = ?, user_id = ?, "
-                            "  session_id = ?, category = ?, event_time = ?, "
-                            "  importance = ?, updated_at = ? "
-                            "WHERE id = ?",
-                            (
-                                content, meta_json, user_id,
-                                session_id, category, event_time,
-                                importance, now, mem_id,
-                            ),
-                        )
-                        conn.commit()
-                        logger.debug("Updated memory %s (external_id=%s)", mem_id, external_id)
-                        return mem_id
-
-                # Insert new row (use INSERT OR REPLACE to support upsert by id)
-                mem_id = id or _new_id()
+        # Try to find existing row by external_id composite key
+        if external_id is not None:
+            existing = conn.execute(
+                "SELECT id FROM memories "
+                "WHERE source = ? AND namespace = ? AND external_id = ?",
+                (source, ns, external_id),
+            ).fetchone()
+            if existing:
+                mem_id = existing["id"]
                 conn.execute(
-                    "INSERT OR REPLACE INTO memories "
-                    "(id, external_id, content, metadata, user_id, session_id, "
-                    " namespace, source, category, event_time, importance, "
-                    " created_at, updated_at) "
-                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    "UPDATE memories SET "
+                    "  content = ?, metadata = ?, user_id = ?, "
+                    "  session_id = ?, category = ?, event_time = ?, "
+                    "  importance = ?, updated_at = ? "
+                    "WHERE id = ?",
                     (
-                        mem_id, external_id, content, meta_json, user_id,
-                        session_id, ns, source, category, event_time,
-                        importance, now, now,
+                        content, meta_json, user_id,
+                        session_id, category, event_time,
+                        importance, now, mem_id,
                     ),
                 )
-                conn.commit()
-                logger.debug("Inserted memory %s", mem_id)
+                logger.debug("Updated memory %s (external_id=%s)", mem_id, external_id)
                 return mem_id
-            except Exception:
-                conn.rollback()
-                raise
+
+        # Insert new row (use INSERT OR REPLACE to support upsert by id)
+        mem_id = id or _new_id()
+        conn.execute(
+            "INSERT OR REPLACE INTO memories "
+            "(id, external_id, content, metadata, user_id, session_id, "
+            " namespace, source, category, event_time, importance, "
+            " created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                mem_id, external_id, content, meta_json, user_id,
+                session_id, ns, source, category, event_time,
+                importance, now, now,
+            ),
+        )
+        logger.debug("Inserted memory %s", mem_id)
+        return mem_id
 
     def get_by_id(self, id: str) -> Optional[Dict[str, Any]]:
         """Retrieve a single memory by primary key.
@@ -286,12 +373,11 @@ class SQLiteMemoryBackend(StorageBackend):
             The memory as a plain dict with parsed ``metadata``, or
             ``None`` if not found.
         """
-        with self._lock:
-            conn = self._get_conn()
-            row = conn.execute(
-                "SELECT * FROM memories WHERE id = ?", (id,)
-            ).fetchone()
-            return self._row_to_dict(row) if row else None
+        conn = self._get_conn()
+        row = conn.execute(
+            "SELECT * FROM memories WHERE id = ?", (id,)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
 
     def list_memories(
         self,
@@ -353,10 +439,9 @@ class SQLiteMemoryBackend(StorageBackend):
         )
         params += [limit, offset]
 
-        with self._lock:
-            conn = self._get_conn()
-            rows = conn.execute(sql, params).fetchall()
-            return [self._row_to_dict(r) for r in rows]
+        conn = self._get_conn()
+        rows = conn.execute(sql, params).fetchall()
+        return [self._row_to_dict(r) for r in rows]
 
     def count(
         self,
@@ -390,28 +475,22 @@ class SQLiteMemoryBackend(StorageBackend):
         where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
         sql = f"SELECT COUNT(*) as cnt FROM memories{where}"
 
-        with self._lock:
-            conn = self._get_conn()
-            row = conn.execute(sql, params).fetchone()
-            return row["cnt"] if row else 0
+        conn = self._get_conn()
+        row = conn.execute(sql, params).fetchone()
+        return row["cnt"] if row else 0
 
     def delete_by_id(self, id: str) -> bool:
         """Delete a memory by primary key.
 
         Returns ``True`` if a row was actually deleted.
         """
-        with self._lock:
-            conn = self._get_conn()
-            try:
-                cur = conn.execute("DELETE FROM memories WHERE id = ?", (id,))
-                conn.commit()
-                deleted = cur.rowcount > 0
-                if deleted:
-                    logger.debug("Deleted memory %s", id)
-                return deleted
-            except Exception:
-                conn.rollback()
-                raise
+        def write(conn: sqlite3.Connection) -> bool:
+            return conn.execute("DELETE FROM memories WHERE id = ?", (id,)).rowcount > 0
+
+        deleted = self._writer.submit(write, wait=True)
+        if deleted:
+            logger.debug("Deleted memory %s", id)
+        return deleted
 
     def clear(
         self,
@@ -433,22 +512,17 @@ class SQLiteMemoryBackend(StorageBackend):
         int
             Number of rows deleted.
         """
-        with self._lock:
-            conn = self._get_conn()
-            try:
-                if global_clear:
-                    cur = conn.execute("DELETE FROM memories")
-                else:
-                    ns = namespace or self._default_ns
-                    cur = conn.execute(
-                        "DELETE FROM memories WHERE namespace = ?", (ns,)
-                    )
-                conn.commit()
-                logger.info("Cleared %d memories", cur.rowcount)
-                return cur.rowcount
-            except Exception:
-                conn.rollback()
-                raise
+        def write(conn: sqlite3.Connection) -> int:
+            if global_clear:
+                return conn.execute("DELETE FROM memories").rowcount
+            ns = namespace or self._default_ns
+            return conn.execute(
+                "DELETE FROM memories WHERE namespace = ?", (ns,)
+            ).rowcount
+
+        removed = self._writer.submit(write, wait=True)
+        logger.info("Cleared %d memories", removed)
+        return removed
 
     # ---- import / export / backup ----------------------------------------
 
@@ -463,26 +537,31 @@ class SQLiteMemoryBackend(StorageBackend):
         int
             Number of records imported.
         """
-        count = 0
-        for rec in records:
-            content = rec.get("content")
-            if not content:
-                logger.warning("Skipping record without content: %s", rec.get("id"))
-                continue
-            self.upsert(
-                content=content,
-                id=rec.get("id"),
-                external_id=rec.get("external_id"),
-                metadata=rec.get("metadata"),
-                user_id=rec.get("user_id", "default"),
-                session_id=rec.get("session_id"),
-                namespace=rec.get("namespace", self._default_ns),
-                source=rec.get("source", "user"),
-                category=rec.get("category"),
-                event_time=rec.get("event_time"),
-                importance=rec.get("importance", 0.5),
-            )
-            count += 1
+        def write(conn: sqlite3.Connection) -> int:
+            count = 0
+            for rec in records:
+                content = rec.get("content")
+                if not content:
+                    logger.warning("Skipping record without content: %s", rec.get("id"))
+                    continue
+                self._upsert_unlocked(
+                    conn,
+                    content,
+                    id=rec.get("id"),
+                    external_id=rec.get("external_id"),
+                    metadata=rec.get("metadata"),
+                    user_id=rec.get("user_id", "default"),
+                    session_id=rec.get("session_id"),
+                    namespace=rec.get("namespace", self._default_ns),
+                    source=rec.get("source", "user"),
+                    category=rec.get("category"),
+                    event_time=rec.get("event_time"),
+                    importance=rec.get("importance", 0.5),
+                )
+                count += 1
+            return count
+
+        count = self._writer.submit(write, wait=True, rows=max(1, len(records)))
         logger.info("Imported %d memories", count)
         return count
 
@@ -527,11 +606,11 @@ class SQLiteMemoryBackend(StorageBackend):
         dest = Path(dest_path)
         dest.parent.mkdir(parents=True, exist_ok=True)
 
-        with self._lock:
-            # Checkpoint WAL to ensure everything is flushed.
-            conn = self._get_conn()
-            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
-            shutil.copy2(self._db_path, dest)
+        # Drain queued writes, then checkpoint WAL so the main file is complete.
+        self._writer.flush()
+        conn = self._get_conn()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        shutil.copy2(self._db_path, dest)
         logger.info("Database backed up to %s", dest)
 
     # ---- helpers ---------------------------------------------------------
@@ -551,7 +630,8 @@ class SQLiteMemoryBackend(StorageBackend):
         return d
 
     def close(self) -> None:
-        """Close the current thread's connection (if open)."""
+        """Drain and stop the writer, then close the current thread's connection."""
+        self._writer.close()
         conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
         if conn is not None:
             conn.close()
@@ -1,10 +1,12 @@
 """Recall v7.0 – SQLite Vector Storage Backend
 
 Stores dense embedding vectors as BLOBs inside a regular SQLite table.
-Search is brute-force cosine similarity over all stored vectors using
-NumPy – suitable for small-to-medium corpora (< 50 k vectors).  For
-larger datasets switch to the existing ``VectorIndexIVF`` or the
-upcoming Qdrant backend (Recall 7.6).
+Search is cosine similarity over a cached, pre-normalised float32
+matrix per namespace – one matmul per query instead of decoding the
+whole table.  Namespaces above ``_LARGE_THRESHOLD`` vectors switch to
+an approximate inverted-file (IVF) mode that only scores the rows of
+the probed clusters.  For very large datasets switch to the existing
+``VectorIndexIVF`` or the upcoming Qdrant backend (Recall 7.6).
 
 The module can share the same database file as
 :class:`~recall.backends.sqlite_memory.SQLiteMemoryBackend` and
@@ -12,8 +14,20 @@ The module can share the same database file as
 
 Design notes
 ------------
-* **Thread safety** – ``RLock`` on every public method.
+* **Thread safety** – writes go through a :class:`GroupCommitWriter`
+  that coalesces concurrent writes into one transaction and applies
+  them to the matrix cache after the commit.  An ``RLock`` guards only
+  the matrix cache: searches hold it while taking a snapshot and score
+  outside it; plain reads take no lock (WAL snapshot reads).
 * **Connection-per-thread** – ``threading.local()`` pool.
+* **Matrix cache (v7.1)** – built on the first search of a namespace and
+  kept in sync by this instance's writes (rows are appended, replaced
+  or deleted ids are masked; the masked rows are compacted away once
+  they make up a quarter of the matrix).  Writes made by *other* processes to the
+  same database are not observed; use one backend instance per
+  database.  With ``matrix_dir`` set, each built matrix is also saved
+  as a ``.npy`` sidecar and memory-mapped on the next cold start if the
+  table has not changed since.
 * **NumPy dependency** – required for cosine-similarity computation.
   If NumPy is unavailable the module still imports but raises at
   construction time.
@@ -21,15 +35,21 @@ Design notes
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
+import os
 import sqlite3
 import struct
 import threading
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from .interfaces import SearchResult, VectorBackend
+from .sqlite_writer import GroupCommitWriter
 
 logger = logging.getLogger(__name__)
 
@@ -76,6 +96,146 @@ def _blob_to_vec(blob: bytes, dim: int) -> "np.ndarray":
     return np.frombuffer(blob, dtype=np.float32, count=dim).copy()
 
 
+def _normalise_rows(mat: "np.ndarray") -> "np.ndarray":
+    """Return *mat* with unit-length rows (zero rows stay zero)."""
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1e-10  # avoid division by zero
+    return (mat / norms).astype(np.float32, copy=False)
+
+
+def _top_k(scores: "np.ndarray", top_k: int) -> "np.ndarray":
+    """Indices of the *top_k* highest scores, best first."""
+    if top_k >= len(scores):
+        return np.argsort(-scores)
+    # Use argpartition for efficiency then sort the top-k slice.
+    part_idx = np.argpartition(-scores, top_k)[:top_k]
+    return part_idx[np.argsort(-scores[part_idx])]
+
+
+# ---------------------------------------------------------------------------
+# Cached namespace matrix
+# ---------------------------------------------------------------------------
+
+_ALL_NAMESPACES = None
+"""Cache key of the matrix used by ``global`` searches."""
+
+
+class _NamespaceMatrix:
+    """Pre-normalised vectors of one namespace (or of the whole table).
+
+    Rows are appended in place.  A replaced or deleted id is masked out
+    in ``alive``, which is copied on every change, so a search can take
+    a snapshot under the backend lock and score it without holding the
+    lock.  Once masked rows exceed ``COMPACT_DEAD_FRACTION`` of the
+    matrix (and ``COMPACT_MIN_DEAD`` rows) the live rows are copied into
+    fresh arrays; snapshots keep the old ones, and ``generation`` counts
+    the compactions.  ``centroids`` / ``assign`` hold the IVF clustering
+    once the matrix is large enough for ANN mode.
+    """
+
+    COMPACT_DEAD_FRACTION = 0.25
+    COMPACT_MIN_DEAD = 1024
+
+    def __init__(self, ids: List[str], mat: "np.ndarray") -> None:
+        self.ids = list(ids)
+        self.row_of = {id: i for i, id in enumerate(self.ids)}
+        self.mat = mat
+        self.dim = mat.shape[1]
+        self.size = len(self.ids)
+        self.alive = np.ones(self.size, dtype=bool)
+        for i, id in enumerate(self.ids):
+            if self.row_of[id] != i:  # duplicate id: the last row wins
+                self.alive[i] = False
+        self.live = int(self.alive.sum())
+        self.centroids: Optional["np.ndarray"] = None
+        self.assign: Optional["np.ndarray"] = None
+        self.trained_size = 0
+        self.training = False
+        self.generation = 0
+        self._maybe_compact()
+
+    def snapshot(self) -> tuple:
+        return self.mat, self.size, self.alive, self.ids, self.centroids, self.assign
+
+    def append(self, ids: List[str], vecs: "np.ndarray") -> None:
+        """Append normalised rows; earlier rows of the same ids are masked."""
+        n = len(ids)
+        alive = np.ones(self.size + n, dtype=bool)
+        alive[:self.size] = self.alive
+        for offset, id in enumerate(ids):
+            previous = self.row_of.get(id)
+            if previous is not None and alive[previous]:
+                alive[previous] = False
+                self.live -= 1
+            self.row_of[id] = self.size + offset
+        self.live += n
+
+        if self.size + n > self.mat.shape[0] or not self.mat.flags.writeable:
+            capacity = max(self.size + n, 2 * self.size, 64)
+            grown = np.empty((capacity, self.dim), dtype=np.float32)
+            grown[:self.size] = self.mat[:self.size]
+            self.mat = grown
+        self.mat[self.size:self.size + n] = vecs
+        if self.centroids is not None:
+            self.assign = np.concatenate([self.assign[:self.size], _assign_clusters(vecs, self.centroids)])
+        self.ids.extend(ids)
+        self.size += n
+        self.alive = alive
+        self._maybe_compact()
+
+    def remove(self, ids: Sequence[str]) -> None:
+        """Mask the rows of *ids* (ids not in this matrix are ignored)."""
+        rows = [self.row_of.pop(id) for id in ids if id in self.row_of]
+        if rows:
+            alive = self.alive.copy()
+            alive[rows] = False
+            self.live -= len(rows)
+            self.alive = alive
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        """Drop the masked rows once they outweigh the compaction threshold."""
+        dead = self.size - self.live
+        if dead < self.COMPACT_MIN_DEAD or dead <= self.size * self.COMPACT_DEAD_FRACTION:
+            return
+        rows = np.flatnonzero(self.alive)
+        self.mat = self.mat[rows]  # fancy indexing copies: snapshots keep the old matrix
+        self.ids = [self.ids[i] for i in rows]
+        self.row_of = {id: i for i, id in enumerate(self.ids)}
+        self.size = len(self.ids)
+        self.alive = np.ones(self.size, dtype=bool)
+        if self.assign is not None:
+            self.assign = self.assign[rows]
+        self.generation += 1
+
+
+def _assign_clusters(vecs: "np.ndarray", centroids: "np.ndarray", chunk: int = 8192) -> "np.ndarray":
+    """Nearest centroid (by cosine) of every row, computed in chunks."""
+    out = np.empty(len(vecs), dtype=np.int32)
+    for start in range(0, len(vecs), chunk):
+        out[start:start + chunk] = np.argmax(vecs[start:start + chunk] @ centroids.T, axis=1)
+    return out
+
+
+def _train_centroids(
+    vecs: "np.ndarray", nlist: int, iterations: int = 10, seed: int = 0
+) -> "np.ndarray":
+    """Spherical k-means on a sample of *vecs* (rows already normalised)."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vecs), nlist * 40)
+    sample = vecs[rng.choice(len(vecs), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _assign_clusters(sample, centroids)
+        onehot = np.zeros((nlist, sample_size), dtype=np.float32)
+        onehot[assign, np.arange(sample_size)] = 1.0
+        sums = onehot @ sample
+        empty = np.bincount(assign, minlength=nlist) == 0
+        sums[empty] = centroids[empty]  # keep empty clusters where they were
+        centroids = _normalise_rows(sums)
+    return centroids
+
+
 # ---------------------------------------------------------------------------
 # SQLiteVectorBackend
 # ---------------------------------------------------------------------------
@@ -90,6 +250,25 @@ class SQLiteVectorBackend(VectorBackend):
         Path to the SQLite database.
     default_namespace : str
         Namespace used when not explicitly provided.
+    matrix_dir : str, optional
+        Directory for ``.npy`` sidecars of the cached matrices.  ``None``
+        (default) keeps the cache in memory only.
+    cache_max_vectors : int
+        Upper bound on the number of rows kept across all cached
+        matrices; least recently searched namespaces are dropped first.
+    ann_threshold : int, optional
+        Namespaces with more live vectors than this are searched in IVF
+        mode.  Defaults to ``_LARGE_THRESHOLD``; ``0`` disables ANN.
+    ann_nprobe : int
+        Number of clusters scored per query in IVF mode.
+    durability : {"full", "normal", "async"}
+        Commit durability of the group-commit writer (see
+        :mod:`recall.backends.sqlite_writer`).
+    group_commit_ms : float
+        Extra time to linger for concurrent writes (``0``: group only
+        the writes that queued up during the previous commit).
+    group_commit_rows : int
+        Maximum rows per group transaction.
 
     Raises
     ------
@@ -99,12 +278,20 @@ class SQLiteVectorBackend(VectorBackend):
 
     _LARGE_THRESHOLD = 50_000
     """When the number of stored vectors exceeds this threshold a
-    warning is emitted suggesting migration to an IVF or ANN index."""
+    warning is emitted suggesting migration to an IVF or ANN index, and
+    (by default) namespaces of that size are searched in IVF mode."""
 
     def __init__(
         self,
         db_path: str = "recall_data/data/memories.db",
         default_namespace: str = "default",
+        matrix_dir: Optional[str] = None,
+        cache_max_vectors: int = 2_000_000,
+        ann_threshold: Optional[int] = None,
+        ann_nprobe: int = 16,
+        durability: str = "normal",
+        group_commit_ms: float = 0.0,
+        group_commit_rows: int = 512,
     ) -> None:
         if not _NP_AVAILABLE:
             raise ImportError(
@@ -114,8 +301,24 @@ class SQLiteVectorBackend(VectorBackend):
 
         self._db_path = str(db_path)
         self._default_ns = default_namespace
-        self._lock = threading.RLock()
+        self._lock = threading.RLock()  # guards the matrix cache only
         self._local = threading.local()
+        self._writer = GroupCommitWriter(
+            self._connect,
+            durability=durability,
+            max_delay_ms=group_commit_ms,
+            max_rows=group_commit_rows,
+            inline_conn=self._get_conn if self._db_path == ":memory:" else None,
+            name="sqlite-vector-writer",
+        )
+
+        self._matrix_dir = matrix_dir
+        self._cache_max_vectors = cache_max_vectors
+        self._ann_threshold = self._LARGE_THRESHOLD if ann_threshold is None else ann_threshold
+        self._ann_nprobe = ann_nprobe
+        self._matrices: "OrderedDict[Optional[str], _NamespaceMatrix]" = OrderedDict()
+        if matrix_dir:
+            Path(matrix_dir).mkdir(parents=True, exist_ok=True)
 
         if self._db_path != ":memory:":
             Path(self._db_path).parent.mkdir(parents=True, exist_ok=True)
@@ -129,14 +332,28 @@ class SQLiteVectorBackend(VectorBackend):
         """Return this thread's ``sqlite3.Connection``."""
         conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
         if conn is None:
-            conn = sqlite3.connect(self._db_path, check_same_thread=False)
-            conn.row_factory = sqlite3.Row
-            conn.execute("PRAGMA journal_mode=WAL")
-            conn.execute("PRAGMA synchronous=NORMAL")
-            conn.execute("PRAGMA busy_timeout=5000")
+            conn = self._connect()
             self._local.conn = conn
         return conn
 
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    @contextmanager
+    def batch(self) -> Iterator["SQLiteVectorBackend"]:
+        """Commit every vector write made by this thread inside the block at once."""
+        with self._writer.batch():
+            yield self
+
+    def flush(self) -> None:
+        """Wait until all queued writes (``"async"`` durability) are committed."""
+        self._writer.flush()
+
     def _init_schema(self) -> None:
         conn = self._get_conn()
         conn.executescript(_VECTOR_SCHEMA_SQL)
@@ -167,30 +384,71 @@ class SQLiteVectorBackend(VectorBackend):
         dim = len(vector)
         now = time.time()
 
-        with self._lock:
-            conn = self._get_conn()
-            try:
-                conn.execute(
-                    "INSERT OR REPLACE INTO vectors "
-                    "(memory_id, vector, dimension, namespace, created_at) "
-                    "VALUES (?, ?, ?, ?, ?)",
-                    (id, blob, dim, ns, now),
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT OR REPLACE INTO vectors "
+                "(memory_id, vector, dimension, namespace, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (id, blob, dim, ns, now),
+            )
+            # Emit a warning if the table is getting large.
+            total = self._count_unlocked(conn)
+            if total == self._LARGE_THRESHOLD:
+                logger.warning(
+                    "Vector table has reached %d entries – consider "
+                    "migrating to VectorIndexIVF or Qdrant for better "
+                    "search performance.",
+                    total,
                 )
-                conn.commit()
-                logger.debug("Vector stored  id=%s  dim=%d", id, dim)
-
-                # Emit a warning if the table is getting large.
-                total = self._count_unlocked(conn)
-                if total == self._LARGE_THRESHOLD:
-                    logger.warning(
-                        "Vector table has reached %d entries – consider "
-                        "migrating to VectorIndexIVF or Qdrant for better "
-                        "search performance.",
-                        total,
-                    )
-            except Exception:
-                conn.rollback()
-                raise
+
+        self._writer.submit(write, on_commit=lambda _: self._cache_write([(id, ns)], [vector]))
+        logger.debug("Vector stored  id=%s  dim=%d", id, dim)
+
+    def add_batch(
+        self,
+        items: Sequence[Tuple[str, List[float], Optional[Dict[str, Any]]]],
+    ) -> None:
+        """Insert or replace many vectors in a single transaction.
+
+        Parameters
+        ----------
+        items : sequence of (id, vector, metadata)
+            Same arguments as :meth:`add`, one triple per vector.
+        """
+        now = time.time()
+        rows = [
+            (
+                id, _vec_to_blob(vector), len(vector),
+                (metadata or {}).get("namespace", self._default_ns), now,
+            )
+            for id, vector, metadata in items
+        ]
+        if not rows:
+            return
+        keys = [(row[0], row[3]) for row in rows]
+        vectors = [vector for _, vector, _ in items]
+
+        def write(conn: sqlite3.Connection) -> None:
+            before = self._count_unlocked(conn)
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors "
+                "(memory_id, vector, dimension, namespace, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            total = self._count_unlocked(conn)
+            if before < self._LARGE_THRESHOLD <= total:
+                logger.warning(
+                    "Vector table has reached %d entries – consider "
+                    "migrating to VectorIndexIVF or Qdrant for better "
+                    "search performance.",
+                    total,
+                )
+
+        self._writer.submit(
+            write, on_commit=lambda _: self._cache_write(keys, vectors), rows=len(rows)
+        )
+        logger.debug("Stored %d vectors in one batch", len(rows))
 
     def search(
         self,
@@ -214,86 +472,114 @@ class SQLiteVectorBackend(VectorBackend):
         list of SearchResult
             Sorted descending by cosine similarity.
         """
-        filters = filters or {}
-        ns: Optional[str] = filters.get("namespace")
-        global_search: bool = filters.get("global", False)
+        return self.search_batch([query_vector], top_k=top_k, filters=filters)[0]
 
-        q = np.asarray(query_vector, dtype=np.float32)
-        q_norm = np.linalg.norm(q)
-        if q_norm == 0:
-            return []
-        q = q / q_norm
+    def search_batch(
+        self,
+        query_vectors: Sequence[List[float]],
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[SearchResult]]:
+        """Cosine-similarity search for several queries in one matmul.
 
-        with self._lock:
-            conn = self._get_conn()
-            if global_search:
-                rows = conn.execute(
-                    "SELECT memory_id, vector, dimension FROM vectors"
-                ).fetchall()
-            else:
-                target_ns = ns or self._default_ns
-                rows = conn.execute(
-                    "SELECT memory_id, vector, dimension FROM vectors WHERE namespace = ?",
-                    (target_ns,),
-                ).fetchall()
+        Parameters are the same as :meth:`search`; *filters* apply to
+        every query.
 
-        if not rows:
+        Returns
+        -------
+        list of list of SearchResult
+            One ranked list per query, in input order.
+        """
+        filters = filters or {}
+        key = _ALL_NAMESPACES if filters.get("global", False) else (
+            filters.get("namespace") or self._default_ns
+        )
+        if len(query_vectors) == 0:
             return []
 
-        ids: list[str] = []
-        vecs: list["np.ndarray"] = []
-        for row in rows:
-            ids.append(row["memory_id"])
-            vecs.append(_blob_to_vec(row["vector"], row["dimension"]))
-
-        mat = np.stack(vecs)  # (N, dim)
-        norms = np.linalg.norm(mat, axis=1, keepdims=True)
-        norms[norms == 0] = 1e-10  # avoid division by zero
-        mat = mat / norms
-
-        scores = mat @ q  # cosine similarity  (N,)
-
-        # Top-k
-        if top_k >= len(scores):
-            top_indices = np.argsort(-scores)
+        with self._lock:
+            matrix = self._get_matrix(key)
+            if matrix is None:
+                return [[] for _ in query_vectors]
+            train = (
+                self._ann_threshold
+                and matrix.live > self._ann_threshold
+                and matrix.trained_size * 2 <= matrix.live
+                and not matrix.training
+            )
+            if train:
+                matrix.training = True  # one trainer; other searches keep scoring exactly
+            snapshot = matrix.snapshot()
+        if train:
+            self._train_ann(matrix)
+            with self._lock:
+                snapshot = matrix.snapshot()
+        mat, size, alive, ids, centroids, assign = snapshot
+
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1)
+        if queries.shape[1] != mat.shape[1]:
+            logger.warning(
+                "Query dimension %d does not match stored vectors (%d)",
+                queries.shape[1], mat.shape[1],
+            )
+            return [[] for _ in query_vectors]
+        q_norms = np.linalg.norm(queries, axis=1)
+        queries = queries / np.where(q_norms == 0, 1.0, q_norms)[:, None]
+
+        if centroids is None:
+            scores = queries @ mat[:size].T  # cosine similarity  (Q, N)
+            scores[:, ~alive] = -np.inf
+            per_query = [(row, None) for row in scores]
         else:
-            # Use argpartition for efficiency then sort the top-k slice.
-            part_idx = np.argpartition(-scores, top_k)[:top_k]
-            top_indices = part_idx[np.argsort(-scores[part_idx])]
-
-        results: list[SearchResult] = []
-        for idx in top_indices:
-            sim = float(scores[idx])
-            if sim <= 0:
-                continue
-            results.append(SearchResult(id=ids[idx], score=sim))
+            per_query = [
+                self._probe(q, mat, size, alive, centroids, assign, top_k) for q in queries
+            ]
+
+        results: list[list[SearchResult]] = []
+        for q_norm, (row_scores, rows) in zip(q_norms, per_query):
+            hits: list[SearchResult] = []
+            if q_norm > 0:
+                for idx in _top_k(row_scores, top_k):
+                    sim = float(row_scores[idx])
+                    if sim <= 0:
+                        continue
+                    hits.append(SearchResult(id=ids[idx if rows is None else rows[idx]], score=sim))
+            results.append(hits)
         return results
 
+    def _probe(self, q, mat, size, alive, centroids, assign, top_k) -> tuple:
+        """IVF mode: score only the rows of the ``ann_nprobe`` nearest clusters."""
+        nprobe = min(self._ann_nprobe, len(centroids))
+        probe = np.argpartition(-(centroids @ q), nprobe - 1)[:nprobe]
+        rows = np.flatnonzero(np.isin(assign[:size], probe) & alive)
+        if len(rows) < top_k:
+            rows = np.flatnonzero(alive)  # too few candidates: score everything
+        return mat[rows] @ q, rows
+
     def delete(self, id: str) -> bool:
         """Delete a vector by memory id.
 
         Returns ``True`` if a row was deleted.
         """
-        with self._lock:
-            conn = self._get_conn()
-            try:
-                cur = conn.execute(
-                    "DELETE FROM vectors WHERE memory_id = ?", (id,)
-                )
-                conn.commit()
-                deleted = cur.rowcount > 0
-                if deleted:
-                    logger.debug("Vector deleted  id=%s", id)
-                return deleted
-            except Exception:
-                conn.rollback()
-                raise
+        def write(conn: sqlite3.Connection) -> bool:
+            return conn.execute(
+                "DELETE FROM vectors WHERE memory_id = ?", (id,)
+            ).rowcount > 0
+
+        def uncache(deleted: bool) -> None:
+            if deleted:
+                with self._lock:
+                    for matrix in self._matrices.values():
+                        matrix.remove([id])
+
+        deleted = self._writer.submit(write, on_commit=uncache, wait=True)
+        if deleted:
+            logger.debug("Vector deleted  id=%s", id)
+        return deleted
 
     def count(self) -> int:
         """Return the total number of stored vectors."""
-        with self._lock:
-            conn = self._get_conn()
-            return self._count_unlocked(conn)
+        return self._count_unlocked(self._get_conn())
 
     def rebuild(self) -> None:
         """No-op for the brute-force backend.
@@ -311,13 +597,12 @@ class SQLiteVectorBackend(VectorBackend):
     def count_by_namespace(self, namespace: Optional[str] = None) -> int:
         """Count vectors in a specific namespace."""
         ns = namespace or self._default_ns
-        with self._lock:
-            conn = self._get_conn()
-            row = conn.execute(
-                "SELECT COUNT(*) AS cnt FROM vectors WHERE namespace = ?",
-                (ns,),
-            ).fetchone()
-            return row["cnt"] if row else 0
+        conn = self._get_conn()
+        row = conn.execute(
+            "SELECT COUNT(*) AS cnt FROM vectors WHERE namespace = ?",
+            (ns,),
+        ).fetchone()
+        return row["cnt"] if row else 0
 
     def get_vector(self, memory_id: str) -> Optional[List[float]]:
         """Retrieve a stored vector by its memory id.
@@ -326,15 +611,14 @@ class SQLiteVectorBackend(VectorBackend):
         -------
         list of float or None
         """
-        with self._lock:
-            conn = self._get_conn()
-            row = conn.execute(
-                "SELECT vector, dimension FROM vectors WHERE memory_id = ?",
-                (memory_id,),
-            ).fetchone()
-            if row is None:
-                return None
-            return _blob_to_vec(row["vector"], row["dimension"]).tolist()
+        conn = self._get_conn()
+        row = conn.execute(
+            "SELECT vector, dimension FROM vectors WHERE memory_id = ?",
+            (memory_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return _blob_to_vec(row["vector"], row["dimension"]).tolist()
 
     def clear(
         self,
@@ -356,22 +640,198 @@ class SQLiteVectorBackend(VectorBackend):
         int
             Number of rows deleted.
         """
-        with self._lock:
-            conn = self._get_conn()
-            try:
+        ns = namespace or self._default_ns
+
+        def write(conn: sqlite3.Connection) -> int:
+            if global_clear:
+                return conn.execute("DELETE FROM vectors").rowcount
+            return conn.execute(
+                "DELETE FROM vectors WHERE namespace = ?", (ns,)
+            ).rowcount
+
+        def uncache(_: int) -> None:
+            with self._lock:
                 if global_clear:
-                    cur = conn.execute("DELETE FROM vectors")
+                    self._matrices.clear()
                 else:
-                    ns = namespace or self._default_ns
-                    cur = conn.execute(
-                        "DELETE FROM vectors WHERE namespace = ?", (ns,)
-                    )
-                conn.commit()
-                logger.info("Vectors cleared: %d", cur.rowcount)
-                return cur.rowcount
-            except Exception:
-                conn.rollback()
-                raise
+                    self._matrices.pop(ns, None)
+                    self._matrices.pop(_ALL_NAMESPACES, None)
+
+        removed = self._writer.submit(write, on_commit=uncache, wait=True)
+        logger.info("Vectors cleared: %d", removed)
+        return removed
+
+    # ---- matrix cache ----------------------------------------------------
+
+    def _get_matrix(self, key: Optional[str]) -> Optional[_NamespaceMatrix]:
+        """Return the cached matrix for *key*, building it on a miss.
+
+        Must be called with ``self._lock`` held.
+        """
+        matrix = self._matrices.get(key)
+        if matrix is not None:
+            self._matrices.move_to_end(key)
+            return matrix
+
+        conn = self._get_conn()
+        matrix = self._load_sidecar(conn, key)
+        if matrix is None:
+            if key is _ALL_NAMESPACES:
+                rows = conn.execute(
+                    "SELECT memory_id, vector, dimension FROM vectors ORDER BY rowid"
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT memory_id, vector, dimension FROM vectors "
+                    "WHERE namespace = ? ORDER BY rowid",
+                    (key,),
+                ).fetchall()
+            if not rows:
+                return None
+            matrix = self._decode_rows(rows)
+            self._save_sidecar(conn, key, matrix)
+
+        self._matrices[key] = matrix
+        self._evict_matrices()
+        return matrix
+
+    @staticmethod
+    def _decode_rows(rows: list) -> _NamespaceMatrix:
+        """Decode BLOB rows into one normalised matrix (single buffer join)."""
+        dim = rows[-1]["dimension"]
+        kept = [row for row in rows if row["dimension"] == dim]
+        if len(kept) < len(rows):
+            logger.warning(
+                "Skipping %d vectors whose dimension differs from %d",
+                len(rows) - len(kept), dim,
+            )
+        buf = b"".join(row["vector"][: dim * 4] for row in kept)
+        mat = np.frombuffer(buf, dtype=np.float32).reshape(len(kept), dim)
+        return _NamespaceMatrix([row["memory_id"] for row in kept], _normalise_rows(mat))
+
+    def _cache_write(self, keys: List[Tuple[str, str]], vectors: Sequence[List[float]]) -> None:
+        """Apply committed inserts/replaces to the cached matrices.
+
+        *keys* are ``(id, namespace)`` pairs aligned with *vectors*.  Runs
+        as the writer's post-commit hook.
+        """
+        with self._lock:
+            self._cache_write_unlocked(keys, vectors)
+
+    def _cache_write_unlocked(self, keys: List[Tuple[str, str]], vectors: Sequence[List[float]]) -> None:
+        if not self._matrices:
+            return
+        written = [id for id, _ in keys]
+        for key, matrix in list(self._matrices.items()):
+            if key is _ALL_NAMESPACES:
+                picked = list(range(len(keys)))
+            else:
+                # An id may move between namespaces: mask it everywhere first.
+                matrix.remove(written)
+                picked = [i for i, (_, ns) in enumerate(keys) if ns == key]
+            if not picked:
+                continue
+            if any(len(vectors[i]) != matrix.dim for i in picked):
+                del self._matrices[key]  # rebuilt from the table on next search
+                continue
+            vecs = _normalise_rows(np.asarray([vectors[i] for i in picked], dtype=np.float32))
+            matrix.append([keys[i][0] for i in picked], vecs)
+        self._evict_matrices()
+
+    def _evict_matrices(self) -> None:
+        """Drop least recently searched matrices above ``cache_max_vectors``.
+
+        Masked rows count until the matrix compacts them (at most
+        ``COMPACT_DEAD_FRACTION`` of a matrix, or ``COMPACT_MIN_DEAD`` rows).
+        """
+        total = sum(m.size for m in self._matrices.values())
+        while total > self._cache_max_vectors and len(self._matrices) > 1:
+            _, dropped = self._matrices.popitem(last=False)
+            total -= dropped.size
+
+    def _train_ann(self, matrix: _NamespaceMatrix) -> None:
+        """Cluster the live rows of *matrix* for IVF search.
+
+        Called without ``self._lock`` by the search that set
+        ``matrix.training``: k-means runs on a snapshot, then the result
+        is swapped in under the lock, assigning rows written meanwhile.
+        """
+        started = time.time()
+        try:
+            with self._lock:
+                mat, size, alive, _, _, _ = matrix.snapshot()
+                generation = matrix.generation
+            live_rows = np.flatnonzero(alive)
+            nlist = max(1, int(np.sqrt(len(live_rows))))
+            centroids = _train_centroids(mat[live_rows], nlist)
+            assign = _assign_clusters(mat[:size], centroids)
+            while True:
+                with self._lock:
+                    if matrix.generation == generation:
+                        if matrix.size > size:
+                            assign = np.concatenate([
+                                assign, _assign_clusters(matrix.mat[size:matrix.size], centroids)
+                            ])
+                        matrix.centroids, matrix.assign = centroids, assign
+                        matrix.trained_size = matrix.live
+                        break
+                    # Compacted meanwhile: row numbers changed, assign the new matrix.
+                    mat, size, generation = matrix.mat, matrix.size, matrix.generation
+                assign = _assign_clusters(mat[:size], centroids)
+        finally:
+            matrix.training = False
+        logger.info(
+            "SQLiteVectorBackend IVF mode: %d vectors, %d clusters (%.2fs)",
+            len(live_rows), nlist, time.time() - started,
+        )
+
+    def _sidecar_paths(self, key: Optional[str]) -> Tuple[str, str]:
+        name = "__all__" if key is _ALL_NAMESPACES else hashlib.sha1(key.encode("utf-8")).hexdigest()
+        base = os.path.join(self._matrix_dir, name)
+        return base + ".npy", base + ".json"
+
+    @staticmethod
+    def _table_signature(conn: sqlite3.Connection, key: Optional[str]) -> list:
+        """Cheap fingerprint of the rows behind *key* (count, max rowid, created_at sum)."""
+        sql = "SELECT COUNT(*), MAX(rowid), TOTAL(created_at) FROM vectors"
+        row = (
+            conn.execute(sql).fetchone() if key is _ALL_NAMESPACES
+            else conn.execute(sql + " WHERE namespace = ?", (key,)).fetchone()
+        )
+        return [row[0], row[1], row[2]]
+
+    def _load_sidecar(self, conn: sqlite3.Connection, key: Optional[str]) -> Optional[_NamespaceMatrix]:
+        """Memory-map a sidecar matrix if it still matches the table."""
+        if not self._matrix_dir:
+            return None
+        npy_path, meta_path = self._sidecar_paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("signature") != self._table_signature(conn, key):
+                return None
+            mat = np.load(npy_path, mmap_mode="r")
+            if mat.shape[0] != len(meta["ids"]):
+                return None
+            return _NamespaceMatrix(meta["ids"], mat)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_sidecar(self, conn: sqlite3.Connection, key: Optional[str], matrix: _NamespaceMatrix) -> None:
+        """Persist a freshly built matrix for memory-mapping on the next start."""
+        if not self._matrix_dir:
+            return
+        npy_path, meta_path = self._sidecar_paths(key)
+        try:
+            signature = self._table_signature(conn, key)
+            with open(npy_path + ".tmp", "wb") as f:
+                np.save(f, matrix.mat[:matrix.size])
+            os.replace(npy_path + ".tmp", npy_path)
+            with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"signature": signature, "ids": matrix.ids}, f)
+            os.replace(meta_path + ".tmp", meta_path)
+        except OSError as exc:
+            logger.warning("Could not write vector matrix sidecar: %s", exc)
 
     # ---- internal --------------------------------------------------------
 
@@ -381,7 +841,8 @@ class SQLiteVectorBackend(VectorBackend):
         return row["cnt"] if row else 0
 
     def close(self) -> None:
-        """Close this thread's connection."""
+        """Drain and stop the writer, then close this thread's connection."""
+        self._writer.close()
         conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
         if conn is not None:
             conn.close()
@@ -0,0 +1,387 @@
+"""Recall v7.1 – Group-commit writer for the SQLite BAL backends
+
+Every BAL write used to run ``BEGIN … COMMIT`` on its own under a
+process-wide ``RLock``.  Because each memory is dual-written to three
+databases, concurrent request threads queued behind one another and
+each paid a full commit.
+
+:class:`GroupCommitWriter` gives a backend one dedicated write
+connection.  Callers hand it a closure ``fn(conn)`` and queue it; the
+first caller to find the writer idle becomes the *leader*: it drains
+everything that is queued (optionally lingering up to ``max_delay_ms``
+when other writers are active, capped at ``max_rows``) and runs the
+whole group in **one** transaction, while the other callers wait for
+their operation to be committed.  Operations that arrive during a
+commit form the next group, so a lone writer pays no extra latency or
+thread hop and concurrent writers share commits.  Each operation runs
+inside its own ``SAVEPOINT`` so a failing operation is rolled back and
+reported to its caller alone, without aborting its neighbours.
+
+Reads never touch the writer: in WAL mode readers on their own
+per-thread connections see the last committed snapshot without
+blocking, and without blocking the writer.
+
+Durability
+----------
+``"full"``
+    ``PRAGMA synchronous=FULL`` on the writer connection; callers wait
+    until their group has committed.
+``"normal"`` (default)
+    ``PRAGMA synchronous=NORMAL`` (WAL: durable across process crashes,
+    the last transactions may be lost on power loss); callers wait for
+    the commit.
+``"async"``
+    Like ``"normal"`` but fire-and-forget writes return immediately and
+    a background thread commits them; failures are logged.  Operations
+    that return a value (deletes, clears, imports) still wait.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_MODES = ("full", "normal", "async")
+
+_SYNCHRONOUS = {"full": "FULL", "normal": "NORMAL", "async": "NORMAL"}
+
+
+class _WriteOp:
+    """One queued write: ``fn(conn)`` plus an optional post-commit hook."""
+
+    __slots__ = ("fn", "on_commit", "rows", "done", "result", "error", "children")
+
+    def __init__(
+        self,
+        fn: Callable[[sqlite3.Connection], Any],
+        on_commit: Optional[Callable[[Any], None]] = None,
+        rows: int = 1,
+    ) -> None:
+        self.fn = fn
+        self.on_commit = on_commit
+        self.rows = rows
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.children: Optional[List["_WriteOp"]] = None
+
+    @classmethod
+    def compound(cls, ops: List["_WriteOp"]) -> "_WriteOp":
+        """Bundle the operations of a ``batch()`` block into one atomic unit."""
+
+        def run(conn: sqlite3.Connection) -> None:
+            for op in ops:
+                op.result = op.fn(conn)
+
+        op = cls(run, rows=sum(o.rows for o in ops))
+        op.children = ops
+        return op
+
+    def committed(self) -> None:
+        for op in self.children or (self,):
+            if op.on_commit is not None:
+                try:
+                    op.on_commit(op.result)
+                except Exception:  # pragma: no cover - hooks are best effort
+                    logger.exception("Post-commit hook failed")
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.error = error
+        for op in self.children or ():
+            op.error = error
+            op.done.set()
+        self.done.set()
+
+
+class GroupCommitWriter:
+    """Coalesce writes from many threads into few SQLite transactions.
+
+    Parameters
+    ----------
+    connect : callable
+        Factory returning a new ``sqlite3.Connection`` for the shared
+        write connection (PRAGMAs such as WAL / busy_timeout applied).
+    durability : {"full", "normal", "async"}
+        See the module docstring.
+    max_delay_ms : float
+        How long the leader lingers for more operations once it sees
+        concurrent writers.  ``0`` (default) commits immediately; ops
+        that queue up while a commit is in flight are still grouped.
+    max_rows : int
+        Upper bound on rows per transaction.
+    inline_conn : callable, optional
+        When given, groups run on the connection returned by this
+        callable instead of a shared write connection (used for
+        ``":memory:"`` databases, whose contents are private to one
+        connection).
+    name : str
+        Background thread name, for debugging.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], sqlite3.Connection],
+        *,
+        durability: str = "normal",
+        max_delay_ms: float = 0.0,
+        max_rows: int = 512,
+        inline_conn: Optional[Callable[[], sqlite3.Connection]] = None,
+        name: str = "sqlite-writer",
+    ) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(
+                f"durability must be one of {DURABILITY_MODES}, got {durability!r}"
+            )
+        self._connect = connect
+        self.durability = durability
+        self._max_delay = max(0.0, max_delay_ms) / 1000.0
+        self._max_rows = max(1, max_rows)
+        self._inline_conn = inline_conn
+        self._name = name
+
+        self._cond = threading.Condition()
+        self._pending: List[_WriteOp] = []
+        self._leading = False
+        self._conn: Optional[sqlite3.Connection] = None
+        self._thread: Optional[threading.Thread] = None
+        self._inline_lock = threading.RLock()
+        self._local = threading.local()
+
+        # Statistics (read without locking; monotonically increasing)
+        self.transactions = 0
+        self.operations = 0
+
+    # ---- public API ------------------------------------------------------
+
+    def submit(
+        self,
+        fn: Callable[[sqlite3.Connection], Any],
+        *,
+        on_commit: Optional[Callable[[Any], None]] = None,
+        wait: bool = False,
+        rows: int = 1,
+    ) -> Any:
+        """Queue ``fn(conn)`` for the next group commit.
+
+        Parameters
+        ----------
+        fn : callable
+            Runs inside the group's transaction on the write connection.
+            Must not commit or roll back.
+        on_commit : callable, optional
+            Called with ``fn``'s return value after the transaction has
+            committed (on the thread that ran the commit).
+        wait : bool
+            Block until committed and return ``fn``'s result even in
+            ``"async"`` mode, or inside a :meth:`batch` block.
+        rows : int
+            Rows written by ``fn``; counts towards ``max_rows``.
+
+        Returns
+        -------
+        Any
+            ``fn``'s return value when the call waited, else ``None``.
+
+        Raises
+        ------
+        Exception
+            Whatever ``fn`` (or the commit) raised, when the call waited.
+        """
+        op = _WriteOp(fn, on_commit, rows)
+        buffered = getattr(self._local, "batch", None)
+        if buffered is not None:
+            buffered.append(op)
+            if not wait:
+                return None
+            # A result is needed now: flush the block so far (including
+            # this op) as one unit.  The rest of the block starts afresh.
+            self._local.batch = []
+            self._run(_WriteOp.compound(buffered), True)
+            return op.result
+        return self._run(op, wait or self.durability != "async")
+
+    @contextmanager
+    def batch(self) -> Iterator["GroupCommitWriter"]:
+        """Buffer this thread's writes and commit them as one transaction.
+
+        Writes inside the block return immediately and become visible
+        when the block exits; an exception inside the block discards
+        them.  Blocks nest – only the outermost one commits.
+        """
+        if getattr(self._local, "batch", None) is not None:
+            yield self
+            return
+        self._local.batch = []
+        try:
+            yield self
+        except BaseException:
+            self._local.batch = None
+            raise
+        ops, self._local.batch = self._local.batch, None
+        if ops:
+            self._run(_WriteOp.compound(ops), self.durability != "async")
+
+    def flush(self) -> None:
+        """Block until every operation queued so far has committed."""
+        with self._cond:
+            while self._pending or self._leading:
+                self._cond.wait()
+
+    def close(self) -> None:
+        """Commit everything queued and close the write connection.
+
+        The writer reopens lazily on the next :meth:`submit`.
+        """
+        with self._cond:
+            while self._pending or self._leading:
+                self._cond.wait()
+            conn, self._conn = self._conn, None
+            self._cond.notify_all()  # lets an idle background thread exit
+        if conn is not None:
+            conn.close()
+
+    # ---- internals -------------------------------------------------------
+
+    def _run(self, op: _WriteOp, wait: bool) -> Any:
+        if self._inline_conn is not None:
+            with self._inline_lock:
+                self._execute(self._inline_conn(), [op])
+        else:
+            with self._cond:
+                self._pending.append(op)
+                if not wait:
+                    self._ensure_thread()
+                self._cond.notify_all()
+            if not wait:
+                return None
+            # Become the leader if nobody is committing; otherwise the
+            # current leader picks this op up before it steps down.
+            while not op.done.is_set():
+                if not self._lead():
+                    op.done.wait(0.05)
+        if op.error is not None:
+            if wait:
+                raise op.error
+            logger.error("Group-commit write failed: %s", op.error)
+        return op.result
+
+    def _lead(self) -> bool:
+        """Commit queued groups until the queue is empty.
+
+        Returns ``False`` without doing anything when another thread is
+        already leading.
+        """
+        with self._cond:
+            if self._leading or not self._pending:
+                return False
+            self._leading = True
+        try:
+            while True:
+                with self._cond:
+                    if not self._pending:
+                        return True
+                    group = self._take_group()
+                try:
+                    conn = self._writer_conn()
+                except Exception as exc:
+                    logger.exception("Cannot open SQLite write connection")
+                    for op in group:
+                        op.finish(exc)
+                    continue
+                self._execute(conn, group)
+        finally:
+            with self._cond:
+                self._leading = False
+                self._cond.notify_all()
+
+    def _writer_conn(self) -> sqlite3.Connection:
+        # Only the leader touches the shared write connection.
+        if self._conn is None:
+            conn = self._connect()
+            conn.isolation_level = None  # explicit BEGIN / SAVEPOINT control
+            conn.execute(f"PRAGMA synchronous={_SYNCHRONOUS[self.durability]}")
+            self._conn = conn
+        return self._conn
+
+    def _take_group(self) -> List[_WriteOp]:
+        # Caller holds ``self._cond`` and ``self._pending`` is non-empty.
+        if len(self._pending) > 1 and self._max_delay:
+            # Concurrent writers are active: linger briefly to widen the group.
+            deadline = time.monotonic() + self._max_delay
+            while sum(op.rows for op in self._pending) < self._max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        group: List[_WriteOp] = []
+        rows = 0
+        while self._pending and (not group or rows + self._pending[0].rows <= self._max_rows):
+            op = self._pending.pop(0)
+            group.append(op)
+            rows += op.rows
+        return group
+
+    def _ensure_thread(self) -> None:
+        # Caller holds ``self._cond``.
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._background, name=self._name, daemon=True
+            )
+            self._thread.start()
+
+    def _background(self) -> None:
+        """Commit fire-and-forget (``"async"``) writes nobody waits for."""
+        while True:
+            with self._cond:
+                while not self._pending or self._leading:
+                    if not self._cond.wait(1.0) and not self._pending:
+                        self._thread = None  # idle: exit, restarted on demand
+                        return
+            self._lead()
+
+    def _execute(self, conn: sqlite3.Connection, group: List[_WriteOp]) -> None:
+        """Run *group* in one transaction, one SAVEPOINT per operation."""
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception as exc:
+            for op in group:
+                op.finish(exc)
+            return
+
+        ok: List[_WriteOp] = []
+        for op in group:
+            try:
+                conn.execute("SAVEPOINT group_op")
+                op.result = op.fn(conn)
+                conn.execute("RELEASE group_op")
+                ok.append(op)
+            except Exception as exc:
+                try:
+                    conn.execute("ROLLBACK TO group_op")
+                    conn.execute("RELEASE group_op")
+                except sqlite3.Error:
+                    pass
+                op.finish(exc)
+
+        try:
+            conn.execute("COMMIT")
+        except Exception as exc:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            for op in ok:
+                op.finish(exc)
+            return
+
+        self.transactions += 1
+        self.operations += len(group)
+        for op in ok:
+            op.committed()
+            op.finish()
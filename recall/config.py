@@ -181,6 +181,8 @@ class RecallConfig:
     recall_embedding_mode: str = 'auto'      # auto / lite / local / cloud / none
     embedding_rate_limit: int = 10
     embedding_rate_window: int = 60
+    embedding_tokens_per_minute: int = 0     # v7.1: 每分钟 token 预算（0 = 不限）
+    embedding_max_in_flight: int = 4         # v7.1: 同时进行的分批请求数
 
     # ── LLM ──
     llm_api_key: str = ''
@@ -269,6 +271,36 @@ class RecallConfig:
     # ── Index / IVF ──
     ivf_auto_switch_threshold: int = 50000
 
+    # ── v7.1 Memory Storage ──
+    memory_storage_mode: str = 'json'        # json（整体重写）/ log（追加日志 + 后台压缩）
+    memory_log_compact_threshold: int = 2000
+    memory_log_fsync: bool = True
+
+    # ── v7.1 Bulk Ingest (add_batch) ──
+    bulk_ingest_chunk_size: int = 1000       # 每个分组提交的条数（每组每个存储只落盘一次）
+    bulk_ingest_workers: int = 0             # 规则抽取进程池大小（0 = 在调用线程内抽取）
+
+    # ── v7.1 SQLite BAL 分组提交 ──
+    sqlite_write_durability: str = 'normal'  # full / normal / async（async 写入不等待提交）
+    sqlite_group_commit_ms: float = 0.0      # 并发写入时额外等待多久凑成一个事务（0 = 只合并提交期间排队的写入）
+    sqlite_group_commit_rows: int = 512      # 每个事务最多包含的行数
+
+    # ── v7.1 LLM 响应缓存 ──
+    llm_cache_enabled: bool = False          # 相同请求直接返回缓存（recall_data/cache/llm_responses.db）
+    llm_cache_ttl_seconds: float = 604800.0  # 缓存有效期（默认 7 天，0 = 不过期）
+    llm_cache_max_entries: int = 50000       # 超出后淘汰最久未使用的条目
+
+    # ── v7.1 LLM 调用调度 ──
+    llm_max_concurrency: int = 16            # 每个提供商同时进行的请求数上限（0 = 不限）
+    llm_tokens_per_minute: int = 0           # 每个提供商每分钟 token 预算（0 = 不限）
+    llm_single_flight: bool = True           # 进行中的相同请求只发送一次，结果共享
+    llm_batch_max_items: int = 1             # 去重确认等短判断打包进一个提示词的最多条数（1 = 不打包）
+    llm_batch_window_ms: float = 0.0         # 等待其它写入凑批的时间（0 = 只打包同一次调用的条目）
+
+    # ── v7.1 任务追踪 ──
+    task_trace_mode: str = 'full'            # full / sampled / off（各步骤耗时统计始终开启）
+    task_trace_sample_every: int = 100       # sampled 模式下每 N 次写入完整追踪一次
+
     # ── Eleven Layer Retriever ──
     eleven_layer_retriever_enabled: bool = True
     retrieval_l1_bloom_enabled: bool = True
@@ -347,6 +379,13 @@ class RecallConfig:
     recall_pipeline_max_size: int = 10000
     recall_pipeline_rate_limit: float = 0.0
     recall_pipeline_workers: int = 2
+    recall_pipeline_persistent: bool = False  # v7.1: 队列落盘（recall_data/data/pipeline_spool.db），重启后重放
+    recall_pipeline_coalesce_max: int = 500   # v7.1: 合并为一次 add_batch 的最大条目数
+    recall_pipeline_coalesce_adds: bool = False  # v7.1: 单条 ADD 也合并为 add_batch（跳过一致性检查 / 矛盾检测）
+    recall_pipeline_status_retention: int = 10000  # v7.1: 保留状态的已完成操作数（按 op_id 查询）
+    recall_executor_read_workers: int = 8
+    recall_executor_write_workers: int = 2
+    recall_executor_max_queue: int = 256
 
     # === i18n ===
     recall_lang: str = 'auto'
@@ -399,6 +438,8 @@ class RecallConfig:
         d.recall_embedding_mode = g('RECALL_EMBEDDING_MODE', d.recall_embedding_mode)
         d.embedding_rate_limit = _int(g('EMBEDDING_RATE_LIMIT', ''), d.embedding_rate_limit)
         d.embedding_rate_window = _int(g('EMBEDDING_RATE_WINDOW', ''), d.embedding_rate_window)
+        d.embedding_tokens_per_minute = _int(g('EMBEDDING_TOKENS_PER_MINUTE', ''), d.embedding_tokens_per_minute)
+        d.embedding_max_in_flight = _int(g('EMBEDDING_MAX_IN_FLIGHT', ''), d.embedding_max_in_flight)
 
         # ── LLM ──
         d.llm_api_key = g('LLM_API_KEY', '') or g('OPENAI_API_KEY', d.llm_api_key)
@@ -487,6 +528,34 @@ class RecallConfig:
         # ── Index / IVF ──
         d.ivf_auto_switch_threshold = _int(g('IVF_AUTO_SWITCH_THRESHOLD', ''), d.ivf_auto_switch_threshold)
 
+        # ── v7.1 Memory Storage ──
+        d.memory_storage_mode = g('MEMORY_STORAGE_MODE', d.memory_storage_mode).strip().lower()
+        d.memory_log_compact_threshold = _int(g('MEMORY_LOG_COMPACT_THRESHOLD', ''), d.memory_log_compact_threshold)
+        d.memory_log_fsync = _bool(g('MEMORY_LOG_FSYNC', ''), d.memory_log_fsync)
+
+        # ── v7.1 Bulk Ingest ──
+        d.bulk_ingest_chunk_size = _int(g('BULK_INGEST_CHUNK_SIZE', ''), d.bulk_ingest_chunk_size)
+        d.bulk_ingest_workers = _int(g('BULK_INGEST_WORKERS', ''), d.bulk_ingest_workers)
+
+        # ── v7.1 SQLite BAL 分组提交 ──
+        d.sqlite_write_durability = g('SQLITE_WRITE_DURABILITY', d.sqlite_write_durability).strip().lower()
+        d.sqlite_group_commit_ms = _float(g('SQLITE_GROUP_COMMIT_MS', ''), d.sqlite_group_commit_ms)
+        d.sqlite_group_commit_rows = _int(g('SQLITE_GROUP_COMMIT_ROWS', ''), d.sqlite_group_commit_rows)
+
+        # ── v7.1 LLM 响应缓存 ──
+        d.llm_cache_enabled = _bool(g('LLM_CACHE_ENABLED', ''), d.llm_cache_enabled)
+        d.llm_cache_ttl_seconds = _float(g('LLM_CACHE_TTL_SECONDS', ''), d.llm_cache_ttl_seconds)
+        d.llm_cache_max_entries = _int(g('LLM_CACHE_MAX_ENTRIES', ''), d.llm_cache_max_entries)
+        d.llm_max_concurrency = _int(g('LLM_MAX_CONCURRENCY', ''), d.llm_max_concurrency)
+        d.llm_tokens_per_minute = _int(g('LLM_TOKENS_PER_MINUTE', ''), d.llm_tokens_per_minute)
+        d.llm_single_flight = _bool(g('LLM_SINGLE_FLIGHT', ''), d.llm_single_flight)
+        d.llm_batch_max_items = _int(g('LLM_BATCH_MAX_ITEMS', ''), d.llm_batch_max_items)
+        d.llm_batch_window_ms = _float(g('LLM_BATCH_WINDOW_MS', ''), d.llm_batch_window_ms)
+
+        # ── v7.1 任务追踪 ──
+        d.task_trace_mode = g('TASK_TRACE_MODE', d.task_trace_mode).strip().lower()
+        d.task_trace_sample_every = _int(g('TASK_TRACE_SAMPLE_EVERY', ''), d.task_trace_sample_every)
+
         # ── Eleven Layer Retriever ──
         d.eleven_layer_retriever_enabled = _bool(g('ELEVEN_LAYER_RETRIEVER_ENABLED', ''), d.eleven_layer_retriever_enabled)
         d.retrieval_l1_bloom_enabled = _bool(g('RETRIEVAL_L1_BLOOM_ENABLED', ''), d.retrieval_l1_bloom_enabled)
@@ -565,6 +634,13 @@ class RecallConfig:
         d.recall_pipeline_max_size = _int(g('RECALL_PIPELINE_MAX_SIZE', ''), d.recall_pipeline_max_size)
         d.recall_pipeline_rate_limit = _float(g('RECALL_PIPELINE_RATE_LIMIT', ''), d.recall_pipeline_rate_limit)
         d.recall_pipeline_workers = _int(g('RECALL_PIPELINE_WORKERS', ''), d.recall_pipeline_workers)
+        d.recall_pipeline_persistent = _bool(g('RECALL_PIPELINE_PERSISTENT', ''), d.recall_pipeline_persistent)
+        d.recall_pipeline_coalesce_max = _int(g('RECALL_PIPELINE_COALESCE_MAX', ''), d.recall_pipeline_coalesce_max)
+        d.recall_pipeline_coalesce_adds = _bool(g('RECALL_PIPELINE_COALESCE_ADDS', ''), d.recall_pipeline_coalesce_adds)
+        d.recall_pipeline_status_retention = _int(g('RECALL_PIPELINE_STATUS_RETENTION', ''), d.recall_pipeline_status_retention)
+        d.recall_executor_read_workers = _int(g('RECALL_EXECUTOR_READ_WORKERS', ''), d.recall_executor_read_workers)
+        d.recall_executor_write_workers = _int(g('RECALL_EXECUTOR_WRITE_WORKERS', ''), d.recall_executor_write_workers)
+        d.recall_executor_max_queue = _int(g('RECALL_EXECUTOR_MAX_QUEUE', ''), d.recall_executor_max_queue)
 
         # === i18n ===
         d.recall_lang = g('RECALL_LANG', d.recall_lang)
@@ -171,7 +171,18 @@ class ContextBuild:
             except Exception:
                 pass
 
-        memories = engine.search(query, user_id=user_id, top_k=top_k, temporal_context=temporal_context)
+        # 从持久条件和伏笔中提取补充检索关键词（3.5 层使用）
+        supplementary_keywords = self._extract_supplementary_keywords(user_id, character_id, active_contexts)
+        keyword_queries = supplementary_keywords[:5]  # 最多使用5个关键词
+
+        # v7.1: 主查询与补充关键词一次 search_many（批量编码 + 批量向量召回 + 共享归档扫描）
+        batch_results = engine.search_many(
+            [query] + keyword_queries,
+            user_id=user_id,
+            top_k=[top_k] + [2] * len(keyword_queries),
+            temporal_contexts=[temporal_context] + [None] * len(keyword_queries),
+        )
+        memories = batch_results[0]
 
         if memories:
             memory_section = self._build_memory_section(memories, max_tokens // 3)
@@ -181,9 +192,8 @@ class ContextBuild:
         # ========== 3.5 关键实体补充检索层（100%不遗忘保证）==========
         # 从持久条件和伏笔中提取关键词，进行补充检索
         # 确保即使 query 中没有直接提及，重要信息也能被召回
-        supplementary_keywords = self._extract_supplementary_keywords(user_id, character_id, active_contexts)
-        if supplementary_keywords:
-            supplementary_memories = self._search_by_keywords(supplementary_keywords, user_id, top_k=5)
+        if keyword_queries:
+            supplementary_memories = self._merge_keyword_results(batch_results[1:], top_k=5)
             if supplementary_memories:
                 # 过滤掉已经在 memories 中的记忆
                 existing_ids = {m.id for m in memories} if memories else set()
@@ -578,25 +588,29 @@ class ContextBuild:
         Returns:
             List: 相关记忆列表
         """
-        engine = self._engine
         if not keywords:
             return []
+        keyword_queries = keywords[:5]  # 最多使用5个关键词
+        try:
+            per_keyword = self._engine.search_many(keyword_queries, user_id=user_id, top_k=2)
+        except Exception:
+            return []
+        return self._merge_keyword_results(per_keyword, top_k)
 
+    @staticmethod
+    def _merge_keyword_results(per_keyword: List[List], top_k: int = 5) -> List:
+        """按关键词顺序合并各关键词的检索结果（去重，最多 top_k 条）"""
         all_memories = []
         seen_ids = set()
 
-        for keyword in keywords[:5]:  # 最多使用5个关键词
-            try:
-                memories = engine.search(keyword, user_id=user_id, top_k=2)
-                for m in memories:
-                    mem_id = m.id if hasattr(m, 'id') else m.get('id', '')
-                    if mem_id and mem_id not in seen_ids:
-                        seen_ids.add(mem_id)
-                        all_memories.append(m)
-                        if len(all_memories) >= top_k:
-                            return all_memories
-            except Exception:
-                continue
+        for memories in per_keyword:
+            for m in memories:
+                mem_id = m.id if hasattr(m, 'id') else m.get('id', '')
+                if mem_id and mem_id not in seen_ids:
+                    seen_ids.add(mem_id)
+                    all_memories.append(m)
+                    if len(all_memories) >= top_k:
+                        return all_memories
 
         return all_memories
 
@@ -1,12 +1,16 @@
-"""API Embedding 后端 - 支持 OpenAI 和硅基流动"""
+"""API Embedding 后端 - 支持 OpenAI 和硅基流动
+
+v7.1: 请求经 EmbeddingDispatcher 发送 —— 令牌桶同时限制请求数与 token 数，
+同一 API 的所有实例共享；一次 encode_batch 的各分批在限额内并发发送，
+429 按 Retry-After / 抖动退避重新排队，不在调用方线程里 sleep。
+"""
 
 import os
-import time
-import threading
-from typing import List, Optional
+from typing import Any, List, Optional, Sequence, Tuple
 import numpy as np
 
 from .base import EmbeddingBackend, EmbeddingConfig, EmbeddingBackendType
+from .dispatcher import RateLimiter, EmbeddingDispatcher, shared_dispatcher
 
 
 # Windows GBK 编码兼容的安全打印函数
@@ -29,60 +33,6 @@ def _safe_print(msg: str) -> None:
         print(msg.encode('ascii', errors='replace').decode('ascii'))
 
 
-class RateLimiter:
-    """简单的速率限制器
-    
-    限制单位时间内的请求次数，超限时自动等待。
-    """
-    
-    def __init__(self, max_requests: int = 5, window_seconds: int = 60):
-        """
-        Args:
-            max_requests: 时间窗口内最大请求数
-            window_seconds: 时间窗口长度（秒）
-        """
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        self.requests: List[float] = []
-        self._lock = threading.Lock()
-    
-    def acquire(self, timeout: float = 120.0) -> bool:
-        """获取许可，超限时阻塞等待
-        
-        Args:
-            timeout: 最大等待时间（秒）
-        
-        Returns:
-            bool: 是否成功获取许可
-        """
-        start_time = time.time()
-        
-        while True:
-            with self._lock:
-                now = time.time()
-                
-                # 清理过期的请求记录
-                self.requests = [t for t in self.requests if now - t < self.window_seconds]
-                
-                # 检查是否可以发送
-                if len(self.requests) < self.max_requests:
-                    self.requests.append(now)
-                    return True
-                
-                # 计算需要等待的时间
-                oldest = min(self.requests) if self.requests else now
-                wait_time = self.window_seconds - (now - oldest) + 0.1
-            
-            # 检查是否超时
-            if time.time() - start_time + wait_time > timeout:
-                _safe_print(f"[Embedding] 速率限制等待超时 ({timeout}秒)")
-                return False
-            
-            # 等待
-            _safe_print(f"[Embedding] API 限流，等待 {wait_time:.1f} 秒...")
-            time.sleep(min(wait_time, 10))  # 最多等待10秒后重新检查
-
-
 class APIEmbeddingBackend(EmbeddingBackend):
     """API Embedding 后端
     
@@ -123,6 +73,14 @@ class APIEmbeddingBackend(EmbeddingBackend):
         "embed-multilingual-light-v3.0": 384,
     }
     
+    # v7.1: 各提供商单次请求的最多文本数（Google 接口逐条编码）
+    PROVIDER_BATCH_LIMITS = {
+        'openai': 100,
+        'voyage': 128,
+        'cohere': 96,
+        'google': 1,
+    }
+    
     # 默认 API 基地址
     DEFAULT_BASES = {
         EmbeddingBackendType.OPENAI: "https://api.openai.com/v1",
@@ -150,12 +108,22 @@ class APIEmbeddingBackend(EmbeddingBackend):
             1536  # 默认
         )
         
-        # 【新增】速率限制器 - 从环境变量读取配置
-        rate_limit = int(os.environ.get('EMBEDDING_RATE_LIMIT', '10'))  # 默认每分钟10次
-        rate_window = int(os.environ.get('EMBEDDING_RATE_WINDOW', '60'))  # 默认60秒窗口
-        self._rate_limiter = RateLimiter(max_requests=rate_limit, window_seconds=rate_window)
         # v5.0: 自动检测 Embedding 提供商
         self._embedding_provider = self._detect_embedding_provider()
+        
+        # 速率限制 + 并发调度 - 从环境变量读取配置（v7.1: 同一 API 的实例共享）
+        rate_limit = int(os.environ.get('EMBEDDING_RATE_LIMIT', '10'))  # 默认每分钟10次
+        rate_window = int(os.environ.get('EMBEDDING_RATE_WINDOW', '60'))  # 默认60秒窗口
+        tokens_per_minute = int(os.environ.get('EMBEDDING_TOKENS_PER_MINUTE', '0'))  # 0 = 不限
+        max_in_flight = int(os.environ.get('EMBEDDING_MAX_IN_FLIGHT', '4'))
+        self._dispatcher = shared_dispatcher(
+            (self._embedding_provider, self.api_base, self.api_key),
+            lambda: EmbeddingDispatcher(
+                RateLimiter(max_requests=rate_limit, window_seconds=rate_window, tokens_per_minute=tokens_per_minute),
+                max_in_flight=max_in_flight,
+            ),
+        )
+        self._rate_limiter = self._dispatcher.limiter
     
     def _get_api_key_from_env(self) -> Optional[str]:
         """从环境变量获取 API key
@@ -217,9 +185,9 @@ class APIEmbeddingBackend(EmbeddingBackend):
         return self._client
     
     def _create_openai_embedding_client(self):
-        """创建 OpenAI Embedding 客户端"""
+        """创建 OpenAI Embedding 客户端（v7.1: 429 由调度器重试，SDK 不再自行 sleep 重试）"""
         from openai import OpenAI
-        return OpenAI(api_key=self.api_key, base_url=self.api_base)
+        return OpenAI(api_key=self.api_key, base_url=self.api_base, max_retries=0)
     
     def _create_google_embedding_client(self):
         """创建 Google Embedding 客户端"""
@@ -248,192 +216,72 @@ class APIEmbeddingBackend(EmbeddingBackend):
     
     def encode(self, text: str) -> np.ndarray:
         """编码单个文本（v5.0: 自动路由到对应提供商）"""
-        if self._embedding_provider == 'google':
-            return self._encode_google(text)
-        elif self._embedding_provider == 'voyage':
-            return self._encode_voyage(text)
-        elif self._embedding_provider == 'cohere':
-            return self._encode_cohere(text)
-        else:
-            return self._encode_openai(text)
+        return self.encode_batch([text])[0]
     
-    def _encode_openai(self, text: str) -> np.ndarray:
-        """OpenAI Embedding 编码（带速率限制和重试）"""
-        max_retries = 3
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        """批量编码（v5.0: 自动路由到对应提供商；v7.1: 各分批在限额内并发发送）"""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype='float32')
+        request = {
+            'google': self._request_google,
+            'voyage': self._request_voyage,
+            'cohere': self._request_cohere,
+        }.get(self._embedding_provider, self._request_openai)
         
-        for attempt in range(max_retries):
-            # 等待速率限制许可
-            if not self._rate_limiter.acquire():
-                raise RuntimeError("Embedding API 速率限制超时")
-            
-            try:
-                response = self.client.embeddings.create(
-                    model=self.config.api_model,
-                    input=text
-                )
-                embedding = np.array(response.data[0].embedding, dtype='float32')
-                
+        self.client  # 在调用方线程创建客户端（未配置 API key 时直接报错，避免工作线程并发创建）
+        
+        # API 通常有批量限制，分批处理
+        batch_size = max(1, min(self.config.batch_size, self.PROVIDER_BATCH_LIMITS.get(self._embedding_provider, 100)))
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results = self._dispatcher.map(request, batches, [self._estimate_tokens(b) for b in batches])
+        
+        all_embeddings = []
+        for vectors in results:
+            for vector in vectors:
+                embedding = np.array(vector, dtype='float32')
                 if self.config.normalize:
                     embedding = embedding / np.linalg.norm(embedding)
-                
-                return embedding
-                
-            except Exception as e:
-                error_str = str(e).lower()
-                
-                # 处理 429 错误（速率限制）
-                if '429' in error_str or 'rate limit' in error_str:
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 3  # 更快退避: 3, 6, 9 秒（总共最多18秒）
-                        _safe_print(f"[Embedding] API 限流 (429)，等待 {wait_time} 秒后重试 ({attempt + 1}/{max_retries})")
-                        time.sleep(wait_time)
-                        continue
-                
-                # 其他错误直接抛出
-                raise
-        
-        raise RuntimeError(f"Embedding API 调用失败，已重试 {max_retries} 次")
+                all_embeddings.append(embedding)
+        return np.array(all_embeddings)
     
-    def _encode_google(self, text: str) -> np.ndarray:
-        """Google Embedding 编码"""
-        if not self._rate_limiter.acquire():
-            raise RuntimeError("Embedding API 速率限制超时")
+    @staticmethod
+    def _estimate_tokens(texts: Sequence[str]) -> int:
+        """粗略估计 token 数（约 3 字符 / token），请求完成后按 usage 结算"""
+        return sum(len(t) // 3 + 1 for t in texts)
+    
+    def get_dispatch_stats(self) -> dict:
+        """v7.1: 限流 / 调度统计（同一 API 的实例共享）"""
+        return self._dispatcher.stats()
+    
+    # ---- 各提供商的单次请求：返回 (向量列表, 实际 token 数或 None) ----
+    
+    def _request_openai(self, batch: Sequence[str]) -> Tuple[List[Any], Optional[int]]:
+        """OpenAI 兼容接口"""
+        response = self.client.embeddings.create(
+            model=self.config.api_model,
+            input=list(batch)
+        )
+        usage = getattr(response, 'usage', None)
+        return [item.embedding for item in response.data], getattr(usage, 'total_tokens', None)
+    
+    def _request_google(self, batch: Sequence[str]) -> Tuple[List[Any], Optional[int]]:
+        """Google Embedding（逐条）"""
         result = self.client.embed_content(
             model=f"models/{self.config.api_model}",
-            content=text
+            content=batch[0]
         )
-        embedding = np.array(result['embedding'], dtype='float32')
-        if self.config.normalize:
-            embedding = embedding / np.linalg.norm(embedding)
-        return embedding
+        return [result['embedding']], None
     
-    def _encode_voyage(self, text: str) -> np.ndarray:
-        """Voyage AI Embedding 编码"""
-        if not self._rate_limiter.acquire():
-            raise RuntimeError("Embedding API 速率限制超时")
-        result = self.client.embed([text], model=self.config.api_model)
-        embedding = np.array(result.embeddings[0], dtype='float32')
-        if self.config.normalize:
-            embedding = embedding / np.linalg.norm(embedding)
-        return embedding
+    def _request_voyage(self, batch: Sequence[str]) -> Tuple[List[Any], Optional[int]]:
+        """Voyage AI Embedding"""
+        result = self.client.embed(list(batch), model=self.config.api_model)
+        return result.embeddings, getattr(result, 'total_tokens', None)
     
-    def _encode_cohere(self, text: str) -> np.ndarray:
-        """Cohere Embedding 编码"""
-        if not self._rate_limiter.acquire():
-            raise RuntimeError("Embedding API 速率限制超时")
+    def _request_cohere(self, batch: Sequence[str]) -> Tuple[List[Any], Optional[int]]:
+        """Cohere Embedding"""
         result = self.client.embed(
-            texts=[text],
+            texts=list(batch),
             model=self.config.api_model,
             input_type="search_document"
         )
-        embedding = np.array(result.embeddings[0], dtype='float32')
-        if self.config.normalize:
-            embedding = embedding / np.linalg.norm(embedding)
-        return embedding
-    
-    def encode_batch(self, texts: List[str]) -> np.ndarray:
-        """批量编码（v5.0: 自动路由到对应提供商）"""
-        if self._embedding_provider == 'google':
-            return self._encode_batch_google(texts)
-        elif self._embedding_provider == 'voyage':
-            return self._encode_batch_voyage(texts)
-        elif self._embedding_provider == 'cohere':
-            return self._encode_batch_cohere(texts)
-        else:
-            return self._encode_batch_openai(texts)
-    
-    def _encode_batch_openai(self, texts: List[str]) -> np.ndarray:
-        """OpenAI 批量编码（带速率限制和重试）"""
-        # API 通常有批量限制，分批处理
-        all_embeddings = []
-        batch_size = min(self.config.batch_size, 100)  # OpenAI 限制
-        
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            
-            max_retries = 3
-            for attempt in range(max_retries):
-                # 等待速率限制许可
-                if not self._rate_limiter.acquire():
-                    raise RuntimeError("Embedding API 速率限制超时")
-                
-                try:
-                    response = self.client.embeddings.create(
-                        model=self.config.api_model,
-                        input=batch
-                    )
-                    
-                    for item in response.data:
-                        embedding = np.array(item.embedding, dtype='float32')
-                        if self.config.normalize:
-                            embedding = embedding / np.linalg.norm(embedding)
-                        all_embeddings.append(embedding)
-                    
-                    break  # 成功，跳出重试循环
-                    
-                except Exception as e:
-                    error_str = str(e).lower()
-                    
-                    # 处理 429 错误
-                    if '429' in error_str or 'rate limit' in error_str:
-                        if attempt < max_retries - 1:
-                            wait_time = (attempt + 1) * 3  # 更快退避: 3, 6, 9 秒
-                            _safe_print(f"[Embedding] API 限流 (429)，等待 {wait_time} 秒后重试")
-                            time.sleep(wait_time)
-                            continue
-                    
-                    raise
-        
-        return np.array(all_embeddings)
-    
-    def _encode_batch_google(self, texts: List[str]) -> np.ndarray:
-        """Google Embedding 批量编码"""
-        all_embeddings = []
-        for text in texts:
-            if not self._rate_limiter.acquire():
-                raise RuntimeError("Embedding API 速率限制超时")
-            result = self.client.embed_content(
-                model=f"models/{self.config.api_model}",
-                content=text
-            )
-            embedding = np.array(result['embedding'], dtype='float32')
-            if self.config.normalize:
-                embedding = embedding / np.linalg.norm(embedding)
-            all_embeddings.append(embedding)
-        return np.array(all_embeddings)
-    
-    def _encode_batch_voyage(self, texts: List[str]) -> np.ndarray:
-        """Voyage AI Embedding 批量编码"""
-        all_embeddings = []
-        batch_size = min(self.config.batch_size, 128)
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            if not self._rate_limiter.acquire():
-                raise RuntimeError("Embedding API 速率限制超时")
-            result = self.client.embed(batch, model=self.config.api_model)
-            for emb in result.embeddings:
-                embedding = np.array(emb, dtype='float32')
-                if self.config.normalize:
-                    embedding = embedding / np.linalg.norm(embedding)
-                all_embeddings.append(embedding)
-        return np.array(all_embeddings)
-    
-    def _encode_batch_cohere(self, texts: List[str]) -> np.ndarray:
-        """Cohere Embedding 批量编码"""
-        all_embeddings = []
-        batch_size = min(self.config.batch_size, 96)
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            if not self._rate_limiter.acquire():
-                raise RuntimeError("Embedding API 速率限制超时")
-            result = self.client.embed(
-                texts=batch,
-                model=self.config.api_model,
-                input_type="search_document"
-            )
-            for emb in result.embeddings:
-                embedding = np.array(emb, dtype='float32')
-                if self.config.normalize:
-                    embedding = embedding / np.linalg.norm(embedding)
-                all_embeddings.append(embedding)
-        return np.array(all_embeddings)
+        return result.embeddings, None
@@ -1,12 +1,18 @@
 """Embedding 后端基类和配置"""
 
+import os
+import logging
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from typing import List, Optional, Union
 from dataclasses import dataclass, field
 from enum import Enum
 
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
 
 class EmbeddingBackendType(str, Enum):
     """Embedding 后端类型"""
@@ -37,7 +43,8 @@ class EmbeddingConfig:
     
     # 性能配置
     cache_embeddings: bool = True
-    max_cache_size: int = 10000
+    max_cache_size: int = 10000          # 内存 LRU 条目数
+    disk_cache_max_entries: int = 100000  # 磁盘缓存条目数（需要 cache_dir）
     
     @classmethod
     def lite(cls) -> 'EmbeddingConfig':
@@ -155,49 +162,86 @@ class EmbeddingBackend(ABC):
     
     def __init__(self, config: EmbeddingConfig, cache_dir: str = None):
         self.config = config
-        self._cache = {}  # 内存缓存
+        self._cache: 'OrderedDict[bytes, np.ndarray]' = OrderedDict()  # 内存 LRU
+        self._cache_lock = threading.Lock()
         self._cache_dir = cache_dir
-        self._disk_cache = {}  # 磁盘缓存（延迟加载）
+        self._disk_cache = None  # EmbeddingDiskCache（延迟创建）
         self._disk_cache_loaded = False
-        
-        # 如果配置了缓存目录，尝试加载磁盘缓存
-        if cache_dir:
-            self._load_disk_cache()
+        # v7.1: 命中统计（内存 / 磁盘 / 实际编码）
+        self.cache_stats = {'memory_hits': 0, 'disk_hits': 0, 'encoded': 0}
+    
+    def _model_name(self) -> str:
+        if self.config.backend == EmbeddingBackendType.LOCAL:
+            return self.config.local_model
+        return self.config.api_model
+    
+    def _cache_namespace(self) -> str:
+        """缓存命名空间：后端类型 + 模型名（不同模型的向量互不混用）"""
+        return f'{self.config.backend.value}-{self._model_name()}'
+    
+    def _cache_key(self, text: str) -> bytes:
+        """v7.1: 稳定的内容寻址缓存键 — 取代进程内随机加盐的 hash(text)"""
+        from .disk_cache import EmbeddingDiskCache
+        return EmbeddingDiskCache.make_key(
+            self.config.backend.value, self._model_name(), self.config.dimension,
+            self.config.normalize, text
+        )
     
     def _load_disk_cache(self):
-        """加载磁盘缓存"""
+        """打开磁盘缓存（mmap 向量文件 + SQLite 键索引）"""
         if self._disk_cache_loaded or not self._cache_dir:
             return
+        self._disk_cache_loaded = True
         
-        import os
-        import pickle
-        
-        cache_file = os.path.join(self._cache_dir, 'embedding_cache.pkl')
-        if os.path.exists(cache_file):
+        # 旧版以 hash(text) 为键的 pickle 缓存跨进程永远不会命中，直接清理
+        legacy_file = os.path.join(self._cache_dir, 'embedding_cache.pkl')
+        if os.path.exists(legacy_file):
             try:
-                with open(cache_file, 'rb') as f:
-                    self._disk_cache = pickle.load(f)
-                # 合并到内存缓存
-                self._cache.update(self._disk_cache)
-            except Exception:
+                os.unlink(legacy_file)
+            except OSError:
                 pass
-        self._disk_cache_loaded = True
-    
-    def _save_disk_cache(self):
-        """保存磁盘缓存"""
-        if not self._cache_dir:
-            return
-        
-        import os
-        import pickle
         
-        os.makedirs(self._cache_dir, exist_ok=True)
-        cache_file = os.path.join(self._cache_dir, 'embedding_cache.pkl')
         try:
-            with open(cache_file, 'wb') as f:
-                pickle.dump(self._cache, f)
-        except Exception:
-            pass
+            from .disk_cache import EmbeddingDiskCache
+            self._disk_cache = EmbeddingDiskCache(
+                self._cache_dir, self._cache_namespace(),
+                max_entries=self.config.disk_cache_max_entries
+            )
+        except Exception as e:
+            logger.warning(f"[Embedding] 磁盘缓存初始化失败，仅使用内存缓存: {e}")
+            self._disk_cache = None
+    
+    def _save_disk_cache(self):
+        """提交磁盘缓存中尚未落盘的条目"""
+        if self._disk_cache is not None:
+            try:
+                self._disk_cache.flush()
+            except Exception as e:
+                logger.warning(f"[Embedding] 磁盘缓存落盘失败: {e}")
+    
+    def _remember(self, key: bytes, embedding: np.ndarray):
+        """写入内存 LRU（超出容量时淘汰最久未用的条目）"""
+        with self._cache_lock:
+            self._cache[key] = embedding
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.config.max_cache_size:
+                self._cache.popitem(last=False)
+    
+    def _lookup_cache(self, key: bytes) -> Optional[np.ndarray]:
+        """依次查询内存 LRU 和磁盘缓存"""
+        with self._cache_lock:
+            embedding = self._cache.get(key)
+            if embedding is not None:
+                self._cache.move_to_end(key)
+                self.cache_stats['memory_hits'] += 1
+                return embedding
+        if self._disk_cache is not None:
+            embedding = self._disk_cache.get(key)
+            if embedding is not None:
+                self.cache_stats['disk_hits'] += 1
+                self._remember(key, embedding)
+                return embedding
+        return None
     
     @property
     @abstractmethod
@@ -222,7 +266,7 @@ class EmbeddingBackend(ABC):
         pass
     
     def encode_with_cache(self, text: str) -> np.ndarray:
-        """带缓存的编码（内存 + 磁盘持久化）"""
+        """带缓存的编码（内存 LRU + 磁盘持久化，键跨重启稳定）"""
         if not self.config.cache_embeddings:
             return self.encode(text)
         
@@ -230,29 +274,88 @@ class EmbeddingBackend(ABC):
         if not self._disk_cache_loaded:
             self._load_disk_cache()
         
-        cache_key = hash(text)
-        if cache_key in self._cache:
-            return self._cache[cache_key]
+        cache_key = self._cache_key(text)
+        embedding = self._lookup_cache(cache_key)
+        if embedding is not None:
+            return embedding
         
         embedding = self.encode(text)
-        
-        # LRU 简单实现：超出大小时清空一半
-        if len(self._cache) >= self.config.max_cache_size:
-            keys = list(self._cache.keys())[:len(self._cache) // 2]
-            for k in keys:
-                del self._cache[k]
-        
-        self._cache[cache_key] = embedding
-        
-        # 每 50 次新缓存保存一次到磁盘
-        if self._cache_dir and len(self._cache) % 50 == 0:
-            self._save_disk_cache()
+        self.cache_stats['encoded'] += 1
+        self._remember(cache_key, embedding)
+        if self._disk_cache is not None:
+            try:
+                self._disk_cache.put(cache_key, embedding)
+            except Exception as e:
+                logger.warning(f"[Embedding] 磁盘缓存写入失败: {e}")
         
         return embedding
     
+    def encode_batch_with_cache(self, texts: List[str]) -> np.ndarray:
+        """v7.1: 带缓存的批量编码
+
+        先查内存 LRU / 磁盘缓存，只把未命中（且去重后）的文本交给 encode_batch()，
+        由各后端按提供商的批量上限分批请求，结果回填缓存。
+
+        Returns:
+            与 texts 顺序一致的 (len(texts), dim) 矩阵
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        if not self.config.cache_embeddings:
+            return np.asarray(self.encode_batch(texts), dtype=np.float32)
+
+        if not self._disk_cache_loaded:
+            self._load_disk_cache()
+
+        keys = [self._cache_key(t) for t in texts]
+        found = {}
+        misses: 'OrderedDict[bytes, str]' = OrderedDict()  # 批内相同文本只编码一次
+        for key, text in zip(keys, texts):
+            if key in found or key in misses:
+                continue
+            embedding = self._lookup_cache(key)
+            if embedding is not None:
+                found[key] = embedding
+            else:
+                misses[key] = text
+
+        if misses:
+            encoded = self.encode_batch(list(misses.values()))
+            self.cache_stats['encoded'] += len(misses)
+            new_items = list(zip(misses.keys(), encoded))
+            for key, embedding in new_items:
+                found[key] = embedding
+                self._remember(key, embedding)
+            if self._disk_cache is not None:
+                try:
+                    self._disk_cache.put_many(new_items)
+                except Exception as e:
+                    logger.warning(f"[Embedding] 磁盘缓存写入失败: {e}")
+
+        return np.asarray([found[k] for k in keys], dtype=np.float32)
+    
     def clear_cache(self):
-        """清空缓存"""
-        self._cache.clear()
+        """清空内存缓存（磁盘缓存保留，重启后仍可命中）"""
+        with self._cache_lock:
+            self._cache.clear()
+    
+    def get_cache_stats(self) -> dict:
+        """v7.1: 缓存命中统计"""
+        stats = dict(self.cache_stats)
+        stats['memory_entries'] = len(self._cache)
+        if self._disk_cache is not None:
+            stats['disk'] = self._disk_cache.get_stats()
+        return stats
+    
+    def close(self):
+        """落盘并关闭磁盘缓存"""
+        if self._disk_cache is not None:
+            try:
+                self._disk_cache.close()
+            except Exception:
+                pass
+            self._disk_cache = None
+            self._disk_cache_loaded = False
 
 
 class NoneBackend(EmbeddingBackend):
@@ -0,0 +1,273 @@
+"""内容寻址的持久化 Embedding 缓存
+
+旧实现以 Python 内置 hash(text) 为键并整体 pickle 到 embedding_cache.pkl：
+hash() 在每个进程中随机加盐，重启后缓存永远不命中，且每 50 条新条目就重写整个字典。
+
+本实现：
+- 键为 (backend, model, dimension, normalize, text) 的 blake2b 摘要，跨进程/重启稳定
+- 向量存放在 mmap 的 float32 文件中（每条占一个定长槽位），按需倍增扩容
+- 键 → 槽位索引存放在 SQLite（WAL）中，增量写入，按批提交
+- 真正的 LRU：内存中维护访问顺序，访问时间戳随提交批量落盘；满了复用最久未用条目的槽位
+
+目录布局（每个模型一个命名空间）：
+    <cache_dir>/embedding_cache/<namespace>/vectors.f32
+    <cache_dir>/embedding_cache/<namespace>/index.db
+"""
+
+import os
+import re
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingDiskCache:
+    """mmap 向量文件 + SQLite 键索引的 LRU 磁盘缓存（线程安全）"""
+
+    VECTOR_FILE = 'vectors.f32'
+    INDEX_FILE = 'index.db'
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, cache_dir: str, namespace: str, max_entries: int = 100000,
+                 commit_interval: int = 64):
+        """
+        Args:
+            cache_dir: 缓存根目录
+            namespace: 命名空间（通常为 backend + 模型名），不同模型互不干扰
+            max_entries: 最大条目数，超出后按 LRU 复用槽位
+            commit_interval: 每累积多少次写入/访问提交一次索引
+        """
+        slug = re.sub(r'[^A-Za-z0-9._-]+', '_', namespace).strip('_')[:64] or 'default'
+        digest = hashlib.blake2b(namespace.encode('utf-8'), digest_size=4).hexdigest()
+        self.path = os.path.join(cache_dir, 'embedding_cache', f'{slug}-{digest}')
+        self.max_entries = max(1, max_entries)
+        self.commit_interval = max(1, commit_interval)
+
+        self._lock = threading.RLock()
+        self._lru: 'OrderedDict[bytes, int]' = OrderedDict()  # key → slot，末尾为最近使用
+        self._touched: Dict[bytes, int] = {}                   # 待落盘的访问时间戳
+        self._free_slots: List[int] = []                       # 已驱逐、可复用的槽位
+        self._next_slot = 0                                    # 从未使用过的最小槽位
+        self._tick = 0
+        self._dirty_ops = 0
+        self._dim: Optional[int] = None
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.path, exist_ok=True)
+        self._vector_file = os.path.join(self.path, self.VECTOR_FILE)
+        self._conn = sqlite3.connect(
+            os.path.join(self.path, self.INDEX_FILE), check_same_thread=False
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key BLOB PRIMARY KEY, slot INTEGER NOT NULL, tick INTEGER NOT NULL)'
+        )
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)')
+        self._conn.commit()
+        self._load()
+
+    # ==================== 键 ====================
+
+    @staticmethod
+    def make_key(backend: str, model: str, dimension: Optional[int], normalize: bool,
+                 text: str) -> bytes:
+        """稳定的内容寻址键（与进程、hash 随机化无关）"""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f'{backend}\x00{model}\x00{dimension or "auto"}\x00{int(bool(normalize))}\x00'
+                 .encode('utf-8'))
+        h.update(text.encode('utf-8', errors='surrogatepass'))
+        return h.digest()
+
+    # ==================== 加载 ====================
+
+    def _load(self):
+        row = self._conn.execute("SELECT v FROM meta WHERE k='dim'").fetchone()
+        if row is None:
+            return
+        self._dim = int(row[0])
+        rows = self._conn.execute('SELECT key, slot, tick FROM entries ORDER BY tick').fetchall()
+        max_slot = max((slot for _, slot, _ in rows), default=-1)
+        expected = (max_slot + 1) * self._dim * 4
+        if (max_slot >= self.max_entries or not os.path.exists(self._vector_file)
+                or os.path.getsize(self._vector_file) < expected):
+            # 向量文件缺失/截断（或容量上限被调小）：索引不可信，整体重置
+            logger.warning(f"[Embedding] 磁盘缓存向量文件不完整，已重置: {self.path}")
+            self._reset(self._dim)
+            return
+        for key, slot, tick in rows:
+            self._lru[bytes(key)] = slot
+            self._tick = max(self._tick, tick)
+        self._next_slot = max_slot + 1
+        used = set(self._lru.values())
+        self._free_slots = [s for s in range(self._next_slot) if s not in used]
+        self._open_vectors(max(
+            os.path.getsize(self._vector_file) // (self._dim * 4), self.INITIAL_CAPACITY
+        ))
+
+    def _open_vectors(self, capacity: int):
+        """以 r+ 模式 mmap 向量文件，必要时扩展文件大小"""
+        capacity = min(max(capacity, 1), self.max_entries)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        size = capacity * self._dim * 4
+        with open(self._vector_file, 'ab') as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._vectors = np.memmap(self._vector_file, dtype=np.float32, mode='r+',
+                                  shape=(capacity, self._dim))
+        self._capacity = capacity
+
+    def _reset(self, dim: int):
+        """清空缓存并按新维度初始化（模型维度变化时）"""
+        self._vectors = None
+        self._lru.clear()
+        self._touched.clear()
+        self._free_slots = []
+        self._next_slot = 0
+        self._conn.execute('DELETE FROM entries')
+        self._conn.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('dim', ?)", (str(dim),))
+        self._conn.commit()
+        if os.path.exists(self._vector_file):
+            os.unlink(self._vector_file)
+        self._dim = dim
+        self._open_vectors(self.INITIAL_CAPACITY)
+
+    # ==================== 读写 ====================
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """按键读取向量（返回副本）；命中时刷新 LRU 顺序"""
+        with self._lock:
+            slot = self._lru.get(key)
+            if slot is None or self._vectors is None:
+                self.misses += 1
+                return None
+            self._lru.move_to_end(key)
+            self._tick += 1
+            self._touched[key] = self._tick
+            self.hits += 1
+            vec = np.array(self._vectors[slot], dtype=np.float32)
+            self._maybe_commit()
+            return vec
+
+    def get_many(self, keys: Iterable[bytes]) -> Dict[bytes, np.ndarray]:
+        """批量读取，返回命中的 {key: vector}"""
+        with self._lock:
+            return {k: v for k in keys if (v := self.get(k)) is not None}
+
+    def put(self, key: bytes, vector: np.ndarray):
+        """写入一条向量（已存在则覆盖并刷新 LRU）"""
+        self.put_many([(key, vector)])
+
+    def put_many(self, items: Iterable[Tuple[bytes, np.ndarray]]):
+        """批量写入；满了按 LRU 复用最久未用条目的槽位"""
+        with self._lock:
+            rows: List[Tuple[bytes, int, int]] = []
+            for key, vector in items:
+                vec = np.asarray(vector, dtype=np.float32).reshape(-1)
+                if self._dim != vec.shape[0]:
+                    self._reset(vec.shape[0])
+                    rows.clear()
+                slot = self._lru.get(key)
+                if slot is None:
+                    slot = self._allocate_slot()
+                self._lru[key] = slot
+                self._lru.move_to_end(key)
+                self._tick += 1
+                self._touched.pop(key, None)
+                self._vectors[slot] = vec
+                rows.append((key, slot, self._tick))
+            if rows:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO entries (key, slot, tick) VALUES (?, ?, ?)', rows
+                )
+                self._dirty_ops += len(rows)
+                self._maybe_commit()
+
+    def _allocate_slot(self) -> int:
+        if not self._free_slots and self._next_slot >= self._capacity:
+            if self._capacity < self.max_entries:
+                self._open_vectors(self._capacity * 2)
+            else:
+                self._evict_batch()
+        if self._free_slots:
+            return self._free_slots.pop()
+        slot = self._next_slot
+        self._next_slot += 1
+        return slot
+
+    def _evict_batch(self):
+        """按 LRU 批量驱逐最久未用的条目
+
+        驱逐记录必须先提交，槽位才能被新向量覆盖：否则崩溃后旧键会指向新向量。
+        按批驱逐（commit_interval 条）把这次额外提交摊还到多次写入上。
+        """
+        count = min(self.commit_interval, len(self._lru))
+        evicted = [self._lru.popitem(last=False) for _ in range(count)]
+        for key, slot in evicted:
+            self._touched.pop(key, None)
+            self._free_slots.append(slot)
+        self._conn.executemany('DELETE FROM entries WHERE key = ?', [(k,) for k, _ in evicted])
+        self.flush()
+
+    def _maybe_commit(self):
+        if self._dirty_ops + len(self._touched) >= self.commit_interval:
+            self.flush()
+
+    def flush(self):
+        """先落盘向量（msync），再提交索引，保证索引中的键一定有完整向量"""
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            if self._touched:
+                self._conn.executemany('UPDATE entries SET tick = ? WHERE key = ?',
+                                       [(t, k) for k, t in self._touched.items()])
+                self._touched.clear()
+            self._conn.commit()
+            self._dirty_ops = 0
+
+    def clear(self):
+        """清空磁盘缓存"""
+        with self._lock:
+            if self._dim is not None:
+                self._reset(self._dim)
+
+    def close(self):
+        with self._lock:
+            try:
+                self.flush()
+            finally:
+                self._vectors = None
+                self._conn.close()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._lru
+
+    def get_stats(self) -> Dict[str, object]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._lru),
+            'capacity': self._capacity,
+            'max_entries': self.max_entries,
+            'dimension': self._dim,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'path': self.path,
+        }
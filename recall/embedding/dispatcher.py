@@ -0,0 +1,339 @@
+"""Embedding API 限流与并发调度（v7.1）
+
+旧实现用滑动窗口计数限流，超限时在调用方线程里 time.sleep 轮询；
+429 重试同样 sleep；一次 encode_batch 的各个分批逐个串行发送。
+
+- RateLimiter：令牌桶，同时限制请求数（EMBEDDING_RATE_LIMIT / EMBEDDING_RATE_WINDOW）
+  与 token 数（EMBEDDING_TOKENS_PER_MINUTE）；429 时整体暂停
+- EmbeddingDispatcher：同一 API（api_base + api_key）的所有调用方共享一个调度线程
+  和工作线程池，在限额内保持最多 max_in_flight 个分批同时请求；各调用方按轮转
+  取批，大批量导入不会饿死单条查询；429 按 Retry-After（没有时指数退避 + 抖动）
+  重新排队，不占用线程 sleep
+"""
+
+import time
+import heapq
+import random
+import itertools
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+class RateLimiter:
+    """令牌桶速率限制器：同时限制请求数与 token 数（线程安全）
+
+    桶容量为一个时间窗口的配额（允许相同大小的突发），按窗口速率连续补充。
+
+    Args:
+        max_requests: 时间窗口内最大请求数，<= 0 不限
+        window_seconds: 时间窗口长度（秒）
+        tokens_per_minute: 每分钟 token 数，<= 0 不限
+    """
+
+    def __init__(self, max_requests: int = 5, window_seconds: int = 60, tokens_per_minute: int = 0):
+        self.max_requests = max(0, max_requests)
+        self.window_seconds = window_seconds
+        self.tokens_per_minute = max(0, tokens_per_minute)
+        self._request_rate = self.max_requests / window_seconds if self.max_requests and window_seconds > 0 else 0.0
+        self._token_rate = self.tokens_per_minute / 60.0
+        self._requests = float(self.max_requests)
+        self._tokens = float(self.tokens_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        if self._request_rate:
+            self._requests = min(float(self.max_requests), self._requests + elapsed * self._request_rate)
+        if self._token_rate:
+            self._tokens = min(float(self.tokens_per_minute), self._tokens + elapsed * self._token_rate)
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        """有配额时扣除并返回 0，否则返回还需等待的秒数（不扣除）"""
+        with self._cond:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            wait_s = 0.0
+            if self._request_rate and self._requests < 1:
+                wait_s = (1 - self._requests) / self._request_rate
+            if self._token_rate and tokens:
+                needed = min(tokens, self.tokens_per_minute)  # 超过桶容量的请求等桶满即放行
+                if self._tokens < needed:
+                    wait_s = max(wait_s, (needed - self._tokens) / self._token_rate)
+            if wait_s > 0:
+                return wait_s
+            if self._request_rate:
+                self._requests -= 1
+            if self._token_rate:
+                self._tokens -= tokens
+            return 0.0
+
+    def acquire(self, timeout: float = 120.0, tokens: int = 0) -> bool:
+        """阻塞直到获得许可（在条件变量上等待）；超时返回 False"""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait_s = self.try_acquire(tokens)
+            if wait_s <= 0:
+                return True
+            remaining = deadline - time.monotonic()
+            if wait_s > remaining:
+                return False
+            with self._cond:
+                self._cond.wait(wait_s)
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """按实际 token 数结算预估值（多退少补）"""
+        if not self._token_rate or actual is None:
+            return
+        with self._cond:
+            self._tokens = min(float(self.tokens_per_minute), self._tokens + estimated - actual)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        """收到 429 后暂停发放许可"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    error_str = str(error).lower()
+    return '429' in error_str or 'rate limit' in error_str
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """从异常附带的 HTTP 响应头读取 Retry-After（秒或 HTTP 日期）"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        value = headers.get('retry-after-ms')
+        if value is not None:
+            return max(0.0, float(value) / 1000)
+        value = headers.get('retry-after')
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class _Caller:
+    """一次 map() 调用；失败后其余分批不再发送"""
+    __slots__ = ('cancelled',)
+
+    def __init__(self):
+        self.cancelled = False
+
+
+class _Job:
+    __slots__ = ('fn', 'batch', 'tokens', 'future', 'caller', 'attempt', 'deadline')
+
+    def __init__(self, fn, batch, tokens, caller):
+        self.fn = fn
+        self.batch = batch
+        self.tokens = tokens
+        self.future = Future()
+        self.caller = caller
+        self.attempt = 0  # > 0 表示 429 后重试（future 已处于运行状态）
+        self.deadline = None  # 排到队首等待配额时才开始计时
+
+
+class EmbeddingDispatcher:
+    """在限额内并发发送 Embedding 分批请求（多个调用方共享，线程安全）
+
+    Args:
+        limiter: 共享的 RateLimiter
+        max_in_flight: 同时进行的请求数上限
+        max_retries: 每个分批最多尝试次数（429 时重试）
+        queue_timeout: 每个分批等待限额的最长时间（秒），从该分批排到队首开始计时，
+            超时以 RuntimeError 失败
+        backoff_base / backoff_max: 无 Retry-After 时的指数退避基数与上限（秒）
+    """
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        max_in_flight: int = 4,
+        max_retries: int = 3,
+        queue_timeout: float = 120.0,
+        backoff_base: float = 3.0,
+        backoff_max: float = 30.0
+    ):
+        self.limiter = limiter
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max(1, max_retries)
+        self.queue_timeout = queue_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._cond = threading.Condition()
+        self._queues: 'OrderedDict[Hashable, deque]' = OrderedDict()  # 调用方 → 待发分批（轮转）
+        self._delayed: List[Tuple[float, int, _Job]] = []  # 429 后等待重试的分批
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='recall-embed')
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'requests': 0, 'batches': 0, 'rate_limited': 0, 'retries': 0, 'throttle_wait_ms': 0.0}
+
+    def map(
+        self,
+        fn: Callable[[Sequence[str]], Tuple[Any, Optional[int]]],
+        batches: List[Sequence[str]],
+        tokens: List[int]
+    ) -> List[Any]:
+        """并发执行 fn(batch)，按 batches 顺序返回结果
+
+        fn 返回 (结果, 实际 token 数或 None)。任一分批失败时取消其余未发送的分批并抛出。
+        """
+        caller = _Caller()
+        jobs = [_Job(fn, batch, n, caller) for batch, n in zip(batches, tokens)]
+        with self._cond:
+            self._queues[caller] = deque(jobs)
+            self._stats['batches'] += len(jobs)
+            self._ensure_thread()
+            self._cond.notify_all()
+        futures = [job.future for job in jobs]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        failed = next((f for f in done if not f.cancelled() and f.exception() is not None), None)
+        if failed is not None:
+            with self._cond:
+                caller.cancelled = True
+                self._queues.pop(caller, None)
+            for future in futures:
+                future.cancel()
+            raise failed.exception()
+        return [future.result() for future in futures]
+
+    def _ensure_thread(self) -> None:
+        # 调用方持有 self._cond
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='recall-embed-dispatch', daemon=True)
+            self._thread.start()
+
+    def _next_job(self) -> Optional[_Job]:
+        """轮转取下一个调用方的分批（调用方持有 self._cond）"""
+        while self._queues:
+            caller, queue = next(iter(self._queues.items()))
+            if not queue:
+                del self._queues[caller]
+                continue
+            return queue[0]
+        return None
+
+    def _take_job(self, job: _Job) -> None:
+        queue = self._queues[job.caller]
+        queue.popleft()
+        if queue:
+            self._queues.move_to_end(job.caller)
+        else:
+            del self._queues[job.caller]
+
+    def _run(self) -> None:
+        throttled_since = None
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, _, job = heapq.heappop(self._delayed)
+                    self._queues.setdefault(job.caller, deque()).appendleft(job)
+                    self._queues.move_to_end(job.caller, last=False)
+
+                timeout = None
+                ready = None
+                job = self._next_job()
+                if job is not None and self._in_flight < self.max_in_flight:
+                    if job.caller.cancelled or job.future.cancelled():
+                        self._take_job(job)
+                        continue
+                    if job.deadline is None:
+                        # 与旧实现一致：每个分批各自最多等待 queue_timeout，
+                        # 而不是整个 map() 共用一个截止时间（大批量导入会在后段分批上超时）
+                        job.deadline = now + self.queue_timeout
+                    if now > job.deadline:
+                        self._take_job(job)
+                        job.future.set_exception(RuntimeError("Embedding API 速率限制超时"))
+                        continue
+                    wait_s = self.limiter.try_acquire(job.tokens)
+                    if wait_s <= 0:
+                        self._take_job(job)
+                        if not job.attempt and not job.future.set_running_or_notify_cancel():
+                            self.limiter.settle(job.tokens, 0)
+                            continue
+                        self._in_flight += 1
+                        self._stats['requests'] += 1
+                        if throttled_since is not None:
+                            self._stats['throttle_wait_ms'] += (now - throttled_since) * 1000
+                            throttled_since = None
+                        ready = job
+                    else:
+                        throttled_since = throttled_since or now
+                        timeout = min(wait_s, max(0.0, job.deadline - now) + 0.001)
+                if ready is None:
+                    if self._delayed:
+                        delay = self._delayed[0][0] - now
+                        timeout = delay if timeout is None else min(timeout, delay)
+                    self._cond.wait(timeout)
+                    continue
+            self._pool.submit(self._execute, ready)
+
+    def _execute(self, job: _Job) -> None:
+        try:
+            result, actual = job.fn(job.batch)
+        except Exception as e:
+            if is_rate_limited(e) and job.attempt < self.max_retries - 1:
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = min(self.backoff_max, self.backoff_base * (2 ** job.attempt)) * random.uniform(0.5, 1.0)
+                else:
+                    delay += random.uniform(0, 0.1 * delay + 0.05)  # 抖动，避免同时重试
+                self.limiter.pause(delay)
+                job.attempt += 1
+                job.deadline = None
+                with self._cond:
+                    self._stats['rate_limited'] += 1
+                    self._stats['retries'] += 1
+                    heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), job))
+            else:
+                if is_rate_limited(e):
+                    with self._cond:
+                        self._stats['rate_limited'] += 1
+                job.future.set_exception(e)
+        else:
+            self.limiter.settle(job.tokens, actual)
+            job.future.set_result(result)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats['in_flight'] = self._in_flight
+            stats['queued'] = sum(len(q) for q in self._queues.values()) + len(self._delayed)
+        stats['throttle_wait_ms'] = round(stats['throttle_wait_ms'], 2)
+        return stats
+
+
+_DISPATCHERS: Dict[Hashable, EmbeddingDispatcher] = {}
+_DISPATCHERS_LOCK = threading.Lock()
+
+
+def shared_dispatcher(key: Hashable, factory: Callable[[], EmbeddingDispatcher]) -> EmbeddingDispatcher:
+    """同一 API（api_base + api_key）的后端实例共享一个调度器与令牌桶（先创建者的配置生效）"""
+    with _DISPATCHERS_LOCK:
+        dispatcher = _DISPATCHERS.get(key)
+        if dispatcher is None:
+            dispatcher = _DISPATCHERS[key] = factory()
+        return dispatcher
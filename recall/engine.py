@@ -5,7 +5,8 @@ import os
 import time
 import uuid
 import logging
-from typing import List, Dict, Any, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Optional, Union
 from dataclasses import dataclass, field
 
 from .version import __version__
@@ -26,7 +27,7 @@ from .backends.factory import BackendFactory, BackendTier
 from .graph import RelationExtractor, TemporalKnowledgeGraph
 from .processor import (
     EntityExtractor,
-    ConsistencyChecker, MemorySummarizer, ScenarioDetector,
+    ConsistencyChecker, ConsistencyFactStore, MemorySummarizer, ScenarioDetector,
     ContextTracker, ContextType
 )
 
@@ -38,13 +39,13 @@ from .retrieval import EightLayerRetriever, ContextBuilder
 # Phase 3: ElevenLayerRetriever（v7.0 起默认启用）
 from .retrieval import (
     ElevenLayerRetriever, RetrievalConfig, 
-    TemporalContext, LayerWeights
+    TemporalContext, LayerWeights, QueryContext
 )
 # v7.0 C-3: ParallelRetriever 接线激活
 from .retrieval import ParallelRetriever, RetrievalTask
 from .retrieval.parallel_retrieval import RetrievalSource
 from .utils import (
-    LLMClient, WarmupManager, PerformanceMonitor,
+    LLMClient, LLMResponseCache, LLMCallScheduler, WarmupManager, PerformanceMonitor,
     EnvironmentManager
 )
 from .utils.perf_monitor import MetricType
@@ -263,7 +264,30 @@ class RecallEngine:
         api_key = llm_api_key or rc.llm_api_key or None
         api_base = rc.llm_api_base or None
         llm_timeout = rc.llm_timeout  # 默认60秒，避免复杂请求超时
-        self.llm_client = LLMClient(model=model, api_key=api_key, api_base=api_base, timeout=llm_timeout) if api_key else None
+        # v7.1: 可选响应缓存（重建索引时相同的抽取 / 摘要请求不再重复付费）
+        llm_cache = LLMResponseCache(
+            os.path.join(self.data_root, 'cache', 'llm_responses.db'),
+            ttl_seconds=rc.llm_cache_ttl_seconds,
+            max_entries=rc.llm_cache_max_entries,
+        ) if api_key and rc.llm_cache_enabled else None
+        # v7.1: 调用调度（合并进行中的相同请求、按提供商限流、短判断微批）
+        llm_scheduler = LLMCallScheduler(
+            max_concurrency=rc.llm_max_concurrency,
+            tokens_per_minute=rc.llm_tokens_per_minute,
+            single_flight=rc.llm_single_flight,
+            batch_max_items=rc.llm_batch_max_items,
+            batch_window_ms=rc.llm_batch_window_ms,
+        ) if api_key else None
+        self.llm_client = LLMClient(
+            model=model, api_key=api_key, api_base=api_base, timeout=llm_timeout,
+            cache=llm_cache, scheduler=llm_scheduler
+        ) if api_key else None
+        
+        # v7.1: 任务追踪模式（sampled / off 时写入热路径只统计步骤耗时）
+        try:
+            get_task_manager().configure_tracing(rc.task_trace_mode, rc.task_trace_sample_every)
+        except ValueError as e:
+            logger.warning(f"[Recall] TASK_TRACE_MODE 无效，保持默认: {e}")
         
         if self.llm_client:
             _safe_print(f"[Recall] LLM 客户端已初始化 (模型: {model})")
@@ -278,9 +302,7 @@ class RecallEngine:
             self.prompt_manager = None
         
         # 存储层
-        self.storage = MultiTenantStorage(
-            base_path=os.path.join(self.data_root, 'data')
-        )
+        self.storage = self._create_storage()
         
         # 分卷存储（Archive原文保存 - 确保100%不遗忘）
         self.volume_manager = VolumeManager(
@@ -295,6 +317,10 @@ class RecallEngine:
         self._metadata_index: Optional[MetadataIndex] = None
         # v7.0 C-2: VectorIndexIVF（在 _init_indexes 中按需创建）
         self._vector_index_ivf: Optional[VectorIndexIVF] = None
+        # v7.1: 常驻检索线程池（在 _init_eleven_layer_retriever 中创建）
+        self._retrieval_executor: Optional[ThreadPoolExecutor] = None
+        # v7.1: 批量导入的规则抽取进程池（BULK_INGEST_WORKERS > 0 时首次 add_batch 惰性创建）
+        self._ingest_process_pool = None
         self._ivf_auto_switch_threshold = self.recall_config.ivf_auto_switch_threshold
         
         if not self.lightweight:
@@ -349,7 +375,8 @@ class RecallEngine:
         # 一致性检查器（传入用户定义的绝对规则 + LLM客户端用于语义检测）
         self.consistency_checker = ConsistencyChecker(
             absolute_rules=self.core_settings.absolute_rules,
-            llm_client=self.llm_client  # 启用LLM语义规则检测
+            llm_client=self.llm_client,  # 启用LLM语义规则检测
+            fact_store=ConsistencyFactStore(os.path.join(self.data_root, 'indexes', 'consistency_facts.db'))  # v7.1
         )
         self.memory_summarizer = MemorySummarizer(llm_client=self.llm_client)
         self.scenario_detector = ScenarioDetector()
@@ -462,6 +489,16 @@ class RecallEngine:
             self.consolidation_manager = None
             _safe_print(f"[Recall v7.0] ConsolidationManager 初始化失败: {e}")
     
+    def _create_storage(self) -> MultiTenantStorage:
+        """v7.1: 按 MEMORY_STORAGE_MODE 创建多租户存储（json 整体重写 / log 追加日志）"""
+        rc = self.recall_config
+        return MultiTenantStorage(
+            base_path=os.path.join(self.data_root, 'data'),
+            storage_mode=rc.memory_storage_mode,
+            log_compact_threshold=rc.memory_log_compact_threshold,
+            log_fsync=rc.memory_log_fsync,
+        )
+    
     def _init_v4_modules(self):
         """初始化 v4.0 Phase 1/2 可选模块
         
@@ -600,7 +637,12 @@ class RecallEngine:
                     vector_dim = self.embedding_backend.get_dimension()
             
             db_base = os.path.join(self.data_root, 'data')
-            self._backend_factory = BackendFactory(vector_dimension=vector_dim)
+            rc = self.recall_config
+            self._backend_factory = BackendFactory(vector_dimension=vector_dim, sqlite_options={
+                'durability': rc.sqlite_write_durability,
+                'group_commit_ms': rc.sqlite_group_commit_ms,
+                'group_commit_rows': rc.sqlite_group_commit_rows,
+            })
             self._storage_backend = self._backend_factory.create_storage_backend(
                 db_path=os.path.join(db_base, 'memories.db')
             )
@@ -1079,12 +1121,20 @@ class RecallEngine:
                 embedding_backend=self.embedding_backend,
                 llm_client=self.llm_client if llm_enabled else None,
                 budget_manager=self.budget_manager,
-                prompt_manager=self.prompt_manager  # v7.0
+                prompt_manager=self.prompt_manager,  # v7.0
+                index_path=os.path.join(self.data_root, 'indexes', 'dedup_signatures.bin'),  # v7.1
+                vector_lookup=self._lookup_memory_vectors  # v7.1: 语义去重复用向量索引中的向量
             )
             _safe_print(f"[Recall v4.0] 三阶段去重器已启用 (Jaccard={jaccard_threshold}, Semantic={semantic_low}-{semantic_high}, LLM={llm_enabled})")
         except Exception as e:
             _safe_print(f"[Recall v4.0] 三阶段去重器初始化失败（使用默认去重）: {e}")
     
+    def _lookup_memory_vectors(self, memory_ids: List[str]) -> Dict[str, Any]:
+        """v7.1: 按记忆 ID 批量取向量索引中已有的向量（供去重器复用，避免重复编码）"""
+        if self._vector_index is not None and hasattr(self._vector_index, 'get_vectors_by_doc_ids'):
+            return self._vector_index.get_vectors_by_doc_ids(memory_ids)
+        return {}
+    
     def _init_eleven_layer_retriever(self):
         """初始化 Phase 3 十一层检索器
         
@@ -1116,6 +1166,13 @@ class RecallEngine:
             # v7.0 C-2: 使用活跃向量索引（可能是 IVF）
             active_vector_index = self.get_active_vector_index()
             
+            # v7.1: 引擎级常驻检索线程池，所有查询的各路召回共享
+            if self._retrieval_executor is None:
+                self._retrieval_executor = ThreadPoolExecutor(
+                    max_workers=max(1, config.recall_workers),
+                    thread_name_prefix='recall-retrieval'
+                )
+            
             # 创建 ElevenLayerRetriever
             self.retriever = ElevenLayerRetriever(
                 # 现有依赖（与 EightLayerRetriever 相同）
@@ -1142,7 +1199,9 @@ class RecallEngine:
                 fulltext_index=getattr(self, 'fulltext_index', None),
                 fulltext_weight=getattr(self, '_fulltext_weight', 0.3),
                 # 配置
-                config=config
+                config=config,
+                # v7.1: 常驻检索线程池
+                executor=self._retrieval_executor
             )
             
             # 记录启用状态
@@ -1335,13 +1394,9 @@ class RecallEngine:
         source_results = self.parallel_retriever.retrieve_parallel(tasks)
         merged = self.parallel_retriever.merge_results(source_results, tasks, top_k=top_k * 3)
         
-        # 过滤为当前用户的记忆
+        # 过滤为当前用户的记忆（v7.1: 直接使用作用域的 ID 视图，不再逐条重建集合）
         scope = self.storage.get_scope(user_id)
-        user_memory_ids = set()
-        for mem in scope._memories:
-            mem_id = mem.get('metadata', {}).get('id', '')
-            if mem_id:
-                user_memory_ids.add(mem_id)
+        user_memory_ids = scope.memory_ids()
         
         results = []
         for item in merged:
@@ -1677,6 +1732,15 @@ class RecallEngine:
                 self._metadata_index.remove_batch(evicted_set)
         except Exception:
             pass
+        try:
+            if getattr(self, 'deduplicator', None) is not None:
+                self.deduplicator.remove_from_index(evicted_ids)
+        except Exception:
+            pass
+        try:
+            self.consistency_checker.remove_memories(evicted_ids)
+        except Exception:
+            pass
         try:
             if self.retriever:
                 for mid in evicted_ids:
@@ -1835,25 +1899,16 @@ class RecallEngine:
     def _migrate_vectors_to_ivf(self, vector_count: int):
         """v7.0: 从平坦索引迁移向量到 IVF 索引
 
-        从 VectorIndex 的 faiss FlatIP 索引中重建向量并批量导入 IVF，
+        从 VectorIndex 的 faiss 索引中导出向量并批量导入 IVF，
         确保切换后 IVF 索引不是空的。
         """
         try:
-            import numpy as np
-            flat_index = self._vector_index.index  # faiss IndexFlatIP
-            if flat_index.ntotal == 0:
+            if self._vector_index.index.ntotal == 0:
                 return
 
-            # 从 faiss Flat 索引重建全量向量
-            import faiss
-            vectors = faiss.rev_swig_ptr(flat_index.get_xb(), flat_index.ntotal * flat_index.d)
-            vectors = vectors.reshape(flat_index.ntotal, flat_index.d).copy()
-
-            # 获取对应的 doc_id 列表
-            doc_ids = list(self._vector_index.turn_mapping)
-
-            if len(doc_ids) != flat_index.ntotal:
-                _safe_print(f"[Recall v7.0] 向量迁移跳过: doc_ids({len(doc_ids)}) != vectors({flat_index.ntotal})")
+            # v7.1: VectorIndex 为 IndexIDMap2，按内部 ID 导出 (doc_id, 向量)
+            doc_ids, vectors = self._vector_index.export_vectors()
+            if not doc_ids:
                 return
 
             # 先用向量数据训练 IVF
@@ -1871,12 +1926,19 @@ class RecallEngine:
             self._vector_index_ivf = None
 
     def _rebuild_content_cache(self):
-        """重建内容缓存（从持久化存储恢复）"""
+        """重建内容缓存（从持久化存储恢复）
+
+        v7.1: 作用域目录通过 ScopedMemory 加载（json 模式读 memories.json，log 模式
+        快照 + 日志重放；log 模式迁移后 memories.json 已被删除，不能直接读文件）
+        """
+        from .storage.memory_log import MemoryLog
+        
         # 扫描所有用户目录
         data_path = os.path.join(self.data_root, 'data')
         if not os.path.exists(data_path):
             return
         
+        log_files = (MemoryLog.SNAPSHOT_FILE, MemoryLog.LOG_FILE)
         count = 0
         for user_dir in os.listdir(data_path):
             user_path = os.path.join(data_path, user_dir)
@@ -1885,26 +1947,37 @@ class RecallEngine:
             
             # 扫描该用户下的所有角色/会话
             for root, dirs, files in os.walk(user_path):
-                if 'memories.json' in files:
-                    memories_file = os.path.join(root, 'memories.json')
-                    try:
-                        with open(memories_file, 'r', encoding='utf-8') as f:
+                has_log = any(f in log_files or f.endswith(MemoryLog.SEGMENT_SUFFIX) for f in files)
+                if 'memories.json' not in files and not has_log:
+                    continue
+                parts = os.path.relpath(root, data_path).split(os.sep)
+                try:
+                    if len(parts) == 3:
+                        # 作用域目录 <user>/<character>/<session>
+                        user_id, character_id, session_id = parts
+                        memories = self.storage.get_scope(
+                            user_id, session_id=session_id, character_id=character_id
+                        ).get_all()
+                    elif 'memories.json' in files:
+                        with open(os.path.join(root, 'memories.json'), 'r', encoding='utf-8') as f:
                             memories = __import__('json').load(f)
-                            for mem in memories:
-                                mem_id = mem.get('metadata', {}).get('id')
-                                content = mem.get('content', '')
-                                metadata = mem.get('metadata', {})
-                                entities = mem.get('entities', [])
-                                if mem_id and content:
-                                    self.retriever.cache_content(mem_id, content)
-                                    # 同时缓存 metadata 和 entities
-                                    if hasattr(self.retriever, 'cache_metadata'):
-                                        self.retriever.cache_metadata(mem_id, metadata)
-                                    if hasattr(self.retriever, 'cache_entities'):
-                                        self.retriever.cache_entities(mem_id, entities)
-                                    count += 1
-                    except Exception as e:
-                        _safe_print(f"[Recall] 加载 {memories_file} 失败: {e}")
+                    else:
+                        continue
+                    for mem in memories:
+                        mem_id = mem.get('metadata', {}).get('id')
+                        content = mem.get('content', '')
+                        metadata = mem.get('metadata', {})
+                        entities = mem.get('entities', [])
+                        if mem_id and content:
+                            self.retriever.cache_content(mem_id, content)
+                            # 同时缓存 metadata 和 entities
+                            if hasattr(self.retriever, 'cache_metadata'):
+                                self.retriever.cache_metadata(mem_id, metadata)
+                            if hasattr(self.retriever, 'cache_entities'):
+                                self.retriever.cache_entities(mem_id, entities)
+                            count += 1
+                except Exception as e:
+                    _safe_print(f"[Recall] 加载 {root} 的记忆失败: {e}")
         
         if count > 0:
             _safe_print(f"[Recall] 已恢复 {count} 条记忆内容到缓存")
@@ -1960,6 +2033,7 @@ class RecallEngine:
         user_id: str = "default",
         skip_dedup: bool = False,
         skip_llm: bool = True,
+        on_added: Optional[Callable[[int, str], None]] = None,
     ) -> List[str]:
         """批量添加记忆（高吞吐）
         
@@ -1968,11 +2042,23 @@ class RecallEngine:
             user_id: 用户ID
             skip_dedup: 跳过去重检查
             skip_llm: 跳过 LLM 调用（实体提取用规则模式）
+            on_added: 每条写入成功后回调 (items 下标, memory_id)
         
         Returns:
             List[str]: 成功添加的 memory_id 列表
         """
-        return self._memory_ops.add_batch(items, user_id=user_id, skip_dedup=skip_dedup, skip_llm=skip_llm)
+        return self._memory_ops.add_batch(items, user_id=user_id, skip_dedup=skip_dedup, skip_llm=skip_llm,
+                                          on_added=on_added)
+
+    def _get_ingest_process_pool(self):
+        """v7.1: 批量导入规则抽取进程池（BULK_INGEST_WORKERS <= 0 时返回 None）"""
+        workers = self.recall_config.bulk_ingest_workers
+        if workers <= 0:
+            return None
+        if self._ingest_process_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._ingest_process_pool = ProcessPoolExecutor(max_workers=workers)
+        return self._ingest_process_pool
 
     def _add_single_fast(self, content, embedding, metadata, user_id, skip_dedup, skip_llm):
         """单条快速添加（add_batch 内部使用）"""
@@ -2056,6 +2142,7 @@ class RecallEngine:
         content_type: Optional[str] = None,
         event_time_start: Optional[str] = None,
         event_time_end: Optional[str] = None,
+        query_context: Optional[QueryContext] = None,
     ) -> List[SearchResult]:
         """搜索记忆
         
@@ -2072,57 +2159,249 @@ class RecallEngine:
             content_type: v5.0 元数据过滤 - 内容类型
             event_time_start: v5.0 事件时间范围起点（YYYY-MM-DD 或 ISO）
             event_time_end: v5.0 事件时间范围终点（YYYY-MM-DD 或 ISO）
+            query_context: v7.1 查询分析上下文（可选，调用方已算好的实体/关键词/向量直接复用）
         
         Returns:
             List[SearchResult]: 搜索结果
         """
         # v5.0: 元数据过滤
+        allowed_ids = self._metadata_allowed_ids(
+            source, tags, category, content_type, event_time_start, event_time_end
+        )
+        
+        # 1. 提取查询实体和关键词（v7.1: 整次检索共享一份查询上下文）
+        query_context = self._prepare_query_context(query, query_context)
+        
+        # 4. 执行检索（【BUG-003 修复】只返回当前用户的记忆）
+        scope = self.storage.get_scope(user_id)
+        results, seen_ids = self._search_candidates(
+            query, user_id, scope, top_k, filters, temporal_context,
+            self._retrieval_config_for(config_preset), allowed_ids, query_context
+        )
+        
+        # v7.0.3: VolumeManager 归档搜索（确保被 LRU 驱逐的记忆仍可搜索）
+        if len(results) < top_k and self.volume_manager:
+            try:
+                archive_hits = self.volume_manager.search_content(
+                    query, max_results=(top_k - len(results)) * 3, user_id=user_id
+                )
+                self._merge_archive_hits(results, seen_ids, archive_hits, user_id, allowed_ids, top_k)
+            except Exception:
+                pass  # VolumeManager 搜索失败不影响已有结果
+        
+        return results[:top_k]
+    
+    def search_many(
+        self,
+        queries: List[str],
+        user_id: str = "default",
+        top_k: Union[int, List[int]] = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        temporal_contexts: Optional[List[Optional[Any]]] = None,
+        config_preset: Optional[str] = None,
+        source: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        content_type: Optional[str] = None,
+        event_time_start: Optional[str] = None,
+        event_time_end: Optional[str] = None,
+    ) -> List[List[SearchResult]]:
+        """批量搜索多个查询（v7.1）
+        
+        结果与逐个调用 search() 相同，但同一用户的多个查询共享：
+        - 一次 encode_batch 编码全部查询向量
+        - 一次 FAISS 查询矩阵完成向量召回（召回层直接取用预取结果）
+        - 一次 BAL 向量后端批量检索
+        - 作用域、元数据过滤、检索配置只准备一次
+        - 一次存档扫描完成全部查询的归档兜底
+        
+        Args:
+            queries: 查询列表
+            user_id: 用户ID
+            top_k: 每个查询的返回数量（整数，或与 queries 等长的列表）
+            filters / config_preset / source / tags / category / content_type /
+            event_time_start / event_time_end: 同 search()，对所有查询生效
+            temporal_contexts: 与 queries 等长的时态上下文列表（可选，元素可为 None）
+        
+        Returns:
+            List[List[SearchResult]]: 与 queries 顺序一致的搜索结果
+        """
+        if not queries:
+            return []
+        top_ks = list(top_k) if isinstance(top_k, (list, tuple)) else [top_k] * len(queries)
+        temporal_contexts = list(temporal_contexts) if temporal_contexts else [None] * len(queries)
+        
+        allowed_ids = self._metadata_allowed_ids(
+            source, tags, category, content_type, event_time_start, event_time_end
+        )
+        retrieval_config = self._retrieval_config_for(config_preset)
+        scope = self.storage.get_scope(user_id)
+        user_memory_ids = scope.memory_ids()
+        
+        # 1. 查询上下文：实体/关键词逐条提取，查询向量一次批量编码
+        contexts = [self._prepare_query_context(query, None) for query in queries]
+        embeddings = None
+        if self.embedding_backend:
+            try:
+                embeddings = self.embedding_backend.encode_batch_with_cache(list(queries))
+                for ctx, embedding in zip(contexts, embeddings):
+                    ctx.embedding = embedding
+            except Exception as e:
+                logger.warning(f"[Recall] 批量编码查询失败，回退逐条编码: {e}")
+                embeddings = None
+        
+        # 2. 向量召回：整个查询矩阵一次检索，结果挂到各自的查询上下文
+        if embeddings is not None:
+            self._prefetch_vector_hits(contexts, embeddings, max(top_ks), user_memory_ids)
+        
+        # 3. BAL 向量后端：同一命名空间的查询批量检索
+        bal_vector_hits: List[Optional[list]] = [None] * len(queries)
+        if embeddings is not None and getattr(self, '_vector_backend', None):
+            try:
+                ns = getattr(scope, '_namespace', user_id)
+                bal_vector_hits = self._vector_backend.search_batch(
+                    list(embeddings), top_k=max(top_ks) * 2, filters={'namespace': ns}
+                )
+                bal_vector_hits = [hits[:k * 2] for hits, k in zip(bal_vector_hits, top_ks)]
+            except Exception:
+                bal_vector_hits = [None] * len(queries)  # 回退逐条检索
+        
+        # 4. 逐查询执行召回与合并（各召回路径仍在常驻检索线程池上并发）
+        all_results = []
+        for i, query in enumerate(queries):
+            results, seen_ids = self._search_candidates(
+                query, user_id, scope, top_ks[i], filters, temporal_contexts[i],
+                retrieval_config, allowed_ids, contexts[i], bal_vector_hits=bal_vector_hits[i]
+            )
+            all_results.append((results, seen_ids))
+        
+        # 5. 归档兜底：结果不足的查询共享一次存档扫描
+        if self.volume_manager:
+            short = [i for i, (results, _) in enumerate(all_results) if len(results) < top_ks[i]]
+            if short:
+                try:
+                    archive_hits = self.volume_manager.search_content_many(
+                        [queries[i] for i in short],
+                        max_results=[(top_ks[i] - len(all_results[i][0])) * 3 for i in short],
+                        user_id=user_id
+                    )
+                    for i, hits in zip(short, archive_hits):
+                        results, seen_ids = all_results[i]
+                        self._merge_archive_hits(results, seen_ids, hits, user_id, allowed_ids, top_ks[i])
+                except Exception:
+                    pass  # VolumeManager 搜索失败不影响已有结果
+        
+        return [results[:k] for (results, _), k in zip(all_results, top_ks)]
+    
+    def _metadata_allowed_ids(
+        self, source, tags, category, content_type, event_time_start, event_time_end
+    ) -> Optional[set]:
+        """v5.0: 元数据过滤条件 → 允许的记忆 ID 集合（无过滤条件时返回 None）"""
         if any([source, tags, category, content_type, event_time_start, event_time_end]) and self._metadata_index:
-            allowed_ids = self._metadata_index.query(
+            return self._metadata_index.query(
                 source=source, tags=tags, category=category, content_type=content_type,
                 event_time_start=event_time_start, event_time_end=event_time_end,
             )
+        return None
+    
+    def _prepare_query_context(self, query: str, query_context: Optional[QueryContext]) -> QueryContext:
+        """补齐查询上下文中的实体、关键词与编码器（已有的字段直接复用）"""
+        if query_context is None:
+            query_context = QueryContext(query=query)
+        if query_context.entities is None:
+            query_context.entities = [e.name for e in self.entity_extractor.extract(query)]
+        if query_context.keywords is None:
+            query_context.keywords = self.entity_extractor.extract_keywords(query)
+        if query_context.encoder is None and self.embedding_backend:
+            query_context.encoder = self.embedding_backend.encode_with_cache
+        return query_context
+    
+    def _retrieval_config_for(self, config_preset: Optional[str]):
+        """Phase 3: 配置预设 → 检索配置（default 返回 None，使用 retriever 的默认配置）"""
+        if config_preset and hasattr(self.retriever, 'config'):
+            from recall.retrieval.config import RetrievalConfig
+            if config_preset == 'fast':
+                return RetrievalConfig.fast()
+            if config_preset == 'accurate':
+                return RetrievalConfig.accurate()
+        return None
+    
+    def _prefetch_vector_hits(
+        self,
+        contexts: List[QueryContext],
+        embeddings: Any,
+        top_k: int,
+        allowed_ids: Any
+    ) -> None:
+        """v7.1: 用整个查询矩阵一次检索向量索引，结果挂到各查询上下文供召回层直接取用
+        
+        预取数量覆盖并行召回（top_k * 2）与串行 L7/L5 粗筛的 top_k，
+        召回层取前 k 条，与单独检索的结果一致；索引不支持批量时不预取。
+        """
+        vector_index = getattr(self.retriever, 'vector_index', None)
+        if vector_index is None or not hasattr(vector_index, 'search_batch') \
+                or not getattr(vector_index, 'enabled', True):
+            return
+        retriever_config = getattr(self.retriever, 'config', None)
+        if isinstance(retriever_config, dict):
+            coarse_k = retriever_config.get('l5_top_k', 0)
         else:
-            allowed_ids = None
+            coarse_k = getattr(retriever_config, 'l7_vector_top_k', 0)
+        k = max(top_k * 2, coarse_k)
+        try:
+            hits = vector_index.search_batch(embeddings, top_k=k, allowed_ids=allowed_ids)
+        except Exception as e:
+            logger.warning(f"[Recall] 批量向量召回失败，回退逐条检索: {e}")
+            return
+        for ctx, ctx_hits in zip(contexts, hits):
+            ctx.vector_hits = ctx_hits
+            ctx.vector_hits_k = k
+    
+    def _search_candidates(
+        self,
+        query: str,
+        user_id: str,
+        scope: Any,
+        top_k: int,
+        filters: Optional[Dict[str, Any]],
+        temporal_context: Optional[Any],
+        retrieval_config: Any,
+        allowed_ids: Optional[set],
+        query_context: QueryContext,
+        bal_vector_hits: Optional[list] = None,
+    ) -> tuple:
+        """单个查询的召回与合并（不含归档兜底）
+        
+        Args:
+            bal_vector_hits: search_many 批量取得的 BAL 向量检索结果（None 时在此检索）
         
-        # 1. 提取查询实体和关键词
-        entities = [e.name for e in self.entity_extractor.extract(query)]
-        keywords = self.entity_extractor.extract_keywords(query)
+        Returns:
+            (results, seen_ids): 已按用户与元数据过滤的结果及其 ID 集合
+        """
+        entities = query_context.entities
+        keywords = query_context.keywords
         
         # 2. 检测场景
         scenario = self.scenario_detector.detect(query)
         
-        # 3. Phase 3: 构建检索配置
-        retrieval_config = None
-        if config_preset and hasattr(self.retriever, 'config'):
-            from recall.retrieval.config import RetrievalConfig
-            if config_preset == 'fast':
-                retrieval_config = RetrievalConfig.fast()
-            elif config_preset == 'accurate':
-                retrieval_config = RetrievalConfig.accurate()
-            # default 使用 retriever 的默认配置
+        # 【BUG-003 修复】当前用户的记忆 ID（v7.1: O(1) 视图，随作用域增删自动更新）
+        user_memory_ids = scope.memory_ids()
         
-        # 4. 执行检索（传递 Phase 3 新参数）
-        # 【BUG-003 修复】先获取当前用户的所有记忆 ID，用于后续过滤
-        scope = self.storage.get_scope(user_id)
-        user_memory_ids = set()
-        for mem in scope._memories:
-            mem_id = mem.get('metadata', {}).get('id', '')
-            if mem_id:
-                user_memory_ids.add(mem_id)
-        
-        # 从全局索引检索（可能包含其他用户的结果）
+        # v7.1: 用户分区过滤下推到各索引内部，不再"全局多取再过滤"
+        # （多租户时小用户的结果会被大用户挤出过采样窗口）
         retrieval_results = self.retriever.retrieve(
             query=query,
             entities=entities,
             keywords=keywords,
-            top_k=top_k * 3,  # 多取一些，因为要过滤
+            top_k=top_k,
             filters=filters,
             temporal_context=temporal_context,
-            config=retrieval_config
+            config=retrieval_config,
+            allowed_ids=user_memory_ids,
+            query_context=query_context
         )
         
-        # 【BUG-003 修复】过滤结果，只保留属于当前用户的记忆
+        # 【BUG-003 修复】过滤结果，只保留属于当前用户的记忆（兜底，正常情况下已全部命中）
         retrieval_results = [
             r for r in retrieval_results 
             if r.id in user_memory_ids
@@ -2137,17 +2416,18 @@ class RecallEngine:
         # BAL 向量搜索
         if getattr(self, '_vector_backend', None) and self.embedding_backend:
             try:
-                query_vec = self.embedding_backend.encode(query)
-                if query_vec is not None:
-                    ns = getattr(scope, '_namespace', user_id)
-                    bal_vector_hits = self._vector_backend.search(
-                        query_vec, top_k=top_k * 2,
-                        filters={'namespace': ns}
-                    )
-                    for hit in bal_vector_hits:
-                        if hit.id and hit.id not in bal_seen:
-                            bal_results.append((hit.id, hit.score, hit.text or '', hit.metadata or {}))
-                            bal_seen.add(hit.id)
+                if bal_vector_hits is None:
+                    query_vec = query_context.get_embedding()
+                    if query_vec is not None:
+                        ns = getattr(scope, '_namespace', user_id)
+                        bal_vector_hits = self._vector_backend.search(
+                            query_vec, top_k=top_k * 2,
+                            filters={'namespace': ns}
+                        )
+                for hit in bal_vector_hits or []:
+                    if hit.id and hit.id not in bal_seen:
+                        bal_results.append((hit.id, hit.score, hit.text or '', hit.metadata or {}))
+                        bal_seen.add(hit.id)
             except Exception:
                 pass  # BAL VectorBackend search — skip on error
         # BAL 全文搜索
@@ -2213,35 +2493,41 @@ class RecallEngine:
         if allowed_ids is not None:
             results = [r for r in results if r.id in allowed_ids]
         
-        # v7.0.3: VolumeManager 归档搜索（确保被 LRU 驱逐的记忆仍可搜索）
-        # v7.0.7: 移除 `mid in user_memory_ids` 条件（被驱逐记忆不在 scope._memories 中，永远为 False）
-        # 改用 user_id 过滤保证隔离
-        if len(results) < top_k and self.volume_manager:
-            try:
-                archive_hits = self.volume_manager.search_content(query, max_results=(top_k - len(results)) * 3)
-                for hit in archive_hits:
-                    mid = hit.get('memory_id', '')
-                    # 用户隔离：通过 user_id 字段过滤
-                    hit_user = hit.get('user_id', '')
-                    # v7.0.12: 移除 hit_user=='unknown' 宽松匹配，防止跨用户数据泄漏
-                    if mid and mid not in seen_ids and (hit_user == user_id):
-                        # v7.0.9: 归档结果也需通过 metadata 过滤（allowed_ids）
-                        if allowed_ids is not None and mid not in allowed_ids:
-                            continue
-                        results.append(SearchResult(
-                            id=mid,
-                            content=hit.get('content', ''),
-                            score=0.3,  # 归档数据给较低分数（时效性低）
-                            metadata=hit.get('metadata', {}),
-                            entities=hit.get('entities', [])
-                        ))
-                        seen_ids.add(mid)
-                        if len(results) >= top_k:
-                            break
-            except Exception:
-                pass  # VolumeManager 搜索失败不影响已有结果
-        
-        return results[:top_k]
+        return results, seen_ids
+    
+    def _merge_archive_hits(
+        self,
+        results: List[SearchResult],
+        seen_ids: set,
+        archive_hits: List[dict],
+        user_id: str,
+        allowed_ids: Optional[set],
+        top_k: int
+    ) -> None:
+        """把归档命中补充到结果末尾，直到满 top_k
+        
+        v7.0.7: 移除 `mid in user_memory_ids` 条件（被驱逐记忆不在 scope._memories 中，永远为 False），
+        改用 user_id 过滤保证隔离
+        """
+        for hit in archive_hits:
+            mid = hit.get('memory_id', '')
+            # 用户隔离：通过 user_id 字段过滤
+            hit_user = hit.get('user_id', '')
+            # v7.0.12: 移除 hit_user=='unknown' 宽松匹配，防止跨用户数据泄漏
+            if mid and mid not in seen_ids and (hit_user == user_id):
+                # v7.0.9: 归档结果也需通过 metadata 过滤（allowed_ids）
+                if allowed_ids is not None and mid not in allowed_ids:
+                    continue
+                results.append(SearchResult(
+                    id=mid,
+                    content=hit.get('content', ''),
+                    score=0.3,  # 归档数据给较低分数（时效性低）
+                    metadata=hit.get('metadata', {}),
+                    entities=hit.get('entities', [])
+                ))
+                seen_ids.add(mid)
+                if len(results) >= top_k:
+                    break
     
     def get_all(
         self,
@@ -3007,6 +3293,14 @@ class RecallEngine:
                 'persistent_contexts': self.context_tracker.get_stats(user_id),
             }
         
+        # v7.1: LLM 调度 / 响应缓存统计
+        llm_client = getattr(self, 'llm_client', None)
+        if llm_client is not None:
+            stats['llm'] = {
+                'scheduler': llm_client.scheduler.stats() if llm_client.scheduler else None,
+                'cache': llm_client.cache.stats() if llm_client.cache else None,
+            }
+        
         # 性能统计
         try:
             stats['performance'] = self.monitor.get_all_stats() if hasattr(self.monitor, 'get_all_stats') else {}
@@ -3070,9 +3364,9 @@ class RecallEngine:
             scope.clear()
         else:
             # 重置所有
-            self.storage = MultiTenantStorage(
-                base_path=os.path.join(self.data_root, 'data')
-            )
+            self.storage.close()
+            self.storage = self._create_storage()
+            self.storage.set_evict_callback(self._on_memories_evicted)
             if not self.lightweight:
                 self._init_indexes()
         
@@ -3142,6 +3436,13 @@ class RecallEngine:
             except Exception:
                 pass
         
+        # 3.8 v7.1: 去重器 MinHash 签名索引落盘
+        if getattr(self, 'deduplicator', None) is not None:
+            try:
+                self.deduplicator.save_index()
+            except Exception:
+                pass
+        
         # 4. 关闭 TopicCluster（SQLite 连接）
         if hasattr(self, '_topic_cluster') and self._topic_cluster:
             try:
@@ -3174,6 +3475,16 @@ class RecallEngine:
                 except Exception:
                     pass
         
+        # 6.5 v7.1: 关闭常驻检索线程池
+        if getattr(self, '_retrieval_executor', None) is not None:
+            self._retrieval_executor.shutdown(wait=False)
+            self._retrieval_executor = None
+        
+        # 6.6 v7.1: 关闭批量导入抽取进程池
+        if getattr(self, '_ingest_process_pool', None) is not None:
+            self._ingest_process_pool.shutdown(wait=False, cancel_futures=True)
+            self._ingest_process_pool = None
+        
         # 7. 关闭存储层
         if hasattr(self, 'storage') and self.storage:
             closer = getattr(self.storage, 'close', None)
@@ -148,6 +148,14 @@ class EntityIndex:
     
     def add(self, entity: IndexedEntity):
         """添加实体"""
+        stored = self._merge(entity)
+        self._mark_dirty()
+        # WAL 增量写入：只追加变更行，不做全量快照
+        self._append_wal(stored)
+        self._save()  # 检查是否需要 compact
+
+    def _merge(self, entity: IndexedEntity) -> IndexedEntity:
+        """把实体合并进内存索引（不写 WAL），返回索引中的实体"""
         if entity.id in self.entities:
             # 合并引用
             existing = self.entities[entity.id]
@@ -158,17 +166,13 @@ class EntityIndex:
                 existing.entity_type = entity.entity_type
         else:
             self.entities[entity.id] = entity
-        
+
         # 更新名称索引
         self.name_index[entity.name.lower()] = entity.id
         for alias in entity.aliases:
             self.name_index[alias.lower()] = entity.id
-        
-        self._mark_dirty()
-        # WAL 增量写入：只追加变更行，不做全量快照
-        self._append_wal(self.entities[entity.id])
-        self._save()  # 检查是否需要 compact
-    
+        return self.entities[entity.id]
+
     def get_by_name(self, name: str) -> Optional[IndexedEntity]:
         """通过名称或别名查找"""
         entity_id = self.name_index.get(name.lower())
@@ -220,9 +224,47 @@ class EntityIndex:
             aliases: 实体别名列表
             confidence: 置信度 (0-1)
         """
+        entity = self._apply_occurrence(entity_name, turn_id, entity_type, aliases, confidence)
+        self._mark_dirty()
+        self._append_wal(entity)
+        self._save()  # 检查是否需要 compact
+
+    def add_occurrences(self, occurrences: List[Dict[str, Any]]) -> None:
+        """批量添加实体出现记录（v7.1: 批量导入使用）
+
+        先在内存中合并整批，再把每个受影响的实体只追加一行 WAL（一次打开文件），
+        整批最多触发一次 compact。逐条调用时热门实体每次都要序列化完整的引用列表。
+
+        Args:
+            occurrences: add_entity_occurrence() 关键字参数组成的字典列表
+                （entity_name、turn_id 必填，其余可选）
+        """
+        touched: Dict[str, IndexedEntity] = {}
+        for occ in occurrences:
+            entity = self._apply_occurrence(
+                occ['entity_name'], occ['turn_id'],
+                occ.get('entity_type', 'UNKNOWN'), occ.get('aliases'), occ.get('confidence', 0.5)
+            )
+            touched[entity.id] = entity
+        if not touched:
+            return
+        self._mark_dirty()
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            with open(self._wal_file, 'a', encoding='utf-8') as f:
+                for entity in touched.values():
+                    f.write(json.dumps(asdict(entity), ensure_ascii=False) + '\n')
+            self._wal_count += len(touched)
+        except Exception:
+            pass  # WAL 写入失败不影响内存索引
+        self._save()
+
+    def _apply_occurrence(self, entity_name: str, turn_id: str, entity_type: str = "UNKNOWN",
+                          aliases: List[str] = None, confidence: float = 0.5) -> IndexedEntity:
+        """在内存中记录一次实体出现（不写 WAL），返回被更新/创建的实体"""
         # 查找或创建实体
         existing = self.get_by_name(entity_name)
-        
+
         if existing:
             # 更新已有实体
             if turn_id not in existing.turn_references:
@@ -239,22 +281,19 @@ class EntityIndex:
             # 更新置信度（取较高值）
             if confidence > existing.confidence:
                 existing.confidence = confidence
-            self._mark_dirty()
-            self._append_wal(existing)
-            self._save()  # 检查是否需要 compact
-        else:
-            # 创建新实体
-            import uuid
-            entity = IndexedEntity(
-                id=f"ent_{uuid.uuid4().hex[:8]}",
-                name=entity_name,
-                aliases=aliases or [],
-                entity_type=entity_type,
-                turn_references=[turn_id],
-                confidence=confidence
-            )
-            self.add(entity)
-    
+            return existing
+
+        # 创建新实体
+        import uuid
+        return self._merge(IndexedEntity(
+            id=f"ent_{uuid.uuid4().hex[:8]}",
+            name=entity_name,
+            aliases=aliases or [],
+            entity_type=entity_type,
+            turn_references=[turn_id],
+            confidence=confidence
+        ))
+
     def get_related_turns(self, entity_name: str) -> List[IndexedEntity]:
         """获取实体相关的轮次
         
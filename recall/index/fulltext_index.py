@@ -5,6 +5,8 @@
 2. 支持中英文混合文本
 3. 与现有 InvertedIndex 互补（InvertedIndex 是精确匹配，这是相关性排序）
 4. 增量更新，无需重建整个索引
+5. v7.1: 段式存储 — 不可变的 mmap 二进制段 + 小的可变缓冲区（追加日志持久化），
+   段在后台按大小分层合并（格式见 fulltext_segment.py）
 """
 
 from __future__ import annotations
@@ -13,9 +15,16 @@ import os
 import json
 import math
 import re
+import bisect
+import heapq
+import threading
+from array import array
 from dataclasses import dataclass, field
-from typing import Dict, List, Set, Optional, Tuple, Any
+from typing import Collection, Dict, FrozenSet, List, Set, Optional, Tuple, Any
 from collections import defaultdict, Counter
+from operator import itemgetter
+
+from .fulltext_segment import FulltextSegment, write_segment, merge_segments
 
 
 # Windows GBK 编码兼容的安全打印函数
@@ -46,6 +55,32 @@ class BM25Config:
     delta: float = 0.0  # BM25+ 的 delta 参数（0 表示经典 BM25）
 
 
+@dataclass
+class _QueryTerm:
+    """查询词的打分参数：score(tf, dl) = scale * tf / (tf + norm_base + norm_length * dl) + bonus"""
+    term: str
+    scale: float            # 查询词频 * idf * (k1 + 1)
+    norm_base: float        # k1 * (1 - b)
+    norm_length: float      # k1 * b / avgdl
+    bonus: float            # 查询词频 * delta（BM25+）
+    ranges: List[Tuple[FulltextSegment, int, int]]
+    buffered: Dict[str, Tuple[int, int]]     # 缓冲区命中: doc_id -> (tf, 文档长度)
+    upper_bound: float = 0.0
+
+    def score(self, tf: int, doc_length: int) -> float:
+        return self.scale * tf / (tf + self.norm_base + self.norm_length * doc_length) + self.bonus
+
+
+@dataclass
+class _QueryPlan:
+    """一次查询的快照：段列表（查询结束前持有读者引用）、墓碑、分区过滤、查询词"""
+    segments: List[FulltextSegment]
+    tombstones: Dict[int, FrozenSet[int]]
+    allowed_ids: Optional[Collection[str]]
+    allowed_locals: Optional[Dict[int, List[int]]]
+    terms: List[_QueryTerm]
+
+
 class FullTextIndex:
     """全文索引 - BM25 实现
     
@@ -54,6 +89,13 @@ class FullTextIndex:
     2. 增量更新
     3. 可配置的 BM25 参数
     4. 支持字段权重（可选）
+    5. v7.1: 段式存储，启动时 mmap 段文件，不再 json.load 整个索引
+    6. v7.1: Top-k 查询用 MaxScore 动态剪枝（段内存每个词项的最大词频/最短文档长度作为得分上界）
+    
+    存储结构（indexes/ 目录下）：
+        fulltext_manifest.json   段列表、墓碑、BM25 参数
+        fulltext/seg_*.bm25      不可变段（数组化倒排 + 词典 + 文档长度）
+        fulltext_buffer.log      缓冲区追加日志（未封段的新增/删除，启动时回放）
     
     使用方式：
         index = FullTextIndex(data_path)
@@ -61,6 +103,9 @@ class FullTextIndex:
         results = index.search('测试', top_k=10)
     """
     
+    BUFFER_MAX_DOCS = 1000     # 缓冲区文档数达到该值时封成一个段
+    MERGE_FACTOR = 8           # 同一大小层的段数达到该值时后台合并
+    
     def __init__(
         self,
         data_path: str,
@@ -74,33 +119,43 @@ class FullTextIndex:
         """
         self.data_path = data_path
         self.index_dir = os.path.join(data_path, 'indexes')
-        self.index_file = os.path.join(self.index_dir, 'fulltext_index.json')
+        self.segment_dir = os.path.join(self.index_dir, 'fulltext')
+        self.manifest_file = os.path.join(self.index_dir, 'fulltext_manifest.json')
+        self.buffer_log_file = os.path.join(self.index_dir, 'fulltext_buffer.log')
+        # v7.1 之前的单文件 JSON 格式（首次加载时迁移）
+        self.legacy_index_file = os.path.join(self.index_dir, 'fulltext_index.json')
         
         self.config = config or BM25Config()
         
-        # 核心数据结构
+        # 全局统计
         self.doc_count = 0                                    # 文档总数
         self.avg_doc_length = 0.0                            # 平均文档长度
         self.total_doc_length = 0                            # 总文档长度
         
-        # 倒排索引: term -> {doc_id -> term_frequency}
-        self.inverted_index: Dict[str, Dict[str, int]] = defaultdict(dict)
-        
-        # 文档信息: doc_id -> {length, terms}
-        self.doc_info: Dict[str, Dict[str, Any]] = {}
+        # 不可变段 + 段内文档定位: doc_id -> segment_id << 32 | 段内文档号
+        self._segments: List[FulltextSegment] = []
+        self._next_segment_id = 1
+        self._doc_keys: Dict[str, int] = {}
         
-        # 文档频率: term -> 包含该词的文档数
-        self.doc_freq: Dict[str, int] = defaultdict(int)
+        # 可变缓冲区: term -> {doc_id -> tf}，doc_id -> (length, {term -> tf})
+        self._buffer_postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._buffer_docs: Dict[str, Tuple[int, Dict[str, int]]] = {}
         
         # 停用词
         self.stopwords: Set[str] = self._default_stopwords()
         
-        # 脏标记
+        # 脏标记（缓冲区或墓碑尚未写入段/manifest）
         self._dirty = False
         
-        # v7.0.8: 添加自动保存计数器 + atexit 兜底
+        # v7.0.8: 自动保存计数器 + atexit 兜底（v7.1: 每 50 次操作 fsync 一次缓冲日志）
         self._add_count = 0
-        self._auto_save_interval = 50  # 每 50 次 add 自动保存
+        self._auto_save_interval = 50
+        
+        self._lock = threading.RLock()
+        self._log = None
+        self._merge_thread: Optional[threading.Thread] = None
+        # 加载失败时的异常：此后不封段、不改写 manifest（见 _save）
+        self._load_error: Optional[Exception] = None
         
         # 加载
         self._load()
@@ -137,67 +192,295 @@ class FullTextIndex:
             'before', 'after', 'above', 'below', 'up', 'down', 'out', 'off', 'over',
         }
     
+    # =========================================================================
+    # 持久化：manifest + 段 + 缓冲日志
+    # =========================================================================
+    
+    def _segment_path(self, segment_id: int) -> str:
+        return os.path.join(self.segment_dir, f'seg_{segment_id:08d}.bm25')
+    
     def _load(self):
-        """加载索引"""
-        if not os.path.exists(self.index_file):
-            return
-        
+        """加载索引：打开（mmap）manifest 中的段，回放缓冲日志"""
         try:
-            with open(self.index_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if not os.path.exists(self.manifest_file) and os.path.exists(self.legacy_index_file):
+                self._migrate_legacy_json()
             
-            self.doc_count = data.get('doc_count', 0)
-            self.avg_doc_length = data.get('avg_doc_length', 0.0)
-            self.total_doc_length = data.get('total_doc_length', 0)
-            self.inverted_index = defaultdict(dict, data.get('inverted_index', {}))
-            self.doc_info = data.get('doc_info', {})
-            self.doc_freq = defaultdict(int, data.get('doc_freq', {}))
-            
-            # 恢复配置
-            if 'config' in data:
-                cfg = data['config']
-                self.config = BM25Config(
-                    k1=cfg.get('k1', 1.5),
-                    b=cfg.get('b', 0.75),
-                    delta=cfg.get('delta', 0.0)
-                )
+            if os.path.exists(self.manifest_file):
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                self._next_segment_id = manifest.get('next_segment_id', 1)
+                cfg = manifest.get('config')
+                if cfg:
+                    self.config = BM25Config(
+                        k1=cfg.get('k1', 1.5),
+                        b=cfg.get('b', 0.75),
+                        delta=cfg.get('delta', 0.0)
+                    )
+                for entry in manifest.get('segments', []):
+                    seg = FulltextSegment(
+                        self._segment_path(entry['id']), entry['id'], set(entry.get('deleted', []))
+                    )
+                    self._install_segment(seg)
+                self._remove_stray_segments()
             
+            self._replay_buffer_log()
         except Exception as e:
+            # 不能当作空索引继续：下一次保存会写出不含已有段的 manifest，整个全文索引被静默丢弃
+            self._load_error = e
             _safe_print(f"[FullTextIndex] 加载索引失败: {e}")
+            _safe_print(f"[FullTextIndex] 不会改写 {self.manifest_file}；新的写入只追加到缓冲日志，"
+                        f"修复 manifest 后重启即可回放")
     
-    def _save(self):
-        """保存索引"""
-        if not self._dirty:
+    def _install_segment(self, seg: FulltextSegment) -> None:
+        """登记一个段：文档定位 + 全局统计"""
+        base = seg.segment_id << 32
+        deleted = seg.deleted
+        for local, doc_id in enumerate(seg.doc_ids):
+            if local not in deleted:
+                self._doc_keys[doc_id] = base | local
+        self._segments.append(seg)
+        self.doc_count += seg.live_docs
+        self.total_doc_length += seg.live_length
+        self._update_avg()
+    
+    def _remove_stray_segments(self) -> None:
+        """删除不在 manifest 中的段文件（合并/封段中途退出的残留）"""
+        if not os.path.isdir(self.segment_dir):
             return
+        live = {os.path.basename(seg.path) for seg in self._segments}
+        for name in os.listdir(self.segment_dir):
+            if name not in live:
+                try:
+                    os.remove(os.path.join(self.segment_dir, name))
+                except OSError:
+                    pass
+    
+    def _migrate_legacy_json(self) -> None:
+        """把 v7.1 之前的 fulltext_index.json 转成一个段"""
+        with open(self.legacy_index_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if 'config' in data:
+            cfg = data['config']
+            self.config = BM25Config(k1=cfg.get('k1', 1.5), b=cfg.get('b', 0.75), delta=cfg.get('delta', 0.0))
         
-        os.makedirs(self.index_dir, exist_ok=True)
+        doc_info = data.get('doc_info', {})
+        doc_ids = list(doc_info)
+        local_of = {doc_id: local for local, doc_id in enumerate(doc_ids)}
+        postings = {}
+        for term, docs in data.get('inverted_index', {}).items():
+            pairs = sorted((local_of[d], tf) for d, tf in docs.items() if d in local_of)
+            if pairs:
+                postings[term] = (array('I', (p[0] for p in pairs)), array('I', (p[1] for p in pairs)))
         
-        data = {
-            'version': '4.0',
-            'doc_count': self.doc_count,
-            'avg_doc_length': self.avg_doc_length,
-            'total_doc_length': self.total_doc_length,
-            'inverted_index': dict(self.inverted_index),
-            'doc_info': self.doc_info,
-            'doc_freq': dict(self.doc_freq),
+        segments = []
+        if doc_ids:
+            os.makedirs(self.segment_dir, exist_ok=True)
+            segment_id = self._next_segment_id
+            write_segment(self._segment_path(segment_id), doc_ids,
+                          [doc_info[d]['length'] for d in doc_ids], postings)
+            segments.append({'id': segment_id, 'deleted': []})
+            self._next_segment_id += 1
+        self._write_manifest(segments)
+        os.remove(self.legacy_index_file)
+        _safe_print(f"[FullTextIndex] 已迁移旧版 JSON 索引: {len(doc_ids)} 篇文档")
+    
+    def _write_manifest(self, segments: Optional[List[Dict[str, Any]]] = None) -> None:
+        from recall.utils.atomic_write import atomic_json_dump
+        if segments is None:
+            segments = [
+                {'id': seg.segment_id, 'deleted': sorted(seg.deleted)}
+                for seg in self._segments
+            ]
+        os.makedirs(self.index_dir, exist_ok=True)
+        atomic_json_dump({
+            'version': '7.1',
+            'next_segment_id': self._next_segment_id,
+            'segments': segments,
             'config': {
                 'k1': self.config.k1,
                 'b': self.config.b,
                 'delta': self.config.delta
             }
-        }
+        }, self.manifest_file)
+    
+    def _replay_buffer_log(self) -> None:
+        """回放缓冲日志（每行一个 JSON 操作，末尾残行忽略）"""
+        if not os.path.exists(self.buffer_log_file):
+            return
+        replayed = 0
+        with open(self.buffer_log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    break
+                if 'a' in op:
+                    self._remove_locked(op['a'])
+                    self._add_locked(op['a'], op['l'], op['t'])
+                else:
+                    self._remove_locked(op['d'])
+                replayed += 1
+        self._dirty = replayed > 0
+    
+    def _append_log(self, op: Dict[str, Any]) -> None:
+        """追加一条缓冲日志（flush 到 OS，每 _auto_save_interval 次 fsync）"""
+        if self._log is None:
+            os.makedirs(self.index_dir, exist_ok=True)
+            self._log = open(self.buffer_log_file, 'a', encoding='utf-8')
+        self._log.write(json.dumps(op, ensure_ascii=False) + '\n')
+        self._log.flush()
+        self._add_count += 1
+        if self._add_count % self._auto_save_interval == 0:
+            os.fsync(self._log.fileno())
+    
+    def _truncate_log(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if os.path.exists(self.buffer_log_file):
+            os.remove(self.buffer_log_file)
+    
+    def _save(self):
+        """保存索引：把缓冲区封成一个段，写 manifest，清空缓冲日志"""
+        with self._lock:
+            if not self._dirty or self._load_error is not None:
+                return
+            self._seal_buffer()
+            self._write_manifest()
+            self._truncate_log()
+            self._dirty = False
+        self._maybe_merge()
+    
+    def _seal_buffer(self) -> None:
+        """缓冲区 -> 新的不可变段（调用方持有锁）"""
+        if not self._buffer_docs:
+            return
+        doc_ids = list(self._buffer_docs)
+        local_of = {doc_id: local for local, doc_id in enumerate(doc_ids)}
+        postings = {}
+        for term, docs in self._buffer_postings.items():
+            pairs = sorted((local_of[d], tf) for d, tf in docs.items())
+            postings[term] = (array('I', (p[0] for p in pairs)), array('I', (p[1] for p in pairs)))
         
-        # v7.0.8: 原子写入 — 先写临时文件再重命名，防止断电损坏
-        tmp_file = self.index_file + '.tmp'
-        with open(tmp_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False)
-            f.flush()
-            os.fsync(f.fileno())
+        os.makedirs(self.segment_dir, exist_ok=True)
+        segment_id = self._next_segment_id
+        self._next_segment_id += 1
+        write_segment(self._segment_path(segment_id), doc_ids,
+                      [self._buffer_docs[d][0] for d in doc_ids], postings)
+        seg = FulltextSegment(self._segment_path(segment_id), segment_id)
         
-        # 原子替换（Windows 上 os.replace 是原子的对于同一卷）
-        os.replace(tmp_file, self.index_file)
+        # 缓冲区文档转入段（统计不变，先扣除再由 _install_segment 加回）
+        self.doc_count -= seg.n_docs
+        self.total_doc_length -= seg.total_length
+        self._buffer_docs.clear()
+        self._buffer_postings.clear()
+        self._install_segment(seg)
+    
+    # =========================================================================
+    # 后台合并
+    # =========================================================================
+    
+    def _pick_merge(self) -> List[FulltextSegment]:
+        """选出待合并的段：同一大小层（以 MERGE_FACTOR 为底的对数）凑满 MERGE_FACTOR 个，
+        或墓碑超过一半的段单独压缩"""
+        tiers: Dict[int, List[FulltextSegment]] = defaultdict(list)
+        for seg in self._segments:
+            tiers[int(math.log(max(seg.live_docs, 1), self.MERGE_FACTOR))].append(seg)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= self.MERGE_FACTOR:
+                return tiers[tier][:self.MERGE_FACTOR]
+        for seg in self._segments:
+            if len(seg.deleted) * 2 > seg.n_docs:
+                return [seg]
+        return []
+    
+    def _maybe_merge(self) -> None:
+        """需要时启动后台合并线程（同一时间只有一个合并）"""
+        with self._lock:
+            if self._merge_thread is not None and self._merge_thread.is_alive():
+                return
+            if self._load_error is not None:
+                return
+            candidates = self._pick_merge()
+            if not candidates:
+                return
+            deleted = {seg.segment_id: set(seg.deleted) for seg in candidates}
+            for seg in candidates:
+                seg.acquire()  # 合并期间 clear() / close() 不会关闭这些段
+            segment_id = self._next_segment_id
+            self._next_segment_id += 1
+            self._merge_thread = threading.Thread(
+                target=self._merge, args=(candidates, deleted, segment_id),
+                name='fulltext-merge', daemon=True
+            )
+            self._merge_thread.start()
+    
+    def _merge(self, candidates: List[FulltextSegment], deleted: Dict[int, Set[int]], segment_id: int) -> None:
+        """合并若干段（在后台线程中运行；写新段时不持锁，替换时持锁）"""
+        path = self._segment_path(segment_id)
+        try:
+            doc_ids, remaps = merge_segments(path, candidates, deleted)
+            merged = FulltextSegment(path, segment_id)
+            merged._doc_ids = doc_ids
+        except Exception as e:
+            _safe_print(f"[FullTextIndex] 段合并失败: {e}")
+            for seg in candidates:
+                seg.release()
+            with self._lock:
+                self._merge_thread = None  # 否则 wait_for_merges() 会一直等待
+            return
         
-        self._dirty = False
+        with self._lock:
+            live = {seg.segment_id for seg in self._segments}
+            cleared = any(seg.segment_id not in live for seg in candidates)  # 合并期间被 clear()
+            discard = cleared or not merged.live_docs  # 在锁内判断：发布后的段可能被并发删除清空
+            if not cleared:
+                base = segment_id << 32
+                for seg in candidates:
+                    remap = remaps[seg.segment_id]
+                    old_base = seg.segment_id << 32
+                    # 合并期间新增的删除映射到新段
+                    for local in seg.deleted - deleted[seg.segment_id]:
+                        if remap[local] >= 0:
+                            merged.mark_deleted(remap[local])
+                    for local, new_local in enumerate(remap):
+                        if new_local >= 0 and self._doc_keys.get(doc_ids[new_local]) == old_base | local:
+                            self._doc_keys[doc_ids[new_local]] = base | new_local
+                
+                retired = {seg.segment_id for seg in candidates}
+                self._segments = [seg for seg in self._segments if seg.segment_id not in retired]
+                if not discard:
+                    self._segments.append(merged)
+                self._write_manifest()
+                for seg in candidates:
+                    seg.retire()  # 进行中的查询仍持有读者引用，最后一个读者释放时关闭 mmap
+        
+        for seg in candidates:
+            seg.release()
+        if not cleared:
+            # 旧段文件不再被 manifest 引用
+            for seg in candidates:
+                try:
+                    os.remove(seg.path)
+                except OSError:
+                    pass  # Windows 上仍被映射时删除失败，下次启动清理
+        if discard:
+            merged.close()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._merge_thread = None
+        self._maybe_merge()
+    
+    def wait_for_merges(self) -> None:
+        """等待后台合并（含级联合并）全部完成（测试/关闭时使用）"""
+        while True:
+            thread = self._merge_thread
+            if thread is None or thread is threading.current_thread():
+                return
+            thread.join()
     
     def tokenize(self, text: str) -> List[str]:
         """分词
@@ -239,51 +522,79 @@ class FullTextIndex:
             doc_id: 文档ID
             text: 文档文本
         """
-        # 如果已存在，先移除
-        if doc_id in self.doc_info:
-            self.remove(doc_id)
-        
         # 分词
         tokens = self.tokenize(text)
         if not tokens:
+            # 如果已存在，先移除
+            self.remove(doc_id)
             return
         
         # 词频统计
-        term_freq = Counter(tokens)
+        term_freq = dict(Counter(tokens))
         doc_length = len(tokens)
         
-        # 更新倒排索引
+        with self._lock:
+            # 如果已存在，先移除（日志中的 add 记录回放时同样先移除）
+            self._remove_locked(doc_id)
+            self._add_locked(doc_id, doc_length, term_freq)
+            self._append_log({'a': doc_id, 'l': doc_length, 't': term_freq})
+            self._dirty = True
+            sealed = len(self._buffer_docs) >= self.BUFFER_MAX_DOCS
+        
+        # v7.1: 缓冲区满时封段（缓冲日志已保证进程崩溃不丢数据）
+        if sealed:
+            self._save()
+
+    def add_batch(self, items: List[Tuple[str, str]]):
+        """批量添加文档（v7.1: 批量导入使用 — 分词在锁外完成，整批一次写日志、一次 fsync）
+
+        Args:
+            items: [(doc_id, text), ...]
+        """
+        prepared = []
+        for doc_id, text in items:
+            tokens = self.tokenize(text)
+            prepared.append((doc_id, len(tokens), dict(Counter(tokens)) if tokens else None))
+        if not prepared:
+            return
+
+        with self._lock:
+            lines = []
+            for doc_id, doc_length, term_freq in prepared:
+                removed = self._remove_locked(doc_id)
+                if term_freq is None:
+                    if removed:
+                        lines.append({'d': doc_id})
+                    continue
+                self._add_locked(doc_id, doc_length, term_freq)
+                lines.append({'a': doc_id, 'l': doc_length, 't': term_freq})
+            if lines:
+                if self._log is None:
+                    os.makedirs(self.index_dir, exist_ok=True)
+                    self._log = open(self.buffer_log_file, 'a', encoding='utf-8')
+                self._log.write(''.join(json.dumps(op, ensure_ascii=False) + '\n' for op in lines))
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._add_count += len(lines)
+                self._dirty = True
+            sealed = len(self._buffer_docs) >= self.BUFFER_MAX_DOCS
+
+        if sealed:
+            self._save()
+
+    def _add_locked(self, doc_id: str, doc_length: int, term_freq: Dict[str, int]) -> None:
+        """写入缓冲区（调用方持有锁，且 doc_id 不存在）"""
         for term, freq in term_freq.items():
-            self.inverted_index[term][doc_id] = freq
-            
-            # 更新文档频率（只在新词时增加）
-            if len(self.inverted_index[term]) == 1 or doc_id not in self.inverted_index[term]:
-                pass  # 已在上面添加
-            # 首次添加该词到该文档
-            if doc_id not in self.doc_info or term not in self.doc_info.get(doc_id, {}).get('terms', []):
-                self.doc_freq[term] += 1
-        
-        # 修正：直接设置文档频率
-        for term in term_freq:
-            self.doc_freq[term] = len(self.inverted_index[term])
-        
-        # 保存文档信息
-        self.doc_info[doc_id] = {
-            'length': doc_length,
-            'terms': list(term_freq.keys())
-        }
+            self._buffer_postings[term][doc_id] = freq
+        self._buffer_docs[doc_id] = (doc_length, term_freq)
         
         # 更新统计
         self.doc_count += 1
         self.total_doc_length += doc_length
+        self._update_avg()
+    
+    def _update_avg(self) -> None:
         self.avg_doc_length = self.total_doc_length / self.doc_count if self.doc_count > 0 else 0
-        
-        self._dirty = True
-        
-        # v7.0.8: 定期自动保存，防止进程异常退出时数据丢失
-        self._add_count += 1
-        if self._add_count % self._auto_save_interval == 0:
-            self._save()
     
     def remove(self, doc_id: str) -> bool:
         """移除文档
@@ -294,35 +605,45 @@ class FullTextIndex:
         Returns:
             是否成功移除
         """
-        if doc_id not in self.doc_info:
-            return False
-        
-        info = self.doc_info[doc_id]
-        
-        # 从倒排索引移除
-        for term in info['terms']:
-            if term in self.inverted_index and doc_id in self.inverted_index[term]:
-                del self.inverted_index[term][doc_id]
-                
-                # 更新文档频率
-                self.doc_freq[term] = len(self.inverted_index[term])
-                
-                # 如果该词不再有文档，移除
-                if not self.inverted_index[term]:
-                    del self.inverted_index[term]
-                    del self.doc_freq[term]
+        with self._lock:
+            if not self._remove_locked(doc_id):
+                return False
+            self._append_log({'d': doc_id})
+            self._dirty = True
+            return True
+    
+    def _remove_locked(self, doc_id: str) -> bool:
+        """从缓冲区删除，或在所在段上打墓碑（调用方持有锁）"""
+        buffered = self._buffer_docs.pop(doc_id, None)
+        if buffered is not None:
+            doc_length, term_freq = buffered
+            for term in term_freq:
+                postings = self._buffer_postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._buffer_postings[term]
+        else:
+            key = self._doc_keys.pop(doc_id, None)
+            if key is None:
+                return False
+            seg = self._segment_by_id(key >> 32)
+            local = key & 0xFFFFFFFF
+            seg.mark_deleted(local)
+            doc_length = seg.doc_lengths[local]
         
         # 更新统计
         self.doc_count -= 1
-        self.total_doc_length -= info['length']
-        self.avg_doc_length = self.total_doc_length / self.doc_count if self.doc_count > 0 else 0
-        
-        # 移除文档信息
-        del self.doc_info[doc_id]
-        
-        self._dirty = True
+        self.total_doc_length -= doc_length
+        self._update_avg()
         return True
     
+    def _segment_by_id(self, segment_id: int) -> FulltextSegment:
+        for seg in self._segments:
+            if seg.segment_id == segment_id:
+                return seg
+        raise KeyError(segment_id)
+    
     def remove_by_doc_ids(self, doc_ids: Set[str]) -> int:
         """批量移除文档
         
@@ -338,71 +659,283 @@ class FullTextIndex:
                 removed_count += 1
         return removed_count
     
+    @staticmethod
+    def _live_postings(seg: FulltextSegment, deleted: FrozenSet[int], start: int, end: int) -> int:
+        """段内某词项未被删除的倒排数（墓碑少时二分查找，多时顺序扫描）"""
+        if not deleted:
+            return end - start
+        docs = seg.posting_docs
+        if len(deleted) < end - start:
+            hits = 0
+            for local in deleted:
+                i = bisect.bisect_left(docs, local, start, end)
+                if i < end and docs[i] == local:
+                    hits += 1
+            return end - start - hits
+        return sum(1 for i in range(start, end) if docs[i] not in deleted)
+    
     def search(
         self,
         query: str,
         top_k: int = 10,
-        min_score: float = 0.0
+        min_score: float = 0.0,
+        allowed_ids: Optional[Collection[str]] = None
     ) -> List[Tuple[str, float]]:
         """搜索文档
         
+        v7.1: MaxScore 动态剪枝 — 词项按得分上界从高到低处理，前 k 名的门槛超过剩余词项上界之和后
+        不再接纳新候选，剩余（通常是倒排很长的高频词/中文 2-gram）只在已有候选上二分查找补分，
+        并随时淘汰不可能进入前 k 的候选；最后用堆取前 k。结果与 search_exhaustive() 相同
+        
         Args:
             query: 查询文本
             top_k: 返回数量
             min_score: 最小分数阈值
+            allowed_ids: 只在这些文档中打分（v7.1: 租户分区过滤）。
+                IDF 仍按全局统计，结果等于不过滤排序后再按分区截取
         
         Returns:
             [(doc_id, score), ...] 按分数降序
         """
-        if self.doc_count == 0:
+        if top_k <= 0:
             return []
+        plan = self._plan_query(query, allowed_ids)
+        if plan is None:
+            return []
+        try:
+            return self._search_plan(plan, top_k, min_score)
+        finally:
+            self._release_plan(plan)
+    
+    def _search_plan(self, plan: _QueryPlan, top_k: int, min_score: float) -> List[Tuple[str, float]]:
+        """MaxScore 剪枝打分（search() 的主体）"""
+        terms = sorted(plan.terms, key=lambda t: t.upper_bound, reverse=True)
+        # remaining[i]: 第 i 个及之后词项的上界之和 = 此时尚未出现的文档可能得到的最高分
+        remaining = [0.0] * (len(terms) + 1)
+        for i in range(len(terms) - 1, -1, -1):
+            remaining[i] = remaining[i + 1] + terms[i].upper_bound
         
-        # 分词
-        query_terms = self.tokenize(query)
-        if not query_terms:
+        scores: Dict[Any, float] = {}
+        threshold = min_score
+        
+        # 必要词阶段：全量遍历倒排
+        essential = 0
+        while essential < len(terms) and remaining[essential] >= threshold:
+            self._accumulate(plan, terms[essential], scores)
+            essential += 1
+            if essential < len(terms) and len(scores) >= top_k:
+                threshold = max(min_score, heapq.nlargest(top_k, scores.values())[-1])
+        
+        # 非必要词阶段：只给已有候选补分
+        for i in range(essential, len(terms)):
+            floor = threshold - remaining[i] - 1e-9
+            scores = {key: score for key, score in scores.items() if score >= floor}
+            if not scores:
+                break
+            self._probe(plan, terms[i], scores)
+            if len(scores) >= top_k:
+                threshold = max(threshold, heapq.nlargest(top_k, scores.values())[-1])
+        
+        return self._top_results(plan, scores, top_k, min_score)
+    
+    def search_exhaustive(
+        self,
+        query: str,
+        top_k: int = 10,
+        min_score: float = 0.0,
+        allowed_ids: Optional[Collection[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """不剪枝的全量打分（每个查询词的全部倒排都计分），用于校验 search() 与基准对比"""
+        if top_k <= 0:
+            return []
+        plan = self._plan_query(query, allowed_ids)
+        if plan is None:
             return []
+        try:
+            scores: Dict[Any, float] = {}
+            for term in plan.terms:
+                self._accumulate(plan, term, scores)
+            return self._top_results(plan, scores, top_k, min_score)
+        finally:
+            self._release_plan(plan)
+    
+    @staticmethod
+    def _release_plan(plan: _QueryPlan) -> None:
+        for seg in plan.segments:
+            seg.release()
+    
+    def _plan_query(
+        self,
+        query: str,
+        allowed_ids: Optional[Collection[str]]
+    ) -> Optional[_QueryPlan]:
+        """分词、快照段与缓冲区、统计每个查询词的 df/IDF 与得分上界
+
+        返回的计划持有各段的读者引用，调用方用完后须调用 _release_plan()。
+        """
+        if self.doc_count == 0:
+            return None
         
-        # 计算每个文档的 BM25 分数
-        scores: Dict[str, float] = defaultdict(float)
+        # 分词（重复出现的词按次数加权）
+        query_terms = Counter(self.tokenize(query))
+        if not query_terms:
+            return None
         
-        for term in query_terms:
-            if term not in self.inverted_index:
-                continue
-            
-            # IDF
-            df = self.doc_freq.get(term, 0)
-            if df == 0:
-                continue
-            
-            idf = math.log((self.doc_count - df + 0.5) / (df + 0.5) + 1)
-            
-            # 遍历包含该词的文档
-            for doc_id, tf in self.inverted_index[term].items():
-                doc_length = self.doc_info[doc_id]['length']
+        # v7.1: 持锁只做快照（段列表 + 墓碑 + 缓冲区中命中的倒排），段上的打分不持锁；
+        # 写入在锁内修改墓碑、clear()/close() 在锁内关闭段，因此段要持有引用、墓碑要取不可变快照
+        with self._lock:
+            segments = list(self._segments)
+            for seg in segments:
+                seg.acquire()
+            tombstones = {seg.segment_id: seg.tombstones() for seg in segments}
+            doc_count = self.doc_count
+            avg_doc_length = self.avg_doc_length
+            buffer_hits = {
+                term: {d: (tf, self._buffer_docs[d][0]) for d, tf in self._buffer_postings[term].items()}
+                for term in query_terms if term in self._buffer_postings
+            }
+            allowed_locals: Optional[Dict[int, List[int]]] = None
+            if allowed_ids is not None:
+                allowed_locals = defaultdict(list)
+                for doc_id in allowed_ids:
+                    key = self._doc_keys.get(doc_id)
+                    if key is not None:
+                        allowed_locals[key >> 32].append(key & 0xFFFFFFFF)
+                for locals_ in allowed_locals.values():
+                    locals_.sort()
+        
+        k1 = self.config.k1
+        b = self.config.b
+        delta = self.config.delta
+        # BM25: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))，BM25+ 再加 delta
+        norm_base = k1 * (1 - b)
+        norm_length = k1 * b / avg_doc_length if avg_doc_length else 0.0
+        
+        try:
+            terms = []
+            for term, weight in query_terms.items():
+                buffered = buffer_hits.get(term, {})
+                ranges = []
+                df = len(buffered)
+                impacts = [(tf, doc_length) for tf, doc_length in buffered.values()]
+                for seg in segments:
+                    span = seg.postings(term)
+                    if span is not None:
+                        ranges.append((seg, span[0], span[1]))
+                        df += self._live_postings(seg, tombstones[seg.segment_id], span[0], span[1])
+                        impacts.append(seg.impact(term))
+                if df == 0:
+                    continue
                 
-                # BM25 公式
-                numerator = tf * (self.config.k1 + 1)
-                denominator = tf + self.config.k1 * (
-                    1 - self.config.b + self.config.b * doc_length / self.avg_doc_length
+                # IDF
+                idf = math.log((doc_count - df + 0.5) / (df + 0.5) + 1)
+                qt = _QueryTerm(
+                    term=term,
+                    scale=weight * idf * (k1 + 1),
+                    norm_base=norm_base,
+                    norm_length=norm_length,
+                    bonus=weight * delta,
+                    ranges=ranges,
+                    buffered=buffered,
                 )
-                
-                score = idf * numerator / denominator
-                
-                # BM25+ 修正
-                if self.config.delta > 0:
-                    score += self.config.delta
-                
-                scores[doc_id] += score
+                # 得分随词频单调增、随文档长度单调减：(最大词频, 最短长度) 给出上界
+                qt.upper_bound = max(qt.score(tf, doc_length) for tf, doc_length in impacts)
+                terms.append(qt)
+        except BaseException:
+            for seg in segments:
+                seg.release()
+            raise
         
-        # 排序并过滤
-        results = [
-            (doc_id, score) 
-            for doc_id, score in scores.items() 
-            if score >= min_score
-        ]
-        results.sort(key=lambda x: x[1], reverse=True)
+        return _QueryPlan(segments, tombstones, allowed_ids, allowed_locals, terms)
+    
+    def _accumulate(self, plan: _QueryPlan, term: _QueryTerm, scores: Dict[Any, float]) -> None:
+        """遍历词项的全部倒排，累加到 scores（段内文档以整数键 segment_id << 32 | 段内文档号 记分）"""
+        scale, norm_base, norm_length, bonus = term.scale, term.norm_base, term.norm_length, term.bonus
+        allowed_ids = plan.allowed_ids
+        get = scores.get
+        
+        for doc_id, (tf, doc_length) in term.buffered.items():
+            if allowed_ids is None or doc_id in allowed_ids:
+                scores[doc_id] = get(doc_id, 0.0) + scale * tf / (tf + norm_base + norm_length * doc_length) + bonus
+        
+        for seg, start, end in term.ranges:
+            base = seg.segment_id << 32
+            docs, tfs, lengths = seg.posting_docs, seg.posting_tfs, seg.doc_lengths
+            deleted = plan.tombstones[seg.segment_id]
+            if plan.allowed_locals is None:
+                positions = range(start, end)
+            else:
+                # 有分区时遍历较小的一侧（分区内文档二分查找倒排）
+                wanted = plan.allowed_locals.get(seg.segment_id, ())
+                if len(wanted) < end - start:
+                    positions = []
+                    for local in wanted:
+                        i = bisect.bisect_left(docs, local, start, end)
+                        if i < end and docs[i] == local:
+                            positions.append(i)
+                else:
+                    wanted = set(wanted)
+                    positions = [i for i in range(start, end) if docs[i] in wanted]
+            for i in positions:
+                local = docs[i]
+                if deleted and local in deleted:
+                    continue
+                tf = tfs[i]
+                key = base | local
+                scores[key] = get(key, 0.0) + scale * tf / (tf + norm_base + norm_length * lengths[local]) + bonus
+    
+    def _probe(self, plan: _QueryPlan, term: _QueryTerm, scores: Dict[Any, float]) -> None:
+        """只为 scores 中已有的候选累加该词项得分（候选少时二分查找倒排，多时顺序扫描）"""
+        scale, norm_base, norm_length, bonus = term.scale, term.norm_base, term.norm_length, term.bonus
+        
+        by_segment: Dict[int, List[int]] = defaultdict(list)
+        for key in scores:
+            if isinstance(key, int):
+                by_segment[key >> 32].append(key & 0xFFFFFFFF)
+            elif key in term.buffered:
+                tf, doc_length = term.buffered[key]
+                scores[key] += scale * tf / (tf + norm_base + norm_length * doc_length) + bonus
         
-        return results[:top_k]
+        for seg, start, end in term.ranges:
+            wanted = by_segment.get(seg.segment_id)
+            if not wanted:
+                continue
+            base = seg.segment_id << 32
+            docs, tfs, lengths = seg.posting_docs, seg.posting_tfs, seg.doc_lengths
+            if len(wanted) * 16 < end - start:
+                positions = []
+                for local in sorted(wanted):
+                    i = bisect.bisect_left(docs, local, start, end)
+                    if i < end and docs[i] == local:
+                        positions.append(i)
+                    start = i
+            else:
+                wanted = set(wanted)
+                positions = [i for i in range(start, end) if docs[i] in wanted]
+            # 候选都来自必要词阶段，不含墓碑文档
+            for i in positions:
+                local = docs[i]
+                tf = tfs[i]
+                scores[base | local] += scale * tf / (tf + norm_base + norm_length * lengths[local]) + bonus
+    
+    @staticmethod
+    def _top_results(
+        plan: _QueryPlan,
+        scores: Dict[Any, float],
+        top_k: int,
+        min_score: float
+    ) -> List[Tuple[str, float]]:
+        """过滤 min_score，堆取前 top_k，段内整数键还原为文档 ID"""
+        results = heapq.nlargest(
+            top_k,
+            ((key, score) for key, score in scores.items() if score >= min_score),
+            key=itemgetter(1)
+        )
+        by_id = {seg.segment_id: seg for seg in plan.segments}
+        return [
+            (by_id[key >> 32].doc_ids[key & 0xFFFFFFFF] if isinstance(key, int) else key, score)
+            for key, score in results
+        ]
     
     def search_with_weights(
         self,
@@ -425,42 +958,109 @@ class FullTextIndex:
         return self.search(query, top_k)
     
     def flush(self):
-        """强制保存"""
-        self._dirty = True
+        """强制落盘（v7.1: fsync 缓冲日志即可保证持久；封段在缓冲区满或 close() 时进行，
+        避免频繁 flush 产生大量小段）"""
+        with self._lock:
+            if self._log is not None:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+    
+    def close(self):
+        """保存并关闭：等待后台合并，释放段的 mmap（进行中的查询结束后才真正关闭）"""
         self._save()
+        self.wait_for_merges()
+        with self._lock:
+            for seg in self._segments:
+                seg.retire()
+            self._segments = []
+            self._doc_keys.clear()
+            self.doc_count = 0
+            self.total_doc_length = 0
+            self._update_avg()
     
     def count(self) -> int:
         """返回文档总数"""
         return self.doc_count
     
     def get_terms(self, doc_id: str) -> List[str]:
-        """获取文档的词项"""
-        info = self.doc_info.get(doc_id)
-        return info['terms'] if info else []
+        """获取文档的词项（v7.1: 段内文档不再重复存储词表，需扫描词典，仅供调试）"""
+        with self._lock:
+            buffered = self._buffer_docs.get(doc_id)
+            if buffered is not None:
+                return list(buffered[1])
+            key = self._doc_keys.get(doc_id)
+            if key is None:
+                return []
+            seg = self._segment_by_id(key >> 32)
+            seg.acquire()
+        local = key & 0xFFFFFFFF
+        terms = []
+        try:
+            for term, start, end in seg.iter_terms():
+                i = bisect.bisect_left(seg.posting_docs, local, start, end)
+                if i < end and seg.posting_docs[i] == local:
+                    terms.append(term)
+        finally:
+            seg.release()
+        return terms
     
     def get_doc_length(self, doc_id: str) -> int:
         """获取文档长度"""
-        info = self.doc_info.get(doc_id)
-        return info['length'] if info else 0
+        with self._lock:
+            buffered = self._buffer_docs.get(doc_id)
+            if buffered is not None:
+                return buffered[0]
+            key = self._doc_keys.get(doc_id)
+            if key is None:
+                return 0
+            return self._segment_by_id(key >> 32).doc_lengths[key & 0xFFFFFFFF]
     
     def clear(self):
         """清空索引"""
-        self.doc_count = 0
-        self.avg_doc_length = 0.0
-        self.total_doc_length = 0
-        self.inverted_index.clear()
-        self.doc_info.clear()
-        self.doc_freq.clear()
-        self._dirty = True
-        self._save()
+        self.wait_for_merges()
+        with self._lock:
+            for seg in self._segments:
+                seg.retire()
+                try:
+                    os.remove(seg.path)
+                except OSError:
+                    pass
+            self._segments = []
+            self._doc_keys.clear()
+            self._buffer_docs.clear()
+            self._buffer_postings.clear()
+            self.doc_count = 0
+            self.total_doc_length = 0
+            self._update_avg()
+            self._truncate_log()
+            self._write_manifest()
+            self._dirty = False
+            self._load_error = None  # 显式清空后从空索引重新开始
     
     def get_stats(self) -> Dict[str, Any]:
         """获取索引统计信息"""
+        with self._lock:
+            segments = list(self._segments)
+            for seg in segments:
+                seg.acquire()
+            vocabulary = set(self._buffer_postings)
+            buffer_docs = len(self._buffer_docs)
+        try:
+            for seg in segments:
+                vocabulary.update(seg.terms())
+            segment_bytes = sum(seg.size_bytes() for seg in segments)
+        finally:
+            for seg in segments:
+                seg.release()
         return {
             'doc_count': self.doc_count,
             'avg_doc_length': self.avg_doc_length,
             'total_doc_length': self.total_doc_length,
-            'vocabulary_size': len(self.inverted_index),
+            'vocabulary_size': len(vocabulary),
+            'segments': len(segments),
+            'segment_bytes': segment_bytes,
+            'buffer_docs': buffer_docs,
+            'load_error': str(self._load_error) if self._load_error is not None else None,
             'config': {
                 'k1': self.config.k1,
                 'b': self.config.b,
@@ -0,0 +1,320 @@
+"""全文索引段文件 - BM25 倒排的紧凑二进制格式（v7.1）
+
+一个段是一组文档的不可变倒排索引，写入后只读，删除通过墓碑（deleted）标记，
+合并时才真正丢弃。段文件通过 mmap 打开，倒排数组直接在映射内存上访问，
+启动时不需要把整个索引反序列化进 Python 字典。
+
+文件布局（小端，所有数组 4 字节对齐）：
+
+    header          MAGIC(8) n_docs n_terms total_length(u64) n_postings doc_blob_len term_blob_len
+    doc_lengths     uint32[n_docs]          段内文档号 -> 文档长度
+    term_offsets    uint32[n_terms + 1]     词项号 -> 倒排区间 [start, end)
+    term_max_tfs    uint32[n_terms]         词项号 -> 倒排内最大词频          (v2)
+    term_min_lens   uint32[n_terms]         词项号 -> 倒排内最短文档长度      (v2)
+    posting_docs    uint32[n_postings]      段内文档号（每个词项内升序）
+    posting_tfs     uint32[n_postings]      词频
+    doc_blob        '\\0' 分隔的文档 ID（UTF-8）
+    term_blob       '\\0' 分隔的词项（UTF-8）
+
+term_max_tfs / term_min_lens 是词项的得分上界（impact），供 BM25 动态剪枝（MaxScore）使用；
+v1 段没有这两节，上界在首次访问时按倒排现算。
+"""
+
+from __future__ import annotations
+
+import mmap
+import struct
+import threading
+from array import array
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+from recall.utils.atomic_write import atomic_bytes_dump
+
+
+SEGMENT_MAGIC = b'RBM25SG\x02'
+_SEGMENT_MAGIC_V1 = b'RBM25SG\x01'
+_HEADER = struct.Struct('<8sIIQIII')
+_HEADER_SIZE = (_HEADER.size + 3) // 4 * 4
+
+
+def _pad4(data: bytes) -> bytes:
+    return data + b'\0' * (-len(data) % 4)
+
+
+def _uint32_array(values=()) -> array:
+    arr = array('I', values)
+    if arr.itemsize != 4:  # pragma: no cover - 非常见平台
+        arr = array('L', values)
+    return arr
+
+
+def write_segment(
+    path: str,
+    doc_ids: List[str],
+    doc_lengths: List[int],
+    postings: Dict[str, Tuple[array, array]]
+) -> None:
+    """写出一个段文件（原子写入）
+
+    Args:
+        path: 段文件路径
+        doc_ids: 段内文档号 -> 文档 ID
+        doc_lengths: 段内文档号 -> 文档长度
+        postings: 词项 -> (段内文档号数组, 词频数组)，文档号需升序
+    """
+    terms = sorted(postings)
+    term_offsets = _uint32_array([0])
+    term_max_tfs = _uint32_array()
+    term_min_lens = _uint32_array()
+    posting_docs = _uint32_array()
+    posting_tfs = _uint32_array()
+    for term in terms:
+        docs, tfs = postings[term]
+        posting_docs.extend(docs)
+        posting_tfs.extend(tfs)
+        term_offsets.append(len(posting_docs))
+        term_max_tfs.append(max(tfs, default=0))
+        term_min_lens.append(min((doc_lengths[d] for d in docs), default=0))
+
+    doc_blob = '\0'.join(doc_ids).encode('utf-8')
+    term_blob = '\0'.join(terms).encode('utf-8')
+    header = _HEADER.pack(
+        SEGMENT_MAGIC, len(doc_ids), len(terms), sum(doc_lengths),
+        len(posting_docs), len(doc_blob), len(term_blob)
+    )
+    atomic_bytes_dump(b''.join([
+        header.ljust(_HEADER_SIZE, b'\0'),
+        _uint32_array(doc_lengths).tobytes(),
+        term_offsets.tobytes(),
+        term_max_tfs.tobytes(),
+        term_min_lens.tobytes(),
+        posting_docs.tobytes(),
+        posting_tfs.tobytes(),
+        _pad4(doc_blob),
+        _pad4(term_blob),
+    ]), path)
+
+
+class FulltextSegment:
+    """只读的 mmap 段
+
+    segment_id 在索引内唯一，用于拼接全局文档键 ``segment_id << 32 | 段内文档号``。
+
+    墓碑只通过 mark_deleted() 修改（调用方持有索引锁），查询用 tombstones() 取不可变快照。
+    查询期间用 acquire() / release() 持有段，retire() 在最后一个读者释放后才关闭 mmap。
+    """
+
+    def __init__(self, path: str, segment_id: int, deleted: Optional[Set[int]] = None):
+        self.path = path
+        self.segment_id = segment_id
+        self.deleted: Set[int] = set(deleted or ())
+        self._tombstones: Optional[FrozenSet[int]] = None
+        self._readers = 0
+        self._retired = False
+        self._ref_lock = threading.Lock()
+
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, self.n_docs, self.n_terms, self.total_length, n_postings,
+             doc_blob_len, term_blob_len) = _HEADER.unpack_from(self._mm, 0)
+            if magic not in (SEGMENT_MAGIC, _SEGMENT_MAGIC_V1):
+                raise ValueError(f"段文件格式无效: {path}")
+
+            view = memoryview(self._mm)
+            offset = _HEADER_SIZE
+
+            def _take(count: int) -> memoryview:
+                nonlocal offset
+                section = view[offset:offset + count * 4].cast('I')
+                offset += count * 4
+                return section
+
+            self.doc_lengths = _take(self.n_docs)
+            self._term_offsets = _take(self.n_terms + 1)
+            if magic == SEGMENT_MAGIC:
+                self._term_max_tfs = _take(self.n_terms)
+                self._term_min_lens = _take(self.n_terms)
+            else:
+                self._term_max_tfs = self._term_min_lens = None
+            self.posting_docs = _take(n_postings)
+            self.posting_tfs = _take(n_postings)
+            self._doc_blob = (offset, doc_blob_len)
+            offset += doc_blob_len + (-doc_blob_len % 4)
+            self._term_blob = (offset, term_blob_len)
+        except Exception:
+            self.close()
+            raise
+
+        self._terms: Optional[Dict[str, int]] = None
+        self._doc_ids: Optional[List[str]] = None
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def _decode_blob(self, blob: Tuple[int, int]) -> List[str]:
+        start, length = blob
+        if length == 0:
+            return []
+        return self._mm[start:start + length].decode('utf-8').split('\0')
+
+    @property
+    def doc_ids(self) -> List[str]:
+        """段内文档号 -> 文档 ID（首次访问时解码）"""
+        if self._doc_ids is None:
+            self._doc_ids = self._decode_blob(self._doc_blob) if self.n_docs else []
+        return self._doc_ids
+
+    def _term_index(self, term: str) -> Optional[int]:
+        if self._terms is None:
+            terms = self._decode_blob(self._term_blob) if self.n_terms else []
+            self._terms = {t: i for i, t in enumerate(terms)}
+        return self._terms.get(term)
+
+    def postings(self, term: str) -> Optional[Tuple[int, int]]:
+        """词项在 posting_docs / posting_tfs 中的区间 [start, end)，不存在返回 None"""
+        idx = self._term_index(term)
+        if idx is None:
+            return None
+        return self._term_offsets[idx], self._term_offsets[idx + 1]
+
+    def impact(self, term: str) -> Optional[Tuple[int, int]]:
+        """词项的 (最大词频, 最短文档长度)，用于计算 BM25 得分上界；不存在返回 None
+
+        墓碑文档仍计入，上界只会偏松，不会偏紧。
+        """
+        idx = self._term_index(term)
+        if idx is None:
+            return None
+        if self._term_max_tfs is not None:
+            return self._term_max_tfs[idx], self._term_min_lens[idx]
+        start, end = self._term_offsets[idx], self._term_offsets[idx + 1]
+        lengths = self.doc_lengths
+        return (max(self.posting_tfs[start:end], default=0),
+                min((lengths[d] for d in self.posting_docs[start:end]), default=0))
+
+    def terms(self) -> Iterator[str]:
+        """段内全部词项"""
+        self._term_index('')
+        return iter(self._terms)
+
+    def iter_terms(self) -> Iterator[Tuple[str, int, int]]:
+        """遍历 (词项, start, end)，用于合并"""
+        for term in self._decode_blob(self._term_blob) if self.n_terms else []:
+            start, end = self.postings(term)
+            yield term, start, end
+
+    def mark_deleted(self, local: int) -> None:
+        """给段内文档打墓碑（调用方持有索引锁）"""
+        self.deleted.add(local)
+        self._tombstones = None
+
+    def tombstones(self) -> FrozenSet[int]:
+        """墓碑的不可变快照（调用方持有索引锁；两次删除之间的查询共用同一个快照）"""
+        if self._tombstones is None:
+            self._tombstones = frozenset(self.deleted)
+        return self._tombstones
+
+    # ------------------------------------------------------------------
+    # 读者引用计数
+    # ------------------------------------------------------------------
+
+    def acquire(self) -> None:
+        """查询开始时持有段（调用方持有索引锁，段仍在索引的段列表中）"""
+        with self._ref_lock:
+            self._readers += 1
+
+    def release(self) -> None:
+        with self._ref_lock:
+            self._readers -= 1
+            if self._readers or not self._retired:
+                return
+        self.close()
+
+    def retire(self) -> None:
+        """段已移出索引：没有读者时立即关闭，否则由最后一个读者关闭"""
+        with self._ref_lock:
+            self._retired = True
+            if self._readers:
+                return
+        self.close()
+
+    @property
+    def live_docs(self) -> int:
+        return self.n_docs - len(self.deleted)
+
+    @property
+    def live_length(self) -> int:
+        return self.total_length - sum(self.doc_lengths[d] for d in self.deleted)
+
+    def size_bytes(self) -> int:
+        return len(self._mm)
+
+    def close(self) -> None:
+        for name in ('doc_lengths', '_term_offsets', '_term_max_tfs', '_term_min_lens',
+                     'posting_docs', 'posting_tfs'):
+            section = getattr(self, name, None)
+            if section is not None:
+                section.release()
+                setattr(self, name, None)
+        mm = getattr(self, '_mm', None)
+        if mm is not None:
+            mm.close()
+            self._mm = None
+
+
+def merge_segments(
+    path: str,
+    segments: List[FulltextSegment],
+    deleted: Dict[int, Set[int]]
+) -> Tuple[List[str], Dict[int, List[int]]]:
+    """把若干段合并为一个新段，丢弃墓碑文档
+
+    Args:
+        path: 新段文件路径
+        segments: 待合并的段
+        deleted: 合并开始时各段墓碑的快照（segment_id -> 段内文档号集合）；
+            合并期间新增的删除由调用方映射到新段
+
+    Returns:
+        (新段的文档 ID 列表, {旧 segment_id: 旧段内文档号 -> 新段内文档号（已删除为 -1）})
+    """
+    remaps: Dict[int, List[int]] = {}
+    doc_ids: List[str] = []
+    doc_lengths: List[int] = []
+    for seg in segments:
+        ids = seg.doc_ids
+        remap = [-1] * seg.n_docs
+        tombstones = deleted.get(seg.segment_id, ())
+        for local in range(seg.n_docs):
+            if local in tombstones:
+                continue
+            remap[local] = len(doc_ids)
+            doc_ids.append(ids[local])
+            doc_lengths.append(seg.doc_lengths[local])
+        remaps[seg.segment_id] = remap
+
+    postings: Dict[str, Tuple[array, array]] = {}
+    for seg in segments:
+        remap = remaps[seg.segment_id]
+        for term, start, end in seg.iter_terms():
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = (_uint32_array(), _uint32_array())
+            for old_local, tf in zip(seg.posting_docs[start:end], seg.posting_tfs[start:end]):
+                new_local = remap[old_local]
+                if new_local >= 0:
+                    entry[0].append(new_local)
+                    entry[1].append(tf)
+
+    write_segment(path, doc_ids, doc_lengths, {t: p for t, p in postings.items() if p[0]})
+    return doc_ids, remaps
+
+
+__all__ = [
+    'SEGMENT_MAGIC',
+    'FulltextSegment',
+    'write_segment',
+    'merge_segments',
+]
@@ -26,19 +26,31 @@ class MetadataIndex:
         atexit.register(self.flush)
 
     def add(self, memory_id, source="", tags=None, category="", content_type="", event_time=""):
-        if source:
-            self._by_source[source].add(memory_id)
-        for tag in (tags or []):
-            self._by_tag[tag].add(memory_id)
-        if category:
-            self._by_category[category].add(memory_id)
-        if content_type:
-            self._by_content_type[content_type].add(memory_id)
-        if event_time:
-            date_key = self._parse_date_key(event_time)
+        self.add_batch([{
+            'memory_id': memory_id, 'source': source, 'tags': tags, 'category': category,
+            'content_type': content_type, 'event_time': event_time,
+        }])
+
+    def add_batch(self, entries):
+        """批量添加（v7.1: 批量导入使用，整批只落盘一次）
+
+        Args:
+            entries: add() 关键字参数组成的字典列表
+        """
+        for entry in entries:
+            memory_id = entry['memory_id']
+            if entry.get('source'):
+                self._by_source[entry['source']].add(memory_id)
+            for tag in (entry.get('tags') or []):
+                self._by_tag[tag].add(memory_id)
+            if entry.get('category'):
+                self._by_category[entry['category']].add(memory_id)
+            if entry.get('content_type'):
+                self._by_content_type[entry['content_type']].add(memory_id)
+            date_key = self._parse_date_key(entry.get('event_time'))
             if date_key:
                 self._by_event_date[date_key].add(memory_id)
-        self._dirty_count += 1
+        self._dirty_count += len(entries)
         if self._dirty_count >= 100:
             self._save()
             self._dirty_count = 0
@@ -7,7 +7,8 @@ import os
 import re
 import json
 from typing import List, Dict, Set, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 
 
 # Windows GBK 编码兼容的安全打印函数
@@ -52,6 +53,8 @@ class OptimizedNgramIndex:
         # v7.0.3: 添加 LRU 上限防止内存无限增长
         self._raw_content: Dict[str, str] = {}
         self._raw_content_max_size: int = 20000  # 最多缓存 2 万条原文在内存中
+        # v7.1: 磁盘上是否有内存缓存中没有的原文（LRU 驱逐后为 True，save() 重写文件后复位）
+        self._raw_evicted: bool = False
         
         # 可选的布隆过滤器
         self._bloom_filter = None
@@ -92,6 +95,7 @@ class OptimizedNgramIndex:
             half = len(keys) // 2
             for k in keys[:half]:
                 del self._raw_content[k]
+            self._raw_evicted = True
         
         # 1.5 增量持久化原文（避免重启丢失）
         self.append_raw_content(turn, content)
@@ -114,6 +118,40 @@ class OptimizedNgramIndex:
         if len(self._raw_content) % 100 == 0:
             self._save_noun_phrases()
     
+    def add_batch(self, items: List[Tuple[str, str]]):
+        """批量添加（v7.1: 批量导入使用）
+
+        原文一次性追加到 JSONL（只打开一次文件），名词短语索引整批只保存一次。
+
+        Args:
+            items: [(memory_id, content), ...]
+        """
+        if not items:
+            return
+        for turn, content in items:
+            self._raw_content[turn] = content
+            for phrase in self._extract_noun_phrases(content):
+                self.bloom_filter.add(phrase)
+                self.noun_phrases.setdefault(phrase, []).append(turn)
+
+        if len(self._raw_content) > self._raw_content_max_size:
+            keys = list(self._raw_content.keys())
+            for k in keys[:len(keys) - self._raw_content_max_size // 2]:
+                del self._raw_content[k]
+            self._raw_evicted = True
+
+        if self._raw_content_file:
+            try:
+                os.makedirs(os.path.dirname(self._raw_content_file), exist_ok=True)
+                with open(self._raw_content_file, 'a', encoding='utf-8') as f:
+                    f.write(''.join(
+                        json.dumps({'id': turn, 'content': content}, ensure_ascii=False) + '\n'
+                        for turn, content in items
+                    ))
+            except Exception as e:
+                _safe_print(f"[NgramIndex] 追加原文失败: {e}")
+        self._save_noun_phrases()
+
     def _save_noun_phrases(self):
         """只保存名词短语索引（原子写入）"""
         if not self._index_file:
@@ -172,6 +210,8 @@ class OptimizedNgramIndex:
         
         v7.0.3: 当内存缓存被 LRU 驱逐后，自动扫描磁盘 JSONL 文件
         以确保长期运行后归档数据仍可搜索（"100%不遗忘"保证）。
+        v7.1: 启动时磁盘原文已全部载入内存，只有发生过驱逐时磁盘上才有
+        内存中没有的原文，否则跳过磁盘扫描（原先每次结果不足都会扫描整个文件）。
         
         Args:
             query: 搜索查询
@@ -208,7 +248,8 @@ class OptimizedNgramIndex:
                 return results
         
         # 第二阶段：如果内存缓存被 LRU 截断过，扫描磁盘 JSONL（保证不遗忘）
-        if self._raw_content_file and os.path.exists(self._raw_content_file) and len(results) < max_results:
+        if (self._raw_evicted and self._raw_content_file and os.path.exists(self._raw_content_file)
+                and len(results) < max_results):
             try:
                 with open(self._raw_content_file, 'r', encoding='utf-8') as f:
                     for line in f:
@@ -268,7 +309,9 @@ class OptimizedNgramIndex:
         self,
         query: str,
         max_results: int = 50,
-        num_workers: int = 4
+        num_workers: int = 4,
+        executor: Optional[Executor] = None,
+        timeout: Optional[float] = None
     ) -> List[str]:
         """Phase 3.6: 并行分片扫描原文
         
@@ -277,7 +320,9 @@ class OptimizedNgramIndex:
         Args:
             query: 搜索查询
             max_results: 最大结果数
-            num_workers: 并行线程数
+            num_workers: 并行线程数（分片数）
+            executor: 复用的线程池（v7.1: 检索器传入常驻池，不再每次新建）
+            timeout: 扫描截止时间（秒），超时返回已扫描到的结果
             
         Returns:
             匹配的 memory_id 列表
@@ -299,14 +344,29 @@ class OptimizedNgramIndex:
         query_lower = query.lower()
         
         # 并行扫描
+        if executor is not None:
+            return self._scan_chunks(executor, query_lower, search_terms, chunks, max_results, timeout)
+        with ThreadPoolExecutor(max_workers=num_workers) as own_executor:
+            return self._scan_chunks(own_executor, query_lower, search_terms, chunks, max_results, timeout)
+    
+    def _scan_chunks(
+        self,
+        executor: Executor,
+        query_lower: str,
+        search_terms: List[str],
+        chunks: List[List[Tuple[str, str]]],
+        max_results: int,
+        timeout: Optional[float] = None
+    ) -> List[str]:
+        """在线程池上扫描全部分片，凑够 max_results 或超时后取消尚未开始的分片"""
         all_results: List[str] = []
-        with ThreadPoolExecutor(max_workers=num_workers) as executor:
-            futures = [
-                executor.submit(self._scan_chunk, query_lower, search_terms, chunk)
-                for chunk in chunks
-            ]
-            
-            for future in as_completed(futures):
+        futures = [
+            executor.submit(self._scan_chunk, query_lower, search_terms, chunk)
+            for chunk in chunks
+        ]
+        
+        try:
+            for future in as_completed(futures, timeout=timeout):
                 try:
                     chunk_results = future.result()
                     all_results.extend(chunk_results)
@@ -315,7 +375,11 @@ class OptimizedNgramIndex:
                 except Exception as e:
                     _safe_print(f"[NgramIndex] 并行扫描失败: {e}")
                     continue
+        except FuturesTimeoutError:
+            _safe_print(f"[NgramIndex] 并行扫描超时，返回已扫描分片的 {len(all_results)} 条结果")
         
+        for future in futures:
+            future.cancel()
         return all_results[:max_results]
     
     def _scan_chunk(
@@ -374,6 +438,7 @@ class OptimizedNgramIndex:
                                 continue
                 _safe_print(f"[NgramIndex] 已加载 {len(self._raw_content)} 条原文内容")
             except Exception as e:
+                self._raw_evicted = True  # 未完整载入：兜底搜索仍需扫描磁盘
                 _safe_print(f"[NgramIndex] 加载原文失败: {e}")
     
     def _atexit_save(self):
@@ -411,6 +476,7 @@ class OptimizedNgramIndex:
                         f.flush()
                         os.fsync(f.fileno())
                     os.replace(tmp_path, self._raw_content_file)
+                    self._raw_evicted = False  # 磁盘原文已与内存一致
                 except Exception:
                     if os.path.exists(tmp_path):
                         os.remove(tmp_path)
@@ -433,6 +499,7 @@ class OptimizedNgramIndex:
         """清空所有索引和原文内容"""
         self.noun_phrases.clear()
         self._raw_content.clear()
+        self._raw_evicted = False
         
         # 重置布隆过滤器
         if self._bloom_filter is not None:
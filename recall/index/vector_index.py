@@ -2,7 +2,9 @@
 
 import os
 import json
-from typing import List, Tuple, Optional, Any, Dict
+import struct
+import threading
+from typing import Collection, List, Tuple, Optional, Any, Dict
 
 import numpy as np
 
@@ -30,6 +32,57 @@ def _safe_print(msg: str) -> None:
         print(msg.encode('ascii', errors='replace').decode('ascii'))
 
 
+def search_with_id_selector(index, query: np.ndarray, top_k: int, internal_ids: List[int]):
+    """只在给定内部 ID 上执行 FAISS 搜索（v7.1: 租户分区过滤下推）
+    
+    faiss>=1.7.3 通过 IDSelectorBatch 在索引扫描时跳过其它租户的向量；
+    旧版本不支持 SearchParameters 时返回 None，由调用方自行回退。
+    
+    Returns:
+        (distances, labels) 或 None
+    """
+    import faiss
+    
+    ids = np.asarray(internal_ids, dtype=np.int64)
+    try:
+        selector = faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))
+        if hasattr(index, 'nprobe'):
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+        else:
+            params = faiss.SearchParameters(sel=selector)
+        return index.search(query, top_k, params=params)
+    except (AttributeError, TypeError):
+        return None
+
+
+class DocPositionMap:
+    """文档 ID → FAISS 内部位置（v7.1）
+    
+    内部 ID 映射列表（VectorIndexIVF.id_mapping）只会追加或被整体替换：
+    追加时增量补齐，替换（删除/清空/重建）时从头构建一次，
+    使按 ID 查位置从 O(n) 扫描变为 O(1) 字典查找。
+    """
+    
+    def __init__(self):
+        self._positions: Dict[Any, List[int]] = {}
+        self._source: Optional[list] = None
+        self._length = 0
+        self._lock = threading.Lock()
+    
+    def lookup(self, mapping: list, doc_ids) -> List[int]:
+        """返回 doc_ids 在 mapping 中的全部位置"""
+        with self._lock:
+            if self._source is not mapping or self._length > len(mapping):
+                self._positions = {}
+                self._source = mapping
+                self._length = 0
+            for pos in range(self._length, len(mapping)):
+                self._positions.setdefault(mapping[pos], []).append(pos)
+            self._length = len(mapping)
+            positions = self._positions
+            return [p for doc_id in doc_ids for p in positions.get(doc_id, ())]
+
+
 class VectorIndex:
     """向量索引 - 使用 FAISS 实现高效相似度搜索
     
@@ -39,6 +92,13 @@ class VectorIndex:
     3. Lite 模式（none）: 禁用向量索引
     """
     
+    # v7.1: 重建索引时每块批量编码的记忆数
+    REBUILD_CHUNK_SIZE = 1000
+    # v7.1: 累计多少次增删后落盘一次
+    SAVE_INTERVAL = 100
+    # v7.1: 二进制 mapping 文件头（格式见 _encode_mapping）
+    MAPPING_MAGIC = b'RVMAP\x00\x01\x00'
+    
     def __init__(
         self, 
         data_path: str, 
@@ -53,16 +113,23 @@ class VectorIndex:
         self.data_path = data_path
         self.index_dir = os.path.join(data_path, 'indexes')
         self.index_file = os.path.join(self.index_dir, 'vector_index.faiss')
-        self.mapping_file = os.path.join(self.index_dir, 'vector_mapping.json')
+        self.mapping_file = os.path.join(self.index_dir, 'vector_mapping.bin')
+        self.legacy_mapping_file = os.path.join(self.index_dir, 'vector_mapping.json')
+        # v7.1: 两次落盘之间的删除先追加到删除日志（fsync），加载时重放，落盘后清空
+        self.delete_log_file = os.path.join(self.index_dir, 'vector_deletes.log')
         self.config_file = os.path.join(self.index_dir, 'vector_config.json')
         
         # Embedding 后端
         self.embedding_config = embedding_config
         self._embedding_backend: Optional[EmbeddingBackend] = None
         
-        # FAISS 索引
+        # FAISS 索引（v7.1: IndexIDMap2 包装 IndexFlatIP，内部 ID 单调递增，删除不影响其它 ID）
         self._index = None
-        self.turn_mapping: List[int] = []  # FAISS 内部 ID → turn_id
+        self._id_to_doc: Dict[int, Any] = {}         # FAISS 内部 ID → turn_id
+        self._doc_to_ids: Dict[Any, List[int]] = {}  # turn_id → FAISS 内部 ID（同一文档可能重复添加）
+        self._next_id = 0
+        self._unsaved_changes = 0
+        self._mapping_lock = threading.RLock()
         
         # 是否启用
         self._enabled = True
@@ -144,71 +211,226 @@ class VectorIndex:
         return self._index
     
     def _load(self):
-        """加载索引"""
+        """加载索引，并重放上次落盘之后的删除"""
         if not self._enabled:
             return
-        
+        self._load_index()
+        self._replay_delete_log()
+    
+    def _load_index(self):
+        """加载索引（v7.1: 旧版 IndexFlatIP + vector_mapping.json 自动迁移）"""
         import faiss
         
-        if os.path.exists(self.index_file):
-            # v7.0.14: 保护 faiss.read_index — 文件损坏时回退到空索引
-            try:
-                self._index = faiss.read_index(self.index_file)
-            except (RuntimeError, Exception) as e:
-                _safe_print(f"[VectorIndex] 警告: FAISS 索引文件损坏，将创建空索引: {e}")
-                self._index = faiss.IndexFlatIP(self.dimension)
-                self.turn_mapping = []
-                self._save_config()
-                return
-            
-            # 检查维度是否匹配
-            if self._index.d != self.dimension:
-                _safe_print(f"[VectorIndex] 警告: 索引维度({self._index.d})与当前模型维度({self.dimension})不匹配")
-                _safe_print(f"[VectorIndex] 正在重建索引...")
-                self._index = faiss.IndexFlatIP(self.dimension)
-                self.turn_mapping = []
-                self._save_config()
-            elif os.path.exists(self.mapping_file):
-                try:
-                    with open(self.mapping_file, 'r', encoding='utf-8') as f:
-                        self.turn_mapping = json.load(f)
-                except (json.JSONDecodeError, Exception) as e:
-                    _safe_print(f"[VectorIndex] 警告: mapping 文件损坏，将重建: {e}")
-                    self.turn_mapping = []
-        else:
+        if not os.path.exists(self.index_file):
             # 创建新索引
-            self._index = faiss.IndexFlatIP(self.dimension)
+            self._reset_index(self.dimension)
             self._save_config()
+            return
+        
+        # v7.0.14: 保护 faiss.read_index — 文件损坏时回退到空索引
+        try:
+            index = faiss.read_index(self.index_file)
+        except (RuntimeError, Exception) as e:
+            _safe_print(f"[VectorIndex] 警告: FAISS 索引文件损坏，将创建空索引: {e}")
+            self._reset_index(self.dimension)
+            self._save_config()
+            return
+        
+        # 检查维度是否匹配
+        if index.d != self.dimension:
+            _safe_print(f"[VectorIndex] 警告: 索引维度({index.d})与当前模型维度({self.dimension})不匹配")
+            _safe_print(f"[VectorIndex] 正在重建索引...")
+            self._reset_index(self.dimension)
+            self._save_config()
+            return
+        
+        if not hasattr(index, 'id_map'):
+            self._migrate_flat_index(index)
+            return
+        
+        self._index = index
+        try:
+            self._read_mapping()
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            _safe_print(f"[VectorIndex] 警告: mapping 文件损坏，将重建: {e}")
+            self._reset_index(self.dimension)
+    
+    @staticmethod
+    def _new_index(dimension: int):
+        """创建空索引：IndexIDMap2 包装 IndexFlatIP（支持 remove_ids 和按 ID reconstruct）"""
+        import faiss
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+    
+    def _reset_index(self, dimension: int):
+        """重置为空索引和空映射"""
+        with self._mapping_lock:
+            self._index = self._new_index(dimension)
+            self._id_to_doc = {}
+            self._doc_to_ids = {}
+            self._next_id = 0
+            self._unsaved_changes = 0
+    
+    def _migrate_flat_index(self, flat_index):
+        """v7.1: 旧版 IndexFlatIP（位置即 ID）迁移为 IndexIDMap2 + 二进制 mapping"""
+        doc_ids: List[Any] = []
+        if os.path.exists(self.legacy_mapping_file):
+            try:
+                with open(self.legacy_mapping_file, 'r', encoding='utf-8') as f:
+                    doc_ids = json.load(f)
+            except (json.JSONDecodeError, Exception) as e:
+                _safe_print(f"[VectorIndex] 警告: mapping 文件损坏，将重建: {e}")
+        
+        # 与旧版搜索行为一致：超出 mapping 长度的向量没有对应文档，丢弃
+        count = min(len(doc_ids), flat_index.ntotal)
+        self._reset_index(flat_index.d)
+        if count:
+            vectors = np.asarray(flat_index.reconstruct_n(0, count), dtype=np.float32)
+            self._add_vectors(doc_ids[:count], vectors)
+        self._save()
+        try:
+            os.remove(self.legacy_mapping_file)
+        except OSError:
+            pass
+        _safe_print(f"[VectorIndex] 已迁移为可删除索引: {count} 条向量")
+    
+    def _add_vectors(self, doc_ids: List[Any], vectors: np.ndarray):
+        """分配内部 ID 并写入索引和映射"""
+        with self._mapping_lock:
+            ids = np.arange(self._next_id, self._next_id + len(doc_ids), dtype=np.int64)
+            self._index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), ids)
+            for internal_id, doc_id in zip(ids.tolist(), doc_ids):
+                self._id_to_doc[internal_id] = doc_id
+                self._doc_to_ids.setdefault(doc_id, []).append(internal_id)
+            self._next_id += len(doc_ids)
+            self._unsaved_changes += len(doc_ids)
+    
+    def _encode_mapping(self) -> bytes:
+        """序列化映射：头部 + 内部 ID(int64) + 类型标记(uint8) + 长度(uint32) + UTF-8 文档 ID"""
+        with self._mapping_lock:
+            items = list(self._id_to_doc.items())
+            next_id = self._next_id
+        count = len(items)
+        encoded = [str(doc_id).encode('utf-8') for _, doc_id in items]
+        ids = np.fromiter((internal_id for internal_id, _ in items), dtype=np.int64, count=count)
+        tags = np.fromiter((1 if isinstance(doc_id, int) else 0 for _, doc_id in items),
+                           dtype=np.uint8, count=count)
+        lengths = np.fromiter((len(b) for b in encoded), dtype=np.uint32, count=count)
+        header = self.MAPPING_MAGIC + struct.pack('<QQ', next_id, count)
+        return b''.join([header, ids.tobytes(), tags.tobytes(), lengths.tobytes()] + encoded)
+    
+    def _read_mapping(self):
+        """读取二进制映射，并与索引中实际存在的 ID 对齐（防止两次写入之间崩溃导致不一致）"""
+        import faiss
+        
+        with open(self.mapping_file, 'rb') as f:
+            data = f.read()
+        magic_len = len(self.MAPPING_MAGIC)
+        if data[:magic_len] != self.MAPPING_MAGIC:
+            raise ValueError("unknown mapping file format")
+        next_id, count = struct.unpack_from('<QQ', data, magic_len)
+        offset = magic_len + 16
+        ids = np.frombuffer(data, dtype=np.int64, count=count, offset=offset)
+        offset += 8 * count
+        tags = np.frombuffer(data, dtype=np.uint8, count=count, offset=offset)
+        offset += count
+        lengths = np.frombuffer(data, dtype=np.uint32, count=count, offset=offset)
+        offset += 4 * count
+        if offset + int(lengths.sum()) != len(data):
+            raise ValueError("truncated mapping file")
+        
+        indexed = set(faiss.vector_to_array(self._index.id_map).tolist())
+        id_to_doc: Dict[int, Any] = {}
+        doc_to_ids: Dict[Any, List[int]] = {}
+        for internal_id, tag, length in zip(ids.tolist(), tags.tolist(), lengths.tolist()):
+            raw = data[offset:offset + length].decode('utf-8')
+            offset += length
+            if internal_id not in indexed:
+                continue
+            doc_id = int(raw) if tag else raw
+            id_to_doc[internal_id] = doc_id
+            doc_to_ids.setdefault(doc_id, []).append(internal_id)
+        
+        orphans = indexed.difference(id_to_doc)
+        if orphans:
+            self._index.remove_ids(np.fromiter(orphans, dtype=np.int64, count=len(orphans)))
+        
+        with self._mapping_lock:
+            self._id_to_doc = id_to_doc
+            self._doc_to_ids = doc_to_ids
+            self._next_id = max([next_id, *(i + 1 for i in indexed)]) if indexed else next_id
+            self._unsaved_changes = len(orphans)
     
     def _save(self):
-        """保存索引（v7.0.10: mapping 文件原子写入）"""
+        """保存索引（v7.0.10: mapping 文件原子写入；v7.1: 二进制 mapping）"""
         if not self._enabled or self._index is None:
             return
         
         import faiss
-        
-        # FAISS 索引写入（faiss 内部无原子保护，但损坏概率低）
-        faiss.write_index(self._index, self.index_file)
-        
-        from recall.utils.atomic_write import atomic_json_dump
-        atomic_json_dump(self.turn_mapping, self.mapping_file)
+        from recall.utils.atomic_write import atomic_bytes_dump
+        
+        with self._mapping_lock:
+            # FAISS 索引写入（faiss 内部无原子保护，但损坏概率低）
+            faiss.write_index(self._index, self.index_file)
+            atomic_bytes_dump(self._encode_mapping(), self.mapping_file)
+            self._unsaved_changes = 0
+            # 删除已包含在索引文件中，日志不再需要
+            try:
+                os.remove(self.delete_log_file)
+            except FileNotFoundError:
+                pass
+    
+    def _append_delete_log(self, doc_ids: List[Any]):
+        """v7.1: 删除立即追加到日志并 fsync（每行一个 JSON 文档 ID，区分 int / str），
+        不必为一次删除重写整个索引文件；调用方持有 _mapping_lock"""
+        with open(self.delete_log_file, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(doc_id, ensure_ascii=False) + '\n' for doc_id in doc_ids))
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _replay_delete_log(self):
+        """v7.1: 重放上次落盘之后的删除（崩溃后被删除的向量不会恢复），然后落盘并清空日志"""
+        if not os.path.exists(self.delete_log_file):
+            return
+        doc_ids = []
+        try:
+            with open(self.delete_log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        doc_ids.append(json.loads(line))
+                    except ValueError:
+                        break  # 写到一半崩溃的尾行
+        except OSError as e:
+            _safe_print(f"[VectorIndex] 警告: 删除日志读取失败: {e}")
+        removed = self._remove_doc_ids(doc_ids) if doc_ids else []
+        if removed:
+            _safe_print(f"[VectorIndex] 已重放删除日志: {len(removed)} 个文档")
+        self._save()
+    
+    def _maybe_save(self):
+        """累计 SAVE_INTERVAL 次变更后落盘（其余由 atexit / close 保存）"""
+        if self._unsaved_changes >= self.SAVE_INTERVAL:
+            self._save()
+    
+    @property
+    def turn_mapping(self) -> List[Any]:
+        """按添加顺序排列的 turn_id 列表（兼容旧接口；O(n) 快照，热路径不要使用）"""
+        with self._mapping_lock:
+            return list(self._id_to_doc.values())
     
     def clear(self):
         """清空向量索引"""
         if not self._enabled:
             return
         
-        import faiss
-        
         # 重置索引
-        self._index = faiss.IndexFlatIP(self.dimension)
-        self.turn_mapping = []
+        self._reset_index(self.dimension)
         self._save()
     
     def remove_by_doc_ids(self, doc_ids_to_remove: List[str]) -> int:
         """移除指定文档ID的向量
         
-        由于 FAISS IndexFlatIP 不支持直接删除，这里通过重建索引实现。
+        v7.1: 通过 IndexIDMap2.remove_ids 原生删除，映射按 ID 直接查找，
+        不再重建整个索引。
         
         Args:
             doc_ids_to_remove: 要移除的文档ID列表
@@ -222,53 +444,44 @@ class VectorIndex:
         if not doc_ids_to_remove:
             return 0
         
-        import faiss
-        
-        remove_set = set(doc_ids_to_remove)
-        removed_count = 0
-        
-        # 找出需要保留的索引
-        keep_indices = []
-        new_mapping = []
-        for idx, doc_id in enumerate(self.turn_mapping):
-            if doc_id in remove_set:
-                removed_count += 1
-            else:
-                keep_indices.append(idx)
-                new_mapping.append(doc_id)
-        
-        if removed_count == 0:
-            return 0
-        
-        # 如果全部被删除
-        if not keep_indices:
-            self._index = faiss.IndexFlatIP(self.dimension)
-            self.turn_mapping = []
-            self._save()
-            return removed_count
+        with self._mapping_lock:
+            removed = self._remove_doc_ids(doc_ids_to_remove)
+            if not removed:
+                return 0
+            # v7.1: 删除立即持久化到删除日志，索引文件仍按 SAVE_INTERVAL 落盘
+            try:
+                self._append_delete_log([doc_id for doc_id, _ in removed])
+            except OSError as e:
+                _safe_print(f"[VectorIndex] 删除日志写入失败，立即保存索引: {e}")
+                self._save()
         
-        # 重建索引（只保留需要的向量）
-        try:
-            # 从原索引重建所有需保留的向量
-            new_vectors = []
-            for idx in keep_indices:
-                vec = self._index.reconstruct(idx)
-                new_vectors.append(vec)
-            
-            # 创建新索引
-            new_index = faiss.IndexFlatIP(self.dimension)
-            if new_vectors:
-                vectors_array = np.array(new_vectors, dtype=np.float32)
-                new_index.add(vectors_array)
+        self._maybe_save()
+        return sum(count for _, count in removed)
+    
+    def _remove_doc_ids(self, doc_ids: List[Any]) -> List[Tuple[Any, int]]:
+        """从索引和映射中删除文档，返回 [(doc_id, 删除的向量数)]"""
+        with self._mapping_lock:
+            removed: List[Tuple[Any, int]] = []
+            internal_ids: List[int] = []
+            for doc_id in set(doc_ids):
+                ids = self._doc_to_ids.get(doc_id)
+                if ids:
+                    internal_ids.extend(ids)
+                    removed.append((doc_id, len(ids)))
             
-            self._index = new_index
-            self.turn_mapping = new_mapping
-            self._save()
+            if not internal_ids:
+                return []
             
-            return removed_count
-        except Exception as e:
-            _safe_print(f"[VectorIndex] 重建索引失败: {e}")
-            return 0
+            try:
+                self._index.remove_ids(np.asarray(internal_ids, dtype=np.int64))
+            except Exception as e:
+                _safe_print(f"[VectorIndex] 删除向量失败: {e}")
+                return []
+            for doc_id, _ in removed:
+                for internal_id in self._doc_to_ids.pop(doc_id):
+                    self._id_to_doc.pop(internal_id, None)
+            self._unsaved_changes += len(internal_ids)
+            return removed
     
     def encode(self, text: str) -> np.ndarray:
         """文本转向量"""
@@ -287,20 +500,31 @@ class VectorIndex:
         # 检查维度是否匹配，不匹配则重建索引
         embedding_dim = embedding.shape[1]
         if self.index.d != embedding_dim:
-            import faiss
             _safe_print(f"[VectorIndex] 运行时维度不匹配: 索引维度={self.index.d}, 向量维度={embedding_dim}")
             _safe_print(f"[VectorIndex] 正在重建索引...")
-            self._index = faiss.IndexFlatIP(embedding_dim)
-            self.turn_mapping = []
+            self._reset_index(embedding_dim)
             self._save_config()
         
-        self.index.add(embedding)
-        self.turn_mapping.append(doc_id)
-        
-        # 每 100 次添加保存一次
-        if len(self.turn_mapping) % 100 == 0:
-            self._save()
-    
+        self._add_vectors([doc_id], embedding)
+
+        # 每 SAVE_INTERVAL 次变更保存一次
+        self._maybe_save()
+
+    def add_batch(self, doc_ids: List[Any], embeddings: np.ndarray):
+        """批量添加向量（v7.1: 批量导入时整批一次 add_with_ids，整批最多落盘一次）"""
+        if not self._enabled or not len(doc_ids):
+            return
+
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(doc_ids), -1)
+        if self.index.d != embeddings.shape[1]:
+            _safe_print(f"[VectorIndex] 运行时维度不匹配: 索引维度={self.index.d}, 向量维度={embeddings.shape[1]}")
+            _safe_print("[VectorIndex] 正在重建索引...")
+            self._reset_index(embeddings.shape[1])
+            self._save_config()
+
+        self._add_vectors(list(doc_ids), embeddings)
+        self._maybe_save()
+
     def add_text(self, doc_id: Any, text: str):
         """直接添加文本"""
         if not self._enabled:
@@ -308,15 +532,74 @@ class VectorIndex:
         embedding = self.encode(text)
         self.add(doc_id, embedding)
     
-    def search(self, query: str, top_k: int = 20) -> List[Tuple[Any, float]]:
-        """搜索最相似的文档"""
+    def _internal_ids_of(self, doc_ids) -> List[int]:
+        """返回这些文档的 FAISS 内部 ID（O(len(doc_ids))）"""
+        doc_to_ids = self._doc_to_ids
+        return [i for doc_id in doc_ids for i in doc_to_ids.get(doc_id, ())]
+    
+    def _search_ids(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        allowed_ids: Optional[Collection[Any]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """在全部向量或 allowed_ids 对应的向量中做精确内积 top_k 搜索
+        
+        query_embeddings 为 (n, d) 查询矩阵，返回 (n, k) 的 distances / labels
+        """
+        n = query_embeddings.shape[0]
+        if allowed_ids is None:
+            return self.index.search(query_embeddings, min(top_k, self.index.ntotal))
+        
+        internal_ids = self._internal_ids_of(allowed_ids)
+        if not internal_ids:
+            return np.empty((n, 0), dtype=np.float32), np.empty((n, 0), dtype=np.int64)
+        k = min(top_k, len(internal_ids))
+        found = search_with_id_selector(self.index, query_embeddings, k, internal_ids)
+        if found is not None:
+            return found
+        
+        # 旧版 faiss 无 IDSelector：直接对分区内的向量精确打分，结果与 IndexFlatIP 一致
+        vectors = np.vstack([self.index.reconstruct(i) for i in internal_ids])
+        sims = query_embeddings @ vectors.T
+        order = np.argsort(-sims, axis=1, kind='stable')[:, :k]
+        return np.take_along_axis(sims, order, axis=1), np.asarray(internal_ids, dtype=np.int64)[order]
+    
+    def _to_results(self, distances: np.ndarray, labels: np.ndarray, row: int = 0) -> List[Tuple[Any, float]]:
+        """FAISS 内部 ID → (turn_id, score)（取查询矩阵的第 row 行）"""
+        id_to_doc = self._id_to_doc
+        results = []
+        for dist, label in zip(distances[row], labels[row]):
+            doc_id = id_to_doc.get(int(label)) if label >= 0 else None
+            if doc_id is not None:
+                results.append((doc_id, float(dist)))
+        return results
+    
+    def search(
+        self,
+        query: str,
+        top_k: int = 20,
+        allowed_ids: Optional[Collection[Any]] = None,
+        query_embedding: Optional[np.ndarray] = None
+    ) -> List[Tuple[Any, float]]:
+        """搜索最相似的文档
+        
+        Args:
+            query: 查询文本
+            top_k: 返回数量
+            allowed_ids: 只在这些文档中搜索（v7.1: 租户分区过滤下推到 FAISS，
+                召回与"全局搜索后过滤"完全一致，但不会被其他租户挤出 top_k）
+            query_embedding: 已编码的查询向量（v7.1: 由 QueryContext 共享，避免重复 encode）
+        """
         if not self._enabled:
             return []
         
         if self.index.ntotal == 0:
             return []
         
-        query_embedding = self.encode(query).reshape(1, -1)
+        if query_embedding is None:
+            query_embedding = self.encode(query)
+        query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
         
         # 检查维度是否匹配
         if query_embedding.shape[1] != self.index.d:
@@ -324,21 +607,46 @@ class VectorIndex:
             _safe_print(f"[VectorIndex] 向量索引需要重建，暂时返回空结果")
             return []
         
-        distances, indices = self.index.search(
-            query_embedding, 
-            min(top_k, self.index.ntotal)
-        )
+        distances, labels = self._search_ids(query_embedding, top_k, allowed_ids)
+        return self._to_results(distances, labels)
+    
+    def search_batch(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 20,
+        allowed_ids: Optional[Collection[Any]] = None
+    ) -> List[List[Tuple[Any, float]]]:
+        """多查询批量搜索（v7.1: 整个查询矩阵一次 FAISS 调用，供 search_many 使用）
         
-        results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx >= 0 and idx < len(self.turn_mapping):
-                doc_id = self.turn_mapping[idx]
-                results.append((doc_id, float(dist)))
+        Args:
+            query_embeddings: (n, d) 查询向量矩阵
+            top_k: 每个查询的返回数量
+            allowed_ids: 同 search，对所有查询生效
         
-        return results
+        Returns:
+            与查询顺序一致的结果列表，每项与 search() 的返回相同
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        n = queries.shape[0]
+        if not self._enabled or self.index.ntotal == 0 or n == 0:
+            return [[] for _ in range(n)]
+        
+        if queries.shape[1] != self.index.d:
+            _safe_print(f"[VectorIndex] 搜索时维度不匹配: 索引维度={self.index.d}, 查询维度={queries.shape[1]}")
+            return [[] for _ in range(n)]
+        
+        distances, labels = self._search_ids(queries, top_k, allowed_ids)
+        return [self._to_results(distances, labels, row) for row in range(n)]
     
-    def search_by_embedding(self, embedding: np.ndarray, top_k: int = 20) -> List[Tuple[Any, float]]:
-        """通过向量搜索"""
+    def search_by_embedding(
+        self,
+        embedding: np.ndarray,
+        top_k: int = 20,
+        allowed_ids: Optional[Collection[Any]] = None
+    ) -> List[Tuple[Any, float]]:
+        """通过向量搜索（allowed_ids 同 search）"""
         if not self._enabled:
             return []
         
@@ -348,18 +656,10 @@ class VectorIndex:
         if embedding.ndim == 1:
             embedding = embedding.reshape(1, -1)
         
-        distances, indices = self.index.search(
-            embedding, 
-            min(top_k, self.index.ntotal)
+        distances, labels = self._search_ids(
+            np.asarray(embedding, dtype=np.float32), top_k, allowed_ids
         )
-        
-        results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx >= 0 and idx < len(self.turn_mapping):
-                doc_id = self.turn_mapping[idx]
-                results.append((doc_id, float(dist)))
-        
-        return results
+        return self._to_results(distances, labels)
     
     def get_vector_by_doc_id(self, doc_id: Any) -> Optional[np.ndarray]:
         """通过文档ID获取已存储的向量
@@ -376,17 +676,16 @@ class VectorIndex:
             return None
         
         try:
-            # 查找 doc_id 在 turn_mapping 中的索引位置
-            if doc_id in self.turn_mapping:
-                idx = self.turn_mapping.index(doc_id)
-                # 使用 FAISS 的 reconstruct 方法获取已存储的向量
-                return self.index.reconstruct(idx)
+            # v7.1: 字典直接查内部 ID，使用 FAISS 的 reconstruct 方法获取已存储的向量
+            internal_ids = self._doc_to_ids.get(doc_id)
+            if internal_ids:
+                return self.index.reconstruct(internal_ids[0])
         except Exception:
             pass
         return None
     
     def get_vectors_by_doc_ids(self, doc_ids: List[Any]) -> Dict[Any, np.ndarray]:
-        """批量获取已存储的向量
+        """批量获取已存储的向量（O(len(doc_ids))，与索引大小无关）
         
         Args:
             doc_ids: 文档ID列表
@@ -398,27 +697,33 @@ class VectorIndex:
             return {}
         
         result = {}
-        # 构建 doc_id -> index 的映射（避免重复查找）
-        doc_id_to_idx = {}
-        for idx, did in enumerate(self.turn_mapping):
-            if did in doc_ids:
-                doc_id_to_idx[did] = idx
-        
-        # 批量获取向量
+        # 批量获取向量（同一文档重复添加时取最后一次）
         for doc_id in doc_ids:
-            if doc_id in doc_id_to_idx:
+            internal_ids = self._doc_to_ids.get(doc_id)
+            if internal_ids:
                 try:
-                    idx = doc_id_to_idx[doc_id]
-                    result[doc_id] = self.index.reconstruct(idx)
+                    result[doc_id] = self.index.reconstruct(internal_ids[-1])
                 except Exception:
                     pass
         
         return result
     
+    def export_vectors(self) -> Tuple[List[Any], np.ndarray]:
+        """按添加顺序导出全部 (turn_id 列表, 向量矩阵)，用于迁移到 IVF 索引"""
+        with self._mapping_lock:
+            items = list(self._id_to_doc.items())
+        if not items:
+            return [], np.zeros((0, self.index.d), dtype=np.float32)
+        vectors = np.vstack([self.index.reconstruct(internal_id) for internal_id, _ in items])
+        return [doc_id for _, doc_id in items], vectors
+    
     def _atexit_save(self):
         """atexit 回调 — 确保退出时保存索引（v7.0.11）"""
         try:
             self._save()
+            # v7.1: 提交 embedding 磁盘缓存中尚未落盘的条目
+            if self._embedding_backend:
+                self._embedding_backend._save_disk_cache()
         except Exception:
             pass
 
@@ -427,6 +732,7 @@ class VectorIndex:
         self._save()
         if self._embedding_backend:
             self._embedding_backend.clear_cache()
+            self._embedding_backend.close()
     
     def rebuild_from_memories(self, memories: List[Tuple[str, str]]) -> int:
         """从记忆数据重建向量索引
@@ -441,29 +747,33 @@ class VectorIndex:
             _safe_print("[VectorIndex] 向量索引未启用，跳过重建")
             return 0
         
-        import faiss
-        
         # 清空现有索引
-        self._index = faiss.IndexFlatIP(self.dimension)
-        self.turn_mapping = []
+        self._reset_index(self.dimension)
         
         _safe_print(f"[VectorIndex] 开始重建向量索引，共 {len(memories)} 条记忆...")
         
+        # v7.1: 分块批量编码（缓存命中的不再请求 API，未命中的按提供商批量上限发送）
         success_count = 0
-        for i, (memory_id, content) in enumerate(memories):
+        chunk_size = self.REBUILD_CHUNK_SIZE
+        for start in range(0, len(memories), chunk_size):
+            chunk = memories[start:start + chunk_size]
             try:
-                embedding = self.encode(content)
-                if embedding.ndim == 1:
-                    embedding = embedding.reshape(1, -1)
-                self._index.add(embedding)
-                self.turn_mapping.append(memory_id)
-                success_count += 1
-                
-                # 每 50 条打印进度
-                if (i + 1) % 50 == 0:
-                    _safe_print(f"[VectorIndex] 重建进度: {i + 1}/{len(memories)}")
+                embeddings = self.embedding_backend.encode_batch_with_cache([c for _, c in chunk])
+                self._add_vectors([memory_id for memory_id, _ in chunk], embeddings)
+                success_count += len(chunk)
             except Exception as e:
-                _safe_print(f"[VectorIndex] 记忆 {memory_id} 索引失败: {e}")
+                # 批量失败时逐条回退，避免一条坏数据拖垮整块
+                _safe_print(f"[VectorIndex] 批量编码失败，逐条重试: {e}")
+                for memory_id, content in chunk:
+                    try:
+                        embedding = self.encode(content)
+                        if embedding.ndim == 1:
+                            embedding = embedding.reshape(1, -1)
+                        self._add_vectors([memory_id], embedding)
+                        success_count += 1
+                    except Exception as e2:
+                        _safe_print(f"[VectorIndex] 记忆 {memory_id} 索引失败: {e2}")
+            _safe_print(f"[VectorIndex] 重建进度: {min(start + chunk_size, len(memories))}/{len(memories)}")
         
         # 保存
         self._save()
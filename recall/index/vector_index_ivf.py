@@ -20,10 +20,12 @@ Phase 3.6: 升级为 IVF-HNSW，召回率从 90-95% 提升到 95-99%
 import os
 import json
 import logging
-from typing import List, Tuple, Optional, Dict, Any
+from typing import Collection, List, Tuple, Optional, Dict, Any
 
 import numpy as np
 
+from .vector_index import DocPositionMap, search_with_id_selector
+
 
 # 检查 FAISS 是否可用
 try:
@@ -156,6 +158,7 @@ class VectorIndexIVF:
         self.doc_metadata: Dict[str, Dict[str, Any]] = {}  # 文档 ID -> 元数据（含 user_id）
         self._pending_vectors: List[np.ndarray] = []  # 待训练的向量
         self._pending_ids: List[str] = []  # 待训练的文档 ID
+        self._doc_positions = DocPositionMap()  # v7.1: 文档 ID -> 内部 ID（分区过滤）
         
         self._load_or_create()
         
@@ -308,6 +311,51 @@ class VectorIndexIVF:
             logger.error(f"[VectorIndexIVF] Failed to add vector for {doc_id}: {e}")
             return False
     
+    def add_batch(
+        self,
+        doc_ids: List[str],
+        embeddings: List[List[float]],
+        user_id: Optional[str] = None
+    ) -> int:
+        """批量添加向量（v7.1: 批量导入使用 — 整批一次 index.add，整批只落盘一次）
+
+        逐条 add() 每次都会整体重写索引文件，批量导入时这是主要瓶颈。
+
+        Returns:
+            成功添加的向量数
+        """
+        if not len(doc_ids):
+            return 0
+        try:
+            vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(doc_ids), -1)
+            if vectors.shape[1] != self.dimension:
+                logger.warning(f"[VectorIndexIVF] Dimension mismatch: expected {self.dimension}, "
+                              f"got {vectors.shape[1]}")
+                return 0
+            vectors = np.ascontiguousarray(vectors)
+            faiss.normalize_L2(vectors)
+
+            if user_id:
+                for doc_id in doc_ids:
+                    self.doc_metadata[doc_id] = {'user_id': user_id}
+
+            if not self.index.is_trained:
+                self._pending_vectors.extend(vectors)
+                self._pending_ids.extend(doc_ids)
+                if len(self._pending_vectors) >= self.min_train_size:
+                    self._train_and_add()
+                else:
+                    self._save_pending()
+                return len(doc_ids)
+
+            self.index.add(vectors)
+            self.id_mapping.extend(doc_ids)
+            self._save()
+            return len(doc_ids)
+        except Exception as e:
+            logger.error(f"[VectorIndexIVF] Failed to add {len(doc_ids)} vectors: {e}")
+            return 0
+
     def _train_and_add(self):
         """训练索引并添加待处理的向量"""
         if not self._pending_vectors:
@@ -359,7 +407,8 @@ class VectorIndexIVF:
         self,
         query_embedding: List[float],
         top_k: int = 10,
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        allowed_ids: Optional[Collection[str]] = None
     ) -> List[Tuple[str, float]]:
         """搜索相似向量
         
@@ -367,56 +416,108 @@ class VectorIndexIVF:
             query_embedding: 查询向量
             top_k: 返回数量
             user_id: 用户ID过滤（多租户隔离）
+            allowed_ids: 只在这些文档中搜索（v7.1: 通过 IDSelector 下推到 FAISS，
+                小租户不再被大租户挤出过采样窗口）
             
         Returns:
             [(文档ID, 相似度分数), ...]
         """
-        if not self.index.is_trained or self.index.ntotal == 0:
-            return []
+        return self.search_batch([query_embedding], top_k, user_id=user_id, allowed_ids=allowed_ids)[0]
+    
+    def search_batch(
+        self,
+        query_embeddings,
+        top_k: int = 10,
+        user_id: Optional[str] = None,
+        allowed_ids: Optional[Collection[str]] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """多查询批量搜索（v7.1: 整个查询矩阵一次 FAISS 调用，供 search_many 使用）
+        
+        Args:
+            query_embeddings: (n, d) 查询向量矩阵或向量列表
+            top_k / user_id / allowed_ids: 同 search，对所有查询生效
+            
+        Returns:
+            与查询顺序一致的结果列表，每项与 search() 的返回相同
+        """
+        n = len(query_embeddings)
+        if n == 0 or not self.index.is_trained or self.index.ntotal == 0:
+            return [[] for _ in range(n)]
         
         try:
-            query = np.array([query_embedding], dtype=np.float32)
+            queries = np.array(query_embeddings, dtype=np.float32).reshape(n, -1)
             
             # 检查维度
-            if query.shape[1] != self.dimension:
+            if queries.shape[1] != self.dimension:
                 logger.warning(f"[VectorIndexIVF] Query dimension mismatch: "
-                              f"expected {self.dimension}, got {query.shape[1]}")
-                return []
+                              f"expected {self.dimension}, got {queries.shape[1]}")
+                return [[] for _ in range(n)]
             
-            faiss.normalize_L2(query)
+            faiss.normalize_L2(queries)
             
-            # 多取一些用于过滤（如果需要用户过滤）
-            search_k = top_k * 5 if user_id else top_k
-            search_k = min(search_k, self.index.ntotal)
+            found = None
+            if allowed_ids is not None:
+                positions = self._doc_positions.lookup(self.id_mapping, allowed_ids)
+                if not positions:
+                    return [[] for _ in range(n)]
+                found = search_with_id_selector(
+                    self.index, queries, min(top_k * 5 if user_id else top_k, len(positions)), positions
+                )
             
-            distances, indices = self.index.search(query, search_k)
-            
-            results = []
-            for dist, idx in zip(distances[0], indices[0]):
-                if idx < 0 or idx >= len(self.id_mapping):
-                    continue
-                
-                doc_id = self.id_mapping[idx]
-                
-                # v7.0.6: 过滤已标记删除的向量（之前缺失，导致幽灵数据出现在搜索结果中）
-                if doc_id in self.doc_metadata and self.doc_metadata[doc_id].get('_deleted'):
-                    continue
-                
-                # 用户过滤（多租户隔离保障）
-                if user_id and doc_id in self.doc_metadata:
-                    meta = self.doc_metadata[doc_id]
-                    if meta.get('user_id') != user_id:
-                        continue  # 跳过其他用户的文档
-                
-                results.append((doc_id, float(dist)))
+            if found is not None:
+                distances, indices = found
+            else:
+                # 多取一些用于过滤（如果需要用户过滤）；旧版 faiss 无 IDSelector 时扫描全部候选
+                search_k = top_k * 5 if user_id else top_k
+                if allowed_ids is not None:
+                    search_k = self.index.ntotal
+                search_k = min(search_k, self.index.ntotal)
                 
-                if len(results) >= top_k:
-                    break
+                distances, indices = self.index.search(queries, search_k)
             
-            return results
+            return [
+                self._filter_hits(distances[row], indices[row], top_k, user_id, allowed_ids)
+                for row in range(n)
+            ]
         except Exception as e:
             logger.error(f"[VectorIndexIVF] Search failed: {e}")
-            return []
+            return [[] for _ in range(n)]
+    
+    def _filter_hits(
+        self,
+        distances,
+        indices,
+        top_k: int,
+        user_id: Optional[str],
+        allowed_ids: Optional[Collection[str]]
+    ) -> List[Tuple[str, float]]:
+        """单个查询的 FAISS 结果 → [(文档ID, 分数)]，过滤越界/已删除/其他用户的向量"""
+        results = []
+        for dist, idx in zip(distances, indices):
+            if idx < 0 or idx >= len(self.id_mapping):
+                continue
+            
+            doc_id = self.id_mapping[idx]
+            
+            if allowed_ids is not None and doc_id not in allowed_ids:
+                continue
+            
+            # v7.0.6: 过滤已标记删除的向量（之前缺失，导致幽灵数据出现在搜索结果中）
+            if doc_id in self.doc_metadata and self.doc_metadata[doc_id].get('_deleted'):
+                continue
+            
+            # 用户过滤（多租户隔离保障）
+            if user_id and doc_id in self.doc_metadata:
+                meta = self.doc_metadata[doc_id]
+                if meta.get('user_id') != user_id:
+                    continue  # 跳过其他用户的文档
+            
+            results.append((doc_id, float(dist)))
+            
+            if len(results) >= top_k:
+                break
+        
+        return results
     
     def _save(self):
         """保存索引和元数据"""
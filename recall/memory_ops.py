@@ -11,6 +11,7 @@ import uuid
 from typing import TYPE_CHECKING, List, Dict, Any, Optional
 
 from .storage import ConsolidatedEntity
+from .retrieval.config import QueryContext
 from .utils.perf_monitor import MetricType
 from .utils.task_manager import TaskType, get_task_manager
 
@@ -48,6 +49,69 @@ class MemoryOperations:
     def __init__(self, engine: 'RecallEngine'):
         self._engine = engine
 
+    # ==================== v7.1: 增量去重索引 ====================
+
+    def _ensure_dedup_scope(self, user_id: str, existing_memories: List[Dict[str, Any]]) -> None:
+        """首次遇到该用户（且持久化的签名索引中没有）时，用最近的记忆预热去重索引"""
+        deduplicator = self._engine.deduplicator
+        if deduplicator is None or deduplicator.has_scope(user_id):
+            return
+        from .processor.three_stage_deduplicator import DedupItem
+
+        items = []
+        for mem in existing_memories or []:
+            mem_content = mem.get('content', '').strip()
+            mem_id = mem.get('metadata', {}).get('id')
+            if mem_content and mem_id:
+                items.append(DedupItem(id=mem_id, name=mem_content[:100], content=mem_content, item_type="memory"))
+        deduplicator.build_index(items, scope=user_id)
+
+    def _index_for_dedup(self, user_id: str, memory_id: str, content: str, embedding: Any = None) -> None:
+        """写入成功后把记忆加入该用户的去重索引（复用已算好的 embedding）
+
+        索引尚未预热的用户跳过：下次去重时 _ensure_dedup_scope 会从存储中一并载入
+        """
+        deduplicator = self._engine.deduplicator
+        if deduplicator is None or not deduplicator.has_scope(user_id):
+            return
+        try:
+            from .processor.three_stage_deduplicator import DedupItem
+            content = content.strip()
+            deduplicator.add_to_index(DedupItem(
+                id=memory_id,
+                name=content[:100],
+                content=content,
+                item_type="memory",
+                embedding=embedding
+            ), scope=user_id)
+        except Exception as e:
+            _safe_print(f"[Recall] 去重索引更新失败（不影响主流程）: {e}")
+
+    # ==================== v7.1: 一致性检查增量事实库 ====================
+
+    def _ensure_fact_scope(self, user_id: str) -> None:
+        """首次对该用户做一致性检查时，从存储中的全部记忆一次性建立事实库"""
+        checker = self._engine.consistency_checker
+        if checker.fact_store is None or checker.has_fact_scope(user_id):
+            return
+        try:
+            memories = []
+            for mem in self._engine.storage.get_scope(user_id).get_all():
+                mem_id = mem.get('metadata', {}).get('id')
+                if mem_id:
+                    memories.append((mem_id, mem.get('content', '')))
+            checker.build_fact_scope(user_id, memories)
+            _safe_print(f"[Recall] 一致性事实库已建立: user={user_id}, {len(memories)} 条记忆")
+        except Exception as e:
+            _safe_print(f"[Recall] 一致性事实库建立失败（回退为逐条提取）: {e}")
+
+    def _index_for_consistency(self, user_id: str, memory_id: str, content: str) -> None:
+        """写入成功后登记记忆的事实（该用户尚未建事实库时跳过，首次检查时一并回填）"""
+        try:
+            self._engine.consistency_checker.index_memory(user_id, memory_id, content)
+        except Exception as e:
+            _safe_print(f"[Recall] 一致性事实库更新失败（不影响主流程）: {e}")
+
     # ==================== add ====================
 
     def add(
@@ -145,34 +209,24 @@ class MemoryOperations:
                     if content_embedding is not None:
                         new_item.embedding = content_embedding.tolist() if hasattr(content_embedding, 'tolist') else list(content_embedding)
 
-                    existing_items = []
-                    for mem in existing_memories:
-                        mem_content = mem.get('content', '').strip()
-                        if mem_content:
-                            existing_items.append(DedupItem(
-                                id=mem.get('metadata', {}).get('id', str(uuid_module.uuid4())),
-                                name=mem_content[:100],
-                                content=mem_content,
-                                item_type="memory"
-                            ))
-
-                    if existing_items:
-                        dedup_result = engine.deduplicator.deduplicate([new_item], existing_items)
-
-                        if dedup_result.matches:
-                            match = dedup_result.matches[0]
-                            _safe_print(f"[Engine][Add] [SKIP] 三阶段去重: type={match.match_type.value}, conf={match.confidence:.2f}")
-                            _safe_print(f"[Engine][Add]    reason={match.reason}")
-                            task_manager.complete_task(dedup_task.id, "发现重复记忆")
-                            task_manager.complete_task(parent_task.id, "记忆已存在，跳过保存")
-                            return AddResult(
-                                id=match.matched_item.id if match.matched_item else 'unknown',
-                                success=False,
-                                entities=[],
-                                message=f"记忆内容已存在（{match.match_type.value}匹配，置信度{match.confidence:.0%}）"
-                            )
-                        else:
-                            _safe_print(f"[Engine][Add]    三阶段去重: 未发现重复")
+                    # v7.1: 去重器按用户维护增量索引（写入成功后 add_to_index），只在首次遇到该用户时用最近记忆预热
+                    self._ensure_dedup_scope(user_id, existing_memories)
+                    dedup_result = engine.deduplicator.deduplicate([new_item], scope=user_id)
+
+                    if dedup_result.matches:
+                        match = dedup_result.matches[0]
+                        _safe_print(f"[Engine][Add] [SKIP] 三阶段去重: type={match.match_type.value}, conf={match.confidence:.2f}")
+                        _safe_print(f"[Engine][Add]    reason={match.reason}")
+                        task_manager.complete_task(dedup_task.id, "发现重复记忆")
+                        task_manager.complete_task(parent_task.id, "记忆已存在，跳过保存")
+                        return AddResult(
+                            id=match.matched_item.id if match.matched_item else 'unknown',
+                            success=False,
+                            entities=[],
+                            message=f"记忆内容已存在（{match.match_type.value}匹配，置信度{match.confidence:.0%}）"
+                        )
+                    else:
+                        _safe_print(f"[Engine][Add]    三阶段去重: 未发现重复")
                 except Exception as e:
                     _safe_print(f"[Engine][Add] [WARN] 三阶段去重失败，回退简单匹配: {e}")
 
@@ -289,7 +343,13 @@ class MemoryOperations:
                 )
                 task_manager.start_task(consistency_task.id, "检查记忆一致性...")
 
-                existing_memories = engine.search(content, user_id=user_id, top_k=5)
+                # v7.1: 复用已提取的实体/关键词和预计算向量，检索时不再重复分析
+                existing_memories = engine.search(content, user_id=user_id, top_k=5, query_context=QueryContext(
+                    query=content,
+                    entities=[e.name for e in entities],
+                    keywords=keywords,
+                    embedding=content_embedding if content == content_normalized else None,
+                ))
                 _safe_print(f"[Recall] 一致性检查: 找到 {len(existing_memories)} 条相关记忆")
                 for i, m in enumerate(existing_memories):
                     _safe_print(f"[Recall]   [{i+1}] {m.content[:30]}...")
@@ -297,9 +357,12 @@ class MemoryOperations:
                 task_manager.update_task(consistency_task.id, progress=0.3, message=f"规则检测 {len(existing_memories)} 条相关记忆...")
 
                 # 阶段1：正则规则检测（快速）
+                # v7.1: 与该用户事实库中相关实体的事实比较，不再逐条重新提取已有记忆
+                self._ensure_fact_scope(user_id)
                 consistency = engine.consistency_checker.check(
                     content,
-                    [{'content': m.content} for m in existing_memories]
+                    [{'content': m.content} for m in existing_memories],
+                    user_id=user_id
                 )
                 _safe_print(f"[Recall] 一致性检查结果: is_consistent={consistency.is_consistent}, violations={len(consistency.violations)}")
                 if not consistency.is_consistent:
@@ -629,6 +692,10 @@ class MemoryOperations:
                 except Exception as e:
                     _safe_print(f"[Recall v7.0] IVF 索引同步写入失败（不影响主流程）: {e}")
 
+            # v7.1: 增量去重索引
+            self._index_for_dedup(user_id, memory_id, content, content_embedding)
+            self._index_for_consistency(user_id, memory_id, content)
+
             # v5.0: 更新元数据索引
             if engine._metadata_index:
                 try:
@@ -966,55 +1033,85 @@ class MemoryOperations:
         user_id: str = "default",
         skip_dedup: bool = False,
         skip_llm: bool = True,
+        on_added=None,
     ) -> List[str]:
-        """批量添加记忆（高吞吐）"""
+        """批量添加记忆（高吞吐）
+
+        on_added(items 下标, memory_id): 每条写入成功后回调（v7.1: 异步写入管线据此
+        把合并写入产生的 memory_id 归还给各自的操作；去重跳过 / 失败的条目不回调）。
+
+        v7.1: 分阶段批量导入 — 按 BULK_INGEST_CHUNK_SIZE 分组，每组依次：
+        去重过滤 → 抽取（skip_llm 时可交给进程池）→ 分组写入，
+        记忆存储、向量 / 元数据索引、L1、BAL 后端在每组内各只落盘 / 提交一次；
+        倒排 / 实体 / N-gram / 全文索引和知识图谱在整批结束后统一写入。
+        """
         import logging
+        from .storage.multi_tenant import ScopedMemory
 
         engine = self._engine
         memory_ids = []
+        added_items = []  # 与 memory_ids 对齐（去重跳过的条目不在其中）
 
         if not engine.embedding_backend:
             raise RuntimeError("Embedding backend 未初始化（需启用 VECTOR_INDEX），无法执行批量添加")
 
-        # 1. 批量计算 embedding
+        # 1. 批量计算 embedding（v7.1: 缓存命中的不再请求 API，未命中的按提供商批量上限发送）
         contents = [item['content'] for item in items]
-        embeddings = engine.embedding_backend.encode_batch(contents)
+        embeddings = engine.embedding_backend.encode_batch_with_cache(contents)
 
-        # 2. 逐条处理但合并 IO
+        # 2. 分组导入
         all_keywords = []
         all_entities = []
         all_ngram_data = []
         all_relations = []
 
+        # 去重：最近记忆的内容集合整批只取一次，批内重复同样跳过
+        seen_contents = None
+        if not skip_dedup:
+            existing_memories, _ = engine.get_paginated(user_id=user_id, offset=0, limit=100)
+            seen_contents = {mem.get('content', '').strip() for mem in existing_memories}
+
+        # 每组不超过作用域容量，保证组内新写入的记忆不会在同组内被 LRU 驱逐
+        chunk_size = max(1, min(engine.recall_config.bulk_ingest_chunk_size, ScopedMemory.MAX_MEMORIES))
         errors = []
-        for i, (item, embedding) in enumerate(zip(items, embeddings)):
-            merged_metadata = {
-                **(item.get('metadata', {})),
-                'source': item.get('source', ''),
-                'tags': item.get('tags', []),
-                'category': item.get('category', ''),
-                'content_type': item.get('content_type', 'custom'),
-            }
-            try:
-                result = self._add_single_fast(
-                    content=item['content'],
-                    embedding=embedding,
-                    metadata=merged_metadata,
-                    user_id=user_id,
-                    skip_dedup=skip_dedup,
-                    skip_llm=skip_llm,
-                )
-                if result:
-                    memory_id, entities, keywords, relations = result
-                    memory_ids.append(memory_id)
-                    # v7.0.10: 传递完整实体信息（entity_type, aliases, confidence）以便 _batch_update_indexes 正确写入
-                    all_entities.extend([(e, memory_id) for e in entities])
-                    all_keywords.extend([(kw, memory_id) for kw in keywords])
-                    all_ngram_data.append((memory_id, item['content']))
-                    all_relations.extend(relations)
-            except Exception as e:
-                errors.append({"index": i, "error": str(e)})
-                logging.warning(f"add_batch item {i} failed: {e}")
+        for start in range(0, len(items), chunk_size):
+            chunk = []
+            for i in range(start, min(start + chunk_size, len(items))):
+                item = items[i]
+                content = item['content']
+                if seen_contents is not None:
+                    if content.strip() in seen_contents:
+                        continue
+                    seen_contents.add(content.strip())
+                merged_metadata = {
+                    **(item.get('metadata', {})),
+                    'source': item.get('source', ''),
+                    'tags': item.get('tags', []),
+                    'category': item.get('category', ''),
+                    'content_type': item.get('content_type', 'custom'),
+                }
+                chunk.append((i, content, embeddings[i], merged_metadata))
+            if not chunk:
+                continue
+
+            try:
+                results = self._ingest_chunk(chunk, user_id=user_id, skip_llm=skip_llm)
+            except Exception as e:
+                errors.extend({"index": i, "error": str(e)} for i, _, _, _ in chunk)
+                logging.warning(f"add_batch items {chunk[0][0]}-{chunk[-1][0]} failed: {e}")
+                continue
+
+            for (i, content, _, _), result in zip(chunk, results):
+                memory_id, entities, keywords, relations = result
+                memory_ids.append(memory_id)
+                added_items.append(items[i])
+                if on_added is not None:
+                    on_added(i, memory_id)
+                # v7.0.10: 传递完整实体信息（entity_type, aliases, confidence）以便 _batch_update_indexes 正确写入
+                all_entities.extend([(e, memory_id) for e in entities])
+                all_keywords.extend([(kw, memory_id) for kw in keywords])
+                all_ngram_data.append((memory_id, content))
+                all_relations.extend(relations)
 
         # 3. 批量更新索引
         self._batch_update_indexes(all_keywords, all_entities, all_ngram_data, all_relations)
@@ -1044,10 +1141,11 @@ class MemoryOperations:
                 logging.warning(f"add_batch episode creation failed: {e}")
 
         # v7.0.8: 预构建 memory_id → entities/keywords 映射（供 4b/4c 共用）
+        # v7.1: all_entities 中是实体对象（v7.0.10 起），这里统一转成实体名
         mid_entities_map = {}
         mid_keywords_map = {}
-        for ent_name, mid in all_entities:
-            mid_entities_map.setdefault(mid, []).append(ent_name)
+        for entity, mid in all_entities:
+            mid_entities_map.setdefault(mid, []).append(entity.name if hasattr(entity, 'name') else str(entity))
         for kw, mid in all_keywords:
             mid_keywords_map.setdefault(mid, []).append(kw)
 
@@ -1055,7 +1153,7 @@ class MemoryOperations:
         # v7.0.6: 使用 all_entities/all_keywords 中的实际数据（之前硬编码空列表）
         if engine.volume_manager:
             try:
-                for mid, item in zip(memory_ids, items[:len(memory_ids)]):
+                for mid, item in zip(memory_ids, added_items):
                     engine.volume_manager.append_turn({
                         'memory_id': mid,
                         'user_id': user_id,
@@ -1103,7 +1201,7 @@ class MemoryOperations:
         # v7.0.5: 修复 — 使用 link_by_topics() 存入 TopicStore + 图谱边
         if hasattr(engine, '_topic_cluster') and engine._topic_cluster:
             try:
-                for mid, item in zip(memory_ids, items[:len(memory_ids)]):
+                for mid, item in zip(memory_ids, added_items):
                     try:
                         # v7.0.9: 使用提取的实体而非 metadata 中的（批量导入通常无 metadata.entities）
                         item_entities = mid_entities_map.get(mid, [])
@@ -1126,7 +1224,7 @@ class MemoryOperations:
         # 4e. 检索器缓存预填
         if engine.retriever:
             try:
-                for mid, item in zip(memory_ids, items[:len(memory_ids)]):
+                for mid, item in zip(memory_ids, added_items):
                     engine.retriever.cache_content(mid, item['content'])
                     # v7.0.2: 也缓存 metadata 和 entities（之前遗漏）
                     if hasattr(engine.retriever, 'cache_metadata') and item.get('metadata'):
@@ -1142,9 +1240,7 @@ class MemoryOperations:
         if hasattr(engine, '_maybe_update_entity_summary'):
             try:
                 # 收集本批次涉及的所有实体名
-                batch_entity_names = set()
-                for ent_name, _ in all_entities:
-                    batch_entity_names.add(ent_name)
+                batch_entity_names = {name for names in mid_entities_map.values() for name in names}
                 # 只更新出现频率高的实体（避免批量导入时大量 LLM 调用）
                 if batch_entity_names and len(batch_entity_names) <= 50:
                     for ent_name in batch_entity_names:
@@ -1161,13 +1257,248 @@ class MemoryOperations:
             logging.warning(f"add_batch: {len(errors)}/{len(items)} 条失败")
         return memory_ids
 
+    # ==================== v7.1: 批量导入分组写入 ====================
+
+    def _ingest_chunk(self, chunk, user_id, skip_llm):
+        """批量导入的一组：抽取 → 分组写入（每个存储只落盘 / 提交一次）
+
+        Args:
+            chunk: [(items 下标, content, embedding, metadata), ...]（已通过去重过滤）
+
+        Returns:
+            与 chunk 对齐的 (memory_id, entities, keywords, relations) 列表
+        """
+        import logging
+
+        engine = self._engine
+        extractions = self._extract_batch([content for _, content, _, _ in chunk], skip_llm)
+
+        # 抽取后处理：实体消歧、时间意图（与 _add_single_fast 对齐）
+        records = []
+        for (_, content, embedding, metadata), (entities, keywords) in zip(chunk, extractions):
+            if entities and getattr(engine, '_entity_resolver', None):
+                try:
+                    for ent in entities:
+                        if hasattr(ent, 'name'):
+                            ent.name = engine._entity_resolver.resolve(ent.name)
+                except Exception as e:
+                    logging.warning(f"add_batch EntityResolver 失败（不影响主流程）: {e}")
+            if getattr(engine, '_time_intent_parser', None):
+                try:
+                    time_result = engine._time_intent_parser.parse(content)
+                    if time_result:
+                        if getattr(time_result, 'start', None):
+                            metadata['event_time'] = time_result.start.isoformat()
+                        if getattr(time_result, 'label', None):
+                            metadata['temporal_label'] = time_result.label
+                except Exception:
+                    pass
+            entity_names = [e.name if hasattr(e, 'name') else str(e) for e in entities]
+            records.append((f"mem_{uuid.uuid4().hex[:12]}", content, embedding, metadata,
+                            entities, keywords, entity_names))
+
+        # 存储记忆：整组一次持久化（失败则整组失败，由 add_batch 记录错误）
+        scope = engine.storage.get_scope(user_id)
+        scope.add_many([
+            (content, {'id': mid, 'entities': names, 'keywords': keywords, **metadata})
+            for mid, content, _, metadata, _, keywords, names in records
+        ])
+
+        ids = [r[0] for r in records]
+        vectors = [r[2] for r in records]
+
+        try:
+            if engine._vector_index and engine._vector_index.enabled:
+                engine._vector_index.add_batch(ids, vectors)
+        except Exception as e:
+            logging.warning(f"add_batch vector index failed: {e}")
+
+        if getattr(engine, '_vector_index_ivf', None) is not None:
+            try:
+                engine._vector_index_ivf.add_batch(ids, vectors)
+            except Exception as e:
+                logging.warning(f"add_batch IVF 写入失败: {e}")
+
+        try:
+            if engine._metadata_index:
+                engine._metadata_index.add_batch([{
+                    'memory_id': mid,
+                    'source': metadata.get('source', ''),
+                    'tags': metadata.get('tags', []),
+                    'category': metadata.get('category', ''),
+                    'content_type': metadata.get('content_type', ''),
+                    'event_time': metadata.get('event_time', ''),
+                } for mid, _, _, metadata, _, _, _ in records])
+        except Exception as e:
+            logging.warning(f"add_batch metadata index failed: {e}")
+
+        # ConsolidatedMemory (L1)：整组合并后只刷盘一次
+        if engine.consolidated_memory is not None:
+            try:
+                from .storage.layer1_consolidated import ConsolidatedEntity
+                for mid, content, _, _, _, _, names in records:
+                    for ename in names:
+                        engine.consolidated_memory.add_or_update(ConsolidatedEntity(
+                            id=f"entity_{ename.lower().replace(' ', '_')}",
+                            name=ename,
+                            entity_type="UNKNOWN",
+                            current_state={"last_content": content[:200]},
+                            confidence=0.5,
+                            verification_count=1,
+                            source_memory_ids=[mid],
+                        ))
+                engine.consolidated_memory.flush()
+            except Exception as e:
+                logging.warning(f"add_batch consolidated memory update failed: {e}")
+
+        # 时态索引
+        temporal_index = getattr(engine.temporal_graph, '_temporal_index', None) if engine.temporal_graph else None
+        if temporal_index is not None:
+            try:
+                from .index.temporal_index import TemporalEntry, TimeRange
+                from datetime import datetime as _dt
+                now = _dt.now()
+                for mid, _, _, metadata, _, _, _ in records:
+                    event_dt = self._parse_event_time(metadata.get('event_time'))
+                    if event_dt:
+                        temporal_index.add(TemporalEntry(
+                            doc_id=mid,
+                            fact_range=TimeRange(start=event_dt),
+                            known_at=now,
+                            system_range=TimeRange(start=now),
+                            subject=user_id,
+                            predicate='memory'
+                        ))
+            except Exception as e:
+                logging.warning(f"add_batch temporal index update failed: {e}")
+
+        # BAL 双写：每个后端整组一次提交
+        if getattr(engine, '_storage_backend', None):
+            try:
+                engine._storage_backend.save_batch([(mid, {
+                    'content': content,
+                    'metadata': metadata,
+                    'namespace': metadata.get('character_id', 'default'),
+                    'source': metadata.get('role', 'unknown'),
+                    'user_id': user_id,
+                    'importance': metadata.get('importance', 0.5),
+                }) for mid, content, _, metadata, _, _, _ in records])
+            except Exception as e:
+                logging.warning(f"add_batch StorageBackend dual-write failed: {e}")
+
+        if getattr(engine, '_vector_backend', None):
+            try:
+                engine._vector_backend.add_batch([(
+                    mid,
+                    embedding.tolist() if hasattr(embedding, 'tolist') else list(embedding),
+                    {'content': content[:200], 'user_id': user_id,
+                     'namespace': metadata.get('character_id', 'default')},
+                ) for mid, content, embedding, metadata, _, _, _ in records if embedding is not None])
+            except Exception as e:
+                logging.warning(f"add_batch VectorBackend dual-write failed: {e}")
+
+        if getattr(engine, '_text_search_backend', None):
+            try:
+                engine._text_search_backend.add_batch([(
+                    mid, content,
+                    {'user_id': user_id, 'entities': names,
+                     'namespace': metadata.get('character_id', 'default')},
+                ) for mid, content, _, metadata, _, _, names in records])
+            except Exception as e:
+                logging.warning(f"add_batch TextSearchBackend dual-write failed: {e}")
+
+        results = []
+        for mid, content, embedding, _, entities, keywords, _ in records:
+            # v7.1: 增量去重索引
+            self._index_for_dedup(user_id, mid, content, embedding)
+            self._index_for_consistency(user_id, mid, content)
+
+            # 规则级关系提取
+            relations = []
+            if engine.relation_extractor and entities:
+                try:
+                    relations = engine.relation_extractor.extract(content, 0, entities=entities)
+                except Exception as e:
+                    logging.warning(f"add_batch relation extraction failed: {e}")
+            results.append((mid, entities, keywords, relations))
+        return results
+
+    def _extract_batch(self, contents, skip_llm):
+        """批量导入的抽取阶段，返回与 contents 对齐的 (entities, keywords) 列表
+
+        skip_llm 且 BULK_INGEST_WORKERS > 0 时，按工作进程数切片并行做规则抽取；
+        进程池不可用或失败时退回逐条抽取。
+        """
+        import logging
+
+        engine = self._engine
+        pool = engine._get_ingest_process_pool() if skip_llm and engine.smart_extractor else None
+        if pool is not None and len(contents) > 1:
+            try:
+                from .processor.smart_extractor import extract_rules_batch
+                step = -(-len(contents) // engine.recall_config.bulk_ingest_workers)
+                max_length = engine.smart_extractor.config.max_text_length
+                futures = [
+                    pool.submit(extract_rules_batch, contents[i:i + step], max_length)
+                    for i in range(0, len(contents), step)
+                ]
+                return [(r.entities, r.keywords) for f in futures for r in f.result()]
+            except Exception as e:
+                logging.warning(f"add_batch 进程池抽取失败，回退到逐条抽取: {e}")
+        return [self._extract_for_ingest(content, skip_llm) for content in contents]
+
+    def _extract_for_ingest(self, content, skip_llm):
+        """单条抽取：SmartExtractor（skip_llm 时强制规则模式），失败回退到规则提取器"""
+        import logging
+
+        engine = self._engine
+        if engine.smart_extractor:
+            try:
+                if skip_llm:
+                    from recall.processor.smart_extractor import ExtractionMode
+                    result = engine.smart_extractor.extract(content, force_mode=ExtractionMode.RULES)
+                else:
+                    result = engine.smart_extractor.extract(content)
+                if result:
+                    return result.entities, result.keywords
+            except Exception as e:
+                logging.warning(f"add_batch SmartExtractor 失败，回退到规则提取器: {e}")
+        if engine.entity_extractor:
+            try:
+                entities = engine.entity_extractor.extract(content)
+                keywords = (engine.entity_extractor.extract_keywords(content)
+                            if hasattr(engine.entity_extractor, 'extract_keywords') else [])
+                return entities, keywords
+            except Exception as e:
+                logging.warning(f"add_batch 规则提取器也失败: {e}")
+        return [], []
+
+    @staticmethod
+    def _parse_event_time(event_time_str):
+        """解析 metadata.event_time（时间意图解析写入的 ISO 格式），无法解析返回 None"""
+        if not event_time_str:
+            return None
+        from datetime import datetime as _dt
+        for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S.%f'):
+            try:
+                return _dt.strptime(event_time_str, fmt)
+            except ValueError:
+                continue
+        return None
+
     # ==================== _add_single_fast ====================
 
     def _add_single_fast(self, content, embedding, metadata, user_id, skip_dedup, skip_llm):
-        """单条快速添加（add_batch 内部使用）"""
+        """单条快速添加（add_batch 内部使用）
+
+        embedding 通常由 add_batch 批量预计算；为 None 时走带缓存的编码。
+        """
         engine = self._engine
         memory_id = f"mem_{uuid.uuid4().hex[:12]}"
 
+        if embedding is None and engine.embedding_backend:
+            embedding = engine.embedding_backend.encode_batch_with_cache([content])[0]
+
         # 去重检查
         if not skip_dedup:
             scope = engine.storage.get_scope(user_id)
@@ -1367,6 +1698,10 @@ class MemoryOperations:
                 import logging
                 logging.warning(f"_add_single_fast TextSearchBackend dual-write failed: {e}")
 
+        # v7.1: 增量去重索引
+        self._index_for_dedup(user_id, memory_id, content, embedding)
+        self._index_for_consistency(user_id, memory_id, content)
+
         # 规则级关系提取
         relations = []
         if engine.relation_extractor and entities:
@@ -1399,36 +1734,32 @@ class MemoryOperations:
             logging.warning(f"_batch_update_indexes inverted index failed: {e}")
 
         # 批量更新实体索引（v7.0.10: 传递完整实体参数，与 add()/add_turn() 对齐）
+        # v7.1: 整批合并后每个实体只追加一行 WAL
         try:
             if engine._entity_index and all_entities:
+                occurrences = []
                 for entity_or_name, mid in all_entities:
                     # 兼容旧格式 (str, mid) 和新格式 (entity_obj, mid)
                     if isinstance(entity_or_name, str):
-                        engine._entity_index.add_entity_occurrence(entity_or_name, mid)
+                        occurrences.append({'entity_name': entity_or_name, 'turn_id': mid})
                     else:
                         entity = entity_or_name
-                        entity_name = entity.name if hasattr(entity, 'name') else str(entity)
-                        entity_type = getattr(entity, 'entity_type', 'UNKNOWN')
-                        aliases = getattr(entity, 'aliases', [])
-                        confidence = getattr(entity, 'confidence', 0.5)
-                        engine._entity_index.add_entity_occurrence(
-                            entity_name=entity_name,
-                            turn_id=mid,
-                            context='',
-                            entity_type=entity_type,
-                            aliases=aliases,
-                            confidence=confidence
-                        )
+                        occurrences.append({
+                            'entity_name': entity.name if hasattr(entity, 'name') else str(entity),
+                            'turn_id': mid,
+                            'entity_type': getattr(entity, 'entity_type', 'UNKNOWN'),
+                            'aliases': getattr(entity, 'aliases', []),
+                            'confidence': getattr(entity, 'confidence', 0.5),
+                        })
+                engine._entity_index.add_occurrences(occurrences)
         except Exception as e:
             import logging
             logging.warning(f"_batch_update_indexes entity index failed: {e}")
 
-        # 批量更新 N-gram 索引
+        # 批量更新 N-gram 索引（v7.1: 原文整批追加，名词短语索引只保存一次）
         try:
             if engine._ngram_index and all_ngram_data:
-                for mid, content in all_ngram_data:
-                    engine._ngram_index.add(mid, content)
-                engine._ngram_index.save()
+                engine._ngram_index.add_batch(all_ngram_data)
         except Exception as e:
             import logging
             logging.warning(f"_batch_update_indexes ngram index failed: {e}")
@@ -1452,15 +1783,10 @@ class MemoryOperations:
             import logging
             logging.warning(f"_batch_update_indexes knowledge graph failed: {e}")
 
-        # 批量更新全文索引 BM25
+        # 批量更新全文索引 BM25（v7.1: 整批一次写缓冲日志）
         try:
             if engine.fulltext_index is not None and all_ngram_data:
-                for mid, content in all_ngram_data:
-                    try:
-                        engine.fulltext_index.add(mid, content)
-                    except Exception as e:
-                        import logging
-                        logging.warning(f"batch fulltext index update failed: {e}")
+                engine.fulltext_index.add_batch(all_ngram_data)
         except Exception as e:
             import logging
             logging.warning(f"_batch_update_indexes fulltext index failed: {e}")
@@ -1562,36 +1888,26 @@ class MemoryOperations:
                         item_type="memory"
                     )
 
-                    existing_items = []
-                    for mem in existing_memories:
-                        mem_content = mem.get('content', '').strip()
-                        if mem_content:
-                            existing_items.append(DedupItem(
-                                id=mem.get('metadata', {}).get('id', str(uuid_module.uuid4())),
-                                name=mem_content[:100],
-                                content=mem_content,
-                                item_type="memory"
-                            ))
-
-                    if existing_items:
-                        user_dedup_result = engine.deduplicator.deduplicate([user_item], existing_items)
-                        user_is_dup = len(user_dedup_result.matches) > 0
-
-                        ai_dedup_result = engine.deduplicator.deduplicate([ai_item], existing_items)
-                        ai_is_dup = len(ai_dedup_result.matches) > 0
-
-                        _safe_print(f"[Engine][Turn]    语义去重结果: user_dup={user_is_dup}, ai_dup={ai_is_dup}")
-
-                        if user_is_dup and ai_is_dup:
-                            user_match_type = user_dedup_result.matches[0].match_type.value
-                            user_conf = user_dedup_result.matches[0].confidence
-                            ai_match_type = ai_dedup_result.matches[0].match_type.value
-                            ai_conf = ai_dedup_result.matches[0].confidence
-                            _safe_print(f"[Engine][Turn] [SKIP] 语义去重: 用户消息({user_match_type},{user_conf:.2f}) + AI回复({ai_match_type},{ai_conf:.2f})")
-                            return AddTurnResult(
-                                success=False,
-                                message=f"对话轮次已存在（用户消息:{user_match_type}, AI回复:{ai_match_type}）"
-                            )
+                    # v7.1: 与 add() 共用按用户的增量去重索引
+                    self._ensure_dedup_scope(user_id, existing_memories)
+                    user_dedup_result = engine.deduplicator.deduplicate([user_item], scope=user_id)
+                    user_is_dup = len(user_dedup_result.matches) > 0
+
+                    ai_dedup_result = engine.deduplicator.deduplicate([ai_item], scope=user_id)
+                    ai_is_dup = len(ai_dedup_result.matches) > 0
+
+                    _safe_print(f"[Engine][Turn]    语义去重结果: user_dup={user_is_dup}, ai_dup={ai_is_dup}")
+
+                    if user_is_dup and ai_is_dup:
+                        user_match_type = user_dedup_result.matches[0].match_type.value
+                        user_conf = user_dedup_result.matches[0].confidence
+                        ai_match_type = ai_dedup_result.matches[0].match_type.value
+                        ai_conf = ai_dedup_result.matches[0].confidence
+                        _safe_print(f"[Engine][Turn] [SKIP] 语义去重: 用户消息({user_match_type},{user_conf:.2f}) + AI回复({ai_match_type},{ai_conf:.2f})")
+                        return AddTurnResult(
+                            success=False,
+                            message=f"对话轮次已存在（用户消息:{user_match_type}, AI回复:{ai_match_type}）"
+                        )
                 except Exception as e:
                     _safe_print(f"[Engine][Turn] [WARN] 去重检查失败，继续处理: {e}")
             else:
@@ -1681,7 +1997,12 @@ class MemoryOperations:
                 analysis_start = time.time()
                 try:
                     from .processor.unified_analyzer import UnifiedAnalysisInput, AnalysisTask
-                    existing_mems_for_check = engine.search(combined_content, user_id=user_id, top_k=5)
+                    existing_mems_for_check = engine.search(combined_content, user_id=user_id, top_k=5, query_context=QueryContext(
+                        query=combined_content,
+                        entities=[e.name for e in entities],
+                        keywords=keywords,
+                        embedding=combined_embedding,
+                    ))
                     _safe_print(f"[Engine][Turn]    统一分析器: 找到 {len(existing_mems_for_check)} 条相关记忆用于对比")
 
                     analysis_result = engine.unified_analyzer.analyze(UnifiedAnalysisInput(
@@ -1817,11 +2138,18 @@ class MemoryOperations:
 
                 # 一致性检查回退
                 try:
-                    existing_mems_for_check = engine.search(combined_content, user_id=user_id, top_k=5)
+                    existing_mems_for_check = engine.search(combined_content, user_id=user_id, top_k=5, query_context=QueryContext(
+                        query=combined_content,
+                        entities=[e.name for e in entities],
+                        keywords=keywords,
+                        embedding=combined_embedding,
+                    ))
                     if existing_mems_for_check:
+                        self._ensure_fact_scope(user_id)
                         consistency = engine.consistency_checker.check(
                             combined_content,
-                            [{'content': m.content} for m in existing_mems_for_check]
+                            [{'content': m.content} for m in existing_mems_for_check],
+                            user_id=user_id
                         )
                         if not consistency.is_consistent:
                             for v in consistency.violations:
@@ -1968,6 +2296,12 @@ class MemoryOperations:
             except Exception as e:
                 _safe_print(f"[Recall][Turn] 向量索引更新失败（不影响主流程）: {e}")
 
+            # (6d+) v7.1: 增量去重索引
+            self._index_for_dedup(user_id, user_memory_id, user_message, _cached_user_embedding)
+            self._index_for_consistency(user_id, user_memory_id, user_message)
+            self._index_for_dedup(user_id, ai_memory_id, ai_response, _cached_ai_embedding)
+            self._index_for_consistency(user_id, ai_memory_id, ai_response)
+
             # (6e) 检索器缓存
             try:
                 if engine.retriever:
@@ -2260,6 +2594,11 @@ class MemoryOperations:
             # 2. 清空该用户的记忆存储
             scope.clear()
 
+            # 2.5 v7.1: 丢弃该用户的增量去重索引 / 一致性事实库
+            if engine.deduplicator is not None:
+                engine.deduplicator.drop_scope(user_id)
+            engine.consistency_checker.drop_fact_scope(user_id)
+
             # 3. 清空该用户在时态知识图谱中的数据
             try:
                 if engine.temporal_graph is not None and hasattr(engine.temporal_graph, 'clear_user'):
@@ -2497,6 +2836,11 @@ class MemoryOperations:
             except Exception as e:
                 _safe_print(f"[Recall][ClearAll] 用户记忆存储清空失败: {e}")
 
+            # 1.5 v7.1: 清空增量去重索引 / 一致性事实库
+            if engine.deduplicator is not None:
+                engine.deduplicator.clear_index()
+            engine.consistency_checker.drop_fact_scope()
+
             # 2. 清空统一图谱
             try:
                 if engine._unified_graph is not None:
@@ -2735,6 +3079,19 @@ class MemoryOperations:
         except Exception as e:
             _safe_print(f"[Recall][Delete] [3b] IVF 向量索引清理失败: {e}")
 
+        # ===== 3c. v7.1: 增量去重索引 =====
+        try:
+            if engine.deduplicator is not None:
+                engine.deduplicator.remove_from_index(memory_ids_list, scope=user_id)
+        except Exception as e:
+            _safe_print(f"[Recall][Delete] [3c] 去重索引清理失败: {e}")
+
+        # ===== 3d. v7.1: 一致性事实库 =====
+        try:
+            engine.consistency_checker.remove_memories(memory_ids_list)
+        except Exception as e:
+            _safe_print(f"[Recall][Delete] [3d] 一致性事实库清理失败: {e}")
+
         # ===== 4. EntityIndex =====
         try:
             if engine._entity_index is not None:
@@ -3014,6 +3371,10 @@ class MemoryOperations:
             except Exception as e:
                 _safe_print(f"[Recall v7.0] update() 向量索引同步失败: {e}")
 
+            # (1b) v7.1: 增量去重索引（同 ID 重新加入即替换旧签名与向量）
+            self._index_for_dedup(user_id, memory_id, content, new_embedding)
+            self._index_for_consistency(user_id, memory_id, content)
+
             # (2) 倒排索引：remove + add
             try:
                 if engine._inverted_index:
@@ -156,6 +156,23 @@ class MetricsCollector:
             "recall_active_connections",
             "Current active HTTP connections",
         )
+        # v7.1: EngineExecutor 读/写线程池
+        self.executor_read_queue_depth = _Gauge(
+            "recall_executor_read_queue_depth",
+            "Engine calls waiting for a read pool thread",
+        )
+        self.executor_write_queue_depth = _Gauge(
+            "recall_executor_write_queue_depth",
+            "Engine calls waiting for a write pool thread",
+        )
+        self.executor_read_active = _Gauge(
+            "recall_executor_read_active",
+            "Engine calls running on the read pool",
+        )
+        self.executor_write_active = _Gauge(
+            "recall_executor_write_active",
+            "Engine calls running on the write pool",
+        )
 
         # 直方图
         self.request_latency = _Histogram(
@@ -188,6 +205,15 @@ class MetricsCollector:
         self.memory_add_count.inc()
         self.add_latency.observe(duration_ms)
 
+    def record_executor(self, pool: str, queue_depth: int, active: int) -> None:
+        """更新 EngineExecutor 线程池的排队深度 / 运行数"""
+        if pool == "read":
+            self.executor_read_queue_depth.set(queue_depth)
+            self.executor_read_active.set(active)
+        elif pool == "write":
+            self.executor_write_queue_depth.set(queue_depth)
+            self.executor_write_active.set(active)
+
     def record_cache_hit(self) -> None:
         self.cache_hit_count.inc()
 
@@ -214,6 +240,8 @@ class MetricsCollector:
             self.memory_add_count, self.memory_search_count,
             self.cache_hit_count, self.cache_miss_count,
             self.memory_count, self.active_connections,
+            self.executor_read_queue_depth, self.executor_write_queue_depth,
+            self.executor_read_active, self.executor_write_active,
             self.request_latency, self.search_latency, self.add_latency,
         ]
         lines: List[str] = []
@@ -247,6 +275,10 @@ class MetricsCollector:
             "cache_hit_rate": round(self.cache_hit_rate, 4),
             "memory_count": self.memory_count.value,
             "active_connections": self.active_connections.value,
+            "executor_read_queue_depth": self.executor_read_queue_depth.value,
+            "executor_write_queue_depth": self.executor_write_queue_depth.value,
+            "executor_read_active": self.executor_read_active.value,
+            "executor_write_active": self.executor_write_active.value,
             "request_latency_avg_ms": round(self.request_latency.avg, 2),
             "request_latency_count": self.request_latency.count,
             "search_latency_avg_ms": round(self.search_latency.avg, 2),
@@ -4,11 +4,20 @@ Non-blocking write queue for memory storage operations.
 Prevents bulk imports from blocking search requests.
 """
 
-from .async_writer import AsyncWritePipeline, WriteOperation, OperationType, PipelineStatus
+from .async_writer import AsyncWritePipeline, WriteOperation, OperationType, PipelineStatus, OpState, OpStatus
+from .spool import WriteSpool
+from .engine_executor import EngineExecutor, ExecutorPoolStatus, ExecutorSaturated, ClientDisconnected
 
 __all__ = [
     "AsyncWritePipeline",
     "WriteOperation",
     "OperationType",
     "PipelineStatus",
+    "OpState",
+    "OpStatus",
+    "WriteSpool",
+    "EngineExecutor",
+    "ExecutorPoolStatus",
+    "ExecutorSaturated",
+    "ClientDisconnected",
 ]
@@ -2,16 +2,37 @@
 Recall v7.0 - Async Write Pipeline
 Non-blocking write queue for memory storage operations.
 Prevents bulk imports from blocking search requests.
+
+v7.1:
+* Optional persistent mode (``spool_path``): every op is recorded in a
+  :class:`~recall.pipeline.spool.WriteSpool` before ``enqueue()`` returns,
+  acknowledged there once the engine has applied it, and replayed on the
+  next start if the process died first.
+* Workers coalesce consecutive ADD_BATCH ops (and, with ``coalesce_adds``,
+  plain ADD ops) into ``engine.add_batch`` calls (one call per run of items
+  with the same ``user_id``) instead of one ``engine.add`` per item.
+  ``add_batch`` does less per item than ``engine.add``: no consistency check,
+  no contradiction detection / unified analyzer. Plain ADD ops therefore keep
+  ``engine.add`` unless ``coalesce_adds`` (RECALL_PIPELINE_COALESCE_ADDS) is on.
+  Without an embedding backend (lite mode) ``add_batch`` is unavailable and
+  every item falls back to ``engine.add``.
+* Per-op status (queued / processing / committed / failed, produced memory
+  ids) is queryable by ``op_id`` via :meth:`AsyncWritePipeline.get_op`;
+  :meth:`AsyncWritePipeline.wait_for` lets a reader block until given ops
+  (or every op up to one of them) are applied — read-your-writes without
+  polling.
 """
 from __future__ import annotations
 
 import asyncio
 import enum
+import heapq
 import time
 import threading
 import uuid
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from ..engine import RecallEngine
@@ -52,6 +73,42 @@ class WriteOperation:
     retries: int = 0
 
 
+class OpState(str, enum.Enum):
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    COMMITTED = "committed"
+    FAILED = "failed"
+
+
+@dataclass
+class OpStatus:
+    """Lifecycle of one enqueued operation."""
+    op_id: str
+    op_type: str
+    seq: int = 0  # enqueue order within this process (replayed ops included)
+    state: OpState = OpState.QUEUED
+    memory_ids: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (OpState.COMMITTED, OpState.FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "op_id": self.op_id,
+            "op_type": self.op_type,
+            "seq": self.seq,
+            "state": self.state.value,
+            "memory_ids": list(self.memory_ids),
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
 @dataclass
 class PipelineStatus:
     """Snapshot of pipeline health metrics."""
@@ -65,6 +122,9 @@ class PipelineStatus:
     is_running: bool = False
     workers: int = 0
     rate_limit_qps: float = 0.0
+    persistent: bool = False
+    total_replayed: int = 0
+    total_coalesced_calls: int = 0
 
 
 # ---------------------------------------------------------------------------
@@ -78,6 +138,7 @@ class AsyncWritePipeline:
     * Background workers drain the queue and call the engine.
     * When the queue exceeds 80 % capacity, ``is_overloaded`` returns *True*
       so the server middleware can respond with *429 Retry-After*.
+    * With ``spool_path`` set, acknowledged ops survive a crash (at-least-once).
     """
 
     OVERFLOW_THRESHOLD = 0.80  # 80 % → signal back-pressure
@@ -88,11 +149,33 @@ class AsyncWritePipeline:
         max_size: int = 10_000,
         rate_limit_qps: float = 0.0,  # 0 = unlimited
         num_workers: int = 2,
+        spool_path: Optional[str] = None,
+        coalesce_max_items: int = 500,
+        status_retention: int = 10_000,
+        coalesce_adds: bool = False,
     ):
         self._engine = engine
         self._max_size = max_size
         self._rate_limit_qps = rate_limit_qps
         self._num_workers = num_workers
+        self._coalesce_max_items = max(1, coalesce_max_items)
+        # Plain ADD ops only go through add_batch when opted in (reduced per-item processing)
+        self._coalesce_types = _ADD_TYPES if coalesce_adds else (OperationType.ADD_BATCH,)
+        self._status_retention = max(1, status_retention)
+
+        self._spool = None
+        if spool_path:
+            from .spool import WriteSpool
+            self._spool = WriteSpool(spool_path, retention=status_retention)
+        self._replay_task: Optional[asyncio.Task] = None
+
+        # op_id -> OpStatus (oldest first; finished entries evicted past retention)
+        self._ops: "OrderedDict[str, OpStatus]" = OrderedDict()
+        self._ops_lock = threading.Lock()
+        self._next_seq = 0
+        self._unfinished: set = set()         # seqs of queued / processing ops
+        self._unfinished_heap: List[int] = []  # same seqs, lazily pruned min-heap
+        self._progress: Optional[asyncio.Condition] = None  # notified when ops finish
 
         self._queue: asyncio.Queue[Optional[WriteOperation]] = asyncio.Queue(maxsize=max_size)
         self._running = False
@@ -105,6 +188,8 @@ class AsyncWritePipeline:
         self._rate_window_start = time.monotonic()
         self._rate_window_count = 0
         self._current_qps: float = 0.0
+        self._total_replayed = 0
+        self._total_coalesced_calls = 0
         self._lock = threading.Lock()  # protects metric snapshots
 
         # For cross-thread enqueue
@@ -120,10 +205,28 @@ class AsyncWritePipeline:
             return
         self._running = True
         self._loop = asyncio.get_running_loop()
+        self._progress = asyncio.Condition()
         for i in range(self._num_workers):
             task = asyncio.create_task(self._worker(i), name=f"pipeline-worker-{i}")
             self._workers.append(task)
-        _safe_print(f"[Pipeline] [START] Async write pipeline started ({self._num_workers} workers, capacity={self._max_size})")
+        if self._spool is not None:
+            pending = await self._loop.run_in_executor(None, self._spool.pending)
+            if pending:
+                self._replay_task = asyncio.create_task(self._replay(pending), name="pipeline-replay")
+        _safe_print(f"[Pipeline] [START] Async write pipeline started ({self._num_workers} workers, capacity={self._max_size}"
+                    f"{', persistent' if self._spool is not None else ''})")
+
+    async def _replay(self, pending: List[Tuple[int, str, str, Dict[str, Any], float]]) -> None:
+        """Re-queue ops acknowledged before a crash / restart (blocking puts respect capacity)."""
+        _safe_print(f"[Pipeline] [SYNC] Replaying {len(pending)} spooled op(s)")
+        for _seq, op_id, op_type, payload, created_at in pending:
+            op = WriteOperation(op_type=OperationType(op_type), payload=payload,
+                                op_id=op_id, created_at=created_at)
+            self._track(op)
+            await self._queue.put(op)
+            with self._lock:
+                self._total_enqueued += 1
+                self._total_replayed += 1
 
     async def stop(self, timeout: float = 30.0) -> None:
         """Gracefully drain the queue then cancel workers."""
@@ -131,6 +234,11 @@ class AsyncWritePipeline:
             return
         self._running = False
 
+        if self._replay_task is not None:
+            # Unreplayed ops stay ``queued`` in the spool for the next start
+            self._replay_task.cancel()
+            self._replay_task = None
+
         # Enqueue sentinel values so workers unblock
         for _ in self._workers:
             try:
@@ -143,6 +251,8 @@ class AsyncWritePipeline:
         for t in pending:
             t.cancel()
         self._workers.clear()
+        if self._spool is not None:
+            self._spool.close()
         _safe_print(f"[Pipeline] Pipeline stopped. Processed={self._total_processed}, Errors={self._total_errors}")
 
     # ------------------------------------------------------------------
@@ -166,13 +276,7 @@ class AsyncWritePipeline:
 
         if running_loop is self._loop:
             # Already on the event loop — non-blocking put
-            try:
-                self._queue.put_nowait(operation)
-                with self._lock:
-                    self._total_enqueued += 1
-                return True
-            except asyncio.QueueFull:
-                return False
+            return self._put(operation)
         else:
             # Called from a sync / different thread
             if self._loop is None:
@@ -186,13 +290,157 @@ class AsyncWritePipeline:
                 return False
 
     async def _async_enqueue(self, operation: WriteOperation) -> bool:
-        try:
-            self._queue.put_nowait(operation)
-            with self._lock:
-                self._total_enqueued += 1
-            return True
-        except asyncio.QueueFull:
+        return self._put(operation)
+
+    def _put(self, operation: WriteOperation) -> bool:
+        """Spool (persistent mode) then queue *operation*; runs on the loop thread."""
+        if self._queue.full():
             return False
+        if self._spool is not None:
+            try:
+                self._spool.append(operation.op_id, operation.op_type.value,
+                                   operation.payload, operation.created_at)
+            except Exception as exc:
+                _safe_print(f"[Pipeline] [FAIL] Spool write failed for op={operation.op_id}: {exc}")
+                return False
+        self._track(operation)
+        self._queue.put_nowait(operation)
+        with self._lock:
+            self._total_enqueued += 1
+        return True
+
+    # ------------------------------------------------------------------
+    # Per-op status
+    # ------------------------------------------------------------------
+
+    def _track(self, operation: WriteOperation) -> None:
+        with self._ops_lock:
+            self._next_seq += 1
+            status = OpStatus(op_id=operation.op_id, op_type=operation.op_type.value,
+                              seq=self._next_seq, created_at=operation.created_at)
+            self._unfinished.add(status.seq)
+            heapq.heappush(self._unfinished_heap, status.seq)
+            self._ops[operation.op_id] = status
+            excess = len(self._ops) - self._status_retention
+            if excess > 0:
+                # Drop the oldest *finished* entries; queued ones are always kept
+                stale = []
+                for op_id, old in self._ops.items():
+                    if old.finished:
+                        stale.append(op_id)
+                        if len(stale) >= excess:
+                            break
+                for op_id in stale:
+                    del self._ops[op_id]
+
+    def _set_state(self, op_id: str, state: OpState, memory_ids: Optional[List[str]] = None,
+                   error: Optional[str] = None) -> None:
+        with self._ops_lock:
+            status = self._ops.get(op_id)
+            if status is None:
+                return
+            status.state = state
+            if memory_ids is not None:
+                status.memory_ids = list(memory_ids)
+            status.error = error
+            status.updated_at = time.time()
+            if status.finished:
+                self._unfinished.discard(status.seq)
+
+    def _oldest_unfinished_seq(self) -> Optional[int]:
+        # Caller holds ``self._ops_lock``.
+        heap = self._unfinished_heap
+        while heap and heap[0] not in self._unfinished:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _pending_of(self, op_ids: List[str], min_op_id: Optional[str]) -> List[str]:
+        """Which of the awaited ops are not applied yet (see :meth:`wait_for`)."""
+        pending = []
+        lookup = []
+        with self._ops_lock:
+            for op_id in op_ids:
+                status = self._ops.get(op_id)
+                if status is None:
+                    lookup.append(op_id)
+                elif not status.finished:
+                    pending.append(op_id)
+            if min_op_id is not None:
+                status = self._ops.get(min_op_id)
+                oldest = self._oldest_unfinished_seq()
+                if status is not None and oldest is not None and oldest <= status.seq:
+                    pending.append(min_op_id)
+        # Not tracked in memory: an op from an earlier run may still wait in the spool
+        for op_id in lookup:
+            status = self.get_op(op_id)
+            if status is not None and not status.finished:
+                pending.append(op_id)
+        return pending
+
+    async def wait_for(
+        self,
+        op_ids: Optional[List[str]] = None,
+        min_op_id: Optional[str] = None,
+        timeout: float = 5.0,
+    ) -> List[str]:
+        """Block until the given ops have been applied (committed or failed).
+
+        Parameters
+        ----------
+        op_ids
+            Wait for each of these ops.
+        min_op_id
+            Wait for this op **and every op enqueued before it**.
+        timeout
+            Give up after this many seconds.
+
+        Returns the op ids still pending when the wait ended (empty list =
+        the writes are visible to subsequent reads).  Unknown op ids (never
+        enqueued, or finished and past retention) count as applied.
+        """
+        op_ids = list(op_ids or [])
+        if not op_ids and min_op_id is None:
+            return []
+        pending = self._pending_of(op_ids, min_op_id)
+        if not pending or self._progress is None:
+            return pending
+        deadline = time.monotonic() + max(0.0, timeout)
+        async with self._progress:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._progress.wait(), timeout=min(remaining, 1.0))
+                except asyncio.TimeoutError:
+                    pass  # periodic re-check rather than relying on every notify
+                pending = self._pending_of(op_ids, min_op_id)
+        return pending
+
+    def get_op(self, op_id: str) -> Optional[OpStatus]:
+        """Status of *op_id*, or ``None`` if unknown (never enqueued or past retention).
+
+        In persistent mode ops from earlier runs are looked up in the spool.
+        """
+        with self._ops_lock:
+            status = self._ops.get(op_id)
+            if status is not None:
+                return OpStatus(**{**status.__dict__, "memory_ids": list(status.memory_ids)})
+        if self._spool is None:
+            return None
+        row = self._spool.get(op_id)
+        if row is None:
+            return None
+        result = row["result"] or {}
+        return OpStatus(
+            op_id=op_id,
+            op_type=row["op_type"],
+            state=OpState(row["state"]),
+            memory_ids=result.get("memory_ids", []),
+            error=result.get("error"),
+            created_at=row["created_at"],
+            updated_at=row["updated_at"] or row["created_at"],
+        )
 
     # ------------------------------------------------------------------
     # Status
@@ -235,6 +483,9 @@ class AsyncWritePipeline:
             is_running=self._running,
             workers=self._num_workers,
             rate_limit_qps=self._rate_limit_qps,
+            persistent=self._spool is not None,
+            total_replayed=self._total_replayed,
+            total_coalesced_calls=self._total_coalesced_calls,
         )
 
     # ------------------------------------------------------------------
@@ -244,71 +495,205 @@ class AsyncWritePipeline:
     async def _worker(self, worker_id: int) -> None:
         """Background task that drains the queue."""
         min_interval = 1.0 / self._rate_limit_qps if self._rate_limit_qps > 0 else 0.0
+        carry: Optional[WriteOperation] = None
+        has_carry = False
 
         while True:
-            op = await self._queue.get()
+            if has_carry:
+                op, has_carry = carry, False
+            else:
+                op = await self._queue.get()
             if op is None:
                 # Sentinel → shutdown
                 self._queue.task_done()
                 break
 
+            group = [op]
+            if op.op_type in self._coalesce_types:
+                # Coalesce the ADD ops that are already waiting behind this one
+                items = _item_count(op)
+                while items < self._coalesce_max_items:
+                    try:
+                        nxt = self._queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        break
+                    if (nxt is not None and nxt.op_type in self._coalesce_types
+                            and _add_flags(nxt) == _add_flags(op)
+                            and items + _item_count(nxt) <= self._coalesce_max_items):
+                        group.append(nxt)
+                        items += _item_count(nxt)
+                    else:
+                        carry, has_carry = nxt, True
+                        break
+
             try:
                 if min_interval > 0:
-                    await asyncio.sleep(min_interval)
-
-                await self._execute(op)
-                with self._lock:
-                    self._total_processed += 1
-                    self._rate_window_count += 1
+                    await asyncio.sleep(min_interval * len(group))
+                for g in group:
+                    self._set_state(g.op_id, OpState.PROCESSING)
+                loop = asyncio.get_running_loop()
+                outcomes = await loop.run_in_executor(None, self._apply, group)
             except Exception as exc:
-                with self._lock:
-                    self._total_errors += 1
-                _safe_print(f"[Pipeline] [FAIL] Worker-{worker_id} op={op.op_id} type={op.op_type}: {exc}")
+                outcomes = {g.op_id: ([], exc) for g in group}
             finally:
-                self._queue.task_done()
+                for _ in group:
+                    self._queue.task_done()
+
+            committed = [g.op_id for g in group if outcomes[g.op_id][1] is None]
+            failed = [g for g in group if outcomes[g.op_id][1] is not None]
+            for g in group:
+                memory_ids, error = outcomes[g.op_id]
+                self._set_state(g.op_id, OpState.FAILED if error else OpState.COMMITTED,
+                                memory_ids, str(error) if error else None)
+            with self._lock:
+                self._total_processed += len(committed)
+                self._total_errors += len(failed)
+                self._rate_window_count += len(group)
+            for g in failed:
+                _safe_print(f"[Pipeline] [FAIL] Worker-{worker_id} op={g.op_id} type={g.op_type}: {outcomes[g.op_id][1]}")
+            if self._progress is not None:
+                async with self._progress:
+                    self._progress.notify_all()
+
+    def _apply(self, group: List[WriteOperation]) -> Dict[str, Tuple[List[str], Optional[BaseException]]]:
+        """Run *group* against the engine (worker thread) and acknowledge it in the spool.
+
+        Returns ``op_id -> (memory_ids, error)``.
+        """
+        if len(group) == 1 and group[0].op_type != OperationType.ADD_BATCH:
+            op = group[0]
+            try:
+                outcomes = {op.op_id: (self._execute(op), None)}
+            except Exception as exc:
+                outcomes = {op.op_id: ([], exc)}
+        elif getattr(self._engine, "embedding_backend", None) is None:
+            # add_batch needs an embedding backend; lite mode keeps per-item engine.add
+            outcomes = self._add_per_item(group)
+        else:
+            outcomes = self._add_coalesced(group)
+
+        if self._spool is not None:
+            for state in (OpState.COMMITTED, OpState.FAILED):
+                ids = [op_id for op_id, (_, error) in outcomes.items() if (error is None) == (state == OpState.COMMITTED)]
+                try:
+                    self._spool.finish(ids, state.value, [
+                        {"memory_ids": outcomes[i][0], "error": str(outcomes[i][1]) if outcomes[i][1] else None}
+                        for i in ids
+                    ])
+                except Exception as exc:  # op stays ``queued`` in the spool → replayed (at-least-once)
+                    _safe_print(f"[Pipeline] [WARN] Spool ack failed: {exc}")
+        return outcomes
+
+    def _add_coalesced(self, group: List[WriteOperation]) -> Dict[str, Tuple[List[str], Optional[BaseException]]]:
+        """Apply ADD / ADD_BATCH ops as ``add_batch`` calls, one per run of same-user items."""
+        skip_dedup, skip_llm = _add_flags(group[0])
+        entries: List[Tuple[str, Dict[str, Any]]] = []  # (op_id, item)
+        for op in group:
+            for item in _add_items(op):
+                entries.append((op.op_id, item))
+
+        memory_ids: Dict[str, List[str]] = {op.op_id: [] for op in group}
+        errors: Dict[str, BaseException] = {}
+        start = 0
+        while start < len(entries):
+            user_id = entries[start][1].get("user_id", "default")
+            end = start
+            while end < len(entries) and entries[end][1].get("user_id", "default") == user_id:
+                end += 1
+            run = entries[start:end]
+
+            def on_added(i: int, memory_id: str, run=run) -> None:
+                memory_ids[run[i][0]].append(memory_id)
 
-    async def _execute(self, op: WriteOperation) -> None:
-        """Dispatch *op* to the engine (run in thread to avoid blocking)."""
-        loop = asyncio.get_running_loop()
+            try:
+                self._engine.add_batch(
+                    [{"content": item["content"], "metadata": item.get("metadata") or {}} for _, item in run],
+                    user_id=user_id,
+                    skip_dedup=skip_dedup,
+                    skip_llm=skip_llm,
+                    on_added=on_added,
+                )
+            except Exception as exc:
+                for op_id, _ in run:
+                    errors.setdefault(op_id, exc)
+            with self._lock:
+                self._total_coalesced_calls += 1
+            start = end
+        return {op.op_id: (memory_ids[op.op_id], errors.get(op.op_id)) for op in group}
+
+    def _add_per_item(self, group: List[WriteOperation]) -> Dict[str, Tuple[List[str], Optional[BaseException]]]:
+        """Apply ADD / ADD_BATCH ops with one ``engine.add`` per item (no embedding backend)."""
+        outcomes: Dict[str, Tuple[List[str], Optional[BaseException]]] = {}
+        for op in group:
+            memory_ids: List[str] = []
+            error: Optional[BaseException] = None
+            for item in _add_items(op):
+                try:
+                    memory_ids.extend(self._add_one(item))
+                except Exception as exc:
+                    error = error or exc
+            outcomes[op.op_id] = (memory_ids, error)
+        return outcomes
+
+    def _add_one(self, item: Dict[str, Any]) -> List[str]:
+        result = self._engine.add(
+            item["content"],
+            user_id=item.get("user_id", "default"),
+            metadata=item.get("metadata"),
+        )
+        if getattr(result, "success", True):
+            return [result.id]
+        if not getattr(result, "id", ""):
+            raise RuntimeError(getattr(result, "message", "") or "add failed")
+        return []  # duplicate of an existing memory: nothing new written
+
+    def _execute(self, op: WriteOperation) -> List[str]:
+        """Apply a single non-batched *op*; returns the memory ids it produced."""
         engine = self._engine
 
         if op.op_type == OperationType.ADD:
-            await loop.run_in_executor(
-                None,
-                lambda: engine.add(
-                    op.payload["content"],
-                    user_id=op.payload.get("user_id", "default"),
-                    metadata=op.payload.get("metadata"),
-                ),
-            )
-        elif op.op_type == OperationType.ADD_BATCH:
-            items = op.payload.get("items", [])
-            for item in items:
-                await loop.run_in_executor(
-                    None,
-                    lambda i=item: engine.add(
-                        i["content"],
-                        user_id=i.get("user_id", "default"),
-                        metadata=i.get("metadata"),
-                    ),
-                )
+            return self._add_one(op.payload)
         elif op.op_type == OperationType.DELETE:
-            await loop.run_in_executor(
-                None,
-                lambda: engine.delete(
-                    op.payload["memory_id"],
-                    user_id=op.payload.get("user_id", "default"),
-                ),
+            engine.delete(
+                op.payload["memory_id"],
+                user_id=op.payload.get("user_id", "default"),
             )
+            return [op.payload["memory_id"]]
         elif op.op_type == OperationType.UPDATE:
-            await loop.run_in_executor(
-                None,
-                lambda: engine.update(
-                    op.payload["memory_id"],
-                    content=op.payload.get("content", ""),
-                    user_id=op.payload.get("user_id", "default"),
-                    metadata=op.payload.get("metadata"),
-                ),
+            engine.update(
+                op.payload["memory_id"],
+                content=op.payload.get("content", ""),
+                user_id=op.payload.get("user_id", "default"),
+                metadata=op.payload.get("metadata"),
             )
+            return [op.payload["memory_id"]]
         else:
             raise ValueError(f"Unknown operation type: {op.op_type}")
+
+
+# ---------------------------------------------------------------------------
+# Coalescing helpers
+# ---------------------------------------------------------------------------
+
+_ADD_TYPES = (OperationType.ADD, OperationType.ADD_BATCH)
+
+
+def _add_items(op: WriteOperation) -> List[Dict[str, Any]]:
+    if op.op_type == OperationType.ADD:
+        return [op.payload]
+    return op.payload.get("items", [])
+
+
+def _item_count(op: WriteOperation) -> int:
+    return len(op.payload.get("items", [])) if op.op_type == OperationType.ADD_BATCH else 1
+
+
+def _add_flags(op: WriteOperation) -> Tuple[bool, bool]:
+    """``(skip_dedup, skip_llm)`` for an ADD op; only ops with equal flags are coalesced.
+
+    ADD keeps ``engine.add`` semantics (dedup + LLM extraction); ADD_BATCH
+    defaults to ``engine.add_batch``'s (dedup, rule-based extraction).
+    """
+    default_skip_llm = op.op_type == OperationType.ADD_BATCH
+    return (bool(op.payload.get("skip_dedup", False)),
+            bool(op.payload.get("skip_llm", default_skip_llm)))
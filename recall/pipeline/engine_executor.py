@@ -0,0 +1,196 @@
+"""
+Recall v7.1 - Engine Executor
+Runs synchronous engine calls off the asyncio event loop.
+
+The REST handlers are ``async def`` but ``RecallEngine`` is synchronous: one
+slow embedding or LLM call made directly in a handler freezes every other
+request on the uvicorn worker.  ``EngineExecutor`` moves that work onto two
+bounded thread pools — reads (search / context) and writes (add / turn) — so a
+bulk ingest stream cannot starve search of threads.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict
+
+
+class ExecutorSaturated(RuntimeError):
+    """The pool's queue is full; the caller should retry later (HTTP 503)."""
+
+    def __init__(self, pool: str, retry_after: int = 1):
+        super().__init__(f"{pool} pool is saturated")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class ClientDisconnected(RuntimeError):
+    """The client went away while its engine call was waiting or running."""
+
+
+@dataclass
+class ExecutorPoolStatus:
+    """Snapshot of a single pool's health metrics."""
+    name: str = ""
+    workers: int = 0
+    max_queue: int = 0
+    queue_depth: int = 0
+    active: int = 0
+    total_submitted: int = 0
+    total_completed: int = 0
+    total_rejected: int = 0
+    total_cancelled: int = 0
+    avg_wait_ms: float = 0.0
+
+
+class _BoundedPool:
+    """ThreadPoolExecutor with an admission limit and queue-depth accounting."""
+
+    def __init__(self, name: str, workers: int, max_queue: int, metrics: Any = None):
+        self.name = name
+        self._metrics = metrics
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix=f"recall-{name}"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._cancelled = 0
+        self._wait_ms_total = 0.0
+        self._started = 0
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        with self._lock:
+            if self._queued + self._active >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturated(self.name)
+            self._queued += 1
+            self._submitted += 1
+            self._publish()
+        enqueued_at = time.monotonic()
+
+        def _call():
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._started += 1
+                self._wait_ms_total += (time.monotonic() - enqueued_at) * 1000
+                self._publish()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+                    self._publish()
+
+        future = self._executor.submit(_call)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future) -> None:
+        # _call never ran for a future cancelled while still queued
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+                self._cancelled += 1
+                self._publish()
+
+    def _publish(self) -> None:
+        """Push queue depth / active count to the metrics collector (lock held)."""
+        if self._metrics is not None:
+            self._metrics.record_executor(self.name, self._queued, self._active)
+
+    def status(self) -> ExecutorPoolStatus:
+        with self._lock:
+            return ExecutorPoolStatus(
+                name=self.name,
+                workers=self.workers,
+                max_queue=self.max_queue,
+                queue_depth=self._queued,
+                active=self._active,
+                total_submitted=self._submitted,
+                total_completed=self._completed,
+                total_rejected=self._rejected,
+                total_cancelled=self._cancelled,
+                avg_wait_ms=round(self._wait_ms_total / self._started, 2) if self._started else 0.0,
+            )
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class EngineExecutor:
+    """Separate bounded read/write thread pools for engine calls.
+
+    * ``run_read()`` / ``run_write()`` are awaited from request handlers.
+    * Each pool admits at most ``workers + max_queue`` calls; beyond that
+      ``ExecutorSaturated`` is raised instead of growing an unbounded backlog.
+    * When a ``request`` is passed, the client connection is polled while the
+      call waits.  On disconnect a still-queued call is cancelled; a call that
+      already started runs to completion in the background (threads cannot be
+      interrupted) and the handler stops waiting for it.
+    """
+
+    DISCONNECT_POLL_INTERVAL = 0.25  # seconds
+
+    def __init__(
+        self,
+        read_workers: int = 8,
+        write_workers: int = 2,
+        max_queue: int = 256,
+        metrics: Any = None,
+    ):
+        """
+        Args:
+            read_workers: threads for search / context / listing calls
+            write_workers: threads for add / add_turn / update / delete calls
+            max_queue: calls allowed to wait per pool before ``ExecutorSaturated``
+            metrics: optional ``MetricsCollector`` that receives queue-depth gauges
+        """
+        self.read_pool = _BoundedPool("read", read_workers, max_queue, metrics)
+        self.write_pool = _BoundedPool("write", write_workers, max_queue, metrics)
+
+    async def run_read(self, fn: Callable[..., Any], *args: Any,
+                       request: Any = None, **kwargs: Any) -> Any:
+        """Run a read-only engine call (search, context, listing)."""
+        return await self._run(self.read_pool, fn, args, kwargs, request)
+
+    async def run_write(self, fn: Callable[..., Any], *args: Any,
+                        request: Any = None, **kwargs: Any) -> Any:
+        """Run a mutating engine call (add, add_turn, update, delete)."""
+        return await self._run(self.write_pool, fn, args, kwargs, request)
+
+    async def _run(self, pool: _BoundedPool, fn: Callable[..., Any],
+                   args: tuple, kwargs: dict, request: Any) -> Any:
+        cf = pool.submit(fn, *args, **kwargs)
+        fut = asyncio.wrap_future(cf)
+        if request is None:
+            return await fut
+
+        while True:
+            done, _ = await asyncio.wait({fut}, timeout=self.DISCONNECT_POLL_INTERVAL)
+            if done:
+                return fut.result()
+            if await request.is_disconnected():
+                if not cf.cancel():
+                    # Already running: let it finish, but retrieve its outcome so
+                    # asyncio does not log "exception was never retrieved".
+                    fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+                raise ClientDisconnected(f"client disconnected while waiting on {pool.name} pool")
+
+    def status(self) -> Dict[str, ExecutorPoolStatus]:
+        return {"read": self.read_pool.status(), "write": self.write_pool.status()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Cancel queued calls and stop both pools."""
+        self.read_pool.shutdown(wait=wait)
+        self.write_pool.shutdown(wait=wait)
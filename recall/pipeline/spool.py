@@ -0,0 +1,146 @@
+"""
+Recall v7.1 - Write Spool
+Durable backing store for ``AsyncWritePipeline``.
+
+Without a spool every queued write lives only in an ``asyncio.Queue``: an
+``op_id`` handed back to the client means nothing once the process dies.
+``WriteSpool`` records each operation in a small SQLite database **before**
+``enqueue()`` acknowledges it, marks it ``committed`` / ``failed`` after the
+engine has applied it, and hands back every still-``queued`` row at startup
+so the pipeline can replay it.
+
+Delivery is at-least-once: a crash between the engine committing an op and
+the spool recording that fact replays the op on restart (``add_batch``
+de-duplication absorbs most repeats).  Finished rows are kept for status
+lookups and pruned to the newest ``retention`` rows.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ops (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    op_id      TEXT    NOT NULL UNIQUE,
+    op_type    TEXT    NOT NULL,
+    payload    TEXT    NOT NULL,
+    created_at REAL    NOT NULL,
+    state      TEXT    NOT NULL DEFAULT 'queued',
+    result     TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_ops_state ON ops(state, seq);
+"""
+
+
+class WriteSpool:
+    """SQLite-backed record of pipeline operations.
+
+    Parameters
+    ----------
+    path : str
+        Database file; parent directories are created.
+    retention : int
+        Finished (committed / failed) rows to keep for status lookups.
+    synchronous : str
+        ``PRAGMA synchronous`` for the spool connection.  ``"FULL"``
+        (default) makes an acknowledged op survive power loss.
+    """
+
+    def __init__(self, path: str, retention: int = 10_000, synchronous: str = "FULL"):
+        self.path = path
+        self.retention = max(0, retention)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.executescript(_SCHEMA)
+        self._finished_since_prune = 0
+
+    # ---- writes ------------------------------------------------------------
+
+    def append(self, op_id: str, op_type: str, payload: Dict[str, Any], created_at: float) -> int:
+        """Durably record a new ``queued`` op and return its sequence number."""
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO ops (op_id, op_type, payload, created_at) VALUES (?, ?, ?, ?)",
+                (op_id, op_type, json.dumps(payload, ensure_ascii=False), created_at),
+            )
+            return cur.lastrowid
+
+    def finish(self, op_ids: List[str], state: str, results: Optional[List[Any]] = None) -> None:
+        """Mark *op_ids* ``committed`` / ``failed`` in one transaction.
+
+        ``results`` (aligned with ``op_ids``) is stored as JSON for status
+        lookups: produced memory ids, or the error message.
+        """
+        if not op_ids:
+            return
+        now = time.time()
+        rows = [
+            (state, json.dumps(results[i] if results else None, ensure_ascii=False), now, op_id)
+            for i, op_id in enumerate(op_ids)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "UPDATE ops SET state = ?, result = ?, updated_at = ? WHERE op_id = ?", rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._finished_since_prune += len(rows)
+            if self._finished_since_prune >= max(100, self.retention // 10):
+                self._prune()
+
+    def _prune(self) -> None:
+        # Caller holds ``self._lock``.
+        self._finished_since_prune = 0
+        self._conn.execute(
+            "DELETE FROM ops WHERE state != 'queued' AND seq NOT IN ("
+            "SELECT seq FROM ops WHERE state != 'queued' ORDER BY seq DESC LIMIT ?)",
+            (self.retention,),
+        )
+
+    # ---- reads -------------------------------------------------------------
+
+    def pending(self) -> List[Tuple[int, str, str, Dict[str, Any], float]]:
+        """Every still-``queued`` op, oldest first: ``(seq, op_id, op_type, payload, created_at)``."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, op_id, op_type, payload, created_at FROM ops "
+                "WHERE state = 'queued' ORDER BY seq"
+            ).fetchall()
+        return [(seq, op_id, op_type, json.loads(payload), created_at)
+                for seq, op_id, op_type, payload, created_at in rows]
+
+    def get(self, op_id: str) -> Optional[Dict[str, Any]]:
+        """The spool row for *op_id*, or ``None`` if unknown / pruned."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT seq, op_type, state, result, created_at, updated_at FROM ops WHERE op_id = ?",
+                (op_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        seq, op_type, state, result, created_at, updated_at = row
+        return {
+            "seq": seq,
+            "op_type": op_type,
+            "state": state,
+            "result": json.loads(result) if result else None,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
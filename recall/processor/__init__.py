@@ -9,6 +9,7 @@ from .foreshadowing_analyzer import (
     AnalysisResult
 )
 from .consistency import ConsistencyChecker, ConsistencyResult, Violation
+from .fact_store import ConsistencyFactStore
 from .memory_summarizer import MemorySummarizer, MemoryItem
 from .scenario import ScenarioDetector, ScenarioType, ScenarioInfo
 from .context_tracker import ContextTracker, PersistentContext, ContextType
@@ -71,6 +72,7 @@ __all__ = [
     'ConsistencyChecker',
     'ConsistencyResult',
     'Violation',
+    'ConsistencyFactStore',
     'MemorySummarizer',
     'MemoryItem',
     'ScenarioDetector',
@@ -10,10 +10,12 @@
 import re
 import os
 import time
-from typing import List, Dict, Any, Optional, Tuple, Set
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Set
 from dataclasses import dataclass, field
 from enum import Enum
 
+from .fact_store import ConsistencyFactStore, Fact
+
 # Windows GBK 编码兼容的安全打印函数
 def _safe_print(msg: str) -> None:
     """安全打印函数，替换 emoji 为 ASCII 等价物以避免 Windows GBK 编码错误"""
@@ -197,12 +199,34 @@ class ConsistencyChecker:
         '睡着': 'asleep', '醒来': 'awake',
     }
     
-    def __init__(self, absolute_rules: Optional[List[str]] = None, llm_client = None):
+    # ========== 冲突检测用的模式 ==========
+    # v7.1: 提为类常量 — 事实库检查时也用它们确定要查询哪些实体
+    PAST_INDICATORS = ['之前', '以前', '去年', '上个月', '昨天', '曾经', '年前', '月前', '天前']
+    FUTURE_INDICATORS = ['之后', '以后', '明年', '下个月', '明天', '将来', '年后', '月后', '天后']
+    # 修复：使用非贪婪匹配和中文字符范围，避免"今年"被包含在名字中
+    CURRENT_AGE_PATTERN = r'([\u4e00-\u9fa5\w]{1,10}?)(?:今年|现在|已经)?(\d+)岁'
+    PAST_AGE_PATTERN = r'(\d+)年前.*?([\u4e00-\u9fa5\w]{1,10}?).*?(\d+)岁'
+    NEGATION_ACTION_PATTERNS = [
+        r'(\w{1,10})(?:开始|正在)?(\S{2,6})(?:了|着|过)',  # X做了Y
+        r'(\w{1,10})(\S{2,6})了(\S+)',  # X杀了Y
+    ]
+    DEATH_ACTION_PATTERNS = [
+        r'(\w{1,10})(?:说|说道|问|回答|走|跑|站|坐|笑|哭|看|听|想|做|拿|给|打|杀|吃|喝)',
+        r'(\w{1,10})的(?:声音|脚步|身影|笑声)',
+    ]
+    
+    def __init__(
+        self,
+        absolute_rules: Optional[List[str]] = None,
+        llm_client = None,
+        fact_store: Optional[ConsistencyFactStore] = None
+    ):
         """初始化一致性检查器
         
         Args:
             absolute_rules: 绝对规则列表，用户定义的必须遵守的规则
             llm_client: LLM客户端，用于语义规则检测（可选，无则回退到关键词检测）
+            fact_store: v7.1 增量事实库（可选）；用户建库后 check() 不再逐条重新提取已有记忆
         """
         # v7.0 统一模式配置
         from recall.mode import get_mode_config
@@ -213,6 +237,7 @@ class ConsistencyChecker:
         raw_rules = absolute_rules or []
         self.absolute_rules = self._dedupe_rules(raw_rules)
         self._llm_client = llm_client
+        self.fact_store = fact_store
         
         # ========== 数值属性模式 ==========
         self.number_pattern = re.compile(r'(\d+(?:\.\d+)?)\s*(岁|年|天|米|厘米|公里|kg|斤|个|次|%)')
@@ -340,7 +365,13 @@ class ConsistencyChecker:
         # 当前轮次
         self.current_turn: int = 0
     
-    def check(self, new_content: str, existing_memories: List[Dict[str, Any]], turn_id: int = 0) -> ConsistencyResult:
+    def check(
+        self,
+        new_content: str,
+        existing_memories: Optional[List[Dict[str, Any]]] = None,
+        turn_id: int = 0,
+        user_id: Optional[str] = None
+    ) -> ConsistencyResult:
         """检查新内容与现有记忆的一致性（增强版）
         
         检测内容：
@@ -350,9 +381,15 @@ class ConsistencyChecker:
         4. 关系冲突（朋友vs敌人等对立关系）
         5. 时间线冲突（事件顺序、年龄一致性）
         6. 否定句违反（声称不会X但做了X）
+        
+        v7.1: 传入 user_id 且该用户的事实库已建好时，只提取新内容的事实，
+        与事实库中该用户全部记忆里相同实体的事实比较；existing_memories
+        仅用于事件顺序检测（需要原文）。
         """
         self.current_turn = turn_id
         violations = []
+        existing_memories = existing_memories or []
+        use_store = user_id is not None and self.has_fact_scope(user_id)
         
         # v5.0: 模式感知 — 非 RP 模式下跳过 RP 特有检查
         rp_enabled = self._mode.rp_consistency_enabled
@@ -366,51 +403,14 @@ class ConsistencyChecker:
             new_relationships = self._extract_relationships(new_content)
             new_negations = self._extract_negations(new_content)
         
-            # 2. 构建现有记忆的事实库
+            # 2. 现有记忆的事实库：事实库中按实体查询，或逐条提取
             # 注意：使用 AttributeType 作为 key，保持类型一致性
-            existing_attributes: Dict[str, Dict[AttributeType, List[Tuple[str, str]]]] = {}
-            existing_states: Dict[str, Dict[AttributeType, List[Tuple[str, str]]]] = {}
-            existing_relationships: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
-            existing_negations: Dict[str, Dict[str, str]] = {}
-            
-            for memory in existing_memories:
-                memory_content = memory.get('content', memory.get('text', ''))
-                source = memory_content[:50] + '...' if len(memory_content) > 50 else memory_content
-                
-                # 提取属性
-                mem_attrs = self._extract_all_attributes(memory_content)
-                for entity, attrs in mem_attrs.items():
-                    if entity not in existing_attributes:
-                        existing_attributes[entity] = {}
-                    for attr_type, value in attrs.items():
-                        if attr_type not in existing_attributes[entity]:
-                            existing_attributes[entity][attr_type] = []
-                        existing_attributes[entity][attr_type].append((value, source))
-                
-                # 提取状态
-                mem_states = self._extract_states(memory_content)
-                for entity, states in mem_states.items():
-                    if entity not in existing_states:
-                        existing_states[entity] = {}
-                    for state_type, value in states.items():
-                        if state_type not in existing_states[entity]:
-                            existing_states[entity][state_type] = []
-                        existing_states[entity][state_type].append((value, source))
-                
-                # 提取关系
-                mem_rels = self._extract_relationships(memory_content)
-                for (e1, e2), rel in mem_rels.items():
-                    key = (e1, e2)
-                    if key not in existing_relationships:
-                        existing_relationships[key] = []
-                    existing_relationships[key].append((rel, source))
-                
-                # 提取否定声明
-                mem_negs = self._extract_negations(memory_content)
-                for entity, actions in mem_negs.items():
-                    if entity not in existing_negations:
-                        existing_negations[entity] = {}
-                    existing_negations[entity].update(actions)
+            if use_store:
+                existing_attributes, existing_states, existing_relationships, existing_negations = \
+                    self._lookup_existing_facts(user_id, new_content, new_attributes, new_states, new_relationships)
+            else:
+                existing_attributes, existing_states, existing_relationships, existing_negations = \
+                    self._collect_existing_facts(existing_memories)
             
             # 3. 检测属性冲突
             violations.extend(self._check_attribute_conflicts(
@@ -438,9 +438,14 @@ class ConsistencyChecker:
             ))
         
         # 7. 检测时间线冲突（通用，所有模式都执行）
-        violations.extend(self._check_timeline_full(
-            new_content, new_events, existing_memories
-        ))
+        if use_store:
+            violations.extend(self._check_timeline_indexed(
+                user_id, new_content, existing_memories
+            ))
+        else:
+            violations.extend(self._check_timeline_full(
+                new_content, new_events, existing_memories
+            ))
         
         # 9. 检测绝对规则违反（通用，所有模式都执行）
         violations.extend(self._check_absolute_rules(new_content))
@@ -451,6 +456,168 @@ class ConsistencyChecker:
             confidence=max(0.5, 1.0 - len(violations) * 0.1)
         )
     
+    def _collect_existing_facts(self, existing_memories: List[Dict[str, Any]]):
+        """逐条提取现有记忆的属性 / 状态 / 关系 / 否定声明（未建事实库时）"""
+        existing_attributes: Dict[str, Dict[AttributeType, List[Tuple[str, str]]]] = {}
+        existing_states: Dict[str, Dict[AttributeType, List[Tuple[str, str]]]] = {}
+        existing_relationships: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        existing_negations: Dict[str, Dict[str, str]] = {}
+        
+        for memory in existing_memories:
+            memory_content = memory.get('content', memory.get('text', ''))
+            source = memory_content[:50] + '...' if len(memory_content) > 50 else memory_content
+            
+            # 提取属性
+            mem_attrs = self._extract_all_attributes(memory_content)
+            for entity, attrs in mem_attrs.items():
+                if entity not in existing_attributes:
+                    existing_attributes[entity] = {}
+                for attr_type, value in attrs.items():
+                    if attr_type not in existing_attributes[entity]:
+                        existing_attributes[entity][attr_type] = []
+                    existing_attributes[entity][attr_type].append((value, source))
+            
+            # 提取状态
+            mem_states = self._extract_states(memory_content)
+            for entity, states in mem_states.items():
+                if entity not in existing_states:
+                    existing_states[entity] = {}
+                for state_type, value in states.items():
+                    if state_type not in existing_states[entity]:
+                        existing_states[entity][state_type] = []
+                    existing_states[entity][state_type].append((value, source))
+            
+            # 提取关系
+            mem_rels = self._extract_relationships(memory_content)
+            for (e1, e2), rel in mem_rels.items():
+                key = (e1, e2)
+                if key not in existing_relationships:
+                    existing_relationships[key] = []
+                existing_relationships[key].append((rel, source))
+            
+            # 提取否定声明
+            mem_negs = self._extract_negations(memory_content)
+            for entity, actions in mem_negs.items():
+                if entity not in existing_negations:
+                    existing_negations[entity] = {}
+                existing_negations[entity].update(actions)
+        
+        return existing_attributes, existing_states, existing_relationships, existing_negations
+    
+    def _lookup_existing_facts(
+        self,
+        user_id: str,
+        new_content: str,
+        new_attributes: Dict[str, Dict[AttributeType, str]],
+        new_states: Dict[str, Dict[AttributeType, str]],
+        new_relationships: Dict[Tuple[str, str], str]
+    ):
+        """从事实库取出与新内容相关的实体的事实（结构同 _collect_existing_facts）"""
+        store = self.fact_store
+        existing_attributes: Dict[str, Dict[AttributeType, List[Tuple[str, str]]]] = {}
+        existing_states: Dict[str, Dict[AttributeType, List[Tuple[str, str]]]] = {}
+        existing_relationships: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        existing_negations: Dict[str, Dict[str, str]] = {}
+        
+        for entity, attr, value, source in store.lookup(user_id, 'attr', new_attributes):
+            existing_attributes.setdefault(entity, {}).setdefault(AttributeType(attr), []).append(
+                (value, self._short_source(source))
+            )
+        
+        # 状态还要覆盖新内容中"行动"的角色（生死矛盾检测）
+        state_entities = set(new_states) | self._pattern_entities(self.DEATH_ACTION_PATTERNS, new_content)
+        for entity, state, value, source in store.lookup(user_id, 'state', state_entities):
+            existing_states.setdefault(entity, {}).setdefault(AttributeType(state), []).append(
+                (value, self._short_source(source))
+            )
+        
+        for e1, e2, rel, source in store.lookup(user_id, 'rel', {e1 for e1, _ in new_relationships}):
+            if (e1, e2) in new_relationships:
+                existing_relationships.setdefault((e1, e2), []).append((rel, self._short_source(source)))
+        
+        action_entities = self._pattern_entities(self.NEGATION_ACTION_PATTERNS, new_content)
+        for entity, action, neg_source, _ in store.lookup(user_id, 'neg', action_entities):
+            existing_negations.setdefault(entity, {})[action] = neg_source
+        
+        return existing_attributes, existing_states, existing_relationships, existing_negations
+    
+    @staticmethod
+    def _short_source(content: str) -> str:
+        return content[:50] + '...' if len(content) > 50 else content
+    
+    @staticmethod
+    def _pattern_entities(patterns: List[str], text: str) -> Set[str]:
+        """各模式第一个捕获组（实体）的集合"""
+        entities = set()
+        for pattern in patterns:
+            for match in re.findall(pattern, text):
+                entity = match[0] if isinstance(match, tuple) else match
+                entities.add(entity.strip())
+        return entities
+    
+    # ========== v7.1: 增量事实库维护 ==========
+    
+    def extract_memory_facts(self, content: str) -> List[Fact]:
+        """提取一条记忆中供一致性检查使用的全部事实（写入事实库用）"""
+        facts: List[Fact] = []
+        for entity, attrs in self._extract_all_attributes(content).items():
+            for attr_type, value in attrs.items():
+                facts.append(('attr', entity, attr_type.value, str(value)))
+        for entity, states in self._extract_states(content).items():
+            for state_type, value in states.items():
+                facts.append(('state', entity, state_type.value, str(value)))
+        for (e1, e2), rel in self._extract_relationships(content).items():
+            facts.append(('rel', e1, e2, rel))
+        for entity, actions in self._extract_negations(content).items():
+            for action, neg_source in actions.items():
+                facts.append(('neg', entity, action, neg_source))
+        
+        current_ages, past_ages = self._extract_ages(content)
+        for entity, age in current_ages:
+            facts.append(('age', entity, '', str(age)))
+        for years_ago, entity, past_age in past_ages:
+            facts.append(('past', entity, str(years_ago), str(past_age)))
+        
+        dates, has_past, has_future = self._tense_markers(content)
+        flags = ('p' if has_past else '') + ('f' if has_future else '')
+        if flags:
+            for date in dict.fromkeys(dates):
+                facts.append(('date', '|'.join(date), '', flags))
+        return facts
+    
+    def has_fact_scope(self, user_id: str) -> bool:
+        """该用户的事实库是否已建好"""
+        return self.fact_store is not None and self.fact_store.has_scope(user_id)
+    
+    def build_fact_scope(self, user_id: str, memories: Iterable[Tuple[str, str]]) -> None:
+        """用该用户的全部记忆 (memory_id, content) 建立事实库（每个用户只需一次）"""
+        if self.fact_store is None:
+            return
+        self.fact_store.build_scope(
+            user_id,
+            ((memory_id, content, self.extract_memory_facts(content)) for memory_id, content in memories)
+        )
+    
+    def index_memory(self, user_id: str, memory_id: str, content: str) -> bool:
+        """记忆写入（或更新）后登记其事实；该用户尚未建库时跳过"""
+        if not self.has_fact_scope(user_id):
+            return False
+        return self.fact_store.index_memory(user_id, memory_id, content, self.extract_memory_facts(content))
+    
+    def remove_memories(self, memory_ids: Iterable[str]) -> None:
+        """删除 / 驱逐记忆时移除其事实"""
+        if self.fact_store is not None:
+            self.fact_store.remove_memories(memory_ids)
+    
+    def drop_fact_scope(self, user_id: Optional[str] = None) -> None:
+        """清空该用户（None = 所有用户）的事实库"""
+        if self.fact_store is None:
+            return
+        if user_id is None:
+            self.fact_store.clear()
+        else:
+            self.fact_store.drop_scope(user_id)
+    
     # ========== 属性提取方法（分步提取，避免贪婪匹配问题）==========
     
     def _extract_name_from_prefix(self, prefix: str, max_len: int = 4) -> Optional[str]:
@@ -900,12 +1067,7 @@ class ConsistencyChecker:
         violations = []
         
         # 提取新内容中的动作
-        action_patterns = [
-            (r'(\w{1,10})(?:开始|正在)?(\S{2,6})(?:了|着|过)', 'did'),  # X做了Y
-            (r'(\w{1,10})(\S{2,6})了(\S+)', 'did'),  # X杀了Y
-        ]
-        
-        for pattern, _ in action_patterns:
+        for pattern in self.NEGATION_ACTION_PATTERNS:
             matches = re.findall(pattern, new_content)
             for match in matches:
                 entity = match[0].strip()
@@ -961,6 +1123,80 @@ class ConsistencyChecker:
         
         return violations
     
+    def _check_timeline_indexed(
+        self,
+        user_id: str,
+        new_content: str,
+        existing_memories: List[Dict[str, Any]]
+    ) -> List[Violation]:
+        """时间线检查（v7.1 事实库版）：时态 / 年龄与事实库比较，事件顺序仍需原文"""
+        violations = []
+        store = self.fact_store
+        
+        # 1. 时态冲突：只查与新内容相同的日期
+        new_dates, new_has_past, new_has_future = self._tense_markers(new_content)
+        if new_dates and (new_has_past or new_has_future):
+            date_keys = ['|'.join(d) for d in new_dates]
+            for date_key, _, flags, source in store.lookup(user_id, 'date', date_keys):
+                violations.extend(self._compare_tense(
+                    new_content, new_dates, new_has_past, new_has_future,
+                    [tuple(date_key.split('|'))], 'p' in flags, 'f' in flags, source
+                ))
+        
+        # 2. 年龄一致性：只查新内容声明了年龄的实体
+        current_ages, _ = self._extract_ages(new_content)
+        new_ages = dict(current_ages)
+        if new_ages:
+            for entity, _, old_age, source in store.lookup(user_id, 'age', new_ages):
+                violation = self._age_violation(entity, new_ages[entity], int(old_age), new_content, source)
+                if violation:
+                    violations.append(violation)
+            for entity, years_ago, past_age, source in store.lookup(user_id, 'past', new_ages):
+                violation = self._past_age_violation(
+                    entity, new_ages[entity], int(years_ago), int(past_age), new_content, source
+                )
+                if violation:
+                    violations.append(violation)
+        
+        # 3. 事件顺序
+        violations.extend(self._check_event_sequence(new_content, existing_memories))
+        
+        return violations
+    
+    def _tense_markers(self, text: str) -> Tuple[List[Tuple[str, ...]], bool, bool]:
+        """(日期列表, 是否有过去时标记, 是否有将来时标记)"""
+        return (
+            self.date_pattern.findall(text),
+            any(ind in text for ind in self.PAST_INDICATORS),
+            any(ind in text for ind in self.FUTURE_INDICATORS),
+        )
+    
+    def _compare_tense(
+        self,
+        new_content: str,
+        new_dates: List[Tuple[str, ...]],
+        new_has_past: bool,
+        new_has_future: bool,
+        memory_dates: List[Tuple[str, ...]],
+        mem_has_past: bool,
+        mem_has_future: bool,
+        evidence: str
+    ) -> List[Violation]:
+        """同一具体日期在新旧内容中的时态描述是否矛盾"""
+        violations = []
+        for new_date in new_dates:
+            for mem_date in memory_dates:
+                if new_date == mem_date:
+                    if (new_has_past and mem_has_future) or (new_has_future and mem_has_past):
+                        violations.append(Violation(
+                            type=ViolationType.TIMELINE_CONFLICT,
+                            description=f"时间线冲突：日期 {'-'.join(filter(None, new_date))} 的时态描述矛盾",
+                            evidence=[new_content[:100], evidence[:100]],
+                            severity=0.6,
+                            suggested_resolution="请确认该日期是过去还是将来"
+                        ))
+        return violations
+    
     def _check_tense_conflicts(
         self,
         new_content: str,
@@ -970,38 +1206,71 @@ class ConsistencyChecker:
         violations = []
         
         # 提取新内容的时间表达
-        new_dates = self.date_pattern.findall(new_content)
-        past_indicators = ['之前', '以前', '去年', '上个月', '昨天', '曾经', '年前', '月前', '天前']
-        future_indicators = ['之后', '以后', '明年', '下个月', '明天', '将来', '年后', '月后', '天后']
-        
-        new_has_past = any(ind in new_content for ind in past_indicators)
-        new_has_future = any(ind in new_content for ind in future_indicators)
+        new_dates, new_has_past, new_has_future = self._tense_markers(new_content)
         
         for memory in existing_memories:
             memory_content = memory.get('content', memory.get('text', ''))
-            memory_dates = self.date_pattern.findall(memory_content)
+            memory_dates, mem_has_past, mem_has_future = self._tense_markers(memory_content)
             
             if not memory_dates and not new_dates:
                 continue
             
-            mem_has_past = any(ind in memory_content for ind in past_indicators)
-            mem_has_future = any(ind in memory_content for ind in future_indicators)
-            
             # 检测具体日期的时态冲突
-            for new_date in new_dates:
-                for mem_date in memory_dates:
-                    if new_date == mem_date:
-                        if (new_has_past and mem_has_future) or (new_has_future and mem_has_past):
-                            violations.append(Violation(
-                                type=ViolationType.TIMELINE_CONFLICT,
-                                description=f"时间线冲突：日期 {'-'.join(filter(None, new_date))} 的时态描述矛盾",
-                                evidence=[new_content[:100], memory_content[:100]],
-                                severity=0.6,
-                                suggested_resolution="请确认该日期是过去还是将来"
-                            ))
+            violations.extend(self._compare_tense(
+                new_content, new_dates, new_has_past, new_has_future,
+                memory_dates, mem_has_past, mem_has_future, memory_content
+            ))
         
         return violations
     
+    def _extract_ages(self, text: str) -> Tuple[List[Tuple[str, int]], List[Tuple[int, str, int]]]:
+        """提取年龄声明：([(实体, 年龄)], [(N年前, 实体, 当时年龄)])"""
+        current = []
+        for match in re.findall(self.CURRENT_AGE_PATTERN, text):
+            entity, age = match[0].strip(), int(match[1])
+            # 过滤掉空名字或纯数字
+            if entity and not entity.isdigit():
+                current.append((entity, age))
+        past = [
+            (int(match[0]), match[1].strip(), int(match[2]))
+            for match in re.findall(self.PAST_AGE_PATTERN, text)
+        ]
+        return current, past
+    
+    def _age_violation(
+        self, entity: str, new_age: int, old_age: int, new_content: str, evidence: str
+    ) -> Optional[Violation]:
+        """判断"X今年M岁"与"X今年K岁"是否冲突"""
+        if new_age == old_age:
+            return None
+        # 允许1岁的差异（可能是生日经过）
+        age_diff = abs(new_age - old_age)
+        if age_diff <= 1:
+            return None
+        return Violation(
+            type=ViolationType.AGE_INCONSISTENCY,
+            description=f"【{entity}】的年龄不一致：之前'{old_age}岁' → 现在'{new_age}岁'（差{age_diff}岁）",
+            evidence=[new_content[:100], evidence[:100]],
+            severity=0.7,
+            suggested_resolution=f"请确认{entity}的实际年龄，或说明时间流逝"
+        )
+    
+    def _past_age_violation(
+        self, entity: str, actual_age: int, years_ago: int, past_age: int, new_content: str, evidence: str
+    ) -> Optional[Violation]:
+        """判断由"N年前X是M岁"推算出的当前年龄是否与新声明冲突"""
+        expected_current_age = past_age + years_ago
+        # 允许2岁的误差
+        if abs(actual_age - expected_current_age) <= 2:
+            return None
+        return Violation(
+            type=ViolationType.AGE_INCONSISTENCY,
+            description=f"【{entity}】年龄推算不一致：{years_ago}年前{past_age}岁 → 现在应该约{expected_current_age}岁，但实际是{actual_age}岁",
+            evidence=[new_content[:100], evidence[:100]],
+            severity=0.65,
+            suggested_resolution=f"请确认时间线或{entity}的年龄"
+        )
+    
     def _check_age_consistency(
         self,
         new_content: str,
@@ -1016,55 +1285,29 @@ class ConsistencyChecker:
         violations = []
         
         # 提取新内容中的年龄声明
-        # 修复：使用非贪婪匹配和中文字符范围，避免"今年"被包含在名字中
-        current_age_pattern = r'([\u4e00-\u9fa5\w]{1,10}?)(?:今年|现在|已经)?(\d+)岁'
-        past_age_pattern = r'(\d+)年前.*?([\u4e00-\u9fa5\w]{1,10}?).*?(\d+)岁'
-        
-        new_ages = {}
-        for match in re.findall(current_age_pattern, new_content):
-            entity, age = match[0].strip(), int(match[1])
-            # 过滤掉空名字或纯数字
-            if entity and not entity.isdigit():
-                new_ages[entity] = age
+        current_ages, _ = self._extract_ages(new_content)
+        new_ages = dict(current_ages)
         
         # 检查与历史记录的一致性
         for memory in existing_memories:
             memory_content = memory.get('content', memory.get('text', ''))
+            old_ages, past_ages = self._extract_ages(memory_content)
             
             # 检查历史年龄声明
-            for match in re.findall(current_age_pattern, memory_content):
-                entity, old_age = match[0].strip(), int(match[1])
-                # 过滤掉空名字或纯数字
-                if not entity or entity.isdigit():
-                    continue
-                if entity in new_ages and new_ages[entity] != old_age:
-                    # 允许1岁的差异（可能是生日经过）
-                    age_diff = abs(new_ages[entity] - old_age)
-                    if age_diff > 1:
-                        violations.append(Violation(
-                            type=ViolationType.AGE_INCONSISTENCY,
-                            description=f"【{entity}】的年龄不一致：之前'{old_age}岁' → 现在'{new_ages[entity]}岁'（差{age_diff}岁）",
-                            evidence=[new_content[:100], memory_content[:100]],
-                            severity=0.7,
-                            suggested_resolution=f"请确认{entity}的实际年龄，或说明时间流逝"
-                        ))
+            for entity, old_age in old_ages:
+                if entity in new_ages:
+                    violation = self._age_violation(entity, new_ages[entity], old_age, new_content, memory_content)
+                    if violation:
+                        violations.append(violation)
             
             # 检查"N年前M岁"的推算
-            for match in re.findall(past_age_pattern, memory_content):
-                years_ago, entity, past_age = int(match[0]), match[1].strip(), int(match[2])
-                expected_current_age = past_age + years_ago
-                
+            for years_ago, entity, past_age in past_ages:
                 if entity in new_ages:
-                    actual_age = new_ages[entity]
-                    # 允许2岁的误差
-                    if abs(actual_age - expected_current_age) > 2:
-                        violations.append(Violation(
-                            type=ViolationType.AGE_INCONSISTENCY,
-                            description=f"【{entity}】年龄推算不一致：{years_ago}年前{past_age}岁 → 现在应该约{expected_current_age}岁，但实际是{actual_age}岁",
-                            evidence=[new_content[:100], memory_content[:100]],
-                            severity=0.65,
-                            suggested_resolution=f"请确认时间线或{entity}的年龄"
-                        ))
+                    violation = self._past_age_violation(
+                        entity, new_ages[entity], years_ago, past_age, new_content, memory_content
+                    )
+                    if violation:
+                        violations.append(violation)
         
         return violations
     
@@ -1120,12 +1363,7 @@ class ConsistencyChecker:
                         dead_entities.add(entity)
         
         # 检查新内容中死亡角色是否有行动
-        action_patterns = [
-            r'(\w{1,10})(?:说|说道|问|回答|走|跑|站|坐|笑|哭|看|听|想|做|拿|给|打|杀|吃|喝)',
-            r'(\w{1,10})的(?:声音|脚步|身影|笑声)',
-        ]
-        
-        for pattern in action_patterns:
+        for pattern in self.DEATH_ACTION_PATTERNS:
             matches = re.findall(pattern, new_content)
             for entity in matches:
                 entity = entity.strip()
@@ -0,0 +1,216 @@
+"""一致性检查的增量事实库（v7.1）
+
+ConsistencyChecker.check() 原先在每次调用时对每条已有记忆重跑全部提取正则
+（属性 / 状态 / 关系 / 否定声明 / 年龄 / 日期），每次 add() 都要付一遍。
+ConsistencyFactStore 在记忆写入时提取一次，按 memory_id 持久化到 SQLite：
+
+- facts 表按 (user_id, kind, entity) 建索引，检查时只取新内容涉及的实体
+  所在的桶，耗时与该用户的记忆总数无关
+- 删除 / 驱逐 / 清空时按 memory_id 或用户移除
+- scopes 表记录哪些用户已建好事实库；未建的用户由调用方首次检查时
+  从存储中回填（之后由 index_memory / remove_memories 增量维护）
+
+事实种类（kind）::
+
+    attr   entity | 属性类型 | 值
+    state  entity | 状态类型 | 值
+    rel    entity1 | entity2 | 关系
+    neg    entity | 动作 | 否定来源
+    age    entity | '' | 年龄
+    past   entity | 年数 | 当时年龄
+    date   日期 | '' | 时态标记（p=过去 / f=将来）
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scopes (
+    user_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS memories (
+    memory_id TEXT PRIMARY KEY,
+    user_id   TEXT NOT NULL,
+    source    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS facts (
+    memory_id TEXT NOT NULL,
+    user_id   TEXT NOT NULL,
+    kind      TEXT NOT NULL,
+    entity    TEXT NOT NULL,
+    attr      TEXT NOT NULL,
+    value     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_facts_lookup ON facts(user_id, kind, entity);
+CREATE INDEX IF NOT EXISTS idx_facts_memory ON facts(memory_id);
+CREATE INDEX IF NOT EXISTS idx_memories_user ON memories(user_id);
+"""
+
+# (kind, entity, attr, value)
+Fact = Tuple[str, str, str, str]
+# (entity, attr, value, 记忆原文前 100 字)
+FactRow = Tuple[str, str, str, str]
+
+_MAX_VARS = 500  # 单条 IN (...) 的参数上限（SQLite 默认 999）
+
+
+class ConsistencyFactStore:
+    """按用户 / memory_id 存储一致性检查用事实（线程安全）
+
+    Args:
+        path: SQLite 文件路径；None 时只在内存中（测试 / 临时使用）
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or ':memory:', check_same_thread=False, isolation_level=None)
+        if path:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._scopes = {row[0] for row in self._conn.execute("SELECT user_id FROM scopes")}
+
+    # ---- 作用域 ----
+
+    def has_scope(self, user_id: str) -> bool:
+        """该用户的事实库是否已建好（建好后由 index_memory / remove_memories 增量维护）"""
+        return user_id in self._scopes
+
+    def build_scope(self, user_id: str, memories: Iterable[Tuple[str, str, List[Fact]]]) -> None:
+        """一次性建立该用户的事实库（替换已有内容）
+
+        Args:
+            memories: (memory_id, 原文, 事实列表)
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_user(user_id)
+                for memory_id, content, facts in memories:
+                    self._insert(user_id, memory_id, content, facts)
+                self._conn.execute("INSERT OR IGNORE INTO scopes (user_id) VALUES (?)", (user_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._scopes.add(user_id)
+
+    def drop_scope(self, user_id: str) -> None:
+        """丢弃该用户的全部事实（清空用户记忆时调用）"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_user(user_id)
+                self._conn.execute("DELETE FROM scopes WHERE user_id = ?", (user_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._scopes.discard(user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ('facts', 'memories', 'scopes'):
+                    self._conn.execute(f"DELETE FROM {table}")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._scopes.clear()
+
+    # ---- 增量维护 ----
+
+    def index_memory(self, user_id: str, memory_id: str, content: str, facts: List[Fact]) -> bool:
+        """写入（或替换）一条记忆的事实；用户尚未建库时跳过并返回 False"""
+        if user_id not in self._scopes:
+            return False
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_memories([memory_id])
+                self._insert(user_id, memory_id, content, facts)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def remove_memories(self, memory_ids: Iterable[str]) -> None:
+        """按 memory_id 删除（删除 / 驱逐）"""
+        memory_ids = [m for m in memory_ids if m]
+        if not memory_ids:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_memories(memory_ids)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _insert(self, user_id: str, memory_id: str, content: str, facts: List[Fact]) -> None:
+        # 调用方持有 self._lock 并已开启事务
+        self._conn.execute(
+            "INSERT OR REPLACE INTO memories (memory_id, user_id, source) VALUES (?, ?, ?)",
+            (memory_id, user_id, content[:100]),
+        )
+        if facts:
+            self._conn.executemany(
+                "INSERT INTO facts (memory_id, user_id, kind, entity, attr, value) VALUES (?, ?, ?, ?, ?, ?)",
+                [(memory_id, user_id, kind, entity, attr, value) for kind, entity, attr, value in facts],
+            )
+
+    def _delete_memories(self, memory_ids: List[str]) -> None:
+        for i in range(0, len(memory_ids), _MAX_VARS):
+            chunk = memory_ids[i:i + _MAX_VARS]
+            marks = ','.join('?' * len(chunk))
+            self._conn.execute(f"DELETE FROM facts WHERE memory_id IN ({marks})", chunk)
+            self._conn.execute(f"DELETE FROM memories WHERE memory_id IN ({marks})", chunk)
+
+    def _delete_user(self, user_id: str) -> None:
+        self._conn.execute("DELETE FROM facts WHERE user_id = ?", (user_id,))
+        self._conn.execute("DELETE FROM memories WHERE user_id = ?", (user_id,))
+
+    # ---- 查询 ----
+
+    def lookup(self, user_id: str, kind: str, entities: Iterable[str]) -> List[FactRow]:
+        """该用户 kind 类事实中实体属于 entities 的行，按写入顺序
+
+        Returns:
+            [(entity, attr, value, 记忆原文前 100 字)]
+        """
+        entities = list(dict.fromkeys(e for e in entities if e))
+        if not entities:
+            return []
+        rows: List[Tuple[int, FactRow]] = []
+        with self._lock:
+            for i in range(0, len(entities), _MAX_VARS):
+                chunk = entities[i:i + _MAX_VARS]
+                marks = ','.join('?' * len(chunk))
+                for rowid, entity, attr, value, source in self._conn.execute(
+                    "SELECT f.rowid, f.entity, f.attr, f.value, m.source FROM facts f "
+                    "JOIN memories m ON m.memory_id = f.memory_id "
+                    f"WHERE f.user_id = ? AND f.kind = ? AND f.entity IN ({marks})",
+                    [user_id, kind, *chunk],
+                ):
+                    rows.append((rowid, (entity, attr, value, source)))
+        rows.sort(key=lambda r: r[0])
+        return [row for _, row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            memories = self._conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+            facts = self._conn.execute("SELECT COUNT(*) FROM facts").fetchone()[0]
+        return {'users': len(self._scopes), 'memories': memories, 'facts': facts}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
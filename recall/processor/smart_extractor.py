@@ -701,3 +701,22 @@ class SmartExtractor:
             stats['budget'] = self.budget_manager.get_stats()
         
         return stats
+
+
+# ==================== v7.1: 批量导入的进程池规则抽取 ====================
+
+_rules_extractor: Optional[SmartExtractor] = None
+
+
+def extract_rules_batch(texts: List[str], max_text_length: int = 10000) -> List[ExtractionResult]:
+    """在当前进程内用纯规则模式抽取一组文本（供批量导入的进程池调用）
+
+    每个工作进程首次调用时创建自己的 SmartExtractor（不带 LLM），之后复用，
+    spaCy / jieba 模型在进程生命周期内只加载一次。
+    """
+    global _rules_extractor
+    if _rules_extractor is None:
+        config = SmartExtractorConfig.rules_only()
+        config.max_text_length = max_text_length
+        _rules_extractor = SmartExtractor(config=config)
+    return [_rules_extractor.extract(text, force_mode=ExtractionMode.RULES) for text in texts]
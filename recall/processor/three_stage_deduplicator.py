@@ -13,8 +13,12 @@ from __future__ import annotations
 import os
 import json
 import hashlib
+import random
 import re
-from dataclasses import dataclass, field, asdict
+import struct
+import threading
+from array import array
+from dataclasses import dataclass, field, asdict, replace
 from typing import List, Dict, Set, Optional, Tuple, Any, Callable
 from enum import Enum
 from collections import defaultdict
@@ -170,6 +174,9 @@ class DedupConfig:
     llm_threshold: float = 0.75             # 进入 LLM 确认的阈值范围（0.70-0.85 之间）
     llm_batch_size: int = 5                 # LLM 批量确认大小
     
+    # v7.1: 增量索引
+    index_max_items: int = 5000             # 每个作用域最多保留的项目数（超出淘汰最早的，0 不限）
+    
     @classmethod
     def default(cls) -> 'DedupConfig':
         """默认配置"""
@@ -194,27 +201,54 @@ class DedupConfig:
         )
 
 
+_MAX_HASH = 2**32 - 1
+_MASK32 = 0xFFFFFFFF
+_MASK64 = 2**64 - 1
+_SHINGLE_BASE = 0x01000193     # shingle 多项式哈希的基数（FNV 素数）
+
+
+def _mix32(h: int) -> int:
+    """murmur3 fmix32 终混，打散多项式哈希的低位相关性"""
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & _MASK32
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & _MASK32
+    h ^= h >> 16
+    return h
+
+
+def _shingle_hash(shingle: str) -> int:
+    """单个 shingle 的 32 位哈希（与 MinHasher._hash_text_shingles 的向量化计算逐位一致）"""
+    h = 0
+    for ch in shingle:
+        h = (h * _SHINGLE_BASE + ord(ch)) & _MASK32
+    return _mix32(h)
+
+
 class MinHasher:
-    """MinHash 实现（用于快速相似度估算）"""
+    """MinHash 实现（用于快速相似度估算）
+    
+    v7.1: 有 NumPy 时向量化 — 文本的全部 shingle 一次性哈希，再对 (num_perm × shingle 数)
+    广播求最小值；没有 NumPy 时逐项计算。两条路径的签名逐位相同，哈希参数只由 seed 决定
+    （不依赖进程哈希盐或 NumPy 随机数实现），签名可以持久化并在进程间共享。
+    """
+    
+    BLOCK_SIZE = 4096      # 向量化时每块 shingle 数，限制 (num_perm × block) 临时矩阵大小
     
     def __init__(self, num_perm: int = 128, seed: int = 42):
         self.num_perm = num_perm
         self.seed = seed
+        self.max_hash = _MAX_HASH
         
-        # 生成哈希参数
-        if HAS_NUMPY:
-            np.random.seed(seed)
-            max_hash = 2**32 - 1
-            self.a = np.random.randint(1, max_hash, num_perm, dtype=np.uint64)
-            self.b = np.random.randint(0, max_hash, num_perm, dtype=np.uint64)
-        else:
-            import random
-            random.seed(seed)
-            max_hash = 2**32 - 1
-            self.a = [random.randint(1, max_hash) for _ in range(num_perm)]
-            self.b = [random.randint(0, max_hash) for _ in range(num_perm)]
+        # 生成哈希参数（局部随机数生成器，不影响全局随机状态）
+        rng = random.Random(seed)
+        self.a = [rng.randint(1, _MAX_HASH) for _ in range(num_perm)]
+        self.b = [rng.randint(0, _MAX_HASH) for _ in range(num_perm)]
         
-        self.max_hash = 2**32 - 1
+        self._vectorized = HAS_NUMPY
+        if HAS_NUMPY:
+            self._a = np.array(self.a, dtype=np.uint64)[:, None]
+            self._b = np.array(self.b, dtype=np.uint64)[:, None]
     
     def get_shingles(self, text: str, k: int = 3) -> Set[str]:
         """获取 k-shingles"""
@@ -225,19 +259,53 @@ class MinHasher:
     
     def minhash(self, shingles: Set[str]) -> List[int]:
         """计算 MinHash 签名"""
-        signature = [self.max_hash] * self.num_perm
-        
-        for shingle in shingles:
-            h = int(hashlib.md5(shingle.encode()).hexdigest(), 16) % self.max_hash
-            
-            for i in range(self.num_perm):
-                if HAS_NUMPY:
-                    hash_val = int((self.a[i] * h + self.b[i]) % self.max_hash)
-                else:
-                    hash_val = (self.a[i] * h + self.b[i]) % self.max_hash
-                signature[i] = min(signature[i], hash_val)
+        if not shingles:
+            return [_MAX_HASH] * self.num_perm
+        hashes = [_shingle_hash(s) for s in shingles]
+        if self._vectorized:
+            return self._minhash_hashes(np.unique(np.array(hashes, dtype=np.uint64)))
+        return self._minhash_python(set(hashes))
+    
+    def signature(self, text: str, k: int = 3) -> List[int]:
+        """文本 -> MinHash 签名，等价于 minhash(get_shingles(text, k))
         
-        return signature
+        v7.1: 向量化路径直接在码点数组上滚动计算全部 shingle 的哈希，不生成 shingle 字符串
+        """
+        if not self._vectorized:
+            return self.minhash(self.get_shingles(text, k))
+        text = text.lower().strip()
+        if len(text) < k:
+            return self.minhash({text})
+        return self._minhash_hashes(self._hash_text_shingles(text, k))
+    
+    def _hash_text_shingles(self, text: str, k: int) -> 'np.ndarray':
+        """文本全部 k-shingle 的哈希（去重后）"""
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        n = len(codes) - k + 1
+        mask = np.uint64(_MASK32)
+        h = np.zeros(n, dtype=np.uint64)
+        for j in range(k):
+            h = (h * np.uint64(_SHINGLE_BASE) + codes[j:j + n]) & mask
+        # fmix32
+        h ^= h >> np.uint64(16)
+        h = (h * np.uint64(0x85EBCA6B)) & mask
+        h ^= h >> np.uint64(13)
+        h = (h * np.uint64(0xC2B2AE35)) & mask
+        h ^= h >> np.uint64(16)
+        return np.unique(h)
+    
+    def _minhash_hashes(self, hashes: 'np.ndarray') -> List[int]:
+        """(a * h + b) mod 2^64 mod max_hash，对全部 shingle 取最小（uint64 乘法自然回绕）"""
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        max_hash = np.uint64(_MAX_HASH)
+        for start in range(0, len(hashes), self.BLOCK_SIZE):
+            block = hashes[None, start:start + self.BLOCK_SIZE]
+            np.minimum(signature, ((self._a * block + self._b) % max_hash).min(axis=1), out=signature)
+        return signature.tolist()
+    
+    def _minhash_python(self, hashes: Set[int]) -> List[int]:
+        """无 NumPy 时的逐项实现（显式模拟 uint64 回绕，与向量化结果一致）"""
+        return [min(((a * h + b) & _MASK64) % _MAX_HASH for h in hashes) for a, b in zip(self.a, self.b)]
     
     def jaccard_from_signatures(
         self,
@@ -252,6 +320,12 @@ class MinHasher:
         return matches / len(sig1)
 
 
+def band_key(band: List[int]) -> int:
+    """LSH 分带的稳定键（blake2b 64 位），不受 PYTHONHASHSEED 影响，可跨进程/重启复用"""
+    data = struct.pack(f'<{len(band)}I', *band)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
 class LSHIndex:
     """LSH 索引（用于快速候选检索）"""
     
@@ -260,31 +334,202 @@ class LSHIndex:
         self.rows_per_band = rows_per_band
         self.buckets: Dict[int, Dict[int, Set[str]]] = defaultdict(lambda: defaultdict(set))
     
-    def add(self, item_id: str, signature: List[int]):
-        """添加项目到索引"""
+    def _band_keys(self, signature: List[int]):
         for band_idx in range(self.num_bands):
             start = band_idx * self.rows_per_band
             end = start + self.rows_per_band
-            band = tuple(signature[start:end])
-            bucket_hash = hash(band)
-            self.buckets[band_idx][bucket_hash].add(item_id)
+            yield band_idx, band_key(signature[start:end])
+    
+    def add(self, item_id: str, signature: List[int]):
+        """添加项目到索引"""
+        for band_idx, key in self._band_keys(signature):
+            self.buckets[band_idx][key].add(item_id)
+    
+    def remove(self, item_id: str, signature: List[int]):
+        """从索引中移除项目（需提供加入时的签名）"""
+        for band_idx, key in self._band_keys(signature):
+            bucket = self.buckets[band_idx].get(key)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self.buckets[band_idx][key]
     
     def query(self, signature: List[int]) -> Set[str]:
         """查询候选项"""
         candidates = set()
         
-        for band_idx in range(self.num_bands):
-            start = band_idx * self.rows_per_band
-            end = start + self.rows_per_band
-            band = tuple(signature[start:end])
-            bucket_hash = hash(band)
-            
-            if bucket_hash in self.buckets[band_idx]:
-                candidates.update(self.buckets[band_idx][bucket_hash])
+        for band_idx, key in self._band_keys(signature):
+            bucket = self.buckets[band_idx].get(key)
+            if bucket:
+                candidates.update(bucket)
         
         return candidates
 
 
+def _normalize_text(text: str) -> str:
+    """文本归一化（精确匹配键）"""
+    if not text:
+        return ""
+    
+    # 转小写
+    text = text.lower()
+    
+    # 移除标点和多余空白
+    text = re.sub(r'[^\w\s\u4e00-\u9fff]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    
+    return text
+
+
+class DedupIndex:
+    """单个作用域（用户）的增量去重索引（v7.1）
+    
+    包含精确匹配表、MinHash 签名 + LSH 分桶、语义向量矩阵，随写入/删除增量维护，
+    不再每次去重都重建。项目按加入顺序保存，超过 max_items 时淘汰最早加入的。
+    
+    语义向量矩阵（有 NumPy 时）按行存放已归一化的向量，容量倍增，删除时用最后一行填洞，
+    语义阶段一次矩阵乘法取 top-1。
+    """
+    
+    def __init__(self, minhasher: MinHasher, max_items: int = 0):
+        self.minhasher = minhasher
+        self.max_items = max_items
+        
+        self.exact_map: Dict[str, DedupItem] = {}           # 归一化名称 -> 项目
+        self.signature_map: Dict[str, List[int]] = {}       # ID -> MinHash 签名
+        self.item_map: Dict[str, DedupItem] = {}            # ID -> 项目（按加入顺序）
+        self.lsh_index = LSHIndex()
+        
+        # 语义向量矩阵：_vectors[:len(_row_ids)] 有效
+        self._vectors = None
+        self._row_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self.item_map)
+    
+    def add(self, item: DedupItem, signature: Optional[List[int]] = None) -> List[str]:
+        """加入/更新项目
+        
+        Args:
+            item: 项目
+            signature: MinHash 签名（None 表示不做模糊匹配索引）
+        
+        Returns:
+            因超出 max_items 被淘汰的项目 ID
+        """
+        if item.id in self.item_map:
+            self.remove(item.id)
+        embedding = item.embedding
+        if embedding is not None and HAS_NUMPY:
+            # 向量只存矩阵一份（列表形式每条约占 32 字节/维）
+            item = replace(item, embedding=None)
+        
+        normalized = _normalize_text(item.name)
+        if normalized:
+            self.exact_map[normalized] = item
+        if signature is not None:
+            self.signature_map[item.id] = signature
+            self.lsh_index.add(item.id, signature)
+        self.item_map[item.id] = item
+        if embedding is not None:
+            self.set_embedding(item.id, embedding)
+        
+        evicted = []
+        while self.max_items and len(self.item_map) > self.max_items:
+            oldest = next(iter(self.item_map))
+            self.remove(oldest)
+            evicted.append(oldest)
+        return evicted
+    
+    def remove(self, item_id: str) -> bool:
+        """移除项目（精确表、签名、LSH 分桶、向量行）"""
+        item = self.item_map.pop(item_id, None)
+        if item is None:
+            return False
+        normalized = _normalize_text(item.name)
+        if normalized and self.exact_map.get(normalized) is item:
+            del self.exact_map[normalized]
+        signature = self.signature_map.pop(item_id, None)
+        if signature is not None:
+            self.lsh_index.remove(item_id, signature)
+        
+        row = self._rows.pop(item_id, None)
+        if row is not None:
+            last_id = self._row_ids.pop()
+            if last_id != item_id:
+                self._vectors[row] = self._vectors[len(self._row_ids)]
+                self._row_ids[row] = last_id
+                self._rows[last_id] = row
+        return True
+    
+    def set_embedding(self, item_id: str, embedding: Any) -> None:
+        """记录项目向量（写入语义矩阵）"""
+        item = self.item_map.get(item_id)
+        if item is None:
+            return
+        if not HAS_NUMPY:
+            item.embedding = embedding
+            return
+        
+        vec = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vec))
+        if norm > 0:
+            vec = vec / norm
+        if self._vectors is not None and self._vectors.shape[1] != vec.shape[0]:
+            # 维度变化（切换了 Embedding 模型）：旧向量全部作废
+            self._vectors = None
+            self._row_ids = []
+            self._rows = {}
+        
+        row = self._rows.get(item_id)
+        if row is None:
+            row = len(self._row_ids)
+            if self._vectors is None or row >= self._vectors.shape[0]:
+                grown = np.zeros((max(64, row * 2), vec.shape[0]), dtype=np.float32)
+                if self._vectors is not None:
+                    grown[:row] = self._vectors[:row]
+                self._vectors = grown
+            self._row_ids.append(item_id)
+            self._rows[item_id] = row
+        self._vectors[row] = vec
+    
+    def missing_embeddings(self) -> List[DedupItem]:
+        """尚无向量的项目"""
+        if HAS_NUMPY:
+            return [item for item_id, item in self.item_map.items() if item_id not in self._rows]
+        return [item for item in self.item_map.values() if item.embedding is None]
+    
+    def nearest(self, embedding: Any) -> Tuple[Optional[DedupItem], float]:
+        """余弦相似度 top-1：(项目, 相似度)；没有向量时返回 (None, 0.0)"""
+        if HAS_NUMPY:
+            if not self._row_ids:
+                return None, 0.0
+            query = np.asarray(embedding, dtype=np.float32).ravel()
+            if query.shape[0] != self._vectors.shape[1]:
+                return None, 0.0
+            sims = self._vectors[:len(self._row_ids)] @ query
+            best = int(np.argmax(sims))
+            return self.item_map[self._row_ids[best]], float(sims[best] / (np.linalg.norm(query) + 1e-8))
+        
+        best_item, best_similarity = None, 0.0
+        for item in self.item_map.values():
+            if item.embedding is None:
+                continue
+            similarity = _cosine(embedding, item.embedding)
+            if similarity > best_similarity:
+                best_item, best_similarity = item, similarity
+        return best_item, best_similarity
+
+
+def _cosine(vec1: List[float], vec2: List[float]) -> float:
+    """余弦相似度（纯 Python）"""
+    dot = sum(a * b for a, b in zip(vec1, vec2))
+    norm1 = sum(a * a for a in vec1) ** 0.5
+    norm2 = sum(b * b for b in vec2) ** 0.5
+    return dot / (norm1 * norm2 + 1e-8)
+
+
 class ThreeStageDeduplicator:
     """三阶段去重系统
     
@@ -301,6 +546,11 @@ class ThreeStageDeduplicator:
     使用方式：
         dedup = ThreeStageDeduplicator(embedding_backend=backend)
         result = dedup.deduplicate(new_items, existing_items)
+        
+        # v7.1: 按作用域维护增量索引
+        dedup.add_to_index(item, scope=user_id)
+        result = dedup.deduplicate([new_item], scope=user_id)
+        dedup.remove_from_index([item_id])
     """
     
     # LLM 确认 Prompt
@@ -316,13 +566,24 @@ class ThreeStageDeduplicator:
 
 只回答 YES、NO 或 UNCERTAIN，不要解释。'''
 
+    # v7.1: 多对项目打包确认（LLMCallScheduler 启用微批时使用）
+    DEDUP_BATCH_PROMPT = '''请逐组判断以下每组中的两个实体/概念是否指代同一事物。
+
+{pairs}
+
+每组一行，格式为 "序号: YES"、"序号: NO" 或 "序号: UNCERTAIN"，不要解释。'''
+
+    _BATCH_ANSWER_RE = re.compile(r'(\d+)\s*[:：.、)]\s*(YES|NO|UNCERTAIN)')
+
     def __init__(
         self,
         config: Optional[DedupConfig] = None,
         embedding_backend: Any = None,      # EmbeddingBackend 实例
         llm_client: Any = None,             # LLMClient 实例
         budget_manager: Any = None,         # BudgetManager 实例
-        prompt_manager: Any = None          # v7.0: PromptManager YAML 模板
+        prompt_manager: Any = None,         # v7.0: PromptManager YAML 模板
+        index_path: Optional[str] = None,   # v7.1: MinHash 签名索引文件
+        vector_lookup: Optional[Callable[[List[str]], Dict[str, Any]]] = None   # v7.1
     ):
         """初始化去重器
         
@@ -332,81 +593,110 @@ class ThreeStageDeduplicator:
             llm_client: LLM 客户端（用于边界情况确认）
             budget_manager: 预算管理器
             prompt_manager: v7.0 PromptManager 实例（可选）
+            index_path: v7.1 签名索引文件路径（可选）。存在时启动即加载，
+                save_index() 写回；多个进程可加载同一文件
+            vector_lookup: v7.1 按 ID 批量取已有向量（如 VectorIndex.get_vectors_by_doc_ids），
+                语义阶段优先复用，取不到的才调用 embedding_backend 编码
         """
         self.config = config or DedupConfig.default()
         self.embedding_backend = embedding_backend
         self.llm_client = llm_client
         self.budget_manager = budget_manager
         self.prompt_manager = prompt_manager
+        self.vector_lookup = vector_lookup
         
-        # MinHash 和 LSH
+        # MinHash
         self.minhasher = MinHasher(num_perm=self.config.minhash_num_perm)
-        self.lsh_index = LSHIndex()
         
-        # 索引存储
-        self._exact_map: Dict[str, DedupItem] = {}          # 归一化名称 -> 项目
-        self._signature_map: Dict[str, List[int]] = {}      # ID -> MinHash 签名
-        self._item_map: Dict[str, DedupItem] = {}           # ID -> 项目
+        # v7.1: 按作用域（用户）划分的增量索引；scope=None 对应默认索引 ''
+        self._indexes: Dict[str, DedupIndex] = {}
+        self._item_scopes: Dict[str, str] = {}              # ID -> 作用域（按 ID 删除时定位）
+        self._lock = threading.RLock()
+        
+        # v7.1: 签名持久化
+        self.index_path = index_path
+        if index_path and os.path.exists(index_path):
+            self.load_index(index_path)
+    
+    # 兼容旧属性：默认作用域的索引
+    @property
+    def lsh_index(self) -> LSHIndex:
+        return self._get_index(None).lsh_index
+    
+    @property
+    def _exact_map(self) -> Dict[str, DedupItem]:
+        return self._get_index(None).exact_map
+    
+    @property
+    def _signature_map(self) -> Dict[str, List[int]]:
+        return self._get_index(None).signature_map
+    
+    @property
+    def _item_map(self) -> Dict[str, DedupItem]:
+        return self._get_index(None).item_map
+    
+    def _get_index(self, scope: Optional[str]) -> DedupIndex:
+        key = scope or ''
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = DedupIndex(self.minhasher, self.config.index_max_items)
+        return index
     
     def _normalize(self, text: str) -> str:
         """文本归一化"""
-        if not text:
-            return ""
-        
-        # 转小写
-        text = text.lower()
-        
-        # 移除标点和多余空白
-        text = re.sub(r'[^\w\s\u4e00-\u9fff]', '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return _normalize_text(text)
+    
+    def has_scope(self, scope: Optional[str]) -> bool:
+        """该作用域的索引是否已建立（建立后由 add_to_index/remove_from_index 增量维护）"""
+        return (scope or '') in self._indexes
     
-    def build_index(self, items: List[DedupItem]):
+    def build_index(self, items: List[DedupItem], scope: Optional[str] = None):
         """构建索引
         
         Args:
             items: 现有项目列表
+            scope: v7.1 作用域（用户）。已在索引中且文本未变的项目不重复计算 MinHash
         """
-        for item in items:
-            # 精确匹配索引
-            normalized = self._normalize(item.name)
-            if normalized:
-                self._exact_map[normalized] = item
-            
-            # MinHash + LSH 索引
-            if self.config.fuzzy_match_enabled:
-                shingles = self.minhasher.get_shingles(item.get_text())
-                signature = self.minhasher.minhash(shingles)
-                self._signature_map[item.id] = signature
-                self.lsh_index.add(item.id, signature)
-            
-            # 项目映射
-            self._item_map[item.id] = item
+        with self._lock:
+            index = self._get_index(scope)
+            for item in items:
+                existing = index.item_map.get(item.id)
+                if existing is not None and existing.get_text() == item.get_text() and existing.name == item.name:
+                    continue
+                self._add_locked(index, scope, item)
+    
+    def _add_locked(self, index: DedupIndex, scope: Optional[str], item: DedupItem) -> None:
+        signature = self.minhasher.signature(item.get_text()) if self.config.fuzzy_match_enabled else None
+        for evicted in index.add(item, signature):
+            self._item_scopes.pop(evicted, None)
+        self._item_scopes[item.id] = scope or ''
     
     def deduplicate(
         self,
         new_items: List[DedupItem],
-        existing_items: Optional[List[DedupItem]] = None
+        existing_items: Optional[List[DedupItem]] = None,
+        scope: Optional[str] = None
     ) -> DedupResult:
         """执行去重
         
         Args:
             new_items: 新项目列表
             existing_items: 现有项目列表（如果未预先构建索引）
+            scope: v7.1 作用域（用户），只与该作用域索引中的项目比较
             
         Returns:
             DedupResult: 去重结果
         """
         # 如果提供了现有项目，构建索引
         if existing_items:
-            self.build_index(existing_items)
+            self.build_index(existing_items, scope=scope)
         
         result = DedupResult()
         result.total_count = len(new_items)
         
+        index = self._get_index(scope)
         for item in new_items:
-            match = self._deduplicate_single(item)
+            match = self._deduplicate_single(item, index)
             
             if match.match_type == MatchType.NEW:
                 result.add_new(item)
@@ -423,15 +713,17 @@ class ThreeStageDeduplicator:
         
         return result
     
-    def _deduplicate_single(self, item: DedupItem) -> DedupMatch:
+    def _deduplicate_single(self, item: DedupItem, index: Optional[DedupIndex] = None) -> DedupMatch:
         """对单个项目进行去重"""
+        index = index or self._get_index(None)
+        
         # === 阶段 1: 确定性匹配 ===
         
         # 1.1 精确匹配
         if self.config.exact_match_enabled:
             normalized = self._normalize(item.name)
-            if normalized in self._exact_map:
-                matched = self._exact_map[normalized]
+            matched = index.exact_map.get(normalized)
+            if matched is not None:
                 return DedupMatch(
                     new_item=item,
                     matched_item=matched,
@@ -442,23 +734,23 @@ class ThreeStageDeduplicator:
         
         # 1.2 MinHash + LSH 模糊匹配
         if self.config.fuzzy_match_enabled:
-            shingles = self.minhasher.get_shingles(item.get_text())
-            signature = self.minhasher.minhash(shingles)
+            signature = self.minhasher.signature(item.get_text())
             
-            candidates = self.lsh_index.query(signature)
+            with self._lock:
+                candidates = index.lsh_index.query(signature)
+                candidate_sigs = [(cid, index.signature_map.get(cid)) for cid in candidates]
             
             if candidates:
                 best_match = None
                 best_jaccard = 0.0
                 
-                for candidate_id in candidates:
-                    if candidate_id in self._signature_map:
-                        candidate_sig = self._signature_map[candidate_id]
+                for candidate_id, candidate_sig in candidate_sigs:
+                    if candidate_sig is not None:
                         jaccard = self.minhasher.jaccard_from_signatures(signature, candidate_sig)
                         
                         if jaccard > best_jaccard:
                             best_jaccard = jaccard
-                            best_match = self._item_map.get(candidate_id)
+                            best_match = index.item_map.get(candidate_id)
                 
                 if best_match and best_jaccard >= self.config.jaccard_threshold:
                     return DedupMatch(
@@ -471,7 +763,7 @@ class ThreeStageDeduplicator:
         
         # === 阶段 2: 语义匹配 ===
         if self.config.semantic_enabled and self.embedding_backend:
-            semantic_match = self._semantic_match(item)
+            semantic_match = self._semantic_match(item, index)
             if semantic_match:
                 return semantic_match
         
@@ -484,9 +776,42 @@ class ThreeStageDeduplicator:
             reason="未找到匹配"
         )
     
-    def _semantic_match(self, item: DedupItem) -> Optional[DedupMatch]:
-        """语义匹配"""
-        if not self.embedding_backend or not self._item_map:
+    def _encode(self, texts: List[str]) -> List[Any]:
+        """批量编码（优先带缓存的批量接口，减少 API 调用）"""
+        if hasattr(self.embedding_backend, 'encode_batch_with_cache'):
+            return list(self.embedding_backend.encode_batch_with_cache(texts))
+        if hasattr(self.embedding_backend, 'encode_with_cache'):
+            return [self.embedding_backend.encode_with_cache(text) for text in texts]
+        return [self.embedding_backend.encode(text) for text in texts]
+    
+    def _fill_embeddings(self, index: DedupIndex) -> None:
+        """为索引中尚无向量的项目补齐向量：先从 vector_lookup 复用，剩余的批量编码"""
+        with self._lock:
+            missing = index.missing_embeddings()
+        if not missing:
+            return
+        
+        found: Dict[str, Any] = {}
+        if self.vector_lookup is not None:
+            try:
+                found = self.vector_lookup([item.id for item in missing]) or {}
+            except Exception as e:
+                _safe_print(f"[ThreeStageDeduplicator] 复用已有向量失败: {e}")
+        to_encode = [item for item in missing if item.id not in found]
+        if to_encode:
+            for item, vec in zip(to_encode, self._encode([item.get_text() for item in to_encode])):
+                found[item.id] = vec
+        
+        with self._lock:
+            for item in missing:
+                vec = found.get(item.id)
+                if vec is not None:
+                    index.set_embedding(item.id, vec if HAS_NUMPY else list(vec))
+    
+    def _semantic_match(self, item: DedupItem, index: Optional[DedupIndex] = None) -> Optional[DedupMatch]:
+        """语义匹配（v7.1: 对作用域内全部向量做一次矩阵乘法取 top-1）"""
+        index = index or self._get_index(None)
+        if not self.embedding_backend or not len(index):
             return None
         
         try:
@@ -494,38 +819,14 @@ class ThreeStageDeduplicator:
             if item.embedding:
                 item_embedding = item.embedding
             else:
-                # 使用带缓存的编码，减少 API 调用
-                if hasattr(self.embedding_backend, 'encode_with_cache'):
-                    item_embedding = self.embedding_backend.encode_with_cache(item.get_text())
-                else:
-                    item_embedding = self.embedding_backend.encode(item.get_text())
+                item_embedding = self._encode([item.get_text()])[0]
                 if hasattr(item_embedding, 'tolist'):
                     item_embedding = item_embedding.tolist()
             
-            # 与所有现有项目计算相似度
-            best_match = None
-            best_similarity = 0.0
-            
-            for existing_id, existing_item in self._item_map.items():
-                # 获取现有项目的 embedding（优先使用缓存）
-                if existing_item.embedding:
-                    existing_embedding = existing_item.embedding
-                else:
-                    # 使用带缓存的编码，减少 API 调用
-                    if hasattr(self.embedding_backend, 'encode_with_cache'):
-                        existing_embedding = self.embedding_backend.encode_with_cache(existing_item.get_text())
-                    else:
-                        existing_embedding = self.embedding_backend.encode(existing_item.get_text())
-                    if hasattr(existing_embedding, 'tolist'):
-                        existing_embedding = existing_embedding.tolist()
-                    existing_item.embedding = existing_embedding
-                
-                # 计算余弦相似度
-                similarity = self._cosine_similarity(item_embedding, existing_embedding)
-                
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_match = existing_item
+            # 现有项目的向量：复用已有的，缺的批量补齐
+            self._fill_embeddings(index)
+            with self._lock:
+                best_match, best_similarity = index.nearest(item_embedding)
             
             # 根据阈值判断
             if best_similarity >= self.config.semantic_threshold:
@@ -562,10 +863,7 @@ class ThreeStageDeduplicator:
             b = np.array(vec2)
             return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-8))
         else:
-            dot = sum(a * b for a, b in zip(vec1, vec2))
-            norm1 = sum(a * a for a in vec1) ** 0.5
-            norm2 = sum(b * b for b in vec2) ** 0.5
-            return dot / (norm1 * norm2 + 1e-8)
+            return _cosine(vec1, vec2)
     
     def _llm_batch_confirm(self, result: DedupResult):
         """LLM 批量确认边界情况"""
@@ -582,87 +880,240 @@ class ThreeStageDeduplicator:
                     result.move_to_new(item)
                 return
         
-        confirmed = []
-        
+        pairs = []
         for item, candidates in result.pending_items[:]:
             if not candidates:
                 result.move_to_new(item)
                 continue
-            
-            candidate = candidates[0]
-            
+            pairs.append((item, candidates[0]))
+        if not pairs:
+            return
+        
+        texts = [(self._pair_text(item), self._pair_text(candidate)) for item, candidate in pairs]
+        scheduler = getattr(self.llm_client, 'scheduler', None)
+        if scheduler is not None and scheduler.batching_enabled:
+            # v7.1: 多个待确认项（含其它线程窗口期内提交的）打包进一个提示词
             try:
-                # v7.0: 优先使用 PromptManager YAML 模板
-                item_a_str = f"{item.name}: {item.content[:100]}" if item.content else item.name
-                item_b_str = f"{candidate.name}: {candidate.content[:100]}" if candidate.content else candidate.name
-                
-                prompt = None
-                if self.prompt_manager:
-                    try:
-                        prompt = self.prompt_manager.render(
-                            'contradiction_detection',
-                            item_a=item_a_str,
-                            item_b=item_b_str
-                        )
-                    except Exception:
-                        pass
-                
-                if prompt is None:
-                    prompt = self.DEDUP_PROMPT.format(
-                        item_a=item_a_str,
-                        item_b=item_b_str
-                    )
-                
-                # 从环境变量读取配置的最大 tokens（去重确认通常只需要很少）
-                import os
-                dedup_llm_max_tokens = int(os.environ.get('DEDUP_LLM_MAX_TOKENS', '100'))
-                response = self.llm_client.complete(
-                    prompt=prompt,
-                    max_tokens=dedup_llm_max_tokens,
-                    temperature=0
-                ).strip().upper()
-                
-                if response == "YES":
-                    result.move_to_match(item, candidate, MatchType.LLM)
-                else:
-                    result.move_to_new(item)
-                
-                # 记录预算
-                if self.budget_manager:
-                    self.budget_manager.record_usage(
-                        operation="dedup_confirm",
-                        tokens_in=len(prompt) // 4,
-                        tokens_out=5,
-                        model=self.llm_client.model
-                    )
-                    
+                verdicts = scheduler.run_batched('dedup_confirm', texts, self._llm_confirm_packed)
             except Exception as e:
                 _safe_print(f"[ThreeStageDeduplicator] LLM 确认失败: {e}")
+                verdicts = [False] * len(texts)
+        else:
+            verdicts = []
+            for item_a_str, item_b_str in texts:
+                try:
+                    verdicts.append(self._llm_confirm_pair(item_a_str, item_b_str))
+                except Exception as e:
+                    _safe_print(f"[ThreeStageDeduplicator] LLM 确认失败: {e}")
+                    verdicts.append(False)
+        
+        for (item, candidate), same in zip(pairs, verdicts):
+            if same:
+                result.move_to_match(item, candidate, MatchType.LLM)
+            else:
                 result.move_to_new(item)
     
-    def add_to_index(self, item: DedupItem):
-        """将项目添加到索引（用于增量更新）"""
-        # 精确匹配索引
-        normalized = self._normalize(item.name)
-        if normalized:
-            self._exact_map[normalized] = item
+    @staticmethod
+    def _pair_text(item: DedupItem) -> str:
+        return f"{item.name}: {item.content[:100]}" if item.content else item.name
+    
+    def _record_confirm_usage(self, prompt: str, tokens_out: int) -> None:
+        if self.budget_manager:
+            self.budget_manager.record_usage(
+                operation="dedup_confirm",
+                tokens_in=len(prompt) // 4,
+                tokens_out=tokens_out,
+                model=self.llm_client.model
+            )
+    
+    def _llm_confirm_pair(self, item_a_str: str, item_b_str: str) -> bool:
+        """单独确认一对项目是否为同一事物"""
+        # v7.0: 优先使用 PromptManager YAML 模板
+        prompt = None
+        if self.prompt_manager:
+            try:
+                prompt = self.prompt_manager.render(
+                    'contradiction_detection',
+                    item_a=item_a_str,
+                    item_b=item_b_str
+                )
+            except Exception:
+                pass
         
-        # MinHash + LSH 索引
-        if self.config.fuzzy_match_enabled:
-            shingles = self.minhasher.get_shingles(item.get_text())
-            signature = self.minhasher.minhash(shingles)
-            self._signature_map[item.id] = signature
-            self.lsh_index.add(item.id, signature)
+        if prompt is None:
+            prompt = self.DEDUP_PROMPT.format(
+                item_a=item_a_str,
+                item_b=item_b_str
+            )
+        
+        # 从环境变量读取配置的最大 tokens（去重确认通常只需要很少）
+        dedup_llm_max_tokens = int(os.environ.get('DEDUP_LLM_MAX_TOKENS', '100'))
+        response = self.llm_client.complete(
+            prompt=prompt,
+            max_tokens=dedup_llm_max_tokens,
+            temperature=0
+        ).strip().upper()
+        
+        # 记录预算
+        self._record_confirm_usage(prompt, 5)
+        return response == "YES"
+    
+    def _llm_confirm_packed(self, pairs: List[Tuple[str, str]]) -> List[bool]:
+        """v7.1: 一次调用确认多对项目；回答缺失的序号逐对补问"""
+        if len(pairs) == 1:
+            return [self._llm_confirm_pair(*pairs[0])]
+        prompt = self.DEDUP_BATCH_PROMPT.format(pairs='\n'.join(
+            f"{i}. 实体 A：{item_a} | 实体 B：{item_b}" for i, (item_a, item_b) in enumerate(pairs, 1)
+        ))
+        dedup_llm_max_tokens = int(os.environ.get('DEDUP_LLM_MAX_TOKENS', '100'))
+        response = self.llm_client.complete(
+            prompt=prompt,
+            max_tokens=max(dedup_llm_max_tokens, 8 * len(pairs)),
+            temperature=0
+        )
+        self._record_confirm_usage(prompt, 5 * len(pairs))
+        
+        answers = {}
+        for number, answer in self._BATCH_ANSWER_RE.findall(response.upper()):
+            answers.setdefault(int(number), answer)
+        verdicts = []
+        for i, (item_a, item_b) in enumerate(pairs, 1):
+            if i in answers:
+                verdicts.append(answers[i] == "YES")
+            else:
+                verdicts.append(self._llm_confirm_pair(item_a, item_b))
+        return verdicts
+    
+    def add_to_index(self, item: DedupItem, scope: Optional[str] = None):
+        """将项目添加到索引（用于增量更新；v7.1: 写入成功后调用，item.embedding 有值时直接复用）"""
+        with self._lock:
+            self._add_locked(self._get_index(scope), scope, item)
+    
+    def remove_from_index(self, item_ids: List[str], scope: Optional[str] = None) -> int:
+        """从索引中移除项目（删除/驱逐记忆时调用）
+        
+        Args:
+            item_ids: 项目 ID
+            scope: 作用域；None 时按 ID 自动定位所在作用域
+        
+        Returns:
+            实际移除的数量
+        """
+        removed = 0
+        with self._lock:
+            for item_id in item_ids:
+                key = scope if scope is not None else self._item_scopes.get(item_id)
+                index = self._indexes.get(key) if key is not None else None
+                if index is not None and index.remove(item_id):
+                    self._item_scopes.pop(item_id, None)
+                    removed += 1
+        return removed
+    
+    def drop_scope(self, scope: Optional[str]) -> None:
+        """丢弃整个作用域的索引（清空用户记忆时调用）"""
+        with self._lock:
+            index = self._indexes.pop(scope or '', None)
+            if index is not None:
+                for item_id in index.item_map:
+                    self._item_scopes.pop(item_id, None)
+    
+    def clear_index(self) -> None:
+        """清空全部作用域的索引"""
+        with self._lock:
+            self._indexes.clear()
+            self._item_scopes.clear()
+    
+    # =========================================================================
+    # v7.1: 签名索引持久化
+    # =========================================================================
+    
+    # 文件布局（小端）：header | 作用域与项目 JSON（UTF-8） | uint32[签名数 × num_perm] 签名矩阵
+    # 向量不入文件（已在向量索引中，语义阶段经 vector_lookup 复用）
+    INDEX_MAGIC = b'RDEDUPS\x02'
+    _INDEX_MAGIC_V1 = b'RDEDUPS\x01'           # 单作用域
+    _INDEX_HEADER = struct.Struct('<8sIII')     # magic, num_perm, seed, meta_len
+    
+    def save_index(self, path: Optional[str] = None) -> None:
+        """保存各作用域的项目与 MinHash 签名（原子写入）；LSH 分桶由签名重建，不单独存储"""
+        path = path or self.index_path
+        if not path:
+            return
+        from recall.utils.atomic_write import atomic_bytes_dump
+        
+        scopes = {}
+        matrix = array('I')
+        with self._lock:
+            for key, index in self._indexes.items():
+                signed = [item_id for item_id in index.item_map if item_id in index.signature_map]
+                scopes[key] = {
+                    'items': [
+                        {
+                            'id': item.id,
+                            'name': item.name,
+                            'content': item.content,
+                            'item_type': item.item_type,
+                            'attributes': item.attributes,
+                        }
+                        for item in index.item_map.values()
+                    ],
+                    'signed': signed,
+                }
+                for item_id in signed:
+                    matrix.extend(index.signature_map[item_id])
+        meta = json.dumps({'scopes': scopes}, ensure_ascii=False, default=str).encode('utf-8')
+        header = self._INDEX_HEADER.pack(self.INDEX_MAGIC, self.minhasher.num_perm, self.minhasher.seed, len(meta))
+        atomic_bytes_dump(header + meta + matrix.tobytes(), path)
+    
+    def load_index(self, path: Optional[str] = None) -> int:
+        """加载 save_index() 写出的索引，合并到当前索引，不重新计算 MinHash
+        
+        Returns:
+            加载的项目数；文件格式或哈希参数（num_perm/seed）不匹配时返回 0
+        """
+        path = path or self.index_path
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            magic, num_perm, seed, meta_len = self._INDEX_HEADER.unpack_from(data, 0)
+            if (magic not in (self.INDEX_MAGIC, self._INDEX_MAGIC_V1)
+                    or num_perm != self.minhasher.num_perm or seed != self.minhasher.seed):
+                _safe_print(f"[ThreeStageDeduplicator] 签名索引参数不匹配，忽略: {path}")
+                return 0
+            offset = self._INDEX_HEADER.size
+            meta = json.loads(data[offset:offset + meta_len].decode('utf-8'))
+            matrix = array('I')
+            matrix.frombytes(data[offset + meta_len:])
+        except (OSError, ValueError, struct.error) as e:
+            _safe_print(f"[ThreeStageDeduplicator] 加载签名索引失败: {e}")
+            return 0
         
-        # 项目映射
-        self._item_map[item.id] = item
+        scopes = meta['scopes'] if magic == self.INDEX_MAGIC else {'': meta}
+        loaded = 0
+        row = 0
+        with self._lock:
+            for key, entry in scopes.items():
+                index = self._get_index(key)
+                signatures = {}
+                for item_id in entry['signed']:
+                    signatures[item_id] = matrix[row * num_perm:(row + 1) * num_perm].tolist()
+                    row += 1
+                for fields in entry['items']:
+                    item = DedupItem(**fields)
+                    for evicted in index.add(item, signatures.get(item.id)):
+                        self._item_scopes.pop(evicted, None)
+                    self._item_scopes[item.id] = key
+                    loaded += 1
+        return loaded
     
     def get_stats(self) -> Dict[str, Any]:
         """获取统计信息"""
+        with self._lock:
+            indexes = list(self._indexes.values())
         return {
-            'total_indexed': len(self._item_map),
-            'exact_index_size': len(self._exact_map),
-            'signature_index_size': len(self._signature_map),
+            'total_indexed': sum(len(index) for index in indexes),
+            'exact_index_size': sum(len(index.exact_map) for index in indexes),
+            'signature_index_size': sum(len(index.signature_map) for index in indexes),
+            'scopes': len(indexes),
             'config': {
                 'jaccard_threshold': self.config.jaccard_threshold,
                 'semantic_threshold': self.config.semantic_threshold,
@@ -17,7 +17,7 @@ from .parallel_retrieval import ParallelRetriever, RetrievalTask
 # Phase 3 新模块
 from .config import (
     RetrievalConfig, LayerWeights, TemporalContext, 
-    LayerStats, RetrievalResultItem
+    LayerStats, RetrievalResultItem, QueryContext
 )
 from .eleven_layer import (
     ElevenLayerRetriever, EightLayerRetrieverCompat,
@@ -43,6 +43,7 @@ __all__ = [
     'RetrievalConfig',
     'LayerWeights',
     'TemporalContext',
+    'QueryContext',
     'LayerStats',
     'RetrievalResultItem',
     'ElevenLayerRetriever',
@@ -12,8 +12,9 @@
 from __future__ import annotations
 
 import os
+import threading
 from dataclasses import dataclass, field
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable, Tuple
 from datetime import datetime
 
 
@@ -46,6 +47,42 @@ class TemporalContext:
         return self.start is not None or self.end is not None
 
 
+# v7.1: 并行召回路径名（用于截止时间配置与统计）
+RECALL_PATHS = ('vector', 'keyword', 'entity', 'fulltext', 'graph', 'fallback')
+
+
+@dataclass
+class QueryContext:
+    """单次检索的查询分析上下文（v7.1）
+    
+    查询向量、实体、关键词在一次 search() 内只计算一次，由各召回层、
+    精排层和 BAL 后端共享；调用方已有分析结果（如写入时的一致性检查）可直接传入。
+    """
+    query: str
+    entities: Optional[List[str]] = None               # 查询实体名
+    keywords: Optional[List[str]] = None               # 查询关键词（倒排索引 token）
+    embedding: Any = None                              # 预先算好的查询向量（可选）
+    encoder: Optional[Callable[[str], Any]] = field(default=None, repr=False)
+    encode_count: int = 0                              # 本次检索实际编码次数
+    vector_hits: Optional[List[Tuple[str, float]]] = None  # 批量预取的向量召回结果（search_many）
+    vector_hits_k: int = 0                             # 预取时使用的 top_k
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    
+    def get_embedding(self) -> Any:
+        """查询向量：首次调用时编码，之后复用（并行召回线程安全）；无编码器时返回 None"""
+        with self._lock:
+            if self.embedding is None and self.encoder is not None:
+                self.encode_count += 1
+                self.embedding = self.encoder(self.query)
+            return self.embedding
+    
+    def get_vector_hits(self, top_k: int) -> Optional[List[Tuple[str, float]]]:
+        """批量预取的向量召回结果：覆盖 top_k 时返回前 top_k 条，否则返回 None（由召回层自行检索）"""
+        if self.vector_hits is None or top_k > self.vector_hits_k:
+            return None
+        return self.vector_hits[:top_k]
+
+
 @dataclass
 class LayerStats:
     """层级执行统计
@@ -138,6 +175,12 @@ class RetrievalConfig:
     fallback_workers: int = 4              # 兜底扫描线程数
     fallback_max_results: int = 50         # 兜底最大结果数
     
+    # === v7.1: 召回执行器配置（引擎级常驻线程池）===
+    recall_workers: int = 16               # 检索线程池大小（所有并发查询共享）
+    recall_timeout: float = 30.0           # 各路召回默认截止时间（秒）
+    # 按路径覆盖截止时间：vector / keyword / entity / fulltext / graph / fallback
+    recall_path_timeouts: Dict[str, float] = field(default_factory=dict)
+    
     # === 权重 ===
     weights: LayerWeights = field(default_factory=LayerWeights)
     
@@ -146,6 +189,10 @@ class RetrievalConfig:
     time_range_start: Optional[datetime] = None
     time_range_end: Optional[datetime] = None
     
+    def recall_deadline(self, path: str) -> float:
+        """某一路召回的截止时间（秒），未单独配置时使用 recall_timeout"""
+        return self.recall_path_timeouts.get(path, self.recall_timeout)
+    
     @classmethod
     def default(cls) -> "RetrievalConfig":
         """默认配置 - L10/L11 关闭"""
@@ -231,6 +278,14 @@ class RetrievalConfig:
             fallback_parallel=get_bool('FALLBACK_PARALLEL', True),
             fallback_workers=get_int('FALLBACK_WORKERS', 4),
             fallback_max_results=get_int('FALLBACK_MAX_RESULTS', 50),
+            # v7.1: 召回执行器
+            recall_workers=get_int('RETRIEVAL_RECALL_WORKERS', 16),
+            recall_timeout=get_float('RETRIEVAL_RECALL_TIMEOUT', 30.0),
+            recall_path_timeouts={
+                path: get_float(f'RETRIEVAL_{path.upper()}_RECALL_TIMEOUT', 0.0)
+                for path in RECALL_PATHS
+                if os.getenv(f'RETRIEVAL_{path.upper()}_RECALL_TIMEOUT')
+            },
             # 权重配置
             weights=LayerWeights(
                 inverted=get_float('RETRIEVAL_WEIGHT_INVERTED', 1.0),
@@ -1,13 +1,14 @@
 """八层漏斗检索架构 - Phase 3.6 升级版：并行三路召回 + RRF 融合"""
 
 import time
-from typing import List, Dict, Any, Optional, Set, Callable, Tuple
+from typing import List, Dict, Any, Optional, Set, Callable, Tuple, Collection
 from dataclasses import dataclass, field
 from enum import Enum
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from collections import defaultdict
 
 from .rrf_fusion import reciprocal_rank_fusion
+from .config import QueryContext
 
 
 # Windows GBK 编码兼容的安全打印函数
@@ -128,6 +129,7 @@ class EightLayerRetriever:
         
         # 统计
         self.stats: List[LayerStats] = []
+        self._last_query_context: Optional[QueryContext] = None
         
         # 配置
         self.config = {
@@ -188,25 +190,49 @@ class EightLayerRetriever:
         top_k: int = 10,
         filters: Optional[Dict[str, Any]] = None,
         temporal_context: Optional[Any] = None,  # Phase 3 兼容：接受但忽略
-        config: Optional[Any] = None  # Phase 3 兼容：接受但忽略
+        config: Optional[Any] = None,  # Phase 3 兼容：接受但忽略
+        allowed_ids: Optional[Collection[str]] = None,
+        query_context: Optional[QueryContext] = None
     ) -> List[RetrievalResult]:
         """执行检索 - Phase 3.6 支持并行三路召回 + RRF 融合
         
         Note: temporal_context 和 config 参数用于 Phase 3 兼容，
         在 EightLayerRetriever 中被忽略，仅 ElevenLayerRetriever 使用。
+        v7.1: allowed_ids 限定只在这些文档中检索（租户分区，向量召回下推到索引内部）
+        v7.1: query_context 共享查询向量/实体/关键词，整次检索只编码一次
         """
+        query_context = self._resolve_query_context(query, query_context)
+        if entities is None:
+            entities = query_context.entities
+        if keywords is None:
+            keywords = query_context.keywords
+        
         # Phase 3.6: 根据配置选择并行或串行模式
         if self.config.get('parallel_recall_enabled', True):
-            return self._parallel_recall(query, entities, keywords, top_k)
+            return self._parallel_recall(query, entities, keywords, top_k, allowed_ids, query_context)
         else:
-            return self._legacy_retrieve(query, entities, keywords, top_k, filters)
+            return self._legacy_retrieve(query, entities, keywords, top_k, filters, allowed_ids, query_context)
+    
+    def _resolve_query_context(self, query: str, query_context: Optional[QueryContext]) -> QueryContext:
+        """v7.1: 取得本次检索的查询上下文，未传入时新建"""
+        if query_context is None:
+            query_context = QueryContext(query=query)
+        if query_context.encoder is None:
+            if self.vector_index is not None and hasattr(self.vector_index, 'encode'):
+                query_context.encoder = self.vector_index.encode
+            elif self.embedding_backend is not None:
+                query_context.encoder = self.embedding_backend.encode
+        self._last_query_context = query_context
+        return query_context
     
     def _parallel_recall(
         self,
         query: str,
         entities: Optional[List[str]],
         keywords: Optional[List[str]],
-        top_k: int
+        top_k: int,
+        allowed_ids: Optional[Collection[str]] = None,
+        query_context: Optional[QueryContext] = None
     ) -> List[RetrievalResult]:
         """Phase 3.6: 并行四路召回实现（保证100%召回）
         
@@ -222,10 +248,10 @@ class EightLayerRetriever:
         # 1. 并行执行四路召回（N-gram 作为正式的第四路）
         with ThreadPoolExecutor(max_workers=4) as executor:
             futures = {
-                executor.submit(self._vector_recall, query, top_k * 2): 'vector',
-                executor.submit(self._keyword_recall, keywords, top_k * 2): 'keyword',
-                executor.submit(self._entity_recall, entities, top_k * 2): 'entity',
-                executor.submit(self._ngram_recall, query, top_k * 2): 'ngram',
+                executor.submit(self._vector_recall, query, top_k * 2, allowed_ids, query_context): 'vector',
+                executor.submit(self._keyword_recall, keywords, top_k * 2, allowed_ids): 'keyword',
+                executor.submit(self._entity_recall, entities, top_k * 2, allowed_ids): 'entity',
+                executor.submit(self._ngram_recall, query, top_k * 2, allowed_ids): 'ngram',
             }
             
             all_results: Dict[str, List[Tuple[str, float]]] = {}
@@ -272,7 +298,12 @@ class EightLayerRetriever:
         
         return results[:top_k]
     
-    def _ngram_recall(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+    def _ngram_recall(
+        self,
+        query: str,
+        top_k: int,
+        allowed_ids: Optional[Collection[str]] = None
+    ) -> List[Tuple[str, float]]:
         """路径 4: N-gram 原文召回（100% 精确匹配保证）
         
         通过扫描原文进行子串匹配，确保任何说过的话都能被找到。
@@ -294,12 +325,21 @@ class EightLayerRetriever:
             doc_ids = self.ngram_index.raw_search(query, max_results=top_k)
         
         # N-gram 匹配到的结果给予较高分数（精确匹配）
-        results = [(doc_id, 0.85) for doc_id in doc_ids]
+        results = [
+            (doc_id, 0.85) for doc_id in doc_ids
+            if allowed_ids is None or doc_id in allowed_ids
+        ]
         
         self._record_stats(RetrievalLayer.L4_NGRAM_INDEX, 0, len(results), start)
         return results
     
-    def _vector_recall(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+    def _vector_recall(
+        self,
+        query: str,
+        top_k: int,
+        allowed_ids: Optional[Collection[str]] = None,
+        query_context: Optional[QueryContext] = None
+    ) -> List[Tuple[str, float]]:
         """路径 1: 语义向量召回
         
         兼容两种向量索引：
@@ -311,17 +351,25 @@ class EightLayerRetriever:
         
         start = time.time()
         results = []
+        partition = {'allowed_ids': allowed_ids} if allowed_ids is not None else {}
+        query_context = query_context or self._resolve_query_context(query, None)
         
         try:
+            prefetched = query_context.get_vector_hits(top_k)
+            if prefetched is not None:
+                # v7.1: search_many 已用整个查询矩阵批量检索过
+                results = prefetched
             # 检查索引类型，兼容不同的 API
-            if hasattr(self.vector_index, 'encode'):
-                # VectorIndex: 支持字符串查询（内部有 encode 方法）
-                results = self.vector_index.search(query, top_k=top_k)
+            elif hasattr(self.vector_index, 'encode'):
+                # VectorIndex: 支持字符串查询，v7.1 附带共享的查询向量
+                results = self.vector_index.search(
+                    query, top_k=top_k, query_embedding=query_context.get_embedding(), **partition
+                )
             else:
                 # VectorIndexIVF: 需要传入向量
                 if hasattr(self, 'embedding_backend') and self.embedding_backend:
-                    query_embedding = self.embedding_backend.encode(query)
-                    results = self.vector_index.search(query_embedding, top_k=top_k)
+                    query_embedding = query_context.get_embedding()
+                    results = self.vector_index.search(query_embedding, top_k=top_k, **partition)
                 else:
                     _safe_print("[Retriever] Warning: No embedding_backend for VectorIndexIVF")
                     return []
@@ -332,7 +380,12 @@ class EightLayerRetriever:
         self._record_stats(RetrievalLayer.L5_VECTOR_COARSE, 0, len(results), start)
         return results
     
-    def _keyword_recall(self, keywords: Optional[List[str]], top_k: int) -> List[Tuple[str, float]]:
+    def _keyword_recall(
+        self,
+        keywords: Optional[List[str]],
+        top_k: int,
+        allowed_ids: Optional[Collection[str]] = None
+    ) -> List[Tuple[str, float]]:
         """路径 2: 关键词倒排索引召回（100% 召回）"""
         if not self.inverted_index or not keywords:
             return []
@@ -356,6 +409,8 @@ class EightLayerRetriever:
             else:
                 matched_docs = self.inverted_index.search(kw)
             for doc_id in matched_docs:
+                if allowed_ids is not None and doc_id not in allowed_ids:
+                    continue
                 doc_keyword_counts[doc_id] += 1
         
         # 计算分数：匹配关键词数 / 总关键词数 * 基础分
@@ -371,7 +426,12 @@ class EightLayerRetriever:
         self._record_stats(RetrievalLayer.L2_INVERTED_INDEX, 0, len(results), start)
         return results[:top_k]
     
-    def _entity_recall(self, entities: Optional[List[str]], top_k: int) -> List[Tuple[str, float]]:
+    def _entity_recall(
+        self,
+        entities: Optional[List[str]],
+        top_k: int,
+        allowed_ids: Optional[Collection[str]] = None
+    ) -> List[Tuple[str, float]]:
         """路径 3: 实体索引召回"""
         if not self.entity_index or not entities:
             return []
@@ -384,6 +444,9 @@ class EightLayerRetriever:
             for indexed_entity in entity_results:
                 doc_ids.update(indexed_entity.turn_references)
         
+        if allowed_ids is not None:
+            doc_ids = {doc_id for doc_id in doc_ids if doc_id in allowed_ids}
+        
         results = [(doc_id, 0.7) for doc_id in list(doc_ids)[:top_k]]
         
         self._record_stats(RetrievalLayer.L3_ENTITY_INDEX, 0, len(results), start)
@@ -416,9 +479,12 @@ class EightLayerRetriever:
         entities: Optional[List[str]] = None,
         keywords: Optional[List[str]] = None,
         top_k: int = 10,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        allowed_ids: Optional[Collection[str]] = None,
+        query_context: Optional[QueryContext] = None
     ) -> List[RetrievalResult]:
         """原有串行八层检索（向后兼容）"""
+        query_context = query_context or self._resolve_query_context(query, None)
         self.stats = []
         candidates: Set[str] = set()  # 候选ID集合
         results: List[RetrievalResult] = []
@@ -474,17 +540,35 @@ class EightLayerRetriever:
             
             self._record_stats(RetrievalLayer.L4_NGRAM_INDEX, input_count, len(candidates), start)
         
+        # v7.1: 租户分区过滤（L2-L4 候选）
+        if allowed_ids is not None:
+            candidates = {doc_id for doc_id in candidates if doc_id in allowed_ids}
+        
         # L5: 向量粗筛
         # 检查向量索引是否存在且启用（支持 Lite 模式）
         vector_enabled = self.vector_index and getattr(self.vector_index, 'enabled', True)
         if self.config['l5_enabled'] and vector_enabled:
             start = time.time()
             input_count = len(candidates)
+            partition = {'allowed_ids': allowed_ids} if allowed_ids is not None else {}
             
-            vector_results = self.vector_index.search(
-                query, 
-                top_k=self.config['l5_top_k']
-            )
+            prefetched = query_context.get_vector_hits(self.config['l5_top_k'])
+            if prefetched is not None:
+                vector_results = prefetched
+            elif hasattr(self.vector_index, 'encode'):
+                vector_results = self.vector_index.search(
+                    query, 
+                    top_k=self.config['l5_top_k'],
+                    query_embedding=query_context.get_embedding(),
+                    **partition
+                )
+            else:
+                # VectorIndexIVF: 直接传入共享的查询向量
+                vector_results = self.vector_index.search(
+                    query_context.get_embedding(),
+                    top_k=self.config['l5_top_k'],
+                    **partition
+                )
             
             # 合并向量结果
             for doc_id, score in vector_results:
@@ -521,7 +605,7 @@ class EightLayerRetriever:
             input_count = len(results)
             
             # 完整实现：重新计算查询与候选文档的精确余弦相似度
-            results = self._vector_fine_ranking(query, results)
+            results = self._vector_fine_ranking(query, results, query_context)
             results = results[:self.config['l6_top_k']]
             
             for r in results:
@@ -562,6 +646,9 @@ class EightLayerRetriever:
             else:
                 fallback_ids = self.ngram_index.search(query)
             
+            if allowed_ids is not None:
+                fallback_ids = [doc_id for doc_id in fallback_ids if doc_id in allowed_ids]
+            
             for doc_id in fallback_ids[:top_k]:
                 content = self.get_content(doc_id)
                 if content:
@@ -581,7 +668,8 @@ class EightLayerRetriever:
     def _vector_fine_ranking(
         self,
         query: str,
-        results: List[RetrievalResult]
+        results: List[RetrievalResult],
+        query_context: Optional[QueryContext] = None
     ) -> List[RetrievalResult]:
         """L6 向量精排 - 使用已存储的向量计算精确相似度
         
@@ -591,6 +679,7 @@ class EightLayerRetriever:
         Args:
             query: 查询文本
             results: L5 粗筛后的候选结果
+            query_context: 查询上下文（v7.1: 复用 L5 的查询向量）
         
         Returns:
             按精确相似度重新排序的结果
@@ -602,8 +691,9 @@ class EightLayerRetriever:
         try:
             import numpy as np
             
-            # 1. 获取查询向量（只需要编码一次）
-            query_embedding = self.vector_index.encode(query)
+            # 1. 获取查询向量（只需要编码一次，v7.1: 与 L5 共享）
+            query_context = query_context or self._resolve_query_context(query, None)
+            query_embedding = query_context.get_embedding()
             query_embedding = query_embedding / np.linalg.norm(query_embedding)  # 归一化
             
             # 2. 批量获取候选文档的已存储向量（不调用 API！）
@@ -723,6 +813,7 @@ class EightLayerRetriever:
         total_time = sum(s.time_ms for s in self.stats)
         return {
             'total_time_ms': total_time,
+            'query_encodes': self._last_query_context.encode_count if self._last_query_context else 0,
             'layers': [
                 {
                     'layer': s.layer.value,
@@ -22,14 +22,19 @@ import time
 import json
 import asyncio
 import logging
+import weakref
+import contextvars
 from enum import Enum
-from typing import List, Dict, Set, Optional, Tuple, Any, Callable
+from typing import List, Dict, Set, Optional, Tuple, Any, Callable, Collection
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from concurrent.futures import (
+    Executor, Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+)
 
 from .config import (
     RetrievalConfig, LayerStats, 
-    RetrievalResultItem, TemporalContext, LayerWeights
+    RetrievalResultItem, TemporalContext, LayerWeights, QueryContext
 )
 from .rrf_fusion import reciprocal_rank_fusion
 from .reranker import RerankerFactory, BuiltinReranker
@@ -58,6 +63,40 @@ class RetrievalLayer(Enum):
     L11_LLM_FILTER = "llm_filter"
 
 
+def _restrict_candidates(
+    temporal_candidates: Optional[Set[str]],
+    allowed_ids: Optional[Collection[str]]
+) -> Optional[Collection[str]]:
+    """v7.1: 合并时态候选与租户分区，供各召回层做成员判断
+    
+    allowed_ids 通常是 ScopedMemory.memory_ids() 的不可变快照，直接使用而不复制。
+    """
+    if allowed_ids is None:
+        return temporal_candidates
+    if temporal_candidates is None:
+        return allowed_ids
+    return {doc_id for doc_id in temporal_candidates if doc_id in allowed_ids}
+
+
+class _SearchTrace:
+    """v7.1: 一次检索的统计（各层耗时、召回路径状态、查询上下文）"""
+
+    __slots__ = ('owner', 'stats', 'recall_path_stats', 'query_context')
+
+    def __init__(self, owner: 'ElevenLayerRetriever', query_context: Optional[QueryContext] = None):
+        self.owner = weakref.ref(owner)
+        self.stats: List[LayerStats] = []
+        self.recall_path_stats: Dict[str, Dict[str, Any]] = {}
+        self.query_context = query_context
+
+
+# v7.1: 当前线程 / asyncio 任务最近一次检索的统计。并发检索各写各的，
+# 召回线程池中的任务复制提交方的上下文，写入同一次检索的统计
+_current_trace: contextvars.ContextVar[Optional[_SearchTrace]] = contextvars.ContextVar(
+    'recall_search_trace', default=None
+)
+
+
 class ElevenLayerRetriever:
     """十一层漏斗检索器
     
@@ -112,7 +151,9 @@ class ElevenLayerRetriever:
         fulltext_index: Optional[Any] = None,
         fulltext_weight: float = 0.3,
         # 配置
-        config: Optional[RetrievalConfig] = None
+        config: Optional[RetrievalConfig] = None,
+        # v7.1: 引擎持有的常驻检索线程池（None 时按 config.recall_workers 惰性创建）
+        executor: Optional[Executor] = None
     ):
         # 现有依赖
         self.bloom_filter = bloom_filter
@@ -146,8 +187,13 @@ class ElevenLayerRetriever:
         
         self.config = config or RetrievalConfig.default()
         
-        # 统计
-        self.stats: List[LayerStats] = []
+        # 统计：按次检索记录在 _SearchTrace 中（v7.1: 并发检索不再互相覆盖），
+        # 通过 stats / recall_path_stats / _last_query_context 读取当前调用方最近一次检索的统计
+        
+        # v7.1: 召回线程池（跨查询复用）
+        self._executor: Optional[Executor] = executor
+        self._owns_executor = False
+        self._executor_lock = threading.Lock()
         
         # 兼容旧配置格式（dict）
         self._legacy_config: Dict[str, Any] = {}
@@ -159,6 +205,30 @@ class ElevenLayerRetriever:
             model=reranker_model,
         )
     
+    def _begin_trace(self, query_context: Optional[QueryContext]) -> _SearchTrace:
+        """v7.1: 开始记录一次检索的统计（只对当前线程 / asyncio 任务可见）"""
+        trace = _SearchTrace(self, query_context)
+        _current_trace.set(trace)
+        return trace
+    
+    def _trace(self) -> _SearchTrace:
+        trace = _current_trace.get()
+        if trace is None or trace.owner() is not self:
+            return _SearchTrace(self)  # 当前调用方还没有用本检索器检索过
+        return trace
+    
+    @property
+    def stats(self) -> List[LayerStats]:
+        return self._trace().stats
+    
+    @property
+    def recall_path_stats(self) -> Dict[str, Dict[str, Any]]:
+        return self._trace().recall_path_stats
+    
+    @property
+    def _last_query_context(self) -> Optional[QueryContext]:
+        return self._trace().query_context
+    
     def cache_content(self, doc_id: str, content: str):
         """缓存文档内容（在添加索引时调用）- 兼容 EightLayerRetriever"""
         self._content_cache[doc_id] = content
@@ -319,7 +389,9 @@ class ElevenLayerRetriever:
         top_k: int = 10,
         filters: Optional[Dict[str, Any]] = None,
         temporal_context: Optional[TemporalContext] = None,
-        config: Optional[RetrievalConfig] = None
+        config: Optional[RetrievalConfig] = None,
+        allowed_ids: Optional[Collection[str]] = None,
+        query_context: Optional[QueryContext] = None
     ) -> List[RetrievalResultItem]:
         """执行十一层检索（同步版本）
         
@@ -327,6 +399,8 @@ class ElevenLayerRetriever:
         
         Phase 3.6: 支持并行三路召回模式（默认启用）
         Phase 7.4: 支持元数据预过滤 (filters 参数)
+        v7.1: 支持租户分区过滤 (allowed_ids 参数，下推到各路召回)
+        v7.1: 支持共享查询上下文 (query_context 参数，查询向量整次检索只编码一次)
         
         Args:
             query: 查询文本
@@ -336,18 +410,38 @@ class ElevenLayerRetriever:
             filters: 过滤条件（可选）
             temporal_context: 时态上下文（可选，用于 L2）
             config: 检索配置（可选，覆盖默认配置）
+            allowed_ids: 只在这些文档中检索（可选，通常为当前用户的记忆 ID）
+            query_context: 查询分析上下文（可选，entities/keywords 未传时从中读取）
         
         Returns:
             List[RetrievalResultItem]: 检索结果
         """
         config = config or self.config
         top_k = top_k or config.final_top_k
+        query_context = self._resolve_query_context(query, query_context)
+        if entities is None:
+            entities = query_context.entities
+        if keywords is None:
+            keywords = query_context.keywords
         
         # Phase 3.6: 根据配置选择并行或串行模式
         if config.parallel_recall_enabled:
-            return self._parallel_recall(query, entities, keywords, top_k, temporal_context, config, filters)
+            return self._parallel_recall(query, entities, keywords, top_k, temporal_context, config, filters,
+                                         allowed_ids, query_context)
         else:
-            return self._legacy_retrieve(query, entities, keywords, top_k, filters, temporal_context, config)
+            return self._legacy_retrieve(query, entities, keywords, top_k, filters, temporal_context, config,
+                                         allowed_ids, query_context)
+    
+    def _resolve_query_context(self, query: str, query_context: Optional[QueryContext]) -> QueryContext:
+        """v7.1: 取得本次检索的查询上下文，未传入时新建（编码器按向量索引类型选择）"""
+        if query_context is None:
+            query_context = QueryContext(query=query)
+        if query_context.encoder is None:
+            if self.vector_index is not None and hasattr(self.vector_index, 'encode'):
+                query_context.encoder = self.vector_index.encode
+            elif self.embedding_backend is not None:
+                query_context.encoder = self.embedding_backend.encode
+        return query_context
     
     def _parallel_recall(
         self,
@@ -357,7 +451,9 @@ class ElevenLayerRetriever:
         top_k: int,
         temporal_context: Optional[TemporalContext],
         config: RetrievalConfig,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        allowed_ids: Optional[Collection[str]] = None,
+        query_context: Optional[QueryContext] = None
     ) -> List[RetrievalResultItem]:
         """Phase 3.6: 并行三路召回实现
         
@@ -369,7 +465,8 @@ class ElevenLayerRetriever:
         
         与 EightLayerRetriever._parallel_recall 保持一致的逻辑
         """
-        self.stats = []
+        query_context = query_context or self._resolve_query_context(query, None)
+        self._begin_trace(query_context)
         candidates: Set[str] = set()
         scores: Dict[str, float] = defaultdict(float)
         
@@ -384,58 +481,25 @@ class ElevenLayerRetriever:
         if config.l2_enabled and self.temporal_index and temporal_context:
             temporal_candidates = self._l2_temporal_filter(temporal_context, config)
         
-        # 1. 并行执行三路召回（带优雅超时处理）
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            futures = {
-                executor.submit(self._vector_recall_parallel, query, top_k * 2): 'vector',
-                executor.submit(self._keyword_recall_parallel, filtered_keywords or keywords, top_k * 2, temporal_candidates): 'keyword',
-                executor.submit(self._entity_recall_parallel, entities, top_k * 2, temporal_candidates): 'entity',
-            }
-            
-            all_results: Dict[str, List[Tuple[str, float]]] = {}
-            try:
-                for future in as_completed(futures, timeout=30.0):
-                    source = futures[future]
-                    try:
-                        all_results[source] = future.result()
-                    except Exception as e:
-                        all_results[source] = []
-                        logger.warning(f"[ElevenLayer] {source} recall failed: {e}")
-            except TimeoutError:
-                # 优雅处理超时：收集已完成的结果，记录未完成的路径
-                completed_sources = set(all_results.keys())
-                for future, source in futures.items():
-                    if source not in completed_sources:
-                        if future.done():
-                            try:
-                                all_results[source] = future.result()
-                            except Exception as e:
-                                all_results[source] = []
-                                logger.warning(f"[ElevenLayer] {source} recall failed after timeout: {e}")
-                        else:
-                            all_results[source] = []
-                            logger.warning(f"[ElevenLayer] {source} recall timed out, using other paths")
+        # v7.1: 租户分区与时态候选一起作为召回过滤条件
+        temporal_candidates = _restrict_candidates(temporal_candidates, allowed_ids)
         
+        # 1. 所有召回路径并发提交到常驻检索线程池，各路按各自截止时间收集
+        # （v7.1: 之前每次查询新建 3 线程池，BM25 与图遍历在池关闭后串行执行）
+        paths: Dict[str, Tuple[Callable[..., List[Tuple[str, float]]], tuple]] = {
+            'vector': (self._vector_recall_parallel, (query, top_k * 2, allowed_ids, query_context)),
+            'keyword': (self._keyword_recall_parallel, (filtered_keywords or keywords, top_k * 2, temporal_candidates)),
+            'entity': (self._entity_recall_parallel, (entities, top_k * 2, temporal_candidates)),
+        }
         # L5: Graph Traversal - 图遍历扩展（附加到实体召回）
         if config.l5_enabled and self.knowledge_graph and entities:
-            graph_results = self._graph_recall_parallel(entities, top_k, config)
-            all_results['graph'] = graph_results
-        
+            paths['graph'] = (self._graph_recall_parallel, (entities, top_k, config, allowed_ids))
         # v7.0.1: BM25 全文检索召回（第4路）
         if self.fulltext_index and query:
-            try:
-                bm25_raw = self.fulltext_index.search(query, top_k=top_k * 2)
-                bm25_results = []
-                for item in bm25_raw:
-                    doc_id = item[0] if isinstance(item, (list, tuple)) else getattr(item, 'doc_id', str(item))
-                    score = item[1] if isinstance(item, (list, tuple)) and len(item) > 1 else 1.0
-                    # v7.0.4: 修复 — RRF 期望 List[Tuple[str, float]]，之前错误使用 RetrievalResultItem 导致 100% 静默失败
-                    bm25_results.append((str(doc_id), float(score)))
-                all_results['fulltext'] = bm25_results
-            except Exception as e:
-                logger.warning(f"[ElevenLayer] BM25 fulltext recall failed: {e}")
-                pass
-
+            paths['fulltext'] = (self._fulltext_recall_parallel, (query, top_k * 2, allowed_ids))
+        
+        all_results = self._run_recall_paths(paths, config)
+        
         # 2. RRF 融合
         results_to_fuse = [
             all_results.get('vector', []),
@@ -464,9 +528,9 @@ class ElevenLayerRetriever:
             weights=weights
         )
         
-        # 3. 如果融合结果为空，启用原文兜底（100% 保证）
+        # 3. 如果融合结果为空，启用原文兜底（100% 保证，分片扫描同样在检索线程池上执行）
         if not fused and config.fallback_enabled and self.ngram_index:
-            fused = self._raw_text_fallback_parallel(query, config)
+            fused = self._raw_text_fallback_parallel(query, config, allowed_ids, executor=self._get_executor())
         
         # 将融合结果转为 candidates 和 scores
         for doc_id, score in fused:
@@ -482,7 +546,7 @@ class ElevenLayerRetriever:
         
         # L8: Vector Fine - 向量精排
         if config.l8_enabled and vector_enabled and len(candidates) > config.fine_rank_threshold:
-            self._l8_vector_fine(query, candidates, scores, config)
+            self._l8_vector_fine(query, candidates, scores, config, query_context)
         
         # L9: Rerank - TF-IDF 重排序
         if config.l9_enabled and candidates:
@@ -504,26 +568,132 @@ class ElevenLayerRetriever:
         results = self._apply_mmr_diversity(results, top_k)
         return results
     
-    def _vector_recall_parallel(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+    def _get_executor(self) -> Executor:
+        """v7.1: 检索线程池（优先使用引擎传入的常驻池，否则按配置惰性创建一个自有池）"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=max(1, self.config.recall_workers),
+                        thread_name_prefix='recall-retrieval'
+                    )
+                    self._owns_executor = True
+        return self._executor
+    
+    def _run_recall_paths(
+        self,
+        paths: Dict[str, Tuple[Callable[..., List[Tuple[str, float]]], tuple]],
+        config: RetrievalConfig
+    ) -> Dict[str, List[Tuple[str, float]]]:
+        """v7.1: 在检索线程池上并发执行各路召回，每路按 config.recall_deadline() 截止
+        
+        超时或失败的路径返回空列表（不影响其他路径）；每路耗时与状态记录到
+        self.recall_path_stats，由 get_stats_summary() 输出。各路在提交方上下文的副本中执行，
+        写入的是本次检索的统计。
+        """
+        executor = self._get_executor()
+        start = time.perf_counter()
+        futures: Dict[Future, str] = {}
+        deadlines: Dict[Future, float] = {}
+        for source, (fn, args) in paths.items():
+            future = executor.submit(contextvars.copy_context().run, fn, *args)
+            futures[future] = source
+            deadlines[future] = start + config.recall_deadline(source)
+        
+        all_results: Dict[str, List[Tuple[str, float]]] = {}
+        
+        def _record(source: str, status: str, results: List[Tuple[str, float]]) -> None:
+            all_results[source] = results
+            self.recall_path_stats[source] = {
+                'status': status,
+                'count': len(results),
+                'time_ms': (time.perf_counter() - start) * 1000,
+            }
+        
+        pending = set(futures)
+        while pending:
+            timeout = max(0.0, min(deadlines[f] for f in pending) - time.perf_counter())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = futures[future]
+                try:
+                    _record(source, 'ok', future.result() or [])
+                except Exception as e:
+                    _record(source, 'error', [])
+                    logger.warning(f"[ElevenLayer] {source} recall failed: {e}")
+            now = time.perf_counter()
+            for future in [f for f in pending if deadlines[f] <= now]:
+                # 已开始的任务无法中断，只是不再等待；未开始的直接取消
+                future.cancel()
+                pending.discard(future)
+                _record(futures[future], 'timeout', [])
+                logger.warning(f"[ElevenLayer] {futures[future]} recall timed out, using other paths")
+        return all_results
+    
+    def _fulltext_recall_parallel(
+        self,
+        query: str,
+        top_k: int,
+        allowed_ids: Optional[Collection[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """v7.0.1 路径 4: BM25 全文检索召回"""
+        start = time.perf_counter()
+        if allowed_ids is not None:
+            bm25_raw = self.fulltext_index.search(query, top_k=top_k, allowed_ids=allowed_ids)
+        else:
+            bm25_raw = self.fulltext_index.search(query, top_k=top_k)
+        bm25_results = []
+        for item in bm25_raw:
+            doc_id = item[0] if isinstance(item, (list, tuple)) else getattr(item, 'doc_id', str(item))
+            score = item[1] if isinstance(item, (list, tuple)) and len(item) > 1 else 1.0
+            # v7.0.4: 修复 — RRF 期望 List[Tuple[str, float]]，之前错误使用 RetrievalResultItem 导致 100% 静默失败
+            bm25_results.append((str(doc_id), float(score)))
+        
+        self.stats.append(LayerStats(
+            layer="fulltext_bm25",
+            input_count=0,
+            output_count=len(bm25_results),
+            time_ms=(time.perf_counter() - start) * 1000
+        ))
+        return bm25_results
+    
+    def _vector_recall_parallel(
+        self,
+        query: str,
+        top_k: int,
+        allowed_ids: Optional[Collection[str]] = None,
+        query_context: Optional[QueryContext] = None
+    ) -> List[Tuple[str, float]]:
         """Phase 3.6 路径 1: 语义向量召回
         
         兼容两种向量索引：
         - VectorIndex: search(query: str) - 内部自动 encode
         - VectorIndexIVF: search(embedding: List[float]) - 需要外部 encode
+        
+        v7.1: allowed_ids 下推到索引内部过滤，保证小租户也能取满 top_k
+        v7.1: 查询向量取自 query_context，与 L8 精排共享同一次编码
         """
         if not self.vector_index or not getattr(self.vector_index, 'enabled', True):
             return []
         
         start = time.perf_counter()
         results = []
+        partition = {'allowed_ids': allowed_ids} if allowed_ids is not None else {}
+        query_context = query_context or self._resolve_query_context(query, None)
         
         try:
-            if hasattr(self.vector_index, 'encode'):
-                results = self.vector_index.search(query, top_k=top_k)
+            prefetched = query_context.get_vector_hits(top_k)
+            if prefetched is not None:
+                # v7.1: search_many 已用整个查询矩阵批量检索过
+                results = prefetched
+            elif hasattr(self.vector_index, 'encode'):
+                results = self.vector_index.search(
+                    query, top_k=top_k, query_embedding=query_context.get_embedding(), **partition
+                )
             else:
                 if hasattr(self, 'embedding_backend') and self.embedding_backend:
-                    query_embedding = self.embedding_backend.encode(query)
-                    results = self.vector_index.search(query_embedding, top_k=top_k)
+                    query_embedding = query_context.get_embedding()
+                    results = self.vector_index.search(query_embedding, top_k=top_k, **partition)
                 else:
                     logger.warning("[ElevenLayer] No embedding_backend for VectorIndexIVF")
                     return []
@@ -647,7 +817,8 @@ class ElevenLayerRetriever:
         self, 
         entities: List[str], 
         top_k: int,
-        config: RetrievalConfig
+        config: RetrievalConfig,
+        allowed_ids: Optional[Collection[str]] = None
     ) -> List[Tuple[str, float]]:
         """Phase 3.6 附加路径: 图遍历扩展（v7.0: 通过 QueryPlanner 执行，获得缓存优化）"""
         start = time.perf_counter()
@@ -695,6 +866,8 @@ class ElevenLayerRetriever:
                                 for episode_id in edge.source_episodes:
                                     graph_candidates.append((episode_id, depth_weight * config.weights.graph))
             
+            if allowed_ids is not None:
+                graph_candidates = [c for c in graph_candidates if c[0] in allowed_ids]
             graph_candidates.sort(key=lambda x: x[1], reverse=True)
         except Exception as e:
             logger.warning(f"[ElevenLayer] Graph recall failed: {e}")
@@ -710,9 +883,15 @@ class ElevenLayerRetriever:
     def _raw_text_fallback_parallel(
         self, 
         query: str, 
-        config: RetrievalConfig
+        config: RetrievalConfig,
+        allowed_ids: Optional[Collection[str]] = None,
+        executor: Optional[Executor] = None
     ) -> List[Tuple[str, float]]:
-        """Phase 3.6 原文兜底搜索（100% 保证）"""
+        """Phase 3.6 原文兜底搜索（100% 保证）
+        
+        v7.1: 传入 executor 时分片扫描复用检索线程池，并受 fallback 路径截止时间约束。
+        只能在调用线程（而非池内线程）中使用 executor，避免池内任务等待池内任务。
+        """
         if not self.ngram_index:
             return []
         
@@ -722,11 +901,20 @@ class ElevenLayerRetriever:
         # 检查是否有可用的并行搜索方法
         raw_search_parallel = getattr(self.ngram_index, 'raw_search_parallel', None)
         if config.fallback_parallel and callable(raw_search_parallel):
-            doc_ids = raw_search_parallel(
-                query,
-                max_results=max_results,
-                num_workers=config.fallback_workers
-            )
+            if executor is not None:
+                doc_ids = raw_search_parallel(
+                    query,
+                    max_results=max_results,
+                    num_workers=config.fallback_workers,
+                    executor=executor,
+                    timeout=config.recall_deadline('fallback')
+                )
+            else:
+                doc_ids = raw_search_parallel(
+                    query,
+                    max_results=max_results,
+                    num_workers=config.fallback_workers
+                )
         else:
             doc_ids = self.ngram_index.raw_search(query, max_results=max_results)
         
@@ -739,14 +927,19 @@ class ElevenLayerRetriever:
             except (TypeError, ValueError):
                 doc_ids = []
         
-        results = [(doc_id, 0.3) for doc_id in doc_ids]
+        results = [
+            (doc_id, 0.3) for doc_id in doc_ids
+            if allowed_ids is None or doc_id in allowed_ids
+        ]
         
+        elapsed_ms = (time.perf_counter() - start) * 1000
         self.stats.append(LayerStats(
             layer="fallback_ngram_parallel",
             input_count=0,
             output_count=len(results),
-            time_ms=(time.perf_counter() - start) * 1000
+            time_ms=elapsed_ms
         ))
+        self.recall_path_stats['fallback'] = {'status': 'ok', 'count': len(results), 'time_ms': elapsed_ms}
         return results
     
     def _legacy_retrieve(
@@ -757,10 +950,13 @@ class ElevenLayerRetriever:
         top_k: int,
         filters: Optional[Dict[str, Any]],
         temporal_context: Optional[TemporalContext],
-        config: RetrievalConfig
+        config: RetrievalConfig,
+        allowed_ids: Optional[Collection[str]] = None,
+        query_context: Optional[QueryContext] = None
     ) -> List[RetrievalResultItem]:
         """原有串行十一层检索（向后兼容）"""
-        self.stats = []
+        query_context = query_context or self._resolve_query_context(query, None)
+        self._begin_trace(query_context)
         candidates: Set[str] = set()  # 候选 ID 集合
         scores: Dict[str, float] = defaultdict(float)  # ID -> 分数
         
@@ -776,6 +972,9 @@ class ElevenLayerRetriever:
         if config.l2_enabled and self.temporal_index and temporal_context:
             temporal_candidates = self._l2_temporal_filter(temporal_context, config)
         
+        # v7.1: 租户分区与时态候选一起作为召回过滤条件
+        temporal_candidates = _restrict_candidates(temporal_candidates, allowed_ids)
+        
         # ========== 召回阶段 ==========
         
         # L3: Inverted Index - 关键词匹配
@@ -788,7 +987,7 @@ class ElevenLayerRetriever:
         
         # L5: Graph Traversal - 图遍历扩展【新增】
         if config.l5_enabled and self.knowledge_graph and entities:
-            self._l5_graph_traversal(entities, candidates, scores, config)
+            self._l5_graph_traversal(entities, candidates, scores, config, allowed_ids)
         
         # L6: N-gram Index - 模糊匹配
         if config.l6_enabled and self.ngram_index:
@@ -797,13 +996,13 @@ class ElevenLayerRetriever:
         # L7: Vector Coarse - 向量粗筛
         vector_enabled = self.vector_index and getattr(self.vector_index, 'enabled', True)
         if config.l7_enabled and vector_enabled:
-            self._l7_vector_coarse(query, candidates, scores, config)
+            self._l7_vector_coarse(query, candidates, scores, config, allowed_ids, query_context)
         
         # ========== 精排阶段 ==========
         
         # L8: Vector Fine - 向量精排
         if config.l8_enabled and vector_enabled and len(candidates) > config.fine_rank_threshold:
-            self._l8_vector_fine(query, candidates, scores, config)
+            self._l8_vector_fine(query, candidates, scores, config, query_context)
         
         # L9: Rerank - TF-IDF 重排序
         if config.l9_enabled and candidates:
@@ -819,7 +1018,7 @@ class ElevenLayerRetriever:
         
         # 终极兜底：如果所有层都没找到结果，使用 N-gram 原文搜索
         if not candidates and self.ngram_index:
-            self._fallback_ngram_search(query, candidates, scores, top_k)
+            self._fallback_ngram_search(query, candidates, scores, top_k, allowed_ids)
         
         # Phase 7.4: importance-weighted scoring
         self._apply_importance_recency_weighting(candidates, scores)
@@ -837,7 +1036,9 @@ class ElevenLayerRetriever:
         top_k: int = 10,
         filters: Optional[Dict[str, Any]] = None,
         temporal_context: Optional[TemporalContext] = None,
-        config: Optional[RetrievalConfig] = None
+        config: Optional[RetrievalConfig] = None,
+        allowed_ids: Optional[Collection[str]] = None,
+        query_context: Optional[QueryContext] = None
     ) -> List[RetrievalResultItem]:
         """执行十一层检索（异步版本，支持 L11 LLM Filter）
         
@@ -849,14 +1050,21 @@ class ElevenLayerRetriever:
             filters: 过滤条件（可选）
             temporal_context: 时态上下文（可选）
             config: 检索配置（可选）
+            allowed_ids: 只在这些文档中检索（可选，v7.1 租户分区）
+            query_context: 查询分析上下文（可选，v7.1 查询向量只编码一次）
         
         Returns:
             List[RetrievalResultItem]: 检索结果
         """
         config = config or self.config
         top_k = top_k or config.final_top_k
+        query_context = self._resolve_query_context(query, query_context)
+        if entities is None:
+            entities = query_context.entities
+        if keywords is None:
+            keywords = query_context.keywords
         
-        self.stats = []
+        self._begin_trace(query_context)
         candidates: Set[str] = set()
         scores: Dict[str, float] = defaultdict(float)
         
@@ -872,6 +1080,8 @@ class ElevenLayerRetriever:
         if config.l2_enabled and self.temporal_index and temporal_context:
             temporal_candidates = self._l2_temporal_filter(temporal_context, config)
         
+        temporal_candidates = _restrict_candidates(temporal_candidates, allowed_ids)
+        
         # ========== 召回阶段 ==========
         
         # L3: Inverted Index
@@ -884,7 +1094,7 @@ class ElevenLayerRetriever:
         
         # L5: Graph Traversal
         if config.l5_enabled and self.knowledge_graph and entities:
-            self._l5_graph_traversal(entities, candidates, scores, config)
+            self._l5_graph_traversal(entities, candidates, scores, config, allowed_ids)
         
         # L6: N-gram Index
         if config.l6_enabled and self.ngram_index:
@@ -893,13 +1103,13 @@ class ElevenLayerRetriever:
         # L7: Vector Coarse
         vector_enabled = self.vector_index and getattr(self.vector_index, 'enabled', True)
         if config.l7_enabled and vector_enabled:
-            self._l7_vector_coarse(query, candidates, scores, config)
+            self._l7_vector_coarse(query, candidates, scores, config, allowed_ids, query_context)
         
         # ========== 精排阶段 ==========
         
         # L8: Vector Fine
         if config.l8_enabled and vector_enabled and len(candidates) > config.fine_rank_threshold:
-            self._l8_vector_fine(query, candidates, scores, config)
+            self._l8_vector_fine(query, candidates, scores, config, query_context)
         
         # L9: Rerank
         if config.l9_enabled and candidates:
@@ -915,7 +1125,7 @@ class ElevenLayerRetriever:
         
         # 兜底搜索
         if not candidates and self.ngram_index:
-            self._fallback_ngram_search(query, candidates, scores, top_k)
+            self._fallback_ngram_search(query, candidates, scores, top_k, allowed_ids)
         
         return self._build_results(candidates, scores, top_k)
     
@@ -1071,7 +1281,8 @@ class ElevenLayerRetriever:
         entities: List[str],
         candidates: Set[str],
         scores: Dict[str, float],
-        config: RetrievalConfig
+        config: RetrievalConfig,
+        allowed_ids: Optional[Collection[str]] = None
     ) -> None:
         """L5: 图遍历扩展 - 使用 TemporalKnowledgeGraph.bfs() 发现关联文档"""
         
@@ -1103,6 +1314,9 @@ class ElevenLayerRetriever:
                             for episode_id in edge.source_episodes:
                                 graph_candidates.append((episode_id, depth_weight * config.weights.graph))
             
+            if allowed_ids is not None:
+                graph_candidates = [c for c in graph_candidates if c[0] in allowed_ids]
+            
             # 按分数排序并取 top_k
             graph_candidates.sort(key=lambda x: x[1], reverse=True)
             for episode_id, score in graph_candidates[:config.l5_graph_top_k]:
@@ -1162,24 +1376,34 @@ class ElevenLayerRetriever:
         query: str,
         candidates: Set[str],
         scores: Dict[str, float],
-        config: RetrievalConfig
+        config: RetrievalConfig,
+        allowed_ids: Optional[Collection[str]] = None,
+        query_context: Optional[QueryContext] = None
     ) -> None:
         """L7: Vector Coarse - 向量粗筛（兼容 VectorIndex 和 VectorIndexIVF）"""
         start_time = time.perf_counter()
         input_count = len(candidates)
+        partition = {'allowed_ids': allowed_ids} if allowed_ids is not None else {}
+        query_context = query_context or self._resolve_query_context(query, None)
 
         # v7.0.2: 区分 VectorIndex（内置 encode + text search）和 VectorIndexIVF（需要外部 embedding）
         is_ivf = hasattr(self.vector_index, 'search') and not hasattr(self.vector_index, 'encode')
-        if is_ivf and self.embedding_backend:
+        prefetched = query_context.get_vector_hits(config.l7_vector_top_k)
+        if prefetched is not None:
+            # v7.1: search_many 已用整个查询矩阵批量检索过
+            vector_results = prefetched
+        elif is_ivf and self.embedding_backend:
             # IVF 索引：先编码，再用向量搜索
-            query_vec = self.embedding_backend.encode(query)
+            query_vec = query_context.get_embedding()
             vec_list = query_vec.tolist() if hasattr(query_vec, 'tolist') else list(query_vec)
-            vector_results = self.vector_index.search(vec_list, top_k=config.l7_vector_top_k)
+            vector_results = self.vector_index.search(vec_list, top_k=config.l7_vector_top_k, **partition)
         else:
-            # 普通 VectorIndex：直接传文本
+            # 普通 VectorIndex：传文本，附带共享的查询向量（v7.1）
             vector_results = self.vector_index.search(
                 query,
-                top_k=config.l7_vector_top_k
+                top_k=config.l7_vector_top_k,
+                query_embedding=query_context.get_embedding(),
+                **partition
             )
 
         # 合并向量结果
@@ -1203,22 +1427,20 @@ class ElevenLayerRetriever:
         query: str,
         candidates: Set[str],
         scores: Dict[str, float],
-        config: RetrievalConfig
+        config: RetrievalConfig,
+        query_context: Optional[QueryContext] = None
     ) -> None:
         """L8: Vector Fine - 向量精排，重新计算精确相似度"""
         start_time = time.perf_counter()
         input_count = len(candidates)
+        query_context = query_context or self._resolve_query_context(query, None)
         
         try:
             import numpy as np
 
-            # 1. 获取查询向量（v7.0.2: 兼容 IVF 模式）
-            is_ivf = not hasattr(self.vector_index, 'encode')
-            if is_ivf and self.embedding_backend:
-                query_embedding = self.embedding_backend.encode(query)
-            elif hasattr(self.vector_index, 'encode'):
-                query_embedding = self.vector_index.encode(query)
-            else:
+            # 1. 获取查询向量（v7.0.2: 兼容 IVF 模式；v7.1: 复用召回阶段的编码结果）
+            query_embedding = query_context.get_embedding()
+            if query_embedding is None:
                 # 无法编码，跳过 L8
                 self.stats.append(LayerStats(
                     layer=RetrievalLayer.L8_VECTOR_FINE.value,
@@ -1550,7 +1772,8 @@ class ElevenLayerRetriever:
         query: str,
         candidates: Set[str],
         scores: Dict[str, float],
-        top_k: int
+        top_k: int,
+        allowed_ids: Optional[Collection[str]] = None
     ) -> None:
         """兜底搜索 - 如果所有层都没找到结果，使用 N-gram 原文搜索"""
         start_time = time.perf_counter()
@@ -1561,6 +1784,9 @@ class ElevenLayerRetriever:
         else:
             fallback_ids = self.ngram_index.search(query)
         
+        if allowed_ids is not None:
+            fallback_ids = [doc_id for doc_id in fallback_ids if doc_id in allowed_ids]
+        
         for doc_id in fallback_ids[:top_k]:
             content = self._get_content(doc_id)
             if content:
@@ -1707,10 +1933,15 @@ class ElevenLayerRetriever:
         ]
     
     def get_stats_summary(self) -> Dict[str, Any]:
-        """获取统计摘要（兼容 EightLayerRetriever）"""
-        total_time = sum(s.time_ms for s in self.stats)
+        """获取统计摘要（兼容 EightLayerRetriever）
+        
+        v7.1: 统计的是当前线程 / asyncio 任务最近一次检索，并发检索互不影响
+        """
+        trace = self._trace()
+        total_time = sum(s.time_ms for s in trace.stats)
         return {
             'total_time_ms': total_time,
+            'query_encodes': trace.query_context.encode_count if trace.query_context else 0,
             'layers': [
                 {
                     'layer': s.layer,
@@ -1718,9 +1949,18 @@ class ElevenLayerRetriever:
                     'output': s.output_count,
                     'time_ms': s.time_ms,
                 }
-                for s in self.stats
-            ]
+                for s in trace.stats
+            ],
+            # v7.1: 并行召回各路径耗时（提交到收集完成/超时的墙钟时间）与状态 ok/timeout/error
+            'recall_paths': dict(trace.recall_path_stats),
         }
+    
+    def close(self) -> None:
+        """v7.1: 关闭自有检索线程池（引擎传入的线程池由引擎负责关闭）"""
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._owns_executor = False
 
 
 # =========================================================================
@@ -1742,7 +1982,9 @@ class EightLayerRetrieverCompat:
         entities: Optional[List[str]] = None,
         keywords: Optional[List[str]] = None,
         top_k: int = 20,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        allowed_ids: Optional[Collection[str]] = None,
+        query_context: Optional[QueryContext] = None
     ) -> List[RetrievalResultItem]:
         """旧 API 兼容（同步）"""
         # 创建兼容配置（禁用新增层）
@@ -1759,7 +2001,9 @@ class EightLayerRetrieverCompat:
             top_k=top_k,
             filters=filters,
             temporal_context=None,
-            config=config
+            config=config,
+            allowed_ids=allowed_ids,
+            query_context=query_context
         )
     
     def cache_content(self, doc_id: str, content: str):
@@ -181,6 +181,9 @@ def mmr_rerank_by_content(
     # 迭代式 MMR 选择
     selected: List[str] = []
     remaining = set(result_map.keys())
+    # v7.1: 每个候选与已选集合的最大相似度增量维护（每轮只与新选中的文档比较），
+    # 相似度计算从 O(k²·n) 降为 O(k·n)
+    max_sim_to_selected: Dict[str, float] = {doc_id: 0.0 for doc_id in remaining}
     
     for _ in range(min(top_k, len(result_map))):
         if not remaining:
@@ -193,25 +196,26 @@ def mmr_rerank_by_content(
             # 相关性分量：使用原始检索分数
             relevance = result_map[doc_id].get('score', 0.0)
             
-            # 多样性分量
-            max_sim_to_selected = 0.0
-            if selected:
-                doc_content = result_map[doc_id].get('content', '')
-                for sel_id in selected:
-                    sel_content = result_map[sel_id].get('content', '')
-                    if doc_content and sel_content:
-                        sim = similarity_fn(doc_content, sel_content)
-                        max_sim_to_selected = max(max_sim_to_selected, sim)
-            
-            mmr_score = lambda_param * relevance - (1 - lambda_param) * max_sim_to_selected
+            mmr_score = lambda_param * relevance - (1 - lambda_param) * max_sim_to_selected[doc_id]
             
             if mmr_score > best_mmr:
                 best_mmr = mmr_score
                 best_id = doc_id
         
-        if best_id is not None:
-            selected.append(best_id)
-            remaining.discard(best_id)
+        if best_id is None:
+            continue
+        selected.append(best_id)
+        remaining.discard(best_id)
+        
+        # 多样性分量：更新剩余候选与新选中文档的相似度
+        sel_content = result_map[best_id].get('content', '')
+        if sel_content and len(selected) < top_k:
+            for doc_id in remaining:
+                doc_content = result_map[doc_id].get('content', '')
+                if doc_content:
+                    sim = similarity_fn(doc_content, sel_content)
+                    if sim > max_sim_to_selected[doc_id]:
+                        max_sim_to_selected[doc_id] = sim
     
     # 构建结果
     mmr_results: List[Dict] = []
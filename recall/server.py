@@ -8,7 +8,7 @@ from typing import List, Dict, Any, Optional
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException, Query, Body, Request
+from fastapi import FastAPI, HTTPException, Query, Body, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 
@@ -115,6 +115,8 @@ SUPPORTED_CONFIG_KEYS = {
     # Embedding 速率限制
     'EMBEDDING_RATE_LIMIT',       # 每时间窗口最大请求数
     'EMBEDDING_RATE_WINDOW',      # 速率限制时间窗口（秒）
+    'EMBEDDING_TOKENS_PER_MINUTE', # Embedding 每分钟 token 预算
+    'EMBEDDING_MAX_IN_FLIGHT',    # Embedding 同时进行的分批请求数
     # Embedding 模式
     'RECALL_EMBEDDING_MODE',
     # LLM 配置（用于伏笔分析器等功能）
@@ -298,6 +300,13 @@ SUPPORTED_CONFIG_KEYS = {
     'RECALL_PIPELINE_MAX_SIZE',       # 异步写入管道最大队列大小
     'RECALL_PIPELINE_RATE_LIMIT',     # 管道限速 (QPS, 0=不限制)
     'RECALL_PIPELINE_WORKERS',        # 管道工作线程数
+    'RECALL_PIPELINE_PERSISTENT',     # 管道队列落盘 + 重启重放
+    'RECALL_PIPELINE_COALESCE_MAX',   # 合并为一次 add_batch 的最大条目数
+    'RECALL_PIPELINE_COALESCE_ADDS',  # 单条 ADD 也合并为 add_batch（跳过一致性检查）
+    'RECALL_PIPELINE_STATUS_RETENTION',  # 保留状态的已完成操作数
+    'RECALL_EXECUTOR_READ_WORKERS',   # 请求执行读线程池大小（搜索 / 上下文）
+    'RECALL_EXECUTOR_WRITE_WORKERS',  # 请求执行写线程池大小（添加 / 对话轮次）
+    'RECALL_EXECUTOR_MAX_QUEUE',      # 每个线程池最多排队请求数（超出返回 503）
     'RECALL_LIFECYCLE_ARCHIVE_DAYS',  # 归档天数
     'RECALL_LIFECYCLE_BACKUP_ENABLED',# 是否启用自动备份
     'RECALL_LIFECYCLE_BACKUP_DIR',    # 备份目录
@@ -307,6 +316,26 @@ SUPPORTED_CONFIG_KEYS = {
     'PARALLEL_RETRIEVER_WORKERS',     # 并行检索工作线程数
     'PARALLEL_RETRIEVER_TIMEOUT',     # 并行检索超时时间（秒）
     
+    # ====== v7.1 性能配置 ======
+    'MEMORY_STORAGE_MODE',            # 记忆持久化模式 json（整体重写）/ log（追加日志 + 后台压缩）
+    'MEMORY_LOG_COMPACT_THRESHOLD',   # log 模式下累积多少条日志记录后触发后台压缩
+    'MEMORY_LOG_FSYNC',               # log 模式下每条记录是否 fsync
+    'BULK_INGEST_CHUNK_SIZE',         # 批量导入每组提交的条数
+    'BULK_INGEST_WORKERS',            # 批量导入规则抽取进程数（0 = 不使用进程池）
+    'SQLITE_WRITE_DURABILITY',        # SQLite BAL 写入持久性 full / normal / async
+    'SQLITE_GROUP_COMMIT_MS',         # SQLite BAL 分组提交等待时间（毫秒）
+    'SQLITE_GROUP_COMMIT_ROWS',       # SQLite BAL 每个事务最多行数
+    'LLM_CACHE_ENABLED',              # LLM 响应缓存开关
+    'LLM_CACHE_TTL_SECONDS',          # LLM 响应缓存有效期（秒）
+    'LLM_CACHE_MAX_ENTRIES',          # LLM 响应缓存最多条数
+    'LLM_MAX_CONCURRENCY',            # 每个 LLM 提供商的并发上限
+    'LLM_TOKENS_PER_MINUTE',          # 每个 LLM 提供商每分钟 token 预算
+    'LLM_SINGLE_FLIGHT',              # 合并进行中的相同 LLM 请求
+    'LLM_BATCH_MAX_ITEMS',            # 短判断打包进一个提示词的最多条数
+    'LLM_BATCH_WINDOW_MS',            # LLM 微批凑批等待时间（毫秒）
+    'TASK_TRACE_MODE',                # 任务追踪模式: full/sampled/off
+    'TASK_TRACE_SAMPLE_EVERY',        # 任务追踪采样间隔
+    
     # ====== v7.0 服务器与安全配置 ======
     'ADMIN_KEY',                      # 管理员密钥（用于敏感操作）
     'RECALL_BACKEND_TIER',            # 后端层级: community/pro/enterprise
@@ -394,6 +423,14 @@ EMBEDDING_RATE_LIMIT=10
 # Rate limit time window in seconds (default 60)
 EMBEDDING_RATE_WINDOW=60
 
+# 每分钟 token 预算（默认0 = 不限），与请求数限制同时生效
+# Token-per-minute budget (default 0 = unlimited), enforced together with the request limit
+# EMBEDDING_TOKENS_PER_MINUTE=0
+
+# 同时进行的分批请求数（默认4），在上述限额内并发发送
+# Max embedding batches in flight at once (default 4), within the limits above
+# EMBEDDING_MAX_IN_FLIGHT=4
+
 # ----------------------------------------------------------------------------
 # 伏笔分析器配置
 # Foreshadowing Analyzer Configuration
@@ -1194,6 +1231,10 @@ class SearchRequest(BaseModel):
     event_time_end: Optional[str] = Field(default=None, description="事件时间范围终点（YYYY-MM-DD 或 ISO格式，v5.0）")
     # v7.3 主题过滤
     topics: Optional[List[str]] = Field(default=None, description="按主题标签过滤（v7.3）")
+    # v7.1 读己之写：等待异步写入生效后再检索
+    wait_for_ops: Optional[List[str]] = Field(default=None, description="先等待这些异步写入 op_id 完成（v7.1）")
+    min_op_id: Optional[str] = Field(default=None, description="先等待该 op_id 及其之前入队的所有异步写入完成（v7.1）")
+    consistency_timeout: float = Field(default=5.0, ge=0, le=60, description="等待异步写入的最长秒数，超时后照常检索（v7.1）")
 
 
 class SearchResultItem(BaseModel):
@@ -1476,10 +1517,77 @@ def get_pipeline():
     return _pipeline
 
 
+# ==================== Engine Executor (v7.1) ====================
+# RecallEngine 是同步的：在 async handler 中直接调用会阻塞整个事件循环。
+# 引擎调用统一交给读/写两个有界线程池执行，批量写入不会挤占搜索线程。
+
+_executor = None  # type: ignore
+
+def get_executor():
+    """获取全局 EngineExecutor 实例（懒初始化）"""
+    global _executor
+    if _executor is None:
+        from .pipeline.engine_executor import EngineExecutor
+        from .observability import get_metrics as _get_metrics
+        _ecfg = _get_config()
+        _executor = EngineExecutor(
+            read_workers=_ecfg.recall_executor_read_workers,
+            write_workers=_ecfg.recall_executor_write_workers,
+            max_queue=_ecfg.recall_executor_max_queue,
+            metrics=_get_metrics(),
+        )
+    return _executor
+
+
+async def _run_engine(pool: str, fn, *args, request: Optional[Request] = None, **kwargs):
+    """在读/写线程池中执行引擎调用
+
+    线程池排队已满 → 503 + Retry-After；客户端断开 → 499（排队中的调用被取消）。
+    """
+    from .pipeline.engine_executor import ExecutorSaturated, ClientDisconnected
+    executor = get_executor()
+    runner = executor.run_read if pool == "read" else executor.run_write
+    try:
+        return await runner(fn, *args, request=request, **kwargs)
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"服务繁忙（{e.pool} 线程池已满），请在 {e.retry_after} 秒后重试",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ClientDisconnected:
+        raise HTTPException(status_code=499, detail="客户端已断开连接")
+
+
+async def run_read(fn, *args, request: Optional[Request] = None, **kwargs):
+    """在读线程池中执行只读引擎调用（搜索 / 上下文 / 列表）"""
+    return await _run_engine("read", fn, *args, request=request, **kwargs)
+
+
+async def run_write(fn, *args, request: Optional[Request] = None, **kwargs):
+    """在写线程池中执行写入类引擎调用（添加 / 对话轮次 / 更新 / 删除）"""
+    return await _run_engine("write", fn, *args, request=request, **kwargs)
+
+
+async def _await_pipeline_ops(request, response: Response) -> None:
+    """读己之写（v7.1）：检索前等待请求指定的异步写入完成
+
+    超时后照常检索，仍未完成的 op_id 通过 X-Recall-Pending-Ops 响应头返回。
+    """
+    if not request.wait_for_ops and not request.min_op_id:
+        return
+    pl = get_pipeline()
+    if pl is None:
+        return
+    pending = await pl.wait_for(request.wait_for_ops, request.min_op_id, timeout=request.consistency_timeout)
+    if pending:
+        response.headers["X-Recall-Pending-Ops"] = ",".join(pending)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    global _config_watcher, _pipeline
+    global _config_watcher, _pipeline, _executor
     
     # 初始化结构化日志 (v7.5)
     from .observability.logging import setup_logging
@@ -1503,6 +1611,7 @@ async def lifespan(app: FastAPI):
     # 启动时
     _safe_print(f"[Recall API] 服务启动 v{__version__}")
     engine = get_engine()  # 预初始化
+    get_executor()
     
     # 启动 Async Write Pipeline
     from .pipeline.async_writer import AsyncWritePipeline
@@ -1512,6 +1621,11 @@ async def lifespan(app: FastAPI):
         max_size=_pcfg.recall_pipeline_max_size,
         rate_limit_qps=_pcfg.recall_pipeline_rate_limit,
         num_workers=_pcfg.recall_pipeline_workers,
+        spool_path=(str(Path(_pcfg.recall_data_root) / 'data' / 'pipeline_spool.db')
+                    if _pcfg.recall_pipeline_persistent else None),
+        coalesce_max_items=_pcfg.recall_pipeline_coalesce_max,
+        status_retention=_pcfg.recall_pipeline_status_retention,
+        coalesce_adds=_pcfg.recall_pipeline_coalesce_adds,
     )
     await _pipeline.start()
     
@@ -1527,6 +1641,9 @@ async def lifespan(app: FastAPI):
         await _pipeline.stop()
     if _config_watcher:
         _config_watcher.stop()
+    if _executor:
+        _executor.shutdown(wait=True)
+        _executor = None
     if _engine:
         _engine.close()
     _safe_print("[Recall API] 服务关闭")
@@ -1715,9 +1832,61 @@ async def pipeline_status():
         "is_running": s.is_running,
         "workers": s.workers,
         "rate_limit_qps": s.rate_limit_qps,
+        "persistent": s.persistent,
+        "total_replayed": s.total_replayed,
+        "total_coalesced_calls": s.total_coalesced_calls,
     }
 
 
+@app.get("/v1/pipeline/ops/{op_id}", tags=["Pipeline"])
+async def pipeline_op_status(op_id: str):
+    """查询单个异步写入操作的状态（v7.1）
+
+    state: queued / processing / committed / failed，committed 时附带写入的 memory_ids。
+    """
+    pl = get_pipeline()
+    if pl is None:
+        raise HTTPException(status_code=503, detail="Pipeline not initialized")
+    op = await asyncio.get_running_loop().run_in_executor(None, pl.get_op, op_id)
+    if op is None:
+        raise HTTPException(status_code=404, detail=f"未知的 op_id: {op_id}")
+    return op.to_dict()
+
+
+@app.post("/v1/pipeline/ops", tags=["Pipeline"])
+async def pipeline_ops_status(
+    op_ids: List[str] = Body(..., embed=True),
+    wait: bool = Body(default=False, embed=True),
+    timeout: float = Body(default=5.0, ge=0, le=60, embed=True),
+):
+    """批量查询异步写入操作的状态（v7.1）
+
+    wait=true 时先等待这些操作完成（最多 timeout 秒）再返回，无需轮询。
+    未知（从未入队或已超出保留条数）的 op_id 返回 state=unknown。
+    """
+    pl = get_pipeline()
+    if pl is None:
+        raise HTTPException(status_code=503, detail="Pipeline not initialized")
+    if wait:
+        await pl.wait_for(op_ids, timeout=timeout)
+    loop = asyncio.get_running_loop()
+    ops = []
+    for op_id in op_ids:
+        op = await loop.run_in_executor(None, pl.get_op, op_id)
+        ops.append(op.to_dict() if op is not None else {"op_id": op_id, "state": "unknown"})
+    return {"ops": ops}
+
+
+@app.get("/v1/executor/status", tags=["Pipeline"])
+async def executor_status():
+    """返回请求执行读/写线程池的状态（v7.1）。
+
+    包括排队深度、运行中调用数、拒绝/取消计数、平均排队等待时间。
+    """
+    from dataclasses import asdict
+    return {name: asdict(st) for name, st in get_executor().status().items()}
+
+
 # ==================== 前端日志上报 ====================
 
 class FrontendLogRequest(BaseModel):
@@ -1828,6 +1997,27 @@ async def get_recent_tasks(
     }
 
 
+@app.get("/v1/tasks/stats", tags=["Tasks"])
+async def get_task_stats(
+    events: int = Query(default=0, description="同时返回最近的完成事件数", ge=0, le=1000)
+):
+    """获取各步骤的耗时统计（v7.1）
+    
+    按任务类型累计的次数 / 失败数 / 平均与最大耗时，在所有追踪模式下都统计。
+    """
+    task_manager = get_task_manager()
+    
+    result = {
+        "success": True,
+        "tracing": task_manager.get_tracing_config(),
+        "steps": task_manager.get_step_stats(),
+        "timestamp": time.time()
+    }
+    if events:
+        result["events"] = task_manager.get_trace_events(events)
+    return result
+
+
 @app.get("/v1/tasks/{task_id}", tags=["Tasks"])
 async def get_task(task_id: str):
     """获取指定任务详情"""
@@ -1867,14 +2057,17 @@ async def get_task_config():
         "success": True,
         "config": {
             "enabled": task_manager.is_enabled(),
-            "max_completed_tasks": task_manager._max_completed_tasks
+            "max_completed_tasks": task_manager._max_completed_tasks,
+            **task_manager.get_tracing_config()
         }
     }
 
 
 @app.put("/v1/tasks/config", tags=["Tasks"])
 async def update_task_config(
-    enabled: Optional[bool] = Body(default=None, description="是否启用任务追踪")
+    enabled: Optional[bool] = Body(default=None, description="是否启用任务追踪"),
+    trace_mode: Optional[str] = Body(default=None, description="追踪模式: full/sampled/off"),
+    sample_every: Optional[int] = Body(default=None, description="sampled 模式的采样间隔", ge=0)
 ):
     """更新任务追踪配置"""
     task_manager = get_task_manager()
@@ -1883,10 +2076,18 @@ async def update_task_config(
         task_manager.set_enabled(enabled)
         _safe_print(f"[Tasks] 任务追踪已{'启用' if enabled else '禁用'}")
     
+    if trace_mode is not None or sample_every is not None:
+        try:
+            task_manager.configure_tracing(trace_mode, sample_every)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        _safe_print(f"[Tasks] 追踪模式: {task_manager.get_tracing_config()}")
+    
     return {
         "success": True,
         "config": {
-            "enabled": task_manager.is_enabled()
+            "enabled": task_manager.is_enabled(),
+            **task_manager.get_tracing_config()
         }
     }
 
@@ -1894,7 +2095,7 @@ async def update_task_config(
 # ==================== 记忆管理 API ====================
 
 @app.post("/v1/memories", response_model=AddMemoryResponse, tags=["Memories"])
-async def add_memory(request: AddMemoryRequest):
+async def add_memory(request: AddMemoryRequest, http_request: Request):
     """添加记忆
     
     当保存用户消息时（metadata.role='user'），会自动从内容中提取持久条件。
@@ -1939,11 +2140,15 @@ async def add_memory(request: AddMemoryRequest):
     
     # v7.0.7: 增加 try/except 包装（之前 engine.add 异常时返回不友好的 500 错误）
     try:
-        result = engine.add(
+        result = await run_write(
+            engine.add,
+            request=http_request,
             content=request.content,
             user_id=request.user_id,
             metadata=merged_metadata
         )
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         _safe_print(f"[Recall][Memory][{request_id}] [ERROR] engine.add 异常: {e}")
@@ -1983,6 +2188,7 @@ async def add_memories_batch(request: Request):
 
     v7.0.1: 支持 async 参数，当 async=true 时通过 AsyncWritePipeline 异步处理，
     立即返回 op_id，可通过 /v1/pipeline/status 查询进度。
+    v7.1: 可通过 /v1/pipeline/ops/{op_id} 查询单个操作的状态与写入的 memory_ids。
     """
     body = await request.json()
     items = body.get('items', [])
@@ -2009,6 +2215,8 @@ async def add_memories_batch(request: Request):
                         }
                         for it in items
                     ],
+                    "skip_dedup": skip_dedup,
+                    "skip_llm": skip_llm,
                 },
             )
             success = pipeline.enqueue(op)
@@ -2018,7 +2226,7 @@ async def add_memories_batch(request: Request):
                     "op_id": op.op_id,
                     "async": True,
                     "queued": len(items),
-                    "message": "已加入异步写入队列，可通过 /v1/pipeline/status 查询进度",
+                    "message": f"已加入异步写入队列，可通过 /v1/pipeline/ops/{op.op_id} 查询进度",
                 }
             else:
                 _safe_print("[Recall][Batch] Pipeline 队列已满，回退到同步模式")
@@ -2027,13 +2235,17 @@ async def add_memories_batch(request: Request):
 
     # v7.0.8: 添加 try/except 包裹，防止未捕获异常导致 500
     try:
-        memory_ids = engine.add_batch(
+        memory_ids = await run_write(
+            engine.add_batch,
+            request=request,
             items=items,
             user_id=user_id,
             skip_dedup=skip_dedup,
             skip_llm=skip_llm,
         )
         return {"memory_ids": memory_ids, "count": len(memory_ids)}
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         _safe_print(f"[Recall][Batch] 批量添加失败: {e}")
@@ -2042,7 +2254,7 @@ async def add_memories_batch(request: Request):
 
 
 @app.post("/v1/memories/turn", response_model=AddTurnResponse, tags=["Memories"])
-async def add_turn(request: AddTurnRequest):
+async def add_turn(request: AddTurnRequest, http_request: Request):
     """添加对话轮次（v4.2 性能优化）
     
     将用户消息和AI回复作为一个整体处理，性能优化：
@@ -2084,13 +2296,17 @@ async def add_turn(request: AddTurnRequest):
     _safe_print(f"[Recall][Turn][{request_id}]    调用 engine.add_turn...")
     # v7.0.8: 添加 try/except 包裹，防止未捕获异常导致 500
     try:
-        result = engine.add_turn(
+        result = await run_write(
+            engine.add_turn,
+            request=http_request,
             user_message=request.user_message,
             ai_response=request.ai_response,
             user_id=request.user_id,
             character_id=resolved_cid,
             metadata=request.metadata
         )
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         _safe_print(f"[Recall][Turn][{request_id}] [ERROR] engine.add_turn 异常: {e}")
@@ -2126,14 +2342,17 @@ async def add_turn(request: AddTurnRequest):
 
 
 @app.post("/v1/memories/search", response_model=List[SearchResultItem], tags=["Memories"])
-async def search_memories(request: SearchRequest):
+async def search_memories(request: SearchRequest, http_request: Request, response: Response):
     """搜索记忆
     
     Phase 3 新增参数：
     - temporal_filter: 时态过滤（时间范围）
     - graph_expand: 图遍历扩展（关联实体发现）
     - config_preset: 配置预设（default/fast/accurate）
+    
+    v7.1: wait_for_ops / min_op_id — 先等待异步写入（/v1/memories/batch async=true）完成再检索
     """
+    await _await_pipeline_ops(request, response)
     query_preview = request.query[:50].replace('\n', ' ') if len(request.query) > 50 else request.query.replace('\n', ' ')
     _safe_print(f"[Recall][Memory] 🔍 搜索请求: user={request.user_id}, top_k={request.top_k}")
     _safe_print(f"[Recall][Memory]    查询: {query_preview}{'...' if len(request.query) > 50 else ''}")
@@ -2175,25 +2394,33 @@ async def search_memories(request: SearchRequest):
     # v7.3: 主题过滤
     topic_filter_ids: set = None
     if request.topics:
-        try:
+        def _collect_topic_ids() -> set:
             from recall.processor.topic_cluster import TopicCluster
             import os
             engine_tmp = get_engine()
             tc = getattr(engine_tmp, 'topic_cluster', None)
             if tc is None:
                 tc = TopicCluster(data_path=os.path.join(engine_tmp.data_root, 'data'))
-            topic_filter_ids = set()
+            ids = set()
             for topic in request.topics:
                 mems = tc.search_by_topic(topic=topic, engine=engine_tmp, user_id=request.user_id, limit=500)
                 for m in mems:
-                    topic_filter_ids.add(m.get('id', ''))
+                    ids.add(m.get('id', ''))
+            return ids
+
+        try:
+            topic_filter_ids = await run_read(_collect_topic_ids, request=http_request)
             _safe_print(f"[Recall][Memory]    主题过滤: topics={request.topics}, 匹配={len(topic_filter_ids)}条")
+        except HTTPException:
+            raise
         except Exception as e:
             _safe_print(f"[Recall][Memory]    主题过滤失败: {e}")
 
     try:
         engine = get_engine()
-        results = engine.search(
+        results = await run_read(
+            engine.search,
+            request=http_request,
             query=request.query,
             user_id=request.user_id,
             top_k=request.top_k,
@@ -2207,6 +2434,8 @@ async def search_memories(request: SearchRequest):
             event_time_start=request.event_time_start,
             event_time_end=request.event_time_end,
         )
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_detail = traceback.format_exc()
@@ -2239,6 +2468,7 @@ async def search_memories(request: SearchRequest):
 
 @app.get("/v1/memories", tags=["Memories"])
 async def list_memories(
+    http_request: Request,
     user_id: str = Query(default="default", description="用户ID"),
     limit: int = Query(default=100, ge=1, le=1000, description="限制数量"),
     offset: int = Query(default=0, ge=0, description="偏移量，用于分页")
@@ -2256,7 +2486,9 @@ async def list_memories(
     engine = get_engine()
     
     # 使用高效的分页方法，避免加载全部数据
-    memories, total_count = engine.get_paginated(
+    memories, total_count = await run_read(
+        engine.get_paginated,
+        request=http_request,
         user_id=user_id,
         offset=offset,
         limit=limit
@@ -2275,10 +2507,10 @@ async def list_memories(
 
 
 @app.get("/v1/memories/{memory_id}", tags=["Memories"])
-async def get_memory(memory_id: str, user_id: str = Query(default="default")):
+async def get_memory(memory_id: str, http_request: Request, user_id: str = Query(default="default")):
     """获取单条记忆"""
     engine = get_engine()
-    memory = engine.get(memory_id, user_id=user_id)
+    memory = await run_read(engine.get, memory_id, request=http_request, user_id=user_id)
     
     if memory is None:
         raise HTTPException(status_code=404, detail="记忆不存在")
@@ -2290,7 +2522,7 @@ async def get_memory(memory_id: str, user_id: str = Query(default="default")):
 async def delete_memory(memory_id: str, user_id: str = Query(default="default")):
     """删除记忆"""
     engine = get_engine()
-    success = engine.delete(memory_id, user_id=user_id)
+    success = await run_write(engine.delete, memory_id, user_id=user_id)
     
     if not success:
         raise HTTPException(status_code=404, detail="记忆不存在或删除失败")
@@ -2415,7 +2647,9 @@ async def update_memory(
     engine = get_engine()
     # v7.0.7: 增加 try/except 包装
     try:
-        success = engine.update(memory_id, content, user_id=user_id, metadata=metadata)
+        success = await run_write(engine.update, memory_id, content, user_id=user_id, metadata=metadata)
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         _safe_print(f"[Recall] ❌ 更新记忆异常: {memory_id}: {e}")
@@ -2503,7 +2737,7 @@ async def update_core_settings(request: CoreSettingsRequest):
 # ==================== 上下文构建 API ====================
 
 @app.post("/v1/context", tags=["Context"])
-async def build_context(request: ContextRequest):
+async def build_context(request: ContextRequest, http_request: Request):
     """构建上下文
     
     注意：auto_extract_context 默认为 False，条件提取已改为在保存用户消息时进行。
@@ -2518,7 +2752,9 @@ async def build_context(request: ContextRequest):
     resolved_cid = _resolve_ns(request.character_id, getattr(request, 'namespace', None))
     # v7.0.7: 增加 try/except 包装
     try:
-        context = engine.build_context(
+        context = await run_read(
+            engine.build_context,
+            request=http_request,
             query=request.query,
             user_id=request.user_id,
             character_id=resolved_cid,
@@ -2527,6 +2763,8 @@ async def build_context(request: ContextRequest):
             include_core_facts=request.include_core_facts,
             auto_extract_context=request.auto_extract_context
         )
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         _safe_print(f"[Recall][Context] ❌ 上下文构建异常: {e}")
@@ -3954,7 +4192,7 @@ class FulltextSearchRequest(BaseModel):
 
 
 @app.post("/v1/search/fulltext", tags=["Search"])
-async def fulltext_search(request: FulltextSearchRequest):
+async def fulltext_search(request: FulltextSearchRequest, http_request: Request):
     """BM25 全文检索
     
     使用 BM25 算法进行全文检索，适合关键词精确匹配场景。
@@ -3970,7 +4208,9 @@ async def fulltext_search(request: FulltextSearchRequest):
         }
     
     try:
-        results = engine.fulltext_index.search(
+        results = await run_read(
+            engine.fulltext_index.search,
+            request=http_request,
             query=request.query,
             top_k=request.top_k
         )
@@ -3989,6 +4229,8 @@ async def fulltext_search(request: FulltextSearchRequest):
             ],
             "count": len(results)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         return {
             "success": False,
@@ -3998,18 +4240,21 @@ async def fulltext_search(request: FulltextSearchRequest):
 
 
 @app.post("/v1/search/hybrid", tags=["Search"])
-async def hybrid_search(request: SearchRequest):
+async def hybrid_search(request: SearchRequest, http_request: Request, response: Response):
     """混合搜索
     
     结合向量搜索和 BM25 全文检索的混合搜索。
     同时利用语义相似度和关键词匹配。
     """
+    await _await_pipeline_ops(request, response)
     engine = get_engine()
     
     try:
         # 尝试使用引擎的混合搜索
         if hasattr(engine, 'hybrid_search'):
-            results = engine.hybrid_search(
+            results = await run_read(
+                engine.hybrid_search,
+                request=http_request,
                 query=request.query,
                 user_id=request.user_id,
                 top_k=request.top_k,
@@ -4017,7 +4262,9 @@ async def hybrid_search(request: SearchRequest):
             )
         else:
             # 回退到普通搜索
-            results = engine.search(
+            results = await run_read(
+                engine.search,
+                request=http_request,
                 query=request.query,
                 user_id=request.user_id,
                 top_k=request.top_k,
@@ -4039,6 +4286,8 @@ async def hybrid_search(request: SearchRequest):
             ],
             "count": len(results)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         return {
             "success": False,
@@ -4048,7 +4297,7 @@ async def hybrid_search(request: SearchRequest):
 
 
 @app.post("/v1/search/parallel", tags=["Search"])
-async def parallel_search(request: SearchRequest):
+async def parallel_search(request: SearchRequest, http_request: Request, response: Response):
     """并行多源搜索（v7.0 C-3 ParallelRetriever）
     
     使用 ParallelRetriever 同时从向量/关键词/实体/图谱四路检索，
@@ -4056,18 +4305,23 @@ async def parallel_search(request: SearchRequest):
     
     适合需要最高召回率的场景（如"100%不遗忘"保证）。
     """
+    await _await_pipeline_ops(request, response)
     engine = get_engine()
     
     try:
         if hasattr(engine, 'search_parallel') and engine.parallel_retriever:
-            results = engine.search_parallel(
+            results = await run_read(
+                engine.search_parallel,
+                request=http_request,
                 query=request.query,
                 user_id=request.user_id,
                 top_k=request.top_k,
             )
         else:
             # ParallelRetriever 不可用，回退到标准搜索
-            results = engine.search(
+            results = await run_read(
+                engine.search,
+                request=http_request,
                 query=request.query,
                 user_id=request.user_id,
                 top_k=request.top_k,
@@ -4090,6 +4344,8 @@ async def parallel_search(request: SearchRequest):
             ],
             "count": len(results)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         return {
             "success": False,
@@ -0,0 +1,183 @@
+"""L3 存档的只读全文索引（v7.1）
+
+VolumeManager.search_content() 的"100%不遗忘"兜底原先逐行解析每个卷的每个
+JSONL 文件再做 lower() 子串匹配。数据文件写满（封存）后内容不再变化，
+于是在封存时为它建一个不可变的字符二元组（bigram）倒排索引：
+
+- 词项：content.lower() 中相邻两个字符 (a, b)，键为 (ord(a) << 21) | ord(b)
+- 倒排表：包含该词项的槽位号（文件内第几轮，升序）
+- 每个槽位附带 user_id 编码，用户隔离在索引内完成：
+  文件中没有该用户时直接跳过，候选槽位按编码过滤
+
+查询 q 的候选 = q 所有二元组倒排表的交集（从最短的表开始），候选行再按偏移
+读出做一次子串校验，只触及命中的倒排表与命中的行。长度不足 2 的查询无法
+用二元组过滤，返回 None 由调用方回退为扫描。
+
+文件格式（小端）::
+
+    头部 32 字节: magic 'RTI1' | 保留 4 字节 | 数据文件长度 Q | 槽位数 I | 词项数 I | 用户表长度 I | 保留
+    用户表 JSON（补齐到 8 字节）
+    词项键 Q × 词项数（升序） | 倒排起点 I × 词项数 | 倒排长度 I × 词项数
+    用户编码 H × 槽位数 | 倒排表 H × 总长度
+"""
+
+import sys
+import json
+import mmap
+import struct
+import bisect
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_MAGIC = b'RTI1'
+_HEADER = struct.Struct('<4s4xQIII4x')
+_NO_USER = 0xFFFF  # 空槽位 / 用户过多时不做索引内过滤
+
+
+def _bigram_keys(text: str) -> set:
+    return {(ord(a) << 21) | ord(b) for a, b in zip(text, text[1:])}
+
+
+def _pad8(data: bytes) -> bytes:
+    return data + b'\0' * (-len(data) % 8)
+
+
+class ArchiveTextIndex:
+    """一个已封存数据文件的二元组倒排索引（内存映射，只读）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # 空文件
+            self._file.close()
+            raise IOError(f"empty archive index: {path}")
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self) -> None:
+        magic, self.data_size, n_slots, n_terms, users_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise IOError(f"bad archive index: {self.path}")
+        pos = _HEADER.size
+        users = json.loads(bytes(self._mm[pos:pos + users_len]).decode('utf-8'))
+        pos += users_len + (-users_len % 8)
+        self._user_codes: Optional[Dict[str, int]] = (
+            {u: code for code, u in enumerate(users)} if users is not None else None
+        )
+        sections = []
+        for typecode, count in (('Q', n_terms), ('I', n_terms), ('I', n_terms), ('H', n_slots)):
+            size = array(typecode).itemsize * count
+            sections.append(self._view(typecode, pos, size))
+            pos += size
+        self._keys, self._starts, self._counts, self._slot_users = sections
+        self._postings = self._view('H', pos, len(self._mm) - pos)
+
+    def _view(self, typecode: str, start: int, size: int):
+        if sys.byteorder == 'little':
+            return memoryview(self._mm)[start:start + size].cast(typecode)
+        values = array(typecode)
+        values.frombytes(self._mm[start:start + size])
+        values.byteswap()
+        return values
+
+    # ---- 构建 ----
+
+    @staticmethod
+    def build(path: str, records: Iterable[Tuple[int, str, str]], data_size: int) -> None:
+        """从 (槽位, content.lower(), user_id) 构建索引文件（原子写入）"""
+        postings: Dict[int, array] = {}
+        slot_users: Dict[int, str] = {}
+        for slot, text, user_id in sorted(records, key=lambda r: r[0]):
+            if slot in slot_users:
+                continue
+            slot_users[slot] = user_id
+            for key in _bigram_keys(text):
+                bucket = postings.get(key)
+                if bucket is None:
+                    bucket = postings[key] = array('H')
+                bucket.append(slot)
+
+        users = sorted(set(slot_users.values()))
+        if len(users) >= _NO_USER:
+            users, codes = None, {}
+        else:
+            codes = {u: code for code, u in enumerate(users)}
+        n_slots = max(slot_users) + 1 if slot_users else 0
+        user_column = array('H', [_NO_USER]) * n_slots
+        for slot, user_id in slot_users.items():
+            user_column[slot] = codes.get(user_id, _NO_USER)
+
+        keys = array('Q', sorted(postings))
+        starts, counts, flat = array('I'), array('I'), array('H')
+        for key in keys:
+            bucket = postings[key]
+            starts.append(len(flat))
+            counts.append(len(bucket))
+            flat.extend(bucket)
+
+        users_json = json.dumps(users, ensure_ascii=False).encode('utf-8')
+        parts = [_HEADER.pack(_MAGIC, data_size, n_slots, len(keys), len(users_json)), _pad8(users_json)]
+        for values in (keys, starts, counts, user_column, flat):
+            if sys.byteorder != 'little':
+                values.byteswap()
+            parts.append(values.tobytes())
+        from recall.utils.atomic_write import atomic_bytes_dump
+        atomic_bytes_dump(b''.join(parts), path)
+
+    # ---- 查询 ----
+
+    def _postings_of(self, needle: str) -> List[int]:
+        """包含 needle 全部二元组的槽位（升序）"""
+        spans = []
+        for key in _bigram_keys(needle):
+            i = bisect.bisect_left(self._keys, key)
+            if i == len(self._keys) or self._keys[i] != key:
+                return []
+            spans.append((self._counts[i], self._starts[i]))
+        spans.sort()
+        count, start = spans[0]
+        slots = set(self._postings[start:start + count])
+        for count, start in spans[1:]:
+            if not slots:
+                break
+            slots.intersection_update(self._postings[start:start + count])
+        return sorted(slots)
+
+    def candidates(self, needles: List[str], user_id: Optional[str] = None) -> Optional[List[int]]:
+        """可能包含任一 needle（已 lower）的槽位，升序
+
+        Args:
+            needles: 小写查询串
+            user_id: 只返回该用户的槽位（None = 不限）
+
+        Returns:
+            槽位列表；有 needle 短于 2 个字符（无法用二元组过滤）时返回 None
+        """
+        if any(len(n) < 2 for n in needles):
+            return None
+        code = None
+        if user_id is not None and self._user_codes is not None:
+            code = self._user_codes.get(user_id)
+            if code is None:
+                return []  # 该文件中没有这个用户
+        slots = set()
+        for needle in needles:
+            slots.update(self._postings_of(needle))
+        if code is not None:
+            slot_users = self._slot_users
+            slots = [s for s in slots if slot_users[s] == code or slot_users[s] == _NO_USER]
+        return sorted(slots)
+
+    def close(self) -> None:
+        for name in ('_keys', '_starts', '_counts', '_slot_users', '_postings'):
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
@@ -0,0 +1,281 @@
+"""追加式日志存储 — ScopedMemory 的 log-structured 持久化模式
+
+JSON 模式下每次 add/delete/update 都要整体重写 memories.json，写入成本为 O(总记忆数)。
+本模块把每次变更追加为一行 JSONL 记录（新增 / 墓碑 / 更新 / 驱逐 / 清空），
+写入成本与作用域大小无关；日志累积到阈值后在后台线程压缩为快照。
+
+磁盘布局（位于作用域目录内）：
+    memories.snapshot.json   快照 {"seq": N, "memories": [...]}（原子写入）
+    memories.<seq>.seg       已轮转、等待压缩的日志段（文件名中的 seq 为段内最大序号）
+    memories.log             当前活跃日志段
+
+启动时：加载快照 → 按序号重放日志段 → 重放活跃日志（跳过 seq <= 快照 seq 的记录）。
+每条记录都带单调递增的 seq，因此压缩过程中任意时刻崩溃，重放都是幂等的。
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryLog:
+    """作用域记忆的追加式日志 + 后台快照压缩"""
+
+    SNAPSHOT_FILE = 'memories.snapshot.json'
+    LOG_FILE = 'memories.log'
+    SEGMENT_SUFFIX = '.seg'
+
+    def __init__(self, data_path: str, compact_threshold: int = 2000, fsync: bool = True):
+        """
+        Args:
+            data_path: 作用域数据目录
+            compact_threshold: 自上次快照以来累积多少条日志记录后触发后台压缩
+            fsync: 每条记录追加后是否 fsync（关闭可换取更高写入吞吐，断电可能丢失最后几条）
+        """
+        self.data_path = data_path
+        self.compact_threshold = max(1, compact_threshold)
+        self.fsync = fsync
+        self._snapshot_file = os.path.join(data_path, self.SNAPSHOT_FILE)
+        self._log_file = os.path.join(data_path, self.LOG_FILE)
+        self._lock = threading.Lock()
+        self._fh = None
+        self._seq = 0                 # 最后一条已写入记录的序号
+        self._snapshot_seq = 0        # 最新快照覆盖到的序号
+        self._pending = 0             # 快照之后累积的日志记录数
+        self._compact_thread: Optional[threading.Thread] = None
+
+    # ==================== 加载 / 重放 ====================
+
+    def exists(self) -> bool:
+        """目录中是否存在日志模式的数据文件"""
+        return (
+            os.path.exists(self._snapshot_file)
+            or os.path.exists(self._log_file)
+            or bool(self._segment_files())
+        )
+
+    def load(self, base: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """加载快照并重放日志尾部，返回完整记忆列表
+
+        Args:
+            base: 没有快照时使用的初始列表（例如从旧版 memories.json 迁移）
+        """
+        memories: List[Dict[str, Any]] = list(base or [])
+        snapshot_seq = 0
+        if os.path.exists(self._snapshot_file):
+            try:
+                with open(self._snapshot_file, 'r', encoding='utf-8') as f:
+                    snap = json.load(f)
+                memories = snap.get('memories', [])
+                snapshot_seq = int(snap.get('seq', 0))
+            except Exception as e:
+                logger.warning(
+                    f"[Recall] 记忆快照加载失败，将仅依赖日志重放: file={self._snapshot_file}, error={e}"
+                )
+
+        last_seq = snapshot_seq
+        pending = 0
+        for path in [p for _, p in self._segment_files()] + [self._log_file]:
+            for record in self._read_records(path):
+                seq = record.get('seq', 0)
+                if seq <= snapshot_seq:
+                    continue
+                self.apply(memories, record)
+                last_seq = max(last_seq, seq)
+                pending += 1
+
+        self._seq = last_seq
+        self._snapshot_seq = snapshot_seq
+        self._pending = pending
+        return memories
+
+    @staticmethod
+    def _read_records(path: str):
+        """逐行读取日志记录，跳过崩溃时写了一半的尾行"""
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"[Recall] 跳过损坏的日志记录: file={path}, line={line_no}")
+
+    @staticmethod
+    def apply(memories: List[Dict[str, Any]], record: Dict[str, Any]) -> None:
+        """把一条日志记录应用到记忆列表（与 ScopedMemory 的实时操作语义一致）"""
+        op = record.get('op')
+        if op == 'add':
+            memories.append(record['memory'])
+        elif op == 'delete':
+            mid = record.get('id')
+            for i, memory in enumerate(memories):
+                if memory.get('metadata', {}).get('id') == mid:
+                    del memories[i]
+                    break
+        elif op == 'update':
+            mid = record.get('id')
+            for memory in memories:
+                if memory.get('metadata', {}).get('id') == mid:
+                    memory['content'] = record.get('content', '')
+                    if record.get('metadata'):
+                        memory.setdefault('metadata', {}).update(record['metadata'])
+                    memory['updated_at'] = record.get('updated_at')
+                    break
+        elif op == 'evict':
+            del memories[:record.get('count', 0)]
+        elif op == 'clear':
+            memories.clear()
+
+    # ==================== 追加 ====================
+
+    def append(self, op: str, **fields) -> None:
+        """追加一条变更记录"""
+        with self._lock:
+            self._seq += 1
+            record = {'seq': self._seq, 'op': op, **fields}
+            if self._fh is None:
+                os.makedirs(self.data_path, exist_ok=True)
+                self._fh = open(self._log_file, 'a', encoding='utf-8')
+            self._fh.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._fh.flush()
+            if self.fsync:
+                os.fsync(self._fh.fileno())
+            self._pending += 1
+
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        """追加一组变更记录（批量导入使用）：一次写入、一次 fsync
+
+        Args:
+            records: 每项为 {'op': ..., **fields}
+        """
+        if not records:
+            return
+        with self._lock:
+            lines = []
+            for fields in records:
+                self._seq += 1
+                lines.append(json.dumps({'seq': self._seq, **fields}, ensure_ascii=False))
+            if self._fh is None:
+                os.makedirs(self.data_path, exist_ok=True)
+                self._fh = open(self._log_file, 'a', encoding='utf-8')
+            self._fh.write('\n'.join(lines) + '\n')
+            self._fh.flush()
+            if self.fsync:
+                os.fsync(self._fh.fileno())
+            self._pending += len(records)
+
+    def should_compact(self, live_count: int = 0) -> bool:
+        """日志累积超过阈值且当前没有进行中的压缩
+
+        阈值取 max(compact_threshold, 当前记忆数)：日志至少与快照一样大时才压缩，
+        使每条写入摊还的压缩成本为 O(1)，吞吐不随作用域规模下降。
+        """
+        running = self._compact_thread is not None and self._compact_thread.is_alive()
+        return self._pending >= max(self.compact_threshold, live_count) and not running
+
+    # ==================== 压缩 ====================
+
+    def compact(self, memories: List[Dict[str, Any]], wait: bool = False) -> None:
+        """把当前状态压缩为快照
+
+        调用线程只做 O(n) 的浅拷贝和一次日志段轮转（rename），
+        序列化与 fsync 在后台线程完成，不阻塞写入路径。
+
+        Args:
+            memories: ScopedMemory 当前的记忆列表（必须在调用方的写入顺序内调用）
+            wait: 是否等待快照落盘（close / 导出时使用）
+        """
+        self.wait()
+        with self._lock:
+            # 浅拷贝：update() 只替换 content / metadata 顶层键，不修改嵌套对象
+            copied = [
+                {**m, 'metadata': dict(m.get('metadata') or {})} for m in memories
+            ]
+            seq = self._seq
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            if os.path.exists(self._log_file):
+                os.replace(
+                    self._log_file,
+                    os.path.join(self.data_path, f'memories.{seq:012d}{self.SEGMENT_SUFFIX}')
+                )
+            self._pending = 0
+
+        self._compact_thread = threading.Thread(
+            target=self._write_snapshot, args=(copied, seq),
+            name='recall-memlog-compact', daemon=True
+        )
+        self._compact_thread.start()
+        if wait:
+            self.wait()
+
+    def _write_snapshot(self, memories: List[Dict[str, Any]], seq: int) -> None:
+        """后台线程：写快照，然后删除已被快照覆盖的日志段"""
+        from recall.utils.atomic_write import atomic_json_dump
+        try:
+            atomic_json_dump({'seq': seq, 'memories': memories}, self._snapshot_file)
+            self._snapshot_seq = seq
+            for seg_seq, path in self._segment_files():
+                if seg_seq <= seq:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+        except Exception as e:
+            # 快照失败不丢数据：日志段保留，下次压缩时一并覆盖
+            logger.warning(f"[Recall] 记忆日志压缩失败: path={self.data_path}, error={e}")
+
+    def _segment_files(self) -> List[Tuple[int, str]]:
+        """列出已轮转的日志段 (seq, path)，按 seq 升序"""
+        if not os.path.isdir(self.data_path):
+            return []
+        segments = []
+        for name in os.listdir(self.data_path):
+            if name.startswith('memories.') and name.endswith(self.SEGMENT_SUFFIX):
+                try:
+                    segments.append((int(name[len('memories.'):-len(self.SEGMENT_SUFFIX)]),
+                                     os.path.join(self.data_path, name)))
+                except ValueError:
+                    continue
+        segments.sort()
+        return segments
+
+    def wait(self) -> None:
+        """等待进行中的后台压缩完成"""
+        thread = self._compact_thread
+        if thread is not None and thread.is_alive():
+            thread.join()
+
+    def remove_files(self) -> None:
+        """删除全部日志模式文件（切换回 JSON 模式迁移完成后调用）"""
+        self.close()
+        for path in [self._snapshot_file, self._log_file] + [p for _, p in self._segment_files()]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        """等待后台压缩并关闭日志文件句柄"""
+        self.wait()
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'seq': self._seq,
+            'snapshot_seq': self._snapshot_seq,
+            'pending_records': self._pending,
+            'segments': len(self._segment_files()),
+        }
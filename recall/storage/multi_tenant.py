@@ -2,11 +2,16 @@
 
 import os
 import json
+import time
 import shutil
-from typing import Optional, List, Dict, Any
+import weakref
+import threading
+from collections.abc import Set as AbstractSetBase
+from typing import Optional, List, Dict, Any, AbstractSet, Iterable, Iterator, Tuple
 from dataclasses import dataclass
 
 from .layer2_working import WorkingMemory
+from .memory_log import MemoryLog
 
 
 @dataclass
@@ -21,41 +26,182 @@ class MemoryScope:
         return os.path.join(self.user_id, self.character_id, self.session_id)
 
 
+class _VersionedIdSet:
+    """记忆 ID 的多版本集合（v7.1）：增删 O(1)，任一版本的只读快照 O(1) 取得
+
+    每次增删把版本号加一；_born 记录在库 ID 的加入版本，_died 记录已删除 ID 的
+    (加入版本, 删除版本)，供删除前取得的快照判断成员。写入串行（自带锁），
+    快照读取不加锁：删除时先写 _died 再移出 _born，读取方总能在其中之一找到它。
+    _died 在没有快照需要时按阈值回收（摊还 O(1)）。
+    """
+
+    _PRUNE_MIN = 64
+
+    def __init__(self, ids: Iterable[str] = ()):
+        self._lock = threading.Lock()
+        self._born: Dict[str, int] = dict.fromkeys(ids, 0)
+        self._died: Dict[str, Tuple[int, int]] = {}
+        self._head: Tuple[int, int] = (0, len(self._born))  # (版本号, 在库数) 一次赋值，读取方无需加锁
+        self._readers: Dict[int, weakref.ref] = {}  # 版本号 → 该版本快照的弱引用（每个版本至多一个）
+        self._prune_at = self._PRUNE_MIN
+
+    def add(self, memory_id: str) -> None:
+        with self._lock:
+            if memory_id in self._born:
+                return
+            version, count = self._head
+            self._born[memory_id] = version + 1
+            self._head = (version + 1, count + 1)
+
+    def discard(self, memory_id: str) -> None:
+        with self._lock:
+            born = self._born.get(memory_id)
+            if born is None:
+                return
+            version, count = self._head
+            self._died[memory_id] = (born, version + 1)
+            del self._born[memory_id]
+            self._head = (version + 1, count - 1)
+            if len(self._died) >= self._prune_at:
+                self._prune_locked()
+
+    def _prune_locked(self) -> None:
+        """回收所有存活快照都已不需要的删除记录"""
+        oldest = min(list(self._readers), default=self._head[0])
+        self._died = {mid: span for mid, span in self._died.items() if span[1] > oldest}
+        self._prune_at = max(self._PRUNE_MIN, 2 * len(self._died))
+
+    def snapshot(self) -> '_IdSnapshot':
+        """当前版本的只读快照；快照仍被引用时，两次写入之间返回同一个对象"""
+        reader = self._readers.get(self._head[0])
+        snap = reader() if reader is not None else None
+        if snap is not None:
+            return snap
+        with self._lock:
+            reader = self._readers.get(self._head[0])
+            snap = reader() if reader is not None else None
+            if snap is None:
+                snap = _IdSnapshot(self, *self._head)
+                self._readers[snap.version] = weakref.ref(snap, self._forget)
+            return snap
+
+    def _forget(self, ref: weakref.ref) -> None:
+        for version, reader in list(self._readers.items()):
+            if reader is ref:
+                self._readers.pop(version, None)
+
+    def contains(self, memory_id: str, version: int) -> bool:
+        born = self._born.get(memory_id)
+        if born is not None and born <= version:
+            return True
+        span = self._died.get(memory_id)
+        return span is not None and span[0] <= version < span[1]
+
+    def iter_at(self, version: int) -> Iterator[str]:
+        born = dict(self._born)  # C 层一次复制，不与写入交错；先复制 _born 再复制 _died（与删除顺序相反）
+        died = dict(self._died)
+        for memory_id, added in born.items():
+            if added <= version:
+                yield memory_id
+        for memory_id, (added, removed) in died.items():
+            if added <= version < removed and born.get(memory_id, removed) > version:  # 已在上面给出的跳过
+                yield memory_id
+
+
+class _IdSnapshot(AbstractSetBase):
+    """_VersionedIdSet 在某个版本的只读视图：成员判断与 len() 为 O(1)，遍历按需复制"""
+
+    __slots__ = ('_ids', 'version', '_count', '__weakref__')
+
+    def __init__(self, ids: _VersionedIdSet, version: int, count: int):
+        self._ids = ids
+        self.version = version
+        self._count = count
+
+    def __contains__(self, memory_id) -> bool:
+        return self._ids.contains(memory_id, self.version)
+
+    def __iter__(self) -> Iterator[str]:
+        return self._ids.iter_at(self.version)
+
+    def __len__(self) -> int:
+        return self._count
+
+
 class ScopedMemory:
-    """作用域内的记忆存储"""
+    """作用域内的记忆存储
+    
+    两种持久化模式：
+    - json: 每次变更整体原子重写 memories.json（默认，兼容旧版本）
+    - log:  变更追加到日志段，后台压缩为快照（写入成本与作用域大小无关，见 MemoryLog）
+    """
     
     MAX_MEMORIES = 5000  # A12: LRU 内存保护上限
     
-    def __init__(self, data_path: str, scope: MemoryScope):
+    def __init__(self, data_path: str, scope: MemoryScope, storage_mode: str = 'json',
+                 log_compact_threshold: int = 2000, log_fsync: bool = True):
         self.data_path = data_path
         self.scope = scope
         self.working_memory = WorkingMemory()
         self._memories: List[Dict[str, Any]] = []
         self._memory_index: Dict[str, Dict[str, Any]] = {}  # A11: memory_id → memory (O(1) lookup)
+        # v7.1: memory_ids() 的多版本 ID 集合（随增删增量维护，快照 O(1)）
+        self._ids = _VersionedIdSet()
         self._memory_file = os.path.join(data_path, 'memories.json')
         # v7.0.2: 驱逐回调 — 用于通知引擎清理被驱逐记忆的索引条目
         self._on_evict_callback: Optional[Any] = None
+        # v7.1: 追加式日志模式（log 模式下所有变更走 MemoryLog，不再整体重写 memories.json）
+        self.storage_mode = storage_mode if storage_mode in ('json', 'log') else 'json'
+        self._log = MemoryLog(data_path, compact_threshold=log_compact_threshold, fsync=log_fsync)
         self._load()
     
     def _load(self):
         """加载记忆"""
-        if os.path.exists(self._memory_file):
-            try:
-                with open(self._memory_file, 'r', encoding='utf-8') as f:
-                    self._memories = json.load(f)
-            except Exception as e:
-                # v7.0.14: 修复 M5 — 损坏时记录警告日志，而非静默丢弃
-                import logging
-                logging.warning(
-                    f"[Recall] memories.json 加载失败，数据可能已损坏，回退为空列表: "
-                    f"file={self._memory_file}, error={e}"
-                )
-                self._memories = []
+        if self.storage_mode == 'log':
+            self._load_log()
+        elif self._log.exists():
+            # v7.1: 从 log 模式切回 json 模式 — 重放日志后落盘为 memories.json 并清理日志文件
+            self._memories = self._log.load()
+            self._save()
+            self._log.remove_files()
+        else:
+            self._load_json_file()
         self._rebuild_index()
         # A12: 加载时如果超出上限，裁剪最旧的条目
         if len(self._memories) > self.MAX_MEMORIES:
             self._evict_oldest(len(self._memories) - self.MAX_MEMORIES)
     
+    def _load_json_file(self):
+        """从 memories.json 加载"""
+        if not os.path.exists(self._memory_file):
+            return
+        try:
+            with open(self._memory_file, 'r', encoding='utf-8') as f:
+                self._memories = json.load(f)
+        except Exception as e:
+            # v7.0.14: 修复 M5 — 损坏时记录警告日志，而非静默丢弃
+            import logging
+            logging.warning(
+                f"[Recall] memories.json 加载失败，数据可能已损坏，回退为空列表: "
+                f"file={self._memory_file}, error={e}"
+            )
+            self._memories = []
+    
+    def _load_log(self):
+        """v7.1: log 模式加载 — 快照 + 日志尾部重放；首次启用时从 memories.json 迁移"""
+        if self._log.exists() or not os.path.exists(self._memory_file):
+            self._memories = self._log.load()
+            return
+        # 旧版 memories.json 作为初始状态，立即压缩为快照后移除
+        self._load_json_file()
+        self._memories = self._log.load(base=self._memories)
+        self._log.compact(self._memories, wait=True)
+        if os.path.exists(self._log._snapshot_file):
+            try:
+                os.unlink(self._memory_file)
+            except OSError:
+                pass
+    
     def _rebuild_index(self):
         """重建 memory_id → memory 的 O(1) 索引"""
         self._memory_index = {}
@@ -63,6 +209,7 @@ class ScopedMemory:
             mid = memory.get('metadata', {}).get('id')
             if mid:
                 self._memory_index[mid] = memory
+        self._ids = _VersionedIdSet(self._memory_index)  # 旧快照仍指向原集合，不受影响
     
     def _evict_oldest(self, count: int):
         """驱逐最旧的 count 条记忆 (LRU 保护)"""
@@ -76,8 +223,9 @@ class ScopedMemory:
             mid = memory.get('metadata', {}).get('id')
             if mid and mid in self._memory_index:
                 del self._memory_index[mid]
+                self._ids.discard(mid)
                 evicted_ids.append(mid)
-        self._save()
+        self._persist('evict', count=count)
         # v7.0.2: 通知引擎清理被驱逐记忆的所有索引条目（消除幽灵条目）
         if evicted_ids and self._on_evict_callback:
             try:
@@ -93,11 +241,38 @@ class ScopedMemory:
             return memory.get('content', '')
         return None
     
+    def memory_ids(self) -> AbstractSet[str]:
+        """本作用域全部记忆 ID 的只读快照 — O(1) 取得、O(1) 成员判断（v7.1）
+        
+        检索时作为租户分区过滤条件下推到各索引并被遍历；快照不随之后的写入变化，
+        并发写入同一作用域时检索不会因字典大小变化而失败。ID 集合随增删增量维护，
+        写入后读取不再整体复制。
+        """
+        return self._ids.snapshot()
+    
     def _save(self):
         """保存记忆（原子写入：tmp+rename 防止断电损坏）"""
         from recall.utils.atomic_write import atomic_json_dump
         atomic_json_dump(self._memories, self._memory_file, indent=2)
     
+    def _persist(self, op: str, **fields):
+        """持久化一次变更：json 模式整体重写；log 模式追加一条记录，累积到阈值后后台压缩"""
+        if self.storage_mode != 'log':
+            self._save()
+            return
+        self._log.append(op, **fields)
+        if self._log.should_compact(len(self._memories)):
+            self._log.compact(self._memories)
+    
+    def flush(self):
+        """v7.1: 将 log 模式的日志同步压缩为快照（导出/关闭前调用）；json 模式无操作"""
+        if self.storage_mode == 'log':
+            self._log.compact(self._memories, wait=True)
+    
+    def close(self):
+        """v7.1: 等待后台压缩完成并关闭日志文件"""
+        self._log.close()
+    
     def add(self, content: str, metadata: Dict[str, Any] = None):
         """添加记忆"""
         memory = {
@@ -110,10 +285,11 @@ class ScopedMemory:
         mid = memory.get('metadata', {}).get('id')
         if mid:
             self._memory_index[mid] = memory
+            self._ids.add(mid)
+        self._persist('add', memory=memory)
         # A12: LRU 驱逐
         if len(self._memories) > self.MAX_MEMORIES:
             self._evict_oldest(len(self._memories) - self.MAX_MEMORIES)
-        self._save()
         
         # 更新工作记忆
         self.working_memory.update_with_delta_rule({
@@ -122,7 +298,48 @@ class ScopedMemory:
             'content': content,
             **(metadata or {})
         })
-    
+
+    def add_many(self, entries: List[Tuple[str, Dict[str, Any]]]):
+        """v7.1: 批量添加记忆 — 整批只持久化一次
+
+        json 模式整批重写一次 memories.json；log 模式整批追加后只 fsync 一次。
+        驱逐在整批写入后统一进行，语义与逐条 add() 相同。
+
+        Args:
+            entries: [(content, metadata), ...]
+        """
+        if not entries:
+            return
+        now = time.time()
+        added = []
+        for content, metadata in entries:
+            memory = {'content': content, 'metadata': metadata or {}, 'timestamp': now}
+            self._memories.append(memory)
+            mid = memory['metadata'].get('id')
+            if mid:
+                self._memory_index[mid] = memory
+                self._ids.add(mid)
+            added.append(memory)
+
+        overflow = len(self._memories) - self.MAX_MEMORIES
+        if self.storage_mode == 'log':
+            self._log.append_many([{'op': 'add', 'memory': m} for m in added])
+            if self._log.should_compact(len(self._memories)):
+                self._log.compact(self._memories)
+        elif overflow <= 0:
+            self._save()
+        # A12: LRU 驱逐（json 模式下驱逐本身的持久化即为整批的那一次重写）
+        if overflow > 0:
+            self._evict_oldest(overflow)
+
+        for memory in added:
+            self.working_memory.update_with_delta_rule({
+                'name': memory['content'][:50],
+                'entity_type': 'MEMORY',
+                'content': memory['content'],
+                **memory['metadata']
+            })
+
     def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """智能搜索记忆 - 使用关键词匹配
         
@@ -227,7 +444,8 @@ class ScopedMemory:
                 del self._memories[i]
                 # A11: 同步索引
                 self._memory_index.pop(memory_id, None)
-                self._save()
+                self._ids.discard(memory_id)
+                self._persist('delete', id=memory_id)
                 return True
         return False
     
@@ -239,7 +457,8 @@ class ScopedMemory:
                 if metadata:
                     memory['metadata'].update(metadata)
                 memory['updated_at'] = __import__('time').time()
-                self._save()
+                self._persist('update', id=memory_id, content=content,
+                              metadata=metadata, updated_at=memory['updated_at'])
                 return True
         return False
     
@@ -247,15 +466,27 @@ class ScopedMemory:
         """清空所有记忆"""
         self._memories = []
         self._memory_index = {}  # A11: 清空索引
-        self._save()
+        self._ids = _VersionedIdSet()
+        self._persist('clear')
         self.working_memory = WorkingMemory()
 
 
 class MultiTenantStorage:
     """多租户存储管理"""
     
-    def __init__(self, base_path: str):
+    def __init__(self, base_path: str, storage_mode: str = 'json',
+                 log_compact_threshold: int = 2000, log_fsync: bool = True):
+        """
+        Args:
+            base_path: 存储根目录
+            storage_mode: 作用域持久化模式 json / log（见 ScopedMemory）
+            log_compact_threshold: log 模式下触发后台压缩的日志记录数
+            log_fsync: log 模式下每条记录是否 fsync
+        """
         self.base_path = base_path
+        self.storage_mode = storage_mode
+        self.log_compact_threshold = log_compact_threshold
+        self.log_fsync = log_fsync
         self._scopes: Dict[str, ScopedMemory] = {}
         # v7.0.2: 驱逐回调 — 引擎注册此回调来清理被驱逐记忆的索引
         self._on_evict_callback: Optional[Any] = None
@@ -276,7 +507,12 @@ class MultiTenantStorage:
         
         if scope_key not in self._scopes:
             data_path = self.get_data_path(scope)
-            scoped = ScopedMemory(data_path, scope)
+            scoped = ScopedMemory(
+                data_path, scope,
+                storage_mode=self.storage_mode,
+                log_compact_threshold=self.log_compact_threshold,
+                log_fsync=self.log_fsync,
+            )
             # v7.0.2: 注册驱逐回调
             if self._on_evict_callback:
                 scoped._on_evict_callback = self._on_evict_callback
@@ -308,16 +544,23 @@ class MultiTenantStorage:
     def delete_session(self, scope: MemoryScope):
         """删除特定会话的记忆"""
         path = self.get_data_path(scope)
+        # v7.1: 先关闭作用域的日志句柄（Windows 上打开的文件无法删除）
+        scope_key = scope.to_path()
+        if scope_key in self._scopes:
+            self._scopes[scope_key].close()
         if os.path.exists(path):
             shutil.rmtree(path)
         # 清除缓存
-        scope_key = scope.to_path()
         if scope_key in self._scopes:
             del self._scopes[scope_key]
     
     def export_memories(self, scope: MemoryScope) -> dict:
         """导出某作用域的所有记忆（用于备份/迁移）"""
         path = self.get_data_path(scope)
+        # v7.1: log 模式下先把日志尾部压缩进快照，保证导出的 .json 文件是完整状态
+        scoped = self._scopes.get(scope.to_path())
+        if scoped is not None:
+            scoped.flush()
         
         export_data = {'scope': scope.__dict__, 'files': {}}
         for root, dirs, files in os.walk(path):
@@ -341,3 +584,11 @@ class MultiTenantStorage:
             # v7.0.12: 修复 — 使用原子写入保护导入数据
             from recall.utils.atomic_write import atomic_json_dump
             atomic_json_dump(content, file_path, ensure_ascii=False)
+    
+    def close(self):
+        """v7.1: 关闭所有作用域（等待 log 模式的后台压缩完成）"""
+        for scoped in self._scopes.values():
+            try:
+                scoped.close()
+            except Exception:
+                pass
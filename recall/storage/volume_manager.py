@@ -1,10 +1,202 @@
-"""分卷管理器 - 支持2亿字规模"""
+"""分卷管理器 - 支持2亿字规模
+
+v7.1: 随机读取 O(1) I/O
+- 每个 turns_*.jsonl 旁有一个 .idx 偏移文件（槽位 i 处 8 字节 = 第 i 轮所在行的字节偏移 + 1），
+  在 _persist() 追加数据时同步写入；读取单轮只需 seek 到该行，不再 readlines() 整个文件
+- memory_id -> 轮次号 的映射存为 memory_id_index.bin（每条 16 字节的追加日志），
+  内存中是按哈希排序的紧凑数组，取代整体重写的 memory_id_index.json
+
+v7.1: 存档全文检索走索引
+- 数据文件写满 TURNS_PER_FILE 轮即封存，封存时建 .tix 二元组倒排索引（见 archive_index.py），
+  倒排表带 user_id 编码；search_content() 只读取命中倒排表的行，用户隔离在索引内完成
+- 未封存的文件（当前写入的文件）和旧数据中缺少 .tix 的封存文件：前者扫描，后者首次检索时补建
+"""
 
 import os
+import sys
 import json
+import struct
+import bisect
+import hashlib
 import threading
+from array import array
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Set
+from typing import Dict, Iterator, List, Optional, Any, Set, Tuple
+
+from .archive_index import ArchiveTextIndex
+
+
+def _memory_id_hash(memory_id: str) -> int:
+    """memory_id 的 64 位哈希（有符号，便于存入 array('q')）"""
+    digest = hashlib.blake2b(memory_id.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+def _array_from_bytes(typecode: str, data: bytes) -> array:
+    """从小端字节构造 array（大端平台上交换字节序）"""
+    arr = array(typecode)
+    arr.frombytes(data[:len(data) - len(data) % arr.itemsize])
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+
+def _array_to_bytes(arr: array) -> bytes:
+    if sys.byteorder == 'big':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+class _MemoryIdIndex:
+    """memory_id -> 轮次号 的紧凑持久化索引（v7.1）
+    
+    磁盘：memory_id_index.bin 追加日志，每条 16 字节 (memory_id 哈希, 轮次号)，
+         轮次号为 -1 表示删除；加载时若日志冗余过多则压缩重写。
+    内存：加载时的条目存为按哈希排序的两个 array('q')（每条 16 字节，二分查找），
+         之后的新增 / 删除记在小字典里，积累到一定数量再合并进数组。
+    
+    哈希冲突的概率可以忽略；调用方读取记录后会校验 memory_id，冲突时回退到扫描。
+    """
+    
+    _RECORD = struct.Struct('<qq')
+    _MERGE_THRESHOLD = 50000
+    
+    def __init__(self, path: str, legacy_json_path: Optional[str] = None):
+        self.path = path
+        self._keys = array('q')
+        self._turns = array('q')
+        self._recent: Dict[int, int] = {}
+        self._pending: List[Tuple[int, int]] = []
+        self._lock = threading.Lock()
+        self._load(legacy_json_path)
+    
+    def _load(self, legacy_json_path: Optional[str]) -> None:
+        entries: Dict[int, int] = {}
+        records = 0
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'rb') as f:
+                    data = f.read()
+            except IOError:
+                data = b''
+            usable = len(data) - len(data) % self._RECORD.size
+            for key, turn in self._RECORD.iter_unpack(data[:usable]):
+                entries[key] = turn
+                records += 1
+        elif legacy_json_path and os.path.exists(legacy_json_path):
+            # 迁移旧的 memory_id_index.json
+            try:
+                with open(legacy_json_path, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+                entries = {_memory_id_hash(mid): int(turn) for mid, turn in legacy.items()}
+            except (json.JSONDecodeError, IOError, ValueError, AttributeError):
+                entries = {}
+            records = -1  # 强制写出 .bin
+        
+        live = sorted((k, t) for k, t in entries.items() if t >= 0)
+        self._keys = array('q', [k for k, _ in live])
+        self._turns = array('q', [t for _, t in live])
+        if records < 0 or records > 2 * len(live) + 1000:
+            self._rewrite()
+            if legacy_json_path and os.path.exists(legacy_json_path):
+                try:
+                    os.remove(legacy_json_path)
+                except OSError:
+                    pass
+    
+    def _rewrite(self) -> None:
+        """把当前内容压缩写成新的 .bin（原子替换）"""
+        from recall.utils.atomic_write import atomic_bytes_dump
+        self._merge()
+        data = bytearray()
+        for key, turn in zip(self._keys, self._turns):
+            data += self._RECORD.pack(key, turn)
+        try:
+            atomic_bytes_dump(bytes(data), self.path)
+            self._pending.clear()
+        except IOError:
+            pass
+    
+    def _merge(self) -> None:
+        """把小字典中的变更合并进排序数组"""
+        if not self._recent:
+            return
+        merged = dict(zip(self._keys, self._turns)) if len(self._recent) * 4 > len(self._keys) else None
+        if merged is not None:
+            merged.update(self._recent)
+            live = sorted((k, t) for k, t in merged.items() if t >= 0)
+            self._keys = array('q', [k for k, _ in live])
+            self._turns = array('q', [t for _, t in live])
+        else:
+            for key, turn in sorted(self._recent.items()):
+                pos = bisect.bisect_left(self._keys, key)
+                found = pos < len(self._keys) and self._keys[pos] == key
+                if turn < 0:
+                    if found:
+                        del self._keys[pos]
+                        del self._turns[pos]
+                elif found:
+                    self._turns[pos] = turn
+                else:
+                    self._keys.insert(pos, key)
+                    self._turns.insert(pos, turn)
+        self._recent.clear()
+    
+    def get(self, memory_id: str) -> Optional[int]:
+        key = _memory_id_hash(memory_id)
+        with self._lock:
+            turn = self._recent.get(key)
+            if turn is None:
+                pos = bisect.bisect_left(self._keys, key)
+                if pos < len(self._keys) and self._keys[pos] == key:
+                    turn = self._turns[pos]
+        return turn if turn is not None and turn >= 0 else None
+    
+    def __contains__(self, memory_id: str) -> bool:
+        return self.get(memory_id) is not None
+    
+    def set(self, memory_id: str, turn_number: int) -> None:
+        self._put(_memory_id_hash(memory_id), turn_number)
+    
+    def remove(self, memory_id: str) -> bool:
+        if memory_id not in self:
+            return False
+        self._put(_memory_id_hash(memory_id), -1)
+        return True
+    
+    def _put(self, key: int, turn: int) -> None:
+        with self._lock:
+            self._recent[key] = turn
+            self._pending.append((key, turn))
+            if len(self._recent) >= self._MERGE_THRESHOLD:
+                self._merge()
+    
+    def flush(self) -> None:
+        """把未落盘的变更追加到 .bin 并 fsync"""
+        with self._lock:
+            if not self._pending:
+                return
+            data = b''.join(self._RECORD.pack(k, t) for k, t in self._pending)
+            try:
+                with open(self.path, 'ab') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._pending.clear()
+            except IOError:
+                pass
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._keys = array('q')
+            self._turns = array('q')
+            self._recent.clear()
+            self._pending.clear()
+            try:
+                open(self.path, 'wb').close()
+            except IOError:
+                pass
 
 
 class VolumeManager:
@@ -26,36 +218,20 @@ class VolumeManager:
         self.file_locks: Dict[int, threading.Lock] = {}      # 并发控制
         self._meta_lock = threading.Lock()  # v7.0.5: 保护 file_locks 的 check-then-create
         self._init_storage()
-        self._memory_id_index: Dict[str, int] = {}
-        self._index_file = os.path.join(data_path, "memory_id_index.json")
-        self._load_memory_id_index()
+        # v7.1: 紧凑二进制索引（自动迁移旧的 memory_id_index.json）
+        self._index_file = os.path.join(data_path, "memory_id_index.bin")
+        self._memory_id_index = _MemoryIdIndex(
+            self._index_file, legacy_json_path=os.path.join(data_path, "memory_id_index.json")
+        )
     
     def _init_storage(self):
         """初始化存储目录"""
         os.makedirs(os.path.join(self.data_path, "L3_archive"), exist_ok=True)
         self.manifest = self._load_or_create_manifest()
     
-    def _load_memory_id_index(self):
-        """加载 memory_id 索引"""
-        if os.path.exists(self._index_file):
-            try:
-                with open(self._index_file, 'r', encoding='utf-8') as f:
-                    self._memory_id_index = json.load(f)
-            except (json.JSONDecodeError, IOError):
-                self._memory_id_index = {}
-    
     def _save_memory_id_index(self):
-        """保存 memory_id 索引（原子写入）"""
-        try:
-            # v7.0.9: 原子写入 — tmp + fsync + rename
-            tmp_file = self._index_file + '.tmp'
-            with open(tmp_file, 'w', encoding='utf-8') as f:
-                json.dump(self._memory_id_index, f, ensure_ascii=False)
-                f.flush()
-                os.fsync(f.fileno())
-            os.replace(tmp_file, self._index_file)
-        except IOError:
-            pass
+        """保存 memory_id 索引（v7.1: 只追加未落盘的变更，不再整体重写）"""
+        self._memory_id_index.flush()
     
     def get_turn(self, turn_number: int) -> Optional[dict]:
         """O(1) 定位任意轮次"""
@@ -134,7 +310,7 @@ class VolumeManager:
         # 更新 memory_id 索引
         memory_id = turn_data.get('memory_id')
         if memory_id:
-            self._memory_id_index[memory_id] = turn_number
+            self._memory_id_index.set(memory_id, turn_number)
             if turn_number % 100 == 0:
                 self._save_memory_id_index()
         
@@ -189,13 +365,13 @@ class VolumeManager:
         
         注意：步骤 1-2 是 O(n) 操作，仅在索引未命中时执行
         """
-        # 0. 索引快速查找 O(1)
-        if memory_id in self._memory_id_index:
-            turn_number = self._memory_id_index[memory_id]
+        # 0. 索引快速查找 O(1)（v7.1: 偏移索引直接定位到行）
+        turn_number = self._memory_id_index.get(memory_id)
+        if turn_number is not None:
             result = self.get_turn(turn_number)
-            if result is not None:
+            if result is not None and result.get('memory_id') == memory_id:
                 return result
-            # 索引指向的轮次不存在（可能数据被清理），继续兜底搜索
+            # 索引指向的轮次不存在（可能数据被清理）或哈希冲突，继续兜底搜索
         
         # 1. 先搜索已加载的卷（快）
         for volume in self.loaded_volumes.values():
@@ -225,71 +401,82 @@ class VolumeManager:
                                 try:
                                     turn_data = json.loads(line)
                                     if turn_data.get('memory_id') == memory_id:
+                                        # 补进索引，下次 O(1) 命中
+                                        if isinstance(turn_data.get('turn'), int):
+                                            self._memory_id_index.set(memory_id, turn_data['turn'])
                                         return turn_data
                                 except json.JSONDecodeError:
                                     continue
         
         return None
     
-    def search_content(self, query: str, max_results: int = 50) -> List[dict]:
+    def search_content(self, query: str, max_results: int = 50, user_id: Optional[str] = None) -> List[dict]:
         """在所有存档中搜索包含查询内容的轮次（100%不遗忘保证）
         
         这是"终极兜底"功能，确保任何原文都能被找到
         
-        搜索顺序：
-        1. 已加载到内存的卷（最快）
-        2. 未加载的磁盘卷文件（兜底）
+        搜索顺序（v7.1）：按卷号、文件号升序；已封存的文件通过 .tix 倒排索引
+        只读取候选行，未封存的文件扫描内存缓存与磁盘行
         
         Args:
             query: 搜索查询
             max_results: 最大返回数量
+            user_id: 只返回该用户的轮次（None = 不限用户）
         
         Returns:
             List[dict]: 匹配的轮次数据列表
         """
-        results = []
-        query_lower = query.lower()
+        return self.search_content_many([query], max_results, user_id=user_id)[0]
+    
+    def search_content_many(self, queries: List[str], max_results=50,
+                            user_id: Optional[str] = None) -> List[List[dict]]:
+        """多个查询共享一次存档遍历（v7.1: search_many 使用，每行只解析一次）
         
-        # 1. 先在已加载的卷中搜索（快）
-        for volume in self.loaded_volumes.values():
-            for turn_data in volume.cached_turns.values():
-                content = turn_data.get('content', '')
-                if query_lower in content.lower():
-                    results.append(turn_data)
-                    if len(results) >= max_results:
-                        return results
+        Args:
+            queries: 搜索查询列表
+            max_results: 每个查询的最大返回数量（整数，或与 queries 等长的列表）
+            user_id: 只返回该用户的轮次（None = 不限用户）
         
-        # 2. 搜索未加载的磁盘卷（兜底 - 确保100%不遗忘）
+        Returns:
+            与 queries 顺序一致的匹配列表，每项与 search_content() 的返回相同
+        """
+        if isinstance(max_results, int):
+            max_results = [max_results] * len(queries)
+        results: List[List[dict]] = [[] for _ in queries]
+        needles = [q.lower() for q in queries]
+        pending = {i for i, limit in enumerate(max_results) if limit > 0}
+        
+        def _match(turn_data: dict) -> None:
+            if user_id is not None and turn_data.get('user_id', '') != user_id:
+                return
+            content_lower = turn_data.get('content', '').lower()
+            for i in list(pending):
+                if needles[i] in content_lower:
+                    results[i].append(turn_data)
+                    if len(results[i]) >= max_results[i]:
+                        pending.discard(i)
+        
+        # 已加载的卷 + 磁盘上的卷（兜底 - 确保100%不遗忘）
+        volume_ids = set(self.loaded_volumes)
         archive_path = os.path.join(self.data_path, "L3_archive")
         if os.path.exists(archive_path):
             for volume_dir in os.listdir(archive_path):
-                if not volume_dir.startswith('volume_'):
-                    continue
-                
-                # 跳过已加载的卷
-                volume_id = int(volume_dir.split('_')[1])
-                if volume_id in self.loaded_volumes:
-                    continue
-                
-                # 扫描磁盘文件
-                volume_path = os.path.join(archive_path, volume_dir)
-                for file_name in os.listdir(volume_path):
-                    if file_name.endswith('.jsonl'):
-                        file_path = os.path.join(volume_path, file_name)
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                for line in f:
-                                    try:
-                                        turn_data = json.loads(line)
-                                        content = turn_data.get('content', '')
-                                        if query_lower in content.lower():
-                                            results.append(turn_data)
-                                            if len(results) >= max_results:
-                                                return results
-                                    except json.JSONDecodeError:
-                                        continue
-                        except IOError:
-                            continue
+                if volume_dir.startswith('volume_'):
+                    try:
+                        volume_ids.add(int(volume_dir.split('_')[1]))
+                    except ValueError:
+                        continue
+        
+        for volume_id in sorted(volume_ids):
+            if not pending:
+                break
+            if volume_id not in self.loaded_volumes:
+                self._load_volume(volume_id)
+            volume = self.loaded_volumes[volume_id]
+            for turn_data in volume.search_candidates([needles[i] for i in sorted(pending)], user_id):
+                _match(turn_data)
+                if not pending:
+                    break
         
         return results
     
@@ -307,8 +494,7 @@ class VolumeManager:
         """
         removed = False
         # 从 memory_id 索引中移除
-        if memory_id in self._memory_id_index:
-            del self._memory_id_index[memory_id]
+        if self._memory_id_index.remove(memory_id):
             self._save_memory_id_index()
             removed = True
         # 从已加载卷的缓存中移除
@@ -344,7 +530,9 @@ class VolumeManager:
         import shutil
         
         try:
-            # 清空内存中的卷
+            # 清空内存中的卷（先关闭内存映射的全文索引）
+            for volume in self.loaded_volumes.values():
+                volume.close()
             self.loaded_volumes.clear()
             
             # 删除 L3_archive 目录
@@ -363,7 +551,6 @@ class VolumeManager:
             
             # 清空 memory_id 索引
             self._memory_id_index.clear()
-            self._save_memory_id_index()
             
             return True
         except Exception as e:
@@ -393,9 +580,25 @@ class VolumeData:
         self.cached_turns: Dict[int, dict] = {}  # turn_number -> turn_data
         # 追踪哪些轮次已持久化，避免重复写入
         self._persisted_turns: Set[int] = set()
+        # v7.1: 每个数据文件的行偏移（槽位 -> 字节偏移 + 1，0 表示缺失）
+        self._offsets: Dict[int, array] = {}
+        # 偏移索引已覆盖的数据文件长度（-1 = 未知，读不到时允许重建一次）
+        self._indexed_size: Dict[int, int] = {}
+        # v7.1: 已封存数据文件的全文索引（file_id -> ArchiveTextIndex）
+        self._text_indexes: Dict[int, ArchiveTextIndex] = {}
+        self._text_index_lock = threading.Lock()
+    
+    def _file_path(self, file_id: int) -> str:
+        return os.path.join(self.base_path, f"turns_{file_id*self.TURNS_PER_FILE+1:05d}_{(file_id+1)*self.TURNS_PER_FILE:05d}.jsonl")
+    
+    def _offset_path(self, file_id: int) -> str:
+        return self._file_path(file_id)[:-len('.jsonl')] + '.idx'
+    
+    def _text_index_path(self, file_id: int) -> str:
+        return self._file_path(file_id)[:-len('.jsonl')] + '.tix'
     
     def get_turn(self, file_id: int, offset: int) -> Optional[dict]:
-        """获取指定轮次"""
+        """获取指定轮次（v7.1: 通过偏移索引 seek 到该行，O(1) I/O）"""
         turn_number = self.volume_id * self.TURNS_PER_VOLUME + file_id * self.TURNS_PER_FILE + offset
         
         if turn_number in self.cached_turns:
@@ -403,15 +606,205 @@ class VolumeData:
         
         if self.lazy_load and self.base_path:
             # 从文件读取
-            file_path = os.path.join(self.base_path, f"turns_{file_id*self.TURNS_PER_FILE+1:05d}_{(file_id+1)*self.TURNS_PER_FILE:05d}.jsonl")
-            if os.path.exists(file_path):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    if offset < len(lines):
-                        return json.loads(lines[offset])
+            return self._read_turn(file_id, offset, turn_number)
         
         return None
     
+    def _read_turn(self, file_id: int, slot: int, turn_number: int) -> Optional[dict]:
+        file_path = self._file_path(file_id)
+        if not os.path.exists(file_path):
+            return None
+        for attempt in range(2):
+            offsets = self._load_offsets(file_id)
+            position = offsets[slot] - 1 if slot < len(offsets) else -1
+            if position >= 0:
+                with open(file_path, 'rb') as f:
+                    f.seek(position)
+                    line = f.readline()
+                try:
+                    turn = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    turn = None
+                if isinstance(turn, dict) and turn.get('turn') == turn_number:
+                    return turn
+            # 偏移文件缺失 / 落后于数据文件（旧数据或崩溃）：扫描重建一次
+            if attempt or not self._rebuild_offsets_if_stale(file_id):
+                return None
+        return None
+    
+    def _load_offsets(self, file_id: int) -> array:
+        offsets = self._offsets.get(file_id)
+        if offsets is None:
+            try:
+                with open(self._offset_path(file_id), 'rb') as f:
+                    offsets = _array_from_bytes('Q', f.read())
+            except IOError:
+                offsets = array('Q')
+            self._offsets[file_id] = offsets
+            self._indexed_size.setdefault(file_id, -1)
+        return offsets
+    
+    def _rebuild_offsets_if_stale(self, file_id: int) -> bool:
+        """数据文件长度与偏移索引覆盖的长度不同时扫描重建，返回是否重建"""
+        file_path = self._file_path(file_id)
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            return False
+        if self._indexed_size.get(file_id, -1) == size:
+            return False
+        offsets = array('Q')
+        with open(file_path, 'rb') as f:
+            position = 0
+            for line in f:
+                try:
+                    turn = json.loads(line).get('turn')
+                except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+                    turn = None
+                if isinstance(turn, int):
+                    slot = turn % self.TURNS_PER_FILE
+                    if slot >= len(offsets):
+                        offsets.extend([0] * (slot + 1 - len(offsets)))
+                    offsets[slot] = position + 1
+                position += len(line)
+        from recall.utils.atomic_write import atomic_bytes_dump
+        try:
+            atomic_bytes_dump(_array_to_bytes(offsets), self._offset_path(file_id))
+        except IOError:
+            pass
+        self._offsets[file_id] = offsets
+        self._indexed_size[file_id] = position
+        return True
+    
+    def _write_offsets(self, file_id: int, positions: List[Tuple[int, int]], start: int, end: int) -> None:
+        """记录新追加行的偏移，只写入偏移文件中变化的区间"""
+        offsets = self._load_offsets(file_id)
+        covered = self._indexed_size.get(file_id, -1)
+        high = max(slot for slot, _ in positions)
+        if high >= len(offsets):
+            offsets.extend([0] * (high + 1 - len(offsets)))
+        for slot, position in positions:
+            offsets[slot] = position + 1
+        low = min(slot for slot, _ in positions)
+        offset_path = self._offset_path(file_id)
+        try:
+            with open(offset_path, 'r+b' if os.path.exists(offset_path) else 'wb') as f:
+                f.seek(low * offsets.itemsize)
+                f.write(_array_to_bytes(offsets[low:high + 1]))
+        except IOError:
+            return
+        # 追加前已完全覆盖（或是新文件），追加后仍完全覆盖
+        self._indexed_size[file_id] = end if covered == start else -1
+    
+    def _is_sealed(self, file_id: int) -> bool:
+        """数据文件已写满 TURNS_PER_FILE 轮（之后不再变化）"""
+        offsets = self._load_offsets(file_id)
+        if not offsets:
+            # 旧数据没有 .idx：扫描重建一次再判断
+            self._rebuild_offsets_if_stale(file_id)
+            offsets = self._offsets[file_id]
+        return len(offsets) >= self.TURNS_PER_FILE and offsets[self.TURNS_PER_FILE - 1] != 0
+    
+    def _text_index(self, file_id: int) -> Optional[ArchiveTextIndex]:
+        """已封存文件的全文索引；文件未封存时返回 None，缺失或过期时（重新）构建"""
+        index = self._text_indexes.get(file_id)
+        if index is not None or not self.base_path:
+            return index
+        file_path = self._file_path(file_id)
+        if not os.path.exists(file_path) or not self._is_sealed(file_id):
+            return None
+        with self._text_index_lock:
+            index = self._text_indexes.get(file_id)
+            if index is not None:
+                return index
+            size = os.path.getsize(file_path)
+            index_path = self._text_index_path(file_id)
+            try:
+                index = ArchiveTextIndex(index_path)
+                if index.data_size != size:
+                    index.close()
+                    index = None
+            except (IOError, OSError, ValueError, struct.error):
+                index = None
+            if index is None:
+                try:
+                    ArchiveTextIndex.build(index_path, self._index_records(file_path), size)
+                    index = ArchiveTextIndex(index_path)
+                except (IOError, OSError) as e:
+                    print(f"[VolumeManager] 构建全文索引失败: {e}")
+                    return None
+            self._text_indexes[file_id] = index
+            return index
+    
+    def _index_records(self, file_path: str) -> Iterator[Tuple[int, str, str]]:
+        with open(file_path, 'rb') as f:
+            for line in f:
+                try:
+                    turn = json.loads(line)
+                    turn_number = turn['turn']
+                except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError):
+                    continue
+                if isinstance(turn_number, int):
+                    yield (turn_number % self.TURNS_PER_FILE,
+                           str(turn.get('content', '')).lower(), turn.get('user_id', ''))
+    
+    def search_candidates(self, needles: List[str], user_id: Optional[str] = None) -> Iterator[dict]:
+        """按文件顺序产出可能包含任一 needle（已 lower）的轮次，由调用方做最终匹配
+        
+        已封存且有全文索引的文件只产出索引候选行（同时按 user_id 过滤），
+        其余文件产出全部缓存轮次与磁盘行。
+        """
+        by_file: Dict[int, Dict[int, dict]] = {}
+        for turn_number, data in list(self.cached_turns.items()):
+            file_id = (turn_number % self.TURNS_PER_VOLUME) // self.TURNS_PER_FILE
+            by_file.setdefault(file_id, {})[turn_number] = data
+        file_ids = set(by_file)
+        if self.lazy_load and self.base_path and os.path.isdir(self.base_path):
+            for file_name in os.listdir(self.base_path):
+                if file_name.startswith('turns_') and file_name.endswith('.jsonl'):
+                    try:
+                        first = int(file_name[len('turns_'):].split('_')[0])
+                    except ValueError:
+                        continue
+                    file_ids.add((first - 1) // self.TURNS_PER_FILE)
+        
+        for file_id in sorted(file_ids):
+            cached = by_file.get(file_id, {})
+            base = self.volume_id * self.TURNS_PER_VOLUME + file_id * self.TURNS_PER_FILE
+            index = self._text_index(file_id)
+            slots = index.candidates(needles, user_id) if index is not None else None
+            if slots is not None:
+                for slot in slots:
+                    turn = cached.get(base + slot)
+                    if turn is None and self.lazy_load:
+                        turn = self._read_turn(file_id, slot, base + slot)
+                    if turn is not None:
+                        yield turn
+                continue
+            
+            for turn_number in sorted(cached):
+                yield cached[turn_number]
+            if not self.lazy_load or not self.base_path:
+                continue  # 非懒加载的卷：磁盘数据已全部在缓存中
+            try:
+                with open(self._file_path(file_id), 'rb') as f:
+                    for line in f:
+                        try:
+                            turn = json.loads(line)
+                        except (json.JSONDecodeError, UnicodeDecodeError):
+                            continue
+                        if isinstance(turn, dict) and turn.get('turn') not in cached:
+                            yield turn
+            except IOError:
+                continue
+    
+    def close(self) -> None:
+        """关闭内存映射的全文索引"""
+        with self._text_index_lock:
+            for index in self._text_indexes.values():
+                index.close()
+            self._text_indexes.clear()
+    
     def append(self, turn_data: dict):
         """追加轮次"""
         turn_number = turn_data.get('turn', self.index['turn_count'])
@@ -443,11 +836,27 @@ class VolumeData:
         for file_id, turns in unpersisted.items():
             if not turns:
                 continue
-            file_path = os.path.join(self.base_path, f"turns_{file_id*self.TURNS_PER_FILE+1:05d}_{(file_id+1)*self.TURNS_PER_FILE:05d}.jsonl")
-            with open(file_path, 'a', encoding='utf-8') as f:
+            file_path = self._file_path(file_id)
+            positions: List[Tuple[int, int]] = []
+            with open(file_path, 'ab') as f:
+                start = position = f.seek(0, os.SEEK_END)
                 for turn_num, turn_data in turns:
-                    f.write(json.dumps(turn_data, ensure_ascii=False) + '\n')
+                    line = (json.dumps(turn_data, ensure_ascii=False) + '\n').encode('utf-8')
+                    f.write(line)
+                    positions.append((turn_num % self.TURNS_PER_FILE, position))
+                    position += len(line)
                     self._persisted_turns.add(turn_num)  # 标记为已持久化
+            if start == 0:
+                # 新数据文件：丢弃可能残留的旧偏移文件
+                self._offsets[file_id] = array('Q')
+                self._indexed_size[file_id] = 0
+                if os.path.exists(self._offset_path(file_id)):
+                    os.remove(self._offset_path(file_id))
+            # v7.1: 同步写入行偏移索引
+            self._write_offsets(file_id, positions, start, position)
+            # v7.1: 文件写满即封存，建立全文索引
+            if any(slot == self.TURNS_PER_FILE - 1 for slot, _ in positions):
+                self._text_index(file_id)
         
         # 保存卷索引（v7.0.10: 原子写入）
         from recall.utils.atomic_write import atomic_json_dump
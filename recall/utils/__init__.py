@@ -1,6 +1,8 @@
 """工具层"""
 
 from .llm_client import LLMClient, LLMResponse
+from .llm_cache import LLMResponseCache
+from .llm_scheduler import LLMCallScheduler
 from .warmup import WarmupManager
 from .perf_monitor import PerformanceMonitor, MetricType
 from .environment import EnvironmentManager
@@ -26,6 +28,8 @@ from .task_manager import (
 
 __all__ = [
     'LLMClient',
+    'LLMResponseCache',
+    'LLMCallScheduler',
     'LLMResponse',
     'WarmupManager',
     'PerformanceMonitor',
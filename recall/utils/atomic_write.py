@@ -11,7 +11,7 @@ import sys
 import json
 import time
 import tempfile
-from typing import Any
+from typing import IO, Any, Callable, Optional
 
 # Windows 上 os.replace() 可能因文件锁/杀毒软件暂时失败，需要重试
 _IS_WINDOWS = sys.platform == 'win32'
@@ -37,6 +37,25 @@ def atomic_json_dump(data: Any, filepath: str, *, ensure_ascii: bool = False, in
         ensure_ascii: json.dump 参数
         indent: json.dump 参数
     """
+    _atomic_write(
+        filepath, 'w',
+        lambda f: json.dump(data, f, ensure_ascii=ensure_ascii, indent=indent),
+        encoding='utf-8'
+    )
+
+
+def atomic_bytes_dump(data: bytes, filepath: str) -> None:
+    """原子写入二进制文件（v7.1，流程同 atomic_json_dump）
+    
+    Args:
+        data: 要写入的字节
+        filepath: 目标文件路径
+    """
+    _atomic_write(filepath, 'wb', lambda f: f.write(data))
+
+
+def _atomic_write(filepath: str, mode: str, write: Callable[[IO], Any], encoding: Optional[str] = None) -> None:
+    """tmp + fsync + os.replace 的公共实现"""
     dir_path = os.path.dirname(filepath) or '.'
     os.makedirs(dir_path, exist_ok=True)
     
@@ -47,8 +66,8 @@ def atomic_json_dump(data: Any, filepath: str, *, ensure_ascii: bool = False, in
         dir=dir_path
     )
     try:
-        with os.fdopen(fd, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=ensure_ascii, indent=indent)
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            write(f)
             f.flush()
             os.fsync(f.fileno())
         # 原子替换（Windows 上可能因文件锁需要重试）
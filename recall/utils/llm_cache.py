@@ -0,0 +1,133 @@
+"""LLM 响应缓存（v7.1）
+
+重建索引、重新导入时，相同的抽取 / 摘要 / 相关性提示词会被再次发送并付费。
+LLMResponseCache 以 (提供商, 模型, 消息, temperature, max_tokens, 其它参数)
+的 SHA-256 为键，把响应内容与 usage 存进 SQLite：
+
+- TTL：超过 ttl_seconds 的条目视为未命中（0 = 不过期）
+- 容量：超过 max_entries 时按最近访问时间淘汰（近似 LRU，每写入一批整理一次）
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key         TEXT PRIMARY KEY,
+    model       TEXT NOT NULL,
+    content     TEXT NOT NULL,
+    usage       TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+"""
+
+
+class LLMResponseCache:
+    """内容寻址的 LLM 响应缓存（线程安全）
+
+    Args:
+        path: SQLite 文件路径；None 时只在内存中
+        ttl_seconds: 有效期（秒），0 = 不过期
+        max_entries: 最多条数，0 = 不限
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: float = 7 * 86400, max_entries: int = 50000):
+        self.path = path
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self.max_entries = max(0, max_entries)
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or ':memory:', check_same_thread=False, isolation_level=None)
+        if path:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._writes_since_trim = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int,
+        **params: Any
+    ) -> str:
+        """请求的缓存键；params 为其它影响输出的参数（stop、response_format 等）"""
+        payload = json.dumps(
+            [provider, model, messages, temperature, max_tokens, {k: v for k, v in params.items() if v is not None}],
+            ensure_ascii=False, sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, str, Dict[str, int]]]:
+        """命中返回 (content, model, usage)，未命中或已过期返回 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT model, content, usage, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl_seconds and now - row[3] > self.ttl_seconds):
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        model, content, usage, _ = row
+        return content, model, json.loads(usage)
+
+    def put(self, key: str, content: str, model: str, usage: Dict[str, int]) -> None:
+        if content is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, usage, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model or '', content, json.dumps(usage or {}), now, now),
+            )
+            self._writes_since_trim += 1
+            if self._writes_since_trim >= (max(1, min(1000, self.max_entries // 10)) if self.max_entries else 1000):
+                self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        # 调用方持有 self._lock
+        self._writes_since_trim = 0
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
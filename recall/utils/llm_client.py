@@ -1,10 +1,25 @@
-"""LLM客户端 - 统一的LLM调用接口"""
+"""LLM客户端 - 统一的LLM调用接口
+
+v7.1:
+- SDK 客户端（及其 HTTP keep-alive 连接池）按提供商配置在进程内共享，
+  异步客户端按事件循环缓存，不再每次调用新建
+- 异步调用与同步调用一样对限流 / 临时错误重试（asyncio.sleep，不阻塞事件循环）；
+  启用调度器时重试交给调度器，退避期间不占用提供商的并发槽位
+- 可选的响应缓存（LLMResponseCache），相同请求直接返回
+- 可选的调用调度器（LLMCallScheduler）：合并进行中的相同请求，
+  按提供商限制并发与每分钟 token 用量
+"""
 
 import os
 import time
-from typing import List, Dict, Any, Optional, Union
+import asyncio
+import threading
+from typing import List, Dict, Any, Callable, Optional, Tuple, Union
 from dataclasses import dataclass
 
+from .llm_cache import LLMResponseCache
+from .llm_scheduler import LLMCallScheduler
+
 
 # Windows GBK 编码兼容的安全打印函数
 def _safe_print(msg: str) -> None:
@@ -34,6 +49,64 @@ class LLMResponse:
     usage: Dict[str, int]
     latency_ms: float
     raw_response: Optional[Any] = None
+    cached: bool = False  # v7.1: 来自响应缓存（未发起请求）
+
+
+class _ClientPool:
+    """进程内共享的 SDK 客户端（v7.1）
+
+    每个 SDK 客户端持有自己的 HTTP 连接池，按 (提供商, api_key, api_base, timeout)
+    共享。异步客户端的连接绑定创建它的事件循环，因此按事件循环分别缓存，
+    循环关闭后丢弃。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync: Dict[Tuple, Any] = {}
+        self._async: Dict[Any, Dict[Tuple, Any]] = {}  # event loop -> {key: client}
+
+    def get_sync(self, key: Tuple, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            client = self._sync.get(key)
+            if client is None:
+                client = self._sync[key] = factory()
+            return client
+
+    def get_async(self, key: Tuple, factory: Callable[[], Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for stale in [lp for lp in self._async if lp.is_closed()]:
+                del self._async[stale]
+            clients = self._async.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                client = clients[key] = factory()
+            return client
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sync.clear()
+            self._async.clear()
+
+
+_CLIENT_POOL = _ClientPool()
+
+
+def _retry_delay(error: Exception, attempt: int, max_retries: int) -> float:
+    """第 attempt 次调用失败后应等待的秒数；不再重试时抛出"""
+    error_str = str(error).lower()
+    # 特殊处理 429 错误（API 限流）
+    if '429' in error_str or 'rate limit' in error_str or 'too many requests' in error_str:
+        if attempt < max_retries - 1:
+            # 指数退避：15, 30, 45 秒
+            wait_time = (attempt + 1) * 15
+            _safe_print(f"[LLM] API 限流 (429)，等待 {wait_time} 秒后重试 ({attempt + 1}/{max_retries})")
+            return wait_time
+        raise RuntimeError(f"LLM API 限流，已重试 {max_retries} 次: {error}")
+    # 其他错误
+    if attempt == max_retries - 1:
+        raise error
+    return 1 * (attempt + 1)  # 普通重试间隔
 
 
 class LLMClient:
@@ -52,7 +125,9 @@ class LLMClient:
         api_key: Optional[str] = None,
         api_base: Optional[str] = None,
         timeout: float = 30.0,
-        max_retries: int = 3
+        max_retries: int = 3,
+        cache: Optional[LLMResponseCache] = None,
+        scheduler: Optional[LLMCallScheduler] = None
     ):
         self.model = model
         # 优先使用 LLM_API_KEY，兼容旧的 OPENAI_API_KEY
@@ -60,6 +135,10 @@ class LLMClient:
         self.api_base = api_base or os.environ.get('LLM_API_BASE')
         self.timeout = timeout
         self.max_retries = max_retries
+        # v7.1: 可选响应缓存
+        self.cache = cache
+        # v7.1: 可选调用调度（单飞合并 + 限流）
+        self.scheduler = scheduler
         
         # 初始化客户端
         self._client = None
@@ -86,16 +165,65 @@ class LLMClient:
     
     @property
     def client(self):
-        """获取 LLM 客户端（v5.0: 自动选择后端）"""
+        """获取 LLM 客户端（v5.0: 自动选择后端；v7.1: 相同配置的实例共享同一个客户端）"""
         if self._client is None:
             if self._provider == 'anthropic':
-                self._client = self._create_anthropic_client()
+                self._client = _CLIENT_POOL.get_sync(self._pool_key(), self._create_anthropic_client)
             elif self._provider == 'google':
                 self._client = self._create_google_client()
             else:
-                self._client = self._create_openai_client()
+                self._client = _CLIENT_POOL.get_sync(self._pool_key(), self._create_openai_client)
         return self._client
     
+    def _pool_key(self) -> Tuple:
+        return (self._provider, self.api_key, self.api_base, self.timeout)
+    
+    def _async_client(self):
+        """当前事件循环中共享的异步客户端（复用 keep-alive 连接）"""
+        if self._provider == 'anthropic':
+            def factory():
+                try:
+                    from anthropic import AsyncAnthropic
+                except ImportError:
+                    raise ImportError("使用 Claude 模型需要安装 anthropic: pip install anthropic")
+                return AsyncAnthropic(api_key=self.api_key, timeout=self.timeout)
+        else:
+            def factory():
+                from openai import AsyncOpenAI
+                client_kwargs = {
+                    "api_key": self.api_key,
+                    "timeout": self.timeout,
+                }
+                if self.api_base:
+                    client_kwargs["base_url"] = self.api_base
+                return AsyncOpenAI(**client_kwargs)
+        return _CLIENT_POOL.get_async(self._pool_key(), factory)
+    
+    # ---- v7.1: 响应缓存 / 调用调度 ----
+    
+    def _request_key(self, messages, max_tokens, temperature, **params) -> Optional[str]:
+        """响应缓存与单飞合并共用的请求键（两者都未启用时不计算）"""
+        if self.cache is None and self.scheduler is None:
+            return None
+        return LLMResponseCache.make_key(self._provider, self.model, messages, temperature, max_tokens, **params)
+    
+    def _cached_response(self, key: Optional[str]) -> Optional[LLMResponse]:
+        if key is None or self.cache is None:
+            return None
+        hit = self.cache.get(key)
+        if hit is None:
+            return None
+        content, model, usage = hit
+        return LLMResponse(content=content, model=model, usage=usage, latency_ms=0.0, cached=True)
+    
+    def _store_response(self, key: Optional[str], response: LLMResponse) -> LLMResponse:
+        if key is not None and self.cache is not None:
+            try:
+                self.cache.put(key, response.content, response.model, response.usage)
+            except Exception as e:
+                _safe_print(f"[LLM] 响应缓存写入失败: {e}")
+        return response
+    
     def _create_openai_client(self):
         """创建 OpenAI 客户端"""
         try:
@@ -163,63 +291,72 @@ class LLMClient:
         """聊天补全 - v5.0: 自动路由到对应提供商"""
         if max_tokens is None:
             max_tokens = int(os.environ.get('LLM_DEFAULT_MAX_TOKENS', '2000'))
-        if self._provider == 'anthropic':
-            return self._chat_anthropic(messages, max_tokens, temperature, stop)
-        elif self._provider == 'google':
-            return self._chat_google(messages, max_tokens, temperature, stop)
-        else:
-            return self._chat_openai(messages, max_tokens, temperature, stop, **kwargs)
+        key = self._request_key(messages, max_tokens, temperature, stop=stop, **kwargs)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
+        
+        # 启用调度器时由调度器重试：每次只发一次请求，失败后释放槽位再退避
+        chat_openai = self._chat_openai if self.scheduler is None else self._chat_openai_once
+        
+        def call():
+            if self._provider == 'anthropic':
+                response = self._chat_anthropic(messages, max_tokens, temperature, stop)
+            elif self._provider == 'google':
+                response = self._chat_google(messages, max_tokens, temperature, stop)
+            else:
+                response = chat_openai(messages, max_tokens, temperature, stop, **kwargs)
+            return self._store_response(key, response)
+        
+        if self.scheduler is None:
+            return call()
+        retry = None if self._provider in ('anthropic', 'google') else self._retry_policy
+        return self.scheduler.call(
+            self._provider, key, call, LLMCallScheduler.estimate_tokens(messages, max_tokens), retry=retry
+        )
+    
+    def _retry_policy(self, error: Exception, attempt: int) -> float:
+        """调度器的重试策略：与直接调用相同的退避时间，SDK 缺失不重试"""
+        if isinstance(error, ImportError):
+            raise error
+        return _retry_delay(error, attempt, self.max_retries)
     
     def _chat_openai(self, messages, max_tokens, temperature, stop, **kwargs):
         """OpenAI 聊天补全 - 带速率限制处理"""
-        start_time = time.time()
-        
         for attempt in range(self.max_retries):
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    stop=stop,
-                    **kwargs
-                )
-                
-                latency = (time.time() - start_time) * 1000
-                
-                return LLMResponse(
-                    content=response.choices[0].message.content,
-                    model=response.model,
-                    usage={
-                        'prompt_tokens': response.usage.prompt_tokens,
-                        'completion_tokens': response.usage.completion_tokens,
-                        'total_tokens': response.usage.total_tokens
-                    },
-                    latency_ms=latency,
-                    raw_response=response
-                )
-                
+                return self._chat_openai_once(messages, max_tokens, temperature, stop, **kwargs)
             except Exception as e:
-                error_str = str(e).lower()
-                
-                # 特殊处理 429 错误（API 限流）
-                if '429' in error_str or 'rate limit' in error_str or 'too many requests' in error_str:
-                    if attempt < self.max_retries - 1:
-                        # 指数退避：15, 30, 45 秒
-                        wait_time = (attempt + 1) * 15
-                        _safe_print(f"[LLM] API 限流 (429)，等待 {wait_time} 秒后重试 ({attempt + 1}/{self.max_retries})")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        raise RuntimeError(f"LLM API 限流，已重试 {self.max_retries} 次: {e}")
-                
-                # 其他错误
-                if attempt == self.max_retries - 1:
-                    raise
-                time.sleep(1 * (attempt + 1))  # 普通重试间隔
+                time.sleep(_retry_delay(e, attempt, self.max_retries))
         
         raise RuntimeError("LLM调用失败")
     
+    def _chat_openai_once(self, messages, max_tokens, temperature, stop, **kwargs):
+        """OpenAI 聊天补全 - 单次请求"""
+        start_time = time.time()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stop=stop,
+            **kwargs
+        )
+        
+        latency = (time.time() - start_time) * 1000
+        
+        return LLMResponse(
+            content=response.choices[0].message.content,
+            model=response.model,
+            usage={
+                'prompt_tokens': response.usage.prompt_tokens,
+                'completion_tokens': response.usage.completion_tokens,
+                'total_tokens': response.usage.total_tokens
+            },
+            latency_ms=latency,
+            raw_response=response
+        )
+    
     def _chat_anthropic(self, messages, max_tokens, temperature, stop):
         """Anthropic 聊天补全"""
         start_time = time.time()
@@ -306,27 +443,48 @@ class LLMClient:
         """
         if max_tokens is None:
             max_tokens = int(os.environ.get('LLM_DEFAULT_MAX_TOKENS', '2000'))
+        key = self._request_key(messages, max_tokens, temperature, **kwargs)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
+        if self.scheduler is None:
+            return await self._achat_uncached(key, messages, max_tokens, temperature, **kwargs)
+        retry = None if self._provider == 'google' else self._retry_policy
+        return await self.scheduler.acall(
+            self._provider, key,
+            lambda: self._achat_once(key, messages, max_tokens, temperature, **kwargs),
+            LLMCallScheduler.estimate_tokens(messages, max_tokens),
+            retry=retry,
+        )
+    
+    async def _achat_uncached(self, key, messages, max_tokens, temperature, **kwargs) -> LLMResponse:
+        """发送请求（带重试）并写入响应缓存"""
+        if self._provider == 'google':
+            return await self._achat_once(key, messages, max_tokens, temperature, **kwargs)
+        for attempt in range(self.max_retries):
+            try:
+                return await self._achat_once(key, messages, max_tokens, temperature, **kwargs)
+            except ImportError:
+                raise
+            except Exception as e:
+                await asyncio.sleep(_retry_delay(e, attempt, self.max_retries))
+        raise RuntimeError("LLM调用失败")
+    
+    async def _achat_once(self, key, messages, max_tokens, temperature, **kwargs) -> LLMResponse:
+        """发送一次请求并写入响应缓存"""
         if self._provider == 'anthropic':
-            return await self._achat_anthropic(messages, max_tokens, temperature, **kwargs)
+            call = self._achat_anthropic
         elif self._provider == 'google':
-            return await self._achat_google(messages, max_tokens, temperature, **kwargs)
+            call = self._achat_google
         else:
-            return await self._achat_openai(messages, max_tokens, temperature, **kwargs)
+            call = self._achat_openai
+        return self._store_response(key, await call(messages, max_tokens, temperature, **kwargs))
     
     async def _achat_openai(self, messages, max_tokens, temperature, **kwargs):
         """异步 OpenAI 聊天补全"""
-        from openai import AsyncOpenAI
-        
         start_time = time.time()
         
-        client_kwargs = {
-            "api_key": self.api_key,
-            "timeout": self.timeout,
-        }
-        if self.api_base:
-            client_kwargs["base_url"] = self.api_base
-        
-        async_client = AsyncOpenAI(**client_kwargs)
+        async_client = self._async_client()
         
         response = await async_client.chat.completions.create(
             model=self.model,
@@ -352,14 +510,9 @@ class LLMClient:
     
     async def _achat_anthropic(self, messages, max_tokens, temperature, **kwargs):
         """异步 Anthropic 聊天补全"""
-        try:
-            from anthropic import AsyncAnthropic
-        except ImportError:
-            raise ImportError("使用 Claude 模型需要安装 anthropic: pip install anthropic")
-        
         start_time = time.time()
         
-        async_client = AsyncAnthropic(api_key=self.api_key, timeout=self.timeout)
+        async_client = self._async_client()
         
         system_msg = ""
         chat_messages = []
@@ -0,0 +1,345 @@
+"""LLM 调用调度器（v7.1）
+
+批量导入时抽取、去重确认、一致性检查会并发发出大量 LLM 请求：相同的
+提示词同时发送多次，瞬时并发与 token 用量超出提供商限额后被 429 拒绝，
+再由 time.sleep 退避重试占住线程。LLMCallScheduler 位于 LLMClient 之前：
+
+- 单飞（single-flight）：进行中的相同请求（与响应缓存同一个键）只发送一次，
+  其余调用方等待并共享结果
+- 按提供商的并发上限与每分钟 token 预算（令牌桶）；同步调用方在条件变量上
+  等待、异步调用方在事件循环的 future 上等待，槽位释放或令牌补足即被唤醒，
+  不占用线程 sleep
+- 重试在调度器内进行：失败后先释放槽位，退避期间不占用并发槽位，
+  到点后重新经过并发上限与 token 预算排队
+- 微批：run_batched() 把多条短判断（如去重确认）与窗口期内其它线程提交的
+  同组条目拼进一个结构化提示词，一次调用完成
+
+token 预估 = 提示词字符数 / 3 + max_tokens（提供商按 max_tokens 计入 TPM），
+请求完成后按实际 usage 多退少补。
+"""
+
+import time
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# retry(error, attempt) -> 退避秒数；不再重试时抛出
+RetryPolicy = Callable[[Exception, int], float]
+
+
+class _ProviderBudget:
+    """单个提供商的并发槽位 + token 令牌桶（由调度器的锁保护）"""
+
+    def __init__(self, max_concurrency: int, tokens_per_minute: int):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.active = 0
+        self.tokens = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def try_acquire(self, tokens: int) -> Optional[float]:
+        """成功返回 0；否则返回建议等待秒数（None = 等到有槽位释放）"""
+        if self.max_concurrency and self.active >= self.max_concurrency:
+            return None
+        if self.tokens_per_minute:
+            now = time.monotonic()
+            rate = self.tokens_per_minute / 60.0
+            self.tokens = min(float(self.tokens_per_minute), self.tokens + (now - self.updated) * rate)
+            self.updated = now
+            needed = min(tokens, self.tokens_per_minute)  # 超过桶容量的单个请求等桶满即放行
+            if self.tokens < needed:
+                return (needed - self.tokens) / rate
+            self.tokens -= tokens
+        self.active += 1
+        return 0.0
+
+
+class _PendingBatch:
+    """同组待打包的条目：第一个提交者为领头者，等窗口结束或凑满后执行"""
+
+    def __init__(self):
+        self.entries: List[Tuple[Any, Future]] = []
+        self.full = threading.Event()
+
+
+class LLMCallScheduler:
+    """LLM 请求调度：单飞合并 + 按提供商限流 + 微批（线程安全，同步 / 异步通用）
+
+    Args:
+        max_concurrency: 每个提供商同时进行的请求数上限，0 = 不限
+        tokens_per_minute: 每个提供商每分钟 token 预算，0 = 不限
+        single_flight: 是否合并进行中的相同请求
+        batch_max_items: run_batched() 每批最多条数，<= 1 时不打包
+        batch_window_ms: 领头者等待其它线程凑批的时间，0 = 只打包同一次提交的条目
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        tokens_per_minute: int = 0,
+        single_flight: bool = True,
+        batch_max_items: int = 1,
+        batch_window_ms: float = 0.0
+    ):
+        self.max_concurrency = max(0, max_concurrency)
+        self.tokens_per_minute = max(0, tokens_per_minute)
+        self.single_flight = single_flight
+        self.batch_max_items = max(1, batch_max_items)
+        self.batch_window_ms = max(0.0, batch_window_ms)
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._budgets: Dict[str, _ProviderBudget] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._batches: Dict[str, _PendingBatch] = {}
+        self._stats = {
+            'requests': 0, 'executed': 0, 'coalesced': 0, 'throttled': 0, 'throttle_wait_ms': 0.0, 'retries': 0,
+            'batches': 0, 'batched_items': 0,
+        }
+
+    @property
+    def batching_enabled(self) -> bool:
+        return self.batch_max_items > 1
+
+    @staticmethod
+    def estimate_tokens(messages: List[Dict[str, Any]], max_tokens: int) -> int:
+        chars = sum(len(str(m.get('content', ''))) for m in messages)
+        return chars // 3 + (max_tokens or 0)
+
+    # ---- 单飞 + 限流 ----
+
+    def call(self, provider: str, key: Optional[str], fn: Callable[[], Any], tokens: int = 0,
+             retry: Optional[RetryPolicy] = None) -> Any:
+        """同步执行 fn()；key 相同的进行中请求只执行一次
+
+        retry(error, attempt) 返回第 attempt 次失败后的退避秒数（不再重试时抛出）；
+        退避期间槽位已释放，在条件变量上等待到点后重新排队。
+        """
+        future, leader = self._join_flight(key)
+        if not leader:
+            return future.result()
+        try:
+            attempt, not_before = 0, 0.0
+            while True:
+                budget = self._acquire(provider, tokens, not_before)
+                try:
+                    result = fn()
+                    break
+                except Exception as e:
+                    if retry is None:
+                        raise
+                    not_before = time.monotonic() + retry(e, attempt)
+                    attempt += 1
+                    self._count_retry()
+                finally:
+                    self._release(budget)
+        except BaseException as e:
+            self._finish_flight(key, future, error=e)
+            raise
+        self._settle(budget, tokens, result)
+        self._finish_flight(key, future, result=result)
+        return result
+
+    async def acall(
+        self, provider: str, key: Optional[str], fn: Callable[[], Awaitable[Any]], tokens: int = 0,
+        retry: Optional[RetryPolicy] = None
+    ) -> Any:
+        """异步执行 await fn()；与同步调用共享单飞表和预算，重试方式同 call()"""
+        future, leader = self._join_flight(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            attempt, not_before = 0, 0.0
+            while True:
+                budget = await self._acquire_async(provider, tokens, not_before)
+                try:
+                    result = await fn()
+                    break
+                except Exception as e:
+                    if retry is None:
+                        raise
+                    not_before = time.monotonic() + retry(e, attempt)
+                    attempt += 1
+                    self._count_retry()
+                finally:
+                    self._release(budget)
+        except BaseException as e:
+            self._finish_flight(key, future, error=e)
+            raise
+        self._settle(budget, tokens, result)
+        self._finish_flight(key, future, result=result)
+        return result
+
+    def _join_flight(self, key: Optional[str]) -> Tuple[Optional[Future], bool]:
+        with self._lock:
+            self._stats['requests'] += 1
+            if not self.single_flight or key is None:
+                self._stats['executed'] += 1
+                return None, True
+            future = self._inflight.get(key)
+            if future is not None:
+                self._stats['coalesced'] += 1
+                return future, False
+            future = self._inflight[key] = Future()
+            self._stats['executed'] += 1
+            return future, True
+
+    def _finish_flight(self, key: Optional[str], future: Optional[Future], result: Any = None,
+                       error: Optional[BaseException] = None) -> None:
+        if future is None:
+            return
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _budget(self, provider: str) -> _ProviderBudget:
+        # 调用方持有 self._lock
+        budget = self._budgets.get(provider)
+        if budget is None:
+            budget = self._budgets[provider] = _ProviderBudget(self.max_concurrency, self.tokens_per_minute)
+        return budget
+
+    def _count_retry(self) -> None:
+        with self._lock:
+            self._stats['retries'] += 1
+
+    def _acquire(self, provider: str, tokens: int, not_before: float = 0.0) -> _ProviderBudget:
+        """not_before：重试退避的截止时刻（monotonic），之前不申请槽位"""
+        started = None
+        with self._cond:
+            budget = self._budget(provider)
+            while True:
+                backoff = not_before - time.monotonic()
+                if backoff > 0:
+                    self._cond.wait(backoff)
+                    continue
+                delay = budget.try_acquire(tokens)
+                if delay == 0:
+                    break
+                if started is None:
+                    started = time.monotonic()
+                    self._stats['throttled'] += 1
+                self._cond.wait(delay)
+            if started is not None:
+                self._stats['throttle_wait_ms'] += (time.monotonic() - started) * 1000
+        return budget
+
+    async def _acquire_async(self, provider: str, tokens: int, not_before: float = 0.0) -> _ProviderBudget:
+        backoff = not_before - time.monotonic()
+        if backoff > 0:
+            await asyncio.sleep(backoff)
+        loop = asyncio.get_running_loop()
+        started = None
+        while True:
+            with self._lock:
+                budget = self._budget(provider)
+                delay = budget.try_acquire(tokens)
+                if delay == 0:
+                    if started is not None:
+                        self._stats['throttle_wait_ms'] += (time.monotonic() - started) * 1000
+                    return budget
+                if started is None:
+                    started = time.monotonic()
+                    self._stats['throttled'] += 1
+                waiter = loop.create_future()
+                budget.async_waiters.append((loop, waiter))
+            try:
+                await asyncio.wait([waiter], timeout=delay)
+            finally:
+                with self._lock:
+                    if (loop, waiter) in budget.async_waiters:
+                        budget.async_waiters.remove((loop, waiter))
+
+    def _release(self, budget: _ProviderBudget) -> None:
+        """释放并发槽位（失败的请求不退还预估的 token）"""
+        with self._cond:
+            budget.active -= 1
+            self._wake_locked(budget)
+
+    def _settle(self, budget: _ProviderBudget, tokens: int, result: Any) -> None:
+        """按实际 usage 结算预估的 token（多退少补）"""
+        if not budget.tokens_per_minute:
+            return
+        usage = getattr(result, 'usage', None) or {}
+        actual = usage.get('total_tokens') if isinstance(usage, dict) else None
+        if not actual:
+            return
+        with self._cond:
+            budget.tokens = min(float(budget.tokens_per_minute), budget.tokens + tokens - actual)
+            self._wake_locked(budget)
+
+    def _wake_locked(self, budget: _ProviderBudget) -> None:
+        self._cond.notify_all()
+        waiters, budget.async_waiters = budget.async_waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, waiter)
+            except RuntimeError:  # 事件循环已关闭
+                pass
+
+    # ---- 微批 ----
+
+    def run_batched(self, group: str, items: List[Any], run_batch: Callable[[List[Any]], List[Any]]) -> List[Any]:
+        """把 items 与窗口期内其它线程提交的同组条目打包执行，返回与 items 一一对应的结果
+
+        run_batch(条目列表) 必须返回等长的结果列表；同组的 run_batch 应可互换
+        （由领头者的 run_batch 执行整批）。未启用打包时按 batch_max_items 分块直接执行。
+        """
+        if not items:
+            return []
+        futures = [Future() for _ in items]
+        with self._lock:
+            batch = self._batches.get(group)
+            leader = batch is None
+            if leader:
+                batch = self._batches[group] = _PendingBatch()
+            batch.entries.extend(zip(items, futures))
+            if len(batch.entries) >= self.batch_max_items:
+                batch.full.set()
+        if leader:
+            if self.batch_window_ms > 0 and not batch.full.is_set():
+                batch.full.wait(self.batch_window_ms / 1000.0)
+            with self._lock:
+                if self._batches.get(group) is batch:
+                    del self._batches[group]
+                entries = list(batch.entries)
+            for start in range(0, len(entries), self.batch_max_items):
+                self._execute_batch(entries[start:start + self.batch_max_items], run_batch)
+        return [future.result() for future in futures]
+
+    def _execute_batch(self, entries: List[Tuple[Any, Future]], run_batch: Callable[[List[Any]], List[Any]]) -> None:
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['batched_items'] += len(entries)
+        try:
+            results = run_batch([item for item, _ in entries])
+            if len(results) != len(entries):
+                raise ValueError(f"run_batch 返回 {len(results)} 条结果，期望 {len(entries)} 条")
+        except Exception as e:
+            for _, future in entries:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(entries, results):
+            future.set_result(result)
+
+    # ---- 统计 ----
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._inflight)
+            stats['active'] = {provider: b.active for provider, b in self._budgets.items()}
+        stats['coalesce_rate'] = stats['coalesced'] / stats['requests'] if stats['requests'] else 0.0
+        stats['llm_calls_saved'] = stats['coalesced'] + stats['batched_items'] - stats['batches']
+        stats['throttle_wait_ms'] = round(stats['throttle_wait_ms'], 2)
+        return stats
+
+
+def _resolve(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
@@ -5,14 +5,24 @@ Recall 4.x: 提供统一的后端处理任务追踪机制
 - 支持通过 API 查询当前活动任务
 - 可选 WebSocket 实时推送
 - 线程安全设计，适用于多请求并发场景
+
+v7.1 低开销模式（trace_mode = full / sampled / off）：
+- sampled：每 sample_every 个顶层任务（如一次 add()）完整追踪，其余返回轻量任务，
+  不加全局锁、不进任务表；off：全部为轻量任务
+- 各步骤的次数 / 耗时 / 失败数在所有模式下都统计（按线程累加，读取时合并）
+- 最近的完成事件写入每个线程自己的环形缓冲区
+- 非 full 模式下订阅者由专用线程异步通知，不在写入线程上回调
 """
 
+import itertools
+import queue
 import threading
 import time
 import uuid
+from collections import deque
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Tuple
 from datetime import datetime
 
 __all__ = ['TaskManager', 'Task', 'TaskStatus', 'TaskType', 'get_task_manager']
@@ -98,6 +108,58 @@ class Task:
         return (end_time - self.started_at) * 1000
 
 
+_LITE_PREFIX = "lite_"
+_MAX_OPEN_LITE = 4096
+_lite_ids = itertools.count()
+
+
+class _LiteTask:
+    """未被采样的轻量任务：只有 id（供后续 start/update/complete 调用传回）"""
+    __slots__ = ('id', 'task_type', 'name')
+
+    def __init__(self, task_type: TaskType, name: str):
+        self.id = f"{_LITE_PREFIX}{next(_lite_ids)}"
+        self.task_type = task_type
+        self.name = name
+
+
+class _ThreadTrace:
+    """单个线程的追踪状态（只由所属线程写入）"""
+    __slots__ = ('owner', 'open', 'counters', 'events')
+
+    def __init__(self, ring_size: int, owner: Optional[threading.Thread] = None):
+        self.owner = owner
+        self.open: Dict[str, Tuple[TaskType, float]] = {}  # 轻量任务 id → (类型, 开始时间)
+        self.counters: Dict[TaskType, List[float]] = {}  # 类型 → [次数, 失败, 总耗时ms, 最大耗时ms]
+        self.events: deque = deque(maxlen=ring_size)  # (时间戳, 类型, 事件, 耗时ms)
+
+
+class _FanoutDispatcher:
+    """订阅者通知的专用线程：写入线程只做一次入队"""
+
+    def __init__(self, manager: 'TaskManager'):
+        self._manager = manager
+        self._queue: 'queue.SimpleQueue' = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='recall-task-fanout', daemon=True)
+        self._thread.start()
+
+    def put(self, task: 'Task', event_type: str) -> None:
+        self._queue.put((task, event_type))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        done = threading.Event()
+        self._queue.put((None, done))
+        return done.wait(timeout)
+
+    def _run(self) -> None:
+        while True:
+            task, event_type = self._queue.get()
+            if task is None:
+                event_type.set()
+                continue
+            self._manager._call_subscribers(task, event_type)
+
+
 class TaskManager:
     """后端任务追踪管理器（单例模式）"""
     
@@ -122,16 +184,165 @@ class TaskManager:
         self._max_completed_tasks = 100  # 保留的已完成任务数量
         self._completed_tasks: List[Task] = []  # 最近完成的任务
         self._enabled = True  # 是否启用任务追踪
+        # v7.1: 低开销追踪
+        self._trace_mode = 'full'  # full / sampled
+        self._sample_every = 100
+        self._sample_seq = itertools.count()
+        self._ring_size = 256
+        self._local = threading.local()
+        self._thread_traces: List[_ThreadTrace] = []
+        self._retired = _ThreadTrace(self._ring_size)  # 已退出线程的累计
+        self._fanout: Optional[_FanoutDispatcher] = None
         self._initialized = True
     
     def set_enabled(self, enabled: bool):
-        """启用或禁用任务追踪"""
+        """启用或禁用任务追踪（禁用时仍统计各步骤耗时）"""
         self._enabled = enabled
     
     def is_enabled(self) -> bool:
         """检查是否启用"""
         return self._enabled
     
+    def configure_tracing(
+        self,
+        mode: Optional[str] = None,
+        sample_every: Optional[int] = None,
+        ring_size: Optional[int] = None
+    ):
+        """v7.1: 设置追踪模式
+        
+        Args:
+            mode: 'full'（每个任务都进任务表，同步通知订阅者）、
+                  'sampled'（每 sample_every 个顶层任务完整追踪一次，订阅者异步通知）或
+                  'off'（只统计步骤耗时）
+            sample_every: sampled 模式的采样间隔，0 = 不完整追踪任何任务
+            ring_size: 每个线程保留的最近事件数（对之后新建的线程生效）
+        """
+        if mode is not None:
+            if mode not in ('full', 'sampled', 'off'):
+                raise ValueError(f"未知的追踪模式: {mode}（可选 full / sampled / off）")
+            self._trace_mode = mode
+        if sample_every is not None:
+            self._sample_every = max(0, int(sample_every))
+        if ring_size is not None:
+            self._ring_size = max(1, int(ring_size))
+            with self._task_lock:
+                self._retired.events = deque(self._retired.events, maxlen=self._ring_size)
+    
+    def get_tracing_config(self) -> Dict[str, Any]:
+        return {
+            'trace_mode': self._trace_mode,
+            'sample_every': self._sample_every,
+            'ring_size': self._ring_size,
+        }
+    
+    # ---- v7.1: 低开销追踪 ----
+    
+    def _thread_trace(self) -> _ThreadTrace:
+        trace = getattr(self._local, 'trace', None)
+        if trace is None:
+            trace = self._local.trace = _ThreadTrace(self._ring_size, threading.current_thread())
+            with self._task_lock:
+                self._retire_dead_traces()
+                self._thread_traces.append(trace)
+        return trace
+    
+    def _retire_dead_traces(self):
+        """已退出线程的计数与事件并入 _retired（调用方持有 _task_lock）"""
+        dead = [t for t in self._thread_traces if not t.owner.is_alive()]
+        if not dead:
+            return
+        self._thread_traces = [t for t in self._thread_traces if t.owner.is_alive()]
+        for trace in dead:
+            for task_type, (count, failed, total_ms, max_ms) in trace.counters.items():
+                agg = self._retired.counters.setdefault(task_type, [0, 0, 0.0, 0.0])
+                agg[0] += count
+                agg[1] += failed
+                agg[2] += total_ms
+                agg[3] = max(agg[3], max_ms)
+            self._retired.events.extend(trace.events)
+    
+    def _should_trace(self, parent_task_id: Optional[str]) -> bool:
+        """是否完整追踪：子任务跟随父任务；顶层任务在 sampled 模式下按间隔采样"""
+        if not self._enabled or self._trace_mode == 'off':
+            return False
+        if parent_task_id is not None:
+            return not parent_task_id.startswith(_LITE_PREFIX)
+        if self._trace_mode == 'full':
+            return True
+        return bool(self._sample_every) and next(self._sample_seq) % self._sample_every == 0
+    
+    def _record(self, task_type: TaskType, event_type: str, elapsed_ms: float):
+        """累加步骤耗时并写入本线程的环形缓冲区（无全局锁）"""
+        trace = self._thread_trace()
+        counter = trace.counters.get(task_type)
+        if counter is None:
+            counter = trace.counters[task_type] = [0, 0, 0.0, 0.0]
+        counter[0] += 1
+        if event_type == 'failed':
+            counter[1] += 1
+        counter[2] += elapsed_ms
+        if elapsed_ms > counter[3]:
+            counter[3] = elapsed_ms
+        trace.events.append((time.time(), task_type, event_type, elapsed_ms))
+    
+    def _open_lite(self, task: _LiteTask):
+        opened = self._thread_trace().open
+        if len(opened) >= _MAX_OPEN_LITE:  # 创建后未完成的任务（异常路径）不无限累积
+            opened.pop(next(iter(opened)))
+        opened[task.id] = (task.task_type, time.perf_counter())
+    
+    def _finish_lite(self, task_id: str, event_type: str):
+        opened = self._thread_trace().open.pop(task_id, None)
+        if opened is not None:  # 在其它线程创建的轻量任务不计时
+            task_type, started = opened
+            self._record(task_type, event_type, (time.perf_counter() - started) * 1000)
+    
+    def get_step_stats(self) -> Dict[str, Dict[str, float]]:
+        """各步骤（任务类型）的累计次数 / 失败数 / 平均与最大耗时（所有模式下都统计）"""
+        with self._task_lock:
+            traces = [self._retired] + self._thread_traces
+        merged: Dict[TaskType, List[float]] = {}
+        for trace in traces:
+            for task_type, (count, failed, total_ms, max_ms) in list(trace.counters.items()):
+                agg = merged.setdefault(task_type, [0, 0, 0.0, 0.0])
+                agg[0] += count
+                agg[1] += failed
+                agg[2] += total_ms
+                agg[3] = max(agg[3], max_ms)
+        return {
+            task_type.value: {
+                'count': int(count),
+                'failed': int(failed),
+                'total_ms': round(total_ms, 3),
+                'avg_ms': round(total_ms / count, 3) if count else 0.0,
+                'max_ms': round(max_ms, 3),
+            }
+            for task_type, (count, failed, total_ms, max_ms) in merged.items()
+        }
+    
+    def get_trace_events(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """各线程环形缓冲区中最近的完成 / 失败事件（新的在前）"""
+        with self._task_lock:
+            traces = [self._retired] + self._thread_traces
+        events = [e for trace in traces for e in list(trace.events)]
+        events.sort(key=lambda e: e[0], reverse=True)
+        return [
+            {'timestamp': ts, 'type': task_type.value, 'event': event_type, 'elapsed_ms': round(elapsed_ms, 3)}
+            for ts, task_type, event_type, elapsed_ms in events[:limit]
+        ]
+    
+    def reset_step_stats(self):
+        with self._task_lock:
+            traces = [self._retired] + self._thread_traces
+        for trace in traces:
+            trace.counters.clear()
+            trace.events.clear()
+    
+    def flush_notifications(self, timeout: float = 5.0) -> bool:
+        """等待已入队的异步订阅者通知全部送达"""
+        return self._fanout.flush(timeout) if self._fanout is not None else True
+    
     def create_task(
         self,
         task_type: TaskType,
@@ -152,17 +363,13 @@ class TaskManager:
             metadata: 附加元数据
         
         Returns:
-            Task: 创建的任务对象
+            Task: 创建的任务对象（v7.1: 未被采样 / 禁用时为只有 id 的轻量任务，
+                  仍统计该步骤耗时）
         """
-        if not self._enabled:
-            # 禁用时返回一个空任务，但不追踪
-            return Task(
-                id=f"noop_{uuid.uuid4().hex[:8]}",
-                task_type=task_type,
-                name=name,
-                user_id=user_id,
-                character_id=character_id
-            )
+        if not self._should_trace(parent_task_id):
+            task = _LiteTask(task_type, name)
+            self._open_lite(task)
+            return task
         
         task = Task(
             id=f"task_{uuid.uuid4().hex[:12]}",
@@ -191,7 +398,7 @@ class TaskManager:
         Returns:
             Task: 更新后的任务，如果任务不存在返回 None
         """
-        if not self._enabled:
+        if not self._enabled or task_id.startswith(_LITE_PREFIX):
             return None
         
         with self._task_lock:
@@ -223,7 +430,7 @@ class TaskManager:
         Returns:
             Task: 更新后的任务
         """
-        if not self._enabled:
+        if not self._enabled or task_id.startswith(_LITE_PREFIX):
             return None
         
         with self._task_lock:
@@ -256,6 +463,9 @@ class TaskManager:
         Returns:
             Task: 完成的任务
         """
+        if task_id.startswith(_LITE_PREFIX):
+            self._finish_lite(task_id, 'completed')
+            return None
         if not self._enabled:
             return None
         
@@ -272,12 +482,10 @@ class TaskManager:
                 # 从活动任务移除
                 self._active_tasks.pop(task_id, None)
                 
-                # 添加到已完成列表
-                self._completed_tasks.append(task)
-                if len(self._completed_tasks) > self._max_completed_tasks:
-                    self._completed_tasks.pop(0)
+                self._remember_completed(task)
         
         if task:
+            self._record(task.task_type, 'completed', task._elapsed_ms() or 0.0)
             self._notify_subscribers(task, 'completed')
         return task
     
@@ -297,6 +505,9 @@ class TaskManager:
         Returns:
             Task: 失败的任务
         """
+        if task_id.startswith(_LITE_PREFIX):
+            self._finish_lite(task_id, 'failed')
+            return None
         if not self._enabled:
             return None
         
@@ -311,15 +522,21 @@ class TaskManager:
                 # 从活动任务移除
                 self._active_tasks.pop(task_id, None)
                 
-                # 添加到已完成列表
-                self._completed_tasks.append(task)
-                if len(self._completed_tasks) > self._max_completed_tasks:
-                    self._completed_tasks.pop(0)
+                self._remember_completed(task)
         
         if task:
+            self._record(task.task_type, 'failed', task._elapsed_ms() or 0.0)
             self._notify_subscribers(task, 'failed')
         return task
     
+    def _remember_completed(self, task: Task):
+        """添加到已完成列表（调用方持有 _task_lock）；被挤出的任务同时移出任务表"""
+        self._completed_tasks.append(task)
+        if len(self._completed_tasks) > self._max_completed_tasks:
+            evicted = self._completed_tasks.pop(0)
+            if evicted.id not in self._active_tasks:
+                self._tasks.pop(evicted.id, None)
+    
     def cancel_task(self, task_id: str, message: str = "") -> Optional[Task]:
         """取消任务
         
@@ -330,6 +547,9 @@ class TaskManager:
         Returns:
             Task: 取消的任务
         """
+        if task_id.startswith(_LITE_PREFIX):
+            self._thread_trace().open.pop(task_id, None)
+            return None
         if not self._enabled:
             return None
         
@@ -434,8 +654,20 @@ class TaskManager:
             self._subscribers.remove(callback)
     
     def _notify_subscribers(self, task: Task, event_type: str):
-        """通知所有订阅者"""
-        for callback in self._subscribers:
+        """通知所有订阅者（v7.1: 非 full 模式下交给分发线程异步通知）"""
+        if not self._subscribers:
+            return
+        if self._trace_mode == 'full':
+            self._call_subscribers(task, event_type)
+            return
+        if self._fanout is None:
+            with self._task_lock:
+                if self._fanout is None:
+                    self._fanout = _FanoutDispatcher(self)
+        self._fanout.put(task, event_type)
+    
+    def _call_subscribers(self, task: Task, event_type: str):
+        for callback in list(self._subscribers):
             try:
                 callback(task, event_type)
             except Exception as e:
@@ -230,7 +230,9 @@ function Import-ApiKeys {
         'RECALL_LIFECYCLE_ARCHIVE_DAYS', 'RECALL_LIFECYCLE_BACKUP_ENABLED',
         'RECALL_LIFECYCLE_BACKUP_DIR', 'RECALL_LIFECYCLE_CLEANUP_TEMP',
         'IVF_AUTO_SWITCH_ENABLED', 'IVF_AUTO_SWITCH_THRESHOLD',
-        'PARALLEL_RETRIEVER_WORKERS', 'PARALLEL_RETRIEVER_TIMEOUT'
+        'PARALLEL_RETRIEVER_WORKERS', 'PARALLEL_RETRIEVER_TIMEOUT',
+        'MEMORY_STORAGE_MODE', 'MEMORY_LOG_COMPACT_THRESHOLD', 'MEMORY_LOG_FSYNC',
+        'RECALL_EXECUTOR_READ_WORKERS', 'RECALL_EXECUTOR_WRITE_WORKERS', 'RECALL_EXECUTOR_MAX_QUEUE'
     )
     
     if (Test-Path $configFile) {
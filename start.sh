@@ -236,7 +236,7 @@ load_api_keys() {
     # 包括 v4.0 Phase 3.6 三路并行召回配置项（100%不遗忘保证）
     # 包括 v4.1 增强功能配置项
     # 包括 v4.2 性能优化配置项
-    local supported_keys="EMBEDDING_API_KEY EMBEDDING_API_BASE EMBEDDING_MODEL EMBEDDING_DIMENSION EMBEDDING_RATE_LIMIT EMBEDDING_RATE_WINDOW RECALL_EMBEDDING_MODE LLM_API_KEY LLM_API_BASE LLM_MODEL LLM_TIMEOUT FORESHADOWING_LLM_ENABLED FORESHADOWING_TRIGGER_INTERVAL FORESHADOWING_AUTO_PLANT FORESHADOWING_AUTO_RESOLVE FORESHADOWING_MAX_RETURN FORESHADOWING_MAX_ACTIVE CONTEXT_TRIGGER_INTERVAL CONTEXT_MAX_CONTEXT_TURNS CONTEXT_MAX_PER_TYPE CONTEXT_MAX_TOTAL CONTEXT_DECAY_DAYS CONTEXT_DECAY_RATE CONTEXT_MIN_CONFIDENCE BUILD_CONTEXT_INCLUDE_RECENT PROACTIVE_REMINDER_ENABLED PROACTIVE_REMINDER_TURNS DEDUP_EMBEDDING_ENABLED DEDUP_HIGH_THRESHOLD DEDUP_LOW_THRESHOLD TEMPORAL_GRAPH_ENABLED TEMPORAL_GRAPH_BACKEND KUZU_BUFFER_POOL_SIZE TEMPORAL_DECAY_RATE TEMPORAL_MAX_HISTORY CONTRADICTION_DETECTION_ENABLED CONTRADICTION_AUTO_RESOLVE CONTRADICTION_DETECTION_STRATEGY CONTRADICTION_SIMILARITY_THRESHOLD FULLTEXT_ENABLED FULLTEXT_K1 FULLTEXT_B FULLTEXT_WEIGHT SMART_EXTRACTOR_MODE SMART_EXTRACTOR_COMPLEXITY_THRESHOLD SMART_EXTRACTOR_ENABLE_TEMPORAL BUDGET_DAILY_LIMIT BUDGET_HOURLY_LIMIT BUDGET_RESERVE BUDGET_ALERT_THRESHOLD DEDUP_JACCARD_THRESHOLD DEDUP_SEMANTIC_THRESHOLD DEDUP_SEMANTIC_LOW_THRESHOLD DEDUP_LLM_ENABLED ELEVEN_LAYER_RETRIEVER_ENABLED RETRIEVAL_L1_BLOOM_ENABLED RETRIEVAL_L2_TEMPORAL_ENABLED RETRIEVAL_L3_INVERTED_ENABLED RETRIEVAL_L4_ENTITY_ENABLED RETRIEVAL_L5_GRAPH_ENABLED RETRIEVAL_L6_NGRAM_ENABLED RETRIEVAL_L7_VECTOR_COARSE_ENABLED RETRIEVAL_L8_VECTOR_FINE_ENABLED RETRIEVAL_L9_RERANK_ENABLED RETRIEVAL_L10_CROSS_ENCODER_ENABLED RETRIEVAL_L11_LLM_ENABLED RETRIEVAL_L2_TEMPORAL_TOP_K RETRIEVAL_L3_INVERTED_TOP_K RETRIEVAL_L4_ENTITY_TOP_K RETRIEVAL_L5_GRAPH_TOP_K RETRIEVAL_L6_NGRAM_TOP_K RETRIEVAL_L7_VECTOR_TOP_K RETRIEVAL_L10_CROSS_ENCODER_TOP_K RETRIEVAL_L11_LLM_TOP_K RETRIEVAL_FINE_RANK_THRESHOLD RETRIEVAL_FINAL_TOP_K RETRIEVAL_L5_GRAPH_MAX_DEPTH RETRIEVAL_L5_GRAPH_MAX_ENTITIES RETRIEVAL_L5_GRAPH_DIRECTION RETRIEVAL_L10_CROSS_ENCODER_MODEL RETRIEVAL_L11_LLM_TIMEOUT RETRIEVAL_WEIGHT_INVERTED RETRIEVAL_WEIGHT_ENTITY RETRIEVAL_WEIGHT_GRAPH RETRIEVAL_WEIGHT_NGRAM RETRIEVAL_WEIGHT_VECTOR RETRIEVAL_WEIGHT_TEMPORAL QUERY_PLANNER_ENABLED QUERY_PLANNER_CACHE_SIZE QUERY_PLANNER_CACHE_TTL COMMUNITY_DETECTION_ENABLED COMMUNITY_DETECTION_ALGORITHM COMMUNITY_MIN_SIZE TRIPLE_RECALL_ENABLED TRIPLE_RECALL_RRF_K TRIPLE_RECALL_VECTOR_WEIGHT TRIPLE_RECALL_KEYWORD_WEIGHT TRIPLE_RECALL_ENTITY_WEIGHT VECTOR_IVF_HNSW_M VECTOR_IVF_HNSW_EF_CONSTRUCTION VECTOR_IVF_HNSW_EF_SEARCH FALLBACK_ENABLED FALLBACK_PARALLEL FALLBACK_WORKERS FALLBACK_MAX_RESULTS LLM_RELATION_MODE LLM_RELATION_COMPLEXITY_THRESHOLD LLM_RELATION_ENABLE_TEMPORAL LLM_RELATION_ENABLE_FACT_DESCRIPTION ENTITY_SUMMARY_ENABLED ENTITY_SUMMARY_MIN_FACTS EPISODE_TRACKING_ENABLED LLM_DEFAULT_MAX_TOKENS LLM_RELATION_MAX_TOKENS FORESHADOWING_MAX_TOKENS CONTEXT_EXTRACTION_MAX_TOKENS ENTITY_SUMMARY_MAX_TOKENS SMART_EXTRACTOR_MAX_TOKENS CONTRADICTION_MAX_TOKENS BUILD_CONTEXT_MAX_TOKENS RETRIEVAL_LLM_MAX_TOKENS DEDUP_LLM_MAX_TOKENS EMBEDDING_REUSE_ENABLED UNIFIED_ANALYZER_ENABLED UNIFIED_ANALYSIS_MAX_TOKENS TURN_API_ENABLED RECALL_MODE FORESHADOWING_ENABLED CHARACTER_DIMENSION_ENABLED RP_CONSISTENCY_ENABLED RP_RELATION_TYPES RP_CONTEXT_TYPES RERANKER_BACKEND COHERE_API_KEY RERANKER_MODEL ADMIN_KEY RECALL_BACKEND_TIER RECALL_CORS_ORIGINS RECALL_CORS_METHODS RECALL_RATE_LIMIT_RPM MCP_TRANSPORT MCP_PORT RECALL_DATA_ROOT RECALL_LOG_LEVEL RECALL_LOG_JSON RECALL_LOG_FILE RECALL_PIPELINE_MAX_SIZE RECALL_PIPELINE_RATE_LIMIT RECALL_PIPELINE_WORKERS RECALL_LANG RECALL_LIFECYCLE_ARCHIVE_DAYS RECALL_LIFECYCLE_BACKUP_ENABLED RECALL_LIFECYCLE_BACKUP_DIR RECALL_LIFECYCLE_CLEANUP_TEMP IVF_AUTO_SWITCH_ENABLED IVF_AUTO_SWITCH_THRESHOLD PARALLEL_RETRIEVER_WORKERS PARALLEL_RETRIEVER_TIMEOUT"
+    local supported_keys="EMBEDDING_API_KEY EMBEDDING_API_BASE EMBEDDING_MODEL EMBEDDING_DIMENSION EMBEDDING_RATE_LIMIT EMBEDDING_RATE_WINDOW RECALL_EMBEDDING_MODE LLM_API_KEY LLM_API_BASE LLM_MODEL LLM_TIMEOUT FORESHADOWING_LLM_ENABLED FORESHADOWING_TRIGGER_INTERVAL FORESHADOWING_AUTO_PLANT FORESHADOWING_AUTO_RESOLVE FORESHADOWING_MAX_RETURN FORESHADOWING_MAX_ACTIVE CONTEXT_TRIGGER_INTERVAL CONTEXT_MAX_CONTEXT_TURNS CONTEXT_MAX_PER_TYPE CONTEXT_MAX_TOTAL CONTEXT_DECAY_DAYS CONTEXT_DECAY_RATE CONTEXT_MIN_CONFIDENCE BUILD_CONTEXT_INCLUDE_RECENT PROACTIVE_REMINDER_ENABLED PROACTIVE_REMINDER_TURNS DEDUP_EMBEDDING_ENABLED DEDUP_HIGH_THRESHOLD DEDUP_LOW_THRESHOLD TEMPORAL_GRAPH_ENABLED TEMPORAL_GRAPH_BACKEND KUZU_BUFFER_POOL_SIZE TEMPORAL_DECAY_RATE TEMPORAL_MAX_HISTORY CONTRADICTION_DETECTION_ENABLED CONTRADICTION_AUTO_RESOLVE CONTRADICTION_DETECTION_STRATEGY CONTRADICTION_SIMILARITY_THRESHOLD FULLTEXT_ENABLED FULLTEXT_K1 FULLTEXT_B FULLTEXT_WEIGHT SMART_EXTRACTOR_MODE SMART_EXTRACTOR_COMPLEXITY_THRESHOLD SMART_EXTRACTOR_ENABLE_TEMPORAL BUDGET_DAILY_LIMIT BUDGET_HOURLY_LIMIT BUDGET_RESERVE BUDGET_ALERT_THRESHOLD DEDUP_JACCARD_THRESHOLD DEDUP_SEMANTIC_THRESHOLD DEDUP_SEMANTIC_LOW_THRESHOLD DEDUP_LLM_ENABLED ELEVEN_LAYER_RETRIEVER_ENABLED RETRIEVAL_L1_BLOOM_ENABLED RETRIEVAL_L2_TEMPORAL_ENABLED RETRIEVAL_L3_INVERTED_ENABLED RETRIEVAL_L4_ENTITY_ENABLED RETRIEVAL_L5_GRAPH_ENABLED RETRIEVAL_L6_NGRAM_ENABLED RETRIEVAL_L7_VECTOR_COARSE_ENABLED RETRIEVAL_L8_VECTOR_FINE_ENABLED RETRIEVAL_L9_RERANK_ENABLED RETRIEVAL_L10_CROSS_ENCODER_ENABLED RETRIEVAL_L11_LLM_ENABLED RETRIEVAL_L2_TEMPORAL_TOP_K RETRIEVAL_L3_INVERTED_TOP_K RETRIEVAL_L4_ENTITY_TOP_K RETRIEVAL_L5_GRAPH_TOP_K RETRIEVAL_L6_NGRAM_TOP_K RETRIEVAL_L7_VECTOR_TOP_K RETRIEVAL_L10_CROSS_ENCODER_TOP_K RETRIEVAL_L11_LLM_TOP_K RETRIEVAL_FINE_RANK_THRESHOLD RETRIEVAL_FINAL_TOP_K RETRIEVAL_L5_GRAPH_MAX_DEPTH RETRIEVAL_L5_GRAPH_MAX_ENTITIES RETRIEVAL_L5_GRAPH_DIRECTION RETRIEVAL_L10_CROSS_ENCODER_MODEL RETRIEVAL_L11_LLM_TIMEOUT RETRIEVAL_WEIGHT_INVERTED RETRIEVAL_WEIGHT_ENTITY RETRIEVAL_WEIGHT_GRAPH RETRIEVAL_WEIGHT_NGRAM RETRIEVAL_WEIGHT_VECTOR RETRIEVAL_WEIGHT_TEMPORAL QUERY_PLANNER_ENABLED QUERY_PLANNER_CACHE_SIZE QUERY_PLANNER_CACHE_TTL COMMUNITY_DETECTION_ENABLED COMMUNITY_DETECTION_ALGORITHM COMMUNITY_MIN_SIZE TRIPLE_RECALL_ENABLED TRIPLE_RECALL_RRF_K TRIPLE_RECALL_VECTOR_WEIGHT TRIPLE_RECALL_KEYWORD_WEIGHT TRIPLE_RECALL_ENTITY_WEIGHT VECTOR_IVF_HNSW_M VECTOR_IVF_HNSW_EF_CONSTRUCTION VECTOR_IVF_HNSW_EF_SEARCH FALLBACK_ENABLED FALLBACK_PARALLEL FALLBACK_WORKERS FALLBACK_MAX_RESULTS LLM_RELATION_MODE LLM_RELATION_COMPLEXITY_THRESHOLD LLM_RELATION_ENABLE_TEMPORAL LLM_RELATION_ENABLE_FACT_DESCRIPTION ENTITY_SUMMARY_ENABLED ENTITY_SUMMARY_MIN_FACTS EPISODE_TRACKING_ENABLED LLM_DEFAULT_MAX_TOKENS LLM_RELATION_MAX_TOKENS FORESHADOWING_MAX_TOKENS CONTEXT_EXTRACTION_MAX_TOKENS ENTITY_SUMMARY_MAX_TOKENS SMART_EXTRACTOR_MAX_TOKENS CONTRADICTION_MAX_TOKENS BUILD_CONTEXT_MAX_TOKENS RETRIEVAL_LLM_MAX_TOKENS DEDUP_LLM_MAX_TOKENS EMBEDDING_REUSE_ENABLED UNIFIED_ANALYZER_ENABLED UNIFIED_ANALYSIS_MAX_TOKENS TURN_API_ENABLED RECALL_MODE FORESHADOWING_ENABLED CHARACTER_DIMENSION_ENABLED RP_CONSISTENCY_ENABLED RP_RELATION_TYPES RP_CONTEXT_TYPES RERANKER_BACKEND COHERE_API_KEY RERANKER_MODEL ADMIN_KEY RECALL_BACKEND_TIER RECALL_CORS_ORIGINS RECALL_CORS_METHODS RECALL_RATE_LIMIT_RPM MCP_TRANSPORT MCP_PORT RECALL_DATA_ROOT RECALL_LOG_LEVEL RECALL_LOG_JSON RECALL_LOG_FILE RECALL_PIPELINE_MAX_SIZE RECALL_PIPELINE_RATE_LIMIT RECALL_PIPELINE_WORKERS RECALL_LANG RECALL_LIFECYCLE_ARCHIVE_DAYS RECALL_LIFECYCLE_BACKUP_ENABLED RECALL_LIFECYCLE_BACKUP_DIR RECALL_LIFECYCLE_CLEANUP_TEMP IVF_AUTO_SWITCH_ENABLED IVF_AUTO_SWITCH_THRESHOLD PARALLEL_RETRIEVER_WORKERS PARALLEL_RETRIEVER_TIMEOUT MEMORY_STORAGE_MODE MEMORY_LOG_COMPACT_THRESHOLD MEMORY_LOG_FSYNC RECALL_EXECUTOR_READ_WORKERS RECALL_EXECUTOR_WRITE_WORKERS RECALL_EXECUTOR_MAX_QUEUE"
     
     if [ -f "$config_file" ]; then
         print_info "加载配置文件: $config_file"
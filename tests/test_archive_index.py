@@ -0,0 +1,223 @@
+"""L3 存档全文索引测试 + 基准 (v7.1)
+
+验证：
+1. 数据文件写满即封存并生成 .tix；search_content 结果与逐行扫描（旧实现）一致，
+   包括跨文件、跨卷、未封存的当前文件和懒加载卷
+2. user_id 在索引内过滤：只返回该用户的轮次，文件中没有该用户时不读取任何行
+3. 旧数据（封存文件缺少 .tix / .idx）首次检索时补建；.tix 与数据文件不符时重建
+4. 单字符查询无法用二元组过滤，回退扫描，结果仍然正确
+5. OptimizedNgramIndex 未发生 LRU 驱逐时原文兜底不再扫描磁盘文件
+6. 基准：在封存的存档上检索，逐行扫描与索引检索的延迟对比
+
+使用方法：
+    python -m pytest tests/test_archive_index.py -v -s
+    python tests/test_archive_index.py --turns 50000 --queries 50
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.storage.volume_manager import VolumeManager, VolumeData
+from recall.storage.archive_index import ArchiveTextIndex
+
+WORDS = ['咖啡', '会议', 'Alice', 'Bob', '项目', 'deadline', '旅行', '北京', 'coffee', '预算', '合同', 'python']
+
+
+@pytest.fixture
+def small_files(monkeypatch):
+    """缩小文件/卷大小，几百轮就能封存多个文件、跨越多个卷"""
+    monkeypatch.setattr(VolumeData, 'TURNS_PER_FILE', 100)
+    monkeypatch.setattr(VolumeData, 'TURNS_PER_VOLUME', 300)
+    monkeypatch.setitem(VolumeManager.DEFAULT_CONFIG, 'turns_per_file', 100)
+    monkeypatch.setitem(VolumeManager.DEFAULT_CONFIG, 'turns_per_volume', 300)
+
+
+def _content(rng, i):
+    return f"第{i}轮 " + ' '.join(rng.choice(WORDS) for _ in range(6))
+
+
+def _fill(path, n, users=('alice', 'bob', 'carol'), seed=0):
+    rng = random.Random(seed)
+    vm = VolumeManager(path)
+    for i in range(n):
+        vm.append_turn({'memory_id': f'mem_{i}', 'user_id': users[i % len(users)], 'content': _content(rng, i)})
+    vm.flush()
+    return vm
+
+
+def _linear_scan(path, query, max_results=50, user_id=None):
+    """v7.1 之前的兜底方式：逐行解析所有 JSONL 做 lower() 子串匹配"""
+    hits = []
+    archive = os.path.join(path, 'L3_archive')
+    for volume_dir in sorted(os.listdir(archive)):
+        volume_path = os.path.join(archive, volume_dir)
+        for name in sorted(os.listdir(volume_path)):
+            if not name.endswith('.jsonl'):
+                continue
+            with open(os.path.join(volume_path, name), 'r', encoding='utf-8') as f:
+                for line in f:
+                    turn = json.loads(line)
+                    if user_id is not None and turn.get('user_id', '') != user_id:
+                        continue
+                    if query.lower() in turn.get('content', '').lower():
+                        hits.append(turn)
+                        if len(hits) >= max_results:
+                            return hits
+    return hits
+
+
+def _turns(hits):
+    return [h['turn'] for h in hits]
+
+
+def test_sealed_files_are_indexed_and_match_linear_scan(small_files):
+    with tempfile.TemporaryDirectory() as tmp:
+        vm = _fill(tmp, 750)  # 卷 0、1 各 3 个封存文件，卷 2 一个封存 + 一个半满文件
+        volume_path = os.path.join(tmp, 'L3_archive', 'volume_0000')
+        assert os.path.exists(os.path.join(volume_path, 'turns_00001_00100.tix'))
+        assert not os.path.exists(os.path.join(tmp, 'L3_archive', 'volume_0002', 'turns_00101_00200.tix'))
+
+        queries = ['咖啡会议', 'alice', 'COFFEE 预算', '第42轮', '第7', 'python 北京', '不存在的内容']
+        for fresh in (False, True):
+            if fresh:
+                vm = VolumeManager(tmp)  # 冷启动：所有卷懒加载
+            for q in queries:
+                for user in (None, 'bob'):
+                    got = vm.search_content(q, max_results=1000, user_id=user)
+                    assert _turns(got) == _turns(_linear_scan(tmp, q, 1000, user)), (q, user)
+                assert _turns(vm.search_content(q, max_results=5)) == _turns(_linear_scan(tmp, q, 5))
+
+        # 还在缓存、尚未落盘的轮次同样可见
+        vm.append_turn({'memory_id': 'fresh', 'user_id': 'bob', 'content': '刚写入的 独角兽'})
+        assert [h['memory_id'] for h in vm.search_content('独角兽', user_id='bob')] == ['fresh']
+        assert vm.search_content('独角兽', user_id='alice') == []
+
+
+def test_user_isolation_inside_index(small_files, monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        _fill(tmp, 300, users=('alice', 'bob'))
+        vm = VolumeManager(tmp)
+        reads = []
+        original = VolumeData._read_turn
+
+        def counting_read(self, file_id, slot, turn_number):
+            reads.append(turn_number)
+            return original(self, file_id, slot, turn_number)
+
+        monkeypatch.setattr(VolumeData, '_read_turn', counting_read)
+        hits = vm.search_content('第1', max_results=1000, user_id='alice')
+        assert hits and all(h['user_id'] == 'alice' for h in hits)
+        assert all(n % 2 == 0 for n in reads)  # 只读取 alice 的候选行
+
+        reads.clear()
+        assert vm.search_content('第1', max_results=1000, user_id='mallory') == []
+        assert reads == []
+
+        index = ArchiveTextIndex(os.path.join(tmp, 'L3_archive', 'volume_0000', 'turns_00001_00100.tix'))
+        assert index.candidates(['第1'], 'mallory') == []
+        assert index.candidates(['第'], None) is None  # 单字符：无法过滤
+        assert index.candidates(['第10轮'], 'alice') == [10]
+        assert index.candidates(['第10轮'], 'bob') == []
+        index.close()
+
+
+def test_legacy_archives_are_indexed_lazily(small_files):
+    with tempfile.TemporaryDirectory() as tmp:
+        _fill(tmp, 300)
+        volume_path = os.path.join(tmp, 'L3_archive', 'volume_0000')
+        expected = _turns(_linear_scan(tmp, '咖啡', 1000))
+        for name in os.listdir(volume_path):
+            if name.endswith(('.tix', '.idx')):
+                os.remove(os.path.join(volume_path, name))
+
+        vm = VolumeManager(tmp)
+        assert _turns(vm.search_content('咖啡', max_results=1000)) == expected
+        assert os.path.exists(os.path.join(volume_path, 'turns_00101_00200.tix'))
+        vm.clear()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _fill(tmp, 300)
+        tix = os.path.join(tmp, 'L3_archive', 'volume_0000', 'turns_00001_00100.tix')
+        ArchiveTextIndex.build(tix, [], 1)  # 与数据文件长度不符：重建
+        vm = VolumeManager(tmp)
+        assert _turns(vm.search_content('第5', max_results=1000)) == _turns(_linear_scan(tmp, '第5', 1000))
+        vm.clear()
+
+
+def test_ngram_raw_fallback_skips_disk_without_eviction(monkeypatch):
+    from recall.index.ngram_index import OptimizedNgramIndex
+    import builtins
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = OptimizedNgramIndex(tmp)
+        index._raw_content_max_size = 10
+        for i in range(8):
+            index.add(f'm{i}', f'note {i} 咖啡')
+
+        opened = []
+        real_open = builtins.open
+
+        def tracking_open(file, *args, **kwargs):
+            opened.append(str(file))
+            return real_open(file, *args, **kwargs)
+
+        monkeypatch.setattr(builtins, 'open', tracking_open)
+        assert index.raw_search('missing') == []
+        assert index._raw_content_file not in opened
+
+        monkeypatch.setattr(builtins, 'open', real_open)
+        for i in range(8, 12):
+            index.add(f'm{i}', f'note {i} 咖啡')  # 触发 LRU 驱逐
+        monkeypatch.setattr(builtins, 'open', tracking_open)
+        assert 'm0' in index.raw_search('note 0')  # 被驱逐的原文仍可从磁盘找到
+        assert index._raw_content_file in opened
+
+
+def run_benchmark(n_turns=30000, n_queries=30):
+    rng = random.Random(1)
+    queries = [f'{rng.choice(WORDS)} {rng.choice(WORDS)}' for _ in range(n_queries)] + \
+              [f'第{rng.randrange(n_turns)}轮' for _ in range(n_queries)]
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        _fill(tmp, n_turns)  # 写入并封存
+        build_s = time.perf_counter() - started
+
+        timings = {}
+        started = time.perf_counter()
+        expected = [_turns(_linear_scan(tmp, q, 20, 'alice')) for q in queries]
+        timings['linear scan'] = (time.perf_counter() - started) / len(queries) * 1000
+
+        vm = VolumeManager(tmp)
+        vm.search_content('预热', user_id='alice')  # 打开索引
+        started = time.perf_counter()
+        got = [_turns(vm.search_content(q, max_results=20, user_id='alice')) for q in queries]
+        timings['indexed'] = (time.perf_counter() - started) / len(queries) * 1000
+        assert got == expected
+
+    print(f"\nL3 存档全文检索基准: {n_turns} 轮, {len(queries)} 个查询（写入+封存 {build_s:.1f}s）")
+    for name, ms in timings.items():
+        print(f"  {name:12s} {ms:9.2f} ms/查询")
+    print(f"  加速比 {timings['linear scan'] / timings['indexed']:.0f}x")
+    return timings
+
+
+def test_archive_index_benchmark_small(small_files):
+    timings = run_benchmark(3000, n_queries=10)
+    assert timings['indexed'] < timings['linear scan']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='L3 存档全文检索基准')
+    parser.add_argument('--turns', type=int, default=30000)
+    parser.add_argument('--queries', type=int, default=30)
+    args = parser.parse_args()
+    run_benchmark(args.turns, args.queries)
@@ -0,0 +1,368 @@
+"""AsyncWritePipeline 持久化队列 + 合并写入测试 (v7.1)
+
+验证：
+1. 连续的 ADD / ADD_BATCH 操作合并为 add_batch 调用（同一用户的连续条目一次调用），
+   每个 op_id 拿回自己写入的 memory_ids；单条 ADD 只在 coalesce_adds 开启时合并
+   （add_batch 不做一致性检查），否则逐条走 engine.add
+2. 没有 Embedding 后端（lite 模式）时 add_batch 不可用，所有条目逐条 engine.add
+3. 持久化模式：入队即落盘，进程在处理前"崩溃"后，新实例启动时重放并确认；
+   已确认的操作不会再次重放，历史 op_id 的状态可从 spool 查询
+4. 合并组内某个用户的写入失败只让包含这些条目的操作失败
+5. 操作状态保留条数有上限，只淘汰已完成的操作
+6. 读己之写：wait_for 等待指定操作 / min_op_id 之前的全部操作完成，
+   超时返回仍未完成的 op_id，未知 op_id 视为已完成
+7. 基准：逐条 engine.add（旧实现）与合并 add_batch 的吞吐对比
+
+使用方法：
+    python -m pytest tests/test_async_pipeline.py -v -s
+    python tests/test_async_pipeline.py --ops 2000 --call-ms 2
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.pipeline.async_writer import AsyncWritePipeline, WriteOperation, OperationType, OpState
+from recall.pipeline.spool import WriteSpool
+
+
+class _AddResult:
+    def __init__(self, memory_id):
+        self.id = memory_id
+        self.success = True
+
+
+class _FakeEngine:
+    """模拟引擎：每次调用有固定开销（embedding 请求 / 落盘），之后每条很便宜"""
+
+    def __init__(self, call_seconds=0.0, fail_users=(), with_embeddings=True):
+        self.call_seconds = call_seconds
+        self.fail_users = set(fail_users)
+        self.embedding_backend = object() if with_embeddings else None
+        self.calls = []  # (method, user_id, contents)
+        self.contents = []
+        self._lock = threading.Lock()
+
+    def _write(self, contents):
+        with self._lock:
+            start = len(self.contents)
+            self.contents.extend(contents)
+            return [f'mem_{start + i}' for i in range(len(contents))]
+
+    def add(self, content, user_id='default', metadata=None):
+        time.sleep(self.call_seconds)
+        self.calls.append(('add', user_id, [content]))
+        return _AddResult(self._write([content])[0])
+
+    def add_batch(self, items, user_id='default', skip_dedup=False, skip_llm=True, on_added=None):
+        time.sleep(self.call_seconds)
+        self.calls.append(('add_batch', user_id, [it['content'] for it in items]))
+        if user_id in self.fail_users:
+            raise RuntimeError(f'engine down for {user_id}')
+        ids = self._write([it['content'] for it in items])
+        for i, memory_id in enumerate(ids):
+            if on_added:
+                on_added(i, memory_id)
+        return ids
+
+
+def _add(content, user='u1'):
+    return WriteOperation(OperationType.ADD, {'content': content, 'user_id': user})
+
+
+def _batch(contents, user='u1'):
+    return WriteOperation(OperationType.ADD_BATCH, {
+        'items': [{'content': c, 'user_id': user} for c in contents]
+    })
+
+
+async def _drain(pipeline, op_ids, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if all(pipeline.get_op(i).finished for i in op_ids):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError('pipeline did not drain')
+
+
+def test_consecutive_adds_are_coalesced():
+    engine = _FakeEngine()
+
+    async def scenario():
+        pipeline = AsyncWritePipeline(engine, num_workers=1, coalesce_adds=True)
+        await pipeline.start()
+        ops = [_add(f'a{i}') for i in range(5)] + [_batch(['b0', 'b1'], user='u2'), _add('a5')]
+        ops.append(WriteOperation(OperationType.DELETE, {'memory_id': 'x', 'user_id': 'u1'}))
+        for op in ops:
+            assert pipeline.enqueue(op)  # 同步入队，worker 尚未运行
+        assert pipeline.get_op(ops[0].op_id).state == OpState.QUEUED
+        engine.delete = lambda memory_id, user_id='default': True
+        await _drain(pipeline, [op.op_id for op in ops])
+        await pipeline.stop()
+        return pipeline, ops
+
+    pipeline, ops = asyncio.run(scenario())
+    # 5 个 ADD → 一次调用；ADD_BATCH 默认 skip_llm=True，不与 ADD 合并；
+    # 最后一个 ADD 前后都无可合并的操作，仍走 engine.add
+    assert [(m, u, c) for m, u, c in engine.calls] == [
+        ('add_batch', 'u1', ['a0', 'a1', 'a2', 'a3', 'a4']),
+        ('add_batch', 'u2', ['b0', 'b1']),
+        ('add', 'u1', ['a5']),
+    ]
+    statuses = [pipeline.get_op(op.op_id) for op in ops]
+    assert all(s.state == OpState.COMMITTED for s in statuses)
+    assert [s.memory_ids for s in statuses[:7]] == [
+        ['mem_0'], ['mem_1'], ['mem_2'], ['mem_3'], ['mem_4'], ['mem_5', 'mem_6'], ['mem_7']
+    ]
+    assert statuses[7].memory_ids == ['x']
+    assert pipeline.status().total_coalesced_calls == 2
+    assert pipeline.get_op('nope') is None
+
+
+def test_same_flags_coalesce_across_users():
+    engine = _FakeEngine()
+
+    async def scenario():
+        pipeline = AsyncWritePipeline(engine, num_workers=1, coalesce_adds=True)
+        await pipeline.start()
+        batch = _batch(['b0', 'b1'], user='u2')
+        batch.payload['skip_llm'] = False
+        ops = [_add('a0'), _add('a1'), batch, _add('a2')]
+        for op in ops:
+            pipeline.enqueue(op)
+        await _drain(pipeline, [op.op_id for op in ops])
+        await pipeline.stop()
+        return pipeline, ops
+
+    pipeline, ops = asyncio.run(scenario())
+    # 同一组内按用户切分为连续的 add_batch 调用
+    assert engine.calls == [
+        ('add_batch', 'u1', ['a0', 'a1']),
+        ('add_batch', 'u2', ['b0', 'b1']),
+        ('add_batch', 'u1', ['a2']),
+    ]
+    assert pipeline.get_op(ops[3].op_id).memory_ids == ['mem_4']
+
+
+def _run_ops(engine, ops, **kwargs):
+    async def scenario():
+        pipeline = AsyncWritePipeline(engine, num_workers=1, **kwargs)
+        await pipeline.start()
+        for op in ops:
+            assert pipeline.enqueue(op)  # 同步入队，worker 尚未运行
+        await _drain(pipeline, [op.op_id for op in ops])
+        await pipeline.stop()
+        return pipeline
+
+    return asyncio.run(scenario())
+
+
+def test_single_adds_keep_engine_add_by_default():
+    engine = _FakeEngine()
+    ops = [_add('a0'), _add('a1'), _batch(['b0', 'b1']), _batch(['b2'])]
+    pipeline = _run_ops(engine, ops)
+    assert engine.calls == [
+        ('add', 'u1', ['a0']),
+        ('add', 'u1', ['a1']),
+        ('add_batch', 'u1', ['b0', 'b1', 'b2']),
+    ]
+    assert pipeline.get_op(ops[3].op_id).memory_ids == ['mem_4']
+
+
+def test_no_embedding_backend_falls_back_to_add():
+    engine = _FakeEngine(with_embeddings=False)
+    ops = [_add('a0'), _add('a1'), _batch(['b0', 'b1'], user='u2')]
+    pipeline = _run_ops(engine, ops, coalesce_adds=True)
+    assert engine.calls == [
+        ('add', 'u1', ['a0']),
+        ('add', 'u1', ['a1']),
+        ('add', 'u2', ['b0']),
+        ('add', 'u2', ['b1']),
+    ]
+    statuses = [pipeline.get_op(op.op_id) for op in ops]
+    assert all(s.state == OpState.COMMITTED for s in statuses)
+    assert [s.memory_ids for s in statuses] == [['mem_0'], ['mem_1'], ['mem_2', 'mem_3']]
+
+
+def test_lite_engine_batch_ops_commit():
+    from recall.engine import RecallEngine
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = RecallEngine(data_root=tmp, lite=True, auto_warmup=False)
+        try:
+            assert engine.embedding_backend is None
+            ops = [_batch(['第一条管道记忆', '第二条管道记忆']), _add('第三条管道记忆')]
+            pipeline = _run_ops(engine, ops, coalesce_adds=True)
+            statuses = [pipeline.get_op(op.op_id) for op in ops]
+            assert [s.state for s in statuses] == [OpState.COMMITTED, OpState.COMMITTED]
+            assert sum(len(s.memory_ids) for s in statuses) == 3
+            assert engine.storage.get_scope('u1').count() == 3
+        finally:
+            engine.close()
+
+
+def test_persistent_queue_replays_after_crash():
+    with tempfile.TemporaryDirectory() as tmp:
+        spool_path = os.path.join(tmp, 'spool.db')
+
+        async def crash():
+            pipeline = AsyncWritePipeline(_FakeEngine(), spool_path=spool_path)
+            await pipeline.start()
+            ops = [_add(f'c{i}') for i in range(4)] + [_batch(['c4', 'c5'])]
+            for op in ops:
+                assert pipeline.enqueue(op)
+            for task in pipeline._workers:  # 模拟进程在处理前退出
+                task.cancel()
+            return ops
+
+        ops = asyncio.run(crash())
+        assert [row[1] for row in WriteSpool(spool_path).pending()] == [op.op_id for op in ops]
+
+        engine = _FakeEngine()
+
+        async def restart():
+            pipeline = AsyncWritePipeline(engine, spool_path=spool_path)
+            await pipeline.start()
+            await _drain(pipeline, [op.op_id for op in ops])
+            replayed = pipeline.status().total_replayed
+            await pipeline.stop()
+            return replayed
+
+        assert asyncio.run(restart()) == 5
+        assert sorted(engine.contents) == [f'c{i}' for i in range(6)]
+
+        async def third():
+            pipeline = AsyncWritePipeline(_FakeEngine(), spool_path=spool_path)
+            await pipeline.start()
+            replayed = pipeline.status().total_replayed
+            status = pipeline.get_op(ops[4].op_id)  # 上一个进程的操作：从 spool 查询
+            await pipeline.stop()
+            return replayed, status
+
+        replayed, status = asyncio.run(third())
+        assert replayed == 0
+        assert status.state == OpState.COMMITTED and len(status.memory_ids) == 2
+
+
+def test_failed_run_only_fails_its_ops():
+    engine = _FakeEngine(fail_users={'bad'})
+
+    async def scenario():
+        pipeline = AsyncWritePipeline(engine, num_workers=1)
+        await pipeline.start()
+        ops = [_add('ok0'), _batch(['x0', 'x1'], user='bad'), _add('ok1')]
+        for op in ops:
+            pipeline.enqueue(op)
+        await _drain(pipeline, [op.op_id for op in ops])
+        await pipeline.stop()
+        return pipeline, ops
+
+    pipeline, ops = asyncio.run(scenario())
+    states = [pipeline.get_op(op.op_id) for op in ops]
+    assert [s.state for s in states] == [OpState.COMMITTED, OpState.FAILED, OpState.COMMITTED]
+    assert 'engine down' in states[1].error
+    assert pipeline.status().total_errors == 1
+
+
+def test_status_retention_keeps_queued_ops():
+    async def scenario():
+        pipeline = AsyncWritePipeline(_FakeEngine(), num_workers=1, status_retention=5)
+        await pipeline.start()
+        first = [_add(f'r{i}') for i in range(5)]
+        for op in first:
+            pipeline.enqueue(op)
+        await _drain(pipeline, [op.op_id for op in first])
+        later = [_add(f's{i}') for i in range(8)]
+        for op in later:
+            pipeline.enqueue(op)
+        tracked = len(pipeline._ops)
+        await _drain(pipeline, [op.op_id for op in later])
+        await pipeline.stop()
+        return pipeline, first, later, tracked
+
+    pipeline, first, later, tracked = asyncio.run(scenario())
+    assert tracked == 8  # 8 个排队中的操作全部保留，已完成的 5 个被淘汰
+    assert all(pipeline.get_op(op.op_id) is None for op in first)
+    assert all(pipeline.get_op(op.op_id).finished for op in later)
+
+
+def test_wait_for_read_your_writes():
+    engine = _FakeEngine(call_seconds=0.05)
+
+    async def scenario():
+        pipeline = AsyncWritePipeline(engine, num_workers=1, coalesce_max_items=1)
+        await pipeline.start()
+        ops = [_add(f'w{i}') for i in range(4)]
+        for op in ops:
+            pipeline.enqueue(op)
+        # 未知 op_id（从未入队 / 已超出保留条数）不阻塞
+        assert await pipeline.wait_for(['nope'], timeout=1.0) == []
+        # 超时：返回仍未完成的操作
+        pending = await pipeline.wait_for([ops[3].op_id], timeout=0.01)
+        assert pending == [ops[3].op_id]
+        # min_op_id：该操作及其之前入队的全部操作完成后才返回
+        assert await pipeline.wait_for(min_op_id=ops[2].op_id, timeout=5.0) == []
+        assert all(pipeline.get_op(op.op_id).finished for op in ops[:3])
+        assert await pipeline.wait_for([ops[3].op_id], timeout=5.0) == []
+        assert len(engine.contents) == 4  # 返回时写入已对读取可见
+        seqs = [pipeline.get_op(op.op_id).seq for op in ops]
+        await pipeline.stop()
+        return seqs
+
+    seqs = asyncio.run(scenario())
+    assert seqs == sorted(seqs) and len(set(seqs)) == 4
+
+
+def run_benchmark(n_ops=1000, call_ms=2.0, persistent=False):
+    results = {}
+    for name, coalesce in (('per-op add', 1), ('coalesced', 500)):
+        engine = _FakeEngine(call_seconds=call_ms / 1000)
+
+        async def scenario():
+            with tempfile.TemporaryDirectory() as tmp:
+                pipeline = AsyncWritePipeline(
+                    engine, max_size=n_ops + 10, num_workers=2, coalesce_max_items=coalesce,
+                    spool_path=os.path.join(tmp, 'spool.db') if persistent else None,
+                    coalesce_adds=coalesce > 1,
+                )
+                await pipeline.start()
+                ops = [_add(f'bench {i}') for i in range(n_ops)]
+                started = time.perf_counter()
+                for op in ops:
+                    assert pipeline.enqueue(op)
+                enqueue_s = time.perf_counter() - started
+                await _drain(pipeline, [op.op_id for op in ops], timeout=600)
+                elapsed = time.perf_counter() - started
+                await pipeline.stop()
+                return enqueue_s, elapsed
+
+        enqueue_s, elapsed = asyncio.run(scenario())
+        results[name] = {'ops_per_sec': n_ops / elapsed, 'engine_calls': len(engine.calls),
+                         'enqueue_us': enqueue_s / n_ops * 1e6}
+
+    print(f"\nAsyncWritePipeline 基准: {n_ops} 个 ADD, 引擎每次调用 {call_ms}ms, persistent={persistent}")
+    for name, r in results.items():
+        print(f"  {name:11s} {r['ops_per_sec']:9.0f} ops/sec  {r['engine_calls']:5d} 次引擎调用  "
+              f"入队 {r['enqueue_us']:.0f} us/op")
+    print(f"  加速比 {results['coalesced']['ops_per_sec'] / results['per-op add']['ops_per_sec']:.1f}x")
+    return results
+
+
+def test_async_pipeline_benchmark_small():
+    results = run_benchmark(200, call_ms=1.0, persistent=True)
+    assert results['coalesced']['engine_calls'] < results['per-op add']['engine_calls']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='AsyncWritePipeline 合并写入基准')
+    parser.add_argument('--ops', type=int, default=1000)
+    parser.add_argument('--call-ms', type=float, default=2.0)
+    parser.add_argument('--persistent', action='store_true')
+    args = parser.parse_args()
+    run_benchmark(args.ops, args.call_ms, args.persistent)
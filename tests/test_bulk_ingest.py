@@ -0,0 +1,245 @@
+"""批量导入分组写入测试 + 基准 (v7.1)
+
+验证：
+1. ScopedMemory.add_many() 与逐条 add() 的持久化结果一致（json / log 模式，含 LRU 驱逐）
+2. SQLite BAL 后端 save_batch / add_batch 单事务写入的结果与逐条写入一致
+3. 实体 / 元数据 / N-gram / 全文索引的批量接口与逐条接口结果一致，重启后仍一致
+4. 基准：同一批记录分别走「逐条写入」与「分组写入」的存储路径，对比 items/sec
+
+抽取（spaCy / jieba）不在基准内：记录自带实体与关键词，只衡量存储与索引的写入路径。
+
+使用方法：
+    python -m pytest tests/test_bulk_ingest.py -v -s
+    python tests/test_bulk_ingest.py --items 50000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.storage.multi_tenant import ScopedMemory, MemoryScope
+from recall.storage.layer1_consolidated import ConsolidatedMemory, ConsolidatedEntity
+from recall.index.entity_index import EntityIndex
+from recall.index.metadata_index import MetadataIndex
+from recall.index.ngram_index import OptimizedNgramIndex
+from recall.index.fulltext_index import FullTextIndex
+from recall.backends.sqlite_memory import SQLiteMemoryBackend
+from recall.backends.sqlite_fts import SQLiteFTS5Backend
+
+
+_NAMES = ['Alice', 'Bob', 'Carol', 'Dave', '小明', '小红', '东京', '上海', 'Python', 'Recall']
+_WORDS = ['coffee', 'morning', 'project', 'deadline', 'travel', 'music', '咖啡', '旅行', '项目', '音乐', '会议']
+
+
+def generate_records(n, seed=0):
+    """合成记录：(memory_id, content, metadata, entity_names, keywords)"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        names = rng.sample(_NAMES, rng.randint(1, 3))
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(4, 12))]
+        content = f"{' '.join(names)} {' '.join(words)} #{i}"
+        metadata = {'source': rng.choice(['chat', 'import']), 'tags': [rng.choice(_WORDS)],
+                    'category': 'note', 'content_type': 'custom'}
+        records.append((f'mem_{i:08d}', content, metadata, names, words[:3]))
+    return records
+
+
+class _Stores:
+    """add_batch 写入的本地存储与索引（不含向量，向量索引依赖 faiss）"""
+
+    def __init__(self, root, storage_mode='log', fsync=True):
+        self.scope = ScopedMemory(os.path.join(root, 'scope'), MemoryScope(),
+                                  storage_mode=storage_mode, log_fsync=fsync)
+        self.metadata = MetadataIndex(os.path.join(root, 'meta'))
+        self.entities = EntityIndex(root)
+        self.ngram = OptimizedNgramIndex(os.path.join(root, 'ngram'))
+        self.fulltext = FullTextIndex(root)
+        self.consolidated = ConsolidatedMemory(root)
+        db_path = os.path.join(root, 'memories.db')
+        self.storage_backend = SQLiteMemoryBackend(db_path)
+        self.text_backend = SQLiteFTS5Backend(db_path)
+
+    def close(self):
+        self.scope.close()
+        self.metadata.flush()
+        self.entities.flush()
+        self.fulltext.close()
+        self.storage_backend.close()
+        self.text_backend.close()
+
+
+def _scope_metadata(mid, metadata, names, keywords):
+    return {'id': mid, 'entities': names, 'keywords': keywords, **metadata}
+
+
+def _consolidated_entity(name, mid, content):
+    return ConsolidatedEntity(
+        id=f"entity_{name.lower()}", name=name, entity_type="UNKNOWN",
+        current_state={"last_content": content[:200]}, confidence=0.5,
+        verification_count=1, source_memory_ids=[mid],
+    )
+
+
+def ingest_per_item(stores, records):
+    """v7.1 之前 add_batch 的写入路径：每条记录对每个存储各写一次"""
+    for mid, content, metadata, names, keywords in records:
+        stores.scope.add(content, _scope_metadata(mid, metadata, names, keywords))
+        stores.metadata.add(mid, source=metadata['source'], tags=metadata['tags'],
+                            category=metadata['category'], content_type=metadata['content_type'])
+        for name in names:
+            stores.consolidated.add_or_update(_consolidated_entity(name, mid, content))
+        stores.consolidated.flush()
+        stores.storage_backend.save(mid, {'content': content, 'metadata': metadata, 'user_id': 'u'})
+        stores.text_backend.add(mid, content, {'user_id': 'u'})
+    for mid, content, _, names, _ in records:
+        for name in names:
+            stores.entities.add_entity_occurrence(name, mid)
+        stores.ngram.add(mid, content)
+        stores.fulltext.add(mid, content)
+    stores.ngram.save()
+
+
+def ingest_bulk(stores, records, chunk_size=1000):
+    """v7.1 add_batch 的分组写入路径：每组每个存储只落盘 / 提交一次"""
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        stores.scope.add_many([(content, _scope_metadata(mid, metadata, names, keywords))
+                               for mid, content, metadata, names, keywords in chunk])
+        stores.metadata.add_batch([{'memory_id': mid, **metadata} for mid, _, metadata, _, _ in chunk])
+        for mid, content, _, names, _ in chunk:
+            for name in names:
+                stores.consolidated.add_or_update(_consolidated_entity(name, mid, content))
+        stores.consolidated.flush()
+        stores.storage_backend.save_batch([(mid, {'content': content, 'metadata': metadata, 'user_id': 'u'})
+                                           for mid, content, metadata, _, _ in chunk])
+        stores.text_backend.add_batch([(mid, content, {'user_id': 'u'}) for mid, content, _, _, _ in chunk])
+    stores.entities.add_occurrences([{'entity_name': name, 'turn_id': mid}
+                                     for mid, _, _, names, _ in records for name in names])
+    stores.ngram.add_batch([(mid, content) for mid, content, _, _, _ in records])
+    stores.fulltext.add_batch([(mid, content) for mid, content, _, _, _ in records])
+
+
+def _snapshot(root, storage_mode):
+    """重新打开全部存储，返回可比较的状态"""
+    stores = _Stores(root, storage_mode)
+    try:
+        return {
+            'scope': [(m['content'], m['metadata']) for m in stores.scope.get_all()],
+            'metadata': stores.metadata.query(source='chat'),
+            'entities': {e.name: sorted(e.turn_references) for e in stores.entities.entities.values()},
+            'ngram': {k: sorted(v) for k, v in stores.ngram.noun_phrases.items()},
+            'fulltext': stores.fulltext.search('coffee 咖啡 Alice', top_k=50),
+            'consolidated': {k: sorted(e.source_memory_ids) for k, e in stores.consolidated.entities.items()},
+            'storage_backend': sorted(stores.storage_backend.list()),
+            'text_backend': sorted(r.id for r in stores.text_backend.search('coffee', top_k=1000,
+                                                                            filters={'global': True})),
+        }
+    finally:
+        stores.close()
+
+
+def test_add_many_matches_add():
+    records = generate_records(120)
+    for mode in ('json', 'log'):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            evicted_a, evicted_b = [], []
+            one = ScopedMemory(a, MemoryScope(), storage_mode=mode, log_compact_threshold=50)
+            many = ScopedMemory(b, MemoryScope(), storage_mode=mode, log_compact_threshold=50)
+            one.MAX_MEMORIES = many.MAX_MEMORIES = 100
+            one._on_evict_callback = evicted_a.extend
+            many._on_evict_callback = evicted_b.extend
+            for mid, content, metadata, _, _ in records:
+                one.add(content, {'id': mid, **metadata})
+            for start in range(0, len(records), 40):
+                many.add_many([(content, {'id': mid, **metadata})
+                               for mid, content, metadata, _, _ in records[start:start + 40]])
+            assert evicted_a == evicted_b == [r[0] for r in records[:20]]
+            one.close()
+            many.close()
+
+            reloaded_one = ScopedMemory(a, MemoryScope(), storage_mode=mode)
+            reloaded_many = ScopedMemory(b, MemoryScope(), storage_mode=mode)
+            assert ([m['metadata']['id'] for m in reloaded_one.get_all()]
+                    == [m['metadata']['id'] for m in reloaded_many.get_all()]
+                    == [r[0] for r in records[20:]])
+            assert reloaded_many.get_content_by_id('mem_00000119') == records[119][1]
+            reloaded_one.close()
+            reloaded_many.close()
+
+
+def test_bulk_path_matches_per_item_path():
+    records = generate_records(300, seed=1)
+    with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+        stores = _Stores(a, fsync=False)
+        ingest_per_item(stores, records)
+        stores.close()
+        stores = _Stores(b, fsync=False)
+        ingest_bulk(stores, records, chunk_size=64)
+        stores.close()
+
+        expected, actual = _snapshot(a, 'log'), _snapshot(b, 'log')
+        for key in expected:
+            assert actual[key] == expected[key], key
+        assert len(actual['storage_backend']) == 300
+
+
+def test_sqlite_backend_batches_are_upserts():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'memories.db')
+        storage = SQLiteMemoryBackend(db_path)
+        storage.save_batch([('m1', {'content': 'first'}), ('m2', {'content': 'second'})])
+        storage.save_batch([('m1', {'content': 'first, edited', 'importance': 0.9})])
+        assert storage.load('m1')['content'] == 'first, edited'
+        assert storage.count(global_search=True) == 2
+
+        fts = SQLiteFTS5Backend(db_path)
+        fts.add_batch([('m1', 'espresso machine', None), ('m2', 'green tea', None),
+                       ('m1', 'espresso with friends', None)])
+        hits = fts.search('espresso', filters={'global': True})
+        assert [h.id for h in hits] == ['m1']
+        assert fts.search('machine', filters={'global': True}) == []
+        storage.close()
+        fts.close()
+
+
+def run_benchmark(n_items, chunk_size=1000, storage_mode='log', fsync=True):
+    records = generate_records(n_items)
+    print(f"\n批量导入基准: {n_items} 条, storage_mode={storage_mode}, fsync={fsync}, chunk={chunk_size}")
+    rates = {}
+    for name, ingest in (('per-item', ingest_per_item), ('bulk', ingest_bulk)):
+        with tempfile.TemporaryDirectory() as tmp:
+            stores = _Stores(tmp, storage_mode, fsync)
+            # 作用域容量放开，避免驱逐干扰计时
+            stores.scope.MAX_MEMORIES = n_items + 1
+            start = time.perf_counter()
+            if ingest is ingest_bulk:
+                ingest(stores, records, chunk_size)
+            else:
+                ingest(stores, records)
+            stores.close()
+            elapsed = time.perf_counter() - start
+        rates[name] = n_items / elapsed
+        print(f"  {name:8s} {elapsed:8.2f}s  {rates[name]:10.0f} items/sec")
+    print(f"  加速比 {rates['bulk'] / rates['per-item']:.1f}x")
+    return rates
+
+
+def test_bulk_ingest_benchmark_small():
+    rates = run_benchmark(600, chunk_size=200, fsync=False)
+    assert rates['bulk'] > rates['per-item']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='add_batch 分组写入基准')
+    parser.add_argument('--items', type=int, default=50000)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--storage-mode', choices=['json', 'log'], default='log')
+    parser.add_argument('--no-fsync', action='store_true')
+    args = parser.parse_args()
+    run_benchmark(args.items, args.chunk_size, args.storage_mode, not args.no_fsync)
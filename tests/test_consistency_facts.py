@@ -0,0 +1,154 @@
+"""一致性检查增量事实库测试 + 基准 (v7.1)
+
+验证：
+1. 建好事实库后 check(user_id=...) 与逐条提取已有记忆（旧实现）产生相同的冲突
+2. 写入即登记、删除 / 驱逐即移除、清空用户即丢弃；未建库的用户写入时跳过
+3. 事实库持久化：重新打开后无需回填
+4. 基准：已有记忆从 10 增长到 10,000 条，逐条提取与事实库检查的延迟对比
+
+使用方法：
+    python -m pytest tests/test_consistency_facts.py -v -s
+    python tests/test_consistency_facts.py --sizes 10 100 1000 10000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.processor.consistency import ConsistencyChecker
+from recall.processor.fact_store import ConsistencyFactStore
+
+MEMORIES = [
+    '张三今年25岁',
+    '张三的头发是黑色',
+    '李四和王五是朋友',
+    '赵六已经死亡',
+    '2020年3月5日之后会开会',
+    '周八的眼睛是蓝色',
+]
+
+NEW_CONTENTS = [
+    '张三今年30岁',
+    '张三的头发是金色',
+    '李四和王五是敌人',
+    '赵六说你好',
+    '2020年3月5日之前开过会',
+    '周八的眼睛是蓝色',
+    '今天天气不错',
+]
+
+
+def _descriptions(result):
+    return [v.description for v in result.violations]
+
+
+def _checker_with(memories, user_id='u1', path=None):
+    checker = ConsistencyChecker(fact_store=ConsistencyFactStore(path))
+    checker.build_fact_scope(user_id, [(f'm{i}', m) for i, m in enumerate(memories)])
+    return checker
+
+
+def test_indexed_check_matches_full_extraction():
+    checker = _checker_with(MEMORIES)
+    existing = [{'content': m} for m in MEMORIES]
+    for content in NEW_CONTENTS:
+        expected = _descriptions(checker.check(content, existing))
+        assert _descriptions(checker.check(content, [], user_id='u1')) == expected, content
+    assert _descriptions(checker.check('张三今年30岁', [], user_id='u1'))  # 确有冲突被检出
+    # 其它用户的事实不参与比较
+    checker.build_fact_scope('u2', [])
+    assert _descriptions(checker.check('张三今年30岁', [], user_id='u2')) == []
+
+
+def test_incremental_maintenance():
+    checker = _checker_with([])
+    assert checker.index_memory('u1', 'a', '张三今年25岁') is True
+    assert checker.index_memory('nobody', 'x', '张三今年25岁') is False  # 未建库：跳过
+    assert _descriptions(checker.check('张三今年40岁', [], user_id='u1'))
+
+    checker.remove_memories(['a'])  # 删除 / 驱逐
+    assert _descriptions(checker.check('张三今年40岁', [], user_id='u1')) == []
+
+    checker.index_memory('u1', 'b', '李四和王五是朋友')
+    checker.index_memory('u1', 'b', '李四和王五是同事')  # 更新：替换旧事实
+    assert _descriptions(checker.check('李四和王五是敌人', [], user_id='u1')) == []
+
+    checker.drop_fact_scope('u1')
+    assert not checker.has_fact_scope('u1')
+    assert checker.fact_store.stats()['facts'] == 0
+
+
+def test_fact_store_is_persistent():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'consistency_facts.db')
+        checker = _checker_with(MEMORIES, path=path)
+        checker.fact_store.close()
+
+        reopened = ConsistencyChecker(fact_store=ConsistencyFactStore(path))
+        assert reopened.has_fact_scope('u1')
+        assert len(_descriptions(reopened.check('张三的头发是金色', [], user_id='u1'))) == 1
+        reopened.fact_store.close()
+
+
+def _synthetic_memories(n, seed=0):
+    rng = random.Random(seed)
+    surnames = '赵钱孙李周吴郑王冯陈褚卫蒋沈韩杨'
+    given = '明华强伟芳娜静丽军杰涛超'
+    templates = [
+        '{a}今年{n}岁', '{a}的头发是黑色', '{a}和{b}是朋友', '{a}不会游泳',
+        '{a}已经结婚', '今天{a}去了市场买菜', '{a}的身高是{h}厘米',
+    ]
+    memories = []
+    for i in range(n):
+        a = rng.choice(surnames) + rng.choice(given)
+        b = rng.choice(surnames) + rng.choice(given)
+        memories.append(rng.choice(templates).format(a=a, b=b, n=rng.randint(10, 60), h=rng.randint(150, 190)))
+    return memories
+
+
+def run_benchmark(sizes=(10, 100, 1000, 10000), n_checks=20):
+    checks = ['赵明今年99岁', '钱华的头发是金色', '孙强和李伟是敌人', '周芳说要去旅行'] * (n_checks // 4)
+    results = {}
+    for size in sizes:
+        memories = _synthetic_memories(size)
+        existing = [{'content': m} for m in memories]
+        checker = _checker_with(memories)
+
+        legacy_checks = checks[:max(1, min(len(checks), 20000 // size))]
+        started = time.perf_counter()
+        for content in legacy_checks:
+            checker.check(content, existing)
+        legacy_ms = (time.perf_counter() - started) / len(legacy_checks) * 1000
+
+        started = time.perf_counter()
+        for content in checks:
+            checker.check(content, [], user_id='u1')
+        indexed_ms = (time.perf_counter() - started) / len(checks) * 1000
+        results[size] = (legacy_ms, indexed_ms)
+
+    print("\n一致性检查基准: 每次 check() 的延迟 (ms)")
+    print(f"  {'记忆数':>8s} {'逐条提取':>10s} {'事实库':>10s}")
+    for size, (legacy_ms, indexed_ms) in results.items():
+        print(f"  {size:8d} {legacy_ms:10.2f} {indexed_ms:10.2f}")
+    return results
+
+
+def test_consistency_facts_benchmark_small():
+    results = run_benchmark((10, 2000), n_checks=8)
+    small_indexed = results[10][1]
+    large_legacy, large_indexed = results[2000]
+    assert large_indexed < large_legacy
+    assert large_indexed < max(small_indexed, 0.5) * 5  # 延迟不随记忆数增长
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='一致性检查事实库基准')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--checks', type=int, default=20)
+    args = parser.parse_args()
+    run_benchmark(args.sizes, args.checks)
@@ -0,0 +1,131 @@
+"""三阶段去重器增量索引测试 (v7.1)
+
+验证：
+1. 按作用域（用户）隔离，重复 build_index 不重算 MinHash
+2. remove_from_index / drop_scope / 超出上限淘汰后，精确与模糊匹配都不再命中
+3. 语义阶段优先复用 vector_lookup 的向量，缺失的只批量编码一次，并取余弦 top-1
+4. 多作用域签名索引保存/加载
+
+使用方法：
+    python -m pytest tests/test_dedup_index.py -v -s
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.processor.three_stage_deduplicator import (
+    ThreeStageDeduplicator, DedupConfig, DedupItem, MatchType
+)
+
+
+def _item(item_id, text, embedding=None):
+    return DedupItem(id=item_id, name=text[:100], content=text, item_type='memory', embedding=embedding)
+
+
+_TEXTS = {
+    'm1': '用户喜欢在早上喝一杯手冲咖啡，尤其是埃塞俄比亚的豆子',
+    'm2': '周末计划和朋友去山里徒步，顺便露营看星星',
+    'm3': 'The user is learning to play the cello and practices every evening',
+}
+
+
+class _Backend:
+    """测试用 Embedding 后端：按文本查表，记录批量编码调用"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.batches = []
+
+    def encode_batch_with_cache(self, texts):
+        self.batches.append(list(texts))
+        return [self.vectors[t] for t in texts]
+
+
+def test_scopes_are_isolated_and_incremental():
+    dedup = ThreeStageDeduplicator(config=DedupConfig(semantic_enabled=False))
+    calls = []
+    signature = dedup.minhasher.signature
+    dedup.minhasher.signature = lambda text, k=3: calls.append(text) or signature(text, k)
+
+    items = [_item(k, v) for k, v in _TEXTS.items()]
+    dedup.build_index(items, scope='alice')
+    dedup.build_index(items, scope='alice')
+    assert len(calls) == 3
+    assert dedup.has_scope('alice') and not dedup.has_scope('bob')
+
+    probe = _item('new', _TEXTS['m1'] + '。')
+    assert dedup.deduplicate([probe], scope='alice').matches[0].matched_item.id == 'm1'
+    assert not dedup.deduplicate([probe], scope='bob').matches
+
+    dedup.add_to_index(_item('m4', '今天学会了做番茄炒蛋'), scope='bob')
+    assert dedup.deduplicate([_item('x', '今天学会了做番茄炒蛋')], scope='bob').matches[0].match_type == MatchType.EXACT
+    assert dedup.get_stats()['total_indexed'] == 4
+
+
+def test_remove_drop_and_eviction():
+    dedup = ThreeStageDeduplicator(config=DedupConfig(semantic_enabled=False, index_max_items=2))
+    for key, text in _TEXTS.items():
+        dedup.add_to_index(_item(key, text), scope='alice')
+    # m1 被淘汰（最早加入）
+    assert dedup.get_stats()['total_indexed'] == 2
+    assert not dedup.deduplicate([_item('p', _TEXTS['m1'])], scope='alice').matches
+
+    assert dedup.remove_from_index(['m2', 'missing']) == 1
+    assert not dedup.deduplicate([_item('p', _TEXTS['m2'])], scope='alice').matches
+    assert dedup.deduplicate([_item('p', _TEXTS['m3'])], scope='alice').matches
+
+    dedup.drop_scope('alice')
+    assert not dedup.has_scope('alice')
+    assert dedup.remove_from_index(['m3']) == 0
+
+
+def test_semantic_stage_reuses_vectors():
+    vectors = {
+        _TEXTS['m1']: [1.0, 0.0, 0.0],
+        _TEXTS['m2']: [0.0, 1.0, 0.0],
+        _TEXTS['m3']: [0.0, 0.0, 1.0],
+        '早上来一杯咖啡': [0.95, 0.05, 0.0],
+    }
+    backend = _Backend(vectors)
+    lookups = []
+
+    def lookup(ids):
+        lookups.append(list(ids))
+        return {'m2': vectors[_TEXTS['m2']]} if 'm2' in ids else {}
+
+    dedup = ThreeStageDeduplicator(
+        config=DedupConfig(fuzzy_match_enabled=False),
+        embedding_backend=backend,
+        vector_lookup=lookup
+    )
+    dedup.build_index([_item('m1', _TEXTS['m1']), _item('m2', _TEXTS['m2'])], scope='alice')
+    dedup.add_to_index(_item('m3', _TEXTS['m3'], embedding=vectors[_TEXTS['m3']]), scope='alice')
+
+    match = dedup.deduplicate([_item('new', '早上来一杯咖啡')], scope='alice').matches[0]
+    assert match.match_type == MatchType.SEMANTIC
+    assert match.matched_item.id == 'm1'
+    # m3 自带向量、m2 来自 vector_lookup，只有 m1 需要编码
+    assert sorted(lookups[0]) == ['m1', 'm2']
+    assert [_TEXTS['m1']] in backend.batches
+
+    backend.batches.clear()
+    dedup.deduplicate([_item('new2', '早上来一杯咖啡')], scope='alice')
+    assert backend.batches == [['早上来一杯咖啡']]
+
+
+def test_multi_scope_index_roundtrip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dedup_signatures.bin')
+        dedup = ThreeStageDeduplicator(config=DedupConfig(semantic_enabled=False), index_path=path)
+        dedup.build_index([_item('m1', _TEXTS['m1']), _item('m2', _TEXTS['m2'])], scope='alice')
+        dedup.build_index([_item('m3', _TEXTS['m3'])], scope='bob')
+        dedup.save_index()
+
+        reloaded = ThreeStageDeduplicator(config=DedupConfig(semantic_enabled=False), index_path=path)
+        assert reloaded.has_scope('alice') and reloaded.has_scope('bob')
+        assert reloaded.deduplicate([_item('p', _TEXTS['m3'] + '!')], scope='bob').matches[0].matched_item.id == 'm3'
+        assert not reloaded.deduplicate([_item('p', _TEXTS['m3'] + '!')], scope='alice').matches
+        assert reloaded.remove_from_index(['m1']) == 1
@@ -15,7 +15,7 @@ from unittest.mock import Mock, MagicMock
 
 from recall.retrieval.config import (
     RetrievalConfig, LayerWeights, TemporalContext,
-    LayerStats, RetrievalResultItem
+    LayerStats, RetrievalResultItem, QueryContext
 )
 from recall.retrieval.eleven_layer import (
     ElevenLayerRetriever, RetrievalLayer, EightLayerRetrieverCompat
@@ -509,6 +509,134 @@ class TestIntegration:
         assert len(results_accurate) > 0
 
 
+# =========================================================================
+# 查询上下文测试（v7.1）
+# =========================================================================
+
+class TestQueryContext:
+    """验证一次检索内查询向量只编码一次"""
+    
+    @pytest.mark.parametrize('parallel', [True, False])
+    def test_single_encode_across_recall_and_fine_rank(self, mock_vector_index, parallel):
+        retriever = ElevenLayerRetriever(
+            vector_index=mock_vector_index,
+            content_store=lambda doc_id: f"content of {doc_id}",
+            config=RetrievalConfig(fine_rank_threshold=0, parallel_recall_enabled=parallel)
+        )
+        retriever.retrieve(query="test query", top_k=5)
+        
+        assert mock_vector_index.encode.call_count == 1
+        assert mock_vector_index.search.call_args.kwargs['query_embedding'] == [0.1, 0.2, 0.3, 0.4]
+        assert retriever.get_stats_summary()['query_encodes'] == 1
+    
+    def test_precomputed_context_is_reused(self, mock_vector_index):
+        retriever = ElevenLayerRetriever(
+            vector_index=mock_vector_index,
+            content_store=lambda doc_id: f"content of {doc_id}",
+            config=RetrievalConfig(fine_rank_threshold=0)
+        )
+        context = QueryContext(query="test query", entities=['Alice'], keywords=['test'],
+                               embedding=[0.4, 0.3, 0.2, 0.1])
+        retriever.retrieve(query="test query", top_k=5, query_context=context)
+        
+        mock_vector_index.encode.assert_not_called()
+        assert retriever.get_stats_summary()['query_encodes'] == 0
+
+
+# =========================================================================
+# 常驻召回线程池测试（v7.1）
+# =========================================================================
+
+class TestRecallExecutor:
+    """验证各路召回共享常驻线程池并按路径截止时间收集"""
+    
+    def test_slow_path_times_out_without_blocking_others(self, mock_vector_index, mock_inverted_index):
+        from concurrent.futures import ThreadPoolExecutor
+        
+        fulltext_index = Mock()
+        fulltext_index.search = Mock(side_effect=lambda *a, **kw: time.sleep(0.5) or [('doc9', 1.0)])
+        executor = ThreadPoolExecutor(max_workers=4)
+        retriever = ElevenLayerRetriever(
+            inverted_index=mock_inverted_index,
+            vector_index=mock_vector_index,
+            fulltext_index=fulltext_index,
+            content_store=lambda doc_id: f"content of {doc_id}",
+            config=RetrievalConfig(l8_enabled=False, recall_path_timeouts={'fulltext': 0.05}),
+            executor=executor
+        )
+        
+        start = time.perf_counter()
+        results = retriever.retrieve(query="coffee", keywords=['coffee'], top_k=5)
+        assert time.perf_counter() - start < 0.4
+        assert 'doc9' not in {r.id for r in results}
+        
+        paths = retriever.get_stats_summary()['recall_paths']
+        assert paths['fulltext']['status'] == 'timeout'
+        assert paths['vector']['status'] == 'ok'
+        assert paths['keyword']['count'] > 0
+        
+        # 第二次查询复用同一个线程池
+        retriever.retrieve(query="coffee", keywords=['coffee'], top_k=5)
+        assert retriever._get_executor() is executor
+        executor.shutdown(wait=True)
+
+
+class TestConcurrentStats:
+    """验证并发检索的统计按次记录，互不覆盖（v7.1）"""
+    
+    def test_concurrent_retrieves_keep_own_stats(self, mock_vector_index):
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        
+        both_searching = threading.Barrier(2, timeout=5)
+        hits = {'coffee': [('doc1', 1.0)], 'tea': [('doc2', 1.0), ('doc3', 0.5)]}
+        
+        def fulltext_search(query, top_k=10, **kwargs):
+            both_searching.wait()  # 两次检索同时处于召回阶段
+            return hits[query]
+        
+        fulltext_index = Mock()
+        fulltext_index.search = Mock(side_effect=fulltext_search)
+        executor = ThreadPoolExecutor(max_workers=8)
+        retriever = ElevenLayerRetriever(
+            vector_index=mock_vector_index,
+            fulltext_index=fulltext_index,
+            content_store=lambda doc_id: f"content of {doc_id}",
+            config=RetrievalConfig(fine_rank_threshold=0),
+            executor=executor
+        )
+        contexts = {
+            'coffee': QueryContext(query='coffee', embedding=[0.4, 0.3, 0.2, 0.1]),  # 预先编码
+            'tea': None,
+        }
+        summaries = {}
+        
+        def search(query):
+            retriever.retrieve(query=query, top_k=5, query_context=contexts[query])
+            summaries[query] = retriever.get_stats_summary()
+        
+        threads = [threading.Thread(target=search, args=(q,)) for q in contexts]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        executor.shutdown(wait=True)
+        
+        assert summaries['coffee']['query_encodes'] == 0
+        assert summaries['tea']['query_encodes'] == 1
+        assert summaries['coffee']['recall_paths']['fulltext']['count'] == 1
+        assert summaries['tea']['recall_paths']['fulltext']['count'] == 2
+        for summary in summaries.values():
+            assert [layer['layer'] for layer in summary['layers']].count('fulltext_bm25') == 1
+        
+        # 没有检索过的线程读到空统计
+        other = {}
+        t = threading.Thread(target=lambda: other.update(retriever.get_stats_summary()))
+        t.start()
+        t.join()
+        assert other['layers'] == [] and other['recall_paths'] == {}
+
+
 # =========================================================================
 # 主入口
 # =========================================================================
@@ -0,0 +1,119 @@
+"""Embedding 持久化缓存测试 (v7.1)
+
+验证：
+1. 缓存键为内容寻址的稳定摘要（与进程 hash 随机化无关），模型/维度/归一化参与键
+2. 重启后磁盘缓存命中，不再调用 encode()
+3. 超出 max_entries 后按 LRU 淘汰最久未用的条目
+4. encode_batch_with_cache 只把未命中的文本（批内去重）交给 encode_batch
+
+使用方法：
+    python -m pytest tests/test_embedding_disk_cache.py -v -s
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.embedding.base import EmbeddingBackend, EmbeddingConfig, EmbeddingBackendType
+from recall.embedding.disk_cache import EmbeddingDiskCache
+
+
+class _CountingBackend(EmbeddingBackend):
+    """按文本长度生成确定性向量，并记录 encode 调用次数"""
+
+    def __init__(self, config, cache_dir=None):
+        super().__init__(config, cache_dir=cache_dir)
+        self.calls = 0
+        self.batches = []
+
+    @property
+    def dimension(self) -> int:
+        return 8
+
+    @property
+    def is_available(self) -> bool:
+        return True
+
+    def encode(self, text):
+        self.calls += 1
+        return np.full(8, len(text), dtype=np.float32)
+
+    def encode_batch(self, texts):
+        self.batches.append(list(texts))
+        return np.stack([self.encode(t) for t in texts])
+
+
+def _config(**kwargs):
+    return EmbeddingConfig(backend=EmbeddingBackendType.OPENAI, api_model='test-model',
+                           dimension=8, **kwargs)
+
+
+def test_make_key_is_stable_and_model_scoped():
+    k1 = EmbeddingDiskCache.make_key('openai', 'm', 8, True, 'hello')
+    assert k1 == EmbeddingDiskCache.make_key('openai', 'm', 8, True, 'hello')
+    assert k1 != EmbeddingDiskCache.make_key('openai', 'm2', 8, True, 'hello')
+    assert k1 != EmbeddingDiskCache.make_key('openai', 'm', 16, True, 'hello')
+    assert k1 != EmbeddingDiskCache.make_key('openai', 'm', 8, False, 'hello')
+
+
+def test_disk_cache_hits_after_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = _CountingBackend(_config(), cache_dir=tmp)
+        texts = [f'text {i}' * (i + 1) for i in range(100)]
+        for t in texts:
+            backend.encode_with_cache(t)
+        assert backend.calls == 100
+        backend.close()
+
+        restarted = _CountingBackend(_config(), cache_dir=tmp)
+        for t in texts:
+            vec = restarted.encode_with_cache(t)
+            assert vec[0] == len(t)
+        assert restarted.calls == 0
+        assert restarted.get_cache_stats()['disk_hits'] == 100
+        restarted.close()
+
+
+def test_disk_cache_lru_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingDiskCache(tmp, 'ns', max_entries=10, commit_interval=2)
+        keys = [EmbeddingDiskCache.make_key('openai', 'm', 4, True, str(i)) for i in range(12)]
+        for i, k in enumerate(keys[:10]):
+            cache.put(k, np.full(4, i, dtype=np.float32))
+        assert cache.get(keys[0]) is not None  # 刷新 0，使 1、2 成为最久未用
+        cache.put(keys[10], np.zeros(4, dtype=np.float32))
+        cache.put(keys[11], np.zeros(4, dtype=np.float32))
+        cache.close()
+
+        reopened = EmbeddingDiskCache(tmp, 'ns', max_entries=10)
+        assert len(reopened) <= 10
+        assert reopened.get(keys[1]) is None
+        assert reopened.get(keys[0])[0] == 0
+        assert reopened.get(keys[9])[0] == 9
+        assert reopened.get(keys[11]) is not None
+        reopened.close()
+
+
+def test_encode_batch_with_cache_only_encodes_misses():
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = _CountingBackend(_config(), cache_dir=tmp)
+        backend.encode_with_cache('seen')
+        texts = ['seen', 'new a', 'new bb', 'new a', 'seen']
+        result = backend.encode_batch_with_cache(texts)
+        assert result.shape == (5, 8)
+        assert [row[0] for row in result] == [len(t) for t in texts]
+        assert backend.batches == [['new a', 'new bb']]
+
+        # 再次批量编码：全部命中，不再调用 encode_batch
+        backend.encode_batch_with_cache(texts)
+        assert len(backend.batches) == 1
+        backend.close()
+
+        restarted = _CountingBackend(_config(), cache_dir=tmp)
+        restarted.encode_batch_with_cache(texts)
+        assert restarted.batches == []
+        restarted.close()
@@ -0,0 +1,368 @@
+"""Embedding API 限流与并发调度测试 (v7.1)
+
+验证（对接本地伪 OpenAI 兼容 Embedding 服务，服务端按 RPM 限流并返回 429 + Retry-After）：
+1. 令牌桶同时限制请求数与 token 数；EMBEDDING_RATE_LIMIT=0 表示不限（旧实现会一直等待）
+2. 一次 encode_batch 的各分批在限额内并发发送，结果顺序不变
+3. 429：按 Retry-After 暂停后重试，SDK 不再自行 sleep 重试
+4. 公平：大批量导入进行中，单条查询按轮转拿到下一个配额，不被饿死
+5. 某个分批失败：抛出异常，其余未发送的分批取消
+6. 排队超时按分批计时：总耗时超过 queue_timeout 的大批量导入不会失败
+7. 基准：相同 RPM 上限下，旧实现（串行分批 + 滑动窗口 sleep）与调度器的吞吐、
+   交互式查询延迟对比
+
+使用方法：
+    python -m pytest tests/test_embedding_dispatcher.py -v -s
+    python tests/test_embedding_dispatcher.py --batches 100 --rpm 50
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('openai')
+
+from recall.embedding.base import EmbeddingConfig, EmbeddingBackendType
+from recall.embedding.api_backend import APIEmbeddingBackend
+from recall.embedding.dispatcher import RateLimiter, EmbeddingDispatcher
+
+DIM = 8
+
+
+def _vector(text):
+    return [float(b) + 1.0 for b in hashlib.sha256(text.encode('utf-8')).digest()[:DIM]]
+
+
+class _MockEmbeddingServer:
+    """本地伪 Embedding 服务：记录请求数 / 峰值并发，可注入 429 / 400
+
+    max_requests > 0 时按令牌桶限流（容量 max_requests，每 window 秒补满，与多数提供商
+    连续补充的 RPM 限额一致），超出返回 429 + Retry-After。
+    """
+
+    def __init__(self, latency=0.0, max_requests=0, window=1.0):
+        self.latency = latency
+        self.max_requests = max_requests
+        self.window = window
+        self.requests = 0
+        self.rejected = 0
+        self.active = 0
+        self.peak = 0
+        self.force_429 = 0
+        self.retry_after = '0.2'
+        self.reject_text = None
+        self._bucket = float(max_requests)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                texts = body['input'] if isinstance(body['input'], list) else [body['input']]
+                status, payload, headers = server.handle(texts, body['model'])
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}/v1'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, texts, model):
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            if self.max_requests:
+                rate = self.max_requests / self.window
+                self._bucket = min(float(self.max_requests), self._bucket + (now - self._updated) * rate)
+                self._updated = now
+            limited = self.force_429 > 0 or (self.max_requests and self._bucket < 1)
+            if limited:
+                self.force_429 = max(0, self.force_429 - 1)
+                self.rejected += 1
+                return 429, {'error': {'message': 'rate limit exceeded'}}, {'Retry-After': self.retry_after}
+            if self.max_requests:
+                self._bucket -= 1
+            if self.reject_text is not None and self.reject_text in texts:
+                return 400, {'error': {'message': 'bad input'}}, {}
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.active -= 1
+        return 200, {
+            'object': 'list', 'model': model,
+            'data': [{'object': 'embedding', 'index': i, 'embedding': _vector(t)} for i, t in enumerate(texts)],
+            'usage': {'prompt_tokens': sum(len(t) for t in texts), 'total_tokens': sum(len(t) for t in texts)},
+        }, {}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _backend(server, batch_size=10, **env):
+    """每次使用新的 api_key，避免与其它测试共享调度器"""
+    settings = {'EMBEDDING_RATE_LIMIT': '0', 'EMBEDDING_RATE_WINDOW': '60',
+                'EMBEDDING_TOKENS_PER_MINUTE': '0', 'EMBEDDING_MAX_IN_FLIGHT': '4'}
+    settings.update({k: str(v) for k, v in env.items()})
+    saved = {k: os.environ.get(k) for k in settings}
+    os.environ.update(settings)
+    try:
+        config = EmbeddingConfig(
+            backend=EmbeddingBackendType.CUSTOM, api_key=f'sk-{uuid.uuid4().hex}', api_base=server.base_url,
+            api_model='mock-embed', dimension=DIM, batch_size=batch_size, normalize=False, cache_embeddings=False,
+        )
+        return APIEmbeddingBackend(config)
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+@pytest.fixture
+def server():
+    mock = _MockEmbeddingServer()
+    yield mock
+    mock.close()
+
+
+def test_token_bucket_counts_requests_and_tokens():
+    limiter = RateLimiter(max_requests=5, window_seconds=1)
+    assert all(limiter.try_acquire() == 0 for _ in range(5))  # 一个窗口的突发
+    wait_s = limiter.try_acquire()
+    assert 0 < wait_s <= 0.2
+    assert limiter.try_acquire() > 0  # 未获得许可时不扣除
+    started = time.perf_counter()
+    assert limiter.acquire(timeout=1.0)
+    assert 0.1 <= time.perf_counter() - started < 0.5
+
+    limiter = RateLimiter(max_requests=0, window_seconds=60, tokens_per_minute=6000)  # 100 token/s
+    assert limiter.try_acquire(tokens=5000) == 0
+    assert limiter.try_acquire(tokens=2000) == pytest.approx(10.0, abs=0.5)
+    limiter.settle(5000, 1000)  # 实际用量少于预估：多退
+    assert limiter.try_acquire(tokens=2000) == 0
+    assert limiter.acquire(timeout=0.1, tokens=6000) is False
+
+    unlimited = RateLimiter(max_requests=0)  # 0 = 不限（旧实现会永远等待）
+    assert all(unlimited.try_acquire() == 0 for _ in range(1000))
+
+
+def test_batches_are_sent_concurrently(server):
+    server.latency = 0.1
+    backend = _backend(server, batch_size=10, EMBEDDING_MAX_IN_FLIGHT=4)
+    assert list(backend.encode('single')) == _vector('single')  # 同时预热 SDK 客户端
+    texts = [f'text {i}' for i in range(50)]
+    started = time.perf_counter()
+    vectors = backend.encode_batch(texts)
+    elapsed = time.perf_counter() - started
+    assert vectors.shape == (50, DIM)
+    assert [list(v) for v in vectors] == [_vector(t) for t in texts]
+    assert server.requests == 6 and 2 <= server.peak <= 4
+    assert elapsed < 5 * 0.1  # 串行需要 0.5 秒
+    assert backend.get_dispatch_stats()['requests'] == 6
+
+
+def test_retry_after_on_429(server):
+    server.force_429 = 1
+    server.retry_after = '0.2'
+    backend = _backend(server)
+    started = time.perf_counter()
+    assert list(backend.encode('hello')) == _vector('hello')
+    assert time.perf_counter() - started >= 0.2
+    assert server.requests == 2  # SDK 不再自行重试
+    stats = backend.get_dispatch_stats()
+    assert stats['rate_limited'] == 1 and stats['retries'] == 1
+
+    server.force_429 = 5  # 超过最多尝试次数：抛出
+    with pytest.raises(Exception) as excinfo:
+        backend.encode('again')
+    assert '429' in str(excinfo.value) or 'rate limit' in str(excinfo.value).lower()
+
+
+def test_interactive_caller_is_not_starved(server):
+    backend = _backend(server, batch_size=1, EMBEDDING_RATE_LIMIT=5, EMBEDDING_RATE_WINDOW=1,
+                       EMBEDDING_MAX_IN_FLIGHT=2)
+    bulk = threading.Thread(target=backend.encode_batch, args=([f'bulk {i}' for i in range(15)],))
+    bulk.start()
+    time.sleep(0.1)  # 突发配额已用完，批量导入进入每 0.2 秒一个的限速阶段
+    started = time.perf_counter()
+    backend.encode('interactive query')
+    latency = time.perf_counter() - started
+    bulk.join()
+    assert latency < 0.6  # 轮转：只需等下一两个配额，而不是排在剩余 ~10 个分批之后（~2 秒）
+
+
+def test_failed_batch_cancels_the_rest(server):
+    server.latency = 0.05
+    server.reject_text = 'bad 0'
+    backend = _backend(server, batch_size=1, EMBEDDING_MAX_IN_FLIGHT=1)
+    with pytest.raises(Exception):
+        backend.encode_batch(['bad 0'] + [f'ok {i}' for i in range(20)])
+    time.sleep(0.2)
+    assert server.requests <= 3
+    assert backend.get_dispatch_stats()['in_flight'] == 0
+
+
+def test_queue_timeout_is_per_batch():
+    dispatcher = EmbeddingDispatcher(RateLimiter(max_requests=2, window_seconds=1), max_in_flight=2,
+                                     queue_timeout=1.0)
+
+    def echo(batch):
+        return list(batch), None
+
+    batches = [[f'text {i}'] for i in range(6)]
+    started = time.perf_counter()
+    assert dispatcher.map(echo, batches, [0] * len(batches)) == batches
+    assert time.perf_counter() - started > 1.0  # 总耗时超过 queue_timeout，每个分批各自未超时
+
+    slow = EmbeddingDispatcher(RateLimiter(max_requests=1, window_seconds=10), queue_timeout=0.3)
+    with pytest.raises(RuntimeError):
+        slow.map(echo, [['a'], ['b']], [0, 0])  # 第二个分批要等 10 秒
+
+
+def _legacy_encode_batch(client, limiter, texts, batch_size):
+    """旧实现：分批串行发送，滑动窗口超限时在调用方线程 sleep，429 固定退避 sleep"""
+    out = []
+    for i in range(0, len(texts), batch_size):
+        batch = texts[i:i + batch_size]
+        for attempt in range(3):
+            limiter.acquire()
+            try:
+                response = client.embeddings.create(model='mock-embed', input=batch)
+                out.extend(item.embedding for item in response.data)
+                break
+            except Exception as e:
+                if ('429' in str(e) or 'rate limit' in str(e).lower()) and attempt < 2:
+                    time.sleep((attempt + 1) * 3)
+                    continue
+                raise
+    return out
+
+
+class _LegacySlidingWindow:
+    """旧的滑动窗口限流器（超限时 time.sleep 轮询）"""
+
+    def __init__(self, max_requests, window_seconds):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.time()
+                self.requests = [t for t in self.requests if now - t < self.window_seconds]
+                if len(self.requests) < self.max_requests:
+                    self.requests.append(now)
+                    return True
+                wait_time = self.window_seconds - (now - min(self.requests)) + 0.1
+            time.sleep(min(wait_time, 10))
+
+
+def run_benchmark(n_batches=100, batch_size=20, rpm=50, latency=0.05, n_interactive=3, queries=10, in_flight=8):
+    """一个批量导入线程 + n_interactive 个交互式查询线程，客户端与服务端限额均为每秒 rpm 次"""
+    from openai import OpenAI
+
+    texts = [f'memory chunk {i}' for i in range(n_batches * batch_size)]
+    results = {}
+    for name in ('legacy', 'dispatcher'):
+        server = _MockEmbeddingServer(latency=latency, max_requests=rpm, window=1.0)
+        if name == 'legacy':
+            client = OpenAI(api_key='sk-legacy', base_url=server.base_url)
+            limiter = _LegacySlidingWindow(rpm, 1)
+
+            def encode_bulk():
+                return _legacy_encode_batch(client, limiter, texts, batch_size)
+
+            def encode_one(q):
+                return _legacy_encode_batch(client, limiter, [q], batch_size)
+        else:
+            backend = _backend(server, batch_size=batch_size, EMBEDDING_RATE_LIMIT=rpm, EMBEDDING_RATE_WINDOW=1,
+                               EMBEDDING_MAX_IN_FLIGHT=in_flight)
+
+            def encode_bulk():
+                return backend.encode_batch(texts)
+
+            encode_one = backend.encode
+        latencies = []
+        lock = threading.Lock()
+
+        def interactive(n):
+            for q in range(queries):
+                started = time.perf_counter()
+                encode_one(f'query {n}-{q}')
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                time.sleep(0.05)
+
+        try:
+            threads = [threading.Thread(target=interactive, args=(n,)) for n in range(n_interactive)]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            encode_bulk()
+            bulk_seconds = time.perf_counter() - started
+            for t in threads:
+                t.join()
+            latencies.sort()
+            results[name] = {
+                'bulk_seconds': bulk_seconds,
+                'texts_per_second': len(texts) / bulk_seconds,
+                'interactive_p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+                'interactive_max_ms': latencies[-1] * 1000,
+                'server_429': server.rejected,
+            }
+        finally:
+            server.close()
+
+    print(f"\nEmbedding 调度基准: {n_batches} 个分批 × {batch_size} 条, 限额 {rpm} 次/秒, 服务延迟 {latency * 1000:.0f} ms, "
+          f"{n_interactive} 个交互式查询线程")
+    for name, r in results.items():
+        print(f"  {name:10s} 批量 {r['bulk_seconds']:6.2f} s ({r['texts_per_second']:7.0f} 条/秒)  "
+              f"查询 p95 {r['interactive_p95_ms']:7.1f} ms  max {r['interactive_max_ms']:7.1f} ms  429: {r['server_429']}")
+    return results
+
+
+def test_embedding_dispatcher_benchmark_small():
+    results = run_benchmark(n_batches=30, batch_size=10, rpm=20, latency=0.03, n_interactive=2, queries=4)
+    assert results['dispatcher']['texts_per_second'] > results['legacy']['texts_per_second']
+    assert results['dispatcher']['interactive_max_ms'] < 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Embedding 限流与并发调度基准')
+    parser.add_argument('--batches', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--rpm', type=int, default=50, help='每秒请求数上限（客户端与服务端相同）')
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--in-flight', type=int, default=8)
+    args = parser.parse_args()
+    run_benchmark(args.batches, args.batch_size, args.rpm, args.latency_ms / 1000, in_flight=args.in_flight)
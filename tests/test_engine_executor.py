@@ -0,0 +1,140 @@
+"""EngineExecutor 读/写线程池测试 (v7.1)
+
+验证：
+1. 负载测试：批量 add_turn 写入流持续进行时，搜索 p99 延迟保持有界
+   （对照组：读写共用同一个线程池时，搜索排在写入之后）
+2. 客户端断开时，仍在排队的调用被取消，不会再执行
+3. 排队已满时拒绝新调用（ExecutorSaturated → HTTP 503）
+
+使用方法：
+    python -m pytest tests/test_engine_executor.py -v -s
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from recall.pipeline.engine_executor import EngineExecutor, ExecutorSaturated, ClientDisconnected
+
+
+class _SlowEngine:
+    """模拟引擎：add_turn 含一次慢 LLM 调用，search 只做一次快速向量检索"""
+
+    def __init__(self, turn_seconds=0.05, search_seconds=0.002):
+        self.turn_seconds = turn_seconds
+        self.search_seconds = search_seconds
+        self.turns = 0
+
+    def add_turn(self, user_message, ai_response):
+        time.sleep(self.turn_seconds)
+        self.turns += 1
+        return True
+
+    def search(self, query):
+        time.sleep(self.search_seconds)
+        return [query]
+
+
+class _FakeRequest:
+    def __init__(self, disconnected=False):
+        self.disconnected = disconnected
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+def _p99(samples):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+async def _search_p99_under_ingest(run_turn, run_search, engine, turns=60, searches=40):
+    async def ingest():
+        await asyncio.gather(*[
+            run_turn(engine.add_turn, user_message=f'u{i}', ai_response=f'a{i}')
+            for i in range(turns)
+        ])
+
+    async def one_search(i):
+        start = time.perf_counter()
+        await run_search(engine.search, query=f'q{i}')
+        return time.perf_counter() - start
+
+    ingest_task = asyncio.create_task(ingest())
+    await asyncio.sleep(0.01)  # 让写入流先占满线程
+    latencies = []
+    for i in range(searches):
+        latencies.append(await one_search(i))
+        await asyncio.sleep(0.005)
+    await ingest_task
+    return _p99(latencies)
+
+
+def test_search_p99_bounded_during_bulk_add_turn():
+    engine = _SlowEngine()
+    executor = EngineExecutor(read_workers=4, write_workers=2, max_queue=1000)
+    isolated = asyncio.run(_search_p99_under_ingest(
+        executor.run_write, executor.run_read, engine
+    ))
+    executor.shutdown()
+
+    shared = EngineExecutor(read_workers=1, write_workers=6, max_queue=1000)
+    baseline = asyncio.run(_search_p99_under_ingest(
+        shared.run_write, shared.run_write, _SlowEngine()
+    ))
+    shared.shutdown()
+
+    print(f"\n  search p99: separate pools={isolated * 1000:.1f}ms, shared pool={baseline * 1000:.1f}ms")
+    assert engine.turns == 60
+    assert isolated < 0.1
+    assert isolated < baseline
+
+
+def test_queued_call_cancelled_on_disconnect():
+    executor = EngineExecutor(read_workers=1, write_workers=1, max_queue=10)
+    executor.DISCONNECT_POLL_INTERVAL = 0.01
+    release = threading.Event()
+    ran = []
+
+    async def scenario():
+        blocker = asyncio.create_task(executor.run_read(release.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ClientDisconnected):
+            await executor.run_read(ran.append, 'late', request=_FakeRequest(disconnected=True))
+        release.set()
+        await blocker
+
+    asyncio.run(scenario())
+    status = executor.status()['read']
+    executor.shutdown()
+    assert ran == []
+    assert status.total_cancelled == 1
+    assert status.queue_depth == 0
+
+
+def test_saturated_pool_rejects():
+    executor = EngineExecutor(read_workers=1, write_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.create_task(executor.run_write(release.wait, 5))
+        second = asyncio.create_task(executor.run_write(release.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturated):
+            await executor.run_write(release.wait, 5)
+        # 读池不受写池饱和影响
+        assert await executor.run_read(lambda: 'ok') == 'ok'
+        release.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(scenario())
+    status = executor.status()['write']
+    executor.shutdown()
+    assert status.total_rejected == 1
+    assert status.total_completed == 2
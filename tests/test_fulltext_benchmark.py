@@ -0,0 +1,171 @@
+"""BM25 Top-k 剪枝基准测试 (v7.1)
+
+测试目标：
+1. search()（MaxScore 动态剪枝 + 堆选前 k）与 search_exhaustive()（全量打分）结果一致
+2. 对比两者在中英文混合合成语料上的查询延迟
+
+pytest 只跑小语料的一致性校验；完整基准（默认 100 万文档）直接运行：
+    python tests/test_fulltext_benchmark.py
+    python tests/test_fulltext_benchmark.py --docs 200000 --queries 50 --top-k 20
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.index.fulltext_index import FullTextIndex
+
+
+# 英文词表 + 常用汉字；按 Zipf 分布抽取，高频词/高频汉字 2-gram 的倒排会很长
+_EN_WORDS = [
+    'memory', 'story', 'character', 'dragon', 'castle', 'journey', 'river', 'forest', 'sword', 'magic',
+    'village', 'king', 'queen', 'battle', 'friend', 'secret', 'letter', 'mountain', 'ocean', 'winter',
+    'summer', 'garden', 'library', 'teacher', 'student', 'coffee', 'machine', 'learning', 'network', 'signal',
+    'market', 'merchant', 'soldier', 'captain', 'island', 'bridge', 'tower', 'shadow', 'light', 'storm',
+] + [f'term{i}' for i in range(2000)]
+_ZH_CHARS = (
+    '的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行'
+    '学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外'
+    '天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情'
+)
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    return [1.0 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def generate_corpus(n_docs: int, seed: int = 42):
+    """生成 (doc_id, text)：每篇 1-3 段英文 + 1-3 段中文，长度随机"""
+    rng = random.Random(seed)
+    en_weights = _zipf_weights(len(_EN_WORDS))
+    zh_weights = _zipf_weights(len(_ZH_CHARS), s=0.9)
+    for i in range(n_docs):
+        parts = []
+        for _ in range(rng.randint(1, 3)):
+            parts.append(' '.join(rng.choices(_EN_WORDS, en_weights, k=rng.randint(3, 15))))
+            parts.append(''.join(rng.choices(_ZH_CHARS, zh_weights, k=rng.randint(4, 20))))
+        yield f'doc_{i}', '，'.join(parts)
+
+
+def generate_queries(n_queries: int, seed: int = 7) -> List[str]:
+    """查询混合高频词与低频词（中文部分会切成 2-gram）"""
+    rng = random.Random(seed)
+    en_weights = _zipf_weights(len(_EN_WORDS))
+    zh_weights = _zipf_weights(len(_ZH_CHARS), s=0.9)
+    queries = []
+    for _ in range(n_queries):
+        words = rng.choices(_EN_WORDS, en_weights, k=rng.randint(1, 3)) + [rng.choice(_EN_WORDS)]
+        chinese = ''.join(rng.choices(_ZH_CHARS, zh_weights, k=rng.randint(2, 5)))
+        queries.append(' '.join(words) + ' ' + chinese)
+    return queries
+
+
+def build_index(path: str, n_docs: int, seed: int = 42) -> FullTextIndex:
+    index = FullTextIndex(path)
+    index.BUFFER_MAX_DOCS = 50000
+    for doc_id, text in generate_corpus(n_docs, seed):
+        index.add(doc_id, text)
+    index.close()
+    return FullTextIndex(path)
+
+
+def same_ranking(pruned: List[Tuple[str, float]], exhaustive: List[Tuple[str, float]]) -> bool:
+    """分数序列一致；严格高于第 k 名分数的文档集合一致（与第 k 名同分的文档允许任取）"""
+    if len(pruned) != len(exhaustive):
+        return False
+    for (_, a), (_, b) in zip(pruned, exhaustive):
+        if abs(a - b) > 1e-6 * max(1.0, abs(b)):
+            return False
+    if not exhaustive:
+        return True
+    cutoff = exhaustive[-1][1] + 1e-6 * max(1.0, abs(exhaustive[-1][1]))
+    return {d for d, s in pruned if s > cutoff} == {d for d, s in exhaustive if s > cutoff}
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(n_docs: int, n_queries: int, top_k: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"构建索引: {n_docs} 篇文档 ...")
+        start = time.perf_counter()
+        index = build_index(tmp, n_docs)
+        stats = index.get_stats()
+        print(f"  耗时 {time.perf_counter() - start:.1f}s, 段数 {stats['segments']}, "
+              f"词表 {stats['vocabulary_size']}, 段文件 {stats['segment_bytes'] / 1e6:.1f}MB")
+
+        pruned_times, exhaustive_times, mismatches = [], [], 0
+        for query in generate_queries(n_queries):
+            exhaustive, t_exhaustive = _timed(index.search_exhaustive, query, top_k=top_k)
+            pruned, t_pruned = _timed(index.search, query, top_k=top_k)
+            exhaustive_times.append(t_exhaustive)
+            pruned_times.append(t_pruned)
+            if not same_ranking(pruned, exhaustive):
+                mismatches += 1
+                print(f"  [MISMATCH] {query!r}")
+
+        def _summary(name, times):
+            ordered = sorted(times)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            print(f"  {name:<10} mean={statistics.mean(times) * 1000:8.1f}ms  "
+                  f"median={statistics.median(times) * 1000:8.1f}ms  p95={p95 * 1000:8.1f}ms")
+
+        print(f"查询 {n_queries} 条, top_k={top_k}:")
+        _summary('exhaustive', exhaustive_times)
+        _summary('maxscore', pruned_times)
+        print(f"  加速比 {sum(exhaustive_times) / sum(pruned_times):.1f}x, 结果不一致 {mismatches} 条")
+        index.close()
+
+
+def test_pruned_search_matches_exhaustive():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = build_index(tmp, 3000)
+        # 缓冲区 + 墓碑也参与
+        for i in range(0, 3000, 7):
+            index.remove(f'doc_{i}')
+        for doc_id, text in generate_corpus(200, seed=3):
+            index.add('extra_' + doc_id, text)
+
+        for query in generate_queries(30):
+            for top_k in (1, 10, 50):
+                assert same_ranking(
+                    index.search(query, top_k=top_k),
+                    index.search_exhaustive(query, top_k=top_k)
+                ), query
+        index.close()
+
+
+def test_pruned_search_with_allowed_ids_and_min_score():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = build_index(tmp, 2000)
+        allowed = {f'doc_{i}' for i in range(0, 2000, 3)}
+        for query in generate_queries(20, seed=11):
+            exhaustive = index.search_exhaustive(query, top_k=10, allowed_ids=allowed)
+            assert same_ranking(index.search(query, top_k=10, allowed_ids=allowed), exhaustive)
+            assert {d for d, _ in exhaustive} <= allowed
+            if exhaustive:
+                floor = exhaustive[len(exhaustive) // 2][1]
+                assert same_ranking(
+                    index.search(query, top_k=10, min_score=floor),
+                    index.search_exhaustive(query, top_k=10, min_score=floor)
+                )
+        index.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='BM25 Top-k 剪枝基准')
+    parser.add_argument('--docs', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--top-k', type=int, default=10)
+    args = parser.parse_args()
+    run_benchmark(args.docs, args.queries, args.top_k)
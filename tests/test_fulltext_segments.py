@@ -0,0 +1,199 @@
+"""FullTextIndex 段式存储测试 (v7.1)
+
+验证：
+1. 缓冲区封段、后台合并、删除墓碑后，BM25 结果与重启后一致
+2. 缓冲日志回放：未封段的新增/删除在重启后仍然可见
+3. 旧版 fulltext_index.json 自动迁移为段
+4. 查询与删除 / 合并并发执行不报错；close() 在进行中的查询结束后才释放段的 mmap
+5. manifest 损坏时不改写 manifest、不删除段，新的写入留在缓冲日志，修复后可回放
+
+使用方法：
+    python -m pytest tests/test_fulltext_segments.py -v -s
+"""
+
+import os
+import sys
+import json
+import random
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.index.fulltext_index import FullTextIndex
+
+
+_WORDS = ['coffee', 'espresso', 'morning', 'friends', 'machine', '咖啡', '早上', '朋友', '机器学习', '自然语言']
+
+
+def _text(rng):
+    return ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(1, 10)))
+
+
+def _small_index(path):
+    index = FullTextIndex(path)
+    index.BUFFER_MAX_DOCS = 20
+    index.MERGE_FACTOR = 3
+    return index
+
+
+def test_segments_merge_and_reload():
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = _small_index(tmp)
+        for i in range(300):
+            index.add(f'doc_{i}', _text(rng))
+        for i in range(0, 300, 4):
+            index.remove(f'doc_{i}')
+        index.add('doc_1', 'coffee coffee coffee')
+        index.wait_for_merges()
+
+        stats = index.get_stats()
+        assert stats['doc_count'] == 225
+        assert stats['segments'] < 300 // 20
+        expected = index.search('coffee 咖啡', top_k=50)
+        everything = {d for d, _ in index.search('coffee 咖啡', top_k=300)}
+        assert 'doc_1' in everything and 'doc_4' not in everything
+
+        reopened = FullTextIndex(tmp)
+        assert reopened.count() == 225
+        assert reopened.search('coffee 咖啡', top_k=50) == expected
+        assert reopened.get_doc_length('doc_1') == 3
+        index.close()
+        reopened.close()
+
+
+def test_buffer_log_replay():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = FullTextIndex(tmp)
+        index.add('a', 'espresso machine')
+        index.add('b', 'espresso with friends')
+        index.remove('a')
+        index.flush()
+
+        reopened = FullTextIndex(tmp)
+        assert [d for d, _ in reopened.search('espresso')] == ['b']
+        assert reopened.get_stats()['segments'] == 0
+
+        reopened.close()
+        assert FullTextIndex(tmp).get_stats()['segments'] == 1
+
+
+def test_legacy_json_is_migrated():
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = os.path.join(tmp, 'indexes')
+        os.makedirs(index_dir)
+        legacy = {
+            'version': '4.0',
+            'doc_count': 2,
+            'avg_doc_length': 2.0,
+            'total_doc_length': 4,
+            'inverted_index': {'coffee': {'m1': 1}, 'tea': {'m1': 1, 'm2': 2}},
+            'doc_info': {'m1': {'length': 2, 'terms': ['coffee', 'tea']}, 'm2': {'length': 2, 'terms': ['tea']}},
+            'doc_freq': {'coffee': 1, 'tea': 2},
+            'config': {'k1': 1.2, 'b': 0.75, 'delta': 0.0},
+        }
+        with open(os.path.join(index_dir, 'fulltext_index.json'), 'w', encoding='utf-8') as f:
+            json.dump(legacy, f)
+
+        index = FullTextIndex(tmp)
+        assert index.count() == 2
+        assert index.config.k1 == 1.2
+        assert [d for d, _ in index.search('coffee')] == ['m1']
+        assert [d for d, _ in index.search('tea')] == ['m2', 'm1']
+        assert not os.path.exists(os.path.join(index_dir, 'fulltext_index.json'))
+
+
+def test_corrupt_manifest_is_not_overwritten():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = FullTextIndex(tmp)
+        index.add('a', 'espresso machine')
+        index.add('b', 'espresso with friends')
+        index.close()
+        manifest = index.manifest_file
+        with open(manifest, 'rb') as f:
+            good = f.read()
+        segments = sorted(os.listdir(index.segment_dir))
+        with open(manifest, 'wb') as f:
+            f.write(good[:len(good) // 2])  # 写到一半的 manifest
+
+        broken = FullTextIndex(tmp)
+        assert broken.get_stats()['load_error']
+        broken.add('c', 'espresso again')
+        broken.close()
+        with open(manifest, 'rb') as f:
+            assert f.read() == good[:len(good) // 2]
+        assert sorted(os.listdir(index.segment_dir)) == segments
+
+        with open(manifest, 'wb') as f:
+            f.write(good)
+        repaired = FullTextIndex(tmp)
+        assert {d for d, _ in repaired.search('espresso')} == {'a', 'b', 'c'}
+        repaired.close()
+
+
+def test_search_concurrent_with_removes():
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = _small_index(tmp)
+        for i in range(400):
+            index.add(f'doc_{i}', _text(rng))
+        index._save()
+        errors = []
+        done = threading.Event()
+
+        def reader():
+            while not done.is_set():
+                try:
+                    index.search('coffee 咖啡 朋友', top_k=20)
+                    index.search_exhaustive('espresso morning', top_k=20)
+                except Exception as e:  # 旧实现: Set changed size during iteration
+                    errors.append(e)
+                    return
+
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        for t in readers:
+            t.start()
+        for i in range(400):
+            index.remove(f'doc_{i}')
+            if i % 50 == 0:
+                index._save()
+        done.set()
+        for t in readers:
+            t.join()
+        index.wait_for_merges()
+        assert errors == []
+        assert index.count() == 0
+        index.close()
+
+
+def test_query_plan_snapshots_tombstones():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = FullTextIndex(tmp)
+        for i in range(5):
+            index.add(f'd{i}', 'espresso machine')
+        index._save()
+        index.remove('d0')
+        plan = index._plan_query('espresso', None)
+        index.remove('d1')  # 查询进行中的删除不影响已取的快照
+        assert plan.tombstones[plan.segments[0].segment_id] == frozenset({0})
+        index._release_plan(plan)
+        assert len(index.search('espresso')) == 3
+        index.close()
+
+
+def test_close_waits_for_inflight_query():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = FullTextIndex(tmp)
+        index.add('a', 'espresso machine')
+        index.add('b', 'espresso with friends')
+        index._save()
+        plan = index._plan_query('espresso', None)  # 模拟进行中的查询
+        index.close()
+        seg = plan.segments[0]
+        assert seg.posting_docs is not None
+        scores = {}
+        index._accumulate(plan, plan.terms[0], scores)
+        assert len(scores) == 2
+        index._release_plan(plan)
+        assert seg.posting_docs is None  # 最后一个读者释放后关闭
@@ -0,0 +1,246 @@
+"""LLMClient 连接复用 + 响应缓存测试 (v7.1)
+
+验证（对接本地伪 OpenAI 兼容 HTTP 服务）：
+1. 同步：相同配置的多个 LLMClient 共享一个 SDK 客户端，多次调用只建立一条 TCP 连接
+2. 异步：achat 复用当前事件循环中的客户端（旧实现每次调用新建客户端和连接）
+3. 异步调用对临时错误重试
+4. 响应缓存：相同请求第二次不访问服务；temperature 不同则未命中；
+   缓存持久化到 SQLite，过期 / 超出容量的条目被淘汰
+5. 基准：每次调用新建 AsyncOpenAI（旧实现）与复用客户端的延迟对比
+
+使用方法：
+    python -m pytest tests/test_llm_client_pool.py -v -s
+    python tests/test_llm_client_pool.py --calls 200
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('openai')
+
+from recall.utils import llm_client as llm_client_module
+from recall.utils.llm_client import LLMClient, _CLIENT_POOL
+from recall.utils.llm_cache import LLMResponseCache
+
+
+class _FakeOpenAI:
+    """本地伪 OpenAI 兼容服务：记录连接数与请求数，可注入失败"""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+        self.fail_next = 0
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                with fake._lock:
+                    fake.requests += 1
+                    fail = fake.fail_next > 0
+                    fake.fail_next -= 1 if fail else 0
+                if fail:
+                    payload, status = {'error': {'message': 'temporarily unavailable'}}, 503
+                else:
+                    payload, status = {
+                        'id': f'chatcmpl-{fake.requests}', 'object': 'chat.completion', 'created': 0,
+                        'model': body['model'],
+                        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {
+                            'role': 'assistant', 'content': 'echo: ' + body['messages'][-1]['content']}}],
+                        'usage': {'prompt_tokens': 3, 'completion_tokens': 2, 'total_tokens': 5},
+                    }, 200
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}/v1'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_api():
+    _CLIENT_POOL.clear()
+    api = _FakeOpenAI()
+    yield api
+    api.close()
+    _CLIENT_POOL.clear()
+
+
+def _client(api, **kwargs):
+    return LLMClient(model='fake-model', api_key='sk-test', api_base=api.base_url, timeout=5.0, **kwargs)
+
+
+def _ask(text):
+    return [{'role': 'user', 'content': text}]
+
+
+def test_sync_clients_share_connection(fake_api):
+    first, second = _client(fake_api), _client(fake_api)
+    for i in range(5):
+        assert first.chat(_ask(f'q{i}'), max_tokens=10).content == f'echo: q{i}'
+        second.chat(_ask(f'r{i}'), max_tokens=10)
+    assert first.client is second.client
+    assert fake_api.requests == 10
+    assert fake_api.connections == 1
+
+
+def test_async_calls_reuse_client(fake_api):
+    client = _client(fake_api)
+
+    async def scenario():
+        for i in range(5):
+            response = await client.achat(_ask(f'a{i}'), max_tokens=10)
+            assert response.content == f'echo: a{i}'
+        return client._async_client()
+
+    pooled = asyncio.run(scenario())
+    assert fake_api.requests == 5 and fake_api.connections == 1
+
+    # 新的事件循环：旧循环的客户端被丢弃，新建一个
+    assert asyncio.run(scenario()) is not pooled
+    assert len(_CLIENT_POOL._async) == 1
+
+
+def test_async_retries_transient_errors(fake_api, monkeypatch):
+    def no_wait(error, attempt, max_retries):
+        if attempt == max_retries - 1:
+            raise error
+        return 0
+
+    client = _client(fake_api)
+    monkeypatch.setattr(llm_client_module, '_retry_delay', no_wait)
+    fake_api.fail_next = 3  # SDK 自身重试 2 次后抛出，由 achat 再重试
+
+    async def scenario():
+        return await client.achat(_ask('retry'), max_tokens=10)
+
+    assert asyncio.run(scenario()).content == 'echo: retry'
+
+
+def test_response_cache_hits_and_persistence(fake_api):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'llm_responses.db')
+        client = _client(fake_api, cache=LLMResponseCache(path))
+        first = client.chat(_ask('summarize'), max_tokens=50, temperature=0)
+        second = client.chat(_ask('summarize'), max_tokens=50, temperature=0)
+        assert not first.cached and second.cached
+        assert second.content == first.content and second.usage == first.usage
+        assert fake_api.requests == 1
+
+        client.chat(_ask('summarize'), max_tokens=50, temperature=0.5)  # 参数不同：未命中
+        assert fake_api.requests == 2
+
+        async def async_call():
+            return await client.achat(_ask('summarize'), max_tokens=50, temperature=0)
+
+        assert asyncio.run(async_call()).cached  # 同步 / 异步共享缓存
+        client.cache.close()
+
+        reopened = _client(fake_api, cache=LLMResponseCache(path))
+        assert reopened.chat(_ask('summarize'), max_tokens=50, temperature=0).cached
+        assert fake_api.requests == 2
+        assert reopened.cache.stats()['hits'] == 1
+        reopened.cache.close()
+
+
+def test_cache_ttl_and_capacity():
+    cache = LLMResponseCache(ttl_seconds=0.05, max_entries=10)
+    key = LLMResponseCache.make_key('openai', 'm', _ask('x'), 0, 10)
+    assert key == LLMResponseCache.make_key('openai', 'm', _ask('x'), 0, 10, stop=None)
+    assert key != LLMResponseCache.make_key('openai', 'm', _ask('x'), 0, 10, stop=['\n'])
+    cache.put(key, 'v', 'm', {})
+    assert cache.get(key) == ('v', 'm', {})
+    time.sleep(0.06)
+    assert cache.get(key) is None
+
+    cache = LLMResponseCache(ttl_seconds=0, max_entries=10)
+    for i in range(25):
+        cache.put(f'k{i}', f'v{i}', 'm', {})
+    assert cache.stats()['entries'] <= 11
+    assert cache.get('k24') is not None and cache.get('k0') is None
+
+
+def run_benchmark(n_calls=100, concurrency=8):
+    from openai import AsyncOpenAI
+
+    api = _FakeOpenAI()
+    _CLIENT_POOL.clear()
+    client = _client(api)
+    results = {}
+    try:
+        async def legacy_call(i):
+            fresh = AsyncOpenAI(api_key='sk-test', base_url=api.base_url, timeout=5.0)
+            await fresh.chat.completions.create(model='fake-model', messages=_ask(f'b{i}'), max_tokens=10)
+            await fresh.close()
+
+        async def pooled_call(i):
+            await client.achat(_ask(f'b{i}'), max_tokens=10)
+
+        for name, call in (('new client per call', legacy_call), ('pooled client', pooled_call)):
+            async def scenario():
+                semaphore = asyncio.Semaphore(concurrency)
+
+                async def one(i):
+                    async with semaphore:
+                        await call(i)
+
+                await asyncio.gather(*(one(i) for i in range(n_calls)))
+
+            connections = api.connections
+            started = time.perf_counter()
+            asyncio.run(scenario())
+            elapsed = time.perf_counter() - started
+            results[name] = {'ms_per_call': elapsed / n_calls * 1000, 'connections': api.connections - connections}
+    finally:
+        api.close()
+        _CLIENT_POOL.clear()
+
+    print(f"\nLLM 异步调用基准: {n_calls} 次调用, 并发 {concurrency}（本地伪服务）")
+    for name, r in results.items():
+        print(f"  {name:20s} {r['ms_per_call']:7.2f} ms/次  {r['connections']:4d} 个 TCP 连接")
+    return results
+
+
+def test_llm_client_pool_benchmark_small():
+    results = run_benchmark(40, concurrency=4)
+    assert results['pooled client']['connections'] <= 4
+    assert results['new client per call']['connections'] == 40
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='LLM 客户端连接复用基准')
+    parser.add_argument('--calls', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+    run_benchmark(args.calls, args.concurrency)
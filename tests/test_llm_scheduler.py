@@ -0,0 +1,433 @@
+"""LLM 调用调度器测试 (v7.1)
+
+验证（对接本地伪 OpenAI 兼容 HTTP 服务，可设置响应延迟、记录峰值并发）：
+1. 单飞：并发发出的相同请求（同步 / 异步）只访问一次服务，结果共享
+2. 并发上限：同步线程与异步协程的峰值并发都不超过 max_concurrency
+3. token 预算：令牌桶不足时等待补足，异步等待不阻塞事件循环
+4. 重试：退避期间释放并发槽位，其它请求照常执行；客户端不再 time.sleep
+5. 微批：去重确认的多对项目（含其它线程窗口期内提交的）打包成一次调用；
+   回答缺失的序号逐对补问
+6. 基准：模拟并发导入（重复的抽取请求 + 去重确认）前后的请求数与耗时
+
+使用方法：
+    python -m pytest tests/test_llm_scheduler.py -v -s
+    python tests/test_llm_scheduler.py --writers 8 --calls 64
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('openai')
+
+from recall.utils.llm_client import LLMClient, LLMResponse, _CLIENT_POOL
+from recall.utils.llm_scheduler import LLMCallScheduler
+from recall.processor.three_stage_deduplicator import (
+    ThreeStageDeduplicator, DedupConfig, DedupItem, DedupResult
+)
+
+_PAIR_LINE = re.compile(r'(\d+)\. 实体 A：(.+?) \| 实体 B：(.+)')
+_SINGLE_PAIR = re.compile(r'实体 A：(.+)\n实体 B：(.+)')
+
+
+def _same(a, b):
+    return a.split(':')[0].strip().lower() == b.split(':')[0].strip().lower()
+
+
+class _StubProvider:
+    """本地伪 OpenAI 兼容服务：记录请求数与峰值并发；能回答单对 / 打包的去重确认"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+        self.drop_answers = 0  # 打包回答中省略最后几组
+        self.prompts = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                prompt = body['messages'][-1]['content']
+                with stub._lock:
+                    stub.requests += 1
+                    stub.active += 1
+                    stub.peak = max(stub.peak, stub.active)
+                    stub.prompts.append(prompt)
+                try:
+                    if stub.delay:
+                        time.sleep(stub.delay)
+                    content = stub.answer(prompt)
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+                data = json.dumps({
+                    'id': 'chatcmpl-stub', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': content}}],
+                    'usage': {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15},
+                }).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}/v1'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def answer(self, prompt):
+        pairs = _PAIR_LINE.findall(prompt)
+        if pairs:
+            lines = [f"{n}: {'YES' if _same(a, b) else 'NO'}" for n, a, b in pairs]
+            return '\n'.join(lines[:len(lines) - self.drop_answers])
+        single = _SINGLE_PAIR.search(prompt)
+        if single:
+            return 'YES' if _same(*single.groups()) else 'NO'
+        return 'echo: ' + prompt
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    _CLIENT_POOL.clear()
+    provider = _StubProvider(delay=0.1)
+    yield provider
+    provider.close()
+    _CLIENT_POOL.clear()
+
+
+def _client(provider, scheduler=None):
+    return LLMClient(model='stub-model', api_key='sk-test', api_base=provider.base_url,
+                     timeout=5.0, scheduler=scheduler)
+
+
+def _ask(text):
+    return [{'role': 'user', 'content': text}]
+
+
+def _run_threads(n, target):
+    results = [None] * n
+
+    def run(i):
+        results[i] = target(i)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_single_flight_sync_and_async(stub):
+    scheduler = LLMCallScheduler()
+    client = _client(stub, scheduler)
+    results = _run_threads(8, lambda i: client.chat(_ask('same prompt'), max_tokens=10, temperature=0).content)
+    assert results == ['echo: same prompt'] * 8
+    assert stub.requests == 1
+
+    async def scenario():
+        same = [client.achat(_ask('async prompt'), max_tokens=10, temperature=0) for _ in range(5)]
+        other = [client.achat(_ask(f'other {i}'), max_tokens=10, temperature=0) for i in range(3)]
+        return await asyncio.gather(*same, *other)
+
+    responses = asyncio.run(scenario())
+    assert [r.content for r in responses[:5]] == ['echo: async prompt'] * 5
+    assert stub.requests == 1 + 1 + 3
+
+    stats = scheduler.stats()
+    assert stats['requests'] == 16 and stats['coalesced'] == 11
+    assert stats['coalesce_rate'] == pytest.approx(11 / 16)
+    assert stats['in_flight'] == 0
+
+    # 关闭单飞：每个调用都发送
+    plain = _client(stub, LLMCallScheduler(single_flight=False))
+    before = stub.requests
+    _run_threads(4, lambda i: plain.chat(_ask('same prompt'), max_tokens=10, temperature=0))
+    assert stub.requests - before == 4
+
+
+def test_leader_error_propagates_to_followers():
+    scheduler = LLMCallScheduler()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.05)
+        raise RuntimeError('provider down')
+
+    def call(i):
+        if i:
+            started.wait()
+        try:
+            scheduler.call('openai', 'k', failing)
+        except RuntimeError as e:
+            return str(e)
+
+    assert _run_threads(4, call) == ['provider down'] * 4
+    assert scheduler.stats()['in_flight'] == 0
+    assert scheduler.call('openai', 'k', lambda: 'ok') == 'ok'  # 失败后不残留
+
+
+def test_concurrency_cap_sync_and_async(stub):
+    client = _client(stub, LLMCallScheduler(max_concurrency=2))
+    _run_threads(8, lambda i: client.chat(_ask(f'sync {i}'), max_tokens=10))
+    assert stub.requests == 8 and stub.peak <= 2
+
+    stub.peak = 0
+
+    async def scenario():
+        await asyncio.gather(*(client.achat(_ask(f'async {i}'), max_tokens=10) for i in range(8)))
+
+    asyncio.run(scenario())
+    assert stub.requests == 16 and stub.peak <= 2
+    assert client.scheduler.stats()['throttled'] >= 6
+
+
+def test_token_budget_waits_without_blocking_loop():
+    scheduler = LLMCallScheduler(max_concurrency=0, tokens_per_minute=60000)  # 1000 token/s
+
+    def spend(total):
+        return lambda: LLMResponse(content='', model='m', usage={'total_tokens': total}, latency_ms=0)
+
+    scheduler.call('openai', None, spend(60000), tokens=60000)  # 耗尽令牌桶
+    started = time.perf_counter()
+    scheduler.call('openai', None, spend(100), tokens=100)
+    assert time.perf_counter() - started >= 0.08
+    assert scheduler.stats()['throttled'] == 1
+
+    # 实际 usage 少于预估：多退
+    scheduler.call('anthropic', None, spend(10), tokens=60000)
+    started = time.perf_counter()
+    scheduler.call('anthropic', None, spend(10), tokens=5)
+    assert time.perf_counter() - started < 0.05
+
+    async def scenario():
+        scheduler.call('google', None, spend(60000), tokens=60000)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.ensure_future(ticker())
+        async def request():
+            return spend(200)()
+
+        await scheduler.acall('google', None, request, tokens=200)
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 10  # 等待约 0.2 秒期间事件循环照常运行
+
+
+def test_retry_backoff_releases_slot():
+    scheduler = LLMCallScheduler(max_concurrency=1)
+    failed = threading.Event()
+    finished = {}
+
+    def flaky():
+        if not failed.is_set():
+            failed.set()
+            raise RuntimeError('429 Too Many Requests')
+        return 'a'
+
+    def call(i):
+        started = time.perf_counter()
+        if i == 0:
+            result = scheduler.call('openai', None, flaky, retry=lambda error, attempt: 0.3)
+        else:
+            failed.wait()
+            result = scheduler.call('openai', None, lambda: 'b')
+        finished[i] = time.perf_counter() - started
+        return result
+
+    assert _run_threads(2, call) == ['a', 'b']
+    assert finished[0] >= 0.3
+    assert finished[1] < 0.2  # 退避期间唯一的槽位已释放，不必等重试结束
+    stats = scheduler.stats()
+    assert stats['retries'] == 1 and stats['active'] == {'openai': 0}
+
+    # 不再重试时抛出策略给出的异常；槽位同样归还
+    def give_up(error, attempt):
+        raise RuntimeError(f'gave up after {attempt + 1}')
+
+    with pytest.raises(RuntimeError, match='gave up after 1'):
+        scheduler.call('openai', 'k', lambda: 1 / 0, retry=give_up)
+    assert scheduler.stats()['active'] == {'openai': 0} and scheduler.stats()['in_flight'] == 0
+
+    async def scenario():
+        attempts = []
+
+        async def flaky_async():
+            attempts.append(time.perf_counter())
+            if len(attempts) == 1:
+                raise RuntimeError('429')
+            return 'ok'
+
+        async def other():
+            await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            await scheduler.acall('openai', None, lambda: asyncio.sleep(0, 'other'))
+            return time.perf_counter() - started
+
+        return await asyncio.gather(
+            scheduler.acall('openai', None, flaky_async, retry=lambda error, attempt: 0.3), other()
+        ), attempts
+
+    (result, other_wait), attempts = asyncio.run(scenario())
+    assert result == 'ok' and other_wait < 0.2
+    assert attempts[1] - attempts[0] >= 0.3
+
+
+def test_client_retries_through_scheduler(stub, monkeypatch):
+    client = _client(stub, LLMCallScheduler(max_concurrency=1))
+    send = client._chat_openai_once
+    calls = []
+
+    def flaky(*args, **kwargs):
+        calls.append(time.perf_counter())
+        if len(calls) == 1:
+            raise RuntimeError('connection reset')
+        return send(*args, **kwargs)
+
+    stub.delay = 0  # 伪服务不再 sleep，下面的 time.sleep 只可能来自客户端
+    monkeypatch.setattr(client, '_chat_openai_once', flaky)
+    monkeypatch.setattr(time, 'sleep', lambda seconds: pytest.fail('重试不应 time.sleep'))
+    assert client.chat(_ask('flaky'), max_tokens=10).content == 'echo: flaky'
+    assert len(calls) == 2 and calls[1] - calls[0] >= 0.9  # 普通错误退避 1 秒
+    assert client.scheduler.stats()['retries'] == 1
+
+
+def _pairs(n, offset=0):
+    pairs = []
+    for i in range(n):
+        j = i + offset
+        name_b = f'Entity{j}' if j % 2 == 0 else f'Other{j}'
+        pairs.append((DedupItem(id=f'n{j}', name=f'Entity{j}'), DedupItem(id=f'e{j}', name=name_b)))
+    return pairs
+
+
+def _confirm(deduplicator, pairs):
+    result = DedupResult()
+    for item, candidate in pairs:
+        result.add_pending(item, [candidate])
+    deduplicator._llm_batch_confirm(result)
+    return {m.new_item.id for m in result.matches}, {item.id for item in result.new_items}
+
+
+def test_dedup_confirmations_are_packed(stub):
+    stub.delay = 0
+    scheduler = LLMCallScheduler(batch_max_items=8)
+    deduplicator = ThreeStageDeduplicator(DedupConfig(llm_enabled=True), llm_client=_client(stub, scheduler))
+
+    matched, new = _confirm(deduplicator, _pairs(5))
+    assert matched == {'n0', 'n2', 'n4'} and new == {'n1', 'n3'}
+    assert stub.requests == 1
+
+    # 回答缺失的序号逐对补问
+    stub.drop_answers = 2
+    matched, new = _confirm(deduplicator, _pairs(5, offset=10))
+    assert matched == {'n10', 'n12', 'n14'} and new == {'n11', 'n13'}
+    assert stub.requests == 1 + 1 + 2
+
+    # 未启用打包：逐对调用（旧行为）
+    plain = ThreeStageDeduplicator(DedupConfig(llm_enabled=True), llm_client=_client(stub, LLMCallScheduler()))
+    before = stub.requests
+    matched, _ = _confirm(plain, _pairs(3, offset=20))
+    assert matched == {'n20', 'n22'} and stub.requests - before == 3
+
+
+def test_dedup_batches_across_threads(stub):
+    stub.delay = 0
+    scheduler = LLMCallScheduler(batch_max_items=8, batch_window_ms=300)
+    deduplicator = ThreeStageDeduplicator(DedupConfig(llm_enabled=True), llm_client=_client(stub, scheduler))
+
+    results = _run_threads(4, lambda i: _confirm(deduplicator, _pairs(2, offset=i * 2)))
+    assert set().union(*(matched for matched, _ in results)) == {'n0', 'n2', 'n4', 'n6'}
+    assert stub.requests == 1  # 8 对凑满一批，提前执行
+    stats = scheduler.stats()
+    assert stats['batches'] == 1 and stats['batched_items'] == 8 and stats['llm_calls_saved'] == 7
+
+
+def run_benchmark(n_writers=8, n_calls=64, duplicate_every=4, dedup_pairs=4, delay=0.05):
+    """n_writers 个线程模拟并发导入：每条抽取请求每 duplicate_every 条重复一次，另各自确认 dedup_pairs 对"""
+    results = {}
+    for name, scheduler in (
+        ('no scheduler', None),
+        ('scheduler', LLMCallScheduler(max_concurrency=8, batch_max_items=16, batch_window_ms=20)),
+    ):
+        _CLIENT_POOL.clear()
+        provider = _StubProvider(delay=delay)
+        client = _client(provider, scheduler)
+        deduplicator = ThreeStageDeduplicator(DedupConfig(llm_enabled=True), llm_client=client)
+        try:
+            def writer(w):
+                for i in range(w, n_calls, n_writers):
+                    client.chat(_ask(f'extract entities from chunk {i // duplicate_every}'),
+                                max_tokens=50, temperature=0)
+                _confirm(deduplicator, _pairs(dedup_pairs, offset=w * dedup_pairs))
+
+            started = time.perf_counter()
+            _run_threads(n_writers, writer)
+            elapsed = time.perf_counter() - started
+            results[name] = {
+                'requests': provider.requests,
+                'peak': provider.peak,
+                'seconds': elapsed,
+                'stats': scheduler.stats() if scheduler else None,
+            }
+        finally:
+            provider.close()
+    _CLIENT_POOL.clear()
+
+    logical = n_calls + n_writers * dedup_pairs
+    print(f"\nLLM 调度基准: {n_writers} 个写入线程, {logical} 次逻辑调用（服务延迟 {delay * 1000:.0f} ms）")
+    for name, r in results.items():
+        print(f"  {name:14s} {r['requests']:4d} 次请求  峰值并发 {r['peak']:3d}  {r['seconds'] * 1000:8.1f} ms")
+    stats = results['scheduler']['stats']
+    print(f"  单飞合并率 {stats['coalesce_rate']:.1%}，打包 {stats['batched_items']} 条 → {stats['batches']} 批，"
+          f"共省下 {stats['llm_calls_saved']} 次调用")
+    return results
+
+
+def test_llm_scheduler_benchmark_small():
+    results = run_benchmark(n_writers=4, n_calls=16, duplicate_every=4, dedup_pairs=2, delay=0.02)
+    assert results['no scheduler']['requests'] == 16 + 8
+    assert results['scheduler']['requests'] < results['no scheduler']['requests']
+    assert results['scheduler']['peak'] <= 8
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='LLM 调用调度基准')
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--calls', type=int, default=64)
+    parser.add_argument('--dedup-pairs', type=int, default=4)
+    parser.add_argument('--delay-ms', type=float, default=50)
+    args = parser.parse_args()
+    run_benchmark(args.writers, args.calls, dedup_pairs=args.dedup_pairs, delay=args.delay_ms / 1000)
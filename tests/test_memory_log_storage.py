@@ -0,0 +1,178 @@
+"""ScopedMemory 追加式日志存储测试 (v7.1)
+
+验证：
+1. log 模式重启后通过「快照 + 日志尾部」重放得到与写入时完全一致的状态
+2. 后台压缩前后、压缩中途崩溃（残留日志段）时重放幂等
+3. json ↔ log 模式互相迁移不丢数据
+4. log 模式下引擎重启后，检索器的内容 / 元数据缓存从快照 + 日志恢复（memories.json 已不存在）
+5. 基准：log 模式 adds/sec 不随作用域规模增长而下降（json 模式为 O(n) 重写）
+
+使用方法：
+    python -m pytest tests/test_memory_log_storage.py -v -s
+"""
+
+import os
+import sys
+import time
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.storage.multi_tenant import ScopedMemory, MemoryScope
+from recall.storage.memory_log import MemoryLog
+
+
+def _scoped(path, mode='log', threshold=2000, fsync=False):
+    return ScopedMemory(path, MemoryScope(), storage_mode=mode,
+                        log_compact_threshold=threshold, log_fsync=fsync)
+
+
+def _state(scoped):
+    return [(m['content'], m['metadata'].get('id'), m['metadata'].get('tag'))
+            for m in scoped.get_all()]
+
+
+def test_log_mode_replay_after_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        s = _scoped(tmp)
+        for i in range(20):
+            s.add(f'memory {i}', {'id': f'm{i}'})
+        assert s.delete('m3')
+        assert s.update('m5', 'memory 5 updated', {'tag': 'edited'})
+        expected = _state(s)
+        s.close()
+
+        assert not os.path.exists(os.path.join(tmp, 'memories.json'))
+        reloaded = _scoped(tmp)
+        assert _state(reloaded) == expected
+        assert reloaded.get_content_by_id('m5') == 'memory 5 updated'
+        assert reloaded.get_content_by_id('m3') is None
+        reloaded.close()
+
+
+def test_log_mode_compaction_and_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        s = _scoped(tmp, threshold=50)
+        s.MAX_MEMORIES = 100
+        for i in range(250):
+            s.add(f'memory {i}', {'id': f'm{i}'})
+        s.delete('m240')
+        s.close()
+        assert s.count() == 99
+        expected = _state(s)
+
+        # 压缩后快照存在，日志段已被清理
+        assert os.path.exists(os.path.join(tmp, MemoryLog.SNAPSHOT_FILE))
+        reloaded = _scoped(tmp, threshold=50)
+        reloaded.MAX_MEMORIES = 100
+        assert _state(reloaded) == expected
+        reloaded.close()
+
+
+def test_log_replay_is_idempotent_with_stale_segments():
+    """模拟「快照已写入、日志段尚未删除」时崩溃：重放不得重复应用记录"""
+    with tempfile.TemporaryDirectory() as tmp:
+        s = _scoped(tmp)
+        for i in range(10):
+            s.add(f'memory {i}', {'id': f'm{i}'})
+        s.flush()
+        expected = _state(s)
+        s.close()
+
+        # 残留一个已被快照覆盖的日志段，末尾带一行写了一半的记录
+        seg = os.path.join(tmp, f'memories.{5:012d}{MemoryLog.SEGMENT_SUFFIX}')
+        with open(seg, 'w', encoding='utf-8') as f:
+            f.write('{"seq": 1, "op": "add", "memory": {"content": "dup", "metadata": {}}}\n')
+            f.write('{"seq": 2, "op": "add", "memory": {"content": "tor')
+        reloaded = _scoped(tmp)
+        assert _state(reloaded) == expected
+        reloaded.close()
+
+
+def test_json_log_migration_roundtrip():
+    with tempfile.TemporaryDirectory() as tmp:
+        s = _scoped(tmp, mode='json')
+        for i in range(5):
+            s.add(f'memory {i}', {'id': f'm{i}'})
+        expected = _state(s)
+
+        # json → log：旧 memories.json 作为初始状态压缩为快照
+        s2 = _scoped(tmp, mode='log')
+        assert _state(s2) == expected
+        assert not os.path.exists(os.path.join(tmp, 'memories.json'))
+        s2.add('memory 5', {'id': 'm5'})
+        expected = _state(s2)
+        s2.close()
+
+        # log → json：重放日志后写回 memories.json 并清理日志文件
+        s3 = _scoped(tmp, mode='json')
+        assert _state(s3) == expected
+        assert os.path.exists(os.path.join(tmp, 'memories.json'))
+        assert not MemoryLog(tmp).exists()
+
+
+def test_engine_restart_restores_caches_in_log_mode(monkeypatch):
+    from recall.engine import RecallEngine
+
+    monkeypatch.setenv('MEMORY_STORAGE_MODE', 'log')
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = RecallEngine(data_root=tmp, lite=True, auto_warmup=False)
+        ids = [engine.add(f'第 {i} 条日志模式记忆，地点是东京', user_id='log_user',
+                          metadata={'tag': f't{i}'}, check_consistency=False).id for i in range(3)]
+        engine.close()
+        scope_dir = os.path.join(tmp, 'data', 'log_user', 'default', 'default')
+        assert MemoryLog(scope_dir).exists()
+        assert not os.path.exists(os.path.join(scope_dir, 'memories.json'))
+
+        restarted = RecallEngine(data_root=tmp, lite=True, auto_warmup=False)
+        try:
+            for i, mid in enumerate(ids):
+                assert restarted.retriever._get_metadata(mid).get('tag') == f't{i}'
+                assert '日志模式记忆' in restarted.retriever._content_cache[mid]
+        finally:
+            restarted.close()
+
+
+def _adds_per_sec(scoped, start, count):
+    t0 = time.perf_counter()
+    for i in range(start, start + count):
+        scoped.add(f'benchmark memory number {i} ' * 4, {'id': f'b{i}', 'entities': ['A', 'B']})
+    return count / (time.perf_counter() - t0)
+
+
+def test_benchmark_adds_per_sec_flat():
+    """log 模式吞吐在 0→5000 条记忆之间基本持平；json 模式随规模线性下降"""
+    bucket = 500
+    with tempfile.TemporaryDirectory() as tmp:
+        s = _scoped(tmp, mode='log')
+        # 先填满工作记忆（容量 200，之后其淘汰开销恒定）
+        for i in range(s.working_memory.capacity):
+            s.working_memory.update_with_delta_rule({'name': f'warmup {i}'})
+        rates = [_adds_per_sec(s, k * bucket, bucket) for k in range(10)]
+        s.close()
+    print('\n  [log]  adds/sec per 500: ' + ', '.join(f'{r:,.0f}' for r in rates))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        s = _scoped(tmp, mode='json')
+        # json 模式逐条添加到 4500 太慢，直接构造大作用域后落盘一次
+        for i in range(4500):
+            s._memories.append({'content': f'benchmark memory number {i} ' * 4,
+                                'metadata': {'id': f'j{i}'}, 'timestamp': 0})
+        s._rebuild_index()
+        json_late = _adds_per_sec(s, 0, 20)
+    print(f'  [json] adds/sec @4500: {json_late:,.0f}')
+
+    early = statistics.median(rates[:3])
+    late = statistics.median(rates[-3:])
+    assert late >= early * 0.5, f'log 模式吞吐随规模下降过多: {early:.0f} → {late:.0f} adds/sec'
+    assert late > json_late, 'log 模式在大作用域下应快于 json 整体重写'
+
+
+if __name__ == '__main__':
+    test_log_mode_replay_after_restart()
+    test_log_mode_compaction_and_eviction()
+    test_log_replay_is_idempotent_with_stale_segments()
+    test_json_log_migration_roundtrip()
+    test_benchmark_adds_per_sec_flat()
+    print('\n=== 测试通过! ===')
@@ -0,0 +1,129 @@
+"""MinHash/LSH 向量化签名测试与微基准 (v7.1)
+
+验证：
+1. 向量化签名与纯 Python 路径逐位一致，signature(text) == minhash(get_shingles(text))
+2. LSH 分带键不依赖 PYTHONHASHSEED（跨进程稳定）
+3. 签名索引 save_index/load_index 往返后模糊匹配仍然命中，且不重新计算 MinHash
+
+使用方法：
+    python -m pytest tests/test_minhash_benchmark.py -v -s
+
+微基准（旧实现 vs 向量化，签名/秒）：
+    python tests/test_minhash_benchmark.py
+"""
+
+import os
+import sys
+import time
+import random
+import hashlib
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.processor.three_stage_deduplicator import (
+    MinHasher, LSHIndex, ThreeStageDeduplicator, DedupConfig, DedupItem, MatchType, band_key, HAS_NUMPY
+)
+
+
+_CHARS = '记忆系统角色剧情设定世界观主线伏笔冒险魔法王国骑士龙城堡森林abcdefghijklmnopqrstuvwxyz '
+
+
+def _texts(n, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choices(_CHARS, k=rng.randint(20, 300))) for _ in range(n)]
+
+
+def _legacy_minhash(hasher, shingles):
+    """v7.1 之前的实现：每个 shingle 一次 md5，再在 Python 中循环全部排列"""
+    signature = [hasher.max_hash] * hasher.num_perm
+    for shingle in shingles:
+        h = int(hashlib.md5(shingle.encode()).hexdigest(), 16) % hasher.max_hash
+        for i in range(hasher.num_perm):
+            signature[i] = min(signature[i], (hasher.a[i] * h + hasher.b[i]) % hasher.max_hash)
+    return signature
+
+
+@pytest.mark.skipif(not HAS_NUMPY, reason="需要 numpy")
+def test_vectorized_matches_python_path():
+    vectorized = MinHasher()
+    fallback = MinHasher()
+    fallback._vectorized = False
+    for text in _texts(50) + ['', 'ab', 'Hello World', '  中文  ']:
+        expected = fallback.minhash(fallback.get_shingles(text))
+        assert vectorized.minhash(vectorized.get_shingles(text)) == expected
+        assert vectorized.signature(text) == expected
+        assert fallback.signature(text) == expected
+
+
+def test_signatures_estimate_jaccard():
+    hasher = MinHasher()
+    base = '用户喜欢在早上喝咖啡，尤其是手冲的埃塞俄比亚豆子'
+    similar = hasher.jaccard_from_signatures(hasher.signature(base), hasher.signature(base + '。'))
+    different = hasher.jaccard_from_signatures(hasher.signature(base), hasher.signature('今天的天气非常适合去爬山'))
+    assert similar > 0.8
+    assert different < 0.2
+
+
+def test_band_keys_are_stable_across_processes():
+    # 固定值：分带键只取决于签名内容，与 PYTHONHASHSEED、进程无关
+    assert band_key([1, 2, 3, 4, 5, 6, 7, 2**32 - 2]) == 3456110924391998571
+    hasher = MinHasher()
+    assert hasher.signature('稳定的签名') == MinHasher(seed=42).signature('稳定的签名')
+
+
+def test_lsh_remove():
+    hasher = MinHasher()
+    lsh = LSHIndex()
+    sig = hasher.signature('the quick brown fox jumps over the lazy dog')
+    lsh.add('a', sig)
+    assert lsh.query(sig) == {'a'}
+    lsh.remove('a', sig)
+    assert lsh.query(sig) == set()
+
+
+def test_index_roundtrip():
+    items = [DedupItem(id=f'm{i}', name=text[:20], content=text, item_type='memory')
+             for i, text in enumerate(_texts(30, seed=1))]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dedup_signatures.bin')
+        dedup = ThreeStageDeduplicator(config=DedupConfig(semantic_enabled=False), index_path=path)
+        dedup.build_index(items)
+        dedup.save_index()
+
+        reloaded = ThreeStageDeduplicator(config=DedupConfig(semantic_enabled=False), index_path=path)
+        assert reloaded._signature_map == dedup._signature_map
+        assert reloaded.get_stats()['total_indexed'] == 30
+
+        probe = DedupItem(id='new', name='probe', content=items[7].content + '!')
+        match = reloaded.deduplicate([probe]).matches[0]
+        assert match.match_type == MatchType.FUZZY
+        assert match.matched_item.id == 'm7'
+
+        # 哈希参数不同的签名不可混用
+        other = ThreeStageDeduplicator(config=DedupConfig(minhash_num_perm=64), index_path=path)
+        assert other.get_stats()['total_indexed'] == 0
+
+
+def _rate(fn, texts):
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    return len(texts) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    hasher = MinHasher()
+    fallback = MinHasher()
+    fallback._vectorized = False
+    for length in (50, 200, 1000):
+        texts = [''.join(random.Random(i).choices(_CHARS, k=length)) for i in range(200)]
+        legacy = _rate(lambda t: _legacy_minhash(hasher, hasher.get_shingles(t)), texts)
+        python = _rate(fallback.signature, texts)
+        line = f"文本长度 {length:>5}: 旧实现 {legacy:9.1f} 签名/秒  纯 Python {python:9.1f} 签名/秒"
+        if HAS_NUMPY:
+            vectorized = _rate(hasher.signature, texts)
+            line += f"  向量化 {vectorized:9.1f} 签名/秒 ({vectorized / legacy:.0f}x)"
+        print(line)
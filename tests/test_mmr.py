@@ -0,0 +1,118 @@
+"""基于文本内容的 MMR 重排序测试 (v7.1)
+
+验证：
+1. mmr_rerank_by_content 增量维护"与已选集合的最大相似度"后，选择顺序与逐轮
+   重新比较全部已选文档的旧实现完全一致（含空内容、top_k 超过候选数）
+2. 相似度计算次数从 O(k²·n) 降为 O(k·n)
+3. 基准：旧实现与增量实现的重排耗时与相似度计算次数
+
+使用方法：
+    python -m pytest tests/test_mmr.py -v -s
+    python tests/test_mmr.py --candidates 200 --top-k 20
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.retrieval.mmr import mmr_rerank_by_content, _jaccard_similarity
+
+_WORDS = ['咖啡', 'coffee', 'tokyo', '东京', 'meeting', '项目', 'deadline', 'Alice', 'Bob', 'music',
+          'morning', '旅行', 'tea', 'report', 'review', 'budget']
+
+
+def _reference_mmr(results, similarity_fn=_jaccard_similarity, lambda_param=0.7, top_k=10):
+    """v7.1 之前的实现：每轮对每个候选重新比较全部已选文档"""
+    result_map = {r['id']: r for r in results if r.get('id')}
+    selected, remaining = [], set(result_map)
+    for _ in range(min(top_k, len(result_map))):
+        best_id, best_mmr = None, float('-inf')
+        for doc_id in remaining:
+            relevance = result_map[doc_id].get('score', 0.0)
+            max_sim = 0.0
+            doc_content = result_map[doc_id].get('content', '')
+            for sel_id in selected:
+                sel_content = result_map[sel_id].get('content', '')
+                if doc_content and sel_content:
+                    max_sim = max(max_sim, similarity_fn(doc_content, sel_content))
+            mmr_score = lambda_param * relevance - (1 - lambda_param) * max_sim
+            if mmr_score > best_mmr:
+                best_mmr, best_id = mmr_score, doc_id
+        selected.append(best_id)
+        remaining.discard(best_id)
+    return selected
+
+
+def _candidates(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {'id': f'doc_{i}', 'score': rng.random(),
+         'content': '' if i % 17 == 0 else ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(3, 8)))}
+        for i in range(n)
+    ]
+
+
+class _CountingSimilarity:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, a, b):
+        self.calls += 1
+        return _jaccard_similarity(a, b)
+
+
+def test_matches_reference_selection():
+    for seed in range(5):
+        results = _candidates(60, seed)
+        for top_k in (1, 5, 20, 100):
+            for lambda_param in (0.3, 0.7):
+                expected = _reference_mmr(results, lambda_param=lambda_param, top_k=top_k)
+                got = mmr_rerank_by_content(results, lambda_param=lambda_param, top_k=top_k)
+                assert [r['id'] for r in got] == expected
+                assert [r['mmr_rank'] for r in got] == list(range(len(expected)))
+
+
+def test_similarity_calls_linear_in_top_k():
+    n, top_k = 100, 20
+    counting = _CountingSimilarity()
+    mmr_rerank_by_content(_candidates(n), similarity_fn=counting, top_k=top_k)
+    # 每选中一篇只与剩余候选比较一次（最后一篇之后不再比较）
+    assert counting.calls <= (top_k - 1) * n
+
+    reference = _CountingSimilarity()
+    _reference_mmr(_candidates(n), similarity_fn=reference, top_k=top_k)
+    assert reference.calls > 5 * counting.calls
+
+
+def run_benchmark(n_candidates=200, top_k=20, rounds=5):
+    results = _candidates(n_candidates)
+    timings = {}
+    for name, rerank in (('逐轮全比较', _reference_mmr), ('增量最大相似度', mmr_rerank_by_content)):
+        counting = _CountingSimilarity()
+        start = time.perf_counter()
+        for _ in range(rounds):
+            rerank(results, similarity_fn=counting, top_k=top_k)
+        timings[name] = {'ms': (time.perf_counter() - start) / rounds * 1000, 'calls': counting.calls // rounds}
+
+    print(f"\nMMR 内容重排基准: {n_candidates} 个候选, top_k={top_k}")
+    for name, r in timings.items():
+        print(f"  {name:10s} {r['ms']:8.2f} ms/次  相似度计算 {r['calls']:6d} 次")
+    return timings
+
+
+def test_mmr_benchmark_small():
+    timings = run_benchmark(100, top_k=10, rounds=2)
+    assert timings['增量最大相似度']['calls'] < timings['逐轮全比较']['calls']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='MMR 内容重排基准')
+    parser.add_argument('--candidates', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+    run_benchmark(args.candidates, args.top_k, args.rounds)
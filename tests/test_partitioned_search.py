@@ -0,0 +1,233 @@
+"""租户分区检索测试 (v7.1)
+
+验证：
+1. VectorIndex 的 allowed_ids 过滤下推：小租户不被大租户挤出 top_k，
+   且结果与"全量搜索后按租户过滤"完全一致
+2. FullTextIndex 的 allowed_ids 过滤：BM25 排序与不过滤时一致
+3. ElevenLayerRetriever 把 allowed_ids 传给向量召回，并过滤关键词/实体召回
+4. ScopedMemory.memory_ids() 返回不可变快照：检索遍历期间同一作用域的写入不会使其失败
+5. memory_ids() 的 ID 集合随增删增量维护：写入后取快照的耗时与作用域大小无关，
+   删除记录在没有旧快照引用时回收
+
+使用方法：
+    python -m pytest tests/test_partitioned_search.py -v -s
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.embedding.base import EmbeddingBackend, EmbeddingConfig, EmbeddingBackendType
+from recall.index.fulltext_index import FullTextIndex
+from recall.retrieval.config import RetrievalConfig
+from recall.retrieval.eleven_layer import ElevenLayerRetriever
+from recall.storage.multi_tenant import MemoryScope, ScopedMemory, _VersionedIdSet
+
+
+class _FixedBackend(EmbeddingBackend):
+    """测试用后端：只提供维度，向量由测试直接写入索引"""
+
+    @property
+    def dimension(self) -> int:
+        return 8
+
+    @property
+    def is_available(self) -> bool:
+        return True
+
+    def encode(self, text):
+        return np.ones(8, dtype=np.float32)
+
+    def encode_batch(self, texts):
+        return np.ones((len(texts), 8), dtype=np.float32)
+
+
+def _unit(vec):
+    vec = np.asarray(vec, dtype=np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def test_vector_index_small_tenant_not_crowded_out():
+    pytest.importorskip('faiss')
+    from recall.index.vector_index import VectorIndex
+
+    rng = np.random.default_rng(0)
+    query = _unit(np.ones(8))
+    with tempfile.TemporaryDirectory() as tmp:
+        config = EmbeddingConfig(backend=EmbeddingBackendType.OPENAI, api_model='m', dimension=8)
+        vi = VectorIndex(tmp, embedding_config=config)
+        vi._embedding_backend = _FixedBackend(config)
+
+        # 三个大租户的向量贴近查询方向，小租户的向量明显更远
+        for tenant in ('big_a', 'big_b', 'big_c'):
+            for i in range(200):
+                vi.add(f'{tenant}_{i}', _unit(query + rng.normal(0, 0.05, 8)))
+        small_ids = {f'small_{i}' for i in range(3)}
+        for doc_id in sorted(small_ids):
+            vi.add(doc_id, _unit(query + rng.normal(0, 1.0, 8)))
+
+        unfiltered = vi.search_by_embedding(query, top_k=30)
+        assert not [d for d, _ in unfiltered if d in small_ids]
+
+        filtered = vi.search_by_embedding(query, top_k=10, allowed_ids=small_ids)
+        assert {d for d, _ in filtered} == small_ids
+
+        # 与"全量搜索后过滤"的排序一致
+        everything = vi.search_by_embedding(query, top_k=vi.index.ntotal)
+        expected = [d for d, _ in everything if d in small_ids]
+        assert [d for d, _ in filtered] == expected
+
+        # 追加后映射增量更新
+        vi.add('small_new', query)
+        small_ids.add('small_new')
+        assert vi.search_by_embedding(query, top_k=1, allowed_ids=small_ids)[0][0] == 'small_new'
+
+
+def test_fulltext_allowed_ids_matches_post_filter():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = FullTextIndex(tmp)
+        for i in range(50):
+            index.add(f'big_{i}', f'coffee coffee espresso morning routine {i}')
+        index.add('small_1', 'coffee with friends')
+        index.add('small_2', 'espresso machine broke')
+        allowed = {'small_1', 'small_2'}
+
+        everything = index.search('coffee espresso', top_k=100)
+        expected = [(d, s) for d, s in everything if d in allowed]
+        assert index.search('coffee espresso', top_k=5, allowed_ids=allowed) == expected
+        assert index.search('coffee espresso', top_k=5, allowed_ids=set()) == []
+
+
+def test_retriever_pushes_allowed_ids_to_recall_paths():
+    vector_index = Mock()
+    vector_index.enabled = True
+    vector_index.encode = Mock(return_value=[0.1, 0.2])
+    vector_index.search = Mock(return_value=[('mine_1', 0.9)])
+    inverted_index = Mock()
+    inverted_index.search_any = Mock(return_value=['mine_2', 'other_1'])
+    entity = Mock()
+    entity.turn_references = ['other_2', 'mine_3']
+    entity_index = Mock()
+    entity_index.get_related_turns = Mock(return_value=[entity])
+
+    retriever = ElevenLayerRetriever(
+        inverted_index=inverted_index,
+        entity_index=entity_index,
+        vector_index=vector_index,
+        content_store=lambda doc_id: f'content of {doc_id}',
+        config=RetrievalConfig.fast()
+    )
+    allowed = {'mine_1', 'mine_2', 'mine_3'}
+    results = retriever.retrieve(
+        query='coffee', keywords=['coffee'], entities=['Alice'], top_k=5, allowed_ids=allowed
+    )
+
+    assert vector_index.search.call_args.kwargs['allowed_ids'] is allowed
+    assert {r.id for r in results} == allowed
+
+
+def test_scope_memory_ids_snapshot_survives_concurrent_writes():
+    with tempfile.TemporaryDirectory() as tmp:
+        scope = ScopedMemory(tmp, MemoryScope(user_id='u'), storage_mode='log', log_fsync=False)
+        scope.add_many([(f'memory {i}', {'id': f'mem_{i}'}) for i in range(500)])
+
+        ids = scope.memory_ids()
+        assert scope.memory_ids() is ids  # 两次写入之间共享同一个快照
+        scope.add('new', {'id': 'mem_new'})
+        assert 'mem_new' not in ids and 'mem_new' in scope.memory_ids()
+        scope.delete('mem_0')
+        assert 'mem_0' in ids and 'mem_0' not in scope.memory_ids()
+
+        stop = threading.Event()
+
+        def writer():
+            i = 0
+            while not stop.is_set():
+                scope.add(f'concurrent {i}', {'id': f'w_{i}'})
+                scope.delete(f'w_{i}')
+                i += 1
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in range(300):
+                snapshot = scope.memory_ids()
+                assert sum(1 for doc_id in snapshot if doc_id.startswith('mem_')) == 500
+        finally:
+            stop.set()
+            thread.join()
+        assert 'w_0' not in scope.memory_ids()
+        scope.close()
+
+
+def test_scope_memory_ids_versions():
+    with tempfile.TemporaryDirectory() as tmp:
+        scope = ScopedMemory(tmp, MemoryScope(user_id='u'), storage_mode='log', log_fsync=False)
+        scope.add_many([(f'memory {i}', {'id': f'mem_{i}'}) for i in range(10)])
+        before = scope.memory_ids()
+        scope.delete('mem_1')
+        scope.add('again', {'id': 'mem_1'})  # 删除后以同一 ID 重新加入
+        scope.add('new', {'id': 'mem_new'})
+        after = scope.memory_ids()
+
+        assert set(before) == {f'mem_{i}' for i in range(10)} and len(before) == 10
+        assert set(after) == set(before) | {'mem_new'} and len(after) == 11
+        assert 'mem_1' in before and 'mem_1' in after and 'mem_new' not in before
+
+        scope.MAX_MEMORIES = 8
+        scope.add('overflow', {'id': 'mem_overflow'})  # 驱逐最旧的 4 条
+        evicted = scope.memory_ids()
+        assert len(evicted) == 8 and len(list(evicted)) == 8
+        assert 'mem_0' not in evicted and 'mem_0' in after
+
+        scope.clear()
+        assert len(scope.memory_ids()) == 0 and 'mem_new' in after
+        scope.close()
+
+
+def test_scope_memory_ids_is_incremental():
+    def ids_after_add_ms(size, rounds=200):
+        with tempfile.TemporaryDirectory() as tmp:
+            scope = ScopedMemory(tmp, MemoryScope(user_id='u'), storage_mode='log', log_fsync=False)
+            scope.add_many([(f'memory {i}', {'id': f'mem_{i}'}) for i in range(size)])
+            spent = 0.0
+            for i in range(rounds):
+                scope.add(f'new {i}', {'id': f'new_{i}'})
+                started = time.perf_counter()
+                ids = scope.memory_ids()
+                spent += time.perf_counter() - started
+                assert f'new_{i}' in ids and len(ids) == size + i + 1
+            scope.close()
+            return spent * 1000
+
+    small, large = ids_after_add_ms(100), ids_after_add_ms(4000)
+    assert large < max(small * 5, 5.0)  # 重建 frozenset 时相差约 40 倍
+
+
+def test_scope_memory_ids_prunes_deletions():
+    with tempfile.TemporaryDirectory() as tmp:
+        scope = ScopedMemory(tmp, MemoryScope(user_id='u'), storage_mode='log', log_fsync=False)
+        held = scope.memory_ids()
+        for i in range(500):
+            scope.add(f'memory {i}', {'id': f'w_{i}'})
+            scope.memory_ids()
+            scope.delete(f'w_{i}')
+        assert len(scope._ids._died) == 500  # 最早的快照仍被引用：删除记录全部保留
+        assert len(held) == 0 and 'w_0' not in held
+
+        del held
+        for i in range(500):
+            scope.add(f'memory {i}', {'id': f'x_{i}'})
+            scope.memory_ids()
+            scope.delete(f'x_{i}')
+        assert len(scope._ids._died) < 2 * _VersionedIdSet._PRUNE_MIN  # 没有快照引用的删除记录已回收
+        assert list(scope.memory_ids()) == []
+        scope.close()
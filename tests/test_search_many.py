@@ -0,0 +1,305 @@
+"""多查询批量检索测试 (v7.1)
+
+验证：
+1. QueryContext 预取的向量召回结果按 top_k 取前缀，不足时回退到召回层自行检索
+2. ElevenLayerRetriever 直接使用预取结果，不再逐查询访问向量索引
+3. VectorIndex.search_batch 与逐条 search 结果一致（含租户分区过滤）
+4. VolumeManager.search_content_many 一次扫描与逐条 search_content 结果一致
+5. RecallEngine.search_many 与逐条 search 结果一致；基准对比 build_context 的
+   检索部分（主查询 + 5 个补充关键词）逐条检索与批量检索的延迟；基准关闭 embedding
+   缓存，并为每次编码请求加上模拟的 API 往返延迟（--latency-ms）
+6. add_batch 写入归档 / 事件关联的实体为实体名（之前是实体对象，无法序列化）
+
+使用方法：
+    python -m pytest tests/test_search_many.py -v -s
+    python tests/test_search_many.py --memories 300 --rounds 20
+    python tests/test_search_many.py --latency-ms 0   # 只看本地检索开销
+"""
+
+import os
+import sys
+import time
+import zlib
+import argparse
+import tempfile
+import contextlib
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.embedding.base import EmbeddingBackend, EmbeddingConfig, EmbeddingBackendType
+from recall.retrieval.config import QueryContext, RetrievalConfig
+from recall.retrieval.eleven_layer import ElevenLayerRetriever
+from recall.storage.volume_manager import VolumeManager
+
+
+class _FixedBackend(EmbeddingBackend):
+    """测试用后端：只提供维度，向量由测试直接写入索引"""
+
+    @property
+    def dimension(self) -> int:
+        return 8
+
+    @property
+    def is_available(self) -> bool:
+        return True
+
+    def encode(self, text):
+        return np.ones(8, dtype=np.float32)
+
+    def encode_batch(self, texts):
+        return np.ones((len(texts), 8), dtype=np.float32)
+
+
+class _HashingBackend(EmbeddingBackend):
+    """测试用后端：按词哈希成确定性向量（共享词越多越相近），不依赖模型或网络
+
+    每条文本另加一个极小的确定性扰动：词袋相同的文本距离完全相等时，FAISS 对并列
+    结果的取舍随 k 变化，逐条检索（k = top_k）与批量预取（k = 2 * max(top_k)）会
+    选中不同的并列文档；真实向量不会出现完全相等的距离。
+    """
+
+    DIM = 64
+
+    def __init__(self, config, latency_ms=0.0):
+        super().__init__(config)
+        self.latency_ms = latency_ms
+        self.requests = 0
+
+    def _round_trip(self):
+        """模拟一次 embedding API 请求的往返延迟（encode / encode_batch 各算一次请求）"""
+        self.requests += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    @property
+    def dimension(self) -> int:
+        return self.DIM
+
+    @property
+    def is_available(self) -> bool:
+        return True
+
+    def encode(self, text):
+        self._round_trip()
+        return self._embed(text)
+
+    def _embed(self, text):
+        vec = np.zeros(self.DIM, dtype=np.float32)
+        for token in str(text).split():
+            vec[zlib.crc32(token.encode('utf-8')) % self.DIM] += 1.0
+        vec += np.random.default_rng(zlib.crc32(str(text).encode('utf-8'))).normal(0, 1e-3, self.DIM)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def encode_batch(self, texts):
+        self._round_trip()
+        return np.vstack([self._embed(t) for t in texts]) if texts else np.zeros((0, self.DIM), dtype=np.float32)
+
+
+@contextlib.contextmanager
+def _engine_with_hashing_backend(data_root, cache_embeddings=True):
+    """构建使用 _HashingBackend 的 RecallEngine（lite 模式没有向量后端，add_batch 不可用）"""
+    from recall.engine import RecallEngine
+    from recall.index import vector_index as vector_index_module
+
+    original = vector_index_module.create_embedding_backend
+    vector_index_module.create_embedding_backend = lambda config, cache_dir=None: _HashingBackend(config)
+    engine = None
+    try:
+        config = EmbeddingConfig(backend=EmbeddingBackendType.OPENAI, api_key='sk-test',
+                                 api_model='hashing', dimension=_HashingBackend.DIM,
+                                 cache_embeddings=cache_embeddings)
+        engine = RecallEngine(data_root=data_root, embedding_config=config, auto_warmup=False)
+        yield engine
+    finally:
+        if engine is not None:
+            engine.close()
+        vector_index_module.create_embedding_backend = original
+
+
+def _unit(vec):
+    vec = np.asarray(vec, dtype=np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def test_query_context_vector_hits_prefix():
+    ctx = QueryContext(query='coffee')
+    assert ctx.get_vector_hits(5) is None
+
+    ctx.vector_hits = [('a', 0.9), ('b', 0.8), ('c', 0.7)]
+    ctx.vector_hits_k = 3
+    assert ctx.get_vector_hits(2) == [('a', 0.9), ('b', 0.8)]
+    assert ctx.get_vector_hits(3) == ctx.vector_hits
+    # 预取数量不够时由召回层自行检索
+    assert ctx.get_vector_hits(4) is None
+
+
+def test_retriever_uses_prefetched_vector_hits():
+    vector_index = Mock()
+    vector_index.enabled = True
+    vector_index.encode = Mock(return_value=[0.1, 0.2])
+    vector_index.search = Mock(return_value=[('other', 0.9)])
+    inverted_index = Mock()
+    inverted_index.search_any = Mock(return_value=[])
+
+    retriever = ElevenLayerRetriever(
+        inverted_index=inverted_index,
+        vector_index=vector_index,
+        content_store=lambda doc_id: f'content of {doc_id}',
+        config=RetrievalConfig.fast()
+    )
+    ctx = QueryContext(query='coffee', entities=[], keywords=['coffee'])
+    ctx.vector_hits = [('mine_1', 0.9), ('mine_2', 0.5)]
+    ctx.vector_hits_k = 100
+    results = retriever.retrieve(query='coffee', top_k=5, allowed_ids={'mine_1', 'mine_2'}, query_context=ctx)
+
+    vector_index.search.assert_not_called()
+    assert {r.id for r in results} == {'mine_1', 'mine_2'}
+
+
+def test_vector_index_search_batch_matches_search():
+    pytest.importorskip('faiss')
+    from recall.index.vector_index import VectorIndex
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        config = EmbeddingConfig(backend=EmbeddingBackendType.OPENAI, api_model='m', dimension=8)
+        vi = VectorIndex(tmp, embedding_config=config)
+        vi._embedding_backend = _FixedBackend(config)
+        for i in range(300):
+            vi.add(f'doc_{i}', _unit(rng.normal(0, 1, 8)))
+
+        queries = np.vstack([_unit(rng.normal(0, 1, 8)) for _ in range(6)])
+        allowed = {f'doc_{i}' for i in range(0, 300, 7)}
+        for partition in (None, allowed):
+            batched = vi.search_batch(queries, top_k=10, allowed_ids=partition)
+            single = [vi.search('', top_k=10, allowed_ids=partition, query_embedding=q) for q in queries]
+            assert [[d for d, _ in hits] for hits in batched] == [[d for d, _ in hits] for hits in single]
+            assert all(np.allclose([s for _, s in a], [s for _, s in b], atol=1e-5)
+                       for a, b in zip(batched, single))
+        assert vi.search_batch(queries, top_k=5, allowed_ids=set()) == [[] for _ in range(6)]
+
+
+def test_search_content_many_matches_search_content():
+    with tempfile.TemporaryDirectory() as tmp:
+        vm = VolumeManager(tmp)
+        words = ['coffee', 'tea', 'tokyo', 'meeting', '咖啡']
+        for i in range(120):
+            vm.append_turn({'memory_id': f'mem_{i}', 'user_id': 'u',
+                            'content': f'{words[i % 5]} note {i} {words[(i * 3) % 5]}'})
+        vm.flush()
+
+        queries = ['coffee', 'TOKYO', '咖啡', 'missing', 'note 1']
+        limits = [5, 50, 3, 10, 200]
+        for loaded in (True, False):
+            if not loaded:
+                vm = VolumeManager(tmp)  # 卷未加载：走磁盘扫描
+            expected = [vm.search_content(q, max_results=n) for q, n in zip(queries, limits)]
+            assert vm.search_content_many(queries, max_results=limits) == expected
+            assert vm.search_content_many(queries, max_results=4) == [
+                vm.search_content(q, max_results=4) for q in queries
+            ]
+
+
+# build_context 的检索部分：主查询 + 最多 5 个补充关键词（每个 top_k=2）
+_MAIN_QUERY = '上次和 Alice 在东京喝咖啡时聊了什么项目'
+_KEYWORDS = ['Alice', '东京', '项目', 'deadline', '咖啡']
+_NAMES = ['Alice', 'Bob', 'Carol', '小明', '东京', '上海']
+_WORDS = ['咖啡', '项目', 'deadline', '旅行', '会议', 'music', 'morning']
+
+
+def _populate(engine, n_memories, user_id='bench'):
+    rng = np.random.default_rng(0)
+    engine.add_batch([
+        {'content': f"{' '.join(rng.choice(_NAMES, 2))} {' '.join(rng.choice(_WORDS, 5))} 第{i}条"}
+        for i in range(n_memories)
+    ], user_id=user_id)
+
+
+def _per_query(engine, user_id, top_k):
+    """v7.1 之前 build_context 的检索方式：每个查询单独调用 search()"""
+    return [engine.search(_MAIN_QUERY, user_id=user_id, top_k=top_k)] + [
+        engine.search(keyword, user_id=user_id, top_k=2) for keyword in _KEYWORDS
+    ]
+
+
+def _batched(engine, user_id, top_k):
+    return engine.search_many([_MAIN_QUERY] + _KEYWORDS, user_id=user_id, top_k=[top_k] + [2] * len(_KEYWORDS))
+
+
+def run_benchmark(n_memories, rounds=10, top_k=10, latency_ms=20.0):
+    """关闭 embedding 缓存（每轮查询向量都要重新请求），每次编码请求耗时 latency_ms"""
+    with tempfile.TemporaryDirectory() as tmp, \
+            _engine_with_hashing_backend(tmp, cache_embeddings=False) as engine:
+        _populate(engine, n_memories)
+        backend = engine._vector_index.embedding_backend
+        backend.latency_ms = latency_ms
+        # 预热：首轮包含缓存加载
+        _per_query(engine, 'bench', top_k)
+        _batched(engine, 'bench', top_k)
+
+        timings, requests = {}, {}
+        for name, run in (('per-query', _per_query), ('search_many', _batched)):
+            backend.requests = 0
+            start = time.perf_counter()
+            for _ in range(rounds):
+                run(engine, 'bench', top_k)
+            timings[name] = (time.perf_counter() - start) / rounds * 1000
+            requests[name] = backend.requests / rounds
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            engine.build_context(_MAIN_QUERY, user_id='bench')
+        timings['build_context'] = (time.perf_counter() - start) / rounds * 1000
+
+    print(f"\n多查询检索基准: {n_memories} 条记忆, {1 + len(_KEYWORDS)} 个查询"
+          f"（哈希向量后端, 每次编码请求 {latency_ms:g} ms）")
+    for name, ms in timings.items():
+        suffix = f"  编码请求 {requests[name]:.0f} 次" if name in requests else ''
+        print(f"  {name:14s} {ms:8.2f} ms/次{suffix}")
+    print(f"  加速比 {timings['per-query'] / timings['search_many']:.2f}x")
+    timings['requests'] = requests
+    return timings
+
+
+def test_search_many_matches_search():
+    with tempfile.TemporaryDirectory() as tmp, _engine_with_hashing_backend(tmp) as engine:
+        _populate(engine, 60)
+        expected = _per_query(engine, 'bench', 10)
+        actual = _batched(engine, 'bench', 10)
+        assert all(expected)
+        assert [[r.id for r in hits] for hits in actual] == [[r.id for r in hits] for hits in expected]
+        assert engine.search_many([], user_id='bench') == []
+        assert engine.build_context(_MAIN_QUERY, user_id='bench')
+
+
+def test_add_batch_records_entity_names():
+    with tempfile.TemporaryDirectory() as tmp, _engine_with_hashing_backend(tmp) as engine:
+        ids = engine.add_batch([{'content': 'Alice 和 Bob 在东京喝咖啡'}, {'content': 'Carol 去了上海开会'}],
+                               user_id='bench')
+        assert len(ids) == 2
+        turns = [engine.volume_manager.get_turn_by_memory_id(mid) for mid in ids]
+        assert all(turn and all(isinstance(name, str) for name in turn['entities']) for turn in turns)
+        assert {'Alice', 'Bob'} <= set(turns[0]['entities']) and 'Carol' in turns[1]['entities']
+
+
+def test_search_many_benchmark_small():
+    timings = run_benchmark(60, rounds=3, latency_ms=10)
+    # 所有查询向量一次 encode_batch 请求完成；逐条检索每个查询至少一次请求
+    assert timings['requests']['search_many'] == 1
+    assert timings['requests']['per-query'] >= 1 + len(_KEYWORDS)
+    assert timings['search_many'] < timings['per-query']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='search_many / build_context 检索延迟基准')
+    parser.add_argument('--memories', type=int, default=300)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='模拟每次 embedding 请求的往返延迟')
+    args = parser.parse_args()
+    run_benchmark(args.memories, args.rounds, args.top_k, args.latency_ms)
@@ -0,0 +1,212 @@
+"""SQLite BAL 分组提交写入测试 + 基准 (v7.1)
+
+验证：
+1. 多线程并发写入 storage / fts 后端后数据完整，且事务数少于写入次数（确有合并）
+2. with backend.batch(): 块内写入在退出时一次提交，异常时整体丢弃，
+   需要返回值的删除操作会先提交块内已有写入
+3. 同组内某个写入失败只影响它自己，不影响同一事务中的其他写入
+4. durability="async" 写入立即返回，flush() 后可见；":memory:" 数据库在调用线程内执行
+5. 向量后端的矩阵缓存在提交后更新，并发写入后检索结果完整
+6. 基准：多线程双写 storage / fts 后端，逐条提交（每事务 1 行）与分组提交的吞吐对比
+
+使用方法：
+    python -m pytest tests/test_sqlite_group_commit.py -v -s
+    python tests/test_sqlite_group_commit.py --threads 16 --writes 200 --durability full
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.backends.sqlite_writer import GroupCommitWriter
+from recall.backends.sqlite_memory import SQLiteMemoryBackend
+from recall.backends.sqlite_fts import SQLiteFTS5Backend
+
+
+def _run_threads(n_threads, target):
+    threads = [threading.Thread(target=target, args=(t,)) for t in range(n_threads)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+
+def test_concurrent_writes_are_grouped():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'memories.db')
+        storage = SQLiteMemoryBackend(db_path)
+        fts = SQLiteFTS5Backend(os.path.join(tmp, 'fts.db'))
+
+        def worker(t):
+            for i in range(50):
+                mid = f't{t}_{i}'
+                storage.save(mid, {'content': f'coffee note {mid}', 'user_id': 'u'})
+                fts.add(mid, f'coffee note {mid}', {'user_id': 'u'})
+
+        _run_threads(8, worker)
+        assert storage.count() == 400
+        assert fts.count() == 400
+        assert len(fts.search('coffee', top_k=1000)) == 400
+        assert storage._writer.operations == 400
+        assert storage._writer.transactions < 400
+        storage.close()
+        fts.close()
+
+
+def test_batch_context_commits_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'memories.db')
+        storage = SQLiteMemoryBackend(db_path)
+        outside = sqlite3.connect(db_path)
+
+        before = storage._writer.transactions
+        with storage.batch():
+            for i in range(20):
+                storage.save(f'm{i}', {'content': f'note {i}'})
+            # 块内写入尚未提交，其他连接不可见
+            assert outside.execute('SELECT COUNT(*) FROM memories').fetchone()[0] == 0
+        assert outside.execute('SELECT COUNT(*) FROM memories').fetchone()[0] == 20
+        assert storage._writer.transactions == before + 1
+
+        with pytest.raises(RuntimeError):
+            with storage.batch():
+                storage.save('discarded', {'content': 'never committed'})
+                raise RuntimeError('abort')
+        assert storage.load('discarded') is None
+
+        with storage.batch():
+            storage.save('pending', {'content': 'queued before the delete'})
+            # 删除需要返回值：先提交块内已有写入
+            assert storage.delete('pending') is True
+            storage.save('after', {'content': 'queued after the delete'})
+        assert storage.load('pending') is None
+        assert storage.load('after')['content'] == 'queued after the delete'
+        outside.close()
+        storage.close()
+
+
+def test_failing_write_is_isolated():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'kv.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute('CREATE TABLE kv (k TEXT PRIMARY KEY, v TEXT NOT NULL)')
+        conn.commit()
+        conn.close()
+
+        writer = GroupCommitWriter(lambda: sqlite3.connect(db_path, check_same_thread=False),
+                                   max_delay_ms=20)
+        errors = []
+
+        def worker(t):
+            value = None if t == 3 else f'v{t}'  # 第 3 个写入违反 NOT NULL
+            try:
+                writer.submit(lambda c: c.execute('INSERT INTO kv VALUES (?, ?)', (f'k{t}', value)))
+            except sqlite3.IntegrityError as exc:
+                errors.append((t, exc))
+
+        _run_threads(6, worker)
+        writer.close()
+        rows = sqlite3.connect(db_path).execute('SELECT k FROM kv ORDER BY k').fetchall()
+        assert [r[0] for r in rows] == ['k0', 'k1', 'k2', 'k4', 'k5']
+        assert [t for t, _ in errors] == [3]
+
+
+def test_async_durability_and_in_memory():
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SQLiteMemoryBackend(os.path.join(tmp, 'memories.db'), durability='async')
+        ids = [storage.upsert(f'note {i}') for i in range(30)]
+        storage.flush()
+        assert storage.count() == 30
+        assert storage.get_by_id(ids[0])['content'] == 'note 0'
+        storage.close()
+
+    memory = SQLiteMemoryBackend(':memory:')
+    with memory.batch():
+        memory.save('a', {'content': 'in memory'})
+    assert memory.load('a')['content'] == 'in memory'
+    assert memory.clear() == 1
+
+    with pytest.raises(ValueError):
+        SQLiteMemoryBackend(':memory:', durability='sometimes')
+
+
+def test_vector_cache_sees_concurrent_writes():
+    np = pytest.importorskip('numpy')
+    from recall.backends.sqlite_vector import SQLiteVectorBackend
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(160, 16))
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteVectorBackend(os.path.join(tmp, 'vectors.db'))
+        backend.add('seed', vectors[0].tolist())
+        assert backend.search(vectors[0].tolist(), top_k=1)[0].id == 'seed'  # 建立缓存
+
+        def worker(t):
+            for i in range(t * 20, t * 20 + 20):
+                backend.add(f'v{i}', vectors[i].tolist())
+
+        _run_threads(8, worker)
+        assert backend.count() == 161
+        assert len(backend.search(vectors[5].tolist(), top_k=1000)) > 0
+        assert backend.search(vectors[77].tolist(), top_k=1)[0].id == 'v77'
+        with backend.batch():
+            backend.add('batched', (-vectors[77]).tolist())
+        assert backend.search((-vectors[77]).tolist(), top_k=1)[0].id == 'batched'
+        assert backend.delete('v77') is True
+        assert all(r.id != 'v77' for r in backend.search(vectors[77].tolist(), top_k=1000))
+        backend.close()
+
+
+def run_benchmark(n_threads=8, writes_per_thread=100, durability='normal'):
+    """每个「记忆写入」双写 storage + fts 两个后端（向量后端依赖 numpy，不计入）"""
+    results = {}
+    for name, rows in (('per-row commit', 1), ('group commit', 512)):
+        with tempfile.TemporaryDirectory() as tmp:
+            options = dict(durability=durability, group_commit_rows=rows)
+            storage = SQLiteMemoryBackend(os.path.join(tmp, 'memories.db'), **options)
+            fts = SQLiteFTS5Backend(os.path.join(tmp, 'fts.db'), **options)
+
+            def worker(t):
+                for i in range(writes_per_thread):
+                    mid = f't{t}_{i}'
+                    storage.save(mid, {'content': f'Alice coffee meeting {mid}', 'user_id': 'u'})
+                    fts.add(mid, f'Alice coffee meeting {mid}', {'user_id': 'u'})
+
+            start = time.perf_counter()
+            _run_threads(n_threads, worker)
+            elapsed = time.perf_counter() - start
+            assert storage.count() == n_threads * writes_per_thread
+            results[name] = {
+                'writes_per_sec': n_threads * writes_per_thread / elapsed,
+                'transactions': storage._writer.transactions + fts._writer.transactions,
+            }
+            storage.close()
+            fts.close()
+
+    print(f"\nSQLite 分组提交基准: {n_threads} 线程 × {writes_per_thread} 次写入, durability={durability}")
+    for name, r in results.items():
+        print(f"  {name:15s} {r['writes_per_sec']:9.0f} writes/sec  {r['transactions']:6d} 个事务")
+    print(f"  加速比 {results['group commit']['writes_per_sec'] / results['per-row commit']['writes_per_sec']:.1f}x")
+    return results
+
+
+def test_group_commit_benchmark_small():
+    results = run_benchmark(n_threads=8, writes_per_thread=40)
+    assert results['group commit']['transactions'] < results['per-row commit']['transactions']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SQLite BAL 分组提交基准')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--durability', choices=['full', 'normal', 'async'], default='normal')
+    args = parser.parse_args()
+    run_benchmark(args.threads, args.writes, args.durability)
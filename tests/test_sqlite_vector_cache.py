@@ -0,0 +1,263 @@
+"""SQLiteVectorBackend 命名空间矩阵缓存测试 (v7.1)
+
+验证：
+1. 缓存矩阵上的检索与逐行解码 BLOB 的暴力检索结果一致，
+   且在新增 / 覆盖 / 跨命名空间移动 / 删除 / 清空后保持一致
+2. search_batch 与逐条 search 结果一致
+3. matrix_dir 旁路文件：冷启动时内存映射加载，表变化后自动重建
+4. 大命名空间的 IVF 近似模式召回率
+5. 覆盖 / 删除留下的屏蔽行超过阈值后压缩，矩阵大小不随反复写入增长
+6. IVF 聚类在锁外训练：训练期间其它检索与写入不被阻塞，写入的行在换入时补上分配
+7. 基准：每次查询解码整表（旧实现）与缓存矩阵的查询延迟
+
+使用方法：
+    python -m pytest tests/test_sqlite_vector_cache.py -v -s
+    python tests/test_sqlite_vector_cache.py --vectors 50000 --dim 384
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.backends import sqlite_vector
+from recall.backends.sqlite_vector import SQLiteVectorBackend, _NamespaceMatrix
+
+
+def _brute_force(db_path, query, top_k, namespace='default'):
+    """v7.1 之前的检索方式：每次查询读出整个命名空间并逐行解码"""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT memory_id, vector, dimension FROM vectors WHERE namespace = ?", (namespace,)
+    ).fetchall()
+    conn.close()
+    if not rows:
+        return []
+    ids = [r[0] for r in rows]
+    mat = np.stack([np.frombuffer(r[1], dtype=np.float32, count=r[2]).copy() for r in rows])
+    mat = mat / np.linalg.norm(mat, axis=1, keepdims=True)
+    q = np.asarray(query, dtype=np.float32)
+    scores = mat @ (q / np.linalg.norm(q))
+    order = np.argsort(-scores)[:top_k]
+    return [(ids[i], float(scores[i])) for i in order if scores[i] > 0]
+
+
+def _hits(results):
+    return [(r.id, round(r.score, 5)) for r in results]
+
+
+def _rounded(pairs):
+    return [(i, round(s, 5)) for i, s in pairs]
+
+
+def test_cached_search_tracks_writes():
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'vectors.db')
+        backend = SQLiteVectorBackend(db_path)
+        backend.add_batch([(f'a_{i}', rng.normal(size=16).tolist(), {'namespace': 'a'}) for i in range(200)])
+        backend.add_batch([(f'b_{i}', rng.normal(size=16).tolist(), {'namespace': 'b'}) for i in range(50)])
+        query = rng.normal(size=16).tolist()
+
+        def check():
+            for ns in ('a', 'b'):
+                got = _hits(backend.search(query, top_k=15, filters={'namespace': ns}))
+                assert got == _rounded(_brute_force(db_path, query, 15, ns))
+
+        check()  # 首次检索建立缓存
+        backend.add('a_new', query, {'namespace': 'a'})
+        backend.add('a_3', (-np.asarray(query)).tolist(), {'namespace': 'a'})  # 覆盖
+        backend.add('b_7', (np.asarray(query) + 0.1).tolist(), {'namespace': 'a'})  # 从 b 移到 a
+        backend.delete('a_10')
+        check()
+        assert [r.id for r in backend.search(query, top_k=2, filters={'namespace': 'a'})] == ['a_new', 'b_7']
+
+        all_ids = {r.id for r in backend.search(query, top_k=1000, filters={'global': True})}
+        assert 'a_10' not in all_ids and 'b_7' in all_ids
+        backend.clear(namespace='b')
+        assert backend.search(query, filters={'namespace': 'b'}) == []
+        check()
+        backend.close()
+
+
+def test_search_batch_matches_search():
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteVectorBackend(os.path.join(tmp, 'vectors.db'))
+        backend.add_batch([(f'd_{i}', rng.normal(size=8).tolist(), None) for i in range(300)])
+        queries = rng.normal(size=(5, 8))
+        queries[2] = 0  # 零向量查询返回空结果
+        batched = backend.search_batch(queries.tolist(), top_k=7)
+        assert [_hits(r) for r in batched] == [_hits(backend.search(q, top_k=7)) for q in queries.tolist()]
+        assert batched[2] == []
+        assert backend.search([0.1] * 4) == []  # 维度不匹配
+        backend.close()
+
+
+def test_matrix_sidecar_is_memory_mapped():
+    rng = np.random.default_rng(2)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'vectors.db')
+        matrix_dir = os.path.join(tmp, 'matrices')
+        query = rng.normal(size=8).tolist()
+
+        first = SQLiteVectorBackend(db_path, matrix_dir=matrix_dir)
+        first.add_batch([(f'd_{i}', rng.normal(size=8).tolist(), None) for i in range(100)])
+        expected = _hits(first.search(query, top_k=10))
+        first.close()
+
+        second = SQLiteVectorBackend(db_path, matrix_dir=matrix_dir)
+        assert _hits(second.search(query, top_k=10)) == expected
+        assert isinstance(second._matrices['default'].mat, np.memmap)
+        second.add('d_new', query)  # 只读映射上追加：复制到内存
+        assert second.search(query, top_k=1)[0].id == 'd_new'
+        second.close()
+
+        # 表已变化：旁路文件签名不匹配，重新解码
+        third = SQLiteVectorBackend(db_path, matrix_dir=matrix_dir)
+        assert third.search(query, top_k=1)[0].id == 'd_new'
+        third.close()
+
+
+def test_ann_mode_recall():
+    rng = np.random.default_rng(3)
+    centers = rng.normal(size=(40, 32))
+    vectors = centers[rng.integers(0, 40, 4000)] + rng.normal(scale=0.3, size=(4000, 32))
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'vectors.db')
+        backend = SQLiteVectorBackend(db_path, ann_threshold=1000, ann_nprobe=8)
+        backend.add_batch([(f'd_{i}', v.tolist(), None) for i, v in enumerate(vectors)])
+        queries = centers[:20] + rng.normal(scale=0.3, size=(20, 32))
+
+        overlap = 0
+        for q in queries:
+            exact = {i for i, _ in _brute_force(db_path, q, 10)}
+            overlap += len(exact & {r.id for r in backend.search(q.tolist(), top_k=10)})
+        assert backend._matrices['default'].centroids is not None
+        assert overlap / (10 * len(queries)) >= 0.9
+
+        # IVF 模式下的写入仍然可见
+        backend.add('fresh', queries[0].tolist())
+        assert backend.search(queries[0].tolist(), top_k=1)[0].id == 'fresh'
+        backend.close()
+
+
+def test_masked_rows_are_compacted(monkeypatch):
+    monkeypatch.setattr(_NamespaceMatrix, 'COMPACT_MIN_DEAD', 16)
+    rng = np.random.default_rng(4)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'vectors.db')
+        backend = SQLiteVectorBackend(db_path, cache_max_vectors=150)
+        backend.add_batch([(f'd_{i}', rng.normal(size=8).tolist(), None) for i in range(100)])
+        query = rng.normal(size=8).tolist()
+        backend.search(query)  # 建立缓存
+        matrix = backend._matrices['default']
+
+        for round_ in range(20):  # 反复覆盖与删除：旧实现下矩阵增长到 1000+ 行
+            backend.add_batch([(f'd_{i}', rng.normal(size=8).tolist(), None) for i in range(0, 100, 2)])
+            backend.delete(f'd_{round_ * 2 + 1}')
+        assert matrix.generation > 0
+        assert matrix.size <= matrix.live / (1 - _NamespaceMatrix.COMPACT_DEAD_FRACTION) + 1
+        assert backend._matrices.get('default') is matrix  # 未因屏蔽行超出缓存上限被逐出
+        assert _hits(backend.search(query, top_k=15)) == _rounded(_brute_force(db_path, query, 15))
+        backend.close()
+
+
+def test_ann_training_runs_outside_lock(monkeypatch):
+    rng = np.random.default_rng(5)
+    vectors = rng.normal(size=(1200, 16))
+    training, release = threading.Event(), threading.Event()
+    train_centroids = sqlite_vector._train_centroids
+
+    def slow_train(*args, **kwargs):
+        training.set()
+        assert release.wait(10)
+        return train_centroids(*args, **kwargs)
+
+    monkeypatch.setattr(sqlite_vector, '_train_centroids', slow_train)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'vectors.db')
+        backend = SQLiteVectorBackend(db_path, ann_threshold=1000, ann_nprobe=64)
+        backend.add_batch([(f'd_{i}', v.tolist(), None) for i, v in enumerate(vectors)])
+        trainer = threading.Thread(target=backend.search, args=(vectors[0].tolist(),))
+        trainer.start()
+        assert training.wait(10)
+
+        # 训练期间：检索照常（精确打分），写入与删除照常提交
+        query = rng.normal(size=16).tolist()
+        started = time.perf_counter()
+        assert _hits(backend.search(query, top_k=10)) == _rounded(_brute_force(db_path, query, 10))
+        backend.add('fresh', query)
+        backend.delete('d_5')
+        assert time.perf_counter() - started < 5
+        assert backend._matrices['default'].centroids is None
+
+        release.set()
+        trainer.join()
+        matrix = backend._matrices['default']
+        assert matrix.centroids is not None and len(matrix.assign) == matrix.size
+        assert backend.search(query, top_k=1)[0].id == 'fresh'  # 训练期间写入的行已分配到簇
+        assert 'd_5' not in {r.id for r in backend.search(vectors[5].tolist(), top_k=10)}
+        backend.close()
+
+
+def run_benchmark(n_vectors, dim=384, n_queries=50, top_k=10):
+    rng = np.random.default_rng(0)
+    queries = rng.normal(size=(n_queries, dim))
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'vectors.db')
+        backend = SQLiteVectorBackend(db_path, ann_threshold=0)
+        for start in range(0, n_vectors, 5000):
+            count = min(5000, n_vectors - start)
+            backend.add_batch([(f'd_{start + i}', v.tolist(), None)
+                               for i, v in enumerate(rng.normal(size=(count, dim)))])
+
+        timings = {}
+        started = time.perf_counter()
+        for q in queries[:5]:
+            _brute_force(db_path, q, top_k)
+        timings['decode per query'] = (time.perf_counter() - started) / 5 * 1000
+
+        started = time.perf_counter()
+        backend.search(queries[0].tolist(), top_k=top_k)
+        timings['cache build'] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for q in queries:
+            backend.search(q.tolist(), top_k=top_k)
+        timings['cached'] = (time.perf_counter() - started) / n_queries * 1000
+
+        backend._ann_threshold = n_vectors // 2
+        backend.search(queries[0].tolist(), top_k=top_k)  # 训练聚类
+        started = time.perf_counter()
+        for q in queries:
+            backend.search(q.tolist(), top_k=top_k)
+        timings['ivf'] = (time.perf_counter() - started) / n_queries * 1000
+        backend.close()
+
+    print(f"\nSQLiteVectorBackend 检索基准: {n_vectors} 条, dim={dim}")
+    for name, ms in timings.items():
+        print(f"  {name:18s} {ms:9.2f} ms")
+    print(f"  加速比 {timings['decode per query'] / timings['cached']:.1f}x (缓存矩阵)")
+    return timings
+
+
+def test_sqlite_vector_benchmark_small():
+    timings = run_benchmark(3000, dim=64, n_queries=20)
+    assert timings['cached'] < timings['decode per query']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SQLiteVectorBackend 缓存矩阵基准')
+    parser.add_argument('--vectors', type=int, default=50000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+    run_benchmark(args.vectors, args.dim, args.queries)
@@ -0,0 +1,274 @@
+"""TaskManager 低开销追踪模式测试 (v7.1)
+
+验证：
+1. sampled：每 N 个顶层任务完整追踪一次，子任务跟随父任务；未采样的任务不进任务表
+2. off：只统计步骤耗时，失败次数同样计入
+3. 各线程的计数器 / 环形缓冲区在读取时合并，环形缓冲区有上限
+4. 非 full 模式下订阅者由分发线程异步通知；full 模式保持同步通知
+5. 已完成列表挤出的任务同时移出任务表（旧实现中任务表只增不减）
+6. 基准：add() 的任务树在 off / sampled / full 三种模式下的吞吐
+
+使用方法：
+    python -m pytest tests/test_task_tracing.py -v -s
+    python tests/test_task_tracing.py --adds 20000 --threads 4
+    python tests/test_task_tracing.py --engine --adds 300
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.utils.task_manager import TaskManager, TaskType, get_task_manager
+
+# memory_ops.add() 依次创建的子任务（父任务为 MEMORY_SAVE）
+_ADD_STEPS = (
+    TaskType.DEDUP_CHECK,
+    TaskType.ENTITY_EXTRACTION,
+    TaskType.CONSISTENCY_CHECK,
+    TaskType.CONTRADICTION_DETECTION,
+    TaskType.INDEX_UPDATE,
+    TaskType.KNOWLEDGE_GRAPH,
+)
+
+
+@pytest.fixture
+def manager():
+    tm = get_task_manager()
+    saved = (tm.get_tracing_config(), tm.is_enabled(), list(tm._subscribers))
+    tm.clear_completed_tasks()
+    tm.reset_step_stats()
+    yield tm
+    config, enabled, subscribers = saved
+    tm.configure_tracing(config['trace_mode'], config['sample_every'], config['ring_size'])
+    tm.set_enabled(enabled)
+    tm._subscribers[:] = subscribers
+    tm.clear_completed_tasks()
+    tm.reset_step_stats()
+
+
+def _simulate_add(tm: TaskManager, fail_step: TaskType = None):
+    """按 memory_ops.add() 的顺序调用 TaskManager（创建 / 开始 / 更新 / 完成）"""
+    parent = tm.create_task(TaskType.MEMORY_SAVE, "保存记忆", user_id="bench")
+    tm.start_task(parent.id, "开始处理记忆...")
+    for step in _ADD_STEPS:
+        child = tm.create_task(step, step.value, user_id="bench", parent_task_id=parent.id)
+        tm.start_task(child.id, "处理中...")
+        tm.update_task(child.id, progress=0.5, message="处理中...")
+        if step == fail_step:
+            tm.fail_task(child.id, "boom")
+        else:
+            tm.complete_task(child.id, "完成", {'count': 1})
+    tm.complete_task(parent.id, "记忆保存成功")
+    return parent
+
+
+def test_sampled_traces_one_in_n_trees(manager):
+    manager.configure_tracing('sampled', sample_every=5)
+    parents = [_simulate_add(manager) for _ in range(20)]
+
+    traced = [p for p in parents if manager.get_task(p.id) is not None]
+    assert len(traced) == 4
+    children = [t for t in manager._tasks.values() if t.parent_task_id is not None]
+    assert len(children) == 4 * len(_ADD_STEPS)
+    assert {t.parent_task_id for t in children} == {p.id for p in traced}
+
+    steps = manager.get_step_stats()
+    assert steps['memory_save']['count'] == 20
+    for step in _ADD_STEPS:
+        assert steps[step.value]['count'] == 20
+
+
+def test_off_mode_counts_steps_only(manager):
+    manager.configure_tracing('off')
+    tasks_before = len(manager._tasks)
+    for i in range(10):
+        _simulate_add(manager, fail_step=TaskType.KNOWLEDGE_GRAPH if i % 2 else None)
+
+    assert len(manager._tasks) == tasks_before
+    assert manager.get_active_tasks() == []
+    steps = manager.get_step_stats()
+    assert (steps['knowledge_graph']['count'], steps['knowledge_graph']['failed']) == (10, 5)
+    assert steps['index_update']['failed'] == 0
+    assert steps['index_update']['avg_ms'] >= 0 and steps['index_update']['max_ms'] >= steps['index_update']['avg_ms']
+
+    # 禁用追踪同样只统计耗时
+    manager.configure_tracing('full')
+    manager.set_enabled(False)
+    _simulate_add(manager)
+    assert len(manager._tasks) == tasks_before
+    assert manager.get_step_stats()['memory_save']['count'] == 11
+
+
+def test_per_thread_counters_and_rings_merge(manager):
+    manager.configure_tracing('off', ring_size=8)
+
+    ready = threading.Barrier(4)
+
+    def worker(_):
+        _simulate_add(manager)
+        ready.wait()  # 都注册后才继续，避免先退出的线程被并入汇总
+        for _ in range(24):
+            _simulate_add(manager)
+
+    # 新线程才使用新的 ring_size
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert manager.get_step_stats()['memory_save']['count'] == 100
+    events = manager.get_trace_events(limit=1000)
+    assert len(events) == 4 * 8
+    assert [e['timestamp'] for e in events] == sorted((e['timestamp'] for e in events), reverse=True)
+    assert len(manager.get_trace_events(limit=3)) == 3
+
+    # 已退出线程的统计在新线程注册时并入汇总，不丢失
+    late = threading.Thread(target=_simulate_add, args=(manager,))
+    late.start()
+    late.join()
+    assert manager.get_step_stats()['memory_save']['count'] == 101
+    assert 8 <= len(manager.get_trace_events(limit=1000)) <= 16
+
+
+def test_subscribers_fan_out_off_thread(manager):
+    calls = []
+
+    def callback(task, event):
+        calls.append((task.id, event, threading.get_ident()))
+
+    manager.subscribe(callback)
+
+    manager.configure_tracing('full')
+    parent = _simulate_add(manager)
+    assert {c[2] for c in calls} == {threading.get_ident()}  # full 模式同步通知
+    assert (parent.id, 'completed') in [(c[0], c[1]) for c in calls]
+
+    calls.clear()
+    manager.configure_tracing('sampled', sample_every=1)
+    parent = _simulate_add(manager)
+    assert manager.flush_notifications(timeout=5)
+    assert len(calls) == 3 + 4 * len(_ADD_STEPS)  # 父任务 3 个事件，子任务各 4 个
+    assert threading.get_ident() not in {c[2] for c in calls}
+    assert calls[-1][:2] == (parent.id, 'completed')  # 顺序保持
+
+    # 慢订阅者不阻塞写入线程
+    manager.unsubscribe(callback)
+    manager.subscribe(lambda task, event: time.sleep(0.01))
+    started = time.perf_counter()
+    _simulate_add(manager)
+    assert time.perf_counter() - started < 0.1
+    assert manager.flush_notifications(timeout=5)
+
+
+def test_evicted_completed_tasks_leave_task_table(manager):
+    manager.configure_tracing('full')
+    baseline = len(manager._tasks)
+    for _ in range(manager._max_completed_tasks):
+        _simulate_add(manager)
+    assert len(manager._tasks) - baseline <= manager._max_completed_tasks
+    assert len(manager.get_recent_tasks(limit=1000, include_active=False)) == manager._max_completed_tasks
+
+
+def test_invalid_trace_mode_rejected(manager):
+    with pytest.raises(ValueError):
+        manager.configure_tracing('verbose')
+    assert manager.get_tracing_config()['trace_mode'] in ('full', 'sampled', 'off')
+
+
+# ==================== 基准 ====================
+
+_MODES = (('off', 0), ('sampled', 100), ('full', 1))
+
+
+def _subscriber(task, event):
+    task.to_dict()  # 与任务面板推送的序列化开销相当
+
+
+def run_benchmark(n_adds=5000, threads=4, with_subscriber=True):
+    """在 off / sampled / full 模式下并发重放 add() 的任务树，返回每种模式的 adds/s"""
+    tm = get_task_manager()
+    saved = tm.get_tracing_config()
+    if with_subscriber:
+        tm.subscribe(_subscriber)
+    results = {}
+    try:
+        for mode, sample_every in _MODES:
+            tm.configure_tracing(mode, sample_every=sample_every)
+            tm.clear_completed_tasks()
+            tm.reset_step_stats()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(lambda _: _simulate_add(tm), range(n_adds)))
+            elapsed = time.perf_counter() - started
+            tm.flush_notifications(timeout=30)
+            results[mode] = {
+                'adds_per_s': n_adds / elapsed,
+                'us_per_add': elapsed / n_adds * 1e6,
+                'counted': tm.get_step_stats()['memory_save']['count'],
+            }
+    finally:
+        tm.unsubscribe(_subscriber)
+        tm.configure_tracing(saved['trace_mode'], saved['sample_every'])
+        tm.clear_completed_tasks()
+
+    print(f"\nTaskManager 追踪开销: {n_adds} 次 add() 任务树 (1 + {len(_ADD_STEPS)} 个任务), {threads} 线程")
+    for mode, r in results.items():
+        print(f"  {mode:8s} {r['adds_per_s']:10.0f} adds/s  {r['us_per_add']:7.1f} µs/add")
+    return results
+
+
+def run_engine_benchmark(n_adds=200):
+    """真实 RecallEngine.add() 在三种模式下的吞吐（需要完整运行环境）"""
+    from recall.engine import RecallEngine
+
+    results = {}
+    tm = get_task_manager()
+    saved = tm.get_tracing_config()
+    try:
+        for mode, sample_every in _MODES:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                engine = RecallEngine(data_root=tmpdir, lite=True, auto_warmup=False)
+                tm.configure_tracing(mode, sample_every=sample_every)  # 引擎初始化会按配置重设
+                started = time.perf_counter()
+                for i in range(n_adds):
+                    engine.add(f"基准记忆 {mode} #{i}: 角色在第 {i} 天去了第 {i % 17} 号城市",
+                               user_id="bench", check_consistency=False)
+                elapsed = time.perf_counter() - started
+                results[mode] = {'adds_per_s': n_adds / elapsed}
+                engine.close()
+    finally:
+        tm.configure_tracing(saved['trace_mode'], saved['sample_every'])
+
+    print(f"\nRecallEngine.add() 吞吐: {n_adds} 次, lite 模式")
+    for mode, r in results.items():
+        print(f"  {mode:8s} {r['adds_per_s']:8.1f} adds/s")
+    return results
+
+
+def test_task_tracing_benchmark_small():
+    results = run_benchmark(1000, threads=4)
+    for r in results.values():
+        assert r['counted'] == 1000  # 步骤统计在所有模式下都完整
+    assert results['off']['adds_per_s'] > results['full']['adds_per_s']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='TaskManager 追踪模式基准')
+    parser.add_argument('--adds', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--no-subscriber', action='store_true', help='不注册订阅者')
+    parser.add_argument('--engine', action='store_true', help='使用真实 RecallEngine.add()')
+    args = parser.parse_args()
+    if args.engine:
+        run_engine_benchmark(args.adds)
+    else:
+        run_benchmark(args.adds, args.threads, with_subscriber=not args.no_subscriber)
@@ -0,0 +1,142 @@
+"""VectorIndex IndexIDMap2 存储测试 (v7.1)
+
+验证：
+1. remove_by_doc_ids 原生删除：被删文档不再出现在搜索结果中，其它文档的向量不变
+2. 二进制 mapping 持久化：重启后 str/int 文档 ID 与向量一一对应
+3. 旧版 IndexFlatIP + vector_mapping.json 自动迁移
+4. 删除立即写入删除日志：未落盘就崩溃，重启后被删除的向量也不会恢复
+
+使用方法：
+    python -m pytest tests/test_vector_index_idmap.py -v -s
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+faiss = pytest.importorskip('faiss')
+
+from recall.embedding.base import EmbeddingBackend, EmbeddingConfig, EmbeddingBackendType  # noqa: E402
+from recall.index.vector_index import VectorIndex  # noqa: E402
+
+
+class _FixedBackend(EmbeddingBackend):
+    """测试用后端：只提供维度，向量由测试直接写入索引"""
+
+    @property
+    def dimension(self) -> int:
+        return 8
+
+    @property
+    def is_available(self) -> bool:
+        return True
+
+    def encode(self, text):
+        return np.ones(8, dtype=np.float32)
+
+    def encode_batch(self, texts):
+        return np.ones((len(texts), 8), dtype=np.float32)
+
+
+def _open(path):
+    config = EmbeddingConfig(backend=EmbeddingBackendType.OPENAI, api_model='m', dimension=8)
+    vi = VectorIndex(path, embedding_config=config)
+    vi._embedding_backend = _FixedBackend(config)
+    return vi
+
+
+def _vectors(n, seed=0):
+    vecs = np.random.default_rng(seed).normal(size=(n, 8)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def test_remove_by_doc_ids_keeps_other_vectors():
+    vecs = _vectors(50)
+    with tempfile.TemporaryDirectory() as tmp:
+        vi = _open(tmp)
+        for i, vec in enumerate(vecs):
+            vi.add(f'doc_{i}', vec)
+
+        assert vi.remove_by_doc_ids(['doc_3', 'doc_10', 'missing']) == 2
+        assert vi.index.ntotal == 48
+        assert vi.get_vector_by_doc_id('doc_3') is None
+        assert 'doc_10' not in {d for d, _ in vi.search_by_embedding(vecs[10], top_k=50)}
+
+        fetched = vi.get_vectors_by_doc_ids(['doc_4', 'doc_49', 'doc_3'])
+        assert set(fetched) == {'doc_4', 'doc_49'}
+        np.testing.assert_allclose(fetched['doc_49'], vecs[49], rtol=1e-6)
+        assert vi.search_by_embedding(vecs[11], top_k=1)[0][0] == 'doc_11'
+
+
+def test_binary_mapping_roundtrip():
+    vecs = _vectors(5, seed=1)
+    doc_ids = ['a', 7, 'long-' + 'x' * 100, 42, '中文']
+    with tempfile.TemporaryDirectory() as tmp:
+        vi = _open(tmp)
+        for doc_id, vec in zip(doc_ids, vecs):
+            vi.add(doc_id, vec)
+        vi.remove_by_doc_ids(['a'])
+        vi._save()
+        assert os.path.exists(os.path.join(tmp, 'indexes', 'vector_mapping.bin'))
+
+        reopened = _open(tmp)
+        assert reopened.index.ntotal == 4  # 索引懒加载：先触发加载再读映射
+        assert reopened.turn_mapping == doc_ids[1:]
+        for doc_id, vec in zip(doc_ids[1:], vecs[1:]):
+            np.testing.assert_allclose(reopened.get_vector_by_doc_id(doc_id), vec, rtol=1e-6)
+
+        # 新增的向量不会复用已删除文档的内部 ID
+        reopened.add('b', vecs[0])
+        assert reopened.search_by_embedding(vecs[0], top_k=1)[0][0] == 'b'
+
+
+def test_legacy_flat_index_is_migrated():
+    vecs = _vectors(4, seed=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = os.path.join(tmp, 'indexes')
+        os.makedirs(index_dir)
+        flat = faiss.IndexFlatIP(8)
+        flat.add(vecs)
+        faiss.write_index(flat, os.path.join(index_dir, 'vector_index.faiss'))
+        with open(os.path.join(index_dir, 'vector_mapping.json'), 'w', encoding='utf-8') as f:
+            json.dump(['m1', 'm2', 'm3', 'm4'], f)
+
+        vi = _open(tmp)
+        assert vi.search_by_embedding(vecs[2], top_k=1)[0][0] == 'm3'
+        assert vi.remove_by_doc_ids(['m1']) == 1
+        assert not os.path.exists(os.path.join(index_dir, 'vector_mapping.json'))
+        assert os.path.exists(os.path.join(index_dir, 'vector_mapping.bin'))
+
+
+def test_deletes_survive_crash_before_save():
+    vecs = _vectors(10, seed=3)
+    with tempfile.TemporaryDirectory() as tmp:
+        vi = _open(tmp)
+        for i, vec in enumerate(vecs):
+            vi.add(i if i % 2 else f'doc_{i}', vec)
+        vi._save()
+
+        # 删除后不落盘（模拟崩溃）：删除日志已 fsync
+        assert vi.remove_by_doc_ids(['doc_2', 3]) == 2
+        assert os.path.exists(vi.delete_log_file)
+        with open(vi.delete_log_file, 'a', encoding='utf-8') as f:
+            f.write('"doc_4')  # 写到一半的尾行被忽略
+
+        reopened = _open(tmp)
+        assert reopened.index.ntotal == 8
+        assert reopened.get_vector_by_doc_id('doc_2') is None
+        assert reopened.get_vector_by_doc_id(3) is None
+        assert reopened.get_vector_by_doc_id('doc_4') is not None
+        assert reopened.search_by_embedding(vecs[3], top_k=1)[0][0] != 3
+        assert not os.path.exists(reopened.delete_log_file)  # 重放后落盘并清空
+
+        # 落盘后日志清空，重新添加的同名文档不受旧删除影响
+        reopened.add('doc_2', vecs[2])
+        reopened._save()
+        assert _open(tmp).search_by_embedding(vecs[2], top_k=1)[0][0] == 'doc_2'
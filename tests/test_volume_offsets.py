@@ -0,0 +1,148 @@
+"""L3 分卷存档偏移索引测试 + 基准 (v7.1)
+
+验证：
+1. 冷启动后 get_turn / get_turn_by_memory_id 通过 .idx 偏移文件直接定位，结果与写入一致
+2. 没有 .idx 的旧存档（或 .idx 落后于数据文件）首次读取时扫描重建
+3. memory_id 索引存为 memory_id_index.bin：删除、清空、重启后保持一致，
+   旧的 memory_id_index.json 自动迁移
+4. 基准：在 1 万轮的数据文件上随机读取，readlines() 整个文件（旧实现）与 seek 到行的延迟
+
+使用方法：
+    python -m pytest tests/test_volume_offsets.py -v -s
+    python tests/test_volume_offsets.py --turns 10000 --reads 500
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall.storage.volume_manager import VolumeManager
+
+
+def _fill(path, n, start=0):
+    vm = VolumeManager(path)
+    for i in range(start, start + n):
+        vm.append_turn({'memory_id': f'mem_{i}', 'user_id': 'u', 'content': f'第 {i} 轮 content {i}'})
+    vm.flush()
+    return vm
+
+
+def _legacy_get_turn(volume_path, file_id, offset):
+    """v7.1 之前 VolumeData.get_turn 的读取方式：读出整个文件取一行"""
+    file_path = os.path.join(volume_path, f"turns_{file_id * 10000 + 1:05d}_{(file_id + 1) * 10000:05d}.jsonl")
+    with open(file_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    return json.loads(lines[offset]) if offset < len(lines) else None
+
+
+def test_cold_reads_use_offset_index():
+    with tempfile.TemporaryDirectory() as tmp:
+        _fill(tmp, 250)
+        volume_path = os.path.join(tmp, 'L3_archive', 'volume_0000')
+        assert os.path.exists(os.path.join(volume_path, 'turns_00001_10000.idx'))
+
+        vm = VolumeManager(tmp)
+        for n in (0, 1, 137, 249):
+            assert vm.get_turn(n)['content'] == f'第 {n} 轮 content {n}'
+            assert vm.get_turn_by_memory_id(f'mem_{n}')['turn'] == n
+        assert vm.get_turn(250) is None
+        assert vm.get_turn_by_memory_id('missing') is None
+
+        # 追加后再次冷启动：新行的偏移同样可用
+        _fill(tmp, 30, start=250)
+        vm = VolumeManager(tmp)
+        assert vm.get_turn(279)['memory_id'] == 'mem_279'
+
+
+def test_missing_or_stale_offsets_are_rebuilt():
+    with tempfile.TemporaryDirectory() as tmp:
+        _fill(tmp, 120)
+        volume_path = os.path.join(tmp, 'L3_archive', 'volume_0000')
+        idx_path = os.path.join(volume_path, 'turns_00001_10000.idx')
+        os.remove(idx_path)
+
+        vm = VolumeManager(tmp)
+        assert vm.get_turn(77)['memory_id'] == 'mem_77'
+        assert os.path.exists(idx_path)
+
+        # .idx 内容损坏（指向错误的行）：校验 turn 不符后重建
+        with open(idx_path, 'r+b') as f:
+            f.seek(50 * 8)
+            f.write((1).to_bytes(8, 'little'))
+        vm = VolumeManager(tmp)
+        assert vm.get_turn(50)['memory_id'] == 'mem_50'
+
+
+def test_memory_id_index_is_compact_and_persistent():
+    with tempfile.TemporaryDirectory() as tmp:
+        vm = _fill(tmp, 300)
+        assert os.path.getsize(os.path.join(tmp, 'memory_id_index.bin')) == 300 * 16
+        assert not os.path.exists(os.path.join(tmp, 'memory_id_index.json'))
+        assert vm.remove_by_memory_id('mem_10') is True
+        assert vm.remove_by_memory_id('mem_10') is False
+
+        vm = VolumeManager(tmp)
+        assert 'mem_10' not in vm._memory_id_index
+        assert vm._memory_id_index.get('mem_11') == 11
+        vm.clear()
+        assert VolumeManager(tmp)._memory_id_index.get('mem_11') is None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _fill(tmp, 50)
+        os.remove(os.path.join(tmp, 'memory_id_index.bin'))
+        with open(os.path.join(tmp, 'memory_id_index.json'), 'w', encoding='utf-8') as f:
+            json.dump({f'mem_{i}': i for i in range(50)}, f)
+        vm = VolumeManager(tmp)
+        assert vm._memory_id_index.get('mem_42') == 42
+        assert os.path.exists(os.path.join(tmp, 'memory_id_index.bin'))
+        assert not os.path.exists(os.path.join(tmp, 'memory_id_index.json'))
+
+
+def run_benchmark(n_turns=10000, n_reads=200):
+    with tempfile.TemporaryDirectory() as tmp:
+        _fill(tmp, n_turns)
+        volume_path = os.path.join(tmp, 'L3_archive', 'volume_0000')
+        rng = random.Random(0)
+        picks = [rng.randrange(n_turns) for _ in range(n_reads)]
+
+        timings = {}
+        start = time.perf_counter()
+        for n in picks[:max(1, n_reads // 10)]:
+            assert _legacy_get_turn(volume_path, n // 10000, n % 10000)['turn'] == n
+        timings['readlines'] = (time.perf_counter() - start) / max(1, n_reads // 10) * 1000
+
+        vm = VolumeManager(tmp)
+        start = time.perf_counter()
+        for n in picks:
+            assert vm.get_turn(n)['turn'] == n
+        timings['offset index'] = (time.perf_counter() - start) / n_reads * 1000
+
+        start = time.perf_counter()
+        for n in picks:
+            assert vm.get_turn_by_memory_id(f'mem_{n}')['turn'] == n
+        timings['by memory_id'] = (time.perf_counter() - start) / n_reads * 1000
+
+    print(f"\nL3 存档随机读取基准: {n_turns} 轮, {n_reads} 次读取")
+    for name, ms in timings.items():
+        print(f"  {name:14s} {ms:8.3f} ms/次")
+    print(f"  加速比 {timings['readlines'] / timings['offset index']:.0f}x")
+    return timings
+
+
+def test_volume_offsets_benchmark_small():
+    timings = run_benchmark(2000, n_reads=100)
+    assert timings['offset index'] < timings['readlines']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='L3 存档随机读取基准')
+    parser.add_argument('--turns', type=int, default=10000)
+    parser.add_argument('--reads', type=int, default=500)
+    args = parser.parse_args()
+    run_benchmark(args.turns, args.reads)